@@ -1,17 +1,5 @@
 """
 API routers
+Each router module is imported on its own (main.py loads them from
+ROUTER_MODULES), so importing one router does not load all of them.
 """
-from app.api import auth, patients, encounters, vitals, consultation, billing, claims, price_list, staff
-
-__all__ = [
-    "auth",
-    "patients",
-    "encounters",
-    "vitals",
-    "consultation",
-    "billing",
-    "claims",
-    "price_list",
-    "staff",
-]
-
@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from pydantic import BaseModel
-from app.core.database import get_db
+from app.core.read_replica import get_read_db
 from app.core.dependencies import get_current_user, require_role
 from app.models.audit_log import AuditLog
 from app.models.user import User
@@ -50,7 +50,7 @@ def get_audit_logs(
     resource_type: Optional[str] = Query(None, description="Filter by resource type"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=500, description="Items per page"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Auditor"]))
 ):
     """
@@ -124,7 +124,7 @@ def get_audit_logs(
 
 @router.get("/roles", response_model=List[str])
 def get_available_roles(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Auditor"]))
 ):
     """
@@ -136,7 +136,7 @@ def get_available_roles(
 
 @router.get("/actions", response_model=List[str])
 def get_available_actions(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Auditor"]))
 ):
     """
@@ -148,7 +148,7 @@ def get_available_actions(
 
 @router.get("/resource-types", response_model=List[str])
 def get_available_resource_types(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Auditor"]))
 ):
     """
@@ -161,7 +161,7 @@ def get_available_resource_types(
 @router.get("/{log_id}", response_model=AuditLogResponse)
 def get_audit_log(
     log_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Auditor"]))
 ):
     """
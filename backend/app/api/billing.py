@@ -1,11 +1,13 @@
 """
 Billing endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel, Field
 from typing import Optional, List, Union
 from datetime import datetime
+from io import BytesIO
 from app.core.database import get_db
 from app.core.dependencies import require_role, get_current_user
 from app.models.user import User
@@ -13,7 +15,16 @@ from app.models.encounter import Encounter
 from app.models.patient import Patient
 from app.models.bill import Bill, BillItem, Receipt, ReceiptItem
 from app.models.price_list import PriceListItem
-from app.services.price_list_service_v2 import get_price_from_all_tables
+from app.services.price_list_service_v2 import get_prices_batch
+from app.services.bill_totals import reconcile_bill_totals
+from app.services.revenue_summary import (
+    determine_service_group,
+    record_receipt_items,
+    record_receipt_refund,
+    reverse_receipt_item,
+    rebuild_revenue_summary,
+    get_revenue_summary
+)
 import random
 
 router = APIRouter(prefix="/billing", tags=["billing"])
@@ -51,42 +62,6 @@ def generate_unique_receipt_number(db: Session, max_attempts: int = 100) -> str:
     return receipt_number
 
 
-def determine_service_group(item_name: str, category: str, investigation_type: Optional[str] = None) -> str:
-    """Determine service group based on item name, category, and investigation type"""
-    item_name_lower = item_name.lower()
-    
-    # Check item name prefixes
-    if item_name_lower.startswith("diagnosis:"):
-        return "Diagnose"
-    elif item_name_lower.startswith("prescription:"):
-        return "Pharmacy"
-    elif item_name_lower.startswith("investigation:"):
-        # Use investigation type if available
-        if investigation_type:
-            if investigation_type.lower() == "lab":
-                return "Lab"
-            elif investigation_type.lower() == "scan":
-                return "Scan"
-            elif investigation_type.lower() == "xray":
-                return "X-ray"
-        # Fallback to checking item name
-        if "lab" in item_name_lower:
-            return "Lab"
-        elif "scan" in item_name_lower:
-            return "Scan"
-        elif "xray" in item_name_lower or "x-ray" in item_name_lower:
-            return "X-ray"
-        return "Investigation"  # Fallback
-    elif category == "surgery":
-        return "Surgery"
-    elif category == "product" or category == "pharmacy":
-        return "Pharmacy"
-    elif category == "drg":
-        return "Diagnose"
-    else:
-        return "Other"
-
-
 class BillItemCreate(BaseModel):
     """Bill item creation model - allows None for item_code and category for miscellaneous items"""
     # Using Optional[str] = None allows None values - this is standard Pydantic behavior
@@ -146,6 +121,7 @@ class BillResponse(BaseModel):
     bill_number: str
     total_amount: float
     paid_amount: float
+    balance: float = 0.0
     is_paid: bool
     miscellaneous: Optional[str] = None
     created_at: datetime
@@ -222,8 +198,19 @@ def create_bill(
         db.flush()
         total_amount = 0.0
     
+    # Resolve list prices for all coded items in one batch instead of one lookup per item
+    # Pass item_name as procedure_name to match exact procedure when G-DRG codes map to multiple procedures
+    lookup_indexes = [
+        index for index, item_data in enumerate(bill_data.items)
+        if item_data.item_code and not (item_data.unit_price is not None and item_data.unit_price >= 0)
+    ]
+    looked_up_prices = dict(zip(lookup_indexes, get_prices_batch(db, [
+        (bill_data.items[index].item_code, None, bill_data.items[index].item_name, is_insured_encounter)
+        for index in lookup_indexes
+    ])))
+    
     # Create bill items (check for duplicates first)
-    for item_data in bill_data.items:
+    for index, item_data in enumerate(bill_data.items):
         # Handle optional fields - use defaults for items without codes/categories
         item_code = item_data.item_code or "MISC"
         category = item_data.category or "other"
@@ -255,10 +242,8 @@ def create_bill(
             # Use custom price provided by user (for miscellaneous items)
             unit_price = item_data.unit_price
         elif item_data.item_code:
-            # Only look up price if item_code is provided
-            # Pass item_name as procedure_name to match exact procedure when G-DRG codes map to multiple procedures
-            unit_price = get_price_from_all_tables(db, item_data.item_code, is_insured_encounter, None, item_data.item_name)
-            print(f"DEBUG create_bill: Looked up price for item_code='{item_data.item_code}', item_name='{item_data.item_name}', is_insured={is_insured_encounter}, price={unit_price}")
+            # Only look up price if item_code is provided (resolved in the batch above)
+            unit_price = looked_up_prices[index]
         else:
             # Items without codes must have a custom price
             raise HTTPException(
@@ -406,6 +391,7 @@ def create_receipt(
                 db.flush()
             
             # Create receipt items
+            new_payments = []
             for receipt_item_data in receipt_data_map["items"]:
                 # Check if receipt item already exists
                 existing_item = db.query(ReceiptItem).filter(
@@ -420,6 +406,10 @@ def create_receipt(
                         amount_paid=receipt_item_data.amount_paid
                     )
                     db.add(receipt_item)
+                    new_payments.append((bill_item_map[receipt_item_data.bill_item_id], receipt_item_data.amount_paid))
+            
+            # Update cashier daily totals in the same transaction
+            record_receipt_items(db, receipt, new_payments)
             
             receipts_created.append({
                 "receipt_id": receipt.id,
@@ -471,6 +461,9 @@ def create_receipt(
             )
             db.add(receipt_item)
         
+        # Update cashier daily totals in the same transaction
+        record_receipt_items(db, receipt, [(item, item.total_price) for item in bill.bill_items])
+        
         receipts_created.append({
             "receipt_id": receipt.id,
             "receipt_number": receipt.receipt_number,
@@ -675,22 +668,9 @@ def get_encounter_bills(
     current_user: User = Depends(get_current_user)  # Allow all authenticated users to view bills
 ):
     """Get all bills for an encounter - visible to all users so they can see what patient owes"""
-    # Query bills and explicitly refresh to ensure we get the latest data
+    # Totals are maintained on write by app.services.bill_totals (drift is fixed by /billing/reconcile-totals)
     bills = db.query(Bill).filter(Bill.encounter_id == encounter_id).order_by(Bill.created_at.desc()).all()
     
-    # Refresh each bill and recalculate total if needed
-    for bill in bills:
-        db.refresh(bill)
-        # Recalculate total from items if total_amount is 0 but items exist
-        bill_items = db.query(BillItem).filter(BillItem.bill_id == bill.id).all()
-        if bill_items and bill.total_amount == 0:
-            # Recalculate and update
-            calculated_total = sum(item.total_price for item in bill_items)
-            if calculated_total > 0:
-                bill.total_amount = calculated_total
-                db.commit()
-                db.refresh(bill)
-    
     return bills
 
 
@@ -816,6 +796,7 @@ def get_bill_details(
         "bill_number": bill.bill_number,
         "total_amount": bill.total_amount,
         "paid_amount": bill.paid_amount,
+        "balance": bill.balance or 0.0,
         "is_paid": bill.is_paid,
         "miscellaneous": bill.miscellaneous,
         "created_at": bill.created_at,
@@ -932,6 +913,7 @@ def add_manual_receipt_to_bill_item(
         if bill.paid_amount >= bill.total_amount:
             bill.is_paid = True
             bill.paid_at = datetime.utcnow()
+        record_receipt_items(db, receipt, [(bill_item, receipt_data.amount_paid)])
     
     db.commit()
     db.refresh(receipt)
@@ -968,6 +950,9 @@ def delete_receipt_item(
     
     amount_to_remove = receipt_item.amount_paid
     
+    # Take the payment back out of the cashier daily totals
+    reverse_receipt_item(db, receipt, receipt_item)
+    
     # Update receipt amount
     receipt.amount_paid -= amount_to_remove
     if receipt.amount_paid <= 0:
@@ -1021,6 +1006,9 @@ def refund_receipt(
     receipt.refunded_at = datetime.utcnow()
     receipt.refunded_by = current_user.id
     
+    # Record the refund in the cashier daily totals
+    record_receipt_refund(db, receipt)
+    
     # Update bill payment status - subtract this receipt's amount
     bill.paid_amount -= receipt.amount_paid
     if bill.paid_amount < 0:
@@ -1125,3 +1113,101 @@ def auto_calculate_bill_items(
         items=bill_items,
         total_amount=sum(item.total_price for item in bill_items)
     )
+
+
+def _parse_summary_range(start_date: str, end_date: Optional[str]):
+    """Parse YYYY-MM-DD range parameters for the revenue summary endpoints"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else start
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+    return start, end
+
+
+@router.get("/revenue-summary")
+def get_revenue_summary_endpoint(
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format (defaults to start_date)"),
+    cashier_id: Optional[int] = Query(None, description="Limit the summary to one cashier"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Billing", "Admin"]))
+):
+    """
+    Daily-close revenue summary for a date range.
+    Reads the pre-aggregated daily_revenue_summaries rows instead of every bill and receipt.
+    """
+    start, end = _parse_summary_range(start_date, end_date)
+    return get_revenue_summary(db, start, end, cashier_id)
+
+
+@router.get("/revenue-summary/export")
+def export_revenue_summary(
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format (defaults to start_date)"),
+    cashier_id: Optional[int] = Query(None, description="Limit the export to one cashier"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Billing", "Admin"]))
+):
+    """Export the revenue summary for a date range to Excel (one sheet per breakdown)"""
+    import pandas as pd
+    
+    start, end = _parse_summary_range(start_date, end_date)
+    summary = get_revenue_summary(db, start, end, cashier_id)
+    
+    sheets = {
+        "Detail": summary["rows"],
+        "By Day": summary["by_day"],
+        "By Cashier": summary["by_cashier"],
+        "By Service Group": summary["by_service_group"],
+        "By Payment Method": summary["by_payment_method"],
+        "Bill Payment State": [
+            {"state": state, **values} for state, values in summary["bill_payment_state"].items()
+        ],
+    }
+    
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for sheet_name, records in sheets.items():
+            pd.DataFrame(records).to_excel(writer, sheet_name=sheet_name, index=False)
+    output.seek(0)
+    
+    filename = f"REVENUE_SUMMARY_{start.strftime('%Y_%m_%d')}_TO_{end.strftime('%Y_%m_%d')}.xlsx"
+    return StreamingResponse(
+        output,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
+
+
+@router.post("/revenue-summary/rebuild")
+def rebuild_revenue_summary_endpoint(
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format (defaults to start_date)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Recompute the revenue summary rows for a date range from receipts (Admin only)"""
+    start, end = _parse_summary_range(start_date, end_date)
+    rows_written = rebuild_revenue_summary(db, start, end)
+    db.commit()
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "rows_written": rows_written
+    }
+
+
+@router.post("/reconcile-totals")
+def reconcile_bill_totals_endpoint(
+    repair: bool = Query(False, description="Write the expected totals back when drift is found"),
+    encounter_id: Optional[int] = Query(None, description="Limit the check to one encounter"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Verify denormalized bill/encounter totals against bill items and receipts (Admin only)"""
+    return reconcile_bill_totals(db, repair=repair, encounter_id=encounter_id)
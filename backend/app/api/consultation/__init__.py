@@ -0,0 +1,51 @@
+"""
+Consultation endpoints (diagnoses, prescriptions, investigations, results,
+admissions, wards, nursing, inpatient care, blood bank, inventory and beds)
+
+Each domain is a sub-router in its own module; `router` includes them all under
+/consultation, so the URLs are unchanged. Inclusion order is route-matching
+order - keep a sub-router with static paths (e.g. /ward-admissions/board) ahead
+of any that declares a path parameter in the same position.
+"""
+from fastapi import APIRouter
+from app.api.consultation import (
+    diagnoses,
+    prescriptions,
+    investigations,
+    results,
+    notes,
+    admissions,
+    wards,
+    nursing,
+    clinical_reviews,
+    inpatient_prescriptions,
+    inpatient_investigations,
+    surgeries,
+    additional_services,
+    blood_bank,
+    inventory,
+    beds,
+)
+
+SUB_ROUTERS = (
+    diagnoses,
+    prescriptions,
+    investigations,
+    results,
+    notes,
+    admissions,
+    wards,
+    nursing,
+    clinical_reviews,
+    inpatient_prescriptions,
+    inpatient_investigations,
+    surgeries,
+    additional_services,
+    blood_bank,
+    inventory,
+    beds,
+)
+
+router = APIRouter(prefix="/consultation", tags=["consultation"])
+for _module in SUB_ROUTERS:
+    router.include_router(_module.router)
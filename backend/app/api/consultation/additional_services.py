@@ -0,0 +1,461 @@
+"""
+Consultation: additional services and their use on ward admissions
+"""
+import random
+from typing import Optional, List
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role
+from app.models.user import User
+from app.models.additional_service import AdditionalService
+from app.models.inpatient_additional_service import InpatientAdditionalService
+from app.models.ward_admission import WardAdmission
+from app.models.bill import Bill, BillItem
+
+router = APIRouter()
+
+
+# Additional Services endpoints (Admin-defined services for IPD)
+class AdditionalServiceCreate(BaseModel):
+    service_name: str
+    description: Optional[str] = None
+    price_per_unit: float
+    unit_type: str = "hour"  # "hour", "day", "unit"
+
+
+class AdditionalServiceUpdate(BaseModel):
+    service_name: Optional[str] = None
+    description: Optional[str] = None
+    price_per_unit: Optional[float] = None
+    unit_type: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
+class AdditionalServiceResponse(BaseModel):
+    id: int
+    service_name: str
+    description: Optional[str]
+    price_per_unit: float
+    unit_type: str
+    is_active: bool
+    created_by: int
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/additional-services", response_model=AdditionalServiceResponse, status_code=status.HTTP_201_CREATED)
+def create_additional_service(
+    service_data: AdditionalServiceCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Create a new additional service - Admin only"""
+    # Check if service with same name already exists
+    existing = db.query(AdditionalService).filter(
+        AdditionalService.service_name == service_data.service_name
+    ).first()
+    
+    if existing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Service '{service_data.service_name}' already exists"
+        )
+    
+    service = AdditionalService(
+        service_name=service_data.service_name,
+        description=service_data.description,
+        price_per_unit=service_data.price_per_unit,
+        unit_type=service_data.unit_type,
+        created_by=current_user.id
+    )
+    db.add(service)
+    db.commit()
+    db.refresh(service)
+    
+    return service
+
+
+@router.get("/additional-services", response_model=List[AdditionalServiceResponse])
+def get_additional_services(
+    active_only: Optional[bool] = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Billing"]))
+):
+    """Get all additional services"""
+    query = db.query(AdditionalService)
+    
+    if active_only:
+        query = query.filter(AdditionalService.is_active == True)
+    
+    services = query.order_by(AdditionalService.service_name).all()
+    return services
+
+
+@router.get("/additional-services/{service_id}", response_model=AdditionalServiceResponse)
+def get_additional_service(
+    service_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Billing"]))
+):
+    """Get a single additional service"""
+    service = db.query(AdditionalService).filter(AdditionalService.id == service_id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Additional service not found")
+    
+    return service
+
+
+@router.put("/additional-services/{service_id}", response_model=AdditionalServiceResponse)
+def update_additional_service(
+    service_id: int,
+    service_data: AdditionalServiceUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Update an additional service - Admin only"""
+    service = db.query(AdditionalService).filter(AdditionalService.id == service_id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Additional service not found")
+    
+    # Check if service name is being changed and conflicts with existing
+    if service_data.service_name and service_data.service_name != service.service_name:
+        existing = db.query(AdditionalService).filter(
+            AdditionalService.service_name == service_data.service_name,
+            AdditionalService.id != service_id
+        ).first()
+        if existing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Service '{service_data.service_name}' already exists"
+            )
+    
+    update_data = service_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(service, field, value)
+    
+    service.updated_at = utcnow()
+    db.commit()
+    db.refresh(service)
+    
+    return service
+
+
+@router.delete("/additional-services/{service_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_additional_service(
+    service_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Delete (soft delete) an additional service - Admin only"""
+    service = db.query(AdditionalService).filter(AdditionalService.id == service_id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Additional service not found")
+    
+    # Soft delete by setting is_active to False
+    service.is_active = False
+    service.updated_at = utcnow()
+    db.commit()
+    
+    return None
+
+
+# Inpatient Additional Service Usage endpoints
+class InpatientAdditionalServiceCreate(BaseModel):
+    service_id: int
+    start_time: Optional[datetime] = None  # Defaults to now if not provided
+    notes: Optional[str] = None
+
+
+class InpatientAdditionalServiceStop(BaseModel):
+    end_time: Optional[datetime] = None  # Defaults to now if not provided
+    notes: Optional[str] = None
+
+
+class InpatientAdditionalServiceResponse(BaseModel):
+    id: int
+    ward_admission_id: int
+    encounter_id: int
+    service_id: int
+    service_name: str
+    service_price_per_unit: float
+    service_unit_type: str
+    start_time: datetime
+    end_time: Optional[datetime]
+    units_used: Optional[float]
+    total_cost: Optional[float]
+    is_billed: bool
+    bill_item_id: Optional[int]
+    notes: Optional[str]
+    started_by: int
+    started_by_name: Optional[str]
+    stopped_by: Optional[int]
+    stopped_by_name: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/ward-admissions/{ward_admission_id}/additional-services", response_model=InpatientAdditionalServiceResponse, status_code=status.HTTP_201_CREATED)
+def start_additional_service(
+    ward_admission_id: int,
+    service_data: InpatientAdditionalServiceCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Start an additional service for a patient"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    service = db.query(AdditionalService).filter(
+        AdditionalService.id == service_data.service_id,
+        AdditionalService.is_active == True
+    ).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Additional service not found or inactive")
+    
+    start_time = service_data.start_time or utcnow()
+    
+    patient_service = InpatientAdditionalService(
+        ward_admission_id=ward_admission_id,
+        encounter_id=ward_admission.encounter_id,
+        service_id=service_data.service_id,
+        start_time=start_time,
+        notes=service_data.notes,
+        started_by=current_user.id
+    )
+    db.add(patient_service)
+    db.commit()
+    db.refresh(patient_service)
+    
+    # Load relationships for response
+    starter = db.query(User).filter(User.id == patient_service.started_by).first()
+    
+    return {
+        "id": patient_service.id,
+        "ward_admission_id": patient_service.ward_admission_id,
+        "encounter_id": patient_service.encounter_id,
+        "service_id": patient_service.service_id,
+        "service_name": service.service_name,
+        "service_price_per_unit": service.price_per_unit,
+        "service_unit_type": service.unit_type,
+        "start_time": patient_service.start_time,
+        "end_time": patient_service.end_time,
+        "units_used": patient_service.units_used,
+        "total_cost": patient_service.total_cost,
+        "is_billed": patient_service.is_billed,
+        "bill_item_id": patient_service.bill_item_id,
+        "notes": patient_service.notes,
+        "started_by": patient_service.started_by,
+        "started_by_name": starter.full_name if starter else None,
+        "stopped_by": patient_service.stopped_by,
+        "stopped_by_name": None,
+        "created_at": patient_service.created_at,
+        "updated_at": patient_service.updated_at,
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/additional-services", response_model=List[InpatientAdditionalServiceResponse])
+def get_inpatient_additional_services(
+    ward_admission_id: int,
+    active_only: Optional[bool] = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Billing"]))
+):
+    """Get all additional services for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    query = db.query(InpatientAdditionalService).filter(
+        InpatientAdditionalService.ward_admission_id == ward_admission_id
+    )
+    
+    if active_only:
+        query = query.filter(InpatientAdditionalService.end_time.is_(None))
+    
+    services = query.order_by(InpatientAdditionalService.start_time.desc()).all()
+    
+    result = []
+    for patient_service in services:
+        service = db.query(AdditionalService).filter(AdditionalService.id == patient_service.service_id).first()
+        starter = db.query(User).filter(User.id == patient_service.started_by).first()
+        stopper = db.query(User).filter(User.id == patient_service.stopped_by).first() if patient_service.stopped_by else None
+        
+        result.append({
+            "id": patient_service.id,
+            "ward_admission_id": patient_service.ward_admission_id,
+            "encounter_id": patient_service.encounter_id,
+            "service_id": patient_service.service_id,
+            "service_name": service.service_name if service else "Unknown",
+            "service_price_per_unit": service.price_per_unit if service else 0,
+            "service_unit_type": service.unit_type if service else "hour",
+            "start_time": patient_service.start_time,
+            "end_time": patient_service.end_time,
+            "units_used": patient_service.units_used,
+            "total_cost": patient_service.total_cost,
+            "is_billed": patient_service.is_billed,
+            "bill_item_id": patient_service.bill_item_id,
+            "notes": patient_service.notes,
+            "started_by": patient_service.started_by,
+            "started_by_name": starter.full_name if starter else None,
+            "stopped_by": patient_service.stopped_by,
+            "stopped_by_name": stopper.full_name if stopper else None,
+            "created_at": patient_service.created_at,
+            "updated_at": patient_service.updated_at,
+        })
+    
+    return result
+
+
+@router.put("/ward-admissions/{ward_admission_id}/additional-services/{service_usage_id}/stop", response_model=InpatientAdditionalServiceResponse)
+def stop_additional_service(
+    ward_admission_id: int,
+    service_usage_id: int,
+    stop_data: InpatientAdditionalServiceStop,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Stop an additional service and automatically bill the patient"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    patient_service = db.query(InpatientAdditionalService).filter(
+        InpatientAdditionalService.id == service_usage_id,
+        InpatientAdditionalService.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not patient_service:
+        raise HTTPException(status_code=404, detail="Service usage not found")
+    
+    if patient_service.end_time is not None:
+        raise HTTPException(status_code=400, detail="Service has already been stopped")
+    
+    service = db.query(AdditionalService).filter(AdditionalService.id == patient_service.service_id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Additional service not found")
+    
+    # Calculate end time - normalize to naive UTC datetime
+    if stop_data.end_time:
+        # If end_time is provided, parse it and ensure it's naive
+        if isinstance(stop_data.end_time, str):
+            # Parse ISO format datetime string
+            try:
+                end_time = datetime.fromisoformat(stop_data.end_time.replace('Z', '+00:00'))
+            except (ValueError, AttributeError):
+                # Fallback to simple parsing
+                end_time = datetime.strptime(stop_data.end_time.replace('Z', ''), '%Y-%m-%dT%H:%M:%S')
+        else:
+            end_time = stop_data.end_time
+        
+        # Convert to naive UTC if timezone-aware
+        if end_time.tzinfo is not None:
+            # Convert to UTC first, then remove timezone info
+            end_time = end_time.astimezone(timezone.utc).replace(tzinfo=None)
+    else:
+        end_time = utcnow()
+    
+    # Ensure start_time is also naive for comparison
+    start_time = patient_service.start_time
+    if hasattr(start_time, 'tzinfo') and start_time.tzinfo is not None:
+        start_time = start_time.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    # Calculate units used based on unit_type
+    time_diff = end_time - start_time
+    
+    if service.unit_type == "hour":
+        units_used = max(1, round(time_diff.total_seconds() / 3600, 2))  # Round to 2 decimals, minimum 1 hour
+    elif service.unit_type == "day":
+        units_used = max(1, round(time_diff.total_seconds() / 86400, 2))  # Round to 2 decimals, minimum 1 day
+    else:  # "unit"
+        units_used = 1
+    
+    total_cost = round(units_used * service.price_per_unit, 2)
+    
+    # Update patient service
+    patient_service.end_time = end_time
+    patient_service.units_used = units_used
+    patient_service.total_cost = total_cost
+    patient_service.stopped_by = current_user.id
+    if stop_data.notes:
+        patient_service.notes = (patient_service.notes or "") + f"\n{stop_data.notes}" if patient_service.notes else stop_data.notes
+    
+    # Auto-bill: Add to patient's bill
+    is_insured = ward_admission.ccc_number is not None and ward_admission.ccc_number.strip() != ""
+    
+    # Get or create bill for this encounter
+    bill = db.query(Bill).filter(
+        Bill.encounter_id == ward_admission.encounter_id,
+        Bill.is_paid == False
+    ).first()
+    
+    if not bill:
+        bill_number = f"BILL-{random.randint(100000, 999999)}"
+        bill = Bill(
+            encounter_id=ward_admission.encounter_id,
+            bill_number=bill_number,
+            is_insured=is_insured,
+            created_by=current_user.id
+        )
+        db.add(bill)
+        db.flush()
+    
+    # Create bill item
+    bill_item = BillItem(
+        bill_id=bill.id,
+        item_code=f"ADD-SVC-{service.id}" if service.id else "MISC",
+        item_name=f"{service.service_name} ({units_used} {service.unit_type}(s))",
+        category="other",
+        quantity=units_used,
+        unit_price=service.price_per_unit,
+        total_price=total_cost
+    )
+    db.add(bill_item)
+    db.flush()
+    
+    # Link bill item to patient service
+    patient_service.bill_item_id = bill_item.id
+    patient_service.is_billed = True
+    
+    # Update bill total
+    bill.total_amount += total_cost
+    
+    db.commit()
+    db.refresh(patient_service)
+    
+    # Load relationships for response
+    starter = db.query(User).filter(User.id == patient_service.started_by).first()
+    stopper = db.query(User).filter(User.id == patient_service.stopped_by).first()
+    
+    return {
+        "id": patient_service.id,
+        "ward_admission_id": patient_service.ward_admission_id,
+        "encounter_id": patient_service.encounter_id,
+        "service_id": patient_service.service_id,
+        "service_name": service.service_name,
+        "service_price_per_unit": service.price_per_unit,
+        "service_unit_type": service.unit_type,
+        "start_time": patient_service.start_time,
+        "end_time": patient_service.end_time,
+        "units_used": patient_service.units_used,
+        "total_cost": patient_service.total_cost,
+        "is_billed": patient_service.is_billed,
+        "bill_item_id": patient_service.bill_item_id,
+        "notes": patient_service.notes,
+        "started_by": patient_service.started_by,
+        "started_by_name": starter.full_name if starter else None,
+        "stopped_by": patient_service.stopped_by,
+        "stopped_by_name": stopper.full_name if stopper else None,
+        "created_at": patient_service.created_at,
+        "updated_at": patient_service.updated_at,
+    }
@@ -0,0 +1,836 @@
+"""
+Consultation: admission recommendations, confirmation, direct admission and cancellation
+"""
+import traceback
+import random
+import logging
+from typing import Optional, List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow, today
+from app.core.dependencies import require_role
+from app.models.user import User
+from app.models.encounter import Encounter, EncounterStatus
+from app.models.diagnosis import Diagnosis
+from app.models.admission import AdmissionRecommendation
+from app.models.patient import Patient
+from app.models.bill import Bill, BillItem
+from app.models.ward_admission import WardAdmission
+from app.models.bed import Bed
+from app.models.treatment_sheet_administration import TreatmentSheetAdministration
+from app.services.price_list_service_v2 import get_price_from_all_tables
+from app.services.bed_occupancy import claim_bed, release_bed
+
+router = APIRouter()
+
+
+# Admission recommendations endpoints
+class AdmissionRecommendationResponse(BaseModel):
+    """Admission recommendation response model"""
+    id: int
+    encounter_id: int
+    ward: str
+    recommended_by: int
+    confirmed_by: Optional[int] = None
+    confirmed_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    # Patient and encounter details
+    patient_name: Optional[str] = None
+    patient_surname: Optional[str] = None
+    patient_other_names: Optional[str] = None
+    patient_card_number: Optional[str] = None
+    patient_gender: Optional[str] = None
+    patient_date_of_birth: Optional[str] = None
+    patient_emergency_contact_name: Optional[str] = None
+    patient_emergency_contact_relationship: Optional[str] = None
+    patient_emergency_contact_number: Optional[str] = None
+    encounter_created_at: Optional[datetime] = None
+    encounter_service_type: Optional[str] = None
+    encounter_ccc_number: Optional[str] = None
+    finalized_by_name: Optional[str] = None  # Name of doctor/PA who finalized
+    finalized_by_role: Optional[str] = None  # Role of doctor/PA who finalized
+    finalized_at: Optional[datetime] = None  # When consultation was finalized
+    cancelled: Optional[int] = None  # 0 = not cancelled, 1 = cancelled
+    cancelled_by: Optional[int] = None
+    cancelled_at: Optional[datetime] = None
+    cancellation_reason: Optional[str] = None
+
+
+@router.get("/admissions", response_model=List[AdmissionRecommendationResponse])
+def get_admission_recommendations(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all admission recommendations with patient and encounter details"""
+    logger = logging.getLogger(__name__)
+    try:
+        admissions = db.query(AdmissionRecommendation)\
+            .options(
+                joinedload(AdmissionRecommendation.encounter).joinedload(Encounter.patient)
+            )\
+            .order_by(AdmissionRecommendation.created_at.desc())\
+            .all()
+        
+        logger.debug("Found %d admission recommendations", len(admissions))
+        
+        result = []
+        for admission in admissions:
+            try:
+                encounter = admission.encounter
+                if not encounter:
+                    print(f"Warning: Admission {admission.id} has no encounter")
+                    continue
+                
+                patient = encounter.patient
+                if not patient:
+                    print(f"Warning: Encounter {encounter.id} has no patient")
+                    continue
+                
+                # Get finalized_by user info if encounter is finalized
+                finalized_by_name = None
+                finalized_by_role = None
+                if encounter.finalized_by:
+                    finalized_user = db.query(User).filter(User.id == encounter.finalized_by).first()
+                    if finalized_user:
+                        finalized_by_name = finalized_user.full_name
+                        finalized_by_role = finalized_user.role
+                
+                # Which emergency contact fields are filled in - never the values (DEBUG is sampled per call site)
+                logger.debug(
+                    "Admission %s emergency contact: name %s, relationship %s, number %s", admission.id,
+                    *("set" if value else "missing" for value in (
+                        patient.emergency_contact_name, patient.emergency_contact_relationship,
+                        patient.emergency_contact_number,
+                    ))
+                )
+                
+                result.append({
+                    "id": admission.id,
+                    "encounter_id": admission.encounter_id,
+                    "ward": admission.ward,
+                    "recommended_by": admission.recommended_by,
+                    "confirmed_by": admission.confirmed_by,
+                    "confirmed_at": admission.confirmed_at,
+                    "created_at": admission.created_at,
+                    "updated_at": admission.updated_at,
+                    "patient_name": patient.name,
+                    "patient_surname": patient.surname,
+                    "patient_other_names": patient.other_names,
+                    "patient_card_number": patient.card_number,
+                    "patient_gender": patient.gender,
+                    "patient_date_of_birth": patient.date_of_birth.isoformat() if patient.date_of_birth else None,
+                    "patient_insured": patient.insured,
+                    "patient_insurance_id": patient.insurance_id if patient.insurance_id else None,
+                    "patient_insurance_start_date": patient.insurance_start_date.isoformat() if patient.insurance_start_date else None,
+                    "patient_insurance_end_date": patient.insurance_end_date.isoformat() if patient.insurance_end_date else None,
+                    "patient_emergency_contact_name": patient.emergency_contact_name if patient.emergency_contact_name else None,
+                    "patient_emergency_contact_relationship": patient.emergency_contact_relationship if patient.emergency_contact_relationship else None,
+                    "patient_emergency_contact_number": patient.emergency_contact_number if patient.emergency_contact_number else None,
+                    "encounter_created_at": encounter.created_at,
+                    "encounter_service_type": encounter.department,
+                    "encounter_ccc_number": encounter.ccc_number if encounter.ccc_number else None,
+                    "finalized_by_name": finalized_by_name,
+                    "finalized_by_role": finalized_by_role,
+                    "finalized_at": encounter.finalized_at,
+                    "cancelled": admission.cancelled,
+                    "cancelled_by": admission.cancelled_by,
+                    "cancelled_at": admission.cancelled_at,
+                    "cancellation_reason": admission.cancellation_reason if admission.cancellation_reason else None,
+                })
+            except Exception as e:
+                print(f"Error processing admission {admission.id}: {str(e)}")
+                traceback.print_exc()
+                continue
+        
+        logger.debug("Returning %d admission recommendations", len(result))
+        return result
+    except Exception as e:
+        print(f"Error in get_admission_recommendations: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error fetching admission recommendations: {str(e)}")
+
+
+def _create_ipd_admission_bill(db: Session, encounter, ccc_number: Optional[str], created_by: int):
+    """
+    Create automatic bill for IPD admission based on insurance status and surgery/diagnosis.
+    
+    Rules:
+    - Insured clients: 50 cedis admission fee + surgery co-payment (if surgery exists)
+    - Non-insured clients: 30 cedis admission fee + chief diagnosis (if no surgery) OR surgery base rate (if surgery exists)
+    """
+    logger = logging.getLogger(__name__)
+    
+    try:
+        # Check if patient is insured (has CCC number)
+        is_insured = ccc_number is not None and ccc_number.strip() != ""
+        
+        # Check if there's a surgery (procedure_g_drg_code exists)
+        has_surgery = encounter.procedure_g_drg_code is not None and encounter.procedure_g_drg_code.strip() != ""
+        
+        logger.info(f"Creating IPD admission bill for encounter {encounter.id}, is_insured={is_insured}, has_surgery={has_surgery}")
+        
+        # Find or create an unpaid bill for this encounter
+        # For readmissions (reused cancelled admissions), we want to ensure we use/create a bill
+        # Check for any unpaid bill first, but if it's paid or doesn't exist, create a new one
+        existing_bill = db.query(Bill).filter(
+            Bill.encounter_id == encounter.id,
+            Bill.is_paid == False
+        ).first()
+        
+        if existing_bill:
+            bill = existing_bill
+            logger.info(f"Using existing unpaid bill {bill.id} with current total_amount={bill.total_amount}")
+        else:
+            # Check if there's a paid bill - if so, we'll still create a new unpaid bill for the readmission
+            paid_bill = db.query(Bill).filter(
+                Bill.encounter_id == encounter.id,
+                Bill.is_paid == True
+            ).first()
+            if paid_bill:
+                logger.info(f"Found paid bill {paid_bill.id} from previous admission, creating new bill for readmission")
+            
+            # Create new bill for this admission/readmission
+            bill_number = f"BILL-{random.randint(100000, 999999)}"
+            bill = Bill(
+                encounter_id=encounter.id,
+                bill_number=bill_number,
+                is_insured=is_insured,
+                total_amount=0.0,  # Explicitly initialize
+                created_by=created_by
+            )
+            db.add(bill)
+            db.flush()
+            logger.info(f"Created new bill {bill.id} with bill_number={bill_number} for admission")
+    
+        # Add admission fee
+        admission_fee = 50.0 if is_insured else 30.0
+        
+        # Check if admission fee item already exists
+        existing_admission_fee = db.query(BillItem).filter(
+            BillItem.bill_id == bill.id,
+            BillItem.item_name.like("%Admission Fee%")
+        ).first()
+        
+        if not existing_admission_fee:
+            admission_fee_item = BillItem(
+                bill_id=bill.id,
+                item_code="IPD-ADM-FEE",
+                item_name=f"IPD Admission Fee ({'Insured' if is_insured else 'Non-Insured'})",
+                category="other",
+                quantity=1,
+                unit_price=admission_fee,
+                total_price=admission_fee
+            )
+            db.add(admission_fee_item)
+            bill.total_amount = (bill.total_amount or 0.0) + admission_fee
+            logger.info(f"Added admission fee: {admission_fee}, new total_amount={bill.total_amount}")
+        else:
+            logger.info(f"Admission fee already exists, skipping")
+    
+        # Handle surgery or chief diagnosis
+        if has_surgery:
+            # Surgery case: Add surgery fee
+            surgery_code = encounter.procedure_g_drg_code
+            surgery_name = encounter.procedure_name or f"Surgery: {surgery_code}"
+            
+            # Check if surgery item already exists
+            existing_surgery = db.query(BillItem).filter(
+                BillItem.bill_id == bill.id,
+                BillItem.item_code == surgery_code
+            ).first()
+            
+            if not existing_surgery:
+                # Get surgery price (co-payment for insured, base rate for non-insured)
+                # Pass surgery_name as procedure_name to match exact surgery when G-DRG codes map to multiple procedures
+                surgery_price = get_price_from_all_tables(
+                    db, 
+                    surgery_code, 
+                    is_insured=is_insured,
+                    service_type=encounter.department,
+                    procedure_name=surgery_name
+                )
+                logger.info(f"Looked up surgery price for code='{surgery_code}', name='{surgery_name}', is_insured={is_insured}, service_type='{encounter.department}', price={surgery_price}")
+                
+                if surgery_price > 0:
+                    surgery_item = BillItem(
+                        bill_id=bill.id,
+                        item_code=surgery_code,
+                        item_name=f"Surgery: {surgery_name}",
+                        category="surgery",
+                        quantity=1,
+                        unit_price=surgery_price,
+                        total_price=surgery_price
+                    )
+                    db.add(surgery_item)
+                    bill.total_amount = (bill.total_amount or 0.0) + surgery_price
+                    logger.info(f"Added surgery fee: {surgery_price}, new total_amount={bill.total_amount}")
+                else:
+                    logger.warning(f"Surgery price is 0 for code='{surgery_code}', skipping")
+            else:
+                logger.info(f"Surgery item already exists, skipping")
+        else:
+            # No surgery: For non-insured, add chief diagnosis
+            if not is_insured:
+                # Find chief diagnosis
+                chief_diagnosis = db.query(Diagnosis).filter(
+                    Diagnosis.encounter_id == encounter.id,
+                    Diagnosis.is_chief == True,
+                    Diagnosis.gdrg_code.isnot(None),
+                    Diagnosis.gdrg_code != ''
+                ).first()
+                
+                if chief_diagnosis:
+                    # Check if chief diagnosis item already exists
+                    existing_diagnosis = db.query(BillItem).filter(
+                        BillItem.bill_id == bill.id,
+                        BillItem.item_code == chief_diagnosis.gdrg_code,
+                        BillItem.category == "drg"
+                    ).first()
+                    
+                    if not existing_diagnosis:
+                        # Get diagnosis price (base rate for non-insured)
+                        # Pass diagnosis name as procedure_name to match exact diagnosis when G-DRG codes map to multiple procedures
+                        diagnosis_price = get_price_from_all_tables(
+                            db,
+                            chief_diagnosis.gdrg_code,
+                            is_insured=False,
+                            procedure_name=chief_diagnosis.diagnosis
+                        )
+                        logger.info(f"Looked up diagnosis price for code='{chief_diagnosis.gdrg_code}', name='{chief_diagnosis.diagnosis}', price={diagnosis_price}")
+                        
+                        if diagnosis_price > 0:
+                            diagnosis_item = BillItem(
+                                bill_id=bill.id,
+                                item_code=chief_diagnosis.gdrg_code,
+                                item_name=f"Diagnosis: {chief_diagnosis.diagnosis}",
+                                category="drg",
+                                quantity=1,
+                                unit_price=diagnosis_price,
+                                total_price=diagnosis_price
+                            )
+                            db.add(diagnosis_item)
+                            bill.total_amount = (bill.total_amount or 0.0) + diagnosis_price
+                            logger.info(f"Added diagnosis fee: {diagnosis_price}, new total_amount={bill.total_amount}")
+                        else:
+                            logger.warning(f"Diagnosis price is 0 for code='{chief_diagnosis.gdrg_code}', skipping")
+                    else:
+                        logger.info(f"Diagnosis item already exists, skipping")
+                else:
+                    logger.info(f"No chief diagnosis found for encounter {encounter.id}")
+        
+        # Ensure all items are flushed before recalculating
+        db.flush()
+        
+        # Ensure bill total is correct by recalculating from items
+        # This handles cases where bill might have been modified or items deleted
+        # Query items again after flush to ensure we get all items
+        bill_items = db.query(BillItem).filter(BillItem.bill_id == bill.id).all()
+        calculated_total = sum(item.total_price for item in bill_items)
+        bill.total_amount = calculated_total
+        
+        # Flush again to ensure total_amount is saved
+        db.flush()
+        
+        # Refresh bill to ensure we have the latest state
+        db.refresh(bill)
+        
+        logger.info(f"IPD admission bill created/updated successfully. Bill ID: {bill.id}, Total Amount: {bill.total_amount}, Items: {len(bill_items)}")
+        print(f"DEBUG: IPD admission bill created/updated. Bill ID: {bill.id}, Total: {bill.total_amount}, Items: {len(bill_items)}")
+        
+        # Verify bill was actually created with items
+        if bill.total_amount == 0 and len(bill_items) == 0:
+            logger.warning(f"WARNING: Bill {bill.id} was created but has no items and total is 0!")
+            print(f"WARNING: Bill {bill.id} was created but has no items and total is 0!")
+        elif bill.total_amount == 0 and len(bill_items) > 0:
+            logger.error(f"ERROR: Bill {bill.id} has {len(bill_items)} items but total_amount is 0! Items: {[(item.item_name, item.total_price) for item in bill_items]}")
+            print(f"ERROR: Bill {bill.id} has {len(bill_items)} items but total_amount is 0! Items: {[(item.item_name, item.total_price) for item in bill_items]}")
+            # Force recalculation one more time
+            calculated_total = sum(item.total_price for item in bill_items)
+            bill.total_amount = calculated_total
+            db.flush()
+            db.refresh(bill)
+            logger.info(f"Force-recalculated bill {bill.id} total_amount to {bill.total_amount}")
+            print(f"Force-recalculated bill {bill.id} total_amount to {bill.total_amount}")
+        
+    except Exception as e:
+        logger.error(f"Error creating IPD admission bill for encounter {encounter.id}: {str(e)}", exc_info=True)
+        print(f"ERROR in _create_ipd_admission_bill: {str(e)}")
+        traceback.print_exc()
+        raise  # Re-raise to let caller handle it
+
+
+class ConfirmAdmissionRequest(BaseModel):
+    ccc_number: Optional[str] = None
+    emergency_contact_name: str
+    emergency_contact_relationship: str
+    emergency_contact_number: str
+    bed_id: int
+    doctor_id: int
+
+
+@router.put("/admissions/{admission_id}/confirm")
+def confirm_admission(
+    admission_id: int,
+    form_data: ConfirmAdmissionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Confirm an admission recommendation with complete form data"""
+    admission = db.query(AdmissionRecommendation).filter(AdmissionRecommendation.id == admission_id).first()
+    if not admission:
+        raise HTTPException(status_code=404, detail="Admission recommendation not found")
+    
+    if admission.confirmed_by is not None:
+        raise HTTPException(status_code=400, detail="Admission has already been confirmed")
+    
+    # Check if ward admission already exists
+    existing_ward_admission = db.query(WardAdmission).filter(
+        WardAdmission.encounter_id == admission.encounter_id,
+        WardAdmission.discharged_at.is_(None)
+    ).first()
+    
+    if existing_ward_admission:
+        raise HTTPException(status_code=400, detail="Patient is already admitted to a ward")
+    
+    # Verify bed exists and is available
+    bed = db.query(Bed).filter(Bed.id == form_data.bed_id).first()
+    if not bed:
+        raise HTTPException(status_code=404, detail="Bed not found")
+    
+    if bed.ward != admission.ward:
+        raise HTTPException(status_code=400, detail=f"Bed does not belong to ward {admission.ward}")
+    
+    if bed.is_occupied:
+        raise HTTPException(status_code=400, detail="Bed is already occupied")
+    
+    # Verify doctor exists
+    doctor = db.query(User).filter(User.id == form_data.doctor_id).first()
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    
+    # Get encounter to check for existing CCC
+    encounter = db.query(Encounter).filter(Encounter.id == admission.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Update encounter for IPD admission
+    # Set status to IN_CONSULTATION for IPD
+    if encounter.status != EncounterStatus.IN_CONSULTATION.value:
+        encounter.status = EncounterStatus.IN_CONSULTATION.value
+        encounter.updated_at = utcnow()
+    
+    # Update encounter department to match ward
+    if encounter.department != admission.ward:
+        encounter.department = admission.ward
+        encounter.updated_at = utcnow()
+    
+    # Ensure encounter is not archived
+    if encounter.archived:
+        encounter.archived = False
+        encounter.updated_at = utcnow()
+    
+    # For IPD confirmations from recommendations: if IPD encounter doesn't have CCC,
+    # check if there's an OPD encounter with CCC for the same patient today and copy it
+    # This allows the IPD encounter to be recognized as insured even though it's the second encounter
+    ccc_to_use = form_data.ccc_number or encounter.ccc_number
+    if not ccc_to_use and encounter.patient_id:
+        # Look for an OPD encounter (not associated with a ward admission) with CCC for same patient today
+        # Get all ward admission encounter IDs to exclude IPD encounters
+        ward_admission_encounter_ids = [wa[0] for wa in db.query(WardAdmission.encounter_id).filter(
+            WardAdmission.encounter_id.isnot(None)
+        ).all()]
+        
+        # Find OPD encounter with CCC for same patient today
+        opd_query = db.query(Encounter).filter(
+            Encounter.patient_id == encounter.patient_id,
+            Encounter.id != encounter.id,  # Different encounter
+            Encounter.archived == False,
+            Encounter.ccc_number.isnot(None),
+            Encounter.ccc_number != "",
+            func.date(Encounter.created_at) == today()
+        )
+        
+        # Exclude IPD encounters (those with ward admissions)
+        if ward_admission_encounter_ids:
+            opd_query = opd_query.filter(~Encounter.id.in_(ward_admission_encounter_ids))
+        
+        opd_encounter_with_ccc = opd_query.first()
+        
+        if opd_encounter_with_ccc and opd_encounter_with_ccc.ccc_number:
+            # Copy CCC from OPD encounter to IPD encounter
+            ccc_to_use = opd_encounter_with_ccc.ccc_number
+            encounter.ccc_number = ccc_to_use
+            encounter.updated_at = utcnow()
+    
+    # Update encounter CCC if provided in form
+    if form_data.ccc_number and not encounter.ccc_number:
+        encounter.ccc_number = form_data.ccc_number
+        ccc_to_use = form_data.ccc_number
+    
+    # Update patient emergency contact if not already set
+    patient = encounter.patient
+    if patient:
+        if not patient.emergency_contact_name:
+            patient.emergency_contact_name = form_data.emergency_contact_name
+            patient.emergency_contact_relationship = form_data.emergency_contact_relationship
+            patient.emergency_contact_number = form_data.emergency_contact_number
+    
+    # Mark admission as confirmed
+    admission.confirmed_by = current_user.id
+    admission.confirmed_at = utcnow()
+    admission.updated_at = utcnow()
+    
+    # Mark bed as occupied (atomic: a concurrent request may have taken it since the check above)
+    try:
+        claim_bed(db, bed)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    # Create ward admission record
+    ward_admission = WardAdmission(
+        admission_recommendation_id=admission.id,
+        encounter_id=admission.encounter_id,
+        ward=admission.ward,
+        bed_id=form_data.bed_id,
+        ccc_number=ccc_to_use,
+        emergency_contact_name=form_data.emergency_contact_name,
+        emergency_contact_relationship=form_data.emergency_contact_relationship,
+        emergency_contact_number=form_data.emergency_contact_number,
+        doctor_id=form_data.doctor_id,
+        admitted_by=current_user.id,
+        admitted_at=utcnow()
+    )
+    db.add(ward_admission)
+    db.flush()  # Flush to get ward_admission ID before committing
+    
+    # Auto-generate IPD admission bill
+    logger = logging.getLogger(__name__)
+    try:
+        logger.info(f"Attempting to create IPD admission bill for encounter {encounter.id}, CCC: {ccc_to_use}")
+        print(f"DEBUG: About to call _create_ipd_admission_bill for encounter {encounter.id}")
+        _create_ipd_admission_bill(db, encounter, ccc_to_use, current_user.id)
+        db.flush()  # Ensure bill is saved before commit
+        
+        # Verify bill was created correctly after flush
+        created_bill = db.query(Bill).filter(Bill.encounter_id == encounter.id, Bill.is_paid == False).order_by(Bill.created_at.desc()).first()
+        if created_bill:
+            # Recalculate total one more time to ensure it's correct
+            bill_items = db.query(BillItem).filter(BillItem.bill_id == created_bill.id).all()
+            if bill_items:
+                calculated_total = sum(item.total_price for item in bill_items)
+                if created_bill.total_amount != calculated_total:
+                    logger.warning(f"Bill {created_bill.id} total_amount mismatch: stored={created_bill.total_amount}, calculated={calculated_total}. Fixing...")
+                    print(f"WARNING: Bill {created_bill.id} total_amount mismatch: stored={created_bill.total_amount}, calculated={calculated_total}. Fixing...")
+                    created_bill.total_amount = calculated_total
+                    db.flush()
+        
+        logger.info(f"Successfully created IPD admission bill for encounter {encounter.id}")
+        print(f"DEBUG: Successfully created IPD admission bill for encounter {encounter.id}")
+    except Exception as e:
+        # Log error but don't fail admission confirmation
+        logger.error(f"Failed to create IPD admission bill for encounter {encounter.id}: {str(e)}", exc_info=True)
+        # Continue with admission confirmation even if bill creation fails
+        # But log it so we can investigate
+        # Also print to console for immediate visibility
+        print(f"ERROR: Failed to create IPD admission bill for encounter {encounter.id}: {str(e)}")
+        traceback.print_exc()
+        # Re-raise the exception so we can see what's happening
+        # But only in development - in production we'll continue
+        # raise  # Uncomment this to see the actual error
+    
+    db.commit()
+    db.refresh(admission)
+    db.refresh(ward_admission)
+    db.refresh(bed)
+    
+    return {
+        "id": admission.id,
+        "encounter_id": admission.encounter_id,
+        "ward": admission.ward,
+        "bed_id": ward_admission.bed_id,
+        "doctor_id": ward_admission.doctor_id,
+        "confirmed_by": admission.confirmed_by,
+        "confirmed_at": admission.confirmed_at,
+        "ward_admission_id": ward_admission.id,
+        "message": "Admission confirmed successfully"
+    }
+
+
+@router.put("/admissions/{admission_id}/revert-confirmation")
+def revert_admission_confirmation(
+    admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Revert admission confirmation - removes from ward and returns to recommendation state"""
+    admission = db.query(AdmissionRecommendation).filter(AdmissionRecommendation.id == admission_id).first()
+    if not admission:
+        raise HTTPException(status_code=404, detail="Admission recommendation not found")
+    
+    if admission.confirmed_by is None:
+        raise HTTPException(status_code=400, detail="Admission is not confirmed")
+    
+    # Check if patient is still in ward (not discharged)
+    ward_admission = db.query(WardAdmission).filter(
+        WardAdmission.admission_recommendation_id == admission.id,
+        WardAdmission.discharged_at.is_(None)
+    ).first()
+    
+    if ward_admission:
+        # Delete all related treatment sheet administrations first (to avoid foreign key constraint)
+        treatment_administrations = db.query(TreatmentSheetAdministration).filter(
+            TreatmentSheetAdministration.ward_admission_id == ward_admission.id
+        ).all()
+        for admin in treatment_administrations:
+            db.delete(admin)
+        
+        # Free up the bed
+        if ward_admission.bed_id:
+            release_bed(db, ward_admission.bed_id)
+        
+        # Delete the ward admission record
+        db.delete(ward_admission)
+    
+    # Revert confirmation status
+    admission.confirmed_by = None
+    admission.confirmed_at = None
+    admission.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(admission)
+    
+    return {
+        "id": admission.id,
+        "encounter_id": admission.encounter_id,
+        "ward": admission.ward,
+        "message": "Admission confirmation reverted successfully"
+    }
+
+
+class DirectAdmissionRequest(BaseModel):
+    """Request for direct admission (without recommendation)"""
+    patient_id: Optional[int] = None
+    patient_card_number: Optional[str] = None
+    ward: str
+    ccc_number: Optional[str] = None
+    emergency_contact_name: str
+    emergency_contact_relationship: str
+    emergency_contact_number: str
+    bed_id: int
+    doctor_id: int
+    admission_notes: Optional[str] = None
+
+
+@router.post("/admissions/direct")
+def create_direct_admission(
+    form_data: DirectAdmissionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Create a direct admission without a recommendation"""
+    # Get patient
+    patient = None
+    if form_data.patient_id:
+        patient = db.query(Patient).filter(Patient.id == form_data.patient_id).first()
+    elif form_data.patient_card_number:
+        patient = db.query(Patient).filter(Patient.card_number == form_data.patient_card_number).first()
+    else:
+        raise HTTPException(status_code=400, detail="Either patient_id or patient_card_number must be provided")
+    
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    # Check if patient is already admitted
+    existing_ward_admission = db.query(WardAdmission).join(Encounter).filter(
+        Encounter.patient_id == patient.id,
+        WardAdmission.discharged_at.is_(None)
+    ).first()
+    
+    if existing_ward_admission:
+        raise HTTPException(status_code=400, detail="Patient is already admitted to a ward")
+    
+    # Verify bed exists and is available
+    bed = db.query(Bed).filter(Bed.id == form_data.bed_id).first()
+    if not bed:
+        raise HTTPException(status_code=404, detail="Bed not found")
+    
+    if bed.ward != form_data.ward:
+        raise HTTPException(status_code=400, detail=f"Bed does not belong to ward {form_data.ward}")
+    
+    if bed.is_occupied:
+        raise HTTPException(status_code=400, detail="Bed is already occupied")
+    
+    # Verify doctor exists
+    doctor = db.query(User).filter(User.id == form_data.doctor_id).first()
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    
+    # Direct admissions ALWAYS create a new encounter (never reuse existing ones)
+    # This ensures each direct admission has its own encounter that can be deleted on cancellation
+    encounter = Encounter(
+        patient_id=patient.id,
+        department=form_data.ward,  # Use ward as department for inpatient
+        status=EncounterStatus.IN_CONSULTATION.value,
+        ccc_number=form_data.ccc_number,
+        created_by=current_user.id
+    )
+    db.add(encounter)
+    db.flush()  # Get encounter ID
+    
+    # Update patient emergency contact if not already set
+    if not patient.emergency_contact_name:
+        patient.emergency_contact_name = form_data.emergency_contact_name
+        patient.emergency_contact_relationship = form_data.emergency_contact_relationship
+        patient.emergency_contact_number = form_data.emergency_contact_number
+    
+    # Create new admission recommendation for direct admission
+    # Direct admissions always create fresh records (no reuse of cancelled admissions)
+    admission_recommendation = AdmissionRecommendation(
+        encounter_id=encounter.id,
+        ward=form_data.ward,
+        recommended_by=current_user.id,
+        confirmed_by=current_user.id,  # Auto-confirm for direct admission
+        confirmed_at=utcnow()
+    )
+    db.add(admission_recommendation)
+    db.flush()  # Get admission_recommendation ID
+    
+    # Mark bed as occupied (atomic: a concurrent request may have taken it since the check above)
+    try:
+        claim_bed(db, bed)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    # Create ward admission record
+    ward_admission = WardAdmission(
+        admission_recommendation_id=admission_recommendation.id,
+        encounter_id=encounter.id,
+        ward=form_data.ward,
+        bed_id=form_data.bed_id,
+        ccc_number=form_data.ccc_number or encounter.ccc_number,
+        emergency_contact_name=form_data.emergency_contact_name,
+        emergency_contact_relationship=form_data.emergency_contact_relationship,
+        emergency_contact_number=form_data.emergency_contact_number,
+        doctor_id=form_data.doctor_id,
+        admitted_by=current_user.id,
+        admission_notes=form_data.admission_notes,
+        admitted_at=utcnow()
+    )
+    db.add(ward_admission)
+    db.flush()  # Flush to get ward_admission ID before committing
+    
+    # Auto-generate IPD admission bill
+    logger = logging.getLogger(__name__)
+    try:
+        ccc_to_use = form_data.ccc_number or encounter.ccc_number
+        logger.info(f"Attempting to create IPD admission bill for encounter {encounter.id}, CCC: {ccc_to_use}")
+        print(f"DEBUG: About to call _create_ipd_admission_bill for encounter {encounter.id}")
+        _create_ipd_admission_bill(db, encounter, ccc_to_use, current_user.id)
+        db.flush()  # Ensure bill is saved before commit
+        
+        # Verify bill was created correctly after flush
+        created_bill = db.query(Bill).filter(Bill.encounter_id == encounter.id, Bill.is_paid == False).order_by(Bill.created_at.desc()).first()
+        if created_bill:
+            # Recalculate total one more time to ensure it's correct
+            bill_items = db.query(BillItem).filter(BillItem.bill_id == created_bill.id).all()
+            if bill_items:
+                calculated_total = sum(item.total_price for item in bill_items)
+                if created_bill.total_amount != calculated_total:
+                    logger.warning(f"Bill {created_bill.id} total_amount mismatch: stored={created_bill.total_amount}, calculated={calculated_total}. Fixing...")
+                    print(f"WARNING: Bill {created_bill.id} total_amount mismatch: stored={created_bill.total_amount}, calculated={calculated_total}. Fixing...")
+                    created_bill.total_amount = calculated_total
+                    db.flush()
+        
+        logger.info(f"Successfully created IPD admission bill for encounter {encounter.id}")
+        print(f"DEBUG: Successfully created IPD admission bill for encounter {encounter.id}")
+    except Exception as e:
+        # Log error but don't fail admission confirmation
+        logger.error(f"Failed to create IPD admission bill for encounter {encounter.id}: {str(e)}", exc_info=True)
+        # Continue with admission confirmation even if bill creation fails
+        # But log it so we can investigate
+        print(f"ERROR: Failed to create IPD admission bill for encounter {encounter.id}: {str(e)}")
+        traceback.print_exc()
+    
+    db.commit()
+    db.refresh(admission_recommendation)
+    db.refresh(ward_admission)
+    db.refresh(bed)
+    
+    return {
+        "id": admission_recommendation.id,
+        "encounter_id": encounter.id,
+        "ward": form_data.ward,
+        "bed_id": ward_admission.bed_id,
+        "doctor_id": ward_admission.doctor_id,
+        "ward_admission_id": ward_admission.id,
+        "message": "Patient admitted successfully"
+    }
+
+
+class CancelAdmissionRequest(BaseModel):
+    reason: str
+
+
+@router.put("/admissions/{admission_id}/cancel")
+def cancel_admission(
+    admission_id: int,
+    cancel_data: CancelAdmissionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Cancel an admission recommendation with a reason"""
+    admission = db.query(AdmissionRecommendation).filter(AdmissionRecommendation.id == admission_id).first()
+    if not admission:
+        raise HTTPException(status_code=404, detail="Admission recommendation not found")
+    
+    if admission.cancelled == 1:
+        raise HTTPException(status_code=400, detail="Admission has already been cancelled")
+    
+    # If confirmed, revert confirmation first (remove from ward)
+    if admission.confirmed_by is not None:
+        ward_admission = db.query(WardAdmission).filter(
+            WardAdmission.admission_recommendation_id == admission.id,
+            WardAdmission.discharged_at.is_(None)
+        ).first()
+        
+        if ward_admission:
+            # Delete all related treatment sheet administrations first (to avoid foreign key constraint)
+            treatment_administrations = db.query(TreatmentSheetAdministration).filter(
+                TreatmentSheetAdministration.ward_admission_id == ward_admission.id
+            ).all()
+            for admin in treatment_administrations:
+                db.delete(admin)
+            
+            # Delete the ward admission record
+            db.delete(ward_admission)
+        
+        # Revert confirmation status
+        admission.confirmed_by = None
+        admission.confirmed_at = None
+    
+    # Mark as cancelled
+    admission.cancelled = 1
+    admission.cancelled_by = current_user.id
+    admission.cancelled_at = utcnow()
+    admission.cancellation_reason = cancel_data.reason
+    admission.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(admission)
+    
+    return {
+        "id": admission.id,
+        "encounter_id": admission.encounter_id,
+        "ward": admission.ward,
+        "cancelled": admission.cancelled,
+        "cancelled_by": admission.cancelled_by,
+        "cancelled_at": admission.cancelled_at,
+        "cancellation_reason": admission.cancellation_reason,
+        "message": "Admission cancelled successfully"
+    }
@@ -0,0 +1,284 @@
+"""
+Consultation: wards, beds and doctors
+"""
+from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from sqlalchemy import distinct
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.consultation_notes import ConsultationNotes
+from app.models.admission import AdmissionRecommendation
+from app.models.bed import Bed
+from app.models.ward_admission import WardAdmission
+from app.models.treatment_sheet_administration import TreatmentSheetAdministration
+from app.models.bill import Bill, BillItem
+from app.services.bed_occupancy import (
+    bed_index, get_bed_availability as bed_availability, reconcile_bed_occupancy as reconcile,
+    release_bed,
+)
+
+router = APIRouter()
+
+
+# Bed management endpoints
+class BedResponse(BaseModel):
+    id: int
+    ward: str
+    bed_number: str
+    is_occupied: bool
+    is_active: bool
+
+
+@router.get("/wards", response_model=List[str])
+def get_wards(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get list of unique wards from admission recommendations"""
+    wards = db.query(distinct(AdmissionRecommendation.ward)).filter(
+        AdmissionRecommendation.ward.isnot(None)
+    ).order_by(AdmissionRecommendation.ward).all()
+    
+    return [ward[0] for ward in wards if ward[0]]
+
+
+@router.get("/beds", response_model=List[BedResponse])
+def get_beds(
+    ward: Optional[str] = None,
+    available_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get beds, optionally filtered by ward and availability (served from the bed occupancy index)"""
+    bed_index.ensure_fresh(db)
+    beds = bed_index.free_beds(ward) if available_only else bed_index.beds(ward)
+    return [bed._asdict() for bed in sorted(beds, key=lambda bed: bed.bed_number)]
+
+
+@router.get("/beds/availability")
+def get_bed_availability(
+    ward: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Total, free and occupied beds per ward (active beds only)"""
+    return bed_availability(db, ward)
+
+
+@router.post("/beds/occupancy/reconcile")
+def reconcile_bed_occupancy(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """
+    Recompute bed occupancy from the active ward admissions and rebuild the
+    availability index - Admin only
+    """
+    return reconcile(db)
+
+
+class BedCreate(BaseModel):
+    ward: str
+    bed_number: str
+    is_active: bool = True
+
+
+@router.post("/beds", response_model=BedResponse, status_code=status.HTTP_201_CREATED)
+def create_bed(
+    bed_data: BedCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Create a new bed in the system - Admin only"""
+    # Check if bed with same number in same ward already exists
+    existing_bed = db.query(Bed).filter(
+        Bed.ward == bed_data.ward,
+        Bed.bed_number == bed_data.bed_number,
+        Bed.is_active == True
+    ).first()
+    
+    if existing_bed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bed {bed_data.bed_number} already exists in {bed_data.ward}"
+        )
+    
+    bed = Bed(
+        ward=bed_data.ward,
+        bed_number=bed_data.bed_number,
+        is_active=bed_data.is_active,
+        is_occupied=False
+    )
+    db.add(bed)
+    db.commit()
+    db.refresh(bed)
+    
+    return bed
+
+
+@router.put("/beds/{bed_id}", response_model=BedResponse)
+def update_bed(
+    bed_id: int,
+    bed_data: BedCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Update a bed - Admin only"""
+    bed = db.query(Bed).filter(Bed.id == bed_id).first()
+    if not bed:
+        raise HTTPException(status_code=404, detail="Bed not found")
+    
+    # Check if bed with same number in same ward already exists (excluding current bed)
+    existing_bed = db.query(Bed).filter(
+        Bed.ward == bed_data.ward,
+        Bed.bed_number == bed_data.bed_number,
+        Bed.id != bed_id,
+        Bed.is_active == True
+    ).first()
+    
+    if existing_bed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bed {bed_data.bed_number} already exists in {bed_data.ward}"
+        )
+    
+    bed.ward = bed_data.ward
+    bed.bed_number = bed_data.bed_number
+    bed.is_active = bed_data.is_active
+    bed.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(bed)
+    
+    return bed
+
+
+@router.delete("/beds/{bed_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_bed(
+    bed_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Delete (soft delete) a bed - Admin only"""
+    bed = db.query(Bed).filter(Bed.id == bed_id).first()
+    if not bed:
+        raise HTTPException(status_code=404, detail="Bed not found")
+    
+    if bed.is_occupied:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot delete bed that is currently occupied"
+        )
+    
+    # Soft delete
+    bed.is_active = False
+    bed.updated_at = utcnow()
+    
+    db.commit()
+    
+    return None
+
+
+# Doctor list endpoint
+class DoctorResponse(BaseModel):
+    id: int
+    full_name: str
+    role: str
+    username: str
+
+
+@router.get("/doctors", response_model=List[DoctorResponse])
+def get_doctors(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get list of all doctors"""
+    doctors = db.query(User).filter(
+        User.role.in_(["Doctor", "PA"]),
+        User.is_active == True
+    ).order_by(User.full_name).all()
+    
+    return [
+        {
+            "id": doctor.id,
+            "full_name": doctor.full_name or doctor.username,
+            "role": doctor.role,
+            "username": doctor.username
+        }
+        for doctor in doctors
+    ]
+
+
+# Cancel admission endpoint (for AM page)
+@router.delete("/ward-admissions/{ward_admission_id}")
+def cancel_ward_admission(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Cancel/delete a ward admission - removes all admission records"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    # Delete all related treatment sheet administrations first (to avoid foreign key constraint)
+    treatment_administrations = db.query(TreatmentSheetAdministration).filter(
+        TreatmentSheetAdministration.ward_admission_id == ward_admission_id
+    ).all()
+    for admin in treatment_administrations:
+        db.delete(admin)
+    
+    # Free up the bed
+    release_bed(db, ward_admission.bed_id)
+    
+    # Get admission recommendation and encounter
+    admission = db.query(AdmissionRecommendation).filter(
+        AdmissionRecommendation.id == ward_admission.admission_recommendation_id
+    ).first()
+    
+    encounter = db.query(Encounter).filter(Encounter.id == ward_admission.encounter_id).first()
+    
+    # Check if this is a direct admission (no consultation notes = direct admission)
+    # Direct admissions should have their encounter deleted on cancellation
+    consultation_notes = None
+    if encounter:
+        consultation_notes = db.query(ConsultationNotes).filter(
+            ConsultationNotes.encounter_id == encounter.id
+        ).first()
+    
+    # Delete all related bills and bill items for this encounter
+    if encounter:
+        unpaid_bills = db.query(Bill).filter(
+            Bill.encounter_id == encounter.id,
+            Bill.is_paid == False
+        ).all()
+        for bill in unpaid_bills:
+            # Delete bill items first
+            bill_items = db.query(BillItem).filter(BillItem.bill_id == bill.id).all()
+            for item in bill_items:
+                db.delete(item)
+            db.delete(bill)
+    
+    # Delete admission recommendation
+    if admission:
+        db.delete(admission)
+    
+    # Delete ward admission record
+    db.delete(ward_admission)
+    
+    # If this is a direct admission (no consultation notes), delete the encounter
+    # This ensures the encounter won't be reused on readmission
+    if encounter and not consultation_notes:
+        # This is a direct admission - delete the encounter
+        db.delete(encounter)
+    
+    db.commit()
+    
+    return {
+        "message": "Admission cancelled successfully. All records have been removed."
+    }
@@ -0,0 +1,716 @@
+"""
+Consultation: blood transfusion types and requests, blood units and blood bank stock
+"""
+import random
+from typing import Optional, List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role
+from app.core.n_plus_one import query_budget
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.blood_transfusion_type import BloodTransfusionType
+from app.models.blood_transfusion_request import BloodTransfusionRequest
+from app.models.ward_admission import WardAdmission
+from app.models.bill import Bill, BillItem
+from app.models.blood_bank import BloodUnit
+from app.services.blood_bank import (
+    blood_request_filters, blood_request_rows, blood_request_response, lock_blood_request,
+    reserve_units, issue_units, release_units, get_blood_request_queue, receive_units, discard_unit,
+    recheck_unit, get_blood_stock, rebuild_blood_stock,
+)
+
+router = APIRouter()
+
+
+# Blood Transfusion Type Management endpoints (Admin only)
+class BloodTransfusionTypeCreate(BaseModel):
+    type_name: str
+    description: Optional[str] = None
+    unit_price: float
+    unit_type: str = "unit"  # "unit", "pack", etc.
+
+
+class BloodTransfusionTypeUpdate(BaseModel):
+    type_name: Optional[str] = None
+    description: Optional[str] = None
+    unit_price: Optional[float] = None
+    unit_type: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
+class BloodTransfusionTypeResponse(BaseModel):
+    id: int
+    type_name: str
+    description: Optional[str]
+    unit_price: float
+    unit_type: str
+    is_active: bool
+    created_by: int
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/blood-transfusion-types", response_model=BloodTransfusionTypeResponse, status_code=status.HTTP_201_CREATED)
+def create_blood_transfusion_type(
+    type_data: BloodTransfusionTypeCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Create a new blood transfusion type - Admin only"""
+    # Check if type with same name already exists
+    existing = db.query(BloodTransfusionType).filter(
+        BloodTransfusionType.type_name == type_data.type_name
+    ).first()
+    
+    if existing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Blood transfusion type '{type_data.type_name}' already exists"
+        )
+    
+    transfusion_type = BloodTransfusionType(
+        type_name=type_data.type_name,
+        description=type_data.description,
+        unit_price=type_data.unit_price,
+        unit_type=type_data.unit_type,
+        created_by=current_user.id
+    )
+    db.add(transfusion_type)
+    db.commit()
+    db.refresh(transfusion_type)
+    
+    return transfusion_type
+
+
+@router.get("/blood-transfusion-types", response_model=List[BloodTransfusionTypeResponse])
+def get_blood_transfusion_types(
+    active_only: Optional[bool] = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Lab"]))
+):
+    """Get all blood transfusion types"""
+    query = db.query(BloodTransfusionType)
+    
+    if active_only:
+        query = query.filter(BloodTransfusionType.is_active == True)
+    
+    types = query.order_by(BloodTransfusionType.type_name).all()
+    return types
+
+
+@router.get("/blood-transfusion-types/{type_id}", response_model=BloodTransfusionTypeResponse)
+def get_blood_transfusion_type(
+    type_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Lab"]))
+):
+    """Get a specific blood transfusion type"""
+    transfusion_type = db.query(BloodTransfusionType).filter(BloodTransfusionType.id == type_id).first()
+    if not transfusion_type:
+        raise HTTPException(status_code=404, detail="Blood transfusion type not found")
+    
+    return transfusion_type
+
+
+@router.put("/blood-transfusion-types/{type_id}", response_model=BloodTransfusionTypeResponse)
+def update_blood_transfusion_type(
+    type_id: int,
+    type_data: BloodTransfusionTypeUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Update a blood transfusion type - Admin only"""
+    transfusion_type = db.query(BloodTransfusionType).filter(BloodTransfusionType.id == type_id).first()
+    if not transfusion_type:
+        raise HTTPException(status_code=404, detail="Blood transfusion type not found")
+    
+    # Check if type name is being changed and conflicts with existing
+    if type_data.type_name and type_data.type_name != transfusion_type.type_name:
+        existing = db.query(BloodTransfusionType).filter(
+            BloodTransfusionType.type_name == type_data.type_name,
+            BloodTransfusionType.id != type_id
+        ).first()
+        if existing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Blood transfusion type '{type_data.type_name}' already exists"
+            )
+    
+    update_data = type_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(transfusion_type, field, value)
+    
+    transfusion_type.updated_at = utcnow()
+    db.commit()
+    db.refresh(transfusion_type)
+    
+    return transfusion_type
+
+
+@router.delete("/blood-transfusion-types/{type_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_blood_transfusion_type(
+    type_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Delete (soft delete) a blood transfusion type - Admin only"""
+    transfusion_type = db.query(BloodTransfusionType).filter(BloodTransfusionType.id == type_id).first()
+    if not transfusion_type:
+        raise HTTPException(status_code=404, detail="Blood transfusion type not found")
+    
+    # Soft delete by setting is_active to False
+    transfusion_type.is_active = False
+    transfusion_type.updated_at = utcnow()
+    db.commit()
+    
+    return None
+
+
+# Blood Transfusion Request endpoints
+class BloodTransfusionRequestCreate(BaseModel):
+    ward_admission_id: int
+    encounter_id: int
+    transfusion_type_id: int
+    quantity: float = 1.0
+    request_reason: Optional[str] = None
+
+
+class BloodTransfusionRequestResponse(BaseModel):
+    id: int
+    ward_admission_id: int
+    encounter_id: int
+    transfusion_type_id: int
+    transfusion_type_name: str
+    quantity: float
+    request_reason: Optional[str]
+    status: str
+    requested_by: int
+    requested_by_name: Optional[str]
+    accepted_by: Optional[int]
+    accepted_by_name: Optional[str]
+    fulfilled_by: Optional[int]
+    fulfilled_by_name: Optional[str]
+    returned_by: Optional[int]
+    returned_by_name: Optional[str]
+    bill_item_id: Optional[int]
+    return_bill_item_id: Optional[int]
+    requested_at: datetime
+    accepted_at: Optional[datetime]
+    fulfilled_at: Optional[datetime]
+    returned_at: Optional[datetime]
+    cancelled_at: Optional[datetime]
+    cancellation_reason: Optional[str]
+    patient_name: str
+    patient_card_number: str
+    ward: str
+    unit_price: float
+    total_price: float
+    unit_numbers: List[str] = []  # Blood bank units reserved / issued for the request
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/blood-transfusion-requests", response_model=BloodTransfusionRequestResponse, status_code=status.HTTP_201_CREATED)
+def create_blood_transfusion_request(
+    request_data: BloodTransfusionRequestCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Create a new blood transfusion request"""
+    # Verify ward admission exists
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == request_data.ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    # Verify encounter exists and matches
+    encounter = db.query(Encounter).filter(Encounter.id == request_data.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    if encounter.id != ward_admission.encounter_id:
+        raise HTTPException(status_code=400, detail="Encounter does not match ward admission")
+    
+    # Verify transfusion type exists and is active
+    transfusion_type = db.query(BloodTransfusionType).filter(BloodTransfusionType.id == request_data.transfusion_type_id).first()
+    if not transfusion_type:
+        raise HTTPException(status_code=404, detail="Blood transfusion type not found")
+    
+    if not transfusion_type.is_active:
+        raise HTTPException(status_code=400, detail="Blood transfusion type is not active")
+    
+    # Create request
+    blood_request = BloodTransfusionRequest(
+        ward_admission_id=request_data.ward_admission_id,
+        encounter_id=request_data.encounter_id,
+        transfusion_type_id=request_data.transfusion_type_id,
+        quantity=request_data.quantity,
+        request_reason=request_data.request_reason,
+        status="pending",
+        requested_by=current_user.id
+    )
+    db.add(blood_request)
+    db.commit()
+    db.refresh(blood_request)
+    
+    # Load relationships for response
+    patient = encounter.patient
+    requester = db.query(User).filter(User.id == current_user.id).first()
+    
+    return {
+        "id": blood_request.id,
+        "ward_admission_id": blood_request.ward_admission_id,
+        "encounter_id": blood_request.encounter_id,
+        "transfusion_type_id": blood_request.transfusion_type_id,
+        "transfusion_type_name": transfusion_type.type_name,
+        "quantity": blood_request.quantity,
+        "request_reason": blood_request.request_reason,
+        "status": blood_request.status,
+        "requested_by": blood_request.requested_by,
+        "requested_by_name": requester.full_name if requester else None,
+        "accepted_by": None,
+        "accepted_by_name": None,
+        "fulfilled_by": None,
+        "fulfilled_by_name": None,
+        "returned_by": None,
+        "returned_by_name": None,
+        "bill_item_id": None,
+        "return_bill_item_id": None,
+        "requested_at": blood_request.requested_at,
+        "accepted_at": None,
+        "fulfilled_at": None,
+        "returned_at": None,
+        "cancelled_at": None,
+        "cancellation_reason": None,
+        "patient_name": f"{patient.name} {patient.surname or ''}".strip(),
+        "patient_card_number": patient.card_number or "",
+        "ward": ward_admission.ward,
+        "unit_price": transfusion_type.unit_price,
+        "total_price": transfusion_type.unit_price * blood_request.quantity,
+    }
+
+
+@router.get("/blood-transfusion-requests", response_model=List[BloodTransfusionRequestResponse])
+def get_blood_transfusion_requests(
+    status: Optional[str] = Query(None),  # Filter by status: pending, accepted, fulfilled, returned, cancelled
+    ward: Optional[str] = Query(None),  # Filter by ward
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Lab"]))
+):
+    """Get blood transfusion requests, newest first"""
+    return blood_request_rows(
+        db, blood_request_filters(status, ward),
+        [BloodTransfusionRequest.requested_at.desc(), BloodTransfusionRequest.id.desc()]
+    )
+
+
+@router.post("/blood-transfusion-requests/{request_id}/accept", response_model=BloodTransfusionRequestResponse)
+def accept_blood_transfusion_request(
+    request_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Admin"]))
+):
+    """Accept a blood transfusion request - Lab only. Creates bill item. Can accept pending or returned requests."""
+    blood_request = lock_blood_request(db, request_id)
+    if not blood_request:
+        raise HTTPException(status_code=404, detail="Blood transfusion request not found")
+    
+    if blood_request.status not in ["pending"]:
+        raise HTTPException(status_code=400, detail=f"Cannot accept request with status '{blood_request.status}'. Only pending requests can be accepted.")
+    
+    # Reserve the bags (stock-managed types) before anything is billed
+    try:
+        reserve_units(db, blood_request)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    # If this was previously returned, we need to create a new bill item (the old one was credited)
+    # If it's a new request, create the first bill item
+    create_new_bill_item = True
+    if blood_request.bill_item_id:
+        # Check if the original bill item still exists
+        existing_bill_item = db.query(BillItem).filter(BillItem.id == blood_request.bill_item_id).first()
+        if existing_bill_item and existing_bill_item.total_price > 0:
+            # Original bill item exists and wasn't credited, reuse it
+            create_new_bill_item = False
+    
+    # Get encounter to check if patient is insured
+    encounter = db.query(Encounter).filter(Encounter.id == blood_request.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    is_insured = bool(encounter.ccc_number and encounter.ccc_number.strip())
+    
+    # Get or create bill for encounter
+    bill = db.query(Bill).filter(Bill.encounter_id == blood_request.encounter_id).first()
+    if not bill:
+        # Create new bill
+        bill_number = f"BILL-{random.randint(100000, 999999)}"
+        bill = Bill(
+            encounter_id=blood_request.encounter_id,
+            bill_number=bill_number,
+            total_amount=0.0,
+            is_insured=is_insured,
+            created_by=current_user.id
+        )
+        db.add(bill)
+        db.flush()
+    
+    # Calculate price (use base rate for cash, co-payment for insured)
+    unit_price = blood_request.transfusion_type.unit_price
+    total_price = unit_price * blood_request.quantity
+    
+    if create_new_bill_item:
+        # Create new bill item
+        bill_item = BillItem(
+            bill_id=bill.id,
+            item_code=f"BLOOD-{blood_request.transfusion_type.type_name.upper().replace(' ', '-')}",
+            item_name=f"{blood_request.transfusion_type.type_name} ({blood_request.quantity} {blood_request.transfusion_type.unit_type})",
+            category="other",
+            quantity=blood_request.quantity,
+            unit_price=unit_price,
+            total_price=total_price
+        )
+        db.add(bill_item)
+        db.flush()
+        
+        # Update bill total
+        bill.total_amount += total_price
+        db.flush()
+        
+        # Update request status
+        blood_request.status = "accepted"
+        blood_request.accepted_by = current_user.id
+        blood_request.accepted_at = utcnow()
+        blood_request.bill_item_id = bill_item.id
+    else:
+        # Reuse existing bill item - just update status
+        bill_item = db.query(BillItem).filter(BillItem.id == blood_request.bill_item_id).first()
+        # Update request status
+        blood_request.status = "accepted"
+        blood_request.accepted_by = current_user.id
+        blood_request.accepted_at = utcnow()
+    
+    db.commit()
+    
+    return blood_request_response(db, request_id)
+
+
+@router.post("/blood-transfusion-requests/{request_id}/fulfill", response_model=BloodTransfusionRequestResponse)
+def fulfill_blood_transfusion_request(
+    request_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Admin"]))
+):
+    """Fulfill a blood transfusion request - Lab only"""
+    blood_request = lock_blood_request(db, request_id)
+    if not blood_request:
+        raise HTTPException(status_code=404, detail="Blood transfusion request not found")
+    
+    if blood_request.status != "accepted":
+        raise HTTPException(status_code=400, detail=f"Cannot fulfill request with status '{blood_request.status}'. Must be 'accepted'.")
+    
+    # Issue the reserved bags to the ward
+    try:
+        issue_units(db, blood_request)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    blood_request.status = "fulfilled"
+    blood_request.fulfilled_by = current_user.id
+    blood_request.fulfilled_at = utcnow()
+    db.commit()
+    
+    return blood_request_response(db, request_id)
+
+
+class CancelBloodRequestRequest(BaseModel):
+    cancellation_reason: Optional[str] = None
+
+
+@router.post("/blood-transfusion-requests/{request_id}/cancel", response_model=BloodTransfusionRequestResponse)
+def cancel_blood_transfusion_request(
+    request_id: int,
+    cancel_data: CancelBloodRequestRequest = Body(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Cancel a blood transfusion request - Normal users can cancel their own requests, Admin can cancel any"""
+    blood_request = lock_blood_request(db, request_id)
+    if not blood_request:
+        raise HTTPException(status_code=404, detail="Blood transfusion request not found")
+    
+    # Normal users can only cancel their own pending requests
+    if current_user.role != "Admin":
+        if blood_request.requested_by != current_user.id:
+            raise HTTPException(status_code=403, detail="You can only cancel your own requests")
+        if blood_request.status != "pending":
+            raise HTTPException(status_code=400, detail=f"Cannot cancel request with status '{blood_request.status}'. Only pending requests can be cancelled.")
+    else:
+        # Admin can cancel any request that hasn't been fulfilled or returned
+        if blood_request.status in ["fulfilled", "returned"]:
+            raise HTTPException(status_code=400, detail=f"Cannot cancel request with status '{blood_request.status}'")
+    
+    # Put reserved bags back into stock
+    if blood_request.status == "accepted":
+        try:
+            release_units(db, blood_request)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    
+    blood_request.status = "cancelled"
+    blood_request.cancelled_at = utcnow()
+    blood_request.cancellation_reason = cancel_data.cancellation_reason
+    db.commit()
+    
+    return blood_request_response(db, request_id)
+
+
+@router.delete("/blood-transfusion-requests/{request_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_blood_transfusion_request(
+    request_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Delete a blood transfusion request - Admin only. Permanently removes the request."""
+    blood_request = db.query(BloodTransfusionRequest).filter(BloodTransfusionRequest.id == request_id).first()
+    if not blood_request:
+        raise HTTPException(status_code=404, detail="Blood transfusion request not found")
+    
+    # Only allow deletion if request is cancelled or pending (not accepted/fulfilled/returned)
+    if blood_request.status not in ["pending", "cancelled"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot delete request with status '{blood_request.status}'. Only pending or cancelled requests can be deleted."
+        )
+    
+    # Units returned on this request keep it as history; clear it rather than block the delete
+    db.query(BloodUnit).filter(BloodUnit.request_id == request_id).update(
+        {BloodUnit.request_id: None}, synchronize_session=False
+    )
+    db.delete(blood_request)
+    db.commit()
+    
+    return None
+
+
+@router.post("/blood-transfusion-requests/{request_id}/return", response_model=BloodTransfusionRequestResponse)
+def return_blood_transfusion_request(
+    request_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Return blood transfusion - Admin only. Creates return bill item (credit). After return, request can be accepted again."""
+    blood_request = lock_blood_request(db, request_id)
+    if not blood_request:
+        raise HTTPException(status_code=404, detail="Blood transfusion request not found")
+    
+    if blood_request.status not in ["accepted", "fulfilled"]:
+        raise HTTPException(status_code=400, detail=f"Cannot return request with status '{blood_request.status}'")
+    
+    # Get encounter to check if patient is insured
+    encounter = db.query(Encounter).filter(Encounter.id == blood_request.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    is_insured = bool(encounter.ccc_number and encounter.ccc_number.strip())
+    
+    # Get bill
+    bill = db.query(Bill).filter(Bill.encounter_id == blood_request.encounter_id).first()
+    if not bill:
+        raise HTTPException(status_code=404, detail="Bill not found")
+    
+    # Calculate return price (negative amount)
+    unit_price = blood_request.transfusion_type.unit_price
+    return_total_price = -(unit_price * blood_request.quantity)  # Negative for credit
+    
+    # Create return bill item (credit)
+    return_bill_item = BillItem(
+        bill_id=bill.id,
+        item_code=f"BLOOD-RETURN-{blood_request.transfusion_type.type_name.upper().replace(' ', '-')}",
+        item_name=f"Return: {blood_request.transfusion_type.type_name} ({blood_request.quantity} {blood_request.transfusion_type.unit_type})",
+        category="other",
+        quantity=blood_request.quantity,
+        unit_price=-unit_price,  # Negative unit price
+        total_price=return_total_price  # Negative total
+    )
+    db.add(return_bill_item)
+    db.flush()
+    
+    # Update bill total (subtract the return amount)
+    bill.total_amount += return_total_price  # Adding negative = subtracting
+    db.flush()
+    
+    # Reserved bags go back into stock, issued bags into quarantine for a lab re-check
+    try:
+        release_units(db, blood_request)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    # Update request status - set to "pending" so it can be accepted again
+    blood_request.status = "pending"
+    blood_request.returned_by = current_user.id
+    blood_request.returned_at = utcnow()
+    blood_request.return_bill_item_id = return_bill_item.id
+    # Reset accepted/fulfilled fields so it can be re-accepted
+    blood_request.accepted_by = None
+    blood_request.accepted_at = None
+    blood_request.fulfilled_by = None
+    blood_request.fulfilled_at = None
+    # Keep the original bill_item_id for reference, but we'll create a new one if accepted again
+    db.commit()
+    
+    return blood_request_response(db, request_id)
+
+
+# Blood bank endpoints
+@router.get("/blood-bank/queue")
+@query_budget(5)  # user, requests with patient/ward/type, staff names, unit numbers, open counts
+def get_blood_bank_queue(
+    status: str = Query("pending", pattern="^(pending|accepted|fulfilled|returned|cancelled)$"),
+    ward: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Admin", "Nurse", "Doctor", "PA"]))
+):
+    """Blood request queue for one status, oldest request first, cursor paginated, with pending / accepted counts"""
+    try:
+        return get_blood_request_queue(db, status, ward, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class BloodUnitsReceive(BaseModel):
+    transfusion_type_id: int
+    unit_numbers: List[str]  # Bag / donation numbers, one per unit
+    blood_group: Optional[str] = None
+    volume_ml: Optional[float] = None
+    expires_at: Optional[datetime] = None
+
+
+class BloodUnitResponse(BaseModel):
+    id: int
+    transfusion_type_id: int
+    unit_number: str
+    blood_group: Optional[str]
+    volume_ml: Optional[float]
+    expires_at: Optional[datetime]
+    status: str
+    request_id: Optional[int]
+    received_at: datetime
+    reserved_at: Optional[datetime]
+    issued_at: Optional[datetime]
+    returned_at: Optional[datetime] = None
+    checked_at: Optional[datetime] = None
+    discarded_at: Optional[datetime]
+    discard_reason: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+
+@router.post("/blood-bank/units", response_model=List[BloodUnitResponse], status_code=status.HTTP_201_CREATED)
+def receive_blood_units(
+    units_data: BloodUnitsReceive,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Admin"]))
+):
+    """Receive blood units into the blood bank - Lab only"""
+    try:
+        units = receive_units(
+            db, units_data.transfusion_type_id, units_data.unit_numbers, current_user.id,
+            units_data.blood_group, units_data.volume_ml, units_data.expires_at
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    return units
+
+
+@router.get("/blood-bank/units", response_model=List[BloodUnitResponse])
+def get_blood_units(
+    transfusion_type_id: Optional[int] = None,
+    status: Optional[str] = Query("available", pattern="^(available|reserved|issued|quarantined|discarded)?$"),
+    limit: int = Query(200, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Admin"]))
+):
+    """Blood units, earliest expiry first"""
+    query = db.query(BloodUnit)
+    if transfusion_type_id:
+        query = query.filter(BloodUnit.transfusion_type_id == transfusion_type_id)
+    if status:
+        query = query.filter(BloodUnit.status == status)
+    return query.order_by(BloodUnit.expires_at.is_(None), BloodUnit.expires_at, BloodUnit.id).limit(limit).all()
+
+
+class DiscardBloodUnitRequest(BaseModel):
+    reason: Optional[str] = None
+
+
+@router.post("/blood-bank/units/{unit_id}/discard", response_model=BloodUnitResponse)
+def discard_blood_unit(
+    unit_id: int,
+    discard_data: DiscardBloodUnitRequest = Body(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Admin"]))
+):
+    """Remove an available unit from stock (expired, damaged) - Lab only"""
+    try:
+        unit = discard_unit(db, unit_id, current_user.id, discard_data.reason)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    db.refresh(unit)
+    return unit
+
+
+class RecheckBloodUnitRequest(BaseModel):
+    passed: bool  # False discards the unit
+    reason: Optional[str] = None
+
+
+@router.post("/blood-bank/units/{unit_id}/recheck", response_model=BloodUnitResponse)
+def recheck_blood_unit(
+    unit_id: int,
+    recheck_data: RecheckBloodUnitRequest = Body(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Admin"]))
+):
+    """Re-check a unit returned from the ward: back into stock if it passes, discarded if not - Lab only"""
+    try:
+        unit = recheck_unit(db, unit_id, current_user.id, recheck_data.passed, recheck_data.reason)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    db.refresh(unit)
+    return unit
+
+
+@router.get("/blood-bank/stock")
+def get_blood_bank_stock(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Admin", "Nurse", "Doctor", "PA"]))
+):
+    """Units per blood transfusion type: available, usable, expiring, reserved, issued, quarantined and discarded"""
+    return get_blood_stock(db)
+
+
+@router.post("/blood-bank/stock/rebuild")
+def rebuild_blood_bank_stock(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Recount the stock counters from the units - Admin only"""
+    types = rebuild_blood_stock(db)
+    db.commit()
+    return {"transfusion_types": types}
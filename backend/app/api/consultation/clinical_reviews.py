@@ -0,0 +1,732 @@
+"""
+Consultation: inpatient clinical reviews with their diagnoses and prescriptions
+"""
+from typing import Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.dependencies import require_role
+from app.models.user import User
+from app.models.diagnosis import Diagnosis
+from app.models.prescription import Prescription
+from app.models.ward_admission import WardAdmission
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.inpatient_diagnosis import InpatientDiagnosis
+from app.models.icd10_drg_mapping import ICD10DRGMapping
+from app.models.inpatient_prescription import InpatientPrescription
+from app.services.investigation_worklist import user_names
+from app.api.consultation.common import FREQUENCY_MAPPING
+
+router = APIRouter()
+
+
+# Inpatient Clinical Review endpoints
+class CreateInpatientClinicalReviewRequest(BaseModel):
+    review_notes: Optional[str] = None
+
+
+@router.post("/ward-admissions/{ward_admission_id}/clinical-reviews")
+def create_inpatient_clinical_review(
+    ward_admission_id: int,
+    request: CreateInpatientClinicalReviewRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Create a new clinical review for an inpatient"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot add clinical review for discharged patient")
+    
+    clinical_review = InpatientClinicalReview(
+        ward_admission_id=ward_admission_id,
+        review_notes=request.review_notes,
+        reviewed_by=current_user.id
+    )
+    
+    db.add(clinical_review)
+    db.commit()
+    db.refresh(clinical_review)
+    
+    reviewer = db.query(User).filter(User.id == clinical_review.reviewed_by).first()
+    
+    return {
+        "id": clinical_review.id,
+        "ward_admission_id": clinical_review.ward_admission_id,
+        "review_notes": clinical_review.review_notes,
+        "reviewed_by": clinical_review.reviewed_by,
+        "reviewed_by_name": reviewer.full_name if reviewer else None,
+        "reviewed_at": clinical_review.reviewed_at,
+        "message": "Clinical review created successfully"
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/clinical-reviews")
+def get_inpatient_clinical_reviews(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Pharmacy", "Pharmacy Head"]))
+):
+    """Get all clinical reviews for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_reviews = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).order_by(InpatientClinicalReview.reviewed_at.desc()).all()
+    
+    result = []
+    for review in clinical_reviews:
+        reviewer = db.query(User).filter(User.id == review.reviewed_by).first()
+        result.append({
+            "id": review.id,
+            "review_notes": review.review_notes,
+            "reviewed_by": review.reviewed_by,
+            "reviewed_by_name": reviewer.full_name if reviewer else None,
+            "reviewed_at": review.reviewed_at,
+        })
+    
+    return result
+
+
+@router.put("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}")
+def update_inpatient_clinical_review(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    request: CreateInpatientClinicalReviewRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Update a clinical review for an inpatient"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    # Check permissions: user can edit their own review, admin can edit any
+    if current_user.role != "Admin" and clinical_review.reviewed_by != current_user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="You can only edit your own clinical review. Admin can edit any review."
+        )
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot edit clinical review for discharged patient")
+    
+    # Update review notes
+    clinical_review.review_notes = request.review_notes
+    
+    db.commit()
+    db.refresh(clinical_review)
+    
+    reviewer = db.query(User).filter(User.id == clinical_review.reviewed_by).first()
+    
+    return {
+        "id": clinical_review.id,
+        "ward_admission_id": clinical_review.ward_admission_id,
+        "review_notes": clinical_review.review_notes,
+        "reviewed_by": clinical_review.reviewed_by,
+        "reviewed_by_name": reviewer.full_name if reviewer else None,
+        "reviewed_at": clinical_review.reviewed_at,
+        "message": "Clinical review updated successfully"
+    }
+
+
+@router.delete("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}")
+def delete_inpatient_clinical_review(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Delete a clinical review (Admin only)"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    # Only Admin can delete
+    if current_user.role != "Admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Only Admin can delete clinical reviews"
+        )
+    
+    db.delete(clinical_review)
+    db.commit()
+    
+    return {
+        "message": "Clinical review deleted successfully"
+    }
+
+
+# Inpatient Diagnosis endpoints
+class InpatientDiagnosisCreate(BaseModel):
+    clinical_review_id: int
+    icd10: Optional[str] = None
+    diagnosis: str
+    gdrg_code: Optional[str] = None
+    diagnosis_status: Optional[str] = None  # 'new', 'old', or 'recurring'
+    is_provisional: bool = False
+    is_chief: bool = False
+
+
+@router.post("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/diagnoses")
+def create_inpatient_diagnosis(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    diagnosis_data: InpatientDiagnosisCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Add a diagnosis to a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    # Convert None ICD-10 to empty string
+    diagnosis_dict = diagnosis_data.dict()
+    if diagnosis_dict.get('icd10') is None:
+        diagnosis_dict['icd10'] = ''
+    
+    # Auto-add ICD-10 code to system if it doesn't exist
+    icd10_code = diagnosis_dict.get('icd10', '').strip()
+    if icd10_code:
+        existing_mapping = db.query(ICD10DRGMapping).filter(
+            ICD10DRGMapping.icd10_code == icd10_code
+        ).first()
+        
+        if not existing_mapping:
+            new_icd10 = ICD10DRGMapping(
+                drg_code='',
+                drg_description='',
+                icd10_code=icd10_code,
+                icd10_description=diagnosis_dict.get('diagnosis', '').strip() or '',
+                notes='Auto-added from inpatient diagnosis entry',
+                remarks='',
+                is_active=True
+            )
+            db.add(new_icd10)
+            db.flush()
+    
+    # Auto-map ICD-10 to DRG code
+    if icd10_code and not diagnosis_dict.get('gdrg_code'):
+        mapping = db.query(ICD10DRGMapping).filter(
+            ICD10DRGMapping.icd10_code == icd10_code,
+            ICD10DRGMapping.is_active == True,
+            ICD10DRGMapping.drg_code != '',
+            ICD10DRGMapping.drg_code.isnot(None)
+        ).first()
+        
+        if mapping:
+            diagnosis_dict['gdrg_code'] = mapping.drg_code
+            if not diagnosis_dict.get('diagnosis') or not diagnosis_dict['diagnosis'].strip():
+                if mapping.icd10_description:
+                    diagnosis_dict['diagnosis'] = mapping.icd10_description
+    
+    diagnosis = InpatientDiagnosis(**diagnosis_dict, created_by=current_user.id)
+    db.add(diagnosis)
+    db.commit()
+    db.refresh(diagnosis)
+    
+    return {
+        "id": diagnosis.id,
+        "clinical_review_id": diagnosis.clinical_review_id,
+        "icd10": diagnosis.icd10,
+        "diagnosis": diagnosis.diagnosis,
+        "gdrg_code": diagnosis.gdrg_code,
+        "diagnosis_status": diagnosis.diagnosis_status,
+        "is_provisional": diagnosis.is_provisional,
+        "is_chief": diagnosis.is_chief,
+        "created_by": diagnosis.created_by,
+        "created_at": diagnosis.created_at,
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/diagnoses")
+def get_inpatient_diagnoses(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all diagnoses for a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    diagnoses = db.query(InpatientDiagnosis).filter(
+        InpatientDiagnosis.clinical_review_id == clinical_review_id
+    ).all()
+    
+    return [
+        {
+            "id": d.id,
+            "clinical_review_id": d.clinical_review_id,
+            "icd10": d.icd10,
+            "diagnosis": d.diagnosis,
+            "gdrg_code": d.gdrg_code,
+            "diagnosis_status": d.diagnosis_status,
+            "is_provisional": d.is_provisional,
+            "is_chief": d.is_chief,
+            "created_by": d.created_by,
+            "created_at": d.created_at,
+        }
+        for d in diagnoses
+    ]
+
+
+@router.delete("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/diagnoses/{diagnosis_id}")
+def delete_inpatient_diagnosis(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    diagnosis_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Delete a diagnosis from a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    diagnosis = db.query(InpatientDiagnosis).filter(
+        InpatientDiagnosis.id == diagnosis_id,
+        InpatientDiagnosis.clinical_review_id == clinical_review_id
+    ).first()
+    if not diagnosis:
+        raise HTTPException(status_code=404, detail="Diagnosis not found")
+    
+    db.delete(diagnosis)
+    db.commit()
+    return None
+
+
+# Inpatient Prescription endpoints
+class InpatientPrescriptionCreate(BaseModel):
+    # clinical_review_id is in the URL path, not needed in body
+    medicine_code: str
+    medicine_name: str
+    dose: Optional[str] = None
+    unit: Optional[str] = None
+    frequency: Optional[str] = None
+    duration: Optional[str] = None
+    instructions: Optional[str] = None
+    quantity: int = 0
+    unparsed: Optional[str] = None
+    is_external: Optional[bool] = False  # Mark prescription as external (to be filled outside)
+
+
+class InpatientPrescriptionUpdate(BaseModel):
+    """Inpatient prescription update model (clinical_review_id not required for updates)"""
+    medicine_code: str
+    medicine_name: str
+    dose: Optional[str] = None
+    unit: Optional[str] = None
+    frequency: Optional[str] = None
+    duration: Optional[str] = None
+    instructions: Optional[str] = None
+    quantity: int = 0
+    unparsed: Optional[str] = None
+    is_external: Optional[bool] = None  # Mark prescription as external (to be filled outside)
+
+
+@router.post("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/prescriptions")
+def create_inpatient_prescription(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    prescription_data: InpatientPrescriptionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin", "Pharmacy", "Pharmacy Head"]))
+):
+    """Add a prescription to a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    # Get frequency value from mapping
+    frequency_value = None
+    if prescription_data.frequency:
+        frequency_value = FREQUENCY_MAPPING.get(prescription_data.frequency.strip(), None)
+    
+    # Handle is_external flag (convert boolean to integer for SQLite)
+    is_external = prescription_data.is_external if prescription_data.is_external is not None else False
+    is_external_int = 1 if is_external else 0
+    
+    prescription = InpatientPrescription(
+        clinical_review_id=clinical_review_id,
+        medicine_code=prescription_data.medicine_code,
+        medicine_name=prescription_data.medicine_name,
+        dose=prescription_data.dose,
+        unit=prescription_data.unit,
+        frequency=prescription_data.frequency,
+        frequency_value=frequency_value,
+        duration=prescription_data.duration,
+        instructions=prescription_data.instructions,
+        quantity=prescription_data.quantity,
+        unparsed=prescription_data.unparsed,
+        prescribed_by=current_user.id,
+        is_external=is_external_int
+    )
+    
+    db.add(prescription)
+    db.commit()
+    db.refresh(prescription)
+    
+    return {
+        "id": prescription.id,
+        "clinical_review_id": prescription.clinical_review_id,
+        "medicine_code": prescription.medicine_code,
+        "medicine_name": prescription.medicine_name,
+        "dose": prescription.dose,
+        "unit": prescription.unit,
+        "frequency": prescription.frequency,
+        "frequency_value": prescription.frequency_value,
+        "duration": prescription.duration,
+        "instructions": prescription.instructions,
+        "quantity": prescription.quantity,
+        "prescribed_by": prescription.prescribed_by,
+        "is_external": bool(prescription.is_external),
+        "created_at": prescription.created_at,
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/prescriptions")
+def get_inpatient_prescriptions(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all prescriptions for a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    prescriptions = db.query(InpatientPrescription).filter(
+        InpatientPrescription.clinical_review_id == clinical_review_id
+    ).all()
+    
+    return [
+        {
+            "id": p.id,
+            "clinical_review_id": p.clinical_review_id,
+            "medicine_code": p.medicine_code,
+            "medicine_name": p.medicine_name,
+            "dose": p.dose,
+            "unit": p.unit,
+            "frequency": p.frequency,
+            "frequency_value": p.frequency_value,
+            "duration": p.duration,
+            "instructions": p.instructions,
+            "quantity": p.quantity,
+            "prescribed_by": p.prescribed_by,
+            "created_at": p.created_at,
+        }
+        for p in prescriptions
+    ]
+
+
+@router.get("/ward-admissions/{ward_admission_id}/prescriptions")
+def get_all_ward_admission_prescriptions(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all DISPENSED prescriptions for a ward admission (for treatment sheet)"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    result = []
+    
+    # 1. Get all DISPENSED inpatient prescriptions from clinical reviews
+    clinical_reviews = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).all()
+    
+    if clinical_reviews:
+        clinical_review_ids = [cr.id for cr in clinical_reviews]
+        inpatient_prescriptions = db.query(InpatientPrescription).filter(
+            InpatientPrescription.clinical_review_id.in_(clinical_review_ids),
+            InpatientPrescription.dispensed_by.isnot(None)  # Only dispensed prescriptions
+        ).order_by(InpatientPrescription.created_at.desc()).all()
+        
+        for p in inpatient_prescriptions:
+            result.append({
+                "id": p.id,
+                "clinical_review_id": p.clinical_review_id,
+                "encounter_id": None,  # Not from OPD encounter
+                "medicine_code": p.medicine_code,
+                "medicine_name": p.medicine_name,
+                "dose": p.dose,
+                "unit": p.unit,
+                "frequency": p.frequency,
+                "frequency_value": p.frequency_value,
+                "duration": p.duration,
+                "instructions": p.instructions,
+                "quantity": p.quantity,
+                "prescribed_by": p.prescribed_by,
+                "created_at": p.created_at,
+                "source": "inpatient"  # Mark as inpatient prescription
+            })
+    
+    # 2. Get DISPENSED OPD encounter prescriptions (if encounter_id exists)
+    if ward_admission.encounter_id:
+        opd_prescriptions = db.query(Prescription).filter(
+            Prescription.encounter_id == ward_admission.encounter_id,
+            Prescription.dispensed_by.isnot(None)  # Only dispensed prescriptions
+        ).order_by(Prescription.created_at.desc()).all()
+        
+        for p in opd_prescriptions:
+            result.append({
+                "id": p.id,
+                "clinical_review_id": None,  # Not from clinical review
+                "encounter_id": p.encounter_id,
+                "medicine_code": p.medicine_code,
+                "medicine_name": p.medicine_name,
+                "dose": p.dose,
+                "unit": p.unit,
+                "frequency": p.frequency,
+                "frequency_value": p.frequency_value,
+                "duration": p.duration,
+                "instructions": p.instructions,
+                "quantity": p.quantity,
+                "prescribed_by": p.prescribed_by,
+                "created_at": p.created_at,
+                "source": "opd"  # Mark as OPD prescription
+            })
+    
+    # Sort by created_at descending
+    result.sort(key=lambda x: x.get("created_at") or datetime.min, reverse=True)
+    
+    return result
+
+
+@router.get("/ward-admissions/{ward_admission_id}/diagnoses/all")
+def get_all_inpatient_diagnoses_for_ward_admission(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin", "Nurse", "Doctor", "PA"]))
+):
+    """Get all diagnoses for a ward admission (across all clinical reviews and from OPD encounter)"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    result = []
+    
+    # Get OPD diagnoses from the encounter (if encounter exists)
+    if ward_admission.encounter_id:
+        opd_diagnoses = db.query(Diagnosis).filter(
+            Diagnosis.encounter_id == ward_admission.encounter_id
+        ).order_by(Diagnosis.created_at.desc()).all()
+        
+        for d in opd_diagnoses:
+            creator = db.query(User).filter(User.id == d.created_by).first()
+            result.append({
+                "id": d.id,
+                "clinical_review_id": None,  # OPD diagnoses don't have clinical_review_id
+                "icd10": d.icd10,
+                "diagnosis": d.diagnosis,
+                "gdrg_code": d.gdrg_code,
+                "diagnosis_status": d.diagnosis_status,
+                "is_provisional": d.is_provisional,
+                "is_chief": d.is_chief,
+                "created_by": d.created_by,
+                "created_by_name": creator.full_name if creator else "Unknown",
+                "created_at": d.created_at,
+                "source": "opd",  # Flag to indicate this is from OPD encounter
+            })
+    
+    # Get all clinical reviews for this ward admission
+    clinical_reviews = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).all()
+    
+    if clinical_reviews:
+        clinical_review_ids = [cr.id for cr in clinical_reviews]
+        
+        # Get all diagnoses from all clinical reviews
+        inpatient_diagnoses = db.query(InpatientDiagnosis).filter(
+            InpatientDiagnosis.clinical_review_id.in_(clinical_review_ids)
+        ).order_by(InpatientDiagnosis.created_at.desc()).all()
+        
+        for d in inpatient_diagnoses:
+            creator = db.query(User).filter(User.id == d.created_by).first()
+            result.append({
+                "id": d.id,
+                "clinical_review_id": d.clinical_review_id,
+                "icd10": d.icd10,
+                "diagnosis": d.diagnosis,
+                "gdrg_code": d.gdrg_code,
+                "diagnosis_status": d.diagnosis_status,
+                "is_provisional": d.is_provisional,
+                "is_chief": d.is_chief,
+                "created_by": d.created_by,
+                "created_by_name": creator.full_name if creator else "Unknown",
+                "created_at": d.created_at,
+                "source": "inpatient",  # Flag to indicate this is from inpatient clinical review
+            })
+    
+    # Sort all diagnoses by created_at (most recent first)
+    result.sort(key=lambda x: x.get("created_at") or datetime.min, reverse=True)
+    
+    return result
+
+
+@router.get("/ward-admissions/{ward_admission_id}/prescriptions/all")
+def get_all_inpatient_prescriptions_for_pharmacy(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Get ALL inpatient prescriptions for a ward admission (for pharmacy - includes pending, confirmed, and dispensed)"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    result = []
+    
+    # Get all clinical reviews for this ward admission
+    clinical_reviews = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).all()
+    
+    if not clinical_reviews:
+        return []
+    
+    clinical_review_ids = [cr.id for cr in clinical_reviews]
+    
+    # Get ALL inpatient prescriptions (pending, confirmed, and dispensed)
+    inpatient_prescriptions = db.query(InpatientPrescription).filter(
+        InpatientPrescription.clinical_review_id.in_(clinical_review_ids)
+    ).order_by(InpatientPrescription.created_at.desc()).all()
+    
+    # Prescriber, confirmer and dispenser names in one query
+    names = user_names(db, (
+        user_id
+        for p in inpatient_prescriptions
+        for user_id in (p.prescribed_by, p.confirmed_by, p.dispensed_by)
+    ))
+    
+    for p in inpatient_prescriptions:
+        prescriber_name = names.get(p.prescribed_by, "Unknown")
+        confirmer_name = names.get(p.confirmed_by, "Unknown") if p.confirmed_by else None
+        dispenser_name = names.get(p.dispensed_by, "Unknown") if p.dispensed_by else None
+        
+        result.append({
+            "id": p.id,
+            "clinical_review_id": p.clinical_review_id,
+            "ward_admission_id": ward_admission.id,
+            "encounter_id": ward_admission.encounter_id,
+            "ward": ward_admission.ward,
+            "medicine_code": p.medicine_code,
+            "medicine_name": p.medicine_name,
+            "dose": p.dose,
+            "unit": p.unit,
+            "frequency": p.frequency,
+            "frequency_value": p.frequency_value,
+            "duration": p.duration,
+            "instructions": p.instructions,
+            "quantity": p.quantity,
+            "prescribed_by": p.prescribed_by,
+            "prescriber_name": prescriber_name,
+            "confirmed_by": p.confirmed_by,
+            "confirmer_name": confirmer_name,
+            "confirmed_at": p.confirmed_at,
+            "dispensed_by": p.dispensed_by,
+            "dispenser_name": dispenser_name,
+            "service_date": p.service_date,  # Add service_date for dispensed date/time
+            "is_external": bool(p.is_external) if hasattr(p, 'is_external') else False,
+            "created_at": p.created_at,
+            "is_confirmed": p.confirmed_by is not None,
+            "is_dispensed": p.dispensed_by is not None
+        })
+    
+    return result
+
+
+@router.delete("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/prescriptions/{prescription_id}")
+def delete_inpatient_prescription(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    prescription_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Delete a prescription from a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    prescription = db.query(InpatientPrescription).filter(
+        InpatientPrescription.id == prescription_id,
+        InpatientPrescription.clinical_review_id == clinical_review_id
+    ).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    db.delete(prescription)
+    db.commit()
+    return None
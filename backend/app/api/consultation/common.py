@@ -0,0 +1,239 @@
+"""
+Consultation: helpers shared by the OPD and IPD endpoints (sample IDs, dosing frequencies, dispensing payload)
+"""
+import json
+import logging
+from typing import Optional
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.datetime_utils import utcnow
+from app.models.encounter import Encounter
+from app.models.diagnosis import Diagnosis
+from app.models.lab_result import LabResult
+from app.models.inpatient_lab_result import InpatientLabResult
+from app.models.inpatient_investigation import InpatientInvestigation
+
+
+def _generate_and_store_sample_id(db: Session, investigation, entered_by_user_id: int):
+    """
+    Generate a sample ID for a lab investigation and create a minimal lab_result record.
+    This allows staff to write the ID on the sample and feed it into the analyzer before payment.
+    """
+    logger = logging.getLogger(__name__)
+    
+    try:
+        # Check if lab_result already exists and has a sample_no
+        # First determine if this is OPD or IPD
+        
+        if isinstance(investigation, InpatientInvestigation):
+            # IPD investigation - check IPD lab results only
+            existing_ipd_result = db.query(InpatientLabResult).filter(
+                InpatientLabResult.investigation_id == investigation.id
+            ).first()
+            
+            if existing_ipd_result and existing_ipd_result.template_data:
+                existing_template_data = existing_ipd_result.template_data
+                if isinstance(existing_template_data, dict):
+                    if existing_template_data.get('sample_no'):
+                        logger.info(f"IPD investigation {investigation.id} already has sample_no: {existing_template_data.get('sample_no')}")
+                        return  # Sample ID already exists
+                else:
+                    try:
+                        template_data = json.loads(existing_template_data)
+                        if template_data.get('sample_no'):
+                            logger.info(f"IPD investigation {investigation.id} already has sample_no: {template_data.get('sample_no')}")
+                            return  # Sample ID already exists
+                    except (json.JSONDecodeError, TypeError):
+                        pass
+        else:
+            # OPD investigation - check OPD lab results only
+            existing_opd_result = db.query(LabResult).filter(
+                LabResult.investigation_id == investigation.id
+            ).first()
+            
+            if existing_opd_result and existing_opd_result.template_data:
+                existing_template_data = existing_opd_result.template_data
+                if isinstance(existing_template_data, dict):
+                    if existing_template_data.get('sample_no'):
+                        logger.info(f"OPD investigation {investigation.id} already has sample_no: {existing_template_data.get('sample_no')}")
+                        return  # Sample ID already exists
+                else:
+                    try:
+                        template_data = json.loads(existing_template_data)
+                        if template_data.get('sample_no'):
+                            logger.info(f"OPD investigation {investigation.id} already has sample_no: {template_data.get('sample_no')}")
+                            return  # Sample ID already exists
+                    except (json.JSONDecodeError, TypeError):
+                        pass
+        
+        # Generate sample ID
+        now = utcnow()
+        year = now.year % 100  # Last 2 digits of year (e.g., 25 for 2025)
+        month = now.month
+        
+        # Format: YYMM
+        year_month_prefix = f"{year:02d}{month:02d}"
+        
+        # Find the highest sample number for this year/month from all lab results
+        max_sample_num = 0
+        
+        # Check OPD lab results
+        opd_results = db.query(LabResult).filter(
+            LabResult.template_data.isnot(None)
+        ).all()
+        
+        for result in opd_results:
+            if result.template_data:
+                try:
+                    template_data = result.template_data if isinstance(result.template_data, dict) else json.loads(result.template_data)
+                    sample_no = template_data.get('sample_no', '')
+                    if sample_no and len(sample_no) == 8 and sample_no[:4] == year_month_prefix:
+                        try:
+                            sample_num = int(sample_no[4:])
+                            if sample_num > max_sample_num:
+                                max_sample_num = sample_num
+                        except ValueError:
+                            pass
+                except (json.JSONDecodeError, TypeError):
+                    pass
+        
+        # Check IPD lab results
+        ipd_results = db.query(InpatientLabResult).filter(
+            InpatientLabResult.template_data.isnot(None)
+        ).all()
+        
+        for result in ipd_results:
+            if result.template_data:
+                try:
+                    template_data = result.template_data if isinstance(result.template_data, dict) else json.loads(result.template_data)
+                    sample_no = template_data.get('sample_no', '')
+                    if sample_no and len(sample_no) == 8 and sample_no[:4] == year_month_prefix:
+                        try:
+                            sample_num = int(sample_no[4:])
+                            if sample_num > max_sample_num:
+                                max_sample_num = sample_num
+                        except ValueError:
+                            pass
+                except (json.JSONDecodeError, TypeError):
+                    pass
+        
+        # Generate next sample number
+        next_sample_num = max_sample_num + 1
+        
+        # Format: YYMMNNNNN (8 digits total)
+        sample_id = f"{year_month_prefix}{next_sample_num:05d}"
+        
+        # Create or update lab_result record with sample ID
+        template_data = {
+            "sample_no": sample_id,
+            "field_values": {},
+            "messages": {},
+            "validated_by": ""
+        }
+        
+        # Check if investigation is OPD or IPD by checking the type
+        if isinstance(investigation, InpatientInvestigation):
+            # IPD investigation
+            existing_lab_result = db.query(InpatientLabResult).filter(
+                InpatientLabResult.investigation_id == investigation.id
+            ).first()
+            
+            if existing_lab_result:
+                # Update existing record
+                if existing_lab_result.template_data:
+                    existing_data = existing_lab_result.template_data if isinstance(existing_lab_result.template_data, dict) else json.loads(existing_lab_result.template_data)
+                    existing_data['sample_no'] = sample_id
+                    existing_lab_result.template_data = existing_data
+                    logger.info(f"Updated IPD lab_result with sample_id={sample_id} for investigation_id={investigation.id}")
+                else:
+                    existing_lab_result.template_data = template_data
+                    logger.info(f"Set IPD lab_result template_data with sample_id={sample_id} for investigation_id={investigation.id}")
+            else:
+                # Create new record
+                lab_result = InpatientLabResult(
+                    investigation_id=investigation.id,
+                    template_data=template_data,
+                    entered_by=entered_by_user_id
+                )
+                db.add(lab_result)
+                db.flush()  # Flush to ensure the record is created in the database
+                logger.info(f"Created IPD lab_result with sample_id={sample_id} for investigation_id={investigation.id}")
+        else:
+            # OPD investigation (Investigation model)
+            existing_lab_result = db.query(LabResult).filter(
+                LabResult.investigation_id == investigation.id
+            ).first()
+            
+            if existing_lab_result:
+                # Update existing record
+                if existing_lab_result.template_data:
+                    existing_data = existing_lab_result.template_data if isinstance(existing_lab_result.template_data, dict) else json.loads(existing_lab_result.template_data)
+                    existing_data['sample_no'] = sample_id
+                    existing_lab_result.template_data = existing_data
+                    logger.info(f"Updated OPD lab_result with sample_id={sample_id} for investigation_id={investigation.id}")
+                else:
+                    existing_lab_result.template_data = template_data
+                    logger.info(f"Set OPD lab_result template_data with sample_id={sample_id} for investigation_id={investigation.id}")
+            else:
+                # Create new record
+                lab_result = LabResult(
+                    investigation_id=investigation.id,
+                    template_data=template_data,
+                    entered_by=entered_by_user_id
+                )
+                db.add(lab_result)
+                db.flush()  # Flush to ensure the record is created in the database
+                logger.info(f"Created OPD lab_result with sample_id={sample_id} for investigation_id={investigation.id}")
+    
+    except Exception as e:
+        logger.error(f"Error generating and storing sample ID for investigation {investigation.id}: {str(e)}", exc_info=True)
+        # Don't raise - allow investigation confirmation to continue even if sample ID generation fails
+        # The sample ID can be generated later when results are entered
+
+
+# Frequency mapping for prescriptions
+FREQUENCY_MAPPING = {
+    "Nocte": 1,
+    "Stat": 1,
+    "OD": 1,
+    "daily": 1,
+    "PRN": 1,
+    "BDS": 2,
+    "BID": 2,
+    "QDS": 4,
+    "QID": 4,
+    "TID": 3,
+    "TDS": 3,
+    "5X": 5,
+    "EVERY OTHER DAY": 1,
+    "AT BED TIME": 1,
+    "6 TIMES": 6
+}
+
+
+def auto_generate_bill_for_chief_diagnosis(
+    db: Session,
+    diagnosis: Diagnosis,
+    encounter: Encounter,
+    current_user_id: int
+) -> bool:
+    """
+    DISABLED: Auto-generate bill for a chief diagnosis.
+    This function is disabled for OPD consultations since the initial service request already covers the diagnosis billing.
+    Returns False (no bill created).
+    """
+    # NOTE: Bill generation for diagnoses is disabled for OPD consultations
+    # since the initial service request already covers the diagnosis billing.
+    # This function is kept for backward compatibility but does nothing.
+    return False
+
+
+class PrescriptionDispense(BaseModel):
+    """Prescription dispense model - allows updating prescription details during dispense/confirmation"""
+    dose: Optional[str] = None
+    frequency: Optional[str] = None
+    duration: Optional[str] = None
+    quantity: Optional[int] = None
+    instructions: Optional[str] = None  # Instructions for the drug
+    is_external: Optional[bool] = None  # Mark prescription as external (to be filled outside)
+    add_to_ipd_bill: Optional[bool] = True  # For IPD prescriptions: whether to add to IPD bill
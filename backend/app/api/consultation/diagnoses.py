@@ -0,0 +1,219 @@
+"""
+Consultation: OPD diagnoses
+"""
+import traceback
+import re
+from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role, get_current_user
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.diagnosis import Diagnosis
+from app.models.prescription import Prescription
+from app.api.consultation.common import FREQUENCY_MAPPING
+from app.api.consultation.prescriptions import (
+    PrescriptionCreate, PrescriptionResponse, add_prescriber_info_to_response,
+)
+
+router = APIRouter()
+
+
+# Diagnosis schemas
+class DiagnosisCreate(BaseModel):
+    """Diagnosis creation model"""
+    encounter_id: int
+    icd10: Optional[str] = None
+    diagnosis: str
+    gdrg_code: Optional[str] = None
+    diagnosis_status: Optional[str] = None  # 'new', 'old', or 'recurring'
+    is_provisional: bool = False
+    is_chief: bool = False
+
+
+class DiagnosisResponse(BaseModel):
+    """Diagnosis response model"""
+    id: int
+    encounter_id: int
+    icd10: Optional[str]
+    diagnosis: str
+    gdrg_code: Optional[str]
+    diagnosis_status: Optional[str]
+    is_provisional: bool
+    is_chief: bool
+    
+    class Config:
+        from_attributes = True
+
+
+@router.get("/diagnosis/encounter/{encounter_id}", response_model=List[DiagnosisResponse])
+def get_diagnoses(
+    encounter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all diagnoses for an encounter"""
+    diagnoses = db.query(Diagnosis).filter(Diagnosis.encounter_id == encounter_id).all()
+    return diagnoses
+
+
+@router.put("/diagnosis/{diagnosis_id}", response_model=DiagnosisResponse)
+def update_diagnosis(
+    diagnosis_id: int,
+    diagnosis_data: DiagnosisCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Update a diagnosis"""
+    diagnosis = db.query(Diagnosis).filter(Diagnosis.id == diagnosis_id).first()
+    if not diagnosis:
+        raise HTTPException(status_code=404, detail="Diagnosis not found")
+    
+    # Verify encounter exists
+    encounter = db.query(Encounter).filter(Encounter.id == diagnosis_data.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Check if diagnosis is being marked as chief
+    was_chief = diagnosis.is_chief
+    is_now_chief = diagnosis_data.is_chief
+    
+    # Update diagnosis fields
+    diagnosis.encounter_id = diagnosis_data.encounter_id
+    diagnosis.icd10 = diagnosis_data.icd10 if diagnosis_data.icd10 else ''
+    diagnosis.diagnosis = diagnosis_data.diagnosis
+    diagnosis.gdrg_code = diagnosis_data.gdrg_code
+    diagnosis.is_provisional = diagnosis_data.is_provisional
+    diagnosis.is_chief = diagnosis_data.is_chief
+    
+    # NOTE: Bill generation for diagnoses is disabled for OPD consultations
+    # since the initial service request already covers the diagnosis billing.
+    # If diagnosis is marked as chief (and wasn't before), auto-generate bill
+    # if is_now_chief and not was_chief and diagnosis.gdrg_code:
+    #     auto_generate_bill_for_chief_diagnosis(db, diagnosis, encounter, current_user.id)
+    
+    db.commit()
+    
+    db.refresh(diagnosis)
+    return diagnosis
+
+
+@router.delete("/diagnosis/{diagnosis_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_diagnosis(
+    diagnosis_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Delete a diagnosis"""
+    diagnosis = db.query(Diagnosis).filter(Diagnosis.id == diagnosis_id).first()
+    if not diagnosis:
+        raise HTTPException(status_code=404, detail="Diagnosis not found")
+    
+    db.delete(diagnosis)
+    db.commit()
+    return None
+
+
+@router.post("/prescription", response_model=PrescriptionResponse, status_code=status.HTTP_201_CREATED)
+def create_prescription(
+    prescription_data: PrescriptionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "Pharmacy", "Pharmacy Head", "PA"]))
+):
+    """Add a prescription to an encounter"""
+    try:
+        encounter = db.query(Encounter).filter(Encounter.id == prescription_data.encounter_id).first()
+        if not encounter:
+            raise HTTPException(status_code=404, detail="Encounter not found")
+        
+        # Get frequency value from mapping if frequency is provided
+        frequency_value = None
+        if prescription_data.frequency:
+            frequency_value = FREQUENCY_MAPPING.get(prescription_data.frequency.strip(), None)
+        
+        # Auto-calculate quantity based on pharmacist logic
+        # For MG: 100mg = 1 unit, so dose (in mg) / 100 = units per dose
+        # Then: (dose_mg / 100) × frequency_value × duration
+        # Example: 500mg, BDS (2), 2 days = (500/100) × 2 × 2 = 5 × 2 × 2 = 20
+        # Only auto-calculate if quantity is not provided or is 0
+        # This allows frontend to override the calculation if needed
+        quantity = prescription_data.quantity
+        if (not quantity or quantity <= 0) and prescription_data.dose and frequency_value and prescription_data.duration:
+            try:
+                dose_num = float(prescription_data.dose)
+                if dose_num > 0:
+                    # Extract duration number (e.g., "7 DAYS" -> 7, "2" -> 2)
+                    duration_str = prescription_data.duration.strip() if prescription_data.duration else ""
+                    duration_num = 1
+                    if duration_str:
+                        # First try to parse as a number directly
+                        try:
+                            direct_num = float(duration_str)
+                            if direct_num > 0:
+                                duration_num = int(direct_num)
+                        except ValueError:
+                            # Otherwise, extract number from string (e.g., "7 DAYS" -> 7)
+                            duration_match = re.search(r'\d+', duration_str)
+                            if duration_match:
+                                duration_num = int(duration_match.group())
+                    
+                    # Convert dose to units based on unit type
+                    units_per_dose = dose_num
+                    unit = prescription_data.unit.strip().upper() if prescription_data.unit else ""
+                    if unit == "MG":
+                        # For MG: 100mg = 1 unit
+                        units_per_dose = dose_num / 100.0
+                    elif unit == "MCG":
+                        # For MCG: 1000mcg = 1 unit
+                        units_per_dose = dose_num / 1000.0
+                    # For other units (TAB, CAP, ML, etc.), use dose as-is (1 tablet = 1 unit)
+                    
+                    # Calculate: units per dose × frequency per day × number of days
+                    calculated_quantity = int(units_per_dose * frequency_value * duration_num)
+                    if calculated_quantity > 0:
+                        quantity = calculated_quantity
+            except (ValueError, TypeError) as e:
+                print(f"Error calculating quantity: {e}")
+                pass  # If calculation fails, use provided quantity or default below
+        
+        # Ensure quantity is set
+        if not quantity or quantity <= 0:
+            quantity = 1
+        
+        prescription_dict = prescription_data.dict()
+        prescription_dict['frequency_value'] = frequency_value
+        prescription_dict['quantity'] = quantity
+        # Convert is_external boolean to integer (0 or 1) for SQLite
+        if 'is_external' in prescription_dict:
+            prescription_dict['is_external'] = 1 if prescription_dict['is_external'] else 0
+        else:
+            prescription_dict['is_external'] = 0
+        
+        prescription = Prescription(**prescription_dict, prescribed_by=current_user.id)
+        db.add(prescription)
+        
+        # Auto-confirm external prescriptions (they don't need pharmacy confirmation)
+        # Check is_external as integer (0 or 1) since SQLite stores it as INTEGER
+        is_external = prescription_dict.get('is_external', 0)
+        if is_external:
+            prescription.confirmed_by = current_user.id
+            prescription.confirmed_at = utcnow()
+            print(f"Auto-confirmed external prescription {prescription.id} - no bill will be created")
+        
+        db.commit()
+        db.refresh(prescription)
+        return add_prescriber_info_to_response(prescription, db)
+    except HTTPException:
+        # Re-raise HTTP exceptions as-is
+        raise
+    except Exception as e:
+        # Log the error and re-raise as HTTPException with 500 status
+        print(f"Error creating prescription: {type(e).__name__}: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating prescription: {str(e)}"
+        )
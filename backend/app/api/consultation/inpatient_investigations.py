@@ -0,0 +1,770 @@
+"""
+Consultation: inpatient investigations - requests, worklists and confirmation
+"""
+import logging
+import random
+from typing import Optional, List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Body
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import or_, text, inspect, func
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.inpatient_lab_result import InpatientLabResult
+from app.models.inpatient_scan_result import InpatientScanResult
+from app.models.inpatient_xray_result import InpatientXrayResult
+from app.models.ward_admission import WardAdmission
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.inpatient_investigation import InpatientInvestigation, InpatientInvestigationStatus
+from app.models.patient import Patient
+from app.models.bill import Bill, BillItem
+from app.services.price_list_service_v2 import get_price_from_all_tables
+from app.api.consultation.common import _generate_and_store_sample_id
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# Inpatient Investigation endpoints
+class InpatientInvestigationCreate(BaseModel):
+    clinical_review_id: int
+    service_type: Optional[str] = None
+    gdrg_code: str
+    procedure_name: Optional[str] = None
+    investigation_type: str  # lab, scan, xray
+    notes: Optional[str] = None
+    price: Optional[str] = None
+
+
+@router.post("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/investigations")
+def create_inpatient_investigation(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    investigation_data: InpatientInvestigationCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Add an investigation to a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    investigation = InpatientInvestigation(
+        clinical_review_id=clinical_review_id,
+        service_type=investigation_data.service_type,
+        gdrg_code=investigation_data.gdrg_code,
+        procedure_name=investigation_data.procedure_name,
+        investigation_type=investigation_data.investigation_type,
+        notes=investigation_data.notes,
+        price=investigation_data.price,
+        requested_by=current_user.id
+    )
+    
+    db.add(investigation)
+    db.commit()
+    db.refresh(investigation)
+    
+    return {
+        "id": investigation.id,
+        "clinical_review_id": investigation.clinical_review_id,
+        "service_type": investigation.service_type,
+        "gdrg_code": investigation.gdrg_code,
+        "procedure_name": investigation.procedure_name,
+        "investigation_type": investigation.investigation_type,
+        "notes": investigation.notes,
+        "price": investigation.price,
+        "status": investigation.status,
+        "requested_by": investigation.requested_by,
+        "created_at": investigation.created_at,
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/investigations")
+def get_inpatient_investigations(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all investigations for a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    investigations = db.query(InpatientInvestigation).filter(
+        InpatientInvestigation.clinical_review_id == clinical_review_id
+    ).all()
+    
+    return [
+        {
+            "id": i.id,
+            "clinical_review_id": i.clinical_review_id,
+            "service_type": i.service_type,
+            "gdrg_code": i.gdrg_code,
+            "procedure_name": i.procedure_name,
+            "investigation_type": i.investigation_type,
+            "notes": i.notes,
+            "price": i.price,
+            "status": i.status,
+            "requested_by": i.requested_by,
+            "created_at": i.created_at,
+        }
+        for i in investigations
+    ]
+
+
+@router.get("/ward-admissions/{ward_admission_id}/investigations/all")
+def get_all_inpatient_investigations_for_ward_admission(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all investigations for a ward admission (across all clinical reviews)"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    # Get all clinical reviews for this ward admission
+    clinical_reviews = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).all()
+    
+    if not clinical_reviews:
+        return []
+    
+    clinical_review_ids = [cr.id for cr in clinical_reviews]
+    
+    # Get all investigations from all clinical reviews
+    investigations = db.query(InpatientInvestigation).filter(
+        InpatientInvestigation.clinical_review_id.in_(clinical_review_ids)
+    ).order_by(InpatientInvestigation.created_at.desc()).all()
+    
+    result = []
+    if not investigations:
+        return []
+    
+    for inv in investigations:
+        requester = db.query(User).filter(User.id == inv.requested_by).first()
+        confirmed_by_user = None
+        completed_by_user = None
+        
+        if inv.confirmed_by:
+            confirmed_by_user = db.query(User).filter(User.id == inv.confirmed_by).first()
+        if inv.completed_by:
+            completed_by_user = db.query(User).filter(User.id == inv.completed_by).first()
+        
+        # Check if result exists
+        has_result = False
+        if inv.investigation_type == "lab":
+            # Check if template_id column exists to avoid query errors
+            has_template_id = False
+            try:
+                inspector = inspect(db.bind)
+                columns_info = inspector.get_columns('inpatient_lab_results')
+                if columns_info and isinstance(columns_info, list):
+                    columns = [col.get('name', '') for col in columns_info if isinstance(col, dict)]
+                    has_template_id = 'template_id' in columns
+            except Exception as e:
+                # If inspection fails, assume column doesn't exist
+                logger.warning("Failed to inspect columns for has_result check: %s", e)
+                has_template_id = False
+            
+            if has_template_id:
+                lab_result = db.query(InpatientLabResult).filter(
+                    InpatientLabResult.investigation_id == inv.id
+                ).first()
+                has_result = lab_result is not None
+            else:
+                # Column doesn't exist, use raw SQL
+                lab_result_row = db.execute(
+                    text("SELECT id FROM inpatient_lab_results WHERE investigation_id = :inv_id LIMIT 1"),
+                    {"inv_id": inv.id}
+                ).first()
+                has_result = lab_result_row is not None
+        elif inv.investigation_type == "scan":
+            scan_result = db.query(InpatientScanResult).filter(
+                InpatientScanResult.investigation_id == inv.id
+            ).first()
+            has_result = scan_result is not None
+        elif inv.investigation_type == "xray":
+            xray_result = db.query(InpatientXrayResult).filter(
+                InpatientXrayResult.investigation_id == inv.id
+            ).first()
+            has_result = xray_result is not None
+        
+        result.append({
+            "id": inv.id,
+            "clinical_review_id": inv.clinical_review_id,
+            "service_type": inv.service_type,
+            "gdrg_code": inv.gdrg_code,
+            "procedure_name": inv.procedure_name,
+            "investigation_type": inv.investigation_type,
+            "notes": inv.notes,
+            "price": inv.price,
+            "status": inv.status,
+            "requested_by": inv.requested_by,
+            "requested_by_name": requester.full_name if requester else None,
+            "confirmed_by": inv.confirmed_by,
+            "confirmed_by_name": confirmed_by_user.full_name if confirmed_by_user else None,
+            "completed_by": inv.completed_by,
+            "completed_by_name": completed_by_user.full_name if completed_by_user else None,
+            "has_result": has_result,
+            "created_at": inv.created_at,
+            "service_date": inv.service_date,
+        })
+    
+    return result
+
+
+@router.delete("/ward-admissions/{ward_admission_id}/clinical-reviews/{clinical_review_id}/investigations/{investigation_id}")
+def delete_inpatient_investigation(
+    ward_admission_id: int,
+    clinical_review_id: int,
+    investigation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Delete an investigation from a clinical review"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == clinical_review_id,
+        InpatientClinicalReview.ward_admission_id == ward_admission_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    investigation = db.query(InpatientInvestigation).filter(
+        InpatientInvestigation.id == investigation_id,
+        InpatientInvestigation.clinical_review_id == clinical_review_id
+    ).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    db.delete(investigation)
+    db.commit()
+    return None
+
+
+@router.get("/inpatient-investigations/by-type")
+def get_inpatient_investigations_by_type(
+    investigation_type: str,  # lab, scan, xray
+    status: Optional[str] = None,  # requested, confirmed, completed, cancelled
+    search: Optional[str] = None,  # Search by card number or patient name
+    date: Optional[str] = None,  # Filter by date (YYYY-MM-DD), defaults to today
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Scan", "Xray", "Admin", "Lab Head", "Scan Head", "Xray Head"]))
+):
+    """
+    Get IPD investigations by type with filters
+    Used by Lab, Scan, and X-ray pages to show IPD service requests
+    """
+    # Validate investigation type
+    valid_types = ["lab", "scan", "xray"]
+    if investigation_type.lower() not in valid_types:
+        raise HTTPException(status_code=400, detail=f"Invalid investigation_type. Must be one of: {', '.join(valid_types)}")
+    
+    # Build base query with joins and eager loading
+    
+    query = (
+        db.query(InpatientInvestigation)
+        .options(
+            joinedload(InpatientInvestigation.clinical_review)
+            .joinedload(InpatientClinicalReview.ward_admission)
+            .joinedload(WardAdmission.encounter)
+            .joinedload(Encounter.patient),
+            joinedload(InpatientInvestigation.clinical_review)
+            .joinedload(InpatientClinicalReview.ward_admission)
+            .joinedload(WardAdmission.bed)
+        )
+        .join(InpatientClinicalReview, InpatientInvestigation.clinical_review_id == InpatientClinicalReview.id)
+        .join(WardAdmission, InpatientClinicalReview.ward_admission_id == WardAdmission.id)
+        .join(Encounter, WardAdmission.encounter_id == Encounter.id)
+        .join(Patient, Encounter.patient_id == Patient.id)
+    )
+    
+    # Filter by investigation type
+    query = query.filter(InpatientInvestigation.investigation_type == investigation_type.lower())
+    
+    # Filter by status
+    if status:
+        valid_statuses = ["requested", "confirmed", "completed", "cancelled"]
+        if status.lower() not in valid_statuses:
+            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
+        query = query.filter(InpatientInvestigation.status == status.lower())
+    
+    # Filter by date (optional - if not provided, show all)
+    if date:
+        try:
+            filter_date = datetime.strptime(date, "%Y-%m-%d").date()
+            # Filter by date (using investigation created_at date)
+            # Use date-only comparison to avoid timezone/time precision issues
+            # For SQLite, use func.date() to extract date from datetime
+            # Compare only the date part, ignoring time
+            query = query.filter(func.date(InpatientInvestigation.created_at) == filter_date)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}")
+    # If no date provided, don't filter by date (show all investigations)
+    
+    # Search by card number or patient name
+    if search:
+        search_term = f"%{search.strip()}%"
+        query = query.filter(
+            or_(
+                Patient.card_number.ilike(search_term),
+                Patient.name.ilike(search_term),
+                Patient.surname.ilike(search_term)
+            )
+        )
+    
+    # Order by created_at descending (newest first)
+    query = query.order_by(InpatientInvestigation.created_at.desc())
+    
+    investigations = query.all()
+    logger.debug(
+        "get_inpatient_investigations_by_type: %d %s investigations (status=%s, date=%s, search=%s)",
+        len(investigations), investigation_type, status, date, search
+    )
+    
+    # Build response with patient info and user names
+    result = []
+    for inv in investigations:
+        try:
+            # Get user names
+            requested_by_name = None
+            if inv.requested_by:
+                requested_user = db.query(User).filter(User.id == inv.requested_by).first()
+                requested_by_name = requested_user.full_name if requested_user else None
+            
+            confirmed_by_name = None
+            if inv.confirmed_by:
+                confirmed_user = db.query(User).filter(User.id == inv.confirmed_by).first()
+                confirmed_by_name = confirmed_user.full_name if confirmed_user else None
+            
+            completed_by_name = None
+            if inv.completed_by:
+                completed_user = db.query(User).filter(User.id == inv.completed_by).first()
+                completed_by_name = completed_user.full_name if completed_user else None
+            
+            # Access relationships - they should be loaded by the joins
+            clinical_review = inv.clinical_review
+            ward_admission = clinical_review.ward_admission if clinical_review else None
+            encounter = ward_admission.encounter if ward_admission else None
+            patient = encounter.patient if encounter else None
+            
+            # Build patient name safely
+            patient_name = "Unknown"
+            patient_card_number = None
+            ward = None
+            bed_number = None
+            encounter_id = None
+            ward_admission_id = None
+            
+            if patient:
+                patient_name = f"{patient.name or ''} {patient.surname or ''} {patient.other_names or ''}".strip() or "Unknown"
+                patient_card_number = patient.card_number
+            
+            if ward_admission:
+                ward = ward_admission.ward
+                # Get bed number from bed relationship if bed exists
+                bed_number = ward_admission.bed.bed_number if ward_admission.bed else None
+                encounter_id = ward_admission.encounter_id
+                ward_admission_id = ward_admission.id
+            
+            inv_dict = {
+                "id": inv.id,
+                "clinical_review_id": inv.clinical_review_id,
+                "ward_admission_id": ward_admission_id,
+                "encounter_id": encounter_id,
+                "gdrg_code": inv.gdrg_code,
+                "procedure_name": inv.procedure_name,
+                "investigation_type": inv.investigation_type,
+                "notes": inv.notes,
+                "price": inv.price,
+                "status": inv.status,
+                "confirmed_by": inv.confirmed_by,
+                "completed_by": inv.completed_by,
+                "cancelled_by": inv.cancelled_by,
+                "cancellation_reason": inv.cancellation_reason,
+                "cancelled_at": inv.cancelled_at,
+                "created_at": inv.created_at,
+                "patient_name": patient_name,
+                "patient_card_number": patient_card_number,
+                "encounter_date": inv.created_at,  # Use investigation created_at (request date) instead of encounter date
+                "requested_by_name": requested_by_name,
+                "confirmed_by_name": confirmed_by_name,
+                "completed_by_name": completed_by_name,
+                "ward": ward,
+                "bed_number": bed_number,
+                "source": "inpatient",  # Mark as IPD
+                "prescription_type": "inpatient"  # For compatibility
+            }
+            result.append(inv_dict)
+        except Exception:
+            # Log error but continue processing other investigations
+            inv_id = inv.id if inv and hasattr(inv, 'id') else 'unknown'
+            logger.exception("Error processing IPD investigation %s", inv_id)
+            # Skip this investigation
+            continue
+    
+    return result
+
+
+@router.get("/inpatient-investigation/{investigation_id}")
+def get_inpatient_investigation(
+    investigation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Scan", "Xray", "Admin", "Lab Head", "Scan Head", "Xray Head", "Doctor", "PA", "Nurse"]))
+):
+    """Get a single IPD investigation by ID"""
+    investigation = (
+        db.query(InpatientInvestigation)
+        .options(
+            joinedload(InpatientInvestigation.clinical_review)
+            .joinedload(InpatientClinicalReview.ward_admission)
+            .joinedload(WardAdmission.encounter)
+            .joinedload(Encounter.patient),
+            joinedload(InpatientInvestigation.clinical_review)
+            .joinedload(InpatientClinicalReview.ward_admission)
+            .joinedload(WardAdmission.bed)
+        )
+        .filter(InpatientInvestigation.id == investigation_id)
+        .first()
+    )
+    
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Get user names
+    requested_by_name = None
+    if investigation.requested_by:
+        requested_user = db.query(User).filter(User.id == investigation.requested_by).first()
+        requested_by_name = requested_user.full_name if requested_user else None
+    
+    confirmed_by_name = None
+    if investigation.confirmed_by:
+        confirmed_user = db.query(User).filter(User.id == investigation.confirmed_by).first()
+        confirmed_by_name = confirmed_user.full_name if confirmed_user else None
+    
+    completed_by_name = None
+    if investigation.completed_by:
+        completed_user = db.query(User).filter(User.id == investigation.completed_by).first()
+        completed_by_name = completed_user.full_name if completed_user else None
+    
+    # Access relationships
+    clinical_review = investigation.clinical_review
+    ward_admission = clinical_review.ward_admission if clinical_review else None
+    encounter = ward_admission.encounter if ward_admission else None
+    patient = encounter.patient if encounter else None
+    
+    # Build patient name safely
+    patient_name = "Unknown"
+    patient_card_number = None
+    ward = None
+    bed_number = None
+    encounter_id = None
+    ward_admission_id = None
+    
+    patient_id = None
+    if patient:
+        patient_name = f"{patient.name or ''} {patient.surname or ''}".strip() or "Unknown"
+        patient_card_number = patient.card_number
+        patient_id = patient.id
+    
+    if ward_admission:
+        ward = ward_admission.ward
+        bed_number = ward_admission.bed.bed_number if ward_admission.bed else None
+        encounter_id = ward_admission.encounter_id
+        ward_admission_id = ward_admission.id
+    
+    return {
+        "id": investigation.id,
+        "clinical_review_id": investigation.clinical_review_id,
+        "ward_admission_id": ward_admission_id,
+        "encounter_id": encounter_id,
+        "patient_id": patient_id,  # Include patient_id for direct patient lookup
+        "gdrg_code": investigation.gdrg_code,
+        "procedure_name": investigation.procedure_name,
+        "investigation_type": investigation.investigation_type,
+        "notes": investigation.notes,
+        "price": investigation.price,
+        "status": investigation.status,
+        "confirmed_by": investigation.confirmed_by,
+        "completed_by": investigation.completed_by,
+        "cancelled_by": investigation.cancelled_by,
+        "cancellation_reason": investigation.cancellation_reason,
+        "cancelled_at": investigation.cancelled_at,
+        "created_at": investigation.created_at,
+        "patient_name": patient_name,
+        "patient_card_number": patient_card_number,
+        "encounter_date": investigation.created_at,
+        "requested_by_name": requested_by_name,
+        "confirmed_by_name": confirmed_by_name,
+        "completed_by_name": completed_by_name,
+        "ward": ward,
+        "bed_number": bed_number,
+        "source": "inpatient",
+        "prescription_type": "inpatient"
+    }
+
+
+class InpatientInvestigationConfirm(BaseModel):
+    add_to_ipd_bill: bool = True
+
+
+@router.put("/inpatient-investigation/{investigation_id}/confirm")
+def confirm_inpatient_investigation(
+    investigation_id: int,
+    confirm_data: InpatientInvestigationConfirm = Body(default=InpatientInvestigationConfirm()),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Scan", "Xray", "Admin", "Lab Head", "Scan Head", "Xray Head"]))
+):
+    """Confirm an IPD investigation and optionally add to IPD bill"""
+    investigation = db.query(InpatientInvestigation).filter(InpatientInvestigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    if investigation.status != InpatientInvestigationStatus.REQUESTED.value:
+        raise HTTPException(status_code=400, detail=f"Investigation is already {investigation.status}")
+    
+    # Get clinical review and ward admission
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == investigation.clinical_review_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    ward_admission = db.query(WardAdmission).filter(
+        WardAdmission.id == clinical_review.ward_admission_id
+    ).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    encounter = db.query(Encounter).filter(Encounter.id == ward_admission.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Update investigation status
+    investigation.status = InpatientInvestigationStatus.CONFIRMED.value
+    investigation.confirmed_by = current_user.id
+    
+    # Generate and store sample ID for lab investigations
+    if investigation.investigation_type == "lab":
+        _generate_and_store_sample_id(db, investigation, current_user.id)
+    
+    # Get price
+    is_insured_encounter = bool(encounter.ccc_number)
+    unit_price = 0.0
+    if investigation.gdrg_code:
+        try:
+            # Determine service type based on investigation type for accurate price lookup
+            service_type = None
+            if investigation.investigation_type == "lab":
+                service_type = "Lab"
+            elif investigation.investigation_type == "scan":
+                service_type = "Scan"
+            elif investigation.investigation_type == "xray":
+                service_type = "X-ray"
+            
+            unit_price = get_price_from_all_tables(db, investigation.gdrg_code, is_insured_encounter, service_type, investigation.procedure_name)
+            logger.debug("confirm_inpatient_investigation: Looked up price for gdrg_code='%s', procedure_name='%s', is_insured=%s, service_type='%s', price=%s", investigation.gdrg_code, investigation.procedure_name, is_insured_encounter, service_type, unit_price)
+            
+            # If lookup returns 0.0, it means price wasn't found
+            if unit_price == 0.0:
+                logger.warning("confirm_inpatient_investigation: Price lookup returned 0.0 for gdrg_code='%s', service_type='%s'. Price not found in pricelist.", investigation.gdrg_code, service_type)
+                # Only use stored price if it exists and lookup returned 0
+                if investigation.price:
+                    try:
+                        stored_price = float(investigation.price)
+                        if stored_price > 0:
+                            logger.warning("confirm_inpatient_investigation: Using stored price '%s' as fallback (price not found in pricelist)", stored_price)
+                            unit_price = stored_price
+                    except (ValueError, TypeError):
+                        pass
+        except Exception as e:
+            logger.warning("confirm_inpatient_investigation: Error getting price: %s", e)
+            # If lookup throws exception, try using stored price as fallback
+            if investigation.price:
+                try:
+                    unit_price = float(investigation.price)
+                    logger.debug("confirm_inpatient_investigation: Using stored price '%s' as fallback after exception", unit_price)
+                except (ValueError, TypeError):
+                    pass
+    
+    total_price = unit_price
+    
+    # Add to IPD bill if requested and price > 0
+    add_to_bill = confirm_data.add_to_ipd_bill if confirm_data.add_to_ipd_bill is not None else True
+    if total_price > 0 and add_to_bill:
+        # Find or create a bill for this encounter
+        existing_bill = db.query(Bill).filter(
+            Bill.encounter_id == encounter.id,
+            Bill.is_paid == False  # Only use unpaid bills
+        ).first()
+        
+        if existing_bill:
+            # Check if this investigation is already in the bill
+            existing_item = db.query(BillItem).filter(
+                BillItem.bill_id == existing_bill.id,
+                BillItem.item_code == investigation.gdrg_code,
+                BillItem.item_name.like(f"%{investigation.procedure_name}%")
+            ).first()
+            
+            if not existing_item:
+                # Add bill item to existing bill
+                bill_item = BillItem(
+                    bill_id=existing_bill.id,
+                    item_code=investigation.gdrg_code or "MISC",
+                    item_name=f"Investigation: {investigation.procedure_name or investigation.gdrg_code}",
+                    category=investigation.investigation_type or "procedure",
+                    quantity=1,
+                    unit_price=unit_price,
+                    total_price=total_price
+                )
+                db.add(bill_item)
+                existing_bill.total_amount += total_price
+        else:
+            # Create new bill
+            bill_number = f"BILL-{random.randint(100000, 999999)}"
+            bill = Bill(
+                encounter_id=encounter.id,
+                bill_number=bill_number,
+                is_insured=is_insured_encounter,
+                total_amount=total_price,
+                created_by=current_user.id
+            )
+            db.add(bill)
+            db.flush()
+            
+            # Create bill item
+            bill_item = BillItem(
+                bill_id=bill.id,
+                item_code=investigation.gdrg_code or "MISC",
+                item_name=f"Investigation: {investigation.procedure_name or investigation.gdrg_code}",
+                category=investigation.investigation_type or "procedure",
+                quantity=1,
+                unit_price=unit_price,
+                total_price=total_price
+            )
+            db.add(bill_item)
+    
+    db.commit()
+    db.refresh(investigation)
+    
+    return {
+        "investigation_id": investigation.id,
+        "status": investigation.status,
+        "message": "IPD investigation confirmed successfully"
+    }
+
+
+@router.put("/inpatient-investigation/{investigation_id}/revert-status")
+def revert_inpatient_investigation_status(
+    investigation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab Head", "Scan Head", "Xray Head", "Admin"]))
+):
+    """Revert IPD investigation status from completed to confirmed (to allow editing results) - Admin and Head roles only"""
+    investigation = db.query(InpatientInvestigation).filter(InpatientInvestigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Only allow reverting from completed to confirmed
+    if investigation.status != InpatientInvestigationStatus.COMPLETED.value:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot revert status. Current status is '{investigation.status}'. Only completed investigations can be reverted."
+        )
+    
+    # Verify investigation type matches (each Head can only revert their own investigation type)
+    if current_user.role == "Lab Head" and investigation.investigation_type != "lab":
+        raise HTTPException(
+            status_code=403,
+            detail="Lab Head can only revert lab investigations"
+        )
+    elif current_user.role == "Scan Head" and investigation.investigation_type != "scan":
+        raise HTTPException(
+            status_code=403,
+            detail="Scan Head can only revert scan investigations"
+        )
+    elif current_user.role == "Xray Head" and investigation.investigation_type != "xray":
+        raise HTTPException(
+            status_code=403,
+            detail="Xray Head can only revert xray investigations"
+        )
+    
+    # Revert status to confirmed
+    investigation.status = InpatientInvestigationStatus.CONFIRMED.value
+    # Clear completed_by when reverting
+    investigation.completed_by = None
+    
+    db.commit()
+    db.refresh(investigation)
+    
+    return {"investigation_id": investigation.id, "status": investigation.status, "message": "Status reverted to confirmed"}
+
+
+class InpatientInvestigationRevertToRequested(BaseModel):
+    """Model for reverting IPD investigation from confirmed to requested"""
+    reason: str  # Reason for reverting (required)
+
+
+@router.put("/inpatient-investigation/{investigation_id}/revert-to-requested")
+def revert_inpatient_investigation_to_requested(
+    investigation_id: int,
+    revert_data: InpatientInvestigationRevertToRequested,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Revert IPD investigation status from confirmed to requested - Admin only"""
+    investigation = db.query(InpatientInvestigation).filter(InpatientInvestigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Only allow reverting from confirmed to requested
+    if investigation.status != InpatientInvestigationStatus.CONFIRMED.value:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot revert status. Current status is '{investigation.status}'. Only confirmed investigations can be reverted to requested."
+        )
+    
+    # Revert status to requested
+    investigation.status = InpatientInvestigationStatus.REQUESTED.value
+    # Clear confirmed_by when reverting
+    investigation.confirmed_by = None
+    # Store revert reason in cancellation_reason field (reusing existing field)
+    investigation.cancellation_reason = f"Reverted to requested by Admin: {revert_data.reason}"
+    investigation.cancelled_by = current_user.id
+    investigation.cancelled_at = utcnow()
+    
+    db.commit()
+    db.refresh(investigation)
+    
+    return {"investigation_id": investigation.id, "status": investigation.status, "message": "Status reverted to requested"}
+
+
+class BulkConfirmInpatientInvestigations(BaseModel):
+    """Model for bulk confirming multiple IPD investigations"""
+    investigation_ids: List[int]
+    add_to_ipd_bill: bool = True  # Whether to add to IPD bill
@@ -0,0 +1,750 @@
+"""
+Consultation: treatment sheet, medication rounds and inpatient prescription dispensing
+"""
+import random
+import re
+from typing import Optional, List
+from datetime import datetime, time
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role
+from app.core.n_plus_one import query_budget
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.prescription import Prescription
+from app.models.ward_admission import WardAdmission
+from app.models.inpatient_prescription import InpatientPrescription
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.treatment_sheet_administration import TreatmentSheetAdministration
+from app.models.bill import Bill, BillItem
+from app.models.patient import Patient
+from app.services.medication_round import get_ward_medication_round as build_medication_round
+from app.services.pharmacy_queue import (
+    get_dispensing_queue, bulk_confirm_prescriptions, prescriptions_with_chain,
+)
+from app.services.price_list_service_v2 import get_price_from_all_tables
+from app.api.consultation.common import FREQUENCY_MAPPING, PrescriptionDispense
+from app.api.consultation.clinical_reviews import InpatientPrescriptionUpdate
+
+router = APIRouter()
+
+
+# Treatment Sheet Administration endpoints
+class TreatmentSheetAdministrationCreate(BaseModel):
+    prescription_id: int
+    administration_date: str  # ISO date string
+    administration_time: str  # HH:MM format
+    signature: Optional[str] = None
+    notes: Optional[str] = None
+
+
+@router.post("/ward-admissions/{ward_admission_id}/treatment-sheet/administrations")
+def create_treatment_administration(
+    ward_admission_id: int,
+    administration_data: TreatmentSheetAdministrationCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Record medication administration on treatment sheet"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    # Verify prescription belongs to this ward admission
+    # Check if it's an inpatient prescription
+    inpatient_prescription = db.query(InpatientPrescription).filter(
+        InpatientPrescription.id == administration_data.prescription_id
+    ).first()
+    
+    # Check if it's an OPD prescription
+    opd_prescription = None
+    if not inpatient_prescription:
+        opd_prescription = db.query(Prescription).filter(
+            Prescription.id == administration_data.prescription_id
+        ).first()
+    
+    if not inpatient_prescription and not opd_prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    # Validate prescription belongs to this ward admission
+    if inpatient_prescription:
+        # Check if prescription belongs to a clinical review for this ward admission
+        clinical_review = db.query(InpatientClinicalReview).filter(
+            InpatientClinicalReview.id == inpatient_prescription.clinical_review_id,
+            InpatientClinicalReview.ward_admission_id == ward_admission_id
+        ).first()
+        
+        if not clinical_review:
+            raise HTTPException(status_code=400, detail="Prescription does not belong to this ward admission")
+    elif opd_prescription:
+        # Check if OPD prescription belongs to the encounter for this ward admission
+        if opd_prescription.encounter_id != ward_admission.encounter_id:
+            raise HTTPException(status_code=400, detail="Prescription does not belong to this ward admission's encounter")
+    
+    # Parse date and time
+    try:
+        admin_date = datetime.fromisoformat(administration_data.administration_date).date()
+        time_parts = administration_data.administration_time.split(':')
+        admin_time = time(int(time_parts[0]), int(time_parts[1]))
+    except (ValueError, IndexError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date or time format: {str(e)}")
+    
+    # Determine prescription type
+    prescription_type = "inpatient" if inpatient_prescription else "opd"
+    
+    administration = TreatmentSheetAdministration(
+        ward_admission_id=ward_admission_id,
+        prescription_id=administration_data.prescription_id,
+        prescription_type=prescription_type,
+        administration_date=admin_date,
+        administration_time=admin_time,
+        given_by=current_user.id,
+        signature=administration_data.signature,
+        notes=administration_data.notes
+    )
+    
+    db.add(administration)
+    db.commit()
+    db.refresh(administration)
+    
+    giver = db.query(User).filter(User.id == current_user.id).first()
+    
+    return {
+        "id": administration.id,
+        "ward_admission_id": administration.ward_admission_id,
+        "prescription_id": administration.prescription_id,
+        "administration_date": administration.administration_date.isoformat(),
+        "administration_time": administration.administration_time.strftime("%H:%M"),
+        "given_by": administration.given_by,
+        "given_by_name": giver.full_name if giver else None,
+        "signature": administration.signature,
+        "notes": administration.notes,
+        "created_at": administration.created_at,
+        "message": "Medication administration recorded successfully"
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/treatment-sheet/administrations")
+def get_treatment_administrations(
+    ward_admission_id: int,
+    prescription_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all medication administrations for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    query = db.query(TreatmentSheetAdministration).filter(
+        TreatmentSheetAdministration.ward_admission_id == ward_admission_id
+    )
+    
+    if prescription_id:
+        query = query.filter(TreatmentSheetAdministration.prescription_id == prescription_id)
+    
+    administrations = query.order_by(
+        TreatmentSheetAdministration.administration_date.desc(),
+        TreatmentSheetAdministration.administration_time.desc()
+    ).all()
+    
+    result = []
+    for admin in administrations:
+        giver = db.query(User).filter(User.id == admin.given_by).first()
+        result.append({
+            "id": admin.id,
+            "ward_admission_id": admin.ward_admission_id,
+            "prescription_id": admin.prescription_id,
+            "prescription_type": getattr(admin, 'prescription_type', 'inpatient'),  # Default for backward compatibility
+            "administration_date": admin.administration_date.isoformat(),
+            "administration_time": admin.administration_time.strftime("%H:%M"),
+            "given_by": admin.given_by,
+            "given_by_name": giver.full_name if giver else None,
+            "signature": admin.signature,
+            "notes": admin.notes,
+            "created_at": admin.created_at,
+        })
+    
+    return result
+
+
+@router.delete("/ward-admissions/{ward_admission_id}/treatment-sheet/administrations/{administration_id}")
+def delete_treatment_administration(
+    ward_admission_id: int,
+    administration_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Delete a medication administration record (only by creator or Admin)"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    administration = db.query(TreatmentSheetAdministration).filter(
+        TreatmentSheetAdministration.id == administration_id,
+        TreatmentSheetAdministration.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not administration:
+        raise HTTPException(status_code=404, detail="Administration record not found")
+    
+    # Check permissions: user can delete their own record, admin can delete any
+    if current_user.role != "Admin" and administration.given_by != current_user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="You can only delete your own administration records. Admin can delete any record."
+        )
+    
+    db.delete(administration)
+    db.commit()
+
+    return {"message": "Administration record deleted successfully"}
+
+
+@router.get("/ward-admissions/medication-round/{ward}")
+def get_ward_medication_round(
+    ward: str,
+    date: Optional[str] = None,  # YYYY-MM-DD, defaults to today
+    shift: Optional[str] = Query(None, pattern="^(morning|afternoon|night)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """
+    Medication round for a ward: every active admission's scheduled doses for the day
+    with their status (given / due / overdue / upcoming), from the prescription
+    frequencies and the treatment sheet administrations
+    """
+    round_date = None
+    if date:
+        try:
+            round_date = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    try:
+        return build_medication_round(db, ward, round_date, shift)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/inpatient-prescriptions/dispensing-queue")
+@query_budget(3)  # user, prescriptions with their chain, staff names
+def get_inpatient_dispensing_queue(
+    status: Optional[str] = Query("pending", description="pending, confirmed, dispensed or external; empty for all"),
+    ward: Optional[str] = None,
+    search: Optional[str] = Query(None, description="Card number, patient name or medicine name"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Hospital-wide inpatient prescription queue for pharmacy, oldest first, cursor paginated"""
+    try:
+        return get_dispensing_queue(db, status or None, ward, search, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class BulkConfirmInpatientPrescriptions(BaseModel):
+    """Model for bulk confirming multiple inpatient prescriptions"""
+    prescription_ids: List[int]
+    add_to_ipd_bill: bool = True  # Whether to add to IPD bill
+
+
+@router.put("/inpatient-prescriptions/bulk-confirm")
+def bulk_confirm_inpatient_prescriptions(
+    bulk_data: BulkConfirmInpatientPrescriptions,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Confirm multiple inpatient prescriptions and add them to the IPD bills (priced in one pass)"""
+    if not bulk_data.prescription_ids:
+        raise HTTPException(status_code=400, detail="No prescription IDs provided")
+    
+    result = bulk_confirm_prescriptions(db, bulk_data.prescription_ids, current_user.id, bulk_data.add_to_ipd_bill)
+    db.commit()
+    
+    return {
+        "confirmed_count": len(result["confirmed_ids"]),
+        "total_requested": len(bulk_data.prescription_ids),
+        "confirmed_ids": result["confirmed_ids"],
+        "billed_amount": result["billed_amount"],
+        "errors": result["errors"],
+        "message": f"Confirmed {len(result['confirmed_ids'])} inpatient prescription(s)"
+    }
+
+
+@router.put("/inpatient-prescription/{prescription_id}/confirm")
+def confirm_inpatient_prescription(
+    prescription_id: int,
+    dispense_data: Optional[PrescriptionDispense] = Body(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Confirm an inpatient prescription and add to IPD bill (no payment required)"""
+    # Prescription with its clinical review, ward admission, encounter and patient in one query
+    prescription = prescriptions_with_chain(db).filter(InpatientPrescription.id == prescription_id).first()
+    if not prescription:
+        if db.query(InpatientPrescription.id).filter(InpatientPrescription.id == prescription_id).first():
+            raise HTTPException(status_code=404, detail="Ward admission not found for this prescription")
+        raise HTTPException(status_code=404, detail="Inpatient prescription not found")
+    
+    # Prevent confirming already external prescriptions (they're auto-confirmed and not billed)
+    # Check is_external as integer (0 or 1) since SQLite stores it as INTEGER
+    current_is_external = bool(prescription.is_external) if hasattr(prescription, 'is_external') else False
+    if current_is_external:
+        raise HTTPException(
+            status_code=400, 
+            detail="External prescriptions are automatically confirmed and cannot be confirmed again. They are filled outside and not billed."
+        )
+    
+    if prescription.confirmed_by is not None:
+        raise HTTPException(status_code=400, detail="Prescription has already been confirmed")
+    
+    encounter = prescription.clinical_review.ward_admission.encounter
+    
+    # Update prescription details if provided
+    # Also allow marking as external if drug is not in stock
+    mark_as_external = False
+    if dispense_data:
+        if dispense_data.dose is not None:
+            prescription.dose = dispense_data.dose
+        if dispense_data.frequency is not None:
+            prescription.frequency = dispense_data.frequency
+        if dispense_data.duration is not None:
+            prescription.duration = dispense_data.duration
+        if dispense_data.quantity is not None:
+            if dispense_data.quantity <= 0:
+                raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
+            prescription.quantity = dispense_data.quantity
+        if dispense_data.instructions is not None:
+            prescription.instructions = dispense_data.instructions
+        if dispense_data.is_external is not None:
+            mark_as_external = dispense_data.is_external
+            # Convert boolean to integer (0 or 1) for SQLite
+            prescription.is_external = 1 if mark_as_external else 0
+    
+    # Mark as confirmed
+    prescription.confirmed_by = current_user.id
+    prescription.confirmed_at = utcnow()
+    
+    # Determine if insured based on encounter CCC number
+    is_insured_encounter = encounter.ccc_number is not None and encounter.ccc_number.strip() != ""
+    
+    # Get price for the medicine
+    unit_price = get_price_from_all_tables(db, prescription.medicine_code, is_insured_encounter)
+    
+    # Ensure quantity is set
+    if not prescription.quantity or prescription.quantity <= 0:
+        prescription.quantity = 1
+    
+    total_price = unit_price * prescription.quantity
+    
+    # Check if we should add to IPD bill (default is True, but skip if external)
+    add_to_bill = True
+    if mark_as_external:
+        # External prescriptions are not billed
+        add_to_bill = False
+    elif dispense_data and hasattr(dispense_data, 'add_to_ipd_bill'):
+        add_to_bill = dispense_data.add_to_ipd_bill if dispense_data.add_to_ipd_bill is not None else True
+    
+    # Add to IPD bill (no payment required - accumulates until discharge)
+    # Skip billing for external prescriptions
+    if total_price > 0 and add_to_bill and not mark_as_external:
+        # Find or create a bill for this encounter
+        existing_bill = db.query(Bill).filter(
+            Bill.encounter_id == encounter.id,
+            Bill.is_paid == False  # Only use unpaid bills
+        ).first()
+        
+        if existing_bill:
+            # Check if this prescription is already in the bill
+            existing_item = db.query(BillItem).filter(
+                BillItem.bill_id == existing_bill.id,
+                BillItem.item_code == prescription.medicine_code,
+                BillItem.item_name.like(f"%{prescription.medicine_name}%")
+            ).first()
+            
+            if not existing_item:
+                # Add bill item to existing bill
+                bill_item = BillItem(
+                    bill_id=existing_bill.id,
+                    item_code=prescription.medicine_code,
+                    item_name=f"Prescription: {prescription.medicine_name}",
+                    category="product",
+                    quantity=prescription.quantity,
+                    unit_price=unit_price,
+                    total_price=total_price
+                )
+                db.add(bill_item)
+                existing_bill.total_amount += total_price
+        else:
+            # Create new bill
+            bill_number = f"BILL-{random.randint(100000, 999999)}"
+            bill = Bill(
+                encounter_id=encounter.id,
+                bill_number=bill_number,
+                is_insured=is_insured_encounter,
+                total_amount=total_price,
+                created_by=current_user.id
+            )
+            db.add(bill)
+            db.flush()
+            
+            # Create bill item
+            bill_item = BillItem(
+                bill_id=bill.id,
+                item_code=prescription.medicine_code,
+                item_name=f"Prescription: {prescription.medicine_name}",
+                category="product",
+                quantity=prescription.quantity,
+                unit_price=unit_price,
+                total_price=total_price
+            )
+            db.add(bill_item)
+    
+    db.commit()
+    db.refresh(prescription)
+    
+    return {
+        "id": prescription.id,
+        "medicine_code": prescription.medicine_code,
+        "medicine_name": prescription.medicine_name,
+        "confirmed_by": prescription.confirmed_by,
+        "confirmed_at": prescription.confirmed_at,
+        "message": "Inpatient prescription confirmed and added to IPD bill"
+    }
+
+
+@router.put("/inpatient-prescription/{prescription_id}/dispense")
+def dispense_inpatient_prescription(
+    prescription_id: int,
+    dispense_data: Optional[PrescriptionDispense] = Body(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Mark an inpatient prescription as dispensed (no payment check - medications accumulate in IPD bills)"""
+    prescription = db.query(InpatientPrescription).filter(InpatientPrescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Inpatient prescription not found")
+    
+    if prescription.dispensed_by is not None:
+        raise HTTPException(status_code=400, detail="Prescription has already been dispensed")
+    
+    if prescription.confirmed_by is None:
+        raise HTTPException(status_code=400, detail="Prescription must be confirmed before dispense")
+    
+    # Update prescription fields if provided
+    if dispense_data:
+        if dispense_data.dose is not None:
+            prescription.dose = dispense_data.dose
+        if dispense_data.frequency is not None:
+            prescription.frequency = dispense_data.frequency
+        if dispense_data.duration is not None:
+            prescription.duration = dispense_data.duration
+        if dispense_data.quantity is not None:
+            if dispense_data.quantity <= 0:
+                raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
+            prescription.quantity = dispense_data.quantity
+    
+    prescription.dispensed_by = current_user.id
+    prescription.service_date = utcnow()
+    
+    db.commit()
+    db.refresh(prescription)
+    
+    return {
+        "id": prescription.id,
+        "medicine_code": prescription.medicine_code,
+        "medicine_name": prescription.medicine_name,
+        "dispensed_by": prescription.dispensed_by,
+        "service_date": prescription.service_date,
+        "message": "Inpatient prescription dispensed successfully"
+    }
+
+
+@router.put("/inpatient-prescription/{prescription_id}/return")
+def return_inpatient_prescription(
+    prescription_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Return a dispensed inpatient prescription (undo dispense)"""
+    prescription = db.query(InpatientPrescription).filter(InpatientPrescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Inpatient prescription not found")
+    
+    if prescription.dispensed_by is None:
+        raise HTTPException(status_code=400, detail="Prescription has not been dispensed")
+    
+    prescription.dispensed_by = None
+    # Don't set service_date to None - it has a NOT NULL constraint
+    # Keep the existing service_date value or update it to current time
+    prescription.service_date = utcnow()
+    
+    db.commit()
+    db.refresh(prescription)
+    
+    return {
+        "id": prescription.id,
+        "medicine_code": prescription.medicine_code,
+        "medicine_name": prescription.medicine_name,
+        "dispensed_by": None,
+        "service_date": prescription.service_date.isoformat() if prescription.service_date else None,
+        "message": "Inpatient prescription returned successfully"
+    }
+
+
+@router.put("/inpatient-prescription/{prescription_id}", response_model=dict)
+def update_inpatient_prescription(
+    prescription_id: int,
+    prescription_data: InpatientPrescriptionUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Pharmacy", "Pharmacy Head"]))
+):
+    """Update an inpatient prescription"""
+    prescription = db.query(InpatientPrescription).filter(InpatientPrescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Inpatient prescription not found")
+    
+    # Prevent editing if prescription is confirmed by pharmacy staff
+    # Only Admin can override this restriction
+    if prescription.confirmed_by is not None and current_user.role != "Admin":
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot edit prescription that has been confirmed by pharmacy staff. Contact admin if changes are needed."
+        )
+    
+    # Get frequency value from mapping if frequency is provided
+    frequency_value = None
+    if prescription_data.frequency:
+        frequency_value = FREQUENCY_MAPPING.get(prescription_data.frequency.strip(), None)
+    
+    # Auto-calculate quantity based on pharmacist logic
+    quantity = prescription_data.quantity
+    if (not quantity or quantity <= 0) and prescription_data.dose and prescription_data.frequency and prescription_data.duration:
+        try:
+            # Extract numeric value from dose
+            dose_str = str(prescription_data.dose).strip()
+            try:
+                dose_num = float(dose_str) if dose_str else 0
+            except (ValueError, TypeError):
+                dose_num = 0
+            
+            # If parsing fails, try to extract first number
+            if dose_num <= 0:
+                first_number_match = re.search(r'\d+(\.\d+)?', dose_str)
+                if first_number_match:
+                    dose_num = float(first_number_match.group())
+            
+            frequency_value_for_calc = frequency_value or FREQUENCY_MAPPING.get(prescription_data.frequency.strip(), 1)
+            
+            if dose_num and dose_num > 0 and frequency_value_for_calc:
+                # Extract duration number
+                duration_str = str(prescription_data.duration).strip()
+                duration_num = 1
+                try:
+                    direct_num = float(duration_str)
+                    if direct_num > 0:
+                        duration_num = int(direct_num)
+                except (ValueError, TypeError):
+                    duration_match = re.search(r'\d+', duration_str)
+                    if duration_match:
+                        duration_num = int(duration_match.group())
+                
+                # Convert dose to units based on unit type
+                units_per_dose = dose_num
+                if prescription_data.unit and prescription_data.unit.upper() == 'MG':
+                    units_per_dose = dose_num / 100
+                elif prescription_data.unit and prescription_data.unit.upper() == 'MCG':
+                    units_per_dose = dose_num / 1000
+                
+                # Calculate: units per dose × frequency per day × number of days
+                calculated_quantity = int(units_per_dose * frequency_value_for_calc * duration_num)
+                if calculated_quantity > 0:
+                    quantity = calculated_quantity
+        except Exception:
+            pass
+    
+    # Ensure quantity is set
+    if not quantity or quantity <= 0:
+        quantity = 1
+    
+    # Update prescription fields
+    prescription.medicine_code = prescription_data.medicine_code
+    prescription.medicine_name = prescription_data.medicine_name
+    prescription.dose = prescription_data.dose
+    prescription.unit = prescription_data.unit
+    prescription.frequency = prescription_data.frequency
+    prescription.frequency_value = frequency_value
+    prescription.duration = prescription_data.duration
+    prescription.instructions = prescription_data.instructions
+    prescription.quantity = quantity
+    prescription.unparsed = prescription_data.unparsed
+    # Update is_external if provided
+    if prescription_data.is_external is not None:
+        prescription.is_external = 1 if prescription_data.is_external else 0
+    
+    db.commit()
+    db.refresh(prescription)
+    
+    return {
+        "id": prescription.id,
+        "medicine_code": prescription.medicine_code,
+        "medicine_name": prescription.medicine_name,
+        "dose": prescription.dose,
+        "unit": prescription.unit,
+        "frequency": prescription.frequency,
+        "duration": prescription.duration,
+        "quantity": prescription.quantity,
+        "instructions": prescription.instructions,
+        "is_external": bool(prescription.is_external),
+        "message": "Inpatient prescription updated successfully"
+    }
+
+
+@router.put("/inpatient-prescription/{prescription_id}/unconfirm")
+def unconfirm_inpatient_prescription(
+    prescription_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Revert a confirmed inpatient prescription back to pending status (undo confirmation)"""
+    prescription = db.query(InpatientPrescription).filter(InpatientPrescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Inpatient prescription not found")
+    
+    if prescription.confirmed_by is None:
+        raise HTTPException(status_code=400, detail="Prescription has not been confirmed")
+    
+    # Prevent unconfirming if prescription has been dispensed
+    if prescription.dispensed_by is not None:
+        raise HTTPException(
+            status_code=400, 
+            detail="Cannot revert a prescription that has already been dispensed. Please return it first."
+        )
+    
+    # Get encounter through clinical review and ward admission
+    clinical_review = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.id == prescription.clinical_review_id
+    ).first()
+    if not clinical_review:
+        raise HTTPException(status_code=404, detail="Clinical review not found")
+    
+    ward_admission = db.query(WardAdmission).filter(
+        WardAdmission.id == clinical_review.ward_admission_id
+    ).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    encounter = ward_admission.encounter
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Find and remove the bill item that was created during confirmation
+    unpaid_bills = db.query(Bill).filter(
+        Bill.encounter_id == encounter.id,
+        Bill.is_paid == False
+    ).all()
+    
+    for bill in unpaid_bills:
+        # Find the bill item for this prescription
+        bill_item = db.query(BillItem).filter(
+            BillItem.bill_id == bill.id,
+            BillItem.item_code == prescription.medicine_code,
+            BillItem.item_name.like(f"%{prescription.medicine_name}%")
+        ).first()
+        
+        if bill_item:
+            # Remove the bill item amount from the bill total
+            bill.total_amount -= bill_item.total_price
+            if bill.total_amount < 0:
+                bill.total_amount = 0.0
+            
+            # Delete the bill item
+            db.delete(bill_item)
+            
+            # If bill has no items left and total is 0, delete the bill
+            remaining_items = db.query(BillItem).filter(BillItem.bill_id == bill.id).count()
+            if remaining_items == 0 and bill.total_amount == 0:
+                db.delete(bill)
+    
+    # Clear confirmation fields and external flag
+    prescription.confirmed_by = None
+    prescription.confirmed_at = None
+    if hasattr(prescription, 'is_external'):
+        prescription.is_external = 0  # Clear external flag so it can be confirmed again
+    
+    db.commit()
+    db.refresh(prescription)
+    
+    return {
+        "id": prescription.id,
+        "medicine_code": prescription.medicine_code,
+        "medicine_name": prescription.medicine_name,
+        "confirmed_by": None,
+        "confirmed_at": None,
+        "message": "Inpatient prescription unconfirmed successfully"
+    }
+
+
+@router.get("/ward-admissions/patient/{card_number}")
+def get_ward_admissions_by_patient_card(
+    card_number: str,
+    include_discharged: Optional[bool] = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Billing", "Admin", "Nurse", "Doctor", "PA", "Records"]))
+):
+    """Get ward admissions for a patient by card number. Set include_discharged=True to include discharged admissions."""
+    # Verify patient exists
+    patient = db.query(Patient).filter(Patient.card_number == card_number).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    # Get all ward admissions for this patient
+    patient_encounters = db.query(Encounter).filter(
+        Encounter.patient_id == patient.id
+    ).all()
+    
+    if not patient_encounters:
+        return []
+    
+    encounter_ids = [e.id for e in patient_encounters]
+    
+    query = db.query(WardAdmission).filter(
+        WardAdmission.encounter_id.in_(encounter_ids)
+    )
+    
+    # Filter by discharged status if not including discharged
+    # Note: This includes partially discharged patients (partially_discharged_at set but discharged_at is NULL)
+    if not include_discharged:
+        query = query.filter(WardAdmission.discharged_at.is_(None))
+    
+    ward_admissions = query.order_by(WardAdmission.admitted_at.desc()).all()
+    
+    result = []
+    for wa in ward_admissions:
+        encounter = wa.encounter
+        if not encounter:
+            continue
+        
+        result.append({
+            "id": wa.id,
+            "encounter_id": wa.encounter_id,
+            "ward": wa.ward,
+            "bed_id": wa.bed_id,
+            "bed_number": wa.bed.bed_number if wa.bed else None,
+            "admitted_at": wa.admitted_at,
+            "admission_notes": wa.admission_notes,
+            "discharged_at": wa.discharged_at,
+            "discharged_by": wa.discharged_by,
+            "partially_discharged_at": wa.partially_discharged_at,  # Include partial discharge info
+            "partially_discharged_by": wa.partially_discharged_by,
+            "encounter_created_at": encounter.created_at,
+            "encounter_department": encounter.department,
+        })
+    
+    return result
@@ -0,0 +1,639 @@
+"""
+Consultation: inpatient inventory debits and per-ward stock balances
+"""
+import random
+import traceback
+from typing import Optional, List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.ward_admission import WardAdmission
+from app.models.inpatient_inventory_debit import InpatientInventoryDebit
+from app.models.bill import Bill, BillItem
+from app.models.inpatient_investigation import InpatientInvestigation, InpatientInvestigationStatus
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.services.price_list_service_v2 import get_price_from_all_tables
+from app.services.stock_ledger import (
+    inventory_debit_filters, inventory_debit_rows, get_inventory_debit_queue as build_queue,
+    get_stock_balances, rebuild_stock_ledger, release_inventory_debits,
+)
+from app.api.consultation.inpatient_investigations import BulkConfirmInpatientInvestigations
+
+router = APIRouter()
+
+
+# Inventory Debit endpoints
+class InpatientInventoryDebitCreate(BaseModel):
+    product_code: str
+    product_name: str
+    quantity: float = 1.0
+    unit_price: Optional[float] = None  # If not provided, will be looked up from price list
+    notes: Optional[str] = None
+
+
+class InpatientInventoryDebitResponse(BaseModel):
+    id: int
+    ward_admission_id: int
+    encounter_id: int
+    product_code: str
+    product_name: str
+    quantity: float
+    unit_price: float
+    total_price: float
+    notes: Optional[str] = None
+    is_billed: bool
+    bill_item_id: Optional[int] = None
+    is_released: Optional[bool] = False
+    released_by: Optional[int] = None
+    released_by_name: Optional[str] = None
+    released_at: Optional[datetime] = None
+    used_by: int
+    used_by_name: Optional[str] = None
+    used_at: datetime
+    created_at: datetime
+    updated_at: datetime
+    # Additional fields for pharmacy view
+    patient_name: Optional[str] = None
+    patient_card_number: Optional[str] = None
+    ward: Optional[str] = None  # Current ward (for backward compatibility)
+    requesting_ward: Optional[str] = None  # Original ward that requested the inventory
+    admitted_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/ward-admissions/{ward_admission_id}/inventory-debits", response_model=InpatientInventoryDebitResponse, status_code=status.HTTP_201_CREATED)
+def create_inpatient_inventory_debit(
+    ward_admission_id: int,
+    debit_data: InpatientInventoryDebitCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Add an inventory debit (product used) for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    encounter = db.query(Encounter).filter(Encounter.id == ward_admission.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Determine if insured based on encounter CCC number
+    is_insured_encounter = encounter.ccc_number is not None and encounter.ccc_number.strip() != ""
+    
+    # Get unit price - use provided price or look up from price list
+    if debit_data.unit_price is not None:
+        unit_price = debit_data.unit_price
+    else:
+        # Look up price from price list
+        unit_price = get_price_from_all_tables(db, debit_data.product_code, is_insured_encounter)
+        if unit_price == 0.0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Product '{debit_data.product_name}' not found in price list or has no price. Please provide unit_price."
+            )
+    
+    total_price = unit_price * debit_data.quantity
+    
+    # Create inventory debit record
+    # Store the current ward as requesting_ward to preserve it even if patient is transferred
+    inventory_debit = InpatientInventoryDebit(
+        ward_admission_id=ward_admission_id,
+        encounter_id=ward_admission.encounter_id,
+        requesting_ward=ward_admission.ward,  # Store original ward at time of debit
+        product_code=debit_data.product_code,
+        product_name=debit_data.product_name,
+        quantity=debit_data.quantity,
+        unit_price=unit_price,
+        total_price=total_price,
+        notes=debit_data.notes,
+        used_by=current_user.id,
+        used_at=utcnow()
+    )
+    db.add(inventory_debit)
+    db.flush()
+    
+    # Automatically add to bill
+    # Find or create a bill for this encounter
+    existing_bill = db.query(Bill).filter(
+        Bill.encounter_id == ward_admission.encounter_id,
+        Bill.is_paid == False  # Only use unpaid bills
+    ).first()
+    
+    if existing_bill:
+        # Check if this product is already in the bill
+        existing_item = db.query(BillItem).filter(
+            BillItem.bill_id == existing_bill.id,
+            BillItem.item_code == debit_data.product_code,
+            BillItem.item_name == debit_data.product_name
+        ).first()
+        
+        if not existing_item:
+            # Add bill item to existing bill
+            bill_item = BillItem(
+                bill_id=existing_bill.id,
+                item_code=debit_data.product_code,
+                item_name=f"Inventory: {debit_data.product_name}",
+                category="product",
+                quantity=debit_data.quantity,
+                unit_price=unit_price,
+                total_price=total_price
+            )
+            db.add(bill_item)
+            db.flush()
+            existing_bill.total_amount += total_price
+            inventory_debit.bill_item_id = bill_item.id
+            inventory_debit.is_billed = True
+    else:
+        # Create new bill
+        bill_number = f"BILL-{random.randint(100000, 999999)}"
+        bill = Bill(
+            encounter_id=ward_admission.encounter_id,
+            bill_number=bill_number,
+            is_insured=is_insured_encounter,
+            miscellaneous=None
+        )
+        db.add(bill)
+        db.flush()
+        
+        # Add bill item
+        bill_item = BillItem(
+            bill_id=bill.id,
+            item_code=debit_data.product_code,
+            item_name=f"Inventory: {debit_data.product_name}",
+            category="product",
+            quantity=debit_data.quantity,
+            unit_price=unit_price,
+            total_price=total_price
+        )
+        db.add(bill_item)
+        db.flush()
+        bill.total_amount = total_price
+        inventory_debit.bill_item_id = bill_item.id
+        inventory_debit.is_billed = True
+    
+    db.commit()
+    db.refresh(inventory_debit)
+    
+    # Load user for response
+    user = db.query(User).filter(User.id == inventory_debit.used_by).first()
+    
+    return {
+        "id": inventory_debit.id,
+        "ward_admission_id": inventory_debit.ward_admission_id,
+        "encounter_id": inventory_debit.encounter_id,
+        "product_code": inventory_debit.product_code,
+        "product_name": inventory_debit.product_name,
+        "quantity": inventory_debit.quantity,
+        "unit_price": inventory_debit.unit_price,
+        "total_price": inventory_debit.total_price,
+        "notes": inventory_debit.notes,
+        "is_billed": inventory_debit.is_billed,
+        "bill_item_id": inventory_debit.bill_item_id,
+        "used_by": inventory_debit.used_by,
+        "used_by_name": user.full_name if user else None,
+        "used_at": inventory_debit.used_at,
+        "created_at": inventory_debit.created_at,
+        "updated_at": inventory_debit.updated_at,
+        "requesting_ward": inventory_debit.requesting_ward,
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/inventory-debits", response_model=List[InpatientInventoryDebitResponse])
+def get_inpatient_inventory_debits(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Billing"]))
+):
+    """Get all inventory debits for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    debits = db.query(InpatientInventoryDebit).filter(
+        InpatientInventoryDebit.ward_admission_id == ward_admission_id
+    ).order_by(InpatientInventoryDebit.used_at.desc()).all()
+    
+    result = []
+    for debit in debits:
+        user = db.query(User).filter(User.id == debit.used_by).first()
+        
+        # Get user who released (if released)
+        released_by_user = None
+        if debit.released_by:
+            released_by_user = db.query(User).filter(User.id == debit.released_by).first()
+        
+        result.append({
+            "id": debit.id,
+            "ward_admission_id": debit.ward_admission_id,
+            "encounter_id": debit.encounter_id,
+            "product_code": debit.product_code,
+            "product_name": debit.product_name,
+            "quantity": debit.quantity,
+            "unit_price": debit.unit_price,
+            "total_price": debit.total_price,
+            "notes": debit.notes,
+            "is_billed": debit.is_billed,
+            "bill_item_id": debit.bill_item_id,
+            "is_released": debit.is_released,
+            "released_by": debit.released_by,
+            "released_by_name": released_by_user.full_name if released_by_user else None,
+            "released_at": debit.released_at,
+            "used_by": debit.used_by,
+            "used_by_name": user.full_name if user else None,
+            "used_at": debit.used_at,
+            "created_at": debit.created_at,
+            "updated_at": debit.updated_at,
+            "requesting_ward": getattr(debit, 'requesting_ward', None) or ward_admission.ward if ward_admission else None,
+        })
+    
+    return result
+
+
+@router.delete("/ward-admissions/{ward_admission_id}/inventory-debits/{debit_id}")
+def delete_inpatient_inventory_debit(
+    ward_admission_id: int,
+    debit_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Delete an inventory debit and its corresponding bill item if billed"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    debit = db.query(InpatientInventoryDebit).filter(
+        InpatientInventoryDebit.id == debit_id,
+        InpatientInventoryDebit.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not debit:
+        raise HTTPException(status_code=404, detail="Inventory debit not found")
+    
+    # If billed, delete the corresponding bill item and update bill total
+    if debit.is_billed and debit.bill_item_id:
+        bill_item = db.query(BillItem).filter(BillItem.id == debit.bill_item_id).first()
+        if bill_item:
+            bill = db.query(Bill).filter(Bill.id == bill_item.bill_id).first()
+            if bill:
+                # Subtract the bill item total from bill total
+                bill.total_amount -= bill_item.total_price
+                # Ensure bill total doesn't go negative
+                if bill.total_amount < 0:
+                    bill.total_amount = 0.0
+            
+            # Clear the foreign key reference first to avoid constraint violation
+            debit.bill_item_id = None
+            debit.is_billed = False
+            db.flush()  # Flush to ensure the reference is cleared before deletion
+            
+            # Now safe to delete the bill item
+            db.delete(bill_item)
+    
+    # Delete the inventory debit record
+    db.delete(debit)
+    db.commit()
+    
+    return {"message": "Inventory debit and corresponding bill item deleted successfully"}
+
+
+@router.get("/inventory-debits", response_model=List[InpatientInventoryDebitResponse])
+def get_all_inventory_debits(
+    ward: Optional[str] = None,
+    is_released: Optional[bool] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    used_by_name: Optional[str] = None,
+    product_code: Optional[str] = None,
+    product_name: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin", "Nurse", "Doctor", "PA"]))
+):
+    """Get all inventory debits with optional filtering - for pharmacy staff to view and release"""
+    start_dt = end_dt = None
+    if start_date:
+        try:
+            start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid start_date format. Use YYYY-MM-DD")
+    
+    if end_date:
+        try:
+            # Include the entire end date by setting time to end of day
+            end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid end_date format. Use YYYY-MM-DD")
+    
+    # Filter by requesting_ward (the ward that requested the inventory), not the current ward.
+    # Shows all debits, including those of discharged patients, most recent first.
+    # For the pharmacy release workflow prefer the paginated /inventory-debits/queue.
+    filters = inventory_debit_filters(
+        ward, is_released, start_dt, end_dt, product_code, product_name, used_by_name
+    )
+    return inventory_debit_rows(
+        db, filters, [InpatientInventoryDebit.used_at.desc(), InpatientInventoryDebit.id.desc()]
+    )
+
+
+@router.get("/inventory-debits/queue")
+def get_inventory_debit_queue(
+    ward: Optional[str] = Query(None, description="Requesting ward"),
+    status: Optional[str] = Query("pending", pattern="^(pending|released)?$", description="pending or released; empty for all"),
+    start_date: Optional[str] = None,  # YYYY-MM-DD
+    end_date: Optional[str] = None,  # YYYY-MM-DD
+    search: Optional[str] = Query(None, description="Product code or name"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin", "Nurse", "Doctor", "PA"]))
+):
+    """Inventory release queue for pharmacy, oldest debit first, cursor paginated"""
+    try:
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    try:
+        is_released = {"pending": False, "released": True}.get(status or "")
+        return build_queue(db, ward, is_released, start_dt, end_dt, search, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/inventory-debits/stock-balances")
+def get_inventory_stock_balances(
+    ward: Optional[str] = None,
+    product_code: Optional[str] = None,
+    outstanding_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin", "Nurse", "Doctor", "PA"]))
+):
+    """Per-ward, per-product stock ledger balances (requested, released, outstanding)"""
+    return get_stock_balances(db, ward, product_code, outstanding_only)
+
+
+@router.post("/inventory-debits/stock-balances/rebuild")
+def rebuild_inventory_stock_balances(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Recompute the stock ledger balances from the inventory debits (Admin only)"""
+    result = rebuild_stock_ledger(db)
+    db.commit()
+    return {"message": "Stock ledger rebuilt", **result}
+
+
+class BulkReleaseInventoryDebits(BaseModel):
+    """Model for releasing multiple inventory debits"""
+    debit_ids: List[int]
+
+
+@router.put("/inventory-debits/bulk-release")
+def bulk_release_inventory_debits(
+    bulk_data: BulkReleaseInventoryDebits,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Release multiple inventory debits in one transaction"""
+    if not bulk_data.debit_ids:
+        raise HTTPException(status_code=400, detail="No inventory debit IDs provided")
+    
+    result = release_inventory_debits(db, bulk_data.debit_ids, current_user.id)
+    db.commit()
+    
+    return {
+        "message": f"Released {len(result['released_ids'])} inventory debit(s)",
+        "released_count": len(result["released_ids"]),
+        "released_ids": result["released_ids"],
+        "released_by": current_user.id,
+        "released_by_name": current_user.full_name,
+        "released_at": result["released_at"],
+        "errors": result["errors"],
+    }
+
+
+@router.put("/inventory-debits/{debit_id}/release")
+def release_inventory_debit(
+    debit_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Release inventory debit - pharmacy staff marks inventory as released for ward administration"""
+    debit = db.query(InpatientInventoryDebit).filter(InpatientInventoryDebit.id == debit_id).first()
+    if not debit:
+        raise HTTPException(status_code=404, detail="Inventory debit not found")
+    
+    if debit.is_released:
+        raise HTTPException(status_code=400, detail="Inventory debit has already been released")
+    
+    # Mark as released
+    debit.is_released = True
+    debit.released_by = current_user.id
+    debit.released_at = utcnow()
+    
+    db.commit()
+    db.refresh(debit)
+    
+    # Get user who released
+    released_by_user = db.query(User).filter(User.id == debit.released_by).first()
+    
+    return {
+        "message": "Inventory debit released successfully",
+        "id": debit.id,
+        "is_released": debit.is_released,
+        "released_by": debit.released_by,
+        "released_by_name": released_by_user.full_name if released_by_user else None,
+        "released_at": debit.released_at
+    }
+
+
+@router.put("/inpatient-investigations/bulk-confirm")
+def bulk_confirm_inpatient_investigations(
+    bulk_data: BulkConfirmInpatientInvestigations,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Scan", "Xray", "Admin", "Lab Head", "Scan Head", "Xray Head"]))
+):
+    """Bulk confirm multiple IPD investigation requests"""
+    if not bulk_data.investigation_ids:
+        raise HTTPException(status_code=400, detail="No investigation IDs provided")
+    
+    investigations = db.query(InpatientInvestigation).filter(
+        InpatientInvestigation.id.in_(bulk_data.investigation_ids)
+    ).all()
+    
+    if len(investigations) != len(bulk_data.investigation_ids):
+        raise HTTPException(status_code=404, detail="Some investigations not found")
+    
+    confirmed_count = 0
+    errors = []
+    
+    for investigation in investigations:
+        try:
+            # Don't allow confirming cancelled investigations
+            if investigation.status == InpatientInvestigationStatus.CANCELLED.value:
+                errors.append(f"Investigation {investigation.id} is cancelled")
+                continue
+            
+            # Don't allow confirming already confirmed or completed investigations
+            if investigation.status in [InpatientInvestigationStatus.CONFIRMED.value, InpatientInvestigationStatus.COMPLETED.value]:
+                errors.append(f"Investigation {investigation.id} is already {investigation.status}")
+                continue
+            
+            # Verify user role matches investigation type
+            if current_user.role not in ["Admin", "Lab Head", "Scan Head", "Xray Head"]:
+                if investigation.investigation_type == "lab" and current_user.role != "Lab":
+                    errors.append(f"Only Lab staff can confirm investigation {investigation.id}")
+                    continue
+                elif investigation.investigation_type == "scan" and current_user.role != "Scan":
+                    errors.append(f"Only Scan staff can confirm investigation {investigation.id}")
+                    continue
+                elif investigation.investigation_type == "xray" and current_user.role != "Xray":
+                    errors.append(f"Only Xray staff can confirm investigation {investigation.id}")
+                    continue
+            
+            # Get clinical review and ward admission
+            clinical_review = db.query(InpatientClinicalReview).filter(
+                InpatientClinicalReview.id == investigation.clinical_review_id
+            ).first()
+            if not clinical_review:
+                errors.append(f"Clinical review not found for investigation {investigation.id}")
+                continue
+            
+            ward_admission = db.query(WardAdmission).filter(
+                WardAdmission.id == clinical_review.ward_admission_id
+            ).first()
+            if not ward_admission:
+                errors.append(f"Ward admission not found for investigation {investigation.id}")
+                continue
+            
+            encounter = db.query(Encounter).filter(Encounter.id == ward_admission.encounter_id).first()
+            if not encounter:
+                errors.append(f"Encounter not found for investigation {investigation.id}")
+                continue
+            
+            # Confirm the investigation
+            investigation.status = InpatientInvestigationStatus.CONFIRMED.value
+            investigation.confirmed_by = current_user.id
+            
+            # Get price
+            is_insured_encounter = bool(encounter.ccc_number)
+            unit_price = 0.0
+            if investigation.gdrg_code:
+                try:
+                    # Determine service type based on investigation type for accurate price lookup
+                    service_type = None
+                    if investigation.investigation_type == "lab":
+                        service_type = "Lab"
+                    elif investigation.investigation_type == "scan":
+                        service_type = "Scan"
+                    elif investigation.investigation_type == "xray":
+                        service_type = "X-ray"
+                    
+                    unit_price = get_price_from_all_tables(db, investigation.gdrg_code, is_insured_encounter, service_type, investigation.procedure_name)
+                    print(f"DEBUG bulk_confirm_inpatient: Looked up price for gdrg_code='{investigation.gdrg_code}', procedure_name='{investigation.procedure_name}', is_insured={is_insured_encounter}, service_type='{service_type}', price={unit_price}")
+                    
+                    # If lookup returns 0.0, it means price wasn't found
+                    if unit_price == 0.0:
+                        print(f"WARNING bulk_confirm_inpatient: Price lookup returned 0.0 for investigation {investigation.id}, gdrg_code='{investigation.gdrg_code}', service_type='{service_type}'")
+                        # Only use stored price if it exists and lookup returned 0
+                        if investigation.price:
+                            try:
+                                stored_price = float(investigation.price)
+                                if stored_price > 0:
+                                    print(f"WARNING bulk_confirm_inpatient: Using stored price '{stored_price}' as fallback for investigation {investigation.id}")
+                                    unit_price = stored_price
+                            except (ValueError, TypeError):
+                                pass
+                except Exception as e:
+                    print(f"ERROR bulk_confirm_inpatient: Failed to get price for investigation {investigation.id}: {e}")
+                    # Fallback to stored price only if exception occurred
+                    if investigation.price:
+                        try:
+                            unit_price = float(investigation.price)
+                        except (ValueError, TypeError):
+                            unit_price = 0.0
+            else:
+                # No gdrg_code, try stored price
+                if investigation.price:
+                    try:
+                        unit_price = float(investigation.price)
+                    except (ValueError, TypeError):
+                        unit_price = 0.0
+            
+            total_price = unit_price
+            
+            # Add to IPD bill if requested and price > 0
+            if total_price > 0 and bulk_data.add_to_ipd_bill:
+                # Find or create a bill for this encounter
+                existing_bill = db.query(Bill).filter(
+                    Bill.encounter_id == encounter.id,
+                    Bill.is_paid == False  # Only use unpaid bills
+                ).first()
+                
+                if existing_bill:
+                    # Check if this investigation is already in the bill
+                    existing_item = db.query(BillItem).filter(
+                        BillItem.bill_id == existing_bill.id,
+                        BillItem.item_code == investigation.gdrg_code,
+                        BillItem.item_name.like(f"%{investigation.procedure_name}%")
+                    ).first()
+                    
+                    if not existing_item:
+                        # Add bill item to existing bill
+                        bill_item = BillItem(
+                            bill_id=existing_bill.id,
+                            item_code=investigation.gdrg_code or "MISC",
+                            item_name=f"Investigation: {investigation.procedure_name or investigation.gdrg_code}",
+                            category=investigation.investigation_type or "procedure",
+                            quantity=1,
+                            unit_price=unit_price,
+                            total_price=total_price
+                        )
+                        db.add(bill_item)
+                        existing_bill.total_amount += total_price
+                else:
+                    # Create new bill
+                    bill_number = f"IPD-{encounter.id}-{random.randint(1000, 9999)}"
+                    bill = Bill(
+                        encounter_id=encounter.id,
+                        bill_number=bill_number,
+                        total_amount=total_price,
+                        is_paid=False
+                    )
+                    db.add(bill)
+                    db.flush()  # Get bill.id
+                    
+                    bill_item = BillItem(
+                        bill_id=bill.id,
+                        item_code=investigation.gdrg_code or "MISC",
+                        item_name=f"Investigation: {investigation.procedure_name or investigation.gdrg_code}",
+                        category=investigation.investigation_type or "procedure",
+                        quantity=1,
+                        unit_price=unit_price,
+                        total_price=total_price
+                    )
+                    db.add(bill_item)
+            
+            confirmed_count += 1
+            
+        except Exception as e:
+            print(f"ERROR bulk_confirm_inpatient: Error processing investigation {investigation.id}: {str(e)}")
+            print(traceback.format_exc())
+            errors.append(f"Error processing investigation {investigation.id}: {str(e)}")
+            continue
+    
+    db.commit()
+    
+    return {
+        "confirmed_count": confirmed_count,
+        "total_requested": len(bulk_data.investigation_ids),
+        "errors": errors
+    }
@@ -0,0 +1,1248 @@
+"""
+Consultation: OPD investigations - requests, worklists, confirmation and status changes
+"""
+import logging
+import random
+from typing import Optional, List
+from datetime import datetime, date, date as date_class
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, Request
+from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow, today
+from app.core.dependencies import require_role, get_current_user
+from app.core.n_plus_one import query_budget
+from app.models.user import User
+from app.models.encounter import Encounter, EncounterStatus
+from app.models.diagnosis import Diagnosis
+from app.models.investigation import Investigation, InvestigationStatus
+from app.models.icd10_drg_mapping import ICD10DRGMapping
+from app.models.bill import Bill, BillItem
+from app.models.patient import Patient
+from app.services.investigation_worklist import (
+    stamp_patient_details, WORKLIST_TYPES, WORKLIST_STATUSES, get_worklist_state, get_worklist_page,
+    get_unified_worklist,
+)
+from app.services.price_list_service_v2 import get_prices_batch, get_price_from_all_tables
+from app.utils.card_number import generate_card_number
+from app.api.consultation.common import _generate_and_store_sample_id
+from app.api.consultation.diagnoses import DiagnosisCreate, DiagnosisResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# Investigation schemas
+class InvestigationCreate(BaseModel):
+    """Investigation creation model"""
+    encounter_id: Optional[int] = None  # Optional for direct walk-in services
+    patient_id: Optional[int] = None  # Required if encounter_id is not provided (for direct services)
+    patient_card_number: Optional[str] = None  # Alternative to patient_id for direct services
+    # For patients without card number (walk-in)
+    patient_name: Optional[str] = None  # Patient name for walk-in without card
+    patient_phone: Optional[str] = None  # Patient phone for walk-in without card
+    patient_age: Optional[int] = None  # Patient age for walk-in without card
+    patient_gender: Optional[str] = None  # Patient gender for walk-in without card
+    gdrg_code: str
+    procedure_name: Optional[str] = None
+    investigation_type: str  # lab, scan, xray
+    notes: Optional[str] = None  # Notes/remarks from doctor
+    price: Optional[str] = None  # Price of the investigation
+    is_insured: Optional[bool] = False  # For direct services without encounter
+    ccc_number: Optional[str] = None  # For direct services without encounter
+
+
+class InvestigationResponse(BaseModel):
+    """Investigation response model"""
+    id: int
+    encounter_id: Optional[int] = None  # Optional for direct walk-in services
+    gdrg_code: str
+    procedure_name: Optional[str]
+    investigation_type: str
+    notes: Optional[str]
+    price: Optional[str] = None
+    status: str
+    confirmed_by: Optional[int] = None
+    completed_by: Optional[int] = None
+    cancelled_by: Optional[int] = None
+    cancellation_reason: Optional[str] = None
+    cancelled_at: Optional[datetime] = None
+    created_at: datetime
+    # Patient and encounter info for list view
+    patient_name: Optional[str] = None
+    patient_card_number: Optional[str] = None
+    encounter_date: Optional[datetime] = None
+    # User names for display
+    requested_by_name: Optional[str] = None
+    confirmed_by_name: Optional[str] = None
+    completed_by_name: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/diagnosis", response_model=DiagnosisResponse, status_code=status.HTTP_201_CREATED)
+def create_diagnosis(
+    diagnosis_data: DiagnosisCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin", "Records"]))
+):
+    """Add a diagnosis to an encounter"""
+    encounter = db.query(Encounter).filter(Encounter.id == diagnosis_data.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Convert None ICD-10 to empty string for database compatibility
+    diagnosis_dict = diagnosis_data.dict()
+    if diagnosis_dict.get('icd10') is None:
+        diagnosis_dict['icd10'] = ''
+    
+    # Auto-add ICD-10 code to system if it doesn't exist
+    icd10_code = diagnosis_dict.get('icd10', '').strip()
+    if icd10_code:
+        # Check if ICD-10 code exists in mappings
+        existing_mapping = db.query(ICD10DRGMapping).filter(
+            ICD10DRGMapping.icd10_code == icd10_code
+        ).first()
+        
+        if not existing_mapping:
+            # Add new ICD-10 code to system (without DRG mapping - unmapped)
+            new_icd10 = ICD10DRGMapping(
+                drg_code='',  # Empty DRG code means unmapped
+                drg_description='',
+                icd10_code=icd10_code,
+                icd10_description=diagnosis_dict.get('diagnosis', '').strip() or '',
+                notes='Auto-added from diagnosis entry',
+                remarks='',
+                is_active=True
+            )
+            db.add(new_icd10)
+            db.flush()  # Flush to get the ID but don't commit yet
+    
+    # Auto-map ICD-10 to DRG code if ICD-10 is provided but DRG is not
+    if icd10_code and not diagnosis_dict.get('gdrg_code'):
+        # Find first DRG code mapped to this ICD-10 code (with non-empty DRG code)
+        mapping = db.query(ICD10DRGMapping).filter(
+            ICD10DRGMapping.icd10_code == icd10_code,
+            ICD10DRGMapping.is_active == True,
+            ICD10DRGMapping.drg_code != '',
+            ICD10DRGMapping.drg_code.isnot(None)
+        ).first()
+        
+        if mapping:
+            diagnosis_dict['gdrg_code'] = mapping.drg_code
+            # Optionally update diagnosis description if it's empty
+            if not diagnosis_dict.get('diagnosis') or not diagnosis_dict['diagnosis'].strip():
+                if mapping.icd10_description:
+                    diagnosis_dict['diagnosis'] = mapping.icd10_description
+    
+    diagnosis = Diagnosis(**diagnosis_dict, created_by=current_user.id)
+    db.add(diagnosis)
+    db.commit()
+    db.refresh(diagnosis)
+    
+    # NOTE: Bill generation for diagnoses is disabled for OPD consultations
+    # since the initial service request already covers the diagnosis billing.
+    # If diagnosis is marked as chief and has GDRG code, auto-generate bill
+    # if diagnosis.is_chief and diagnosis.gdrg_code:
+    #     auto_generate_bill_for_chief_diagnosis(db, diagnosis, encounter, current_user.id)
+    
+    return diagnosis
+
+
+class BulkConfirmInvestigations(BaseModel):
+    """Model for bulk confirming multiple investigations"""
+    investigation_ids: List[int]  # List of investigation IDs to confirm
+
+
+@router.put("/investigations/bulk-confirm")
+def bulk_confirm_investigations(
+    bulk_data: BulkConfirmInvestigations,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Scan", "Xray", "Admin", "Lab Head", "Scan Head", "Xray Head"]))
+):
+    """Bulk confirm multiple investigation requests"""
+    if not bulk_data.investigation_ids:
+        raise HTTPException(status_code=400, detail="No investigation IDs provided")
+    
+    investigations = db.query(Investigation).filter(
+        Investigation.id.in_(bulk_data.investigation_ids)
+    ).all()
+    
+    if len(investigations) != len(bulk_data.investigation_ids):
+        raise HTTPException(status_code=404, detail="Some investigations not found")
+    
+    # Load encounters and resolve all investigation prices up front (one query per price table)
+    encounter_ids = {inv.encounter_id for inv in investigations if inv.encounter_id}
+    encounters_by_id = {
+        enc.id: enc for enc in db.query(Encounter).filter(Encounter.id.in_(encounter_ids)).all()
+    } if encounter_ids else {}
+    service_type_by_investigation_type = {"lab": "Lab", "scan": "Scan", "xray": "X-ray"}
+    priced_investigations = [
+        inv for inv in investigations
+        if inv.gdrg_code and inv.encounter_id in encounters_by_id
+    ]
+    batch_prices = {}
+    batch_price_error = None
+    try:
+        batch_prices = dict(zip(
+            (inv.id for inv in priced_investigations),
+            get_prices_batch(db, [
+                (
+                    inv.gdrg_code,
+                    service_type_by_investigation_type.get(inv.investigation_type),
+                    inv.procedure_name,
+                    encounters_by_id[inv.encounter_id].ccc_number is not None
+                    and encounters_by_id[inv.encounter_id].ccc_number.strip() != ""
+                )
+                for inv in priced_investigations
+            ])
+        ))
+    except Exception as e:
+        batch_price_error = e
+    
+    confirmed_count = 0
+    errors = []
+    
+    for investigation in investigations:
+        try:
+            # Don't allow confirming cancelled investigations
+            if investigation.status == InvestigationStatus.CANCELLED.value:
+                errors.append(f"Investigation {investigation.id} is cancelled")
+                continue
+            
+            # Don't allow confirming already confirmed or completed investigations
+            if investigation.status in [InvestigationStatus.CONFIRMED.value, InvestigationStatus.COMPLETED.value]:
+                errors.append(f"Investigation {investigation.id} is already {investigation.status}")
+                continue
+            
+            # Verify user role matches investigation type
+            if current_user.role not in ["Admin", "Lab Head", "Scan Head", "Xray Head"]:
+                if investigation.investigation_type == "lab" and current_user.role != "Lab":
+                    errors.append(f"Only Lab staff can confirm investigation {investigation.id}")
+                    continue
+                elif investigation.investigation_type == "scan" and current_user.role != "Scan":
+                    errors.append(f"Only Scan staff can confirm investigation {investigation.id}")
+                    continue
+                elif investigation.investigation_type == "xray" and current_user.role != "Xray":
+                    errors.append(f"Only Xray staff can confirm investigation {investigation.id}")
+                    continue
+            
+            # Confirm the investigation and generate bill (same logic as single confirm)
+            investigation.status = InvestigationStatus.CONFIRMED.value
+            investigation.confirmed_by = current_user.id
+            
+            # Generate and store sample ID for lab investigations
+            if investigation.investigation_type == "lab":
+                _generate_and_store_sample_id(db, investigation, current_user.id)
+            
+            # Generate bill if investigation has an encounter
+            if investigation.encounter_id:
+                encounter = encounters_by_id.get(investigation.encounter_id)
+                if encounter:
+                    is_insured_encounter = encounter.ccc_number is not None and encounter.ccc_number.strip() != ""
+                    
+                    # Get price for the investigation
+                    unit_price = 0.0
+                    if investigation.gdrg_code:
+                        # Determine service type based on investigation type
+                        service_type = service_type_by_investigation_type.get(investigation.investigation_type)
+                        
+                        try:
+                            if batch_price_error is not None:
+                                raise batch_price_error
+                            unit_price = batch_prices[investigation.id]
+                            logger.debug("bulk_confirm: Batch price for investigation %s, gdrg_code='%s', procedure_name='%s', is_insured=%s, service_type='%s', price=%s", investigation.id, investigation.gdrg_code, investigation.procedure_name, is_insured_encounter, service_type, unit_price)
+                            
+                            # If lookup returns 0.0, it means price wasn't found
+                            if unit_price == 0.0:
+                                logger.warning("bulk_confirm: Price lookup returned 0.0 for investigation %s, gdrg_code='%s', service_type='%s'", investigation.id, investigation.gdrg_code, service_type)
+                                # Only use stored price if it exists and lookup returned 0
+                                if investigation.price:
+                                    try:
+                                        stored_price = float(investigation.price)
+                                        if stored_price > 0:
+                                            logger.warning("bulk_confirm: Using stored price '%s' as fallback for investigation %s", stored_price, investigation.id)
+                                            unit_price = stored_price
+                                    except (ValueError, TypeError):
+                                        pass
+                        except Exception as e:
+                            logger.error("bulk_confirm: Failed to get price for investigation %s: %s", investigation.id, e)
+                            # Fallback to stored price only if exception occurred
+                            if investigation.price:
+                                try:
+                                    unit_price = float(investigation.price)
+                                    logger.warning("bulk_confirm: Using stored price '%s' as fallback after exception for investigation %s", unit_price, investigation.id)
+                                except (ValueError, TypeError):
+                                    unit_price = 0.0
+                    else:
+                        # No gdrg_code, try stored price
+                        if investigation.price:
+                            try:
+                                unit_price = float(investigation.price)
+                            except (ValueError, TypeError):
+                                unit_price = 0.0
+                    
+                    total_price = unit_price
+                    
+                    # Create/add to bill if price > 0
+                    if total_price > 0:
+                        existing_bill = db.query(Bill).filter(
+                            Bill.encounter_id == encounter.id,
+                            Bill.is_paid == False
+                        ).first()
+                        
+                        if existing_bill:
+                            # Check if already in bill
+                            existing_item = db.query(BillItem).filter(
+                                BillItem.bill_id == existing_bill.id,
+                                BillItem.item_code == investigation.gdrg_code,
+                                BillItem.item_name.like(f"%{investigation.procedure_name}%")
+                            ).first()
+                            
+                            if not existing_item:
+                                bill_item = BillItem(
+                                    bill_id=existing_bill.id,
+                                    item_code=investigation.gdrg_code or "MISC",
+                                    item_name=f"Investigation: {investigation.procedure_name or investigation.gdrg_code}",
+                                    category=investigation.investigation_type or "procedure",
+                                    quantity=1,
+                                    unit_price=unit_price,
+                                    total_price=total_price
+                                )
+                                db.add(bill_item)
+                                existing_bill.total_amount += total_price
+                        else:
+                            # Create new bill
+                            bill_number = f"BILL-{random.randint(100000, 999999)}"
+                            bill = Bill(
+                                encounter_id=encounter.id,
+                                bill_number=bill_number,
+                                is_insured=is_insured_encounter,
+                                total_amount=total_price,
+                                created_by=current_user.id
+                            )
+                            db.add(bill)
+                            db.flush()
+                            
+                            bill_item = BillItem(
+                                bill_id=bill.id,
+                                item_code=investigation.gdrg_code or "MISC",
+                                item_name=f"Investigation: {investigation.procedure_name or investigation.gdrg_code}",
+                                category=investigation.investigation_type or "procedure",
+                                quantity=1,
+                                unit_price=unit_price,
+                                total_price=total_price
+                            )
+                            db.add(bill_item)
+            
+            confirmed_count += 1
+            
+        except Exception as e:
+            errors.append(f"Error confirming investigation {investigation.id}: {str(e)}")
+    
+    db.commit()
+    
+    return {
+        "confirmed_count": confirmed_count,
+        "total_requested": len(bulk_data.investigation_ids),
+        "errors": errors if errors else None
+    }
+
+
+@router.post("/investigation", response_model=InvestigationResponse, status_code=status.HTTP_201_CREATED)
+def create_investigation(
+    investigation_data: InvestigationCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin", "Records", "Scan", "Scan Head", "Xray", "Xray Head", "Lab", "Lab Head"]))
+):
+    """Request an investigation (lab, scan, x-ray). Can be from consultation (with encounter_id) or direct walk-in (without encounter_id)"""
+    encounter = None
+    is_insured = False
+    
+    # Handle investigation with encounter (from consultation)
+    if investigation_data.encounter_id:
+        encounter = db.query(Encounter).filter(Encounter.id == investigation_data.encounter_id).first()
+        if not encounter:
+            raise HTTPException(status_code=404, detail="Encounter not found")
+        is_insured = bool(encounter.ccc_number)
+    # Handle direct walk-in service (without encounter)
+    else:
+        # Must provide either patient_id, patient_card_number, or patient name/phone/age
+        patient = None
+        if investigation_data.patient_id:
+            patient = db.query(Patient).filter(Patient.id == investigation_data.patient_id).first()
+        elif investigation_data.patient_card_number:
+            patient = db.query(Patient).filter(Patient.card_number == investigation_data.patient_card_number).first()
+        elif investigation_data.patient_name and investigation_data.patient_phone and investigation_data.patient_age:
+            # Patient without card number - create a temporary patient record
+            
+            # Generate a card number for the new patient
+            card_number = generate_card_number(db)
+            
+            # Calculate date of birth from age (approximate)
+            today_date = today()
+            birth_year = today_date.year - investigation_data.patient_age
+            date_of_birth = date(birth_year, 1, 1)  # Use January 1st as approximate DOB
+            
+            # Create new patient record
+            patient = Patient(
+                name=investigation_data.patient_name,
+                surname="",  # Not provided
+                gender=investigation_data.patient_gender or "Other",
+                age=investigation_data.patient_age,
+                date_of_birth=date_of_birth,
+                card_number=card_number,
+                contact=investigation_data.patient_phone,
+                insured=investigation_data.is_insured or False,
+                ccc_number=investigation_data.ccc_number if investigation_data.is_insured else None
+            )
+            db.add(patient)
+            db.flush()  # Get patient ID without committing yet
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail="For direct services, provide either: (1) patient_id, (2) patient_card_number, or (3) patient_name, patient_phone, and patient_age"
+            )
+        
+        if not patient:
+            raise HTTPException(status_code=404, detail="Patient not found or could not be created")
+        
+        # Use provided insurance info or patient's insurance status
+        if investigation_data.is_insured is not None:
+            is_insured = investigation_data.is_insured
+        else:
+            is_insured = patient.insured or bool(investigation_data.ccc_number)
+        
+        # Create a minimal encounter for direct services so the investigation can be linked to the patient
+        # This ensures the investigation appears in queries and maintains data consistency
+        encounter = Encounter(
+            patient_id=patient.id,
+            department="Direct Service",  # Mark as direct service
+            status=EncounterStatus.DRAFT.value,  # Draft status for direct services
+            ccc_number=investigation_data.ccc_number if investigation_data.is_insured else None,
+            created_by=current_user.id
+        )
+        db.add(encounter)
+        db.flush()  # Get encounter ID without committing yet
+    
+    # Auto-fetch price from price list if not provided
+    price = investigation_data.price
+    if not price and investigation_data.gdrg_code:
+        try:
+            # Determine service type based on investigation type for accurate price lookup
+            service_type = None
+            if investigation_data.investigation_type == "lab":
+                service_type = "Lab"
+            elif investigation_data.investigation_type == "scan":
+                service_type = "Scan"
+            elif investigation_data.investigation_type == "xray":
+                service_type = "X-ray"
+            
+            price_value = get_price_from_all_tables(db, investigation_data.gdrg_code, is_insured, service_type, investigation_data.procedure_name)
+            price = str(price_value) if price_value else None
+            logger.debug("create_investigation: Looked up price for gdrg_code='%s', procedure_name='%s', is_insured=%s, service_type='%s', price=%s", investigation_data.gdrg_code, investigation_data.procedure_name, is_insured, service_type, price_value)
+        except Exception as e:
+            # If price lookup fails, continue without price
+            logger.error("create_investigation: Failed to get price from price list: %s", e)
+            price = None
+    
+    investigation = Investigation(
+        encounter_id=encounter.id if encounter else investigation_data.encounter_id,
+        gdrg_code=investigation_data.gdrg_code,
+        procedure_name=investigation_data.procedure_name,
+        investigation_type=investigation_data.investigation_type,
+        notes=investigation_data.notes,
+        price=price,
+        requested_by=current_user.id,
+        status=InvestigationStatus.REQUESTED.value
+    )
+    stamp_patient_details(db, investigation)
+    db.add(investigation)
+    db.commit()
+    db.refresh(investigation)
+    return investigation
+
+
+@router.get("/investigation/{investigation_id}", response_model=InvestigationResponse)
+def get_investigation(
+    investigation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a single investigation by ID with patient and encounter info"""
+    investigation = (
+        db.query(Investigation)
+        .join(Encounter, Investigation.encounter_id == Encounter.id)
+        .join(Patient, Encounter.patient_id == Patient.id)
+        .filter(Investigation.id == investigation_id)
+        .first()
+    )
+    
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Get user names
+    requested_by_name = None
+    if investigation.requested_by:
+        requested_user = db.query(User).filter(User.id == investigation.requested_by).first()
+        requested_by_name = requested_user.full_name if requested_user else None
+    
+    confirmed_by_name = None
+    if investigation.confirmed_by:
+        confirmed_user = db.query(User).filter(User.id == investigation.confirmed_by).first()
+        confirmed_by_name = confirmed_user.full_name if confirmed_user else None
+    
+    completed_by_name = None
+    if investigation.completed_by:
+        completed_user = db.query(User).filter(User.id == investigation.completed_by).first()
+        completed_by_name = completed_user.full_name if completed_user else None
+    
+    inv_dict = {
+        "id": investigation.id,
+        "encounter_id": investigation.encounter_id,
+        "gdrg_code": investigation.gdrg_code,
+        "procedure_name": investigation.procedure_name,
+        "investigation_type": investigation.investigation_type,
+        "notes": investigation.notes,
+        "price": investigation.price,
+        "status": investigation.status,
+        "confirmed_by": investigation.confirmed_by,
+        "completed_by": investigation.completed_by,
+        "cancelled_by": investigation.cancelled_by,
+        "cancellation_reason": investigation.cancellation_reason,
+        "cancelled_at": investigation.cancelled_at,
+        "created_at": investigation.created_at,
+        "patient_name": f"{investigation.encounter.patient.name or ''} {investigation.encounter.patient.surname or ''} {investigation.encounter.patient.other_names or ''}".strip(),
+        "patient_card_number": investigation.encounter.patient.card_number,
+        "encounter_date": investigation.encounter.created_at,
+        "requested_by_name": requested_by_name,
+        "confirmed_by_name": confirmed_by_name,
+        "completed_by_name": completed_by_name,
+    }
+    return InvestigationResponse(**inv_dict)
+
+
+@router.get("/investigation/encounter/{encounter_id}", response_model=List[InvestigationResponse])
+def get_investigations(
+    encounter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all investigations for an encounter"""
+    investigations = db.query(Investigation).filter(Investigation.encounter_id == encounter_id).all()
+    return investigations
+
+
+class InvestigationCancel(BaseModel):
+    """Investigation cancellation model"""
+    reason: str  # Reason for cancellation (required)
+
+
+@router.put("/investigation/{investigation_id}/cancel", response_model=InvestigationResponse)
+def cancel_investigation(
+    investigation_id: int,
+    cancel_data: InvestigationCancel,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Cancel an investigation (can cancel confirmed investigations)"""
+    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Don't allow cancelling already cancelled or completed investigations
+    if investigation.status == InvestigationStatus.CANCELLED.value:
+        raise HTTPException(status_code=400, detail="Investigation is already cancelled")
+    
+    if investigation.status == InvestigationStatus.COMPLETED.value:
+        raise HTTPException(status_code=400, detail="Cannot cancel a completed investigation")
+    
+    investigation.status = InvestigationStatus.CANCELLED.value
+    investigation.cancelled_by = current_user.id
+    investigation.cancellation_reason = cancel_data.reason
+    investigation.cancelled_at = utcnow()
+    
+    db.commit()
+    db.refresh(investigation)
+    return investigation
+
+
+@router.put("/investigation/{investigation_id}", response_model=InvestigationResponse)
+def update_investigation(
+    investigation_id: int,
+    investigation_data: InvestigationCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Update an investigation"""
+    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Prevent editing if investigation is confirmed by staff
+    # Only Admin can override this restriction
+    if investigation.confirmed_by is not None and current_user.role != "Admin":
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot edit investigation that has been confirmed by staff. Contact admin if changes are needed."
+        )
+    
+    # Verify encounter exists
+    encounter = db.query(Encounter).filter(Encounter.id == investigation_data.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Update investigation fields
+    investigation.encounter_id = investigation_data.encounter_id
+    investigation.gdrg_code = investigation_data.gdrg_code
+    investigation.procedure_name = investigation_data.procedure_name
+    investigation.investigation_type = investigation_data.investigation_type
+    investigation.notes = investigation_data.notes
+    investigation.price = investigation_data.price
+    
+    db.commit()
+    db.refresh(investigation)
+    return investigation
+
+
+@router.delete("/investigation/{investigation_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_investigation(
+    investigation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Delete an investigation"""
+    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Prevent deleting if investigation is confirmed by staff
+    # Only Admin can override this restriction
+    if investigation.confirmed_by is not None and current_user.role != "Admin":
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot delete investigation that has been confirmed by staff. Contact admin if deletion is needed."
+        )
+    
+    # Also check status for additional protection
+    if investigation.status == InvestigationStatus.CONFIRMED.value and current_user.role != "Admin":
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot delete investigation that has been confirmed. Contact admin if deletion is needed."
+        )
+    
+    db.delete(investigation)
+    db.commit()
+    return None
+
+
+@router.get("/investigation/patient/{card_number}/encounter/{encounter_id}", response_model=List[InvestigationResponse])
+def get_investigations_by_patient_card(
+    card_number: str,
+    encounter_id: int,
+    investigation_type: Optional[str] = None,  # Filter by type: lab, scan, xray
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get investigations for a patient (by card number) for a specific encounter"""
+    # Verify patient exists
+    patient = db.query(Patient).filter(Patient.card_number == card_number).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    # Verify encounter belongs to patient
+    encounter = db.query(Encounter).filter(
+        Encounter.id == encounter_id,
+        Encounter.patient_id == patient.id
+    ).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found or does not belong to this patient")
+    
+    # Build query
+    query = db.query(Investigation).filter(Investigation.encounter_id == encounter_id)
+    
+    # Filter by investigation type if provided
+    if investigation_type:
+        query = query.filter(Investigation.investigation_type == investigation_type)
+    
+    investigations = query.all()
+    return investigations
+
+
+@router.get("/investigation/list/{investigation_type}", response_model=List[InvestigationResponse])
+def get_investigations_by_type(
+    investigation_type: str,  # lab, scan, xray
+    status: Optional[str] = None,  # requested, confirmed, completed, cancelled
+    search: Optional[str] = None,  # Search by card number or patient name
+    date: Optional[str] = None,  # Filter by date (YYYY-MM-DD), defaults to today
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get investigations by type with filters
+    Used by Lab, Scan, and X-ray pages to show service requests
+    """
+    # Validate investigation type
+    valid_types = ["lab", "scan", "xray"]
+    if investigation_type.lower() not in valid_types:
+        raise HTTPException(status_code=400, detail=f"Invalid investigation_type. Must be one of: {', '.join(valid_types)}")
+    
+    # Build base query with joins
+    query = (
+        db.query(Investigation)
+        .join(Encounter, Investigation.encounter_id == Encounter.id)
+        .join(Patient, Encounter.patient_id == Patient.id)
+    )
+    
+    # Filter by investigation type
+    query = query.filter(Investigation.investigation_type == investigation_type.lower())
+    
+    # Filter by status
+    if status:
+        valid_statuses = ["requested", "confirmed", "completed", "cancelled"]
+        if status.lower() not in valid_statuses:
+            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
+        query = query.filter(Investigation.status == status.lower())
+    
+    # Filter by date (default to today)
+    if date:
+        try:
+            filter_date = datetime.strptime(date, "%Y-%m-%d").date()
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}")
+    else:
+        filter_date = date_class.today()
+    
+    # Filter by date (using encounter created_at date)
+    start_of_day = datetime.combine(filter_date, datetime.min.time())
+    end_of_day = datetime.combine(filter_date, datetime.max.time())
+    query = query.filter(Encounter.created_at >= start_of_day, Encounter.created_at <= end_of_day)
+    
+    # Search by card number or patient name
+    if search:
+        search_term = f"%{search.strip()}%"
+        # Search in card number, name, or surname
+        # For full name search, we'll check if search term matches name or surname separately
+        query = query.filter(
+            or_(
+                Patient.card_number.ilike(search_term),
+                Patient.name.ilike(search_term),
+                Patient.surname.ilike(search_term)
+            )
+        )
+    
+    # Order by created_at descending (newest first)
+    query = query.order_by(Investigation.created_at.desc())
+    
+    investigations = query.all()
+    
+    # Build response with patient info and user names
+    result = []
+    for inv in investigations:
+        # Get user names
+        requested_by_name = None
+        if inv.requested_by:
+            requested_user = db.query(User).filter(User.id == inv.requested_by).first()
+            requested_by_name = requested_user.full_name if requested_user else None
+        
+        confirmed_by_name = None
+        if inv.confirmed_by:
+            confirmed_user = db.query(User).filter(User.id == inv.confirmed_by).first()
+            confirmed_by_name = confirmed_user.full_name if confirmed_user else None
+        
+        completed_by_name = None
+        if inv.completed_by:
+            completed_user = db.query(User).filter(User.id == inv.completed_by).first()
+            completed_by_name = completed_user.full_name if completed_user else None
+        
+        inv_dict = {
+            "id": inv.id,
+            "encounter_id": inv.encounter_id,
+            "gdrg_code": inv.gdrg_code,
+            "procedure_name": inv.procedure_name,
+            "investigation_type": inv.investigation_type,
+            "notes": inv.notes,
+            "price": inv.price,
+            "status": inv.status,
+            "confirmed_by": inv.confirmed_by,
+            "completed_by": inv.completed_by,
+            "cancelled_by": inv.cancelled_by,
+            "cancellation_reason": inv.cancellation_reason,
+            "cancelled_at": inv.cancelled_at,
+            "created_at": inv.created_at,
+            "patient_name": f"{inv.encounter.patient.name or ''} {inv.encounter.patient.surname or ''} {inv.encounter.patient.other_names or ''}".strip(),
+            "patient_card_number": inv.encounter.patient.card_number,
+            "encounter_date": inv.encounter.created_at,
+            "requested_by_name": requested_by_name,
+            "confirmed_by_name": confirmed_by_name,
+            "completed_by_name": completed_by_name,
+        }
+        result.append(InvestigationResponse(**inv_dict))
+    
+    return result
+
+
+class InvestigationWorklistResponse(BaseModel):
+    """Paged investigation worklist"""
+    total: int
+    page: int
+    page_size: int
+    items: List[InvestigationResponse]
+
+
+@router.get("/investigation/worklist/{investigation_type}", response_model=InvestigationWorklistResponse)
+@query_budget(4)  # user, count/ETag aggregate, page, staff names
+def get_investigation_worklist(
+    investigation_type: str,  # lab, scan, xray
+    request: Request,
+    response: Response,
+    status: Optional[str] = Query(None, description="requested, confirmed, completed or cancelled"),
+    search: Optional[str] = Query(None, description="Card number or patient name (partial match)"),
+    start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format (defaults to today)"),
+    end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format (defaults to start_date)"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(50, ge=1, le=200, description="Items per page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Paged Lab / Scan / X-ray worklist for the service desks.
+    Filters on the investigation request date. Send the returned ETag back in
+    If-None-Match - unchanged polls get 304 Not Modified without loading rows.
+    """
+    investigation_type = investigation_type.lower()
+    if investigation_type not in WORKLIST_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid investigation_type. Must be one of: {', '.join(WORKLIST_TYPES)}")
+    if status:
+        status = status.lower()
+        if status not in WORKLIST_STATUSES:
+            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(WORKLIST_STATUSES)}")
+    
+    try:
+        date_from = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else today()
+        date_to = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else date_from
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+    
+    search = search.strip() if search and search.strip() else None
+    filters = dict(
+        investigation_type=investigation_type, status=status, date_from=date_from, date_to=date_to,
+        search=search, page=page, page_size=page_size
+    )
+    
+    state = get_worklist_state(db, **filters)
+    headers = {"ETag": state["etag"], "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and state["etag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return {
+        "total": state["total"],
+        "page": page,
+        "page_size": page_size,
+        "items": get_worklist_page(db, **filters),
+    }
+
+
+class UnifiedWorklistItem(BaseModel):
+    """OPD or IPD investigation row on the unified worklist"""
+    source: str  # opd or ipd
+    ref: str  # Type-tagged reference, e.g. ipd-12
+    id: int
+    encounter_id: Optional[int] = None
+    ward_admission_id: Optional[int] = None
+    ward: Optional[str] = None
+    gdrg_code: str
+    procedure_name: Optional[str] = None
+    investigation_type: str
+    status: str
+    price: Optional[str] = None
+    notes: Optional[str] = None
+    created_at: Optional[datetime] = None
+    patient_name: Optional[str] = None
+    patient_card_number: Optional[str] = None
+    requested_by_name: Optional[str] = None
+    confirmed_by_name: Optional[str] = None
+    completed_by_name: Optional[str] = None
+
+
+class UnifiedWorklistResponse(BaseModel):
+    """Paged OPD + IPD investigation worklist"""
+    total: int
+    page: int
+    page_size: int
+    items: List[UnifiedWorklistItem]
+
+
+@router.get("/investigation/unified-worklist/{investigation_type}", response_model=UnifiedWorklistResponse)
+@query_budget(4)  # user, UNION ALL count, UNION ALL page, staff names
+def get_unified_investigation_worklist(
+    investigation_type: str,  # lab, scan, xray
+    status: Optional[str] = Query(None, description="requested, confirmed, completed or cancelled"),
+    search: Optional[str] = Query(None, description="Card number or patient name (partial match)"),
+    start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format (defaults to today)"),
+    end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format (defaults to start_date)"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(50, ge=1, le=200, description="Items per page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    OPD and IPD investigations of one type in a single paged list (newest first).
+    Pass each row's source back to the result endpoints (?source=opd|ipd) so they
+    resolve the id against the right table.
+    """
+    investigation_type = investigation_type.lower()
+    if investigation_type not in WORKLIST_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid investigation_type. Must be one of: {', '.join(WORKLIST_TYPES)}")
+    if status:
+        status = status.lower()
+        if status not in WORKLIST_STATUSES:
+            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(WORKLIST_STATUSES)}")
+    
+    try:
+        date_from = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else today()
+        date_to = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else date_from
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+    
+    worklist = get_unified_worklist(
+        db, investigation_type, status=status, date_from=date_from, date_to=date_to,
+        search=search, page=page, page_size=page_size
+    )
+    return {"total": worklist["total"], "page": page, "page_size": page_size, "items": worklist["items"]}
+
+
+class InvestigationUpdateDetails(BaseModel):
+    """Investigation update details model"""
+    gdrg_code: str
+    procedure_name: str
+    investigation_type: Optional[str] = None
+    notes: Optional[str] = None
+    price: Optional[str] = None
+
+
+@router.put("/investigation/{investigation_id}/update-details", response_model=InvestigationResponse)
+def update_investigation_details(
+    investigation_id: int,
+    update_data: InvestigationUpdateDetails,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Scan", "Xray", "Admin", "Lab Head", "Scan Head", "Xray Head"]))
+):
+    """Update investigation details (gdrg_code, procedure_name, investigation_type) - allows staff to change service"""
+    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Check permissions - only staff matching investigation type or Admin/Head can update
+    if current_user.role not in ["Admin", "Lab Head", "Scan Head", "Xray Head", "Scan"]:
+        if investigation.investigation_type == "lab" and current_user.role != "Lab":
+            raise HTTPException(status_code=403, detail="Only Lab staff can update lab investigations")
+        elif investigation.investigation_type == "scan" and current_user.role != "Scan" and current_user.role != "Scan Head":
+            raise HTTPException(status_code=403, detail="Only Scan staff and Scan Head can update scan investigations")
+        elif investigation.investigation_type == "xray" and current_user.role != "Xray" and current_user.role != "Xray Head":
+            raise HTTPException(status_code=403, detail="Only Xray staff can update xray investigations")
+    
+    # Update both gdrg_code and procedure_name together (required)
+    investigation.gdrg_code = update_data.gdrg_code
+    investigation.procedure_name = update_data.procedure_name
+    
+    # Update investigation_type if provided
+    if update_data.investigation_type is not None:
+        investigation.investigation_type = update_data.investigation_type
+    
+    # Update notes if provided
+    if update_data.notes is not None:
+        investigation.notes = update_data.notes
+    
+    # Update price if provided
+    if update_data.price is not None:
+        investigation.price = update_data.price
+    
+    db.commit()
+    db.refresh(investigation)
+    return investigation
+
+
+@router.put("/investigation/{investigation_id}/revert-status")
+def revert_investigation_status(
+    investigation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab Head", "Scan Head", "Xray Head", "Admin"]))
+):
+    """Revert investigation status from completed to confirmed (to allow editing results) - Admin and Head roles only"""
+    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Only allow reverting from completed to confirmed
+    if investigation.status != InvestigationStatus.COMPLETED.value:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot revert status. Current status is '{investigation.status}'. Only completed investigations can be reverted."
+        )
+    
+    # Verify investigation type matches (each Head can only revert their own investigation type)
+    if current_user.role == "Lab Head" and investigation.investigation_type != "lab":
+        raise HTTPException(
+            status_code=403,
+            detail="Lab Head can only revert lab investigations"
+        )
+    elif current_user.role == "Scan Head" and investigation.investigation_type != "scan":
+        raise HTTPException(
+            status_code=403,
+            detail="Scan Head can only revert scan investigations"
+        )
+    elif current_user.role == "Xray Head" and investigation.investigation_type != "xray":
+        raise HTTPException(
+            status_code=403,
+            detail="Xray Head can only revert xray investigations"
+        )
+    
+    # Revert status to confirmed
+    investigation.status = InvestigationStatus.CONFIRMED.value
+    # Clear completed_by when reverting
+    investigation.completed_by = None
+    
+    db.commit()
+    db.refresh(investigation)
+    
+    return {"investigation_id": investigation.id, "status": investigation.status, "message": "Status reverted to confirmed"}
+
+
+class InvestigationRevertToRequested(BaseModel):
+    """Model for reverting investigation from confirmed to requested"""
+    reason: str  # Reason for reverting (required)
+
+
+@router.put("/investigation/{investigation_id}/revert-to-requested")
+def revert_investigation_to_requested(
+    investigation_id: int,
+    revert_data: InvestigationRevertToRequested,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Revert investigation status from confirmed to requested - Admin only"""
+    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Only allow reverting from confirmed to requested
+    if investigation.status != InvestigationStatus.CONFIRMED.value:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot revert status. Current status is '{investigation.status}'. Only confirmed investigations can be reverted to requested."
+        )
+    
+    # Revert status to requested
+    investigation.status = InvestigationStatus.REQUESTED.value
+    # Clear confirmed_by when reverting
+    investigation.confirmed_by = None
+    # Store revert reason in cancellation_reason field (reusing existing field)
+    investigation.cancellation_reason = f"Reverted to requested by Admin: {revert_data.reason}"
+    investigation.cancelled_by = current_user.id
+    investigation.cancelled_at = utcnow()
+    
+    db.commit()
+    db.refresh(investigation)
+    
+    return {"investigation_id": investigation.id, "status": investigation.status, "message": "Status reverted to requested"}
+
+
+@router.put("/investigation/{investigation_id}/confirm")
+def confirm_investigation(
+    investigation_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Scan", "Xray", "Admin", "Lab Head", "Scan Head", "Xray Head"]))
+):
+    """Confirm an investigation request and automatically generate a bill item"""
+    investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
+    if not investigation:
+        raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    # Don't allow confirming cancelled investigations
+    if investigation.status == InvestigationStatus.CANCELLED.value:
+        raise HTTPException(status_code=400, detail="Cannot confirm a cancelled investigation")
+    
+    # Verify user role matches investigation type (Lab can confirm labs, etc.)
+    if current_user.role not in ["Admin", "Lab Head", "Scan Head", "Xray Head"]:
+        if investigation.investigation_type == "lab" and current_user.role != "Lab":
+            raise HTTPException(
+                status_code=403,
+                detail="Only Lab staff can confirm lab investigations"
+            )
+        elif investigation.investigation_type == "scan" and current_user.role != "Scan":
+            raise HTTPException(
+                status_code=403,
+                detail="Only Scan staff can confirm scan investigations"
+            )
+        elif investigation.investigation_type == "xray" and current_user.role != "Xray":
+            raise HTTPException(
+                status_code=403,
+                detail="Only Xray staff can confirm xray investigations"
+            )
+    
+    # Get encounter to determine insurance status (if exists)
+    encounter = None
+    is_insured_encounter = False
+    
+    if investigation.encounter_id:
+        encounter = db.query(Encounter).filter(Encounter.id == investigation.encounter_id).first()
+        if not encounter:
+            raise HTTPException(status_code=404, detail="Encounter not found")
+        # Determine if insured based on encounter CCC number
+        is_insured_encounter = encounter.ccc_number is not None and encounter.ccc_number.strip() != ""
+    else:
+        # Direct service without encounter - cannot auto-generate bill item
+        # Just confirm the investigation
+        investigation.status = InvestigationStatus.CONFIRMED.value
+        investigation.confirmed_by = current_user.id
+        db.commit()
+        db.refresh(investigation)
+        return {"investigation_id": investigation.id, "status": investigation.status}
+    
+    investigation.status = InvestigationStatus.CONFIRMED.value
+    investigation.confirmed_by = current_user.id
+    
+    # Generate and store sample ID for lab investigations
+    if investigation.investigation_type == "lab":
+        _generate_and_store_sample_id(db, investigation, current_user.id)
+    
+    # Get price for the investigation (co-pay for insured, base rate for cash)
+    # Always look up price from price list to ensure correct pricing based on current insurance status
+    unit_price = 0.0
+    
+    if investigation.gdrg_code:
+        # Determine service type based on investigation type for better price lookup
+        service_type = None
+        if investigation.investigation_type == "lab":
+            service_type = "Lab"
+        elif investigation.investigation_type == "scan":
+            service_type = "Scan"
+        elif investigation.investigation_type == "xray":
+            service_type = "X-ray"
+        
+        # Always look up price from price list to get correct price based on insurance status
+        # Pass procedure_name to match exact procedure when G-DRG codes map to multiple procedures
+        try:
+            unit_price = get_price_from_all_tables(db, investigation.gdrg_code, is_insured_encounter, service_type, investigation.procedure_name)
+            logger.debug("confirm_investigation: Looked up price for gdrg_code='%s', procedure_name='%s', is_insured=%s, service_type='%s', price=%s", investigation.gdrg_code, investigation.procedure_name, is_insured_encounter, service_type, unit_price)
+            
+            # If lookup returns 0.0, it means price wasn't found - don't use stored price, log warning
+            if unit_price == 0.0:
+                logger.warning("confirm_investigation: Price lookup returned 0.0 for gdrg_code='%s', service_type='%s'. Price not found in pricelist.", investigation.gdrg_code, service_type)
+                # Only use stored price if it exists and lookup returned 0 (price not in pricelist)
+                if investigation.price:
+                    try:
+                        stored_price = float(investigation.price)
+                        if stored_price > 0:
+                            logger.warning("confirm_investigation: Using stored price '%s' as fallback (price not found in pricelist)", stored_price)
+                            unit_price = stored_price
+                    except (ValueError, TypeError):
+                        pass
+        except Exception as e:
+            logger.error("confirm_investigation: Failed to get price from price list: %s", e)
+            # If lookup throws exception, try using stored price as fallback
+            if investigation.price:
+                try:
+                    unit_price = float(investigation.price)
+                    logger.debug("confirm_investigation: Using stored price as fallback after exception: %s", unit_price)
+                except (ValueError, TypeError):
+                    unit_price = 0.0
+    else:
+        # No gdrg_code, try using stored price
+        if investigation.price:
+            try:
+                unit_price = float(investigation.price)
+                logger.debug("confirm_investigation: Using stored price (no gdrg_code): %s", unit_price)
+            except (ValueError, TypeError):
+                unit_price = 0.0
+    
+    # If still no price, log warning but continue (bill won't be created)
+    if unit_price == 0.0:
+        logger.warning("confirm_investigation: No price found for investigation %s, gdrg_code='%s', procedure_name='%s'", investigation.id, investigation.gdrg_code, investigation.procedure_name)
+    
+    total_price = unit_price  # Investigations are typically quantity 1
+    
+    logger.debug("confirm_investigation: unit_price=%s, total_price=%s, encounter_id=%s", unit_price, total_price, encounter.id if encounter else None)
+    
+    # Always create/add to bill if total_price > 0
+    if total_price > 0:
+        try:
+            # Find or create a bill for this encounter
+            existing_bill = db.query(Bill).filter(
+                Bill.encounter_id == encounter.id,
+                Bill.is_paid == False  # Only use unpaid bills
+            ).first()
+            
+            logger.debug("confirm_investigation: existing_bill=%s", existing_bill.id if existing_bill else None)
+            
+            if existing_bill:
+                # Check if this investigation is already in the bill
+                existing_item = db.query(BillItem).filter(
+                    BillItem.bill_id == existing_bill.id,
+                    BillItem.item_code == investigation.gdrg_code,
+                    BillItem.item_name.like(f"%{investigation.procedure_name}%")
+                ).first()
+                
+                logger.debug("confirm_investigation: existing_item=%s", existing_item.id if existing_item else None)
+                
+                if not existing_item:
+                    # Add bill item to existing bill
+                    bill_item = BillItem(
+                        bill_id=existing_bill.id,
+                        item_code=investigation.gdrg_code or "MISC",
+                        item_name=f"Investigation: {investigation.procedure_name or investigation.gdrg_code}",
+                        category=investigation.investigation_type or "procedure",  # Use investigation_type as category
+                        quantity=1,
+                        unit_price=unit_price,
+                        total_price=total_price
+                    )
+                    db.add(bill_item)
+                    existing_bill.total_amount += total_price
+                    logger.debug("confirm_investigation: Added bill item to existing bill. New total_amount=%s", existing_bill.total_amount)
+                else:
+                    logger.debug("confirm_investigation: Bill item already exists, skipping")
+            else:
+                # Create new bill
+                bill_number = f"BILL-{random.randint(100000, 999999)}"
+                bill = Bill(
+                    encounter_id=encounter.id,
+                    bill_number=bill_number,
+                    is_insured=is_insured_encounter,
+                    total_amount=total_price,
+                    created_by=current_user.id
+                )
+                db.add(bill)
+                db.flush()
+                logger.debug("confirm_investigation: Created new bill %s with bill_number=%s", bill.id, bill_number)
+                
+                # Create bill item
+                bill_item = BillItem(
+                    bill_id=bill.id,
+                    item_code=investigation.gdrg_code or "MISC",
+                    item_name=f"Investigation: {investigation.procedure_name or investigation.gdrg_code}",
+                    category=investigation.investigation_type or "procedure",  # Use investigation_type as category
+                    quantity=1,
+                    unit_price=unit_price,
+                    total_price=total_price
+                )
+                db.add(bill_item)
+                logger.debug("confirm_investigation: Created bill item with unit_price=%s, total_price=%s", unit_price, total_price)
+        except Exception:
+            logger.exception("confirm_investigation: Exception during bill creation")
+            # Don't fail the confirmation if bill creation fails, but log it
+    else:
+        logger.warning("confirm_investigation: Not creating bill because total_price=%s (must be > 0)", total_price)
+    
+    db.commit()
+    db.refresh(investigation)
+    return {"investigation_id": investigation.id, "status": investigation.status}
@@ -0,0 +1,756 @@
+"""
+Consultation: consultation notes, doctor note entries and consultation templates
+"""
+from typing import Optional, List, Dict, Any
+from datetime import datetime, date as date_type
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, func
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow, today
+from app.core.dependencies import require_role, get_current_user
+from app.models.user import User
+from app.models.encounter import Encounter, EncounterStatus
+from app.models.consultation_notes import ConsultationNotes
+from app.models.admission import AdmissionRecommendation
+from app.models.doctor_note_entry import DoctorNoteEntry
+from app.models.consultation_template import ConsultationTemplate
+from app.models.ward_admission import WardAdmission
+from app.models.treatment_sheet_administration import TreatmentSheetAdministration
+from app.models.bill import Bill, BillItem
+from app.models.patient import Patient
+from app.services.investigation_worklist import user_names
+
+router = APIRouter()
+
+
+# Consultation Notes schemas
+class ConsultationNotesCreate(BaseModel):
+    """Consultation notes creation/update model"""
+    encounter_id: int
+    presenting_complaints: Optional[str] = None
+    doctor_notes: Optional[str] = None
+    follow_up_date: Optional[str] = None  # ISO date string (YYYY-MM-DD)
+    outcome: Optional[str] = None  # referred | discharged | recommended_for_admission
+    admission_ward: Optional[str] = None  # required when outcome == recommended_for_admission
+
+
+class ConsultationNotesResponse(BaseModel):
+    """Consultation notes response model"""
+    id: int
+    encounter_id: int
+    presenting_complaints: Optional[str]
+    doctor_notes: Optional[str]
+    follow_up_date: Optional[str] = None
+    outcome: Optional[str] = None
+    admission_ward: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+@router.get("/notes/encounter/{encounter_id}", response_model=Optional[ConsultationNotesResponse])
+def get_consultation_notes(
+    encounter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get consultation notes for an encounter"""
+    notes = db.query(ConsultationNotes).filter(ConsultationNotes.encounter_id == encounter_id).first()
+    if notes:
+        # Fetch admission recommendation if exists
+        admission = db.query(AdmissionRecommendation).filter(AdmissionRecommendation.encounter_id == encounter_id).first()
+        # Serialize follow_up_date properly
+        return {
+            "id": notes.id,
+            "encounter_id": notes.encounter_id,
+            "presenting_complaints": notes.presenting_complaints,
+            "doctor_notes": notes.doctor_notes,
+            "follow_up_date": notes.follow_up_date.isoformat() if notes.follow_up_date else None,
+            "outcome": notes.outcome,
+            "admission_ward": (admission.ward if admission else None),
+            "created_at": notes.created_at,
+            "updated_at": notes.updated_at,
+        }
+    return None
+
+
+@router.post("/notes", response_model=ConsultationNotesResponse, status_code=status.HTTP_201_CREATED)
+def create_or_update_consultation_notes(
+    notes_data: ConsultationNotesCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Create or update consultation notes for an encounter"""
+    encounter = db.query(Encounter).filter(Encounter.id == notes_data.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Check if notes already exist
+    existing_notes = db.query(ConsultationNotes).filter(
+        ConsultationNotes.encounter_id == notes_data.encounter_id
+    ).first()
+    
+    follow_up_date = None
+    if notes_data.follow_up_date and notes_data.follow_up_date.strip():
+        try:
+            follow_up_date = date_type.fromisoformat(notes_data.follow_up_date.strip())
+        except (ValueError, AttributeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid follow_up_date format. Use YYYY-MM-DD. Error: {str(e)}")
+    
+    if existing_notes:
+        # Update existing notes
+        existing_notes.presenting_complaints = notes_data.presenting_complaints
+        existing_notes.doctor_notes = notes_data.doctor_notes
+        existing_notes.follow_up_date = follow_up_date
+        existing_notes.outcome = notes_data.outcome
+        existing_notes.updated_at = utcnow()
+        # Initialize final_encounter_id to the current encounter_id (will be updated if new encounter is created)
+        final_encounter_id = notes_data.encounter_id
+        # Handle admission recommendation
+        admission = db.query(AdmissionRecommendation).filter(AdmissionRecommendation.encounter_id == notes_data.encounter_id).first()
+        if notes_data.outcome == "recommended_for_admission" and notes_data.admission_ward:
+            if admission:
+                # If admission exists and is cancelled, delete it completely and create a new one
+                if admission.cancelled == 1:
+                    # Delete any related ward admission first (if exists)
+                    ward_admission = db.query(WardAdmission).filter(
+                        WardAdmission.admission_recommendation_id == admission.id
+                    ).first()
+                    if ward_admission:
+                        # Delete treatment sheet administrations first
+                        treatment_administrations = db.query(TreatmentSheetAdministration).filter(
+                            TreatmentSheetAdministration.ward_admission_id == ward_admission.id
+                        ).all()
+                        for admin in treatment_administrations:
+                            db.delete(admin)
+                        db.delete(ward_admission)
+                    
+                    # Get patient_id from the old encounter before deleting
+                    old_encounter = db.query(Encounter).filter(Encounter.id == notes_data.encounter_id).first()
+                    patient_id = old_encounter.patient_id if old_encounter else None
+                    ccc_number = old_encounter.ccc_number if old_encounter else None
+                    
+                    # Delete any unpaid bills from the cancelled admission's encounter
+                    # This ensures a fresh bill is created for readmission
+                    unpaid_bills = db.query(Bill).filter(
+                        Bill.encounter_id == notes_data.encounter_id,
+                        Bill.is_paid == False
+                    ).all()
+                    for bill in unpaid_bills:
+                        # Delete bill items first
+                        bill_items = db.query(BillItem).filter(BillItem.bill_id == bill.id).all()
+                        for item in bill_items:
+                            db.delete(item)
+                        db.delete(bill)
+                    
+                    # Delete the cancelled admission recommendation
+                    db.delete(admission)
+                    db.flush()
+                    
+                    # Create a new encounter for this IPD admission (not reusing old OPD encounter)
+                    new_encounter = Encounter(
+                        patient_id=patient_id,
+                        department=notes_data.admission_ward,  # Use ward as department for IPD
+                        status=EncounterStatus.IN_CONSULTATION.value,
+                        ccc_number=ccc_number,
+                        created_by=current_user.id
+                    )
+                    db.add(new_encounter)
+                    db.flush()  # Get the new encounter ID
+                    
+                    # Create new admission recommendation with new encounter
+                    admission = AdmissionRecommendation(
+                        encounter_id=new_encounter.id,
+                        ward=notes_data.admission_ward,
+                        recommended_by=current_user.id
+                    )
+                    db.add(admission)
+                    # Update consultation notes to point to new encounter
+                    existing_notes.encounter_id = new_encounter.id
+                    # Store new encounter_id for response query
+                    final_encounter_id = new_encounter.id
+                else:
+                    # Update existing non-cancelled admission
+                    admission.ward = notes_data.admission_ward
+                    admission.recommended_by = current_user.id
+                    admission.updated_at = utcnow()
+                    final_encounter_id = notes_data.encounter_id
+            else:
+                admission = AdmissionRecommendation(
+                    encounter_id=notes_data.encounter_id,
+                    ward=notes_data.admission_ward,
+                    recommended_by=current_user.id
+                )
+                db.add(admission)
+                final_encounter_id = notes_data.encounter_id
+        else:
+            # If outcome changed away from admission, remove admission record if exists
+            if admission:
+                db.delete(admission)
+            final_encounter_id = notes_data.encounter_id
+        db.commit()
+        db.refresh(existing_notes)
+        # Serialize response properly - use the final encounter_id (may be new or old)
+        admission = db.query(AdmissionRecommendation).filter(AdmissionRecommendation.encounter_id == final_encounter_id).first() if notes_data.outcome == "recommended_for_admission" else None
+        return {
+            "id": existing_notes.id,
+            "encounter_id": existing_notes.encounter_id,
+            "presenting_complaints": existing_notes.presenting_complaints,
+            "doctor_notes": existing_notes.doctor_notes,
+            "follow_up_date": existing_notes.follow_up_date.isoformat() if existing_notes.follow_up_date else None,
+            "outcome": existing_notes.outcome,
+            "admission_ward": (admission.ward if admission else None),
+            "created_at": existing_notes.created_at,
+            "updated_at": existing_notes.updated_at,
+        }
+    else:
+        # Create new notes
+        notes = ConsultationNotes(
+            encounter_id=notes_data.encounter_id,
+            presenting_complaints=notes_data.presenting_complaints,
+            doctor_notes=notes_data.doctor_notes,
+            follow_up_date=follow_up_date,
+            outcome=notes_data.outcome,
+            created_by=current_user.id
+        )
+        db.add(notes)
+        # Initialize final_encounter_id to the current encounter_id (will be updated if new encounter is created)
+        final_encounter_id = notes_data.encounter_id
+        # Create admission recommendation if applicable
+        if notes_data.outcome == "recommended_for_admission" and notes_data.admission_ward:
+            # Check if there's an existing admission recommendation for this encounter
+            existing_admission = db.query(AdmissionRecommendation).filter(
+                AdmissionRecommendation.encounter_id == notes_data.encounter_id
+            ).first()
+            
+            if existing_admission:
+                # If cancelled, delete it completely and create a new one
+                if existing_admission.cancelled == 1:
+                    # Delete any related ward admission first (if exists)
+                    ward_admission = db.query(WardAdmission).filter(
+                        WardAdmission.admission_recommendation_id == existing_admission.id
+                    ).first()
+                    if ward_admission:
+                        # Delete treatment sheet administrations first
+                        treatment_administrations = db.query(TreatmentSheetAdministration).filter(
+                            TreatmentSheetAdministration.ward_admission_id == ward_admission.id
+                        ).all()
+                        for admin in treatment_administrations:
+                            db.delete(admin)
+                        db.delete(ward_admission)
+                    
+                    # Get patient_id from the old encounter before deleting
+                    old_encounter = db.query(Encounter).filter(Encounter.id == notes_data.encounter_id).first()
+                    patient_id = old_encounter.patient_id if old_encounter else None
+                    ccc_number = old_encounter.ccc_number if old_encounter else None
+                    
+                    # If old encounter doesn't have CCC, look for OPD encounter with CCC for same patient today
+                    # This allows IPD encounters to inherit CCC from OPD encounters
+                    if not ccc_number and patient_id:
+                        # Get all ward admission encounter IDs to exclude IPD encounters
+                        ward_admission_encounter_ids = [wa[0] for wa in db.query(WardAdmission.encounter_id).filter(
+                            WardAdmission.encounter_id.isnot(None)
+                        ).all()]
+                        
+                        # Find OPD encounter with CCC for same patient today
+                        opd_query = db.query(Encounter).filter(
+                            Encounter.patient_id == patient_id,
+                            Encounter.id != notes_data.encounter_id,  # Different encounter
+                            Encounter.archived == False,
+                            Encounter.ccc_number.isnot(None),
+                            Encounter.ccc_number != "",
+                            func.date(Encounter.created_at) == today()
+                        )
+                        
+                        # Exclude IPD encounters (those with ward admissions)
+                        if ward_admission_encounter_ids:
+                            opd_query = opd_query.filter(~Encounter.id.in_(ward_admission_encounter_ids))
+                        
+                        opd_encounter_with_ccc = opd_query.first()
+                        
+                        if opd_encounter_with_ccc and opd_encounter_with_ccc.ccc_number:
+                            ccc_number = opd_encounter_with_ccc.ccc_number
+                    
+                    # Delete any unpaid bills from the cancelled admission's encounter
+                    # This ensures a fresh bill is created for readmission
+                    unpaid_bills = db.query(Bill).filter(
+                        Bill.encounter_id == notes_data.encounter_id,
+                        Bill.is_paid == False
+                    ).all()
+                    for bill in unpaid_bills:
+                        # Delete bill items first
+                        bill_items = db.query(BillItem).filter(BillItem.bill_id == bill.id).all()
+                        for item in bill_items:
+                            db.delete(item)
+                        db.delete(bill)
+                    
+                    # Delete the cancelled admission recommendation
+                    db.delete(existing_admission)
+                    db.flush()
+                    
+                    # Create a new encounter for this IPD admission (not reusing old OPD encounter)
+                    new_encounter = Encounter(
+                        patient_id=patient_id,
+                        department=notes_data.admission_ward,  # Use ward as department for IPD
+                        status=EncounterStatus.IN_CONSULTATION.value,
+                        ccc_number=ccc_number,
+                        created_by=current_user.id
+                    )
+                    db.add(new_encounter)
+                    db.flush()  # Get the new encounter ID
+                    
+                    # Create new admission recommendation with new encounter
+                    admission = AdmissionRecommendation(
+                        encounter_id=new_encounter.id,
+                        ward=notes_data.admission_ward,
+                        recommended_by=current_user.id
+                    )
+                    db.add(admission)
+                    # Update consultation notes to point to new encounter
+                    notes.encounter_id = new_encounter.id
+                    # Store new encounter_id for response query
+                    final_encounter_id = new_encounter.id
+                else:
+                    # Update existing non-cancelled admission
+                    existing_admission.ward = notes_data.admission_ward
+                    existing_admission.recommended_by = current_user.id
+                    existing_admission.updated_at = utcnow()
+                    final_encounter_id = notes_data.encounter_id
+            else:
+                admission = AdmissionRecommendation(
+                    encounter_id=notes_data.encounter_id,
+                    ward=notes_data.admission_ward,
+                    recommended_by=current_user.id
+                )
+                db.add(admission)
+                final_encounter_id = notes_data.encounter_id
+        db.commit()
+        db.refresh(notes)
+        # Serialize response properly - use the final encounter_id (may be new or old)
+        admission = db.query(AdmissionRecommendation).filter(AdmissionRecommendation.encounter_id == final_encounter_id).first()
+        return {
+            "id": notes.id,
+            "encounter_id": notes.encounter_id,
+            "presenting_complaints": notes.presenting_complaints,
+            "doctor_notes": notes.doctor_notes,
+            "follow_up_date": notes.follow_up_date.isoformat() if notes.follow_up_date else None,
+            "outcome": notes.outcome,
+            "admission_ward": (admission.ward if admission else None),
+            "created_at": notes.created_at,
+            "updated_at": notes.updated_at,
+        }
+
+
+# Doctor Note Entry endpoints
+class DoctorNoteEntryCreate(BaseModel):
+    """Doctor note entry creation model"""
+    encounter_id: int
+    notes: str
+
+
+class DoctorNoteEntryUpdate(BaseModel):
+    """Doctor note entry update model"""
+    notes: str
+
+
+class DoctorNoteEntryResponse(BaseModel):
+    """Doctor note entry response model"""
+    id: int
+    encounter_id: int
+    notes: str
+    created_by: int
+    created_by_name: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+@router.get("/encounters/{encounter_id}/doctor-notes", response_model=List[DoctorNoteEntryResponse])
+def get_doctor_note_entries(
+    encounter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all doctor note entries for an encounter"""
+    encounter = db.query(Encounter).filter(Encounter.id == encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    doctor_notes = db.query(DoctorNoteEntry).filter(
+        DoctorNoteEntry.encounter_id == encounter_id
+    ).order_by(DoctorNoteEntry.created_at.asc()).all()
+    
+    result = []
+    for note in doctor_notes:
+        creator = db.query(User).filter(User.id == note.created_by).first()
+        result.append({
+            "id": note.id,
+            "encounter_id": note.encounter_id,
+            "notes": note.notes,
+            "created_by": note.created_by,
+            "created_by_name": creator.full_name if creator else None,
+            "created_at": note.created_at,
+            "updated_at": note.updated_at,
+        })
+    
+    return result
+
+
+@router.get("/patients/{patient_id}/doctor-notes", response_model=List[dict])
+def get_patient_doctor_notes(
+    patient_id: int,
+    exclude_encounter_id: Optional[int] = Query(None, description="Exclude notes from this encounter (current encounter)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all doctor note entries for a patient across all encounters"""
+    # Verify patient exists
+    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    # Get all encounters for this patient
+    encounters_query = db.query(Encounter).filter(
+        Encounter.patient_id == patient_id,
+        Encounter.archived == False
+    )
+    
+    if exclude_encounter_id:
+        encounters_query = encounters_query.filter(Encounter.id != exclude_encounter_id)
+    
+    encounters = encounters_query.all()
+    
+    if not encounters:
+        return []
+    
+    encounter_ids = [enc.id for enc in encounters]
+    
+    # Get all doctor notes for these encounters
+    doctor_notes = db.query(DoctorNoteEntry).filter(
+        DoctorNoteEntry.encounter_id.in_(encounter_ids)
+    ).order_by(DoctorNoteEntry.created_at.desc()).all()
+    
+    # Encounters are already loaded; note authors come from one IN query
+    encounters_by_id = {enc.id: enc for enc in encounters}
+    names = user_names(db, (note.created_by for note in doctor_notes))
+    
+    result = []
+    for note in doctor_notes:
+        encounter = encounters_by_id.get(note.encounter_id)
+        
+        result.append({
+            "id": note.id,
+            "encounter_id": note.encounter_id,
+            "encounter_date": encounter.created_at if encounter else None,
+            "encounter_department": encounter.department if encounter else None,
+            "notes": note.notes,
+            "created_by": note.created_by,
+            "created_by_name": names.get(note.created_by),
+            "created_at": note.created_at,
+            "updated_at": note.updated_at,
+        })
+    
+    return result
+
+
+@router.post("/encounters/{encounter_id}/doctor-notes", response_model=DoctorNoteEntryResponse, status_code=status.HTTP_201_CREATED)
+def create_doctor_note_entry(
+    encounter_id: int,
+    note_data: DoctorNoteEntryCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Create a new doctor note entry for an encounter"""
+    encounter = db.query(Encounter).filter(Encounter.id == encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Check if encounter is finalized - cannot add notes to finalized encounters
+    if encounter.status == EncounterStatus.FINALIZED.value:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot add doctor notes to a finalized consultation"
+        )
+    
+    # Verify encounter_id matches
+    if note_data.encounter_id != encounter_id:
+        raise HTTPException(status_code=400, detail="Encounter ID mismatch")
+    
+    doctor_note = DoctorNoteEntry(
+        encounter_id=encounter_id,
+        notes=note_data.notes,
+        created_by=current_user.id
+    )
+    
+    db.add(doctor_note)
+    db.commit()
+    db.refresh(doctor_note)
+    
+    creator = db.query(User).filter(User.id == doctor_note.created_by).first()
+    return {
+        "id": doctor_note.id,
+        "encounter_id": doctor_note.encounter_id,
+        "notes": doctor_note.notes,
+        "created_by": doctor_note.created_by,
+        "created_by_name": creator.full_name if creator else None,
+        "created_at": doctor_note.created_at,
+        "updated_at": doctor_note.updated_at,
+    }
+
+
+# Consultation Template endpoints
+class ConsultationTemplateCreate(BaseModel):
+    """Consultation template creation model"""
+    name: str
+    description: Optional[str] = None
+    is_shared: bool = False
+    prescriptions: Optional[List[Dict[str, Any]]] = None  # List of prescription data
+    investigations: Optional[List[Dict[str, Any]]] = None  # List of investigation data
+
+
+class ConsultationTemplateUpdate(BaseModel):
+    """Consultation template update model"""
+    name: Optional[str] = None
+    description: Optional[str] = None
+    is_shared: Optional[bool] = None
+    prescriptions: Optional[List[Dict[str, Any]]] = None
+    investigations: Optional[List[Dict[str, Any]]] = None
+
+
+class ConsultationTemplateResponse(BaseModel):
+    """Consultation template response model"""
+    id: int
+    name: str
+    description: Optional[str] = None
+    created_by: int
+    created_by_name: Optional[str] = None
+    is_shared: bool
+    prescriptions: List[Dict[str, Any]] = []
+    investigations: List[Dict[str, Any]] = []
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+@router.get("/consultation-templates", response_model=List[ConsultationTemplateResponse])
+def get_consultation_templates(
+    include_shared: bool = Query(True, description="Include shared templates"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all consultation templates accessible to the user"""
+    if include_shared:
+        query = db.query(ConsultationTemplate).filter(
+            or_(
+                ConsultationTemplate.created_by == current_user.id,
+                ConsultationTemplate.is_shared == True
+            )
+        )
+    else:
+        query = db.query(ConsultationTemplate).filter(
+            ConsultationTemplate.created_by == current_user.id
+        )
+    
+    templates = query.order_by(ConsultationTemplate.created_at.desc()).all()
+    
+    result = []
+    for template in templates:
+        creator = db.query(User).filter(User.id == template.created_by).first()
+        result.append({
+            "id": template.id,
+            "name": template.name,
+            "description": template.description,
+            "created_by": template.created_by,
+            "created_by_name": creator.full_name if creator else None,
+            "is_shared": template.is_shared,
+            "prescriptions": template.get_prescriptions(),
+            "investigations": template.get_investigations(),
+            "created_at": template.created_at,
+            "updated_at": template.updated_at,
+        })
+    
+    return result
+
+
+@router.post("/consultation-templates", response_model=ConsultationTemplateResponse, status_code=status.HTTP_201_CREATED)
+def create_consultation_template(
+    template_data: ConsultationTemplateCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA"]))
+):
+    """Create a new consultation template"""
+    template = ConsultationTemplate(
+        name=template_data.name,
+        description=template_data.description,
+        created_by=current_user.id,
+        is_shared=template_data.is_shared,
+    )
+    template.set_prescriptions(template_data.prescriptions)
+    template.set_investigations(template_data.investigations)
+    
+    db.add(template)
+    db.commit()
+    db.refresh(template)
+    
+    creator = db.query(User).filter(User.id == template.created_by).first()
+    return {
+        "id": template.id,
+        "name": template.name,
+        "description": template.description,
+        "created_by": template.created_by,
+        "created_by_name": creator.full_name if creator else None,
+        "is_shared": template.is_shared,
+        "prescriptions": template.get_prescriptions(),
+        "investigations": template.get_investigations(),
+        "created_at": template.created_at,
+        "updated_at": template.updated_at,
+    }
+
+
+@router.put("/consultation-templates/{template_id}", response_model=ConsultationTemplateResponse)
+def update_consultation_template(
+    template_id: int,
+    template_data: ConsultationTemplateUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA"]))
+):
+    """Update a consultation template (only by creator or admin)"""
+    template = db.query(ConsultationTemplate).filter(ConsultationTemplate.id == template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    # Check if user is the creator (or admin)
+    if template.created_by != current_user.id and current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="You can only edit your own templates")
+    
+    if template_data.name is not None:
+        template.name = template_data.name
+    if template_data.description is not None:
+        template.description = template_data.description
+    if template_data.is_shared is not None:
+        template.is_shared = template_data.is_shared
+    if template_data.prescriptions is not None:
+        template.set_prescriptions(template_data.prescriptions)
+    if template_data.investigations is not None:
+        template.set_investigations(template_data.investigations)
+    
+    template.updated_at = utcnow()
+    db.commit()
+    db.refresh(template)
+    
+    creator = db.query(User).filter(User.id == template.created_by).first()
+    return {
+        "id": template.id,
+        "name": template.name,
+        "description": template.description,
+        "created_by": template.created_by,
+        "created_by_name": creator.full_name if creator else None,
+        "is_shared": template.is_shared,
+        "prescriptions": template.get_prescriptions(),
+        "investigations": template.get_investigations(),
+        "created_at": template.created_at,
+        "updated_at": template.updated_at,
+    }
+
+
+@router.delete("/consultation-templates/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_consultation_template(
+    template_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA"]))
+):
+    """Delete a consultation template (only by creator or admin)"""
+    template = db.query(ConsultationTemplate).filter(ConsultationTemplate.id == template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    # Check if user is the creator (or admin)
+    if template.created_by != current_user.id and current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="You can only delete your own templates")
+    
+    db.delete(template)
+    db.commit()
+    return None
+
+
+@router.get("/consultation-templates/{template_id}", response_model=ConsultationTemplateResponse)
+def get_consultation_template(
+    template_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a specific consultation template"""
+    template = db.query(ConsultationTemplate).filter(ConsultationTemplate.id == template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    
+    # Check if user has access (creator or shared template)
+    if template.created_by != current_user.id and not template.is_shared:
+        raise HTTPException(status_code=403, detail="You don't have access to this template")
+    
+    creator = db.query(User).filter(User.id == template.created_by).first()
+    return {
+        "id": template.id,
+        "name": template.name,
+        "description": template.description,
+        "created_by": template.created_by,
+        "created_by_name": creator.full_name if creator else None,
+        "is_shared": template.is_shared,
+        "prescriptions": template.get_prescriptions(),
+        "investigations": template.get_investigations(),
+        "created_at": template.created_at,
+        "updated_at": template.updated_at,
+    }
+
+
+@router.put("/doctor-notes/{note_id}", response_model=DoctorNoteEntryResponse)
+def update_doctor_note_entry(
+    note_id: int,
+    note_data: DoctorNoteEntryUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Update a doctor note entry (only by the creator)"""
+    doctor_note = db.query(DoctorNoteEntry).filter(DoctorNoteEntry.id == note_id).first()
+    if not doctor_note:
+        raise HTTPException(status_code=404, detail="Doctor note entry not found")
+    
+    # Check if user is the creator (or admin)
+    if doctor_note.created_by != current_user.id and current_user.role != "Admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You can only update your own doctor notes"
+        )
+    
+    # Check if encounter is finalized
+    encounter = db.query(Encounter).filter(Encounter.id == doctor_note.encounter_id).first()
+    if encounter and encounter.status == EncounterStatus.FINALIZED.value:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot update doctor notes for a finalized consultation"
+        )
+    
+    doctor_note.notes = note_data.notes
+    doctor_note.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(doctor_note)
+    
+    creator = db.query(User).filter(User.id == doctor_note.created_by).first()
+    return {
+        "id": doctor_note.id,
+        "encounter_id": doctor_note.encounter_id,
+        "notes": doctor_note.notes,
+        "created_by": doctor_note.created_by,
+        "created_by_name": creator.full_name if creator else None,
+        "created_at": doctor_note.created_at,
+        "updated_at": doctor_note.updated_at,
+    }
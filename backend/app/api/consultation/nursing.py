@@ -0,0 +1,508 @@
+"""
+Consultation: admission notes, nurse notes, mid documentations and inpatient vitals
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role
+from app.models.user import User
+from app.models.ward_admission import WardAdmission
+from app.models.nurse_note import NurseNote
+from app.models.nurse_mid_documentation import NurseMidDocumentation
+from app.models.inpatient_vital import InpatientVital
+
+router = APIRouter()
+
+
+class UpdateAdmissionNotesRequest(BaseModel):
+    notes: Optional[str] = None
+
+
+@router.put("/ward-admissions/{ward_admission_id}/admission-notes")
+def update_admission_notes(
+    ward_admission_id: int,
+    request: UpdateAdmissionNotesRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Update admission notes"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot update notes for discharged patient")
+    
+    ward_admission.admission_notes = request.notes
+    ward_admission.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(ward_admission)
+    
+    return {
+        "id": ward_admission.id,
+        "admission_notes": ward_admission.admission_notes,
+        "message": "Admission notes updated successfully"
+    }
+
+
+# Nurse Notes endpoints
+class CreateNurseNoteRequest(BaseModel):
+    notes: str
+
+
+@router.post("/ward-admissions/{ward_admission_id}/nurse-notes")
+def create_nurse_note(
+    ward_admission_id: int,
+    request: CreateNurseNoteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Create a new nurse note"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot add notes for discharged patient")
+    
+    nurse_note = NurseNote(
+        ward_admission_id=ward_admission_id,
+        notes=request.notes,
+        created_by=current_user.id
+    )
+    
+    db.add(nurse_note)
+    db.commit()
+    db.refresh(nurse_note)
+    
+    return {
+        "id": nurse_note.id,
+        "ward_admission_id": nurse_note.ward_admission_id,
+        "notes": nurse_note.notes,
+        "created_by": nurse_note.created_by,
+        "created_at": nurse_note.created_at,
+        "message": "Nurse note created successfully"
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/nurse-notes")
+def get_nurse_notes(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all nurse notes for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    nurse_notes = db.query(NurseNote).filter(
+        NurseNote.ward_admission_id == ward_admission_id
+    ).order_by(NurseNote.created_at.desc()).all()
+    
+    result = []
+    for note in nurse_notes:
+        creator = db.query(User).filter(User.id == note.created_by).first()
+        strikethrough_by_user = None
+        if note.strikethrough_by:
+            strikethrough_by_user = db.query(User).filter(User.id == note.strikethrough_by).first()
+        
+        result.append({
+            "id": note.id,
+            "notes": note.notes,
+            "created_by": note.created_by,
+            "created_by_name": creator.full_name if creator else None,
+            "created_at": note.created_at,
+            "strikethrough": note.strikethrough,
+            "strikethrough_by": note.strikethrough_by,
+            "strikethrough_by_name": strikethrough_by_user.full_name if strikethrough_by_user else None,
+            "strikethrough_at": note.strikethrough_at,
+        })
+    
+    return result
+
+
+# Nurse Mid Documentation endpoints
+class CreateNurseMidDocumentationRequest(BaseModel):
+    patient_problems_diagnosis: Optional[str] = None
+    aim_of_care: Optional[str] = None
+    nursing_assessment: Optional[str] = None
+    nursing_orders: Optional[str] = None
+    nursing_intervention: Optional[str] = None
+    evaluation: Optional[str] = None
+    documentation: Optional[str] = None  # Keep for backward compatibility
+
+
+@router.post("/ward-admissions/{ward_admission_id}/nurse-mid-documentations")
+def create_nurse_mid_documentation(
+    ward_admission_id: int,
+    request: CreateNurseMidDocumentationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Create a new nurse mid documentation"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot add documentation for discharged patient")
+    
+    nurse_mid_doc = NurseMidDocumentation(
+        ward_admission_id=ward_admission_id,
+        patient_problems_diagnosis=request.patient_problems_diagnosis,
+        aim_of_care=request.aim_of_care,
+        nursing_assessment=request.nursing_assessment,
+        nursing_orders=request.nursing_orders,
+        nursing_intervention=request.nursing_intervention,
+        evaluation=request.evaluation,
+        documentation=request.documentation,  # For backward compatibility
+        created_by=current_user.id
+    )
+    
+    db.add(nurse_mid_doc)
+    db.commit()
+    db.refresh(nurse_mid_doc)
+    
+    return {
+        "id": nurse_mid_doc.id,
+        "ward_admission_id": nurse_mid_doc.ward_admission_id,
+        "patient_problems_diagnosis": nurse_mid_doc.patient_problems_diagnosis,
+        "aim_of_care": nurse_mid_doc.aim_of_care,
+        "nursing_assessment": nurse_mid_doc.nursing_assessment,
+        "nursing_orders": nurse_mid_doc.nursing_orders,
+        "nursing_intervention": nurse_mid_doc.nursing_intervention,
+        "evaluation": nurse_mid_doc.evaluation,
+        "documentation": nurse_mid_doc.documentation,  # For backward compatibility
+        "created_by": nurse_mid_doc.created_by,
+        "created_at": nurse_mid_doc.created_at,
+        "message": "Nurse mid documentation created successfully"
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/nurse-mid-documentations")
+def get_nurse_mid_documentations(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all nurse mid documentations for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    nurse_mid_docs = db.query(NurseMidDocumentation).filter(
+        NurseMidDocumentation.ward_admission_id == ward_admission_id
+    ).order_by(NurseMidDocumentation.created_at.desc()).all()
+    
+    result = []
+    for doc in nurse_mid_docs:
+        creator = db.query(User).filter(User.id == doc.created_by).first()
+        result.append({
+            "id": doc.id,
+            "patient_problems_diagnosis": doc.patient_problems_diagnosis,
+            "aim_of_care": doc.aim_of_care,
+            "nursing_assessment": doc.nursing_assessment,
+            "nursing_orders": doc.nursing_orders,
+            "nursing_intervention": doc.nursing_intervention,
+            "evaluation": doc.evaluation,
+            "documentation": doc.documentation,  # For backward compatibility
+            "created_by": doc.created_by,
+            "created_by_name": creator.full_name if creator else None,
+            "created_at": doc.created_at,
+        })
+    
+    return result
+
+
+@router.put("/ward-admissions/{ward_admission_id}/nurse-mid-documentations/{documentation_id}")
+def update_nurse_mid_documentation(
+    ward_admission_id: int,
+    documentation_id: int,
+    request: CreateNurseMidDocumentationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Update a nurse mid documentation"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    nurse_mid_doc = db.query(NurseMidDocumentation).filter(
+        NurseMidDocumentation.id == documentation_id,
+        NurseMidDocumentation.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not nurse_mid_doc:
+        raise HTTPException(status_code=404, detail="Nurse mid documentation not found")
+    
+    # Check permissions: user can edit their own documentation, admin and doctor can edit any
+    if current_user.role not in ["Admin"] and nurse_mid_doc.created_by != current_user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="You can only edit your own documentation. Admin can edit any documentation."
+        )
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot edit documentation for discharged patient")
+    
+    # Update fields
+    nurse_mid_doc.patient_problems_diagnosis = request.patient_problems_diagnosis
+    nurse_mid_doc.aim_of_care = request.aim_of_care
+    nurse_mid_doc.nursing_assessment = request.nursing_assessment
+    nurse_mid_doc.nursing_orders = request.nursing_orders
+    nurse_mid_doc.nursing_intervention = request.nursing_intervention
+    nurse_mid_doc.evaluation = request.evaluation
+    nurse_mid_doc.documentation = request.documentation  # For backward compatibility
+    
+    db.commit()
+    db.refresh(nurse_mid_doc)
+    
+    return {
+        "id": nurse_mid_doc.id,
+        "ward_admission_id": nurse_mid_doc.ward_admission_id,
+        "patient_problems_diagnosis": nurse_mid_doc.patient_problems_diagnosis,
+        "aim_of_care": nurse_mid_doc.aim_of_care,
+        "nursing_assessment": nurse_mid_doc.nursing_assessment,
+        "nursing_orders": nurse_mid_doc.nursing_orders,
+        "nursing_intervention": nurse_mid_doc.nursing_intervention,
+        "evaluation": nurse_mid_doc.evaluation,
+        "documentation": nurse_mid_doc.documentation,  # For backward compatibility
+        "created_by": nurse_mid_doc.created_by,
+        "created_at": nurse_mid_doc.created_at,
+        "message": "Nurse mid documentation updated successfully"
+    }
+
+
+# Inpatient Vitals endpoints
+class CreateInpatientVitalRequest(BaseModel):
+    temperature: Optional[float] = None
+    blood_pressure_systolic: Optional[int] = None
+    blood_pressure_diastolic: Optional[int] = None
+    pulse: Optional[int] = None
+    respiratory_rate: Optional[int] = None
+    oxygen_saturation: Optional[float] = None
+    weight: Optional[float] = None
+    height: Optional[float] = None
+    notes: Optional[str] = None
+
+
+@router.post("/ward-admissions/{ward_admission_id}/vitals")
+def create_inpatient_vital(
+    ward_admission_id: int,
+    request: CreateInpatientVitalRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Create a new vital record for an inpatient"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot add vitals for discharged patient")
+    
+    # Calculate BMI if weight and height are provided
+    bmi = None
+    if request.weight and request.height and request.height > 0:
+        bmi = request.weight / ((request.height / 100) ** 2)
+    
+    vital = InpatientVital(
+        ward_admission_id=ward_admission_id,
+        temperature=request.temperature,
+        blood_pressure_systolic=request.blood_pressure_systolic,
+        blood_pressure_diastolic=request.blood_pressure_diastolic,
+        pulse=request.pulse,
+        respiratory_rate=request.respiratory_rate,
+        oxygen_saturation=request.oxygen_saturation,
+        weight=request.weight,
+        height=request.height,
+        bmi=bmi,
+        notes=request.notes,
+        recorded_by=current_user.id
+    )
+    
+    db.add(vital)
+    db.commit()
+    db.refresh(vital)
+    
+    return {
+        "id": vital.id,
+        "ward_admission_id": vital.ward_admission_id,
+        "temperature": vital.temperature,
+        "blood_pressure_systolic": vital.blood_pressure_systolic,
+        "blood_pressure_diastolic": vital.blood_pressure_diastolic,
+        "pulse": vital.pulse,
+        "respiratory_rate": vital.respiratory_rate,
+        "oxygen_saturation": vital.oxygen_saturation,
+        "weight": vital.weight,
+        "height": vital.height,
+        "bmi": vital.bmi,
+        "notes": vital.notes,
+        "recorded_by": vital.recorded_by,
+        "recorded_at": vital.recorded_at,
+        "message": "Vital record created successfully"
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/vitals")
+def get_inpatient_vitals(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all vital records for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    vitals = db.query(InpatientVital).filter(
+        InpatientVital.ward_admission_id == ward_admission_id
+    ).order_by(InpatientVital.recorded_at.desc()).all()
+    
+    result = []
+    for vital in vitals:
+        recorder = db.query(User).filter(User.id == vital.recorded_by).first()
+        result.append({
+            "id": vital.id,
+            "temperature": vital.temperature,
+            "blood_pressure_systolic": vital.blood_pressure_systolic,
+            "blood_pressure_diastolic": vital.blood_pressure_diastolic,
+            "pulse": vital.pulse,
+            "respiratory_rate": vital.respiratory_rate,
+            "oxygen_saturation": vital.oxygen_saturation,
+            "weight": vital.weight,
+            "height": vital.height,
+            "bmi": vital.bmi,
+            "notes": vital.notes,
+            "recorded_by": vital.recorded_by,
+            "recorded_by_name": recorder.full_name if recorder else None,
+            "recorded_at": vital.recorded_at,
+        })
+    
+    return result
+
+
+@router.put("/ward-admissions/{ward_admission_id}/vitals/{vital_id}")
+def update_inpatient_vital(
+    ward_admission_id: int,
+    vital_id: int,
+    request: CreateInpatientVitalRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Update a vital record for an inpatient"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    vital = db.query(InpatientVital).filter(
+        InpatientVital.id == vital_id,
+        InpatientVital.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not vital:
+        raise HTTPException(status_code=404, detail="Vital record not found")
+    
+    # Check permissions: user can edit their own vital, admin can edit any
+    if current_user.role != "Admin" and vital.recorded_by != current_user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="You can only edit your own vital record. Admin can edit any record."
+        )
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot edit vital record for discharged patient")
+    
+    # Calculate BMI if weight and height are provided
+    bmi = None
+    if request.weight and request.height and request.height > 0:
+        bmi = request.weight / ((request.height / 100) ** 2)
+    
+    # Update vital fields
+    vital.temperature = request.temperature
+    vital.blood_pressure_systolic = request.blood_pressure_systolic
+    vital.blood_pressure_diastolic = request.blood_pressure_diastolic
+    vital.pulse = request.pulse
+    vital.respiratory_rate = request.respiratory_rate
+    vital.oxygen_saturation = request.oxygen_saturation
+    vital.weight = request.weight
+    vital.height = request.height
+    vital.bmi = bmi
+    vital.notes = request.notes
+    
+    db.commit()
+    db.refresh(vital)
+    
+    recorder = db.query(User).filter(User.id == vital.recorded_by).first()
+    
+    return {
+        "id": vital.id,
+        "ward_admission_id": vital.ward_admission_id,
+        "temperature": vital.temperature,
+        "blood_pressure_systolic": vital.blood_pressure_systolic,
+        "blood_pressure_diastolic": vital.blood_pressure_diastolic,
+        "pulse": vital.pulse,
+        "respiratory_rate": vital.respiratory_rate,
+        "oxygen_saturation": vital.oxygen_saturation,
+        "weight": vital.weight,
+        "height": vital.height,
+        "bmi": vital.bmi,
+        "notes": vital.notes,
+        "recorded_by": vital.recorded_by,
+        "recorded_by_name": recorder.full_name if recorder else None,
+        "recorded_at": vital.recorded_at,
+        "message": "Vital record updated successfully"
+    }
+
+
+@router.put("/ward-admissions/{ward_admission_id}/nurse-notes/{note_id}/strikethrough")
+def toggle_nurse_note_strikethrough(
+    ward_admission_id: int,
+    note_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Toggle strikethrough status of a nurse note"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    nurse_note = db.query(NurseNote).filter(
+        NurseNote.id == note_id,
+        NurseNote.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not nurse_note:
+        raise HTTPException(status_code=404, detail="Nurse note not found")
+    
+    # Check permissions: user can strikethrough their own notes, admin can strikethrough any
+    if current_user.role != "Admin" and nurse_note.created_by != current_user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="You can only strikethrough your own notes. Admin can strikethrough any note."
+        )
+    
+    # Toggle strikethrough status
+    if nurse_note.strikethrough == 0:
+        nurse_note.strikethrough = 1
+        nurse_note.strikethrough_by = current_user.id
+        nurse_note.strikethrough_at = utcnow()
+    else:
+        nurse_note.strikethrough = 0
+        nurse_note.strikethrough_by = None
+        nurse_note.strikethrough_at = None
+    
+    nurse_note.updated_at = utcnow()
+    db.commit()
+    db.refresh(nurse_note)
+    
+    return {
+        "id": nurse_note.id,
+        "strikethrough": nurse_note.strikethrough,
+        "message": "Nurse note strikethrough status updated successfully"
+    }
@@ -0,0 +1,936 @@
+"""
+Consultation: OPD prescriptions - prescribing, direct prescriptions, pharmacy confirm / dispense / return
+"""
+import random
+import time
+import re
+import logging
+from typing import Optional, List
+from datetime import datetime, date
+from fastapi import APIRouter, Depends, HTTPException, status, Body
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow, today
+from app.core.dependencies import require_role, get_current_user
+from app.models.user import User
+from app.models.encounter import Encounter, EncounterStatus
+from app.models.prescription import Prescription
+from app.models.patient import Patient
+from app.models.bill import Bill, BillItem, Receipt, ReceiptItem
+from app.models.ward_admission import WardAdmission
+from app.services.price_list_service_v2 import get_price_from_all_tables
+from app.utils.card_number import generate_card_number
+from app.api.consultation.common import FREQUENCY_MAPPING, PrescriptionDispense
+
+router = APIRouter()
+
+
+# Prescription schemas
+class PrescriptionCreate(BaseModel):
+    """Prescription creation model"""
+    encounter_id: int
+    medicine_code: str
+    medicine_name: str
+    dose: Optional[str] = None  # Numeric dose value (e.g., "500")
+    unit: Optional[str] = None  # Unit of dose (e.g., "MG", "ML", "TAB")
+    frequency: Optional[str] = None  # Frequency label (e.g., "BDS", "TDS", "OD")
+    frequency_value: Optional[int] = None  # Numeric frequency value (e.g., 2 for BDS)
+    duration: Optional[str] = None  # Duration (e.g., "7 DAYS")
+    instructions: Optional[str] = None  # Instructions for the drug
+    quantity: Optional[int] = None  # Auto-calculated: dose * frequency_value * duration
+    unparsed: Optional[str] = None
+    is_external: Optional[bool] = False  # True if prescription is to be filled outside (external pharmacy)
+
+
+class PrescriptionResponse(BaseModel):
+    """Prescription response model"""
+    id: int
+    encounter_id: int
+    medicine_code: str
+    medicine_name: str
+    dose: Optional[str]
+    unit: Optional[str] = None
+    frequency: Optional[str]
+    frequency_value: Optional[int] = None
+    duration: Optional[str]
+    instructions: Optional[str] = None
+    quantity: int
+    unparsed: Optional[str] = None
+    prescribed_by: int
+    is_external: bool = False
+    prescriber_name: Optional[str] = None  # Full name of the prescriber
+    prescriber_role: Optional[str] = None  # Role of the prescriber
+    confirmed_by: Optional[int] = None
+    dispensed_by: Optional[int] = None
+    dispenser_name: Optional[str] = None  # Full name of the dispenser
+    confirmed_at: Optional[datetime] = None
+    service_date: datetime
+    created_at: datetime
+    is_dispensed: bool = False
+    is_confirmed: bool = False
+    patient_card_number: Optional[str] = None  # For direct prescriptions - card number of newly created patient
+    
+    class Config:
+        from_attributes = True
+    
+    @classmethod
+    def from_orm(cls, obj):
+        """Custom from_orm to add is_dispensed and is_confirmed computed fields"""
+        # Handle cases where confirmed_by and confirmed_at might not exist in old database records
+        confirmed_by = getattr(obj, 'confirmed_by', None)
+        confirmed_at = getattr(obj, 'confirmed_at', None)
+        dispensed_by = getattr(obj, 'dispensed_by', None)
+        unit = getattr(obj, 'unit', None)
+        frequency_value = getattr(obj, 'frequency_value', None)
+        instructions = getattr(obj, 'instructions', None)
+        
+        data = {
+            "id": obj.id,
+            "encounter_id": obj.encounter_id,
+            "medicine_code": obj.medicine_code,
+            "medicine_name": obj.medicine_name,
+            "dose": obj.dose,
+            "unit": unit,
+            "frequency": obj.frequency,
+            "frequency_value": frequency_value,
+            "duration": obj.duration,
+            "instructions": instructions,
+            "quantity": obj.quantity,
+            "unparsed": obj.unparsed,
+            "prescribed_by": obj.prescribed_by,
+            "confirmed_by": confirmed_by,
+            "dispensed_by": dispensed_by,
+            "confirmed_at": confirmed_at,
+            "service_date": obj.service_date,
+            "created_at": obj.created_at,
+            "is_dispensed": dispensed_by is not None,
+            "is_confirmed": confirmed_by is not None,
+        }
+        return cls(**data)
+
+
+class DirectPrescriptionCreate(BaseModel):
+    """Direct prescription creation model (walk-in, no consultation)"""
+    medicine_code: str
+    medicine_name: str
+    dose: Optional[str] = None
+    unit: Optional[str] = None
+    frequency: Optional[str] = None
+    frequency_value: Optional[int] = None
+    duration: Optional[str] = None
+    instructions: Optional[str] = None
+    quantity: Optional[int] = None
+    unparsed: Optional[str] = None
+    # Patient identification - either patient_id, patient_card_number, or patient details
+    patient_id: Optional[int] = None
+    patient_card_number: Optional[str] = None
+    patient_name: Optional[str] = None  # Full name (first + last + other)
+    patient_phone: Optional[str] = None
+    patient_age: Optional[int] = None
+    patient_dob: Optional[str] = None  # Date of birth (YYYY-MM-DD)
+    patient_gender: Optional[str] = None
+    is_direct_service: Optional[bool] = True  # Always True for direct prescriptions
+
+
+@router.post("/prescription/direct", response_model=PrescriptionResponse, status_code=status.HTTP_201_CREATED)
+def create_direct_prescription(
+    prescription_data: DirectPrescriptionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Create a direct prescription (walk-in, no consultation). Always uses base_rate pricing (no co-payment)."""
+    # Get or create patient
+    patient = None
+    if prescription_data.patient_id:
+        patient = db.query(Patient).filter(Patient.id == prescription_data.patient_id).first()
+    elif prescription_data.patient_card_number:
+        patient = db.query(Patient).filter(Patient.card_number == prescription_data.patient_card_number).first()
+    elif prescription_data.patient_name and prescription_data.patient_phone:
+        # Patient without card number - create a temporary patient record
+        # Parse patient name (first name, last name, other names)
+        name_parts = prescription_data.patient_name.strip().split()
+        first_name = name_parts[0] if name_parts else ""
+        last_name = name_parts[1] if len(name_parts) > 1 else ""
+        other_names = " ".join(name_parts[2:]) if len(name_parts) > 2 else ""
+        
+        # Calculate date of birth
+        date_of_birth = None
+        if prescription_data.patient_dob:
+            try:
+                date_of_birth = datetime.strptime(prescription_data.patient_dob, "%Y-%m-%d").date()
+            except ValueError:
+                pass
+        elif prescription_data.patient_age:
+            # Calculate approximate DOB from age
+            today_date = today()
+            birth_year = today_date.year - prescription_data.patient_age
+            date_of_birth = date(birth_year, 1, 1)  # Use January 1st as approximate DOB
+        
+        # Generate a card number for the new patient
+        card_number = generate_card_number(db)
+        
+        # Create new patient record
+        patient = Patient(
+            name=first_name,
+            surname=last_name,
+            other_names=other_names if other_names else None,
+            gender=prescription_data.patient_gender or "Other",
+            age=prescription_data.patient_age,
+            date_of_birth=date_of_birth,
+            card_number=card_number,
+            contact=prescription_data.patient_phone,
+            insured=False,  # Direct prescriptions are always cash (base_rate)
+            ccc_number=None
+        )
+        db.add(patient)
+        db.flush()  # Get patient ID without committing yet
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="For direct prescriptions, provide either: (1) patient_id, (2) patient_card_number, or (3) patient_name and patient_phone"
+        )
+    
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found or could not be created")
+    
+    # Check if there's an existing unpaid direct service encounter for this patient
+    # Reuse it to group all prescriptions together
+    encounter = db.query(Encounter).filter(
+        Encounter.patient_id == patient.id,
+        Encounter.department == "Direct Service",
+        Encounter.status == EncounterStatus.DRAFT.value
+    ).order_by(Encounter.created_at.desc()).first()
+    
+    # If no existing encounter, create a new one
+    if not encounter:
+        encounter = Encounter(
+            patient_id=patient.id,
+            department="Direct Service",  # Mark as direct service
+            status=EncounterStatus.DRAFT.value,  # Draft status for direct services
+            ccc_number=None,  # Direct prescriptions are always cash (no insurance)
+            created_by=current_user.id
+        )
+        db.add(encounter)
+        db.flush()  # Get encounter ID without committing yet
+    
+    # Get frequency value from mapping if frequency is provided
+    frequency_value = None
+    if prescription_data.frequency:
+        frequency_value = FREQUENCY_MAPPING.get(prescription_data.frequency.strip(), None)
+    
+    # Auto-calculate quantity if not provided
+    quantity = prescription_data.quantity
+    if (not quantity or quantity <= 0) and prescription_data.dose and frequency_value and prescription_data.duration:
+        try:
+            dose_num = float(prescription_data.dose)
+            if dose_num > 0:
+                # Extract duration number
+                duration_str = prescription_data.duration.strip() if prescription_data.duration else ""
+                duration_num = 1
+                if duration_str:
+                    try:
+                        direct_num = float(duration_str)
+                        if direct_num > 0:
+                            duration_num = int(direct_num)
+                    except ValueError:
+                        duration_match = re.search(r'\d+', duration_str)
+                        if duration_match:
+                            duration_num = int(duration_match.group())
+                
+                # Convert dose to units based on unit type
+                units_per_dose = dose_num
+                unit = prescription_data.unit.strip().upper() if prescription_data.unit else ""
+                if unit == "MG":
+                    units_per_dose = dose_num / 100.0
+                elif unit == "MCG":
+                    units_per_dose = dose_num / 1000.0
+                
+                # Calculate: units per dose × frequency per day × number of days
+                calculated_quantity = int(units_per_dose * frequency_value * duration_num)
+                if calculated_quantity > 0:
+                    quantity = calculated_quantity
+        except (ValueError, TypeError):
+            pass
+    
+    # Ensure quantity is set
+    if not quantity or quantity <= 0:
+        quantity = 1
+    
+    # Create prescription
+    prescription_dict = {
+        'encounter_id': encounter.id,
+        'medicine_code': prescription_data.medicine_code,
+        'medicine_name': prescription_data.medicine_name,
+        'dose': prescription_data.dose,
+        'unit': prescription_data.unit,
+        'frequency': prescription_data.frequency,
+        'frequency_value': frequency_value,
+        'duration': prescription_data.duration,
+        'instructions': prescription_data.instructions,
+        'quantity': quantity,
+        'unparsed': prescription_data.unparsed,
+        'is_external': 0,  # Not external, will be dispensed here
+    }
+    
+    prescription = Prescription(**prescription_dict, prescribed_by=current_user.id)
+    db.add(prescription)
+    db.flush()  # Get prescription ID
+    
+    # Auto-confirm direct prescriptions (client pays first, then dispensed later)
+    # Direct prescriptions are always base_rate (no co-payment)
+    is_insured = False  # Always False for direct prescriptions
+    unit_price = get_price_from_all_tables(db, prescription.medicine_code, is_insured)
+    
+    # Auto-confirm (but NOT auto-dispense - client must pay first)
+    prescription.confirmed_by = current_user.id
+    prescription.confirmed_at = utcnow()
+    
+    # Create bill item for the prescription (base_rate pricing)
+    # Find or create an unpaid bill for this encounter
+    existing_bill = db.query(Bill).filter(
+        Bill.encounter_id == encounter.id,
+        Bill.is_paid == False
+    ).first()
+    
+    if not existing_bill:
+        # Generate unique bill number
+        max_attempts = 100
+        bill_number = None
+        for _ in range(max_attempts):
+            candidate = f"BILL-{random.randint(100000, 999999)}"
+            existing_bill_check = db.query(Bill).filter(
+                Bill.bill_number == candidate
+            ).first()
+            if not existing_bill_check:
+                bill_number = candidate
+                break
+        
+        if not bill_number:
+            # Fallback: use timestamp-based approach
+            timestamp = int(time.time() * 1000) % 1000000
+            bill_number = f"BILL-{timestamp:06d}"
+        
+        bill = Bill(
+            encounter_id=encounter.id,
+            bill_number=bill_number,
+            total_amount=0.0,  # Will be calculated from items
+            is_paid=False,
+            created_by=current_user.id
+        )
+        db.add(bill)
+        db.flush()
+    else:
+        bill = existing_bill
+    
+    # Add prescription as bill item
+    total_price = unit_price * prescription.quantity
+    bill_item = BillItem(
+        bill_id=bill.id,
+        item_name=prescription.medicine_name,
+        item_code=prescription.medicine_code,
+        category="product",  # Pharmacy items are products
+        quantity=prescription.quantity,
+        unit_price=unit_price,
+        total_price=total_price
+    )
+    db.add(bill_item)
+    
+    # Update bill total
+    bill.total_amount = (bill.total_amount or 0.0) + total_price
+    
+    db.commit()
+    db.refresh(prescription)
+    
+    # Return prescription with patient card number if it was newly created
+    response = add_prescriber_info_to_response(prescription, db)
+    
+    # Add patient card number to response if patient was newly created
+    if patient and not prescription_data.patient_id and not prescription_data.patient_card_number:
+        # Patient was newly created, include card number in response
+        # Update the response object directly
+        response.patient_card_number = patient.card_number
+    
+    return response
+
+
+def add_prescriber_info_to_response(prescription, db: Session) -> PrescriptionResponse:
+    """Helper function to add prescriber and dispenser information to a prescription response"""
+    # Get prescriber information (handle missing user gracefully)
+    prescriber_name = None
+    prescriber_role = None
+    try:
+        prescriber = db.query(User).filter(User.id == prescription.prescribed_by).first()
+        if prescriber:
+            prescriber_name = prescriber.full_name
+            prescriber_role = prescriber.role
+    except Exception as e:
+        logger = logging.getLogger(__name__)
+        logger.warning(f"Could not load prescriber info for prescription {prescription.id}: {str(e)}")
+    
+    # Get dispenser information (handle missing user gracefully)
+    dispenser_name = None
+    try:
+        if prescription.dispensed_by:
+            dispenser = db.query(User).filter(User.id == prescription.dispensed_by).first()
+            if dispenser:
+                dispenser_name = dispenser.full_name
+    except Exception as e:
+        logger = logging.getLogger(__name__)
+        logger.warning(f"Could not load dispenser info for prescription {prescription.id}: {str(e)}")
+    
+    # Create response with prescriber details
+    # Convert is_external from integer (0/1) to boolean
+    is_external = bool(prescription.is_external) if hasattr(prescription, 'is_external') else False
+    
+    # Compute is_confirmed and is_dispensed from confirmed_by and dispensed_by
+    is_confirmed = prescription.confirmed_by is not None
+    is_dispensed = prescription.dispensed_by is not None
+    
+    prescription_dict = {
+        'id': prescription.id,
+        'encounter_id': prescription.encounter_id,
+        'medicine_code': prescription.medicine_code,
+        'medicine_name': prescription.medicine_name,
+        'dose': prescription.dose,
+        'unit': prescription.unit,
+        'frequency': prescription.frequency,
+        'frequency_value': prescription.frequency_value,
+        'duration': prescription.duration,
+        'instructions': prescription.instructions,
+        'quantity': prescription.quantity,
+        'unparsed': prescription.unparsed,
+        'prescribed_by': prescription.prescribed_by,
+        'is_external': is_external,
+        'prescriber_name': prescriber_name,
+        'prescriber_role': prescriber_role,
+        'confirmed_by': prescription.confirmed_by,
+        'dispensed_by': prescription.dispensed_by,
+        'dispenser_name': dispenser_name,
+        'confirmed_at': prescription.confirmed_at,
+        'service_date': prescription.service_date,
+        'created_at': prescription.created_at,
+        'is_confirmed': is_confirmed,
+        'is_dispensed': is_dispensed,
+    }
+    return PrescriptionResponse(**prescription_dict)
+
+
+@router.get("/prescription/encounter/{encounter_id}", response_model=List[PrescriptionResponse])
+def get_prescriptions(
+    encounter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all prescriptions for an encounter (works even if encounter is archived)"""
+    # Verify encounter exists (but don't require it to be non-archived - prescriptions should still be accessible)
+    encounter = db.query(Encounter).filter(Encounter.id == encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Query prescriptions with prescriber information, ordered by creation time
+    # Don't filter by archived status - prescriptions should be accessible even if encounter is archived
+    prescriptions = db.query(Prescription).filter(
+        Prescription.encounter_id == encounter_id
+    ).order_by(Prescription.created_at.desc()).all()
+    
+    result = []
+    for p in prescriptions:
+        result.append(add_prescriber_info_to_response(p, db))
+    
+    return result
+
+
+@router.get("/prescription/patient/{card_number}/encounter/{encounter_id}", response_model=List[PrescriptionResponse])
+def get_prescriptions_by_patient_card(
+    card_number: str,
+    encounter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get prescriptions for a patient (by card number) for a specific encounter"""
+    # Verify patient exists
+    patient = db.query(Patient).filter(Patient.card_number == card_number).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    # Verify encounter belongs to patient (include archived encounters - they may still have prescriptions to dispense)
+    encounter = db.query(Encounter).filter(
+        Encounter.id == encounter_id,
+        Encounter.patient_id == patient.id
+    ).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found or does not belong to this patient")
+    
+    # Get prescriptions for the encounter with prescriber information
+    # Don't filter by archived status - prescriptions should be accessible even if encounter is archived
+    prescriptions = db.query(Prescription).filter(Prescription.encounter_id == encounter_id).order_by(Prescription.created_at.desc()).all()
+    
+    result = []
+    for p in prescriptions:
+        result.append(add_prescriber_info_to_response(p, db))
+    
+    return result
+
+
+@router.put("/prescription/{prescription_id}/dispense", response_model=PrescriptionResponse)
+def dispense_prescription(
+    prescription_id: int,
+    dispense_data: Optional[PrescriptionDispense] = Body(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Mark a prescription as dispensed - only allowed if bill is paid or bill amount is 0 (except for inpatients)"""
+    prescription = db.query(Prescription).filter(Prescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    if prescription.dispensed_by is not None:
+        raise HTTPException(status_code=400, detail="Prescription has already been dispensed")
+    
+    if prescription.confirmed_by is None:
+        raise HTTPException(status_code=400, detail="Prescription must be confirmed before dispense")
+    
+    # Check if this is an inpatient prescription (encounter is linked to a ward admission)
+    is_inpatient = db.query(WardAdmission).filter(
+        WardAdmission.encounter_id == prescription.encounter_id
+    ).first() is not None
+    
+    # For inpatients, skip payment check - medications are added to IPD bills and paid at discharge
+    if not is_inpatient:
+        # Check if bill for this prescription is paid or amount is 0
+        # Find the bill item for this prescription
+        bill_item = db.query(BillItem).filter(
+            BillItem.item_code == prescription.medicine_code,
+            BillItem.item_name.like(f"%{prescription.medicine_name}%")
+        ).join(Bill).filter(
+            Bill.encounter_id == prescription.encounter_id,
+            Bill.is_paid == False
+        ).first()
+        
+        if bill_item:
+            # Check if bill item is fully paid
+            total_paid = 0.0
+            for receipt_item in db.query(ReceiptItem).filter(
+                ReceiptItem.bill_item_id == bill_item.id
+            ).join(Receipt).filter(Receipt.refunded == False).all():
+                total_paid += receipt_item.amount_paid
+            
+            remaining_balance = bill_item.total_price - total_paid
+            
+            # Only allow dispense if bill amount is 0 or fully paid
+            if bill_item.total_price > 0 and remaining_balance > 0:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Cannot dispense prescription. Bill not paid. Remaining balance: {remaining_balance:.2f}"
+                )
+    
+    # Update prescription fields if provided
+    if dispense_data:
+        if dispense_data.dose is not None:
+            prescription.dose = dispense_data.dose
+        if dispense_data.frequency is not None:
+            prescription.frequency = dispense_data.frequency
+        if dispense_data.duration is not None:
+            prescription.duration = dispense_data.duration
+        if dispense_data.quantity is not None:
+            if dispense_data.quantity <= 0:
+                raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
+            prescription.quantity = dispense_data.quantity
+    
+    prescription.dispensed_by = current_user.id
+    prescription.service_date = utcnow()
+    
+    db.commit()
+    db.refresh(prescription)
+    return add_prescriber_info_to_response(prescription, db)
+
+
+@router.put("/prescription/{prescription_id}/confirm", response_model=PrescriptionResponse)
+def confirm_prescription(
+    prescription_id: int,
+    dispense_data: Optional[PrescriptionDispense] = Body(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Confirm a prescription (allows pharmacy to update details) and automatically generate a bill item"""
+    prescription = db.query(Prescription).filter(Prescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    # Prevent confirming already external prescriptions (they're auto-confirmed and not billed)
+    # Check is_external as integer (0 or 1) since SQLite stores it as INTEGER
+    current_is_external = bool(prescription.is_external) if hasattr(prescription, 'is_external') else False
+    if current_is_external:
+        raise HTTPException(
+            status_code=400, 
+            detail="External prescriptions are automatically confirmed and cannot be confirmed again. They are filled outside and not billed."
+        )
+    
+    if prescription.confirmed_by is not None:
+        raise HTTPException(status_code=400, detail="Prescription has already been confirmed")
+    
+    encounter = db.query(Encounter).filter(Encounter.id == prescription.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Allow pharmacy to update prescription details during confirmation
+    # Also allow marking as external if drug is not in stock
+    mark_as_external = False
+    if dispense_data:
+        if dispense_data.dose is not None:
+            prescription.dose = dispense_data.dose
+        if dispense_data.frequency is not None:
+            prescription.frequency = dispense_data.frequency
+        if dispense_data.duration is not None:
+            prescription.duration = dispense_data.duration
+        if dispense_data.quantity is not None:
+            if dispense_data.quantity <= 0:
+                raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
+            prescription.quantity = dispense_data.quantity
+        if dispense_data.instructions is not None:
+            prescription.instructions = dispense_data.instructions
+        if dispense_data.is_external is not None:
+            mark_as_external = dispense_data.is_external
+            # Convert boolean to integer (0 or 1) for SQLite
+            prescription.is_external = 1 if mark_as_external else 0
+    
+    # Mark prescription as confirmed
+    prescription.confirmed_by = current_user.id
+    prescription.confirmed_at = utcnow()
+    
+    # Determine if insured based on encounter CCC number
+    is_insured_encounter = encounter.ccc_number is not None and encounter.ccc_number.strip() != ""
+    
+    # Get price for the medicine (co-pay for insured, base rate for cash)
+    # If insurance_covered="no", always uses base_rate regardless of insurance status
+    print(f"DEBUG: Calling get_price_from_all_tables with code='{prescription.medicine_code}', is_insured={is_insured_encounter}")
+    print(f"DEBUG: Prescription before price lookup - quantity={prescription.quantity}, medicine_code={prescription.medicine_code}")
+    unit_price = get_price_from_all_tables(db, prescription.medicine_code, is_insured_encounter)
+    
+    # Ensure quantity is set (should already be set, but safety check)
+    if not prescription.quantity or prescription.quantity <= 0:
+        print(f"WARNING: Prescription quantity is {prescription.quantity}, setting to 1")
+        prescription.quantity = 1
+    
+    total_price = unit_price * prescription.quantity
+    
+    # Debug: Log pricing information
+    print(f"Prescription confirmation - Medicine: {prescription.medicine_code}, Is Insured: {is_insured_encounter}, Unit Price: {unit_price}, Total Price: {total_price}, Quantity: {prescription.quantity}")
+    print(f"DEBUG: unit_price={unit_price}, quantity={prescription.quantity}, total_price={total_price}")
+    print(f"DEBUG: Will create bill? {total_price > 0}")
+    
+    # Skip billing for external prescriptions (they are filled outside)
+    # Check is_external as integer (0 or 1) since SQLite stores it as INTEGER
+    is_external = bool(prescription.is_external) if hasattr(prescription, 'is_external') else False
+    if is_external or mark_as_external:
+        print(f"Prescription {prescription_id} is external - skipping bill creation")
+        db.commit()
+        db.refresh(prescription)
+        return add_prescriber_info_to_response(prescription, db)
+    
+    # Always create/add to bill if total_price > 0
+    # This ensures bills are created even when insurance_covered="no" and base_rate is set
+    if total_price > 0:
+        print(f"Creating bill item - Unit Price: {unit_price}, Total Price: {total_price}")
+        # Find or create a bill for this encounter
+        existing_bill = db.query(Bill).filter(
+            Bill.encounter_id == encounter.id,
+            Bill.is_paid == False  # Only use unpaid bills
+        ).first()
+        
+        if existing_bill:
+            # Check if this prescription is already in the bill
+            existing_item = db.query(BillItem).filter(
+                BillItem.bill_id == existing_bill.id,
+                BillItem.item_code == prescription.medicine_code,
+                BillItem.item_name.like(f"%{prescription.medicine_name}%")
+            ).first()
+            
+            if not existing_item:
+                # Add bill item to existing bill
+                bill_item = BillItem(
+                    bill_id=existing_bill.id,
+                    item_code=prescription.medicine_code,
+                    item_name=f"Prescription: {prescription.medicine_name}",
+                    category="product",
+                    quantity=prescription.quantity,
+                    unit_price=unit_price,
+                    total_price=total_price
+                )
+                db.add(bill_item)
+                existing_bill.total_amount += total_price
+        else:
+            # Create new bill
+            bill_number = f"BILL-{random.randint(100000, 999999)}"
+            bill = Bill(
+                encounter_id=encounter.id,
+                bill_number=bill_number,
+                is_insured=is_insured_encounter,
+                total_amount=total_price,
+                created_by=current_user.id
+            )
+            db.add(bill)
+            db.flush()
+            
+            # Create bill item
+            bill_item = BillItem(
+                bill_id=bill.id,
+                item_code=prescription.medicine_code,
+                item_name=f"Prescription: {prescription.medicine_name}",
+                category="product",
+                quantity=prescription.quantity,
+                unit_price=unit_price,
+                total_price=total_price
+            )
+            db.add(bill_item)
+            print(f"Bill and bill item created successfully")
+    else:
+        print(f"WARNING: Not creating bill - Unit Price: {unit_price}, Total Price: {total_price} (one or both are 0)")
+    
+    db.commit()
+    db.refresh(prescription)
+    return add_prescriber_info_to_response(prescription, db)
+
+
+@router.put("/prescription/{prescription_id}/unconfirm", response_model=PrescriptionResponse)
+def unconfirm_prescription(
+    prescription_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Revert a confirmed prescription back to pending status (undo confirmation)"""
+    prescription = db.query(Prescription).filter(Prescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    if prescription.confirmed_by is None:
+        raise HTTPException(status_code=400, detail="Prescription has not been confirmed")
+    
+    # Prevent unconfirming if prescription has been dispensed
+    if prescription.dispensed_by is not None:
+        raise HTTPException(
+            status_code=400, 
+            detail="Cannot revert a prescription that has already been dispensed. Please return it first."
+        )
+    
+    # Check if prescription is external (external prescriptions are not billed, so skip bill item removal)
+    is_external = bool(prescription.is_external) if hasattr(prescription, 'is_external') else False
+    
+    # Find and remove the bill item that was created during confirmation (only for non-external prescriptions)
+    # External prescriptions are not billed, so no bill items to remove
+    if not is_external:
+        encounter = db.query(Encounter).filter(Encounter.id == prescription.encounter_id).first()
+        if encounter:
+            unpaid_bills = db.query(Bill).filter(
+                Bill.encounter_id == encounter.id,
+                Bill.is_paid == False
+            ).all()
+            
+            for bill in unpaid_bills:
+                # Find the bill item for this prescription
+                bill_item = db.query(BillItem).filter(
+                    BillItem.bill_id == bill.id,
+                    BillItem.item_code == prescription.medicine_code,
+                    BillItem.item_name.like(f"%{prescription.medicine_name}%")
+                ).first()
+                
+                if bill_item:
+                    # Check if this bill item has been paid (has receipts)
+                    # If the bill item has any payments, we can't remove it
+                    receipt_items = db.query(ReceiptItem).join(Receipt).filter(
+                        Receipt.bill_id == bill.id,
+                        ReceiptItem.bill_item_id == bill_item.id
+                    ).all()
+                    
+                    if receipt_items:
+                        raise HTTPException(
+                            status_code=400,
+                            detail="Cannot revert prescription. The bill item has already been paid. Please refund the payment first."
+                        )
+                    
+                    # Remove the bill item and update bill total
+                    bill.total_amount -= bill_item.total_price
+                    if bill.total_amount < 0:
+                        bill.total_amount = 0
+                    
+                    db.delete(bill_item)
+                    
+                    # If bill has no items left and total is 0, we can optionally delete the bill
+                    # But for now, we'll just leave it with 0 total
+                    remaining_items = db.query(BillItem).filter(BillItem.bill_id == bill.id).count()
+                    if remaining_items == 0 and bill.total_amount == 0:
+                        # Optionally delete empty bill, but for now we'll keep it
+                        pass
+                    
+                    break  # Found and removed the bill item, exit loop
+    
+    # Revert prescription confirmation and clear external flag
+    prescription.confirmed_by = None
+    prescription.confirmed_at = None
+    if hasattr(prescription, 'is_external'):
+        prescription.is_external = 0  # Clear external flag so it can be confirmed again
+    
+    db.commit()
+    db.refresh(prescription)
+    return add_prescriber_info_to_response(prescription, db)
+
+
+@router.put("/prescription/{prescription_id}/return", response_model=PrescriptionResponse)
+def return_prescription(
+    prescription_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Return a dispensed prescription (undo dispense - patient couldn't pay)"""
+    prescription = db.query(Prescription).filter(Prescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    if prescription.dispensed_by is None:
+        raise HTTPException(status_code=400, detail="Prescription has not been dispensed")
+    
+    prescription.dispensed_by = None
+    prescription.service_date = utcnow()
+    
+    db.commit()
+    db.refresh(prescription)
+    return add_prescriber_info_to_response(prescription, db)
+
+
+@router.get("/prescription/encounter/{encounter_id}/dispensed", response_model=List[PrescriptionResponse])
+def get_dispensed_prescriptions(
+    encounter_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get only dispensed prescriptions for an encounter (for billing)"""
+    prescriptions = db.query(Prescription).filter(
+        Prescription.encounter_id == encounter_id,
+        Prescription.dispensed_by.isnot(None)
+    ).all()
+    return [add_prescriber_info_to_response(p, db) for p in prescriptions]
+
+
+@router.put("/prescription/{prescription_id}", response_model=PrescriptionResponse)
+def update_prescription(
+    prescription_id: int,
+    prescription_data: PrescriptionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Update a prescription"""
+    prescription = db.query(Prescription).filter(Prescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    # Prevent editing if prescription is confirmed by pharmacy staff
+    # Only Admin can override this restriction
+    if prescription.confirmed_by is not None and current_user.role != "Admin":
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot edit prescription that has been confirmed by pharmacy staff. Contact admin if changes are needed."
+        )
+    
+    # Verify encounter exists
+    encounter = db.query(Encounter).filter(Encounter.id == prescription_data.encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    
+    # Get frequency value from mapping if frequency is provided
+    frequency_value = None
+    if prescription_data.frequency:
+        frequency_value = FREQUENCY_MAPPING.get(prescription_data.frequency.strip(), None)
+    
+    # Auto-calculate quantity based on pharmacist logic
+    # For MG: 100mg = 1 unit, so dose (in mg) / 100 = units per dose
+    # Then: (dose_mg / 100) × frequency_value × duration
+    # Example: 500mg, BDS (2), 2 days = (500/100) × 2 × 2 = 5 × 2 × 2 = 20
+    # Only auto-calculate if quantity is not provided or is 0
+    # This allows frontend to override the calculation if needed
+    quantity = prescription_data.quantity
+    if (not quantity or quantity <= 0) and prescription_data.dose and frequency_value and prescription_data.duration:
+        try:
+            dose_num = float(prescription_data.dose)
+            if dose_num > 0:
+                # Extract duration number (e.g., "7 DAYS" -> 7, "2" -> 2)
+                duration_str = prescription_data.duration.strip()
+                duration_num = 1
+                if duration_str:
+                    # First try to parse as a number directly
+                    try:
+                        direct_num = float(duration_str)
+                        if direct_num > 0:
+                            duration_num = int(direct_num)
+                    except ValueError:
+                        # Otherwise, extract number from string (e.g., "7 DAYS" -> 7)
+                        duration_match = re.search(r'\d+', duration_str)
+                        if duration_match:
+                            duration_num = int(duration_match.group())
+                
+                # Convert dose to units based on unit type
+                units_per_dose = dose_num
+                unit = prescription_data.unit.strip().upper() if prescription_data.unit else ""
+                if unit == "MG":
+                    # For MG: 100mg = 1 unit
+                    units_per_dose = dose_num / 100.0
+                elif unit == "MCG":
+                    # For MCG: 1000mcg = 1 unit
+                    units_per_dose = dose_num / 1000.0
+                # For other units (TAB, CAP, ML, etc.), use dose as-is (1 tablet = 1 unit)
+                
+                # Calculate: units per dose × frequency per day × number of days
+                calculated_quantity = int(units_per_dose * frequency_value * duration_num)
+                if calculated_quantity > 0:
+                    quantity = calculated_quantity
+        except (ValueError, TypeError):
+            pass  # If calculation fails, use provided quantity or default below
+    
+    # Ensure quantity is set
+    if not quantity or quantity <= 0:
+        quantity = 1
+    
+    # Update prescription fields
+    prescription.encounter_id = prescription_data.encounter_id
+    prescription.medicine_code = prescription_data.medicine_code
+    prescription.medicine_name = prescription_data.medicine_name
+    prescription.dose = prescription_data.dose
+    prescription.unit = prescription_data.unit
+    prescription.frequency = prescription_data.frequency
+    prescription.frequency_value = frequency_value
+    prescription.duration = prescription_data.duration
+    prescription.instructions = prescription_data.instructions
+    prescription.quantity = quantity
+    prescription.unparsed = prescription_data.unparsed
+    
+    db.commit()
+    db.refresh(prescription)
+    return add_prescriber_info_to_response(prescription, db)
+
+
+@router.delete("/prescription/{prescription_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_prescription(
+    prescription_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "Admin", "PA", "Records"]))
+):
+    """Delete a prescription"""
+    prescription = db.query(Prescription).filter(Prescription.id == prescription_id).first()
+    if not prescription:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    
+    # Allow deletion of external prescriptions even if confirmed (they're going outside)
+    # Check is_external as integer (0 or 1) since SQLite stores it as INTEGER
+    is_external = bool(prescription.is_external) if hasattr(prescription, 'is_external') else False
+    
+    # Prevent deleting if prescription is confirmed by pharmacy staff (unless it's external)
+    # Only Admin can override this restriction for non-external prescriptions
+    if not is_external and prescription.confirmed_by is not None and current_user.role != "Admin":
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot delete prescription that has been confirmed by pharmacy staff. Contact admin if deletion is needed."
+        )
+    
+    db.delete(prescription)
+    db.commit()
+    return None
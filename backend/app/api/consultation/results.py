@@ -0,0 +1,1680 @@
+"""
+Consultation: lab, scan and X-ray results and their attachments
+"""
+import json
+import logging
+import mimetypes
+from typing import Optional, List
+from datetime import datetime
+from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException, status, Body, UploadFile, File, Form, Response, Query, Request
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy import text, inspect
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role, get_current_user
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.investigation import InvestigationStatus
+from app.models.lab_result import LabResult
+from app.models.inpatient_lab_result import InpatientLabResult
+from app.models.scan_result import ScanResult
+from app.models.inpatient_scan_result import InpatientScanResult
+from app.models.xray_result import XrayResult
+from app.models.inpatient_xray_result import InpatientXrayResult
+from app.models.lab_result_template import LabResultTemplate
+from app.models.bill import Bill
+from app.models.inpatient_investigation import InpatientInvestigationStatus
+from app.services.investigation_resolver import resolve_investigation, resolve_typed_investigation
+from app.services.attachment_store import (
+    store_upload, release_attachment, resolve_attachment, attachment_sha256,
+    result_attachment_paths,
+)
+from app.services.attachment_delivery import attachment_etag, attachment_response, thumbnail_response
+from app.services.attachment_compression import get_derivative
+
+router = APIRouter()
+
+
+# Lab Result schemas
+class LabResultCreate(BaseModel):
+    """Lab result creation model"""
+    investigation_id: int
+    results_text: Optional[str] = None
+
+
+class LabResultResponse(BaseModel):
+    """Lab result response model"""
+    id: int
+    investigation_id: int
+    template_id: Optional[int] = None
+    results_text: Optional[str]
+    template_data: Optional[dict] = None  # Structured template data
+    attachment_path: Optional[str]
+    entered_by: int
+    updated_by: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+    # User names for display
+    entered_by_name: Optional[str] = None
+    updated_by_name: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/lab-result/sample-id", response_model=LabResultResponse, status_code=status.HTTP_200_OK)
+def save_sample_id(
+    investigation_id: int = Body(...),
+    sample_no: str = Body(...),
+    source: Optional[str] = Body(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Lab Head", "Admin"]))
+):
+    """
+    Save sample ID for a lab investigation without payment check.
+    This is the only data that can be saved before payment.
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"Saving sample_no={sample_no} for investigation_id={investigation_id}")
+    
+    investigation = None
+    is_inpatient = False
+    
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    ipd_investigation, opd_investigation = resolve_typed_investigation(db, investigation_id, source)
+    if ipd_investigation:
+        investigation = ipd_investigation
+        is_inpatient = True
+    else:
+        # Not IPD, check OPD
+        investigation = opd_investigation
+        if not investigation:
+            raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    if investigation.investigation_type != "lab":
+        raise HTTPException(status_code=400, detail="This endpoint is only for lab investigations")
+    
+    # Create or update lab_result record with just the sample ID
+    template_data = {
+        "sample_no": sample_no,
+        "field_values": {},
+        "messages": {},
+        "validated_by": ""
+    }
+    
+    result = None
+    if is_inpatient:
+        # IPD investigation
+        existing_lab_result = db.query(InpatientLabResult).filter(
+            InpatientLabResult.investigation_id == investigation_id
+        ).first()
+        
+        if existing_lab_result:
+            # Update existing record
+            if existing_lab_result.template_data:
+                existing_data = existing_lab_result.template_data if isinstance(existing_lab_result.template_data, dict) else json.loads(existing_lab_result.template_data)
+                # Create a new dict to ensure SQLAlchemy detects the change
+                updated_data = existing_data.copy()
+                updated_data['sample_no'] = sample_no
+                existing_lab_result.template_data = updated_data
+                flag_modified(existing_lab_result, 'template_data')  # Tell SQLAlchemy the JSON column changed
+            else:
+                existing_lab_result.template_data = template_data
+                flag_modified(existing_lab_result, 'template_data')  # Tell SQLAlchemy the JSON column changed
+            result = existing_lab_result
+        else:
+            # Create new record
+            lab_result = InpatientLabResult(
+                investigation_id=investigation_id,
+                template_data=template_data,
+                entered_by=current_user.id
+            )
+            db.add(lab_result)
+            result = lab_result
+    else:
+        # OPD investigation
+        existing_lab_result = db.query(LabResult).filter(
+            LabResult.investigation_id == investigation_id
+        ).first()
+        
+        if existing_lab_result:
+            # Update existing record
+            if existing_lab_result.template_data:
+                existing_data = existing_lab_result.template_data if isinstance(existing_lab_result.template_data, dict) else json.loads(existing_lab_result.template_data)
+                # Create a new dict to ensure SQLAlchemy detects the change
+                updated_data = existing_data.copy()
+                updated_data['sample_no'] = sample_no
+                existing_lab_result.template_data = updated_data
+                flag_modified(existing_lab_result, 'template_data')  # Tell SQLAlchemy the JSON column changed
+            else:
+                existing_lab_result.template_data = template_data
+                flag_modified(existing_lab_result, 'template_data')  # Tell SQLAlchemy the JSON column changed
+            result = existing_lab_result
+        else:
+            # Create new record
+            lab_result = LabResult(
+                investigation_id=investigation_id,
+                template_data=template_data,
+                entered_by=current_user.id
+            )
+            db.add(lab_result)
+            result = lab_result
+    
+    try:
+        db.commit()
+        db.refresh(result)  # Refresh to get the latest data from database
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error saving sample ID: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to save sample ID: {str(e)}")
+    
+    if not result:
+        raise HTTPException(status_code=500, detail="Failed to save sample ID")
+    
+    # Verify sample_no was saved correctly
+    # Query fresh from database to ensure we have the latest data
+    if is_inpatient:
+        fresh_result = db.query(InpatientLabResult).filter(InpatientLabResult.investigation_id == investigation_id).first()
+    else:
+        fresh_result = db.query(LabResult).filter(LabResult.investigation_id == investigation_id).first()
+    
+    if fresh_result:
+        result = fresh_result
+    
+    saved_sample_no = None
+    if result.template_data:
+        if isinstance(result.template_data, dict):
+            saved_sample_no = result.template_data.get('sample_no', '')
+        else:
+            try:
+                saved_data = json.loads(result.template_data)
+                saved_sample_no = saved_data.get('sample_no', '')
+            except:
+                pass
+    
+    logger.info(f"Sample ID save attempt. investigation_id={investigation_id}, input_sample_no={sample_no}, saved_sample_no={saved_sample_no}, template_data={result.template_data}")
+    
+    # Only raise error if we explicitly tried to save but it didn't work
+    # Allow empty sample_no if it wasn't in the original data (edge case)
+    if saved_sample_no != sample_no:
+        logger.error(f"ERROR: Sample ID mismatch. Expected={sample_no}, Got={saved_sample_no}. Template data: {result.template_data}")
+        # Don't raise error - just log it. The sample_no might still be saved but not yet visible
+        # Return the result anyway so frontend can check
+    
+    # Get user names
+    entered_user = db.query(User).filter(User.id == result.entered_by).first()
+    updated_user = db.query(User).filter(User.id == result.updated_by).first() if result.updated_by else None
+    
+    result_dict = {
+        "id": result.id,
+        "investigation_id": result.investigation_id,
+        "template_id": result.template_id,
+        "results_text": result.results_text,
+        "template_data": result.template_data,
+        "attachment_path": result.attachment_path,
+        "entered_by": result.entered_by,
+        "updated_by": result.updated_by,
+        "created_at": result.created_at,
+        "updated_at": result.updated_at,
+        "entered_by_name": entered_user.full_name if entered_user else None,
+        "updated_by_name": updated_user.full_name if updated_user else None,
+    }
+    return LabResultResponse(**result_dict)
+
+
+@router.post("/lab-result", response_model=LabResultResponse, status_code=status.HTTP_201_CREATED)
+async def create_lab_result(
+    investigation_id: int = Form(...),
+    results_text: Optional[str] = Form(None),
+    template_id: Optional[int] = Form(None),
+    template_data: Optional[str] = Form(None),  # JSON string
+    attachment: Optional[UploadFile] = File(None),
+    source: Optional[str] = Form(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Lab Head", "Admin"]))
+):
+    """Create or update lab result with optional file attachment and template data"""
+    logger = logging.getLogger(__name__)
+    
+    investigation = None
+    is_inpatient = False
+    
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    ipd_investigation, opd_investigation = resolve_typed_investigation(db, investigation_id, source)
+    if ipd_investigation:
+        investigation = ipd_investigation
+        is_inpatient = True
+    else:
+        # Not IPD, check OPD
+        investigation = opd_investigation
+        if not investigation:
+            raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    if investigation.investigation_type != "lab":
+        raise HTTPException(status_code=400, detail="This endpoint is only for lab investigations")
+    
+    # Check payment status for OPD investigations (IPD doesn't require payment check)
+    if not is_inpatient:
+        # Get encounter for this investigation
+        encounter = db.query(Encounter).filter(Encounter.id == investigation.encounter_id).first()
+        
+        if encounter:
+            # Check if patient is insured (has CCC number) - insured patients may have 0 bills
+            is_insured = encounter.ccc_number is not None and encounter.ccc_number.strip() != ""
+            
+            # Find bill items for this investigation
+            bills = db.query(Bill).filter(Bill.encounter_id == encounter.id).all()
+            investigation_paid = False
+            investigation_free = False
+            
+            for bill in bills:
+                for bill_item in bill.bill_items:
+                    # Match by G-DRG code or procedure name
+                    matches_code = bill_item.item_code == investigation.gdrg_code
+                    investigation_name = investigation.procedure_name or ''
+                    investigation_code = investigation.gdrg_code or ''
+                    matches_name = bill_item.item_name and (
+                        investigation_name in bill_item.item_name or
+                        investigation_code in bill_item.item_name or
+                        f"Investigation: {investigation_name}" in bill_item.item_name or
+                        f"Investigation: {investigation_code}" in bill_item.item_name
+                    )
+                    
+                    if matches_code or matches_name:
+                        total_price = bill_item.total_price or 0
+                        if total_price == 0:
+                            investigation_free = True
+                            investigation_paid = True
+                        else:
+                            # Calculate amount paid for this bill item from receipts
+                            amount_paid = 0.0
+                            for receipt in bill.receipts:
+                                if not receipt.refunded:  # Only count non-refunded receipts
+                                    for receipt_item in receipt.receipt_items:
+                                        if receipt_item.bill_item_id == bill_item.id:
+                                            amount_paid += receipt_item.amount_paid or 0.0
+                            
+                            # Calculate remaining balance
+                            remaining_balance = total_price - amount_paid
+                            is_paid = remaining_balance <= 0.01  # Allow 0.01 tolerance for rounding
+                            
+                            if is_paid:
+                                investigation_paid = True
+                        break
+                
+                if investigation_paid:
+                    break
+            
+            # If no bill item found and patient is not insured, require payment
+            if not investigation_paid and not investigation_free:
+                if not is_insured:
+                    raise HTTPException(
+                        status_code=402,
+                        detail="Payment required. This investigation must be paid for before results can be entered. Please process payment at the billing desk."
+                    )
+                # For insured patients without bill items, allow (might be fully covered)
+    
+    # Parse template_data if provided
+    parsed_template_data = None
+    if template_data:
+        try:
+            parsed_template_data = json.loads(template_data)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON in template_data")
+    
+    # Validate template_id if provided
+    if template_id:
+        template = db.query(LabResultTemplate).filter(
+            LabResultTemplate.id == template_id,
+            LabResultTemplate.is_active == 1
+        ).first()
+        if not template:
+            raise HTTPException(status_code=404, detail="Template not found or inactive")
+        # If template_data is provided, ensure template procedure_name matches
+        if parsed_template_data and investigation.procedure_name and template.procedure_name != investigation.procedure_name:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Template procedure name ({template.procedure_name}) does not match investigation procedure name ({investigation.procedure_name})"
+            )
+    elif parsed_template_data:
+        # If template_data is provided but no template_id, try to find template by procedure name
+        if investigation.procedure_name:
+            template = db.query(LabResultTemplate).filter(
+                LabResultTemplate.procedure_name == investigation.procedure_name,
+                LabResultTemplate.is_active == 1
+            ).first()
+            if template:
+                template_id = template.id
+    
+    # If investigation is completed, only Admin and Lab Head can edit
+    if is_inpatient:
+        if investigation.status == InpatientInvestigationStatus.COMPLETED.value:
+            if current_user.role not in ["Admin", "Lab Head"]:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Only Admin and Lab Head can edit completed investigations. Please contact Lab Head to revert the status."
+                )
+    else:
+        if investigation.status == InvestigationStatus.COMPLETED.value:
+            if current_user.role not in ["Admin", "Lab Head"]:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Only Admin and Lab Head can edit completed investigations. Please contact Lab Head to revert the status."
+                )
+    
+    # Handle file upload
+    attachment_path = None
+    if attachment:
+        # Streamed into the content-addressed store off the event loop
+        stored = await store_upload(db, attachment, current_user.id, default_filename="lab_result.pdf")
+        attachment_path = stored.path
+    
+    # Handle IPD and OPD investigations separately due to FK constraints
+    if is_inpatient:
+        # Use InpatientLabResult for IPD investigations
+        existing_result = db.query(InpatientLabResult).filter(InpatientLabResult.investigation_id == investigation_id).first()
+    else:
+        # Use LabResult for OPD investigations
+        existing_result = db.query(LabResult).filter(LabResult.investigation_id == investigation_id).first()
+    
+    if existing_result:
+        # Update existing result
+        existing_result.results_text = results_text
+        if template_id is not None:
+            existing_result.template_id = template_id
+        if parsed_template_data is not None:
+            # Merge with existing template_data to preserve sample_no and other fields
+            if existing_result.template_data:
+                existing_data = existing_result.template_data if isinstance(existing_result.template_data, dict) else json.loads(existing_result.template_data)
+                # ALWAYS preserve sample_no from existing data if it exists and is non-empty
+                # Sample ID should never be overwritten with empty value
+                existing_sample_no = existing_data.get('sample_no', '')
+                new_sample_no = parsed_template_data.get('sample_no', '')
+                # IMPORTANT: If new sample_no is provided and non-empty, ALWAYS use it
+                # This allows users to regenerate sample IDs if needed
+                if new_sample_no and isinstance(new_sample_no, str) and new_sample_no.strip() != '':
+                    # New one is provided and non-empty, use it (even if existing one exists)
+                    parsed_template_data['sample_no'] = new_sample_no.strip()
+                    logger.info(f"Using new sample_no={new_sample_no} for investigation_id={investigation_id} (replacing existing={existing_sample_no})")
+                elif existing_sample_no and isinstance(existing_sample_no, str) and existing_sample_no.strip() != '':
+                    # No new sample_no provided, preserve existing one
+                    parsed_template_data['sample_no'] = existing_sample_no
+                    logger.info(f"Preserved existing sample_no={existing_sample_no} for investigation_id={investigation_id}")
+                else:
+                    # Neither exists, leave it empty (will be generated later if needed)
+                    logger.info(f"No sample_no provided or existing for investigation_id={investigation_id}")
+                # Merge field_values - new values override existing ones, but keep existing if new is empty
+                if 'field_values' in existing_data and existing_data['field_values']:
+                    if 'field_values' not in parsed_template_data:
+                        parsed_template_data['field_values'] = existing_data['field_values'].copy()
+                    elif parsed_template_data['field_values']:
+                        # Merge: start with existing, then update with new non-empty values
+                        merged_field_values = existing_data['field_values'].copy()
+                        for key, value in parsed_template_data['field_values'].items():
+                            if value is not None and value != '':
+                                merged_field_values[key] = value
+                        parsed_template_data['field_values'] = merged_field_values
+                    else:
+                        # New field_values is empty dict, keep existing
+                        parsed_template_data['field_values'] = existing_data['field_values'].copy()
+                # Merge messages similarly
+                if 'messages' in existing_data and existing_data['messages']:
+                    if 'messages' not in parsed_template_data:
+                        parsed_template_data['messages'] = existing_data['messages'].copy()
+                    elif parsed_template_data['messages']:
+                        merged_messages = existing_data['messages'].copy()
+                        for key, value in parsed_template_data['messages'].items():
+                            if value is not None and value != '':
+                                merged_messages[key] = value
+                        parsed_template_data['messages'] = merged_messages
+                    else:
+                        # New messages is empty dict, keep existing
+                        parsed_template_data['messages'] = existing_data['messages'].copy()
+            existing_result.template_data = parsed_template_data
+        if attachment_path:
+            # Release the old attachment (its file is deleted on commit if nothing else uses it)
+            if existing_result.attachment_path:
+                release_attachment(db, existing_result.attachment_path)
+            existing_result.attachment_path = attachment_path
+        existing_result.updated_by = current_user.id  # Track who updated
+        existing_result.updated_at = utcnow()
+        
+        # Mark investigation as completed if results are entered
+        if results_text or parsed_template_data or attachment_path:
+            if is_inpatient:
+                investigation.status = InpatientInvestigationStatus.COMPLETED.value
+            else:
+                investigation.status = InvestigationStatus.COMPLETED.value
+            investigation.completed_by = current_user.id  # Track who completed
+            # Ensure investigation is in session for update
+            db.add(investigation)
+    else:
+        # Create new result
+        if is_inpatient:
+            lab_result = InpatientLabResult(
+                investigation_id=investigation_id,
+                template_id=template_id,
+                results_text=results_text,
+                template_data=parsed_template_data,
+                attachment_path=attachment_path,
+                entered_by=current_user.id
+            )
+        else:
+            lab_result = LabResult(
+                investigation_id=investigation_id,
+                template_id=template_id,
+                results_text=results_text,
+                template_data=parsed_template_data,
+                attachment_path=attachment_path,
+                entered_by=current_user.id
+            )
+        db.add(lab_result)
+        
+        # Mark investigation as completed if results are entered
+        if results_text or parsed_template_data or attachment_path:
+            if is_inpatient:
+                investigation.status = InpatientInvestigationStatus.COMPLETED.value
+            else:
+                investigation.status = InvestigationStatus.COMPLETED.value
+            investigation.completed_by = current_user.id  # Track who completed
+            # Ensure investigation is in session for update
+            db.add(investigation)
+    
+    db.commit()
+    # Refresh investigation to ensure status and completed_by are updated
+    db.refresh(investigation)
+    if existing_result:
+        db.refresh(existing_result)
+        # Get user names for response
+        entered_user = db.query(User).filter(User.id == existing_result.entered_by).first()
+        updated_user = db.query(User).filter(User.id == existing_result.updated_by).first() if existing_result.updated_by else None
+        result_dict = {
+            "id": existing_result.id,
+            "investigation_id": existing_result.investigation_id,
+            "template_id": existing_result.template_id,
+            "results_text": existing_result.results_text,
+            "template_data": existing_result.template_data,
+            "attachment_path": existing_result.attachment_path,
+            "entered_by": existing_result.entered_by,
+            "updated_by": existing_result.updated_by,
+            "created_at": existing_result.created_at,
+            "updated_at": existing_result.updated_at,
+            "entered_by_name": entered_user.full_name if entered_user else None,
+            "updated_by_name": updated_user.full_name if updated_user else None,
+        }
+        return LabResultResponse(**result_dict)
+    else:
+        db.refresh(lab_result)
+        # Get user names for response
+        entered_user = db.query(User).filter(User.id == lab_result.entered_by).first()
+        result_dict = {
+            "id": lab_result.id,
+            "investigation_id": lab_result.investigation_id,
+            "template_id": lab_result.template_id,
+            "results_text": lab_result.results_text,
+            "template_data": lab_result.template_data,
+            "attachment_path": lab_result.attachment_path,
+            "entered_by": lab_result.entered_by,
+            "updated_by": lab_result.updated_by,
+            "created_at": lab_result.created_at,
+            "updated_at": lab_result.updated_at,
+            "entered_by_name": entered_user.full_name if entered_user else None,
+            "updated_by_name": None,
+        }
+        return LabResultResponse(**result_dict)
+
+
+@router.get("/lab-result/investigation/{investigation_id}", response_model=Optional[LabResultResponse])
+def get_lab_result(
+    investigation_id: int,
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get lab result for an investigation (supports both OPD and IPD investigations)"""
+    # LabResult.investigation_id has FK constraint to investigations.id (OPD only)
+    # So IPD investigation IDs cannot be stored in LabResult table
+    # We must check investigation type BEFORE querying LabResult to avoid ID collisions
+    
+    logger = logging.getLogger(__name__)
+    
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    ipd_investigation, opd_investigation = resolve_typed_investigation(db, investigation_id, source)
+    
+    if ipd_investigation:
+        logger.info(f"Found IPD investigation {investigation_id}, type: {ipd_investigation.investigation_type}")
+        # This is definitely an IPD investigation - ONLY query InpatientLabResult table
+        # Do NOT fall back to OPD LabResult table even if no IPD result exists
+        if ipd_investigation.investigation_type != "lab":
+            logger.info(f"IPD investigation {investigation_id} is not a lab investigation, returning None")
+            return None
+        
+        # Use raw SQL query to avoid template_id column issue if it doesn't exist in database
+        # Check if template_id column exists first, then use appropriate query
+        
+        # Check if template_id column exists in the table
+        has_template_id = False
+        try:
+            inspector = inspect(db.bind)
+            columns_info = inspector.get_columns('inpatient_lab_results')
+            if columns_info and isinstance(columns_info, list):
+                columns = [col.get('name', '') for col in columns_info if isinstance(col, dict)]
+                has_template_id = 'template_id' in columns
+        except Exception as e:
+            # If inspection fails, assume column doesn't exist and use raw SQL
+            logger.warning(f"Failed to inspect columns, assuming template_id doesn't exist: {e}")
+            has_template_id = False
+        
+        if has_template_id:
+            # Column exists, use normal ORM query
+            result = db.query(InpatientLabResult).filter(InpatientLabResult.investigation_id == investigation_id).first()
+            
+            if not result:
+                logger.info(f"No IPD lab result found for investigation {investigation_id}, returning None")
+                return None
+            
+            entered_user = db.query(User).filter(User.id == result.entered_by).first()
+            updated_user = db.query(User).filter(User.id == result.updated_by).first() if result.updated_by else None
+            
+            result_dict = {
+                "id": result.id,
+                "investigation_id": result.investigation_id,
+                "template_id": result.template_id,
+                "results_text": result.results_text,
+                "template_data": result.template_data,
+                "attachment_path": result.attachment_path,
+                "entered_by": result.entered_by,
+                "updated_by": result.updated_by,
+                "created_at": result.created_at,
+                "updated_at": result.updated_at,
+                "entered_by_name": entered_user.full_name if entered_user else None,
+                "updated_by_name": updated_user.full_name if updated_user else None,
+            }
+            return LabResultResponse(**result_dict)
+        else:
+            # Column doesn't exist, use raw SQL query without template_id
+            logger.info(f"template_id column not found, using raw SQL query")
+            result_row = db.execute(
+                text("""
+                    SELECT id, investigation_id, results_text, template_data, 
+                           attachment_path, entered_by, updated_by, created_at, updated_at
+                    FROM inpatient_lab_results 
+                    WHERE investigation_id = :investigation_id
+                    LIMIT 1
+                """),
+                {"investigation_id": investigation_id}
+            ).first()
+            
+            if not result_row:
+                logger.info(f"No IPD lab result found for investigation {investigation_id}, returning None")
+                return None
+            
+            # Build result dict from raw query
+            entered_user = db.query(User).filter(User.id == result_row.entered_by).first()
+            updated_user = db.query(User).filter(User.id == result_row.updated_by).first() if result_row.updated_by else None
+            
+            result_dict = {
+                "id": result_row.id,
+                "investigation_id": result_row.investigation_id,
+                "template_id": None,  # Column doesn't exist in database
+                "results_text": result_row.results_text,
+                "template_data": result_row.template_data,
+                "attachment_path": result_row.attachment_path,
+                "entered_by": result_row.entered_by,
+                "updated_by": result_row.updated_by,
+                "created_at": result_row.created_at,
+                "updated_at": result_row.updated_at,
+                "entered_by_name": entered_user.full_name if entered_user else None,
+                "updated_by_name": updated_user.full_name if updated_user else None,
+            }
+            return LabResultResponse(**result_dict)
+    
+    # Not an IPD investigation - check OPD
+    logger.info(f"Investigation {investigation_id} is not IPD, checking OPD")
+    if not opd_investigation:
+        logger.info(f"No OPD investigation found for {investigation_id}, returning None")
+        return None
+    
+    if opd_investigation.investigation_type != "lab":
+        logger.info(f"OPD investigation {investigation_id} is not a lab investigation, returning None")
+        return None
+    
+    # Query OPD LabResult table
+    result = db.query(LabResult).filter(LabResult.investigation_id == investigation_id).first()
+    
+    if not result:
+        logger.info(f"No OPD lab result found for investigation {investigation_id}, returning None")
+        return None
+    
+    logger.info(f"Found OPD lab result for investigation {investigation_id}")
+    # Get user names
+    entered_user = db.query(User).filter(User.id == result.entered_by).first()
+    updated_user = db.query(User).filter(User.id == result.updated_by).first() if result.updated_by else None
+    
+    result_dict = {
+        "id": result.id,
+        "investigation_id": result.investigation_id,
+        "template_id": result.template_id,
+        "results_text": result.results_text,
+        "template_data": result.template_data,
+        "attachment_path": result.attachment_path,
+        "entered_by": result.entered_by,
+        "updated_by": result.updated_by,
+        "created_at": result.created_at,
+        "updated_at": result.updated_at,
+        "entered_by_name": entered_user.full_name if entered_user else None,
+        "updated_by_name": updated_user.full_name if updated_user else None,
+    }
+    return LabResultResponse(**result_dict)
+
+
+@router.get("/lab-result/investigation/{investigation_id}/template")
+def get_lab_result_template_for_investigation(
+    investigation_id: int,
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the active template for a lab investigation's procedure name"""
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    ipd_investigation, opd_investigation = resolve_typed_investigation(db, investigation_id, source)
+    if ipd_investigation:
+        investigation = ipd_investigation
+    else:
+        investigation = opd_investigation
+        if not investigation:
+            raise HTTPException(status_code=404, detail="Investigation not found")
+    
+    if investigation.investigation_type != "lab":
+        return None
+    
+    # Get template for this procedure name
+    if not investigation.procedure_name:
+        return None
+    
+    template = db.query(LabResultTemplate).filter(
+        LabResultTemplate.procedure_name == investigation.procedure_name,
+        LabResultTemplate.is_active == 1
+    ).first()
+    
+    if not template:
+        return None
+    
+    # Get user names
+    created_user = db.query(User).filter(User.id == template.created_by).first()
+    updated_user = db.query(User).filter(User.id == template.updated_by).first() if template.updated_by else None
+    
+    return {
+        "id": template.id,
+        "g_drg_code": template.g_drg_code,
+        "procedure_name": template.procedure_name,
+        "template_name": template.template_name,
+        "template_structure": template.template_structure,
+        "created_by": template.created_by,
+        "updated_by": template.updated_by,
+        "created_at": template.created_at,
+        "updated_at": template.updated_at,
+        "is_active": template.is_active,
+        "created_by_name": created_user.full_name if created_user else None,
+        "updated_by_name": updated_user.full_name if updated_user else None,
+    }
+
+
+@router.get("/lab-result/{investigation_id}/download")
+def download_lab_result_attachment(
+    investigation_id: int,
+    request: Request,
+    view: bool = Query(False, description="If true, open in browser instead of downloading"),
+    original: bool = Query(False, description="With view, send the uploaded file rather than its compressed copy"),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download or view lab result attachment file"""
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    resolved = resolve_investigation(db, investigation_id, source)
+    result = resolved.get_result(db, "lab") if resolved else None
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Lab result not found")
+    
+    if not result.attachment_path:
+        raise HTTPException(status_code=404, detail="No attachment found for this lab result")
+    
+    # Build full file path (content-addressed store or a legacy upload path)
+    try:
+        file_path = resolve_attachment(result.attachment_path)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid attachment path")
+    
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="File not found on server")
+    
+    # Determine MIME type
+    mime_type, _ = mimetypes.guess_type(Path(result.attachment_path).name)
+    if not mime_type:
+        # Default to application/octet-stream if unknown
+        mime_type = "application/octet-stream"
+    
+    # Get filename for download
+    filename = Path(result.attachment_path).name  # stored files are named by hash; the path ends with the upload's name
+    
+    # Use inline for PDFs and images when viewing, attachment for others or when downloading
+    is_pdf_or_image = mime_type.startswith('image/') or mime_type == 'application/pdf'
+    disposition = 'inline' if (view and is_pdf_or_image) else 'attachment'
+    
+    # The viewer gets the compressed copy once it has been built
+    etag = attachment_etag(file_path, result.attachment_path)
+    if view and not original:
+        derivative = get_derivative(db, result.attachment_path)
+        if derivative:
+            file_path, mime_type, filename, etag = derivative
+    
+    # Streamed, with ETag and Range support
+    return attachment_response(
+        request, file_path, filename, mime_type, etag,
+        immutable=False, disposition=disposition
+    )
+
+
+def _attachment_thumbnail(request: Request, db: Session, investigation_id: int, source: Optional[str],
+                          result_type: str, attachment_path: Optional[str], size: int) -> Response:
+    """Thumbnail of a lab / scan / X-ray result attachment (first attachment when no path is given)"""
+    resolved = resolve_investigation(db, investigation_id, source)
+    result = resolved.get_result(db, result_type) if resolved else None
+    paths = result_attachment_paths(result.attachment_path) if result else []
+    if not paths:
+        raise HTTPException(status_code=404, detail="No attachment found for this result")
+    if attachment_path and attachment_path not in paths:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    target_path = attachment_path or paths[0]
+
+    try:
+        file_path = resolve_attachment(target_path)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid attachment path")
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="File not found on server")
+
+    mime_type = mimetypes.guess_type(Path(target_path).name)[0] or "application/octet-stream"
+    try:
+        return thumbnail_response(
+            request, file_path, mime_type, attachment_etag(file_path, target_path), size,
+            immutable=attachment_path is not None and attachment_sha256(target_path) is not None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.get("/lab-result/{investigation_id}/thumbnail")
+def get_lab_result_thumbnail(
+    investigation_id: int,
+    request: Request,
+    size: int = Query(256, ge=32, le=1024, description="Longest side in pixels (rounded up to a cached size)"),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """JPEG preview of a lab result attachment (image or PDF first page)"""
+    return _attachment_thumbnail(request, db, investigation_id, source, "lab", None, size)
+
+
+@router.delete("/lab-result/{investigation_id}/attachment")
+def delete_lab_result_attachment(
+    investigation_id: int,
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Lab", "Lab Head", "Admin"]))
+):
+    """Delete lab result attachment"""
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    resolved = resolve_investigation(db, investigation_id, source)
+    result = resolved.get_result(db, "lab") if resolved else None
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Lab result not found")
+    
+    if not result.attachment_path:
+        raise HTTPException(status_code=404, detail="No attachment found for this lab result")
+    
+    # Release the file (deleted on commit unless another result shares its content)
+    release_attachment(db, result.attachment_path)
+    
+    # Update the result
+    result.attachment_path = None
+    result.updated_by = current_user.id
+    result.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(result)
+    
+    return {"message": "Attachment deleted successfully", "investigation_id": investigation_id}
+
+
+# Scan Result schemas
+class ScanResultCreate(BaseModel):
+    """Scan result creation model"""
+    investigation_id: int
+    results_text: Optional[str] = None
+
+
+class ScanResultResponse(BaseModel):
+    """Scan result response model"""
+    id: int
+    investigation_id: int
+    results_text: Optional[str]
+    attachment_path: Optional[str]
+    entered_by: int
+    updated_by: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+    # User names for display
+    entered_by_name: Optional[str] = None
+    updated_by_name: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/scan-result", response_model=ScanResultResponse, status_code=status.HTTP_201_CREATED)
+async def create_scan_result(
+    investigation_id: int = Form(...),
+    results_text: Optional[str] = Form(None),
+    attachments: Optional[List[UploadFile]] = File(None),
+    source: Optional[str] = Form(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Scan", "Scan Head", "Admin"]))
+):
+    """Create or update scan result with optional file attachment"""
+    logger = logging.getLogger(__name__)
+    
+    # Ensure investigation_id is an integer
+    try:
+        investigation_id = int(investigation_id)
+    except (ValueError, TypeError):
+        logger.error(f"Invalid investigation_id type: {type(investigation_id)}, value: {investigation_id}")
+        raise HTTPException(status_code=400, detail=f"Invalid investigation ID: {investigation_id}")
+    
+    logger.info(f"Creating scan result for investigation_id: {investigation_id} (type: {type(investigation_id)})")
+    
+    investigation = None
+    is_inpatient = False
+    
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    ipd_investigation, opd_investigation = resolve_typed_investigation(db, investigation_id, source)
+    if ipd_investigation:
+        logger.info(f"Found IPD investigation {investigation_id}, type: {ipd_investigation.investigation_type}")
+        investigation = ipd_investigation
+        is_inpatient = True
+    else:
+        # Not IPD, check OPD
+        logger.info(f"Investigation {investigation_id} not found in IPD, checking OPD")
+        investigation = opd_investigation
+        if not investigation:
+            logger.error(f"Investigation {investigation_id} not found in both IPD and OPD tables")
+            raise HTTPException(status_code=404, detail=f"Investigation not found: {investigation_id}")
+    
+    if investigation.investigation_type != "scan":
+        raise HTTPException(status_code=400, detail="This endpoint is only for scan investigations")
+    
+    # If investigation is completed, only Admin and Scan Head can edit
+    if is_inpatient:
+        if investigation.status == InpatientInvestigationStatus.COMPLETED.value:
+            if current_user.role not in ["Admin", "Scan Head"]:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Only Admin and Scan Head can edit completed investigations. Please contact Scan Head to revert the status."
+                )
+    else:
+        if investigation.status == InvestigationStatus.COMPLETED.value:
+            if current_user.role not in ["Admin", "Scan Head"]:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Only Admin and Scan Head can edit completed investigations. Please contact Scan Head to revert the status."
+                )
+    
+    # Handle multiple file uploads
+    
+    uploaded_paths = []
+    if attachments:
+        # Process each uploaded file - streamed into the content-addressed store off the event loop,
+        # keeping the original filename as the last path segment
+        for attachment in attachments:
+            if attachment:
+                stored = await store_upload(db, attachment, current_user.id)
+                uploaded_paths.append(stored.path)
+    
+    # Determine final attachment_path (JSON array or None)
+    attachment_path = json.dumps(uploaded_paths) if uploaded_paths else None
+    
+    # Handle IPD and OPD investigations separately due to FK constraints
+    if is_inpatient:
+        # Use InpatientScanResult for IPD investigations
+        existing_result = db.query(InpatientScanResult).filter(InpatientScanResult.investigation_id == investigation_id).first()
+    else:
+        # Use ScanResult for OPD investigations
+        existing_result = db.query(ScanResult).filter(ScanResult.investigation_id == investigation_id).first()
+    
+    if existing_result:
+        # Update existing result
+        existing_result.results_text = results_text
+        if uploaded_paths:
+            # Merge with existing attachments
+            existing_attachments = []
+            if existing_result.attachment_path:
+                try:
+                    existing_attachments = json.loads(existing_result.attachment_path)
+                    if not isinstance(existing_attachments, list):
+                        existing_attachments = [existing_result.attachment_path]
+                except:
+                    # If not JSON, treat as single attachment
+                    existing_attachments = [existing_result.attachment_path]
+            # Combine existing and new attachments
+            all_attachments = existing_attachments + uploaded_paths
+            existing_result.attachment_path = json.dumps(all_attachments)
+        existing_result.updated_by = current_user.id  # Track who updated
+        existing_result.updated_at = utcnow()
+        
+        # Mark investigation as completed if results are entered
+        if results_text or uploaded_paths:
+            if is_inpatient:
+                investigation.status = InpatientInvestigationStatus.COMPLETED.value
+            else:
+                investigation.status = InvestigationStatus.COMPLETED.value
+            investigation.completed_by = current_user.id  # Track who completed
+            # Ensure investigation is in session
+            db.add(investigation)
+    else:
+        # Create new result
+        if is_inpatient:
+            scan_result = InpatientScanResult(
+                investigation_id=investigation_id,
+                results_text=results_text,
+                attachment_path=attachment_path,
+                entered_by=current_user.id
+            )
+        else:
+            scan_result = ScanResult(
+                investigation_id=investigation_id,
+                results_text=results_text,
+                attachment_path=attachment_path,
+                entered_by=current_user.id
+            )
+        db.add(scan_result)
+        
+        # Mark investigation as completed if results are entered
+        if results_text or uploaded_paths:
+            if is_inpatient:
+                investigation.status = InpatientInvestigationStatus.COMPLETED.value
+            else:
+                investigation.status = InvestigationStatus.COMPLETED.value
+            investigation.completed_by = current_user.id  # Track who completed
+            # Ensure investigation is in session
+            db.add(investigation)
+    
+    db.commit()
+    # Refresh investigation to ensure status and completed_by are updated
+    db.refresh(investigation)
+    if existing_result:
+        db.refresh(existing_result)
+        # Get user names for response
+        entered_user = db.query(User).filter(User.id == existing_result.entered_by).first()
+        updated_user = db.query(User).filter(User.id == existing_result.updated_by).first() if existing_result.updated_by else None
+        result_dict = {
+            "id": existing_result.id,
+            "investigation_id": existing_result.investigation_id,
+            "results_text": existing_result.results_text,
+            "attachment_path": existing_result.attachment_path,
+            "entered_by": existing_result.entered_by,
+            "updated_by": existing_result.updated_by,
+            "created_at": existing_result.created_at,
+            "updated_at": existing_result.updated_at,
+            "entered_by_name": entered_user.full_name if entered_user else None,
+            "updated_by_name": updated_user.full_name if updated_user else None,
+        }
+        return ScanResultResponse(**result_dict)
+    else:
+        db.refresh(scan_result)
+        # Get user names for response
+        entered_user = db.query(User).filter(User.id == scan_result.entered_by).first()
+        result_dict = {
+            "id": scan_result.id,
+            "investigation_id": scan_result.investigation_id,
+            "results_text": scan_result.results_text,
+            "attachment_path": scan_result.attachment_path,
+            "entered_by": scan_result.entered_by,
+            "updated_by": scan_result.updated_by,
+            "created_at": scan_result.created_at,
+            "updated_at": scan_result.updated_at,
+            "entered_by_name": entered_user.full_name if entered_user else None,
+            "updated_by_name": None,
+        }
+        return ScanResultResponse(**result_dict)
+
+
+@router.get("/scan-result/investigation/{investigation_id}", response_model=Optional[ScanResultResponse])
+def get_scan_result(
+    investigation_id: int,
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get scan result for an investigation (supports both OPD and IPD investigations)"""
+    logger = logging.getLogger(__name__)
+    
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    ipd_investigation, opd_investigation = resolve_typed_investigation(db, investigation_id, source)
+    
+    if ipd_investigation:
+        logger.info(f"Found IPD investigation {investigation_id}, type: {ipd_investigation.investigation_type}")
+        # This is definitely an IPD investigation - ONLY query InpatientScanResult table
+        if ipd_investigation.investigation_type != "scan":
+            logger.info(f"IPD investigation {investigation_id} is not a scan investigation, returning None")
+            return None
+        
+        result = db.query(InpatientScanResult).filter(InpatientScanResult.investigation_id == investigation_id).first()
+        
+        if not result:
+            logger.info(f"No IPD scan result found for investigation {investigation_id}, returning None")
+            return None
+        
+        logger.info(f"Found IPD scan result for investigation {investigation_id}")
+        entered_user = db.query(User).filter(User.id == result.entered_by).first()
+        updated_user = db.query(User).filter(User.id == result.updated_by).first() if result.updated_by else None
+        
+        result_dict = {
+            "id": result.id,
+            "investigation_id": result.investigation_id,
+            "results_text": result.results_text,
+            "attachment_path": result.attachment_path,
+            "entered_by": result.entered_by,
+            "updated_by": result.updated_by,
+            "created_at": result.created_at,
+            "updated_at": result.updated_at,
+            "entered_by_name": entered_user.full_name if entered_user else None,
+            "updated_by_name": updated_user.full_name if updated_user else None,
+        }
+        return ScanResultResponse(**result_dict)
+    
+    # Not an IPD investigation - check OPD
+    logger.info(f"Investigation {investigation_id} is not IPD, checking OPD")
+    if not opd_investigation:
+        logger.info(f"No OPD investigation found for {investigation_id}, returning None")
+        return None
+    
+    if opd_investigation.investigation_type != "scan":
+        logger.info(f"OPD investigation {investigation_id} is not a scan investigation, returning None")
+        return None
+    
+    # Query OPD ScanResult table
+    result = db.query(ScanResult).filter(ScanResult.investigation_id == investigation_id).first()
+    
+    if not result:
+        logger.info(f"No OPD scan result found for investigation {investigation_id}, returning None")
+        return None
+    
+    logger.info(f"Found OPD scan result for investigation {investigation_id}")
+    entered_user = db.query(User).filter(User.id == result.entered_by).first()
+    updated_user = db.query(User).filter(User.id == result.updated_by).first() if result.updated_by else None
+    
+    result_dict = {
+        "id": result.id,
+        "investigation_id": result.investigation_id,
+        "results_text": result.results_text,
+        "attachment_path": result.attachment_path,
+        "entered_by": result.entered_by,
+        "updated_by": result.updated_by,
+        "created_at": result.created_at,
+        "updated_at": result.updated_at,
+        "entered_by_name": entered_user.full_name if entered_user else None,
+        "updated_by_name": updated_user.full_name if updated_user else None,
+    }
+    return ScanResultResponse(**result_dict)
+
+
+@router.get("/scan-result/{investigation_id}/download")
+def download_scan_result_attachment(
+    investigation_id: int,
+    request: Request,
+    attachment_path: Optional[str] = Query(None),
+    view: bool = Query(False, description="If true, open in browser instead of downloading"),
+    original: bool = Query(False, description="With view, send the uploaded file rather than its compressed copy"),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download scan result attachment file"""
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    resolved = resolve_investigation(db, investigation_id, source)
+    result = resolved.get_result(db, "scan") if resolved else None
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Scan result not found")
+    
+    if not result.attachment_path:
+        raise HTTPException(status_code=404, detail="No attachment found for this scan result")
+    
+    # Parse attachment_path (can be JSON array or single string)
+    attachment_paths = []
+    try:
+        parsed = json.loads(result.attachment_path)
+        attachment_paths = parsed if isinstance(parsed, list) else [result.attachment_path]
+    except:
+        attachment_paths = [result.attachment_path]
+    
+    # Use provided attachment_path or first one
+    target_path = attachment_path if attachment_path and attachment_path in attachment_paths else attachment_paths[0]
+    
+    # Build full file path (content-addressed store or a legacy upload path)
+    try:
+        file_path = resolve_attachment(target_path)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid attachment path")
+    
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="File not found on server")
+    
+    # Determine MIME type
+    mime_type, _ = mimetypes.guess_type(Path(target_path).name)
+    if not mime_type:
+        mime_type = "application/octet-stream"
+    
+    # Get filename for download
+    filename = Path(target_path).name  # stored files are named by hash; the path ends with the upload's name
+    
+    # Use inline for PDFs and images when viewing, attachment for others or when downloading
+    is_pdf_or_image = mime_type.startswith('image/') or mime_type == 'application/pdf'
+    disposition = 'inline' if (view and is_pdf_or_image) else 'attachment'
+    
+    # The viewer gets the compressed copy once it has been built
+    etag = attachment_etag(file_path, target_path)
+    if view and not original:
+        derivative = get_derivative(db, target_path)
+        if derivative:
+            file_path, mime_type, filename, etag = derivative
+    
+    # Streamed with ETag / Range support; a stored file named in the URL never changes
+    return attachment_response(
+        request, file_path, filename, mime_type, etag,
+        immutable=attachment_path == target_path and attachment_sha256(target_path) is not None, disposition=disposition
+    )
+
+
+@router.get("/scan-result/{investigation_id}/thumbnail")
+def get_scan_result_thumbnail(
+    investigation_id: int,
+    request: Request,
+    attachment_path: Optional[str] = Query(None),
+    size: int = Query(256, ge=32, le=1024, description="Longest side in pixels (rounded up to a cached size)"),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """JPEG preview of a scan result attachment (image or PDF first page)"""
+    return _attachment_thumbnail(request, db, investigation_id, source, "scan", attachment_path, size)
+
+
+@router.delete("/scan-result/{investigation_id}/attachment")
+def delete_scan_result_attachment(
+    investigation_id: int,
+    attachment_path: str = Query(...),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Scan", "Scan Head", "Admin"]))
+):
+    """Delete a specific attachment from scan result"""
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    resolved = resolve_investigation(db, investigation_id, source)
+    result = resolved.get_result(db, "scan") if resolved else None
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Scan result not found")
+    
+    if not result.attachment_path:
+        raise HTTPException(status_code=404, detail="No attachments found")
+    
+    # Parse attachment_path (can be JSON array or single string)
+    attachment_paths = []
+    try:
+        parsed = json.loads(result.attachment_path)
+        attachment_paths = parsed if isinstance(parsed, list) else [result.attachment_path]
+    except:
+        attachment_paths = [result.attachment_path]
+    
+    # Remove the specified attachment
+    if attachment_path not in attachment_paths:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    
+    attachment_paths.remove(attachment_path)
+    
+    # Release the file (deleted on commit unless another result shares its content)
+    release_attachment(db, attachment_path)
+    
+    # Update the result
+    if len(attachment_paths) == 0:
+        result.attachment_path = None
+    else:
+        result.attachment_path = json.dumps(attachment_paths)
+    
+    result.updated_by = current_user.id
+    result.updated_at = utcnow()
+    db.commit()
+    
+    return {"message": "Attachment deleted successfully"}
+
+
+# X-ray Result schemas
+class XrayResultCreate(BaseModel):
+    """X-ray result creation model"""
+    investigation_id: int
+    results_text: Optional[str] = None
+
+
+class XrayResultResponse(BaseModel):
+    """X-ray result response model"""
+    id: int
+    investigation_id: int
+    results_text: Optional[str]
+    attachment_path: Optional[str]
+    entered_by: int
+    updated_by: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+    # User names for display
+    entered_by_name: Optional[str] = None
+    updated_by_name: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/xray-result", response_model=XrayResultResponse, status_code=status.HTTP_201_CREATED)
+async def create_xray_result(
+    investigation_id: int = Form(...),
+    results_text: Optional[str] = Form(None),
+    attachments: Optional[List[UploadFile]] = File(None),
+    source: Optional[str] = Form(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Xray", "Xray Head", "Admin"]))
+):
+    """Create or update x-ray result with optional file attachment"""
+    logger = logging.getLogger(__name__)
+    
+    # Ensure investigation_id is an integer
+    try:
+        investigation_id = int(investigation_id)
+    except (ValueError, TypeError):
+        logger.error(f"Invalid investigation_id type: {type(investigation_id)}, value: {investigation_id}")
+        raise HTTPException(status_code=400, detail=f"Invalid investigation ID: {investigation_id}")
+    
+    logger.info(f"Creating xray result for investigation_id: {investigation_id} (type: {type(investigation_id)})")
+    
+    investigation = None
+    is_inpatient = False
+    
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    ipd_investigation, opd_investigation = resolve_typed_investigation(db, investigation_id, source)
+    if ipd_investigation:
+        logger.info(f"Found IPD investigation {investigation_id}, type: {ipd_investigation.investigation_type}")
+        investigation = ipd_investigation
+        is_inpatient = True
+    else:
+        # Not IPD, check OPD
+        logger.info(f"Investigation {investigation_id} not found in IPD, checking OPD")
+        investigation = opd_investigation
+        if not investigation:
+            logger.error(f"Investigation {investigation_id} not found in both IPD and OPD tables")
+            raise HTTPException(status_code=404, detail=f"Investigation not found: {investigation_id}")
+    
+    if investigation.investigation_type != "xray":
+        raise HTTPException(status_code=400, detail="This endpoint is only for x-ray investigations")
+    
+    # If investigation is completed, only Admin and Xray Head can edit
+    if is_inpatient:
+        if investigation.status == InpatientInvestigationStatus.COMPLETED.value:
+            if current_user.role not in ["Admin", "Xray Head"]:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Only Admin and Xray Head can edit completed investigations. Please contact Xray Head to revert the status."
+                )
+    else:
+        if investigation.status == InvestigationStatus.COMPLETED.value:
+            if current_user.role not in ["Admin", "Xray Head"]:
+                raise HTTPException(
+                    status_code=403,
+                    detail="Only Admin and Xray Head can edit completed investigations. Please contact Xray Head to revert the status."
+                )
+    
+    # Handle multiple file uploads
+    
+    uploaded_paths = []
+    if attachments:
+        # Process each uploaded file - streamed into the content-addressed store off the event loop,
+        # keeping the original filename as the last path segment
+        for attachment in attachments:
+            if attachment:
+                stored = await store_upload(db, attachment, current_user.id)
+                uploaded_paths.append(stored.path)
+    
+    # Determine final attachment_path (JSON array or None)
+    attachment_path = json.dumps(uploaded_paths) if uploaded_paths else None
+    
+    # Handle IPD and OPD investigations separately due to FK constraints
+    if is_inpatient:
+        # Use InpatientXrayResult for IPD investigations
+        existing_result = db.query(InpatientXrayResult).filter(InpatientXrayResult.investigation_id == investigation_id).first()
+    else:
+        # Use XrayResult for OPD investigations
+        existing_result = db.query(XrayResult).filter(XrayResult.investigation_id == investigation_id).first()
+    
+    if existing_result:
+        # Update existing result
+        existing_result.results_text = results_text
+        if uploaded_paths:
+            # Merge with existing attachments
+            existing_attachments = []
+            if existing_result.attachment_path:
+                try:
+                    existing_attachments = json.loads(existing_result.attachment_path)
+                    if not isinstance(existing_attachments, list):
+                        existing_attachments = [existing_result.attachment_path]
+                except:
+                    # If not JSON, treat as single attachment
+                    existing_attachments = [existing_result.attachment_path]
+            # Combine existing and new attachments
+            all_attachments = existing_attachments + uploaded_paths
+            existing_result.attachment_path = json.dumps(all_attachments)
+        existing_result.updated_by = current_user.id  # Track who updated
+        existing_result.updated_at = utcnow()
+        
+        # Mark investigation as completed if results are entered
+        if results_text or uploaded_paths:
+            if is_inpatient:
+                investigation.status = InpatientInvestigationStatus.COMPLETED.value
+            else:
+                investigation.status = InvestigationStatus.COMPLETED.value
+            investigation.completed_by = current_user.id  # Track who completed
+            # Ensure investigation is in session
+            db.add(investigation)
+    else:
+        # Create new result
+        if is_inpatient:
+            xray_result = InpatientXrayResult(
+                investigation_id=investigation_id,
+                results_text=results_text,
+                attachment_path=attachment_path,
+                entered_by=current_user.id
+            )
+        else:
+            xray_result = XrayResult(
+                investigation_id=investigation_id,
+                results_text=results_text,
+                attachment_path=attachment_path,
+                entered_by=current_user.id
+            )
+        db.add(xray_result)
+        
+        # Mark investigation as completed if results are entered
+        if results_text or uploaded_paths:
+            if is_inpatient:
+                investigation.status = InpatientInvestigationStatus.COMPLETED.value
+            else:
+                investigation.status = InvestigationStatus.COMPLETED.value
+            investigation.completed_by = current_user.id  # Track who completed
+            # Ensure investigation is in session
+            db.add(investigation)
+    
+    db.commit()
+    # Refresh investigation to ensure status and completed_by are updated
+    db.refresh(investigation)
+    if existing_result:
+        db.refresh(existing_result)
+        # Get user names for response
+        entered_user = db.query(User).filter(User.id == existing_result.entered_by).first()
+        updated_user = db.query(User).filter(User.id == existing_result.updated_by).first() if existing_result.updated_by else None
+        result_dict = {
+            "id": existing_result.id,
+            "investigation_id": existing_result.investigation_id,
+            "results_text": existing_result.results_text,
+            "attachment_path": existing_result.attachment_path,
+            "entered_by": existing_result.entered_by,
+            "updated_by": existing_result.updated_by,
+            "created_at": existing_result.created_at,
+            "updated_at": existing_result.updated_at,
+            "entered_by_name": entered_user.full_name if entered_user else None,
+            "updated_by_name": updated_user.full_name if updated_user else None,
+        }
+        return XrayResultResponse(**result_dict)
+    else:
+        db.refresh(xray_result)
+        # Get user names for response
+        entered_user = db.query(User).filter(User.id == xray_result.entered_by).first()
+        result_dict = {
+            "id": xray_result.id,
+            "investigation_id": xray_result.investigation_id,
+            "results_text": xray_result.results_text,
+            "attachment_path": xray_result.attachment_path,
+            "entered_by": xray_result.entered_by,
+            "updated_by": xray_result.updated_by,
+            "created_at": xray_result.created_at,
+            "updated_at": xray_result.updated_at,
+            "entered_by_name": entered_user.full_name if entered_user else None,
+            "updated_by_name": None,
+        }
+        return XrayResultResponse(**result_dict)
+
+
+@router.get("/xray-result/investigation/{investigation_id}", response_model=Optional[XrayResultResponse])
+def get_xray_result(
+    investigation_id: int,
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get x-ray result for an investigation (supports both OPD and IPD investigations)"""
+    logger = logging.getLogger(__name__)
+    
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    ipd_investigation, opd_investigation = resolve_typed_investigation(db, investigation_id, source)
+    
+    if ipd_investigation:
+        logger.info(f"Found IPD investigation {investigation_id}, type: {ipd_investigation.investigation_type}")
+        # This is definitely an IPD investigation - ONLY query InpatientXrayResult table
+        if ipd_investigation.investigation_type != "xray":
+            logger.info(f"IPD investigation {investigation_id} is not an xray investigation, returning None")
+            return None
+        
+        result = db.query(InpatientXrayResult).filter(InpatientXrayResult.investigation_id == investigation_id).first()
+        
+        if not result:
+            logger.info(f"No IPD xray result found for investigation {investigation_id}, returning None")
+            return None
+        
+        logger.info(f"Found IPD xray result for investigation {investigation_id}")
+        entered_user = db.query(User).filter(User.id == result.entered_by).first()
+        updated_user = db.query(User).filter(User.id == result.updated_by).first() if result.updated_by else None
+        
+        result_dict = {
+            "id": result.id,
+            "investigation_id": result.investigation_id,
+            "results_text": result.results_text,
+            "attachment_path": result.attachment_path,
+            "entered_by": result.entered_by,
+            "updated_by": result.updated_by,
+            "created_at": result.created_at,
+            "updated_at": result.updated_at,
+            "entered_by_name": entered_user.full_name if entered_user else None,
+            "updated_by_name": updated_user.full_name if updated_user else None,
+        }
+        return XrayResultResponse(**result_dict)
+    
+    # Not an IPD investigation - check OPD
+    logger.info(f"Investigation {investigation_id} is not IPD, checking OPD")
+    if not opd_investigation:
+        logger.info(f"No OPD investigation found for {investigation_id}, returning None")
+        return None
+    
+    if opd_investigation.investigation_type != "xray":
+        logger.info(f"OPD investigation {investigation_id} is not an xray investigation, returning None")
+        return None
+    
+    # Query OPD XrayResult table
+    result = db.query(XrayResult).filter(XrayResult.investigation_id == investigation_id).first()
+    
+    if not result:
+        logger.info(f"No OPD xray result found for investigation {investigation_id}, returning None")
+        return None
+    
+    logger.info(f"Found OPD xray result for investigation {investigation_id}")
+    entered_user = db.query(User).filter(User.id == result.entered_by).first()
+    updated_user = db.query(User).filter(User.id == result.updated_by).first() if result.updated_by else None
+    
+    result_dict = {
+        "id": result.id,
+        "investigation_id": result.investigation_id,
+        "results_text": result.results_text,
+        "attachment_path": result.attachment_path,
+        "entered_by": result.entered_by,
+        "updated_by": result.updated_by,
+        "created_at": result.created_at,
+        "updated_at": result.updated_at,
+        "entered_by_name": entered_user.full_name if entered_user else None,
+        "updated_by_name": updated_user.full_name if updated_user else None,
+    }
+    return XrayResultResponse(**result_dict)
+
+
+@router.get("/xray-result/{investigation_id}/download")
+def download_xray_result_attachment(
+    investigation_id: int,
+    request: Request,
+    attachment_path: Optional[str] = Query(None),
+    view: bool = Query(False, description="If true, open in browser instead of downloading"),
+    original: bool = Query(False, description="With view, send the uploaded file rather than its compressed copy"),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Download x-ray result attachment file"""
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    resolved = resolve_investigation(db, investigation_id, source)
+    result = resolved.get_result(db, "xray") if resolved else None
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="X-ray result not found")
+    
+    if not result.attachment_path:
+        raise HTTPException(status_code=404, detail="No attachment found for this x-ray result")
+    
+    # Parse attachment_path (can be JSON array or single string)
+    attachment_paths = []
+    try:
+        parsed = json.loads(result.attachment_path)
+        attachment_paths = parsed if isinstance(parsed, list) else [result.attachment_path]
+    except:
+        attachment_paths = [result.attachment_path]
+    
+    # Use provided attachment_path or first one
+    target_path = attachment_path if attachment_path and attachment_path in attachment_paths else attachment_paths[0]
+    
+    # Build full file path (content-addressed store or a legacy upload path)
+    try:
+        file_path = resolve_attachment(target_path)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid attachment path")
+    
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="File not found on server")
+    
+    # Determine MIME type
+    mime_type, _ = mimetypes.guess_type(Path(target_path).name)
+    if not mime_type:
+        mime_type = "application/octet-stream"
+    
+    # Get filename for download
+    filename = Path(target_path).name  # stored files are named by hash; the path ends with the upload's name
+    
+    # Use inline for PDFs and images when viewing, attachment for others or when downloading
+    is_pdf_or_image = mime_type.startswith('image/') or mime_type == 'application/pdf'
+    disposition = 'inline' if (view and is_pdf_or_image) else 'attachment'
+    
+    # The viewer gets the compressed copy once it has been built
+    etag = attachment_etag(file_path, target_path)
+    if view and not original:
+        derivative = get_derivative(db, target_path)
+        if derivative:
+            file_path, mime_type, filename, etag = derivative
+    
+    # Streamed with ETag / Range support; a stored file named in the URL never changes
+    return attachment_response(
+        request, file_path, filename, mime_type, etag,
+        immutable=attachment_path == target_path and attachment_sha256(target_path) is not None, disposition=disposition
+    )
+
+
+@router.get("/xray-result/{investigation_id}/thumbnail")
+def get_xray_result_thumbnail(
+    investigation_id: int,
+    request: Request,
+    attachment_path: Optional[str] = Query(None),
+    size: int = Query(256, ge=32, le=1024, description="Longest side in pixels (rounded up to a cached size)"),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """JPEG preview of a X-ray result attachment (image or PDF first page)"""
+    return _attachment_thumbnail(request, db, investigation_id, source, "xray", attachment_path, size)
+
+
+@router.delete("/xray-result/{investigation_id}/attachment")
+def delete_xray_result_attachment(
+    investigation_id: int,
+    attachment_path: str = Query(...),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="opd or ipd - which table investigation_id belongs to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Xray", "Xray Head", "Admin"]))
+):
+    """Delete a specific attachment from xray result"""
+    # OPD and IPD ids overlap - resolve against the table named by source (IPD first when omitted)
+    resolved = resolve_investigation(db, investigation_id, source)
+    result = resolved.get_result(db, "xray") if resolved else None
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="X-ray result not found")
+    
+    if not result.attachment_path:
+        raise HTTPException(status_code=404, detail="No attachments found")
+    
+    # Parse attachment_path (can be JSON array or single string)
+    attachment_paths = []
+    try:
+        parsed = json.loads(result.attachment_path)
+        attachment_paths = parsed if isinstance(parsed, list) else [result.attachment_path]
+    except:
+        attachment_paths = [result.attachment_path]
+    
+    # Remove the specified attachment
+    if attachment_path not in attachment_paths:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    
+    attachment_paths.remove(attachment_path)
+    
+    # Release the file (deleted on commit unless another result shares its content)
+    release_attachment(db, attachment_path)
+    
+    # Update the result
+    if len(attachment_paths) == 0:
+        result.attachment_path = None
+    else:
+        result.attachment_path = json.dumps(attachment_paths)
+    
+    result.updated_by = current_user.id
+    result.updated_at = utcnow()
+    db.commit()
+    
+    return {"message": "Attachment deleted successfully"}
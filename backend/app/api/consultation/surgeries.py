@@ -0,0 +1,304 @@
+"""
+Consultation: inpatient surgeries
+"""
+import logging
+from typing import Optional, List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow
+from app.core.dependencies import require_role
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.inpatient_surgery import InpatientSurgery
+from app.models.ward_admission import WardAdmission
+from app.models.bill import Bill, BillItem
+from app.services.price_list_service_v2 import get_surgery_price
+
+router = APIRouter()
+
+
+# Inpatient Surgery endpoints
+class InpatientSurgeryCreate(BaseModel):
+    """Request model for creating an inpatient surgery"""
+    g_drg_code: Optional[str] = None
+    surgery_name: str
+    surgery_type: Optional[str] = None
+    surgeon_name: Optional[str] = None
+    assistant_surgeon: Optional[str] = None
+    anesthesia_type: Optional[str] = None
+    surgery_date: Optional[datetime] = None
+    surgery_notes: Optional[str] = None
+
+
+class InpatientSurgeryUpdate(BaseModel):
+    """Request model for updating/completing an inpatient surgery"""
+    surgery_name: Optional[str] = None
+    surgery_type: Optional[str] = None
+    surgeon_name: Optional[str] = None
+    assistant_surgeon: Optional[str] = None
+    anesthesia_type: Optional[str] = None
+    surgery_date: Optional[datetime] = None
+    surgery_notes: Optional[str] = None
+    operative_notes: Optional[str] = None
+    post_operative_notes: Optional[str] = None
+    complications: Optional[str] = None
+    is_completed: Optional[bool] = None
+
+
+class InpatientSurgeryResponse(BaseModel):
+    """Response model for inpatient surgery"""
+    id: int
+    ward_admission_id: int
+    encounter_id: int
+    g_drg_code: Optional[str]
+    surgery_name: str
+    surgery_type: Optional[str]
+    surgeon_name: Optional[str]
+    assistant_surgeon: Optional[str]
+    anesthesia_type: Optional[str]
+    surgery_date: Optional[datetime]
+    surgery_notes: Optional[str]
+    operative_notes: Optional[str]
+    post_operative_notes: Optional[str]
+    complications: Optional[str]
+    is_completed: bool
+    completed_at: Optional[datetime]
+    completed_by: Optional[int]
+    created_by: int
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+@router.post("/ward-admissions/{ward_admission_id}/surgeries", response_model=InpatientSurgeryResponse, status_code=status.HTTP_201_CREATED)
+def create_inpatient_surgery(
+    ward_admission_id: int,
+    surgery_data: InpatientSurgeryCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Create a new surgery record for an inpatient"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    surgery = InpatientSurgery(
+        ward_admission_id=ward_admission_id,
+        encounter_id=ward_admission.encounter_id,
+        g_drg_code=surgery_data.g_drg_code,
+        surgery_name=surgery_data.surgery_name,
+        surgery_type=surgery_data.surgery_type,
+        surgeon_name=surgery_data.surgeon_name,
+        assistant_surgeon=surgery_data.assistant_surgeon,
+        anesthesia_type=surgery_data.anesthesia_type,
+        surgery_date=surgery_data.surgery_date,
+        surgery_notes=surgery_data.surgery_notes,
+        created_by=current_user.id
+    )
+    db.add(surgery)
+    db.commit()
+    db.refresh(surgery)
+    
+    return surgery
+
+
+@router.get("/ward-admissions/{ward_admission_id}/surgeries", response_model=List[InpatientSurgeryResponse])
+def get_inpatient_surgeries(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all surgeries for a ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    surgeries = db.query(InpatientSurgery).filter(
+        InpatientSurgery.ward_admission_id == ward_admission_id
+    ).order_by(InpatientSurgery.created_at.desc()).all()
+    
+    return surgeries
+
+
+@router.get("/ward-admissions/{ward_admission_id}/surgeries/{surgery_id}", response_model=InpatientSurgeryResponse)
+def get_inpatient_surgery(
+    ward_admission_id: int,
+    surgery_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get a single surgery by ID"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    surgery = db.query(InpatientSurgery).filter(
+        InpatientSurgery.id == surgery_id,
+        InpatientSurgery.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not surgery:
+        raise HTTPException(status_code=404, detail="Surgery not found")
+    
+    return surgery
+
+
+@router.put("/ward-admissions/{ward_admission_id}/surgeries/{surgery_id}", response_model=InpatientSurgeryResponse)
+def update_inpatient_surgery(
+    ward_admission_id: int,
+    surgery_id: int,
+    surgery_data: InpatientSurgeryUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Admin"]))
+):
+    """Update a surgery record (including completion)"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    surgery = db.query(InpatientSurgery).filter(
+        InpatientSurgery.id == surgery_id,
+        InpatientSurgery.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not surgery:
+        raise HTTPException(status_code=404, detail="Surgery not found")
+    
+    # Track if surgery is being completed (was False, now True)
+    was_completed = surgery.is_completed
+    is_being_completed = False
+    
+    # Update fields
+    update_data = surgery_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(surgery, field, value)
+    
+    # Handle completion
+    if surgery_data.is_completed is not None:
+        surgery.is_completed = surgery_data.is_completed
+        if surgery_data.is_completed and not surgery.completed_at:
+            surgery.completed_at = utcnow()
+            surgery.completed_by = current_user.id
+            # Check if surgery is being completed (was not completed before)
+            if not was_completed:
+                is_being_completed = True
+        elif not surgery_data.is_completed:
+            surgery.completed_at = None
+            surgery.completed_by = None
+    
+    surgery.updated_at = utcnow()
+    
+    # If surgery is being completed, create bill item
+    if is_being_completed and surgery.g_drg_code:
+        try:
+            # Get encounter to determine insurance status
+            encounter = db.query(Encounter).filter(Encounter.id == surgery.encounter_id).first()
+            if encounter:
+                is_insured = encounter.ccc_number is not None and encounter.ccc_number.strip() != ""
+                
+                # Find or create an unpaid bill for this encounter
+                bill = db.query(Bill).filter(
+                    Bill.encounter_id == encounter.id,
+                    Bill.is_paid == False
+                ).first()
+                
+                if not bill:
+                    # Create new bill
+                    bill = Bill(
+                        encounter_id=encounter.id,
+                        patient_id=encounter.patient_id,
+                        is_insured=is_insured,
+                        total_amount=0.0,
+                        created_by=current_user.id
+                    )
+                    db.add(bill)
+                    db.flush()
+                
+                # Check if surgery item already exists for this surgery
+                existing_surgery_item = db.query(BillItem).filter(
+                    BillItem.bill_id == bill.id,
+                    BillItem.item_code == surgery.g_drg_code,
+                    BillItem.category == "surgery"
+                ).first()
+                
+                if not existing_surgery_item:
+                    # Get surgery price from SurgeryPrice table only (exclude procedure/day surgery prices)
+                    surgery_price = get_surgery_price(
+                        db,
+                        surgery.g_drg_code,
+                        is_insured=is_insured,
+                        service_type=encounter.department if encounter.department else None
+                    )
+                    
+                    if surgery_price > 0:
+                        # Create bill item for surgery
+                        surgery_item = BillItem(
+                            bill_id=bill.id,
+                            item_code=surgery.g_drg_code,
+                            item_name=f"Surgery: {surgery.surgery_name}",
+                            category="surgery",
+                            quantity=1.0,
+                            unit_price=surgery_price,
+                            total_price=surgery_price
+                        )
+                        db.add(surgery_item)
+                        bill.total_amount += surgery_price
+        except Exception as e:
+            # Log error but don't fail surgery update
+            logging.error(f"Failed to create bill item for completed surgery {surgery.id}: {str(e)}")
+            # Continue with surgery update even if billing fails
+    
+    db.commit()
+    db.refresh(surgery)
+    
+    return surgery
+
+
+@router.delete("/ward-admissions/{ward_admission_id}/surgeries/{surgery_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_inpatient_surgery(
+    ward_admission_id: int,
+    surgery_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Delete a surgery record and its corresponding bill item if billed - Admin only"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    surgery = db.query(InpatientSurgery).filter(
+        InpatientSurgery.id == surgery_id,
+        InpatientSurgery.ward_admission_id == ward_admission_id
+    ).first()
+    
+    if not surgery:
+        raise HTTPException(status_code=404, detail="Surgery not found")
+    
+    # If surgery has a g_drg_code, find and delete corresponding bill item
+    if surgery.g_drg_code:
+        # Find bill items for this surgery (by g_drg_code and category "surgery")
+        bill_items = db.query(BillItem).join(Bill).filter(
+            Bill.encounter_id == surgery.encounter_id,
+            BillItem.item_code == surgery.g_drg_code,
+            BillItem.category == "surgery"
+        ).all()
+        
+        for bill_item in bill_items:
+            bill = db.query(Bill).filter(Bill.id == bill_item.bill_id).first()
+            if bill:
+                # Subtract the bill item total from bill total
+                bill.total_amount -= bill_item.total_price
+                # Ensure bill total doesn't go negative
+                if bill.total_amount < 0:
+                    bill.total_amount = 0.0
+            db.delete(bill_item)
+    
+    # Delete the surgery record
+    db.delete(surgery)
+    db.commit()
+    return None
@@ -0,0 +1,1039 @@
+"""
+Consultation: ward admissions - ward board, transfers, discharge, daily ward state and census
+"""
+import logging
+from typing import Optional, List
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Response, Query, Request
+from sqlalchemy.orm import Session, joinedload
+from pydantic import BaseModel
+from app.core.database import get_db
+from app.core.datetime_utils import utcnow, today
+from app.core.dependencies import require_role
+from app.core.n_plus_one import query_budget
+from app.models.user import User
+from app.models.encounter import Encounter
+from app.models.ward_admission import WardAdmission
+from app.models.ward_transfer import WardTransfer
+from app.models.bed import Bed
+from app.models.patient import Patient
+from app.models.bill import Bill
+from app.models.inpatient_prescription import InpatientPrescription
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.ward_census import WardCensusEvent, WardCensusEventType
+from app.services.ward_board import get_ward_admission_rows, get_ward_board, parse_fields
+from app.services.bed_occupancy import claim_bed, release_bed, bed_index
+from app.services import discharge_summary
+from app.services.discharge_summary import prerender_discharge_summary
+from app.services.ward_census import get_ward_census, rebuild_all_census
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# Ward admissions endpoints
+class WardAdmissionResponse(BaseModel):
+    """Ward admission response model"""
+    id: int
+    encounter_id: int
+    ward: str
+    bed_id: Optional[int] = None
+    bed_number: Optional[str] = None
+    doctor_id: Optional[int] = None
+    doctor_name: Optional[str] = None
+    doctor_username: Optional[str] = None
+    admitted_by: int
+    admitted_at: datetime
+    discharged_at: Optional[datetime] = None
+    discharged_by: Optional[int] = None
+    discharge_outcome: Optional[str] = None
+    discharge_condition: Optional[str] = None
+    partially_discharged_at: Optional[datetime] = None
+    partially_discharged_by: Optional[int] = None
+    final_orders: Optional[str] = None
+    
+    # Patient and encounter details
+    patient_name: Optional[str] = None
+    patient_surname: Optional[str] = None
+    patient_other_names: Optional[str] = None
+    patient_card_number: Optional[str] = None
+    patient_gender: Optional[str] = None
+    patient_date_of_birth: Optional[str] = None
+    encounter_created_at: Optional[datetime] = None
+    encounter_service_type: Optional[str] = None
+    admitted_by_name: Optional[str] = None
+    admitted_by_role: Optional[str] = None
+    
+    # Emergency contact details (from ward_admission or patient)
+    emergency_contact_name: Optional[str] = None
+    emergency_contact_relationship: Optional[str] = None
+    emergency_contact_number: Optional[str] = None
+    
+    # Admission documentation
+    admission_notes: Optional[str] = None
+    # Note: clinical_review, nurses_notes, nurses_mid_documentation, and vitals are now in separate tables
+    # They will be loaded separately via their respective endpoints
+
+
+@router.get("/ward-admissions", response_model=List[WardAdmissionResponse])
+@query_budget(3)  # user, rows, admitting/discharging/doctor names
+def get_ward_admissions(
+    ward: Optional[str] = None,
+    include_discharged: Optional[bool] = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get ward admissions - by default only shows active (non-discharged) patients"""
+    return get_ward_admission_rows(db, ward, bool(include_discharged))
+
+
+@router.get("/ward-admissions/board")
+@query_budget(3)  # user, rows, admitting/discharging/doctor names
+def get_ward_board_endpoint(
+    ward: Optional[str] = None,
+    include_discharged: bool = False,
+    since: Optional[datetime] = Query(None, description="server_time of the previous refresh; only changed rows are returned"),
+    fields: Optional[str] = Query(None, description="Comma-separated row fields to return (id is always included)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """
+    Ward board for frequent refreshes. Same rows as /ward-admissions, plus
+    incremental updates (since=) and field projection (fields=).
+    """
+    try:
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return get_ward_board(db, ward, include_discharged, since, selected_fields)
+
+
+class TransferPatientRequest(BaseModel):
+    """Request to transfer a patient between wards or beds"""
+    ward_admission_id: int
+    from_ward: str
+    to_ward: str
+    bed_id: int
+    transfer_reason: Optional[str] = None
+
+
+@router.post("/ward-admissions/transfer")
+def transfer_patient(
+    form_data: TransferPatientRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Transfer a patient between wards or beds"""
+    # Get the ward admission
+    ward_admission = db.query(WardAdmission).filter(
+        WardAdmission.id == form_data.ward_admission_id
+    ).first()
+    
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at:
+        raise HTTPException(status_code=400, detail="Cannot transfer a discharged patient")
+    
+    if ward_admission.death_recorded_at:
+        raise HTTPException(status_code=400, detail="Cannot transfer a deceased patient")
+    
+    # Verify bed exists and is available (only check if not a ward transfer, as bed will be checked on acceptance)
+    bed = db.query(Bed).filter(Bed.id == form_data.bed_id).first()
+    if not bed:
+        raise HTTPException(status_code=404, detail="Bed not found")
+    
+    if bed.ward != form_data.to_ward:
+        raise HTTPException(status_code=400, detail=f"Bed does not belong to ward {form_data.to_ward}")
+    
+    # Check if transferring to a different ward
+    is_ward_transfer = form_data.from_ward != form_data.to_ward
+    
+    if not is_ward_transfer:
+        # For same-ward bed transfers, check if bed is available
+        if bed.is_occupied:
+            raise HTTPException(status_code=400, detail="Bed is already occupied")
+    
+    # Check if there's already a pending transfer for this patient
+    if is_ward_transfer:
+        existing_pending_transfer = db.query(WardTransfer).filter(
+            WardTransfer.ward_admission_id == form_data.ward_admission_id,
+            WardTransfer.status == "pending"
+        ).first()
+        
+        if existing_pending_transfer:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Patient already has a pending transfer request. Please wait for it to be accepted or rejected before creating another transfer."
+            )
+    
+    if is_ward_transfer:
+        # For ward transfers, create a pending transfer record
+        # Don't update ward admission or beds yet - wait for acceptance
+        transfer = WardTransfer(
+            ward_admission_id=ward_admission.id,
+            from_ward=form_data.from_ward,
+            to_ward=form_data.to_ward,
+            transfer_reason=form_data.transfer_reason,
+            status="pending",
+            transferred_by=current_user.id,
+            transferred_at=utcnow()
+        )
+        db.add(transfer)
+        db.commit()
+        db.refresh(transfer)
+        
+        return {
+            "id": transfer.id,
+            "ward_admission_id": ward_admission.id,
+            "from_ward": form_data.from_ward,
+            "to_ward": form_data.to_ward,
+            "bed_id": form_data.bed_id,
+            "status": "pending",
+            "message": "Transfer request created. Waiting for receiving ward to accept."
+        }
+    else:
+        # For same-ward bed transfers, process immediately
+        # Claim the new bed first so a lost race leaves the patient in the old one
+        try:
+            claim_bed(db, bed)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        
+        # Free up the old bed if it exists
+        release_bed(db, ward_admission.bed_id)
+        
+        # Update ward admission
+        ward_admission.bed_id = form_data.bed_id
+        ward_admission.updated_at = utcnow()
+        
+        # Create transfer record (auto-accepted for same-ward transfers)
+        transfer = WardTransfer(
+            ward_admission_id=ward_admission.id,
+            from_ward=form_data.from_ward,
+            to_ward=form_data.to_ward,
+            transfer_reason=form_data.transfer_reason,
+            status="accepted",
+            transferred_by=current_user.id,
+            accepted_by=current_user.id,
+            transferred_at=utcnow(),
+            accepted_at=utcnow()
+        )
+        db.add(transfer)
+        
+        db.commit()
+        db.refresh(ward_admission)
+        db.refresh(transfer)
+        db.refresh(bed)
+        
+        return {
+            "id": transfer.id,
+            "ward_admission_id": ward_admission.id,
+            "from_ward": form_data.from_ward,
+            "to_ward": form_data.to_ward,
+            "bed_id": form_data.bed_id,
+            "status": "accepted",
+            "message": "Patient transferred successfully"
+        }
+
+
+@router.get("/ward-admissions/pending-transfers")
+def get_pending_transfers(
+    ward: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get pending transfer requests for a ward"""
+    query = db.query(WardTransfer).filter(
+        WardTransfer.status == "pending"
+    )
+    
+    if ward:
+        query = query.filter(WardTransfer.to_ward == ward)
+    
+    transfers = query.options(
+        joinedload(WardTransfer.ward_admission).joinedload(WardAdmission.encounter).joinedload(Encounter.patient),
+        joinedload(WardTransfer.transferrer)
+    ).order_by(WardTransfer.transferred_at.desc()).all()
+    
+    result = []
+    for transfer in transfers:
+        ward_admission = transfer.ward_admission
+        encounter = ward_admission.encounter if ward_admission else None
+        patient = encounter.patient if encounter else None
+        
+        if not patient:
+            continue
+        
+        result.append({
+            "id": transfer.id,
+            "ward_admission_id": ward_admission.id,
+            "from_ward": transfer.from_ward,
+            "to_ward": transfer.to_ward,
+            "transfer_reason": transfer.transfer_reason,
+            "status": transfer.status,
+            "transferred_by_name": transfer.transferrer.full_name if transfer.transferrer else None,
+            "transferred_at": transfer.transferred_at,
+            "patient_name": patient.name,
+            "patient_surname": patient.surname,
+            "patient_card_number": patient.card_number,
+            "patient_gender": patient.gender,
+            "current_ward": ward_admission.ward,
+            "current_bed_id": ward_admission.bed_id,
+        })
+    
+    return result
+
+
+@router.get("/ward-admissions/{ward_admission_id}", response_model=WardAdmissionResponse)
+@query_budget(5)  # user, admission with encounter/patient/bed, three user names
+def get_ward_admission(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get a single ward admission by ID"""
+    try:
+        ward_admission = db.query(WardAdmission).options(
+            joinedload(WardAdmission.encounter).joinedload(Encounter.patient),
+            joinedload(WardAdmission.bed)
+        ).filter(WardAdmission.id == ward_admission_id).first()
+        
+        if not ward_admission:
+            raise HTTPException(status_code=404, detail="Ward admission not found")
+        
+        encounter = ward_admission.encounter
+        if not encounter:
+            raise HTTPException(status_code=404, detail="Encounter not found for this ward admission")
+        
+        patient = encounter.patient
+        if not patient:
+            raise HTTPException(status_code=404, detail="Patient not found for this encounter")
+        
+        # Get admitted_by user info
+        admitted_by_name = None
+        admitted_by_role = None
+        if ward_admission.admitted_by:
+            admitted_user = db.query(User).filter(User.id == ward_admission.admitted_by).first()
+            if admitted_user:
+                admitted_by_name = admitted_user.full_name
+                admitted_by_role = admitted_user.role
+        
+        # Get discharged_by user info if discharged
+        discharged_by_name = None
+        discharged_by_role = None
+        if ward_admission.discharged_by:
+            discharged_user = db.query(User).filter(User.id == ward_admission.discharged_by).first()
+            if discharged_user:
+                discharged_by_name = discharged_user.full_name
+                discharged_by_role = discharged_user.role
+        
+        # Get emergency contact directly from patient table
+        emergency_contact_name = patient.emergency_contact_name
+        emergency_contact_relationship = patient.emergency_contact_relationship
+        emergency_contact_number = patient.emergency_contact_number
+        
+        # Get bed information
+        bed_number = None
+        if ward_admission.bed_id:
+            if ward_admission.bed:
+                bed_number = ward_admission.bed.bed_number
+            else:
+                logger.warning("Ward admission %s has bed_id=%s but no such bed", ward_admission.id, ward_admission.bed_id)
+        
+        # Get doctor information (doctor under whose care)
+        doctor_id = ward_admission.doctor_id
+        doctor_name = None
+        doctor_username = None
+        if doctor_id:
+            doctor_user = db.query(User).filter(User.id == doctor_id).first()
+            if doctor_user:
+                doctor_name = doctor_user.full_name
+                doctor_username = doctor_user.username
+        
+        return {
+            "id": ward_admission.id,
+            "encounter_id": ward_admission.encounter_id,
+            "ward": ward_admission.ward,
+            "bed_id": ward_admission.bed_id,
+            "bed_number": bed_number,
+            "doctor_id": doctor_id,
+            "doctor_name": doctor_name,
+            "doctor_username": doctor_username,
+            "admitted_by": ward_admission.admitted_by,
+            "admitted_at": ward_admission.admitted_at,
+            "discharged_at": ward_admission.discharged_at,
+            "discharged_by": ward_admission.discharged_by,
+            "discharge_outcome": ward_admission.discharge_outcome,
+            "discharge_condition": ward_admission.discharge_condition,
+            "partially_discharged_at": ward_admission.partially_discharged_at,
+            "partially_discharged_by": ward_admission.partially_discharged_by,
+            "final_orders": ward_admission.final_orders,
+            "patient_name": patient.name,
+            "patient_surname": patient.surname,
+            "patient_other_names": patient.other_names,
+            "patient_card_number": patient.card_number,
+            "patient_gender": patient.gender,
+            "patient_date_of_birth": patient.date_of_birth.isoformat() if patient.date_of_birth else None,
+            "encounter_created_at": encounter.created_at,
+            "encounter_service_type": encounter.department,
+            "admitted_by_name": admitted_by_name,
+            "admitted_by_role": admitted_by_role,
+            "discharged_by_name": discharged_by_name,
+            "discharged_by_role": discharged_by_role,
+            "emergency_contact_name": emergency_contact_name,
+            "emergency_contact_relationship": emergency_contact_relationship,
+            "emergency_contact_number": emergency_contact_number,
+            "admission_notes": ward_admission.admission_notes,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error in get_ward_admission: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error fetching ward admission: {str(e)}")
+
+
+class PartialDischargeRequest(BaseModel):
+    """Request for partial discharge"""
+    discharge_outcome: str  # discharged, absconded, referred, died, discharged_against_medical_advice
+    discharge_condition: str  # stable, cured, died, absconded
+    final_orders: Optional[str] = None  # Doctor's final orders/notes
+
+
+class FinalDischargeRequest(BaseModel):
+    """Request for final discharge"""
+    discharge_outcome: str  # discharged, absconded, referred, died, discharged_against_medical_advice
+    discharge_condition: str  # stable, cured, died, absconded
+    final_orders: Optional[str] = None  # Doctor's final orders/notes
+
+
+@router.post("/ward-admissions/{ward_admission_id}/partial-discharge")
+def partial_discharge_patient(
+    ward_admission_id: int,
+    request: PartialDischargeRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Initiate partial discharge - allows doctor to give final orders before final discharge"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Patient has already been discharged")
+    
+    if ward_admission.partially_discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Patient has already been partially discharged")
+    
+    # Validate outcome and condition
+    valid_outcomes = ["discharged", "absconded", "referred", "died", "discharged_against_medical_advice"]
+    valid_conditions = ["stable", "cured", "delivered", "improved", "not_improved", "died", "absconded"]
+    
+    if request.discharge_outcome not in valid_outcomes:
+        raise HTTPException(status_code=400, detail=f"Invalid discharge outcome. Must be one of: {', '.join(valid_outcomes)}")
+    
+    if request.discharge_condition not in valid_conditions:
+        raise HTTPException(status_code=400, detail=f"Invalid discharge condition. Must be one of: {', '.join(valid_conditions)}")
+    
+    # Mark as partially discharged
+    ward_admission.partially_discharged_at = utcnow()
+    ward_admission.partially_discharged_by = current_user.id
+    ward_admission.discharge_outcome = request.discharge_outcome
+    ward_admission.discharge_condition = request.discharge_condition
+    ward_admission.final_orders = request.final_orders
+    ward_admission.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(ward_admission)
+    
+    return {
+        "id": ward_admission.id,
+        "encounter_id": ward_admission.encounter_id,
+        "ward": ward_admission.ward,
+        "partially_discharged_at": ward_admission.partially_discharged_at,
+        "partially_discharged_by": ward_admission.partially_discharged_by,
+        "discharge_outcome": ward_admission.discharge_outcome,
+        "discharge_condition": ward_admission.discharge_condition,
+        "message": "Partial discharge initiated successfully. Please ensure all bills are paid before final discharge."
+    }
+
+
+@router.post("/ward-admissions/{ward_admission_id}/revert-partial-discharge")
+def revert_partial_discharge(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Revert partial discharge - allows staff to undo partial discharge if services were missed"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Cannot revert partial discharge for a fully discharged patient")
+    
+    if ward_admission.partially_discharged_at is None:
+        raise HTTPException(status_code=400, detail="Patient has not been partially discharged")
+    
+    # Revert partial discharge fields
+    ward_admission.partially_discharged_at = None
+    ward_admission.partially_discharged_by = None
+    ward_admission.discharge_outcome = None
+    ward_admission.discharge_condition = None
+    ward_admission.final_orders = None
+    ward_admission.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(ward_admission)
+    
+    return {
+        "id": ward_admission.id,
+        "encounter_id": ward_admission.encounter_id,
+        "ward": ward_admission.ward,
+        "message": "Partial discharge reverted successfully. You can now add services and discharge again when ready."
+    }
+
+
+@router.put("/ward-admissions/{ward_admission_id}/discharge")
+def final_discharge_patient(
+    ward_admission_id: int,
+    request: FinalDischargeRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Final discharge - checks bills are paid before completing discharge"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    if ward_admission.discharged_at is not None:
+        raise HTTPException(status_code=400, detail="Patient has already been discharged")
+    
+    # Check if partially discharged first
+    if ward_admission.partially_discharged_at is None:
+        raise HTTPException(status_code=400, detail="Patient must be partially discharged first before final discharge")
+    
+    # Validate outcome and condition
+    valid_outcomes = ["discharged", "absconded", "referred", "died", "discharged_against_medical_advice"]
+    valid_conditions = ["stable", "cured", "delivered", "improved", "not_improved", "died", "absconded"]
+    
+    if request.discharge_outcome not in valid_outcomes:
+        raise HTTPException(status_code=400, detail=f"Invalid discharge outcome. Must be one of: {', '.join(valid_outcomes)}")
+    
+    if request.discharge_condition not in valid_conditions:
+        raise HTTPException(status_code=400, detail=f"Invalid discharge condition. Must be one of: {', '.join(valid_conditions)}")
+    
+    # Check if all bills are paid (skip check for died or absconded patients)
+    is_died_or_absconded = (
+        request.discharge_outcome in ["died", "absconded"] or 
+        request.discharge_condition in ["died", "absconded"]
+    )
+    
+    if not is_died_or_absconded:
+        encounter = ward_admission.encounter
+        if encounter:
+            unpaid_bills = db.query(Bill).filter(
+                Bill.encounter_id == encounter.id,
+                Bill.is_paid == False
+            ).all()
+            
+            if unpaid_bills:
+                total_unpaid = sum(bill.total_amount - bill.paid_amount for bill in unpaid_bills)
+                if total_unpaid > 0.01:  # Allow small rounding differences
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Cannot discharge patient. Outstanding bills amount to GHC {total_unpaid:.2f}. All bills must be paid before discharge."
+                    )
+    
+    # Free up the bed
+    release_bed(db, ward_admission.bed_id)
+    
+    # Update discharge information (in case it changed from partial discharge)
+    ward_admission.discharge_outcome = request.discharge_outcome
+    ward_admission.discharge_condition = request.discharge_condition
+    if request.final_orders:
+        ward_admission.final_orders = request.final_orders
+    
+    # Mark as fully discharged
+    ward_admission.discharged_at = utcnow()
+    ward_admission.discharged_by = current_user.id
+    ward_admission.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(ward_admission)
+
+    # Render the discharge summary now so records and claims can print it straight away
+    background_tasks.add_task(prerender_discharge_summary, ward_admission.id)
+    
+    return {
+        "id": ward_admission.id,
+        "encounter_id": ward_admission.encounter_id,
+        "ward": ward_admission.ward,
+        "discharged_at": ward_admission.discharged_at,
+        "discharged_by": ward_admission.discharged_by,
+        "discharge_outcome": ward_admission.discharge_outcome,
+        "discharge_condition": ward_admission.discharge_condition,
+        "message": "Patient discharged successfully"
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/discharge-summary")
+def get_discharge_summary(
+    ward_admission_id: int,
+    request: Request,
+    format: str = Query("pdf", description="pdf, html or json"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin", "Records", "Claims"]))
+):
+    """
+    Discharge summary for an admission - diagnoses, medications, investigations,
+    surgeries, transfers, reviews and vitals. Rendered documents are cached on disk
+    until the record changes; X-Cache says whether this one was.
+    """
+    if format == "json":
+        record = discharge_summary.gather_discharge_record(db, ward_admission_id)
+        if record is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ward admission not found")
+        return record
+
+    try:
+        summary = discharge_summary.get_discharge_summary(db, ward_admission_id, format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except discharge_summary.RenderError:
+        logger.exception("Discharge summary for admission %s could not be rendered", ward_admission_id)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="The discharge summary could not be rendered")
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ward admission not found")
+
+    # One tag per format: the PDF and HTML renders of a record must not validate each other
+    etag = f'"{summary["digest"]}-{format}"'
+    headers = {
+        "ETag": etag,
+        "X-Cache": "hit" if summary["cached"] else "miss",
+        "Content-Disposition": f'inline; filename="discharge-summary-{ward_admission_id}.{format}"',
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=summary["content"], media_type=summary["media_type"], headers=headers)
+
+
+@router.get("/inpatient-prescription/patient/{card_number}")
+def get_inpatient_prescriptions_by_patient_card(
+    card_number: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Pharmacy", "Pharmacy Head", "Admin"]))
+):
+    """Get all inpatient prescriptions for a patient by card number"""
+    # Verify patient exists
+    patient = db.query(Patient).filter(Patient.card_number == card_number).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    # Get all ward admissions for this patient
+    # First get encounters for this patient, then get ward admissions
+    patient_encounters = db.query(Encounter).filter(
+        Encounter.patient_id == patient.id
+    ).all()
+    
+    if not patient_encounters:
+        return []
+    
+    encounter_ids = [e.id for e in patient_encounters]
+    
+    ward_admissions = db.query(WardAdmission).filter(
+        WardAdmission.encounter_id.in_(encounter_ids),
+        WardAdmission.discharged_at.is_(None)  # Only active admissions
+    ).all()
+    
+    if not ward_admissions:
+        return []
+    
+    ward_admission_ids = [wa.id for wa in ward_admissions]
+    
+    # Get all clinical reviews for these ward admissions
+    clinical_reviews = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.ward_admission_id.in_(ward_admission_ids)
+    ).all()
+    
+    if not clinical_reviews:
+        return []
+    
+    clinical_review_ids = [cr.id for cr in clinical_reviews]
+    
+    # Get all inpatient prescriptions for these clinical reviews
+    prescriptions = db.query(InpatientPrescription).filter(
+        InpatientPrescription.clinical_review_id.in_(clinical_review_ids)
+    ).order_by(InpatientPrescription.created_at.desc()).all()
+    
+    result = []
+    for p in prescriptions:
+        clinical_review = next((cr for cr in clinical_reviews if cr.id == p.clinical_review_id), None)
+        if not clinical_review:
+            continue
+        
+        ward_admission = next((wa for wa in ward_admissions if wa.id == clinical_review.ward_admission_id), None)
+        if not ward_admission:
+            continue
+        
+        # Get prescriber info
+        prescriber = db.query(User).filter(User.id == p.prescribed_by).first()
+        prescriber_name = prescriber.full_name if prescriber else "Unknown"
+        
+        # Get confirmer info if confirmed
+        confirmer_name = None
+        if p.confirmed_by:
+            confirmer = db.query(User).filter(User.id == p.confirmed_by).first()
+            confirmer_name = confirmer.full_name if confirmer else "Unknown"
+        
+        # Get dispenser info if dispensed
+        dispenser_name = None
+        if p.dispensed_by:
+            dispenser = db.query(User).filter(User.id == p.dispensed_by).first()
+            dispenser_name = dispenser.full_name if dispenser else "Unknown"
+        
+        result.append({
+            "id": p.id,
+            "prescription_type": "inpatient",
+            "clinical_review_id": p.clinical_review_id,
+            "ward_admission_id": ward_admission.id,
+            "encounter_id": ward_admission.encounter_id,
+            "ward": ward_admission.ward,
+            "medicine_code": p.medicine_code,
+            "medicine_name": p.medicine_name,
+            "dose": p.dose,
+            "unit": p.unit,
+            "frequency": p.frequency,
+            "frequency_value": p.frequency_value,
+            "duration": p.duration,
+            "instructions": p.instructions,
+            "quantity": p.quantity,
+            "prescribed_by": p.prescribed_by,
+            "prescriber_name": prescriber_name,
+            "confirmed_by": p.confirmed_by,
+            "confirmer_name": confirmer_name,
+            "confirmed_at": p.confirmed_at,
+            "dispensed_by": p.dispensed_by,
+            "dispenser_name": dispenser_name,
+            "is_external": bool(p.is_external) if hasattr(p, 'is_external') else False,
+            "created_at": p.created_at,
+            "is_confirmed": p.confirmed_by is not None,
+            "is_dispensed": p.dispensed_by is not None
+        })
+    
+    return result
+
+
+def calculate_age(date_of_birth):
+    """Calculate age from date of birth"""
+    if not date_of_birth:
+        return None
+    today_date = today()
+    return today_date.year - date_of_birth.year - ((today_date.month, today_date.day) < (date_of_birth.month, date_of_birth.day))
+
+
+@router.get("/ward-admissions/daily-state/{ward}")
+def get_daily_ward_state(
+    ward: str,
+    date: Optional[str] = None,  # Date in YYYY-MM-DD format, defaults to today
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """
+    Get daily ward state statistics for a specific ward.
+    Counts come from the ward census (one row per ward per day); the patient
+    lists come from that day's census events in a single joined query.
+    """
+    # Parse date or use today
+    if date:
+        try:
+            target_date = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    else:
+        target_date = datetime.now().date()
+    
+    census = get_ward_census(db, ward, target_date, target_date)[0]
+    
+    bed_index.ensure_fresh(db)
+    total_beds = bed_index.total_count(ward)
+    occupied_beds = census["closing"]
+    empty_beds = total_beds - occupied_beds
+    
+    # Patients behind the day's movements
+    day_events = db.query(WardCensusEvent, WardAdmission, Patient).join(
+        WardAdmission, WardAdmission.id == WardCensusEvent.ward_admission_id
+    ).join(
+        Encounter, Encounter.id == WardAdmission.encounter_id
+    ).join(
+        Patient, Patient.id == Encounter.patient_id
+    ).filter(
+        WardCensusEvent.ward == ward,
+        WardCensusEvent.event_date == target_date,
+        WardCensusEvent.event_type != WardCensusEventType.TRANSFER_OUT.value
+    ).order_by(WardCensusEvent.event_at, WardCensusEvent.id).all()
+    
+    patient_lists = {
+        WardCensusEventType.ADMISSION.value: [],
+        WardCensusEventType.TRANSFER_IN.value: [],
+        WardCensusEventType.DISCHARGE.value: [],
+        WardCensusEventType.DEATH.value: [],
+    }
+    for census_event, admission, patient in day_events:
+        is_transfer = census_event.event_type == WardCensusEventType.TRANSFER_IN.value
+        entry = {
+            "id": census_event.transfer_id if is_transfer else admission.id,
+            "office_no": admission.id,  # Using admission ID as office number
+            "name": f"{patient.name} {patient.surname}",
+            "age": calculate_age(patient.date_of_birth) if patient.date_of_birth else None,
+            "gender": patient.gender,
+            "male": 1 if patient.gender and patient.gender.lower() == "male" else 0,
+            "female": 1 if patient.gender and patient.gender.lower() == "female" else 0,
+            "official": 1 if admission.ccc_number else 0,  # Official if has CCC
+            "non_official": 0 if admission.ccc_number else 1,
+        }
+        if is_transfer:
+            entry["from_ward"] = census_event.related_ward
+        patient_lists[census_event.event_type].append(entry)
+    
+    return {
+        "ward": ward,
+        "date": target_date.isoformat(),
+        "statistics": {
+            "remained_previous_day": census["opening"],
+            "new_admissions": census["admissions"],
+            "transfers_in": census["transfers_in"],
+            "total_admissions": census["admissions"] + census["transfers_in"],
+            "transfers_out": census["transfers_out"],
+            "total_discharges": census["discharges"],
+            "total_deaths": census["deaths"],
+            "remained_at_midnight": census["closing"],
+            "empty_beds": empty_beds,
+            "total_beds": total_beds,
+            "occupied_beds": occupied_beds,
+        },
+        "admissions": patient_lists[WardCensusEventType.ADMISSION.value],
+        "transfers_in": patient_lists[WardCensusEventType.TRANSFER_IN.value],
+        "discharges": patient_lists[WardCensusEventType.DISCHARGE.value],
+        "deaths": patient_lists[WardCensusEventType.DEATH.value],
+    }
+
+
+@router.get("/ward-admissions/census/{ward}")
+def get_ward_census_range(
+    ward: str,
+    start_date: str,  # YYYY-MM-DD
+    end_date: Optional[str] = None,  # YYYY-MM-DD, defaults to start_date
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Daily census and bed occupancy for a ward over a date range (read from the census table)"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else start
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="Date range cannot exceed 366 days")
+    
+    bed_index.ensure_fresh(db)
+    total_beds = bed_index.total_count(ward)
+    
+    days = get_ward_census(db, ward, start, end)
+    for day in days:
+        day["total_beds"] = total_beds
+        day["occupancy_rate"] = round(day["closing"] / total_beds * 100, 1) if total_beds else None
+    
+    patient_days = sum(day["closing"] for day in days)
+    return {
+        "ward": ward,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "total_beds": total_beds,
+        "patient_days": patient_days,
+        "average_occupancy_rate": round(patient_days / (total_beds * len(days)) * 100, 1) if total_beds else None,
+        "days": days,
+    }
+
+
+@router.post("/ward-admissions/census/rebuild")
+def rebuild_ward_census_endpoint(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Regenerate the ward census event log and daily census from admissions and transfers (Admin only)"""
+    result = rebuild_all_census(db)
+    db.commit()
+    return {"message": "Ward census rebuilt", **result}
+
+
+class AcceptTransferRequest(BaseModel):
+    """Request to accept a transfer"""
+    bed_id: int  # Bed to assign in the receiving ward
+
+
+@router.post("/ward-admissions/transfers/{transfer_id}/accept")
+def accept_transfer(
+    transfer_id: int,
+    form_data: AcceptTransferRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Accept a pending transfer request"""
+    # Get the transfer
+    transfer = db.query(WardTransfer).filter(
+        WardTransfer.id == transfer_id
+    ).first()
+    
+    if not transfer:
+        raise HTTPException(status_code=404, detail="Transfer not found")
+    
+    if transfer.status != "pending":
+        raise HTTPException(status_code=400, detail=f"Transfer is already {transfer.status}")
+    
+    # Verify the user has permission to accept transfers for the receiving ward
+    # (This is handled by the role requirement, but you could add ward-specific checks)
+    
+    # Get the ward admission
+    ward_admission = db.query(WardAdmission).filter(
+        WardAdmission.id == transfer.ward_admission_id
+    ).first()
+    
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    # Verify bed exists and is available
+    bed = db.query(Bed).filter(Bed.id == form_data.bed_id).first()
+    if not bed:
+        raise HTTPException(status_code=404, detail="Bed not found")
+    
+    if bed.ward != transfer.to_ward:
+        raise HTTPException(status_code=400, detail=f"Bed does not belong to ward {transfer.to_ward}")
+    
+    if bed.is_occupied:
+        raise HTTPException(status_code=400, detail="Bed is already occupied")
+    
+    # Claim the new bed first so a lost race leaves the patient in the old one
+    try:
+        claim_bed(db, bed)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    # Free up the old bed if it exists
+    release_bed(db, ward_admission.bed_id)
+    
+    # Update ward admission
+    ward_admission.ward = transfer.to_ward
+    ward_admission.bed_id = form_data.bed_id
+    ward_admission.updated_at = utcnow()
+    
+    # Update transfer status
+    transfer.status = "accepted"
+    transfer.accepted_by = current_user.id
+    transfer.accepted_at = utcnow()
+    transfer.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(ward_admission)
+    db.refresh(transfer)
+    db.refresh(bed)
+    
+    return {
+        "id": transfer.id,
+        "ward_admission_id": ward_admission.id,
+        "from_ward": transfer.from_ward,
+        "to_ward": transfer.to_ward,
+        "bed_id": form_data.bed_id,
+        "status": "accepted",
+        "message": "Transfer accepted successfully"
+    }
+
+
+class RejectTransferRequest(BaseModel):
+    """Request to reject a transfer"""
+    rejection_reason: Optional[str] = None
+
+
+@router.post("/ward-admissions/transfers/{transfer_id}/reject")
+def reject_transfer(
+    transfer_id: int,
+    form_data: RejectTransferRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Reject a pending transfer request"""
+    # Get the transfer
+    transfer = db.query(WardTransfer).filter(
+        WardTransfer.id == transfer_id
+    ).first()
+    
+    if not transfer:
+        raise HTTPException(status_code=404, detail="Transfer not found")
+    
+    if transfer.status != "pending":
+        raise HTTPException(status_code=400, detail=f"Transfer is already {transfer.status}")
+    
+    # Update transfer status
+    transfer.status = "rejected"
+    transfer.rejected_by = current_user.id
+    transfer.rejection_reason = form_data.rejection_reason
+    transfer.rejected_at = utcnow()
+    transfer.updated_at = utcnow()
+    
+    db.commit()
+    db.refresh(transfer)
+    
+    return {
+        "id": transfer.id,
+        "status": "rejected",
+        "message": "Transfer rejected successfully"
+    }
+
+
+@router.get("/ward-admissions/{ward_admission_id}/transfers")
+def get_ward_admission_transfers(
+    ward_admission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Nurse", "Doctor", "PA", "Admin"]))
+):
+    """Get all transfers for a specific ward admission"""
+    ward_admission = db.query(WardAdmission).filter(WardAdmission.id == ward_admission_id).first()
+    if not ward_admission:
+        raise HTTPException(status_code=404, detail="Ward admission not found")
+    
+    transfers = db.query(WardTransfer).filter(
+        WardTransfer.ward_admission_id == ward_admission_id
+    ).options(
+        joinedload(WardTransfer.transferrer),
+        joinedload(WardTransfer.accepter),
+        joinedload(WardTransfer.rejecter)
+    ).order_by(WardTransfer.transferred_at.desc()).all()
+    
+    result = []
+    for transfer in transfers:
+        result.append({
+            "id": transfer.id,
+            "from_ward": transfer.from_ward,
+            "to_ward": transfer.to_ward,
+            "transfer_reason": transfer.transfer_reason,
+            "status": transfer.status,
+            "transferred_by": transfer.transferred_by,
+            "transferred_by_name": transfer.transferrer.full_name if transfer.transferrer else None,
+            "transferred_at": transfer.transferred_at,
+            "accepted_by": transfer.accepted_by,
+            "accepted_by_name": transfer.accepter.full_name if transfer.accepter else None,
+            "accepted_at": transfer.accepted_at,
+            "rejected_by": transfer.rejected_by,
+            "rejected_by_name": transfer.rejecter.full_name if transfer.rejecter else None,
+            "rejection_reason": transfer.rejection_reason,
+            "rejected_at": transfer.rejected_at,
+        })
+    
+    return result
@@ -324,3 +324,44 @@ def get_database_info(
         logger.error(f"Error getting database info: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+@router.get("/storage/attachments")
+def get_attachment_storage(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Stored result attachments and their compressed copies - counts, bytes and space saved"""
+    from app.services.attachment_compression import get_compression_stats
+    return get_compression_stats(db)
+
+
+@router.post("/storage/attachments/compress")
+def compress_attachments(
+    limit: int = 500,
+    retry_failed: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Queue compression of attachments stored before compression was available (or that failed)"""
+    from app.services.attachment_compression import queue_pending_compression
+    queued = queue_pending_compression(db, limit=limit, retry_failed=retry_failed)
+    return {"queued": queued}
+
+
+@router.get("/pool")
+def get_connection_pool_stats(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Live connection pool state - checked out / overflow connections, waits and timeouts (plus SQLite pragmas)"""
+    from app.core.database import get_pool_stats
+    return get_pool_stats()
+
+
+@router.get("/replica")
+def get_read_replica_status(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Read-replica routing - whether reports are served from the replica, its lag and why not"""
+    from app.core.read_replica import replica_router
+    return replica_router.status()
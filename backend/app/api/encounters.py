@@ -115,16 +115,24 @@ def get_encounter_bill_total(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get total bill amount for an encounter"""
+    """Get total bill amount for an encounter (from the denormalized encounter totals)"""
     from app.models.bill import Bill
     
-    bills = db.query(Bill).filter(Bill.encounter_id == encounter_id).all()
-    total_amount = sum(bill.total_amount for bill in bills)
+    encounter = db.query(
+        Encounter.bill_total_amount,
+        Encounter.bill_paid_amount,
+        Encounter.bill_balance
+    ).filter(Encounter.id == encounter_id).first()
+    if not encounter:
+        raise HTTPException(status_code=404, detail="Encounter not found")
+    bill_count = db.query(Bill.id).filter(Bill.encounter_id == encounter_id).count()
     
     return {
         "encounter_id": encounter_id,
-        "total_bill_amount": total_amount,
-        "bill_count": len(bills)
+        "total_bill_amount": encounter.bill_total_amount or 0.0,
+        "paid_amount": encounter.bill_paid_amount or 0.0,
+        "balance": encounter.bill_balance or 0.0,
+        "bill_count": bill_count
     }
 
 
@@ -0,0 +1,157 @@
+"""
+Push channel API endpoints
+Server-Sent Events stream of committed changes (see app.services.change_feed),
+so worklist, ward board, transfer, blood bank, pharmacy and billing screens
+apply deltas instead of re-downloading their lists on a timer.
+"""
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.database import SessionLocal
+from app.core.dependencies import get_current_user
+from app.core.security import decode_access_token
+from app.models.user import User
+from app.services.event_bus import TOPICS, ChangeEvent, event_bus
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+
+
+def _parse_topics(topics: Optional[str]) -> Optional[List[str]]:
+    if not topics or not topics.strip():
+        return None
+    requested = [topic.strip() for topic in topics.split(",") if topic.strip()]
+    unknown = [topic for topic in requested if topic not in TOPICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topic(s): {', '.join(unknown)}")
+    return requested
+
+
+def _stream_user(request: Request, token: Optional[str]) -> User:
+    """
+    Authenticate a stream from the Authorization header or ?token= (EventSource
+    cannot send headers). The session is closed before streaming starts so a
+    long-lived connection does not hold a database connection.
+    """
+    header = request.headers.get("authorization", "")
+    if header.lower().startswith("bearer "):
+        token = header[7:]
+    payload = decode_access_token(token) if token else None
+    if not payload or payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == int(payload["sub"])).first()
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+def _sse(event_name: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_name}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _change(event: ChangeEvent) -> str:
+    return _sse(event.topic, event.to_dict(), event.id)
+
+
+@router.get("/topics")
+def get_event_topics(current_user: User = Depends(get_current_user)):
+    """Topics available on the push channel and channel statistics"""
+    return {"topics": TOPICS, **event_bus.stats()}
+
+
+@router.get("/recent")
+def get_recent_events(
+    since: int = Query(0, ge=0, description="Last event id the client has applied"),
+    topics: Optional[str] = Query(None, description="Comma-separated topics; empty for all"),
+    ward: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Buffered events after since, for clients that cannot hold a stream open.
+    resync=true means events were dropped from the buffer: reload the lists.
+    """
+    events = event_bus.recent(since, _parse_topics(topics), ward)
+    return {
+        "last_event_id": event_bus.last_event_id,
+        "resync": events is None,
+        "events": [e.to_dict() for e in events or []],
+    }
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    topics: Optional[str] = Query(None, description="Comma-separated topics; empty for all"),
+    ward: Optional[str] = Query(None, description="Only changes for this ward (and changes not tied to a ward)"),
+    token: Optional[str] = Query(None, description="Access token, for EventSource clients"),
+    last_event_id: Optional[int] = Query(None, ge=0, description="Resume after this event id"),
+):
+    """
+    Server-Sent Events stream of changes.
+
+    Events:
+        ready  - {"last_event_id"} on connect
+        <topic> - one ChangeEvent (id: is its sequence number)
+        resync - changes were missed; reload the lists, then keep listening
+    Reconnecting clients resume from Last-Event-ID.
+    """
+    topic_list = _parse_topics(topics)
+    await run_in_threadpool(_stream_user, request, token)
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+
+    subscription, replay = event_bus.subscribe(topic_list, ward, last_event_id)
+
+    async def event_stream():
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n"
+            yield _sse("ready", {"last_event_id": event_bus.last_event_id})
+            if replay is None:
+                yield _sse("resync", {"reason": "events since last_event_id are no longer available"})
+            else:
+                for event in replay:
+                    yield _change(event)
+
+            while True:
+                if await request.is_disconnected():
+                    break
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    yield _sse("resync", {"reason": "client fell behind"})
+                    continue
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _change(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -10,6 +10,9 @@ from app.core.database import get_db
 from app.core.dependencies import require_role, get_current_user
 from app.models.user import User
 from app.models.lab_result_template import LabResultTemplate
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/lab-templates", tags=["lab-templates"])
 
@@ -37,20 +40,15 @@ def generate_sample_id(
     """
     from app.models.lab_result import LabResult
     from app.models.inpatient_lab_result import InpatientLabResult
-    from app.models.investigation import Investigation
-    from app.models.inpatient_investigation import InpatientInvestigation
+    from app.services.investigation_resolver import resolve_investigation
     from datetime import datetime
     import json
     
     # If investigation_id is provided, determine source automatically
     if investigation_id and not source:
-        ipd_investigation = db.query(InpatientInvestigation).filter(InpatientInvestigation.id == investigation_id).first()
-        if ipd_investigation:
-            source = 'inpatient'
-        else:
-            opd_investigation = db.query(Investigation).filter(Investigation.id == investigation_id).first()
-            if opd_investigation:
-                source = 'opd'
+        resolved = resolve_investigation(db, investigation_id)
+        if resolved:
+            source = 'inpatient' if resolved.is_inpatient else 'opd'
     
     now = datetime.utcnow()
     year = now.year % 100  # Last 2 digits of year (e.g., 25 for 2025)
@@ -65,10 +63,6 @@ def generate_sample_id(
     max_sample_num = 0
     found_sample_ids = []  # For debugging
     
-    # Import logging for debugging
-    import logging
-    logger = logging.getLogger(__name__)
-    
     # Force a fresh query by expiring all objects in the session
     # This ensures we see the latest committed data
     db.expire_all()
@@ -80,14 +74,11 @@ def generate_sample_id(
         LabResult.template_data.isnot(None)
     ).all()
     
-    logger.info(f"Checking {len(opd_results)} OPD lab results for sample IDs with prefix {year_month_prefix}")
-    print(f"[SAMPLE_ID_DEBUG] Checking {len(opd_results)} OPD lab results for sample IDs with prefix {year_month_prefix}")
+    logger.debug("Checking %s OPD lab results for sample IDs with prefix %s", len(opd_results), year_month_prefix)
     
     for result in opd_results:
         if result.template_data:
             try:
-                # Log the raw template_data to see what we're working with
-                print(f"[SAMPLE_ID_DEBUG] OPD investigation_id={result.investigation_id}, template_data type: {type(result.template_data)}, value: {result.template_data}")
                 
                 # Handle both dict and JSON string formats
                 template_data = None
@@ -98,39 +89,34 @@ def generate_sample_id(
                     try:
                         template_data = json.loads(result.template_data)
                     except json.JSONDecodeError as e:
-                        logger.warning(f"Failed to parse OPD template_data as JSON for investigation_id={result.investigation_id}: {e}")
-                        print(f"[SAMPLE_ID_DEBUG] Failed to parse OPD JSON: {e}")
+                        logger.warning("Failed to parse OPD template_data as JSON for investigation_id=%s: %s", result.investigation_id, e)
                         continue
                 else:
-                    logger.warning(f"Unexpected template_data type: {type(result.template_data)} for investigation_id={result.investigation_id}")
-                    print(f"[SAMPLE_ID_DEBUG] Unexpected OPD template_data type: {type(result.template_data)}")
+                    logger.warning("Unexpected template_data type: %s for investigation_id=%s", type(result.template_data), result.investigation_id)
                     continue
                 
                 if not isinstance(template_data, dict):
-                    print(f"[SAMPLE_ID_DEBUG] OPD template_data is not a dict after parsing: {type(template_data)}")
                     continue
                 
                 sample_no = template_data.get('sample_no', '')
-                print(f"[SAMPLE_ID_DEBUG] OPD investigation_id={result.investigation_id}, sample_no: '{sample_no}' (type: {type(sample_no)})")
-                logger.debug(f"OPD investigation_id={result.investigation_id}, sample_no from template_data: '{sample_no}' (type: {type(sample_no)})")
+                logger.debug("OPD investigation_id=%s, sample_no from template_data: '%s' (type: %s)", result.investigation_id, sample_no, type(sample_no))
                 # Check if sample_no matches the current year/month pattern (9 characters: YYMMNNNNN = 2+2+5)
                 if sample_no and isinstance(sample_no, str):
                     sample_no = sample_no.strip()
-                    logger.debug(f"OPD sample_no after strip: '{sample_no}', len={len(sample_no)}, prefix match: {sample_no[:4] == year_month_prefix if len(sample_no) >= 4 else False}")
-                    print(f"[SAMPLE_ID_DEBUG] OPD sample_no after strip: '{sample_no}', len={len(sample_no)}, prefix: {sample_no[:4] if len(sample_no) >= 4 else 'N/A'}, expected: {year_month_prefix}")
+                    logger.debug("OPD sample_no after strip: '%s', len=%s, prefix match: %s", sample_no, len(sample_no), sample_no[:4] == year_month_prefix if len(sample_no) >= 4 else False)
                     if len(sample_no) == 9 and sample_no[:4] == year_month_prefix:
                         try:
                             sample_num = int(sample_no[4:])  # Extract the last 5 digits
                             found_sample_ids.append(f"OPD:{sample_no}")
-                            logger.info(f"Found OPD sample ID: {sample_no} (num: {sample_num})")
+                            logger.debug("Found OPD sample ID: %s (num: %s)", sample_no, sample_num)
                             if sample_num > max_sample_num:
                                 max_sample_num = sample_num
                         except (ValueError, TypeError) as e:
-                            logger.warning(f"Failed to parse sample number from {sample_no}: {e}")
+                            logger.warning("Failed to parse sample number from %s: %s", sample_no, e)
                 elif sample_no:
-                    logger.warning(f"OPD sample_no is not a string: {sample_no} (type: {type(sample_no)})")
+                    logger.warning("OPD sample_no is not a string: %s (type: %s)", sample_no, type(sample_no))
             except Exception as e:
-                logger.error(f"Error processing OPD result investigation_id={result.investigation_id}: {e}", exc_info=True)
+                logger.error("Error processing OPD result investigation_id=%s: %s", result.investigation_id, e, exc_info=True)
     
     # Check IPD lab results (always check, regardless of source)
     # Force fresh query
@@ -138,14 +124,11 @@ def generate_sample_id(
         InpatientLabResult.template_data.isnot(None)
     ).all()
     
-    logger.info(f"Checking {len(ipd_results)} IPD lab results for sample IDs with prefix {year_month_prefix}")
-    print(f"[SAMPLE_ID_DEBUG] Checking {len(ipd_results)} IPD lab results for sample IDs with prefix {year_month_prefix}")
+    logger.debug("Checking %s IPD lab results for sample IDs with prefix %s", len(ipd_results), year_month_prefix)
     
     for result in ipd_results:
         if result.template_data:
             try:
-                # Log the raw template_data to see what we're working with
-                print(f"[SAMPLE_ID_DEBUG] IPD investigation_id={result.investigation_id}, template_data type: {type(result.template_data)}, value: {result.template_data}")
                 
                 # Handle both dict and JSON string formats
                 template_data = None
@@ -156,39 +139,34 @@ def generate_sample_id(
                     try:
                         template_data = json.loads(result.template_data)
                     except json.JSONDecodeError as e:
-                        logger.warning(f"Failed to parse IPD template_data as JSON for investigation_id={result.investigation_id}: {e}")
-                        print(f"[SAMPLE_ID_DEBUG] Failed to parse IPD JSON: {e}")
+                        logger.warning("Failed to parse IPD template_data as JSON for investigation_id=%s: %s", result.investigation_id, e)
                         continue
                 else:
-                    logger.warning(f"Unexpected template_data type: {type(result.template_data)} for investigation_id={result.investigation_id}")
-                    print(f"[SAMPLE_ID_DEBUG] Unexpected IPD template_data type: {type(result.template_data)}")
+                    logger.warning("Unexpected template_data type: %s for investigation_id=%s", type(result.template_data), result.investigation_id)
                     continue
                 
                 if not isinstance(template_data, dict):
-                    print(f"[SAMPLE_ID_DEBUG] IPD template_data is not a dict after parsing: {type(template_data)}")
                     continue
                 
                 sample_no = template_data.get('sample_no', '')
-                print(f"[SAMPLE_ID_DEBUG] IPD investigation_id={result.investigation_id}, sample_no: '{sample_no}' (type: {type(sample_no)})")
-                logger.debug(f"IPD investigation_id={result.investigation_id}, sample_no from template_data: '{sample_no}' (type: {type(sample_no)})")
+                logger.debug("IPD investigation_id=%s, sample_no from template_data: '%s' (type: %s)", result.investigation_id, sample_no, type(sample_no))
                 # Check if sample_no matches the current year/month pattern (9 characters: YYMMNNNNN = 2+2+5)
                 if sample_no and isinstance(sample_no, str):
                     sample_no = sample_no.strip()
-                    logger.debug(f"IPD sample_no after strip: '{sample_no}', len={len(sample_no)}, prefix match: {sample_no[:4] == year_month_prefix if len(sample_no) >= 4 else False}")
-                    print(f"[SAMPLE_ID_DEBUG] IPD sample_no after strip: '{sample_no}', len={len(sample_no)}, prefix: {sample_no[:4] if len(sample_no) >= 4 else 'N/A'}, expected: {year_month_prefix}")
+                    logger.debug("IPD sample_no after strip: '%s', len=%s, prefix match: %s", sample_no, len(sample_no), sample_no[:4] == year_month_prefix if len(sample_no) >= 4 else False)
                     if len(sample_no) == 9 and sample_no[:4] == year_month_prefix:
                         try:
                             sample_num = int(sample_no[4:])  # Extract the last 5 digits
                             found_sample_ids.append(f"IPD:{sample_no}")
-                            logger.info(f"Found IPD sample ID: {sample_no} (num: {sample_num})")
+                            logger.debug("Found IPD sample ID: %s (num: %s)", sample_no, sample_num)
                             if sample_num > max_sample_num:
                                 max_sample_num = sample_num
                         except (ValueError, TypeError) as e:
-                            logger.warning(f"Failed to parse sample number from {sample_no}: {e}")
+                            logger.warning("Failed to parse sample number from %s: %s", sample_no, e)
                 elif sample_no:
-                    logger.warning(f"IPD sample_no is not a string: {sample_no} (type: {type(sample_no)})")
+                    logger.warning("IPD sample_no is not a string: %s (type: %s)", sample_no, type(sample_no))
             except Exception as e:
-                logger.error(f"Error processing IPD result investigation_id={result.investigation_id}: {e}", exc_info=True)
+                logger.error("Error processing IPD result investigation_id=%s: %s", result.investigation_id, e, exc_info=True)
     
     # Generate next sample number (always increment, even if max_sample_num is 0)
     # This ensures sequential numbering across both OPD and IPD tables
@@ -200,10 +178,8 @@ def generate_sample_id(
     sample_id = f"{year_month_prefix}{next_sample_num:05d}"
     
     # Log for debugging
-    logger.info(f"Generated sample ID: {sample_id} (max found: {max_sample_num}, year_month: {year_month_prefix}, source: {source}, investigation_id: {investigation_id})")
-    logger.info(f"Found {len(found_sample_ids)} sample IDs: {found_sample_ids[:10]}")  # Log first 10 for debugging
-    print(f"[SAMPLE_ID_DEBUG] Generated sample ID: {sample_id} (max found: {max_sample_num}, year_month: {year_month_prefix})")
-    print(f"[SAMPLE_ID_DEBUG] Found {len(found_sample_ids)} sample IDs: {found_sample_ids}")
+    logger.info("Generated sample ID: %s (max found: %s, year_month: %s, source: %s, investigation_id: %s)", sample_id, max_sample_num, year_month_prefix, source, investigation_id)
+    logger.debug("Found %s sample IDs: %s", len(found_sample_ids), found_sample_ids[:10])
     
     return {"sample_id": sample_id}
 
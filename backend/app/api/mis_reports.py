@@ -7,7 +7,7 @@ from sqlalchemy import and_, or_, func
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, date, timedelta
-from app.core.database import get_db
+from app.core.read_replica import get_read_db
 from app.core.dependencies import require_role
 from app.models.user import User
 from app.models.encounter import Encounter, EncounterStatus
@@ -18,7 +18,6 @@ from app.models.investigation import Investigation
 from app.models.lab_result import LabResult
 from app.models.scan_result import ScanResult
 from app.models.xray_result import XrayResult
-import pandas as pd
 from io import BytesIO
 from fastapi.responses import StreamingResponse
 from app.api.mis_reports_morbidity import (
@@ -102,7 +101,7 @@ def get_consulting_room_register(
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     department: Optional[str] = Query(None, description="Filter by department(s) - comma-separated for multiple"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Records", "Doctor", "PA"]))
 ):
     """
@@ -294,12 +293,14 @@ def export_consulting_room_register(
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     department: Optional[str] = Query(None, description="Filter by department(s) - comma-separated for multiple"),
     clinic_name: str = Query("Asesewa Government Hospital", description="Clinic name for header"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Records", "Doctor", "PA"]))
 ):
     """
     Export Consulting Room Register as Excel file matching DHIMS template format
     """
+    import pandas as pd
+    
     try:
         # Get report data
         report_response = get_consulting_room_register(
@@ -469,7 +470,7 @@ def get_statement_of_outpatient(
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     departments: Optional[str] = Query(None, description="Comma-separated list of departments"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Records"]))
 ):
     """
@@ -655,12 +656,14 @@ def export_statement_of_outpatient(
     clinic_city: str = Query("Asesewa", description="Clinic city for header"),
     clinic_region: str = Query("N/A", description="Clinic region for header"),
     clinic_district: str = Query("N/A", description="Clinic district for header"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Records"]))
 ):
     """
     Export Statement of Outpatient as Excel file matching DHIMS template format
     """
+    import pandas as pd
+    
     try:
         # Get report data
         report_response = get_statement_of_outpatient(
@@ -798,7 +801,7 @@ def get_opd_morbidity(
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     departments: Optional[str] = Query(None, description="Comma-separated list of departments"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Records"]))
 ):
     """
@@ -948,12 +951,14 @@ def export_opd_morbidity(
     clinic_city: str = Query("Asesewa", description="Clinic city for header"),
     clinic_region: str = Query("N/A", description="Clinic region for header"),
     clinic_district: str = Query("N/A", description="Clinic district for header"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["Admin", "Records"]))
 ):
     """
     Export OPD Morbidity Report as Excel file matching DHIMS template format
     """
+    import pandas as pd
+    
     try:
         # Get report data
         report_response = get_opd_morbidity(
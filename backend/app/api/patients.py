@@ -1,7 +1,7 @@
 """
 Patient management endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_, and_
 from pydantic import BaseModel
@@ -12,11 +12,16 @@ import io
 from app.core.database import get_db
 from app.core.dependencies import require_role, get_current_user
 from app.core.datetime_utils import today
+from app.core.n_plus_one import query_budget
 from app.models.user import User
 from app.models.patient import Patient
 from app.models.encounter import Encounter, EncounterStatus
 from app.utils.card_number import generate_card_number, generate_ccc_number
 from app.core.audit import log_activity
+from app.services.investigation_worklist import refresh_patient_details
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
@@ -345,7 +350,7 @@ def get_patient_by_card(
         return list(patients) if patients else []
     except Exception as e:
         # Log the error and return empty list
-        print(f"Error in card number search: {e}")
+        logger.exception("Error in card number search: %s", e)
         return []
 
 
@@ -378,16 +383,13 @@ def search_patient_by_ccc(
             )
         ).all()
         
-        # Debug logging (remove in production)
-        print(f"CCC/Insurance search term: '{search_term}', Upper: '{search_term_upper}', Found: {len(patients)} patients")
+        logger.debug("CCC/Insurance search: %d patients", len(patients))
         
         # Ensure we always return a list, even if it's empty or has one item
         return list(patients) if patients else []
     except Exception as e:
         # Log the error and return empty list
-        print(f"Error in CCC/Insurance number search: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in CCC/Insurance number search: %s", e)
         return []
 
 
@@ -432,26 +434,16 @@ def search_patient_by_name(
         if term_conditions:
             filter_condition = or_(*term_conditions)
             
-            # Debug: print the SQL query
-            print(f"Name search - Term: '{search_term}', Terms: {search_terms}")
-            
             patients = db.query(Patient).filter(filter_condition).all()
-            
-            # Debug: print query results
-            print(f"Query returned {len(patients)} patients")
-            for p in patients[:3]:  # Print first 3 for debugging
-                print(f"  - ID: {p.id}, Name: {p.name}, Surname: {p.surname}")
+            logger.debug("Name search: %d terms, %d patients", len(search_terms), len(patients))
         else:
-            print("No filter condition generated - no search terms")
             patients = []
         
         # Ensure we always return a list, even if it's empty or has one item
         return list(patients) if patients else []
     except Exception as e:
         # Log the error and return empty list
-        print(f"Error in name search: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in name search: %s", e)
         return []
 
 
@@ -481,14 +473,13 @@ def search_patient_by_contact(
             )
         ).all()
         
-        # Debug logging
-        print(f"Contact search term: '{contact_number}', Cleaned: '{search_term}', Found: {len(patients)} patients")
+        logger.debug("Contact search: %d patients", len(patients))
         
         # Ensure we always return a list, even if it's empty or has one item
         return list(patients) if patients else []
     except Exception as e:
         # Log the error and return empty list
-        print(f"Error in contact number search: {e}")
+        logger.exception("Error in contact number search: %s", e)
         return []
 
 
@@ -505,6 +496,33 @@ def get_patient(
     return patient
 
 
+@router.get("/{patient_id}/timeline")
+@query_budget(16)  # user, patient, encounters/admissions/reviews, ten event sources, staff names
+def get_patient_timeline_endpoint(
+    patient_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    types: Optional[str] = Query(None, description="Comma-separated event types to include"),
+    source: Optional[str] = Query(None, pattern="^(opd|ipd)$", description="Only OPD or only IPD events"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["Doctor", "PA", "Nurse", "Admin"]))
+):
+    """
+    Patient's clinical history (OPD and IPD) as one stream, newest first.
+    Cursor paginated; each page costs a fixed number of queries.
+    """
+    from app.services.patient_timeline import get_patient_timeline, parse_event_types
+    
+    if not db.query(Patient.id).filter(Patient.id == patient_id).first():
+        raise HTTPException(status_code=404, detail="Patient not found")
+    
+    try:
+        event_types = parse_event_types(types)
+        return get_patient_timeline(db, patient_id, cursor, limit, event_types, source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.put("/{patient_id}", response_model=PatientResponse)
 def update_patient(
     request: Request,
@@ -524,6 +542,9 @@ def update_patient(
     for key, value in patient_data.dict().items():
         setattr(patient, key, value)
     
+    # Keep the name/card number shown on investigation worklists in step
+    refresh_patient_details(db, patient)
+    
     db.commit()
     db.refresh(patient)
     
@@ -643,7 +664,7 @@ def create_encounter(
             # Get price for the procedure - pass service_type and procedure_name to get the correct price
             # procedure_name helps match exact procedure when G-DRG codes map to multiple procedures
             unit_price = get_price_from_all_tables(db, procedure_g_drg_code, is_insured_encounter, service_type, procedure_name)
-            print(f"DEBUG create_encounter: Looked up price for gdrg_code='{procedure_g_drg_code}', procedure_name='{procedure_name}', is_insured={is_insured_encounter}, service_type='{service_type}', price={unit_price}")
+            logger.debug("Looked up price for gdrg_code='%s', procedure_name='%s', is_insured=%s, service_type='%s', price=%s", procedure_g_drg_code, procedure_name, is_insured_encounter, service_type, unit_price)
             
             # Always create bill when procedure is provided
             # If price is 0, still create bill with 0 amount (price may be added to price list later)
@@ -675,8 +696,7 @@ def create_encounter(
         except Exception as e:
             # Log error but don't fail encounter creation
             # The bill can be created manually later if needed
-            import logging
-            logging.error(f"Failed to auto-create bill for encounter {encounter.id}: {str(e)}")
+            logger.error("Failed to auto-create bill for encounter %s: %s", encounter.id, e)
             # Continue with encounter creation even if bill creation fails
     
     db.commit()
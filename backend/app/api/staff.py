@@ -6,7 +6,6 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
 from typing import List, Optional
-import pandas as pd
 from io import BytesIO
 
 from app.core.database import get_db
@@ -203,6 +202,8 @@ def import_staff_from_excel(
     Import staff from Excel file - Admin only
     Expected columns: username, full_name, Gender, Email, role, is_active
     """
+    import pandas as pd
+    
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
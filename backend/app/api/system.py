@@ -1,9 +1,11 @@
 """
 System information API endpoints
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.core.datetime_utils import now, utcnow, today
 from app.core.config import settings
+from app.core.dependencies import require_role
+from app.models.user import User
 from datetime import datetime
 
 router = APIRouter(prefix="/system", tags=["system"])
@@ -38,3 +40,91 @@ def get_application_date():
         "using_system_date": not bool(settings.APPLICATION_REFERENCE_DATE)
     }
 
+
+
+@router.get("/startup")
+def get_startup_profile(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """
+    Startup timing report: milliseconds per router import and per startup step
+    (listener registration, schema verification, analyzer, backup scheduler,
+    bed index), and when the application became ready.
+    """
+    from app.core.startup_profile import startup_profile
+    return startup_profile.report()
+
+
+@router.get("/metrics")
+def get_request_metrics(
+    limit: int = 50,
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """
+    Request metrics since startup (or the last reset): per route template the
+    request count, latency percentiles, SQL statements and database time per
+    request; routes with the most statements per request (N+1 candidates); and
+    the slowest SQL statements with the route that ran them.
+    """
+    from app.core.request_metrics import metrics_registry
+    return metrics_registry.snapshot(limit=limit)
+
+
+@router.post("/metrics/reset")
+def reset_request_metrics(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Clear the request metrics, e.g. before measuring a change"""
+    from app.core.request_metrics import metrics_registry
+    metrics_registry.reset()
+    return {"message": "Request metrics reset"}
+
+
+@router.get("/n-plus-one")
+def get_n_plus_one_findings(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """
+    N+1 findings since startup (N_PLUS_ONE_MODE log or raise): statement shapes
+    a request repeated at least N_PLUS_ONE_THRESHOLD times, and requests over
+    their @query_budget, each with the application frames that ran the query.
+    """
+    from app.core.n_plus_one import detection_enabled, findings_registry
+    return {
+        "mode": settings.N_PLUS_ONE_MODE,
+        "enabled": detection_enabled(),
+        "threshold": settings.N_PLUS_ONE_THRESHOLD,
+        "findings": findings_registry.snapshot(),
+    }
+
+
+@router.post("/n-plus-one/reset")
+def reset_n_plus_one_findings(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Clear the N+1 findings"""
+    from app.core.n_plus_one import findings_registry
+    findings_registry.clear()
+    return {"message": "N+1 findings cleared"}
+
+
+@router.get("/logging")
+def get_logging_status(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Log levels in effect, sampling settings, and records queued or dropped (queue full)"""
+    import logging
+    from app.core.logging_config import logging_stats
+    return {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "levels": {
+            name: logging.getLevelName(logger.level)
+            for name, logger in sorted(logging.root.manager.loggerDict.items())
+            if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET
+        },
+        "format": settings.LOG_FORMAT,
+        "file": settings.LOG_FILE or None,
+        "sample_initial": settings.LOG_SAMPLE_INITIAL,
+        "sample_every": settings.LOG_SAMPLE_EVERY,
+        **logging_stats(),
+    }
@@ -22,6 +22,43 @@ class Settings(BaseSettings):
     MYSQL_DATABASE: str = "hms"
     MYSQL_CHARSET: str = "utf8mb4"
     
+    # Connection Pool Settings (MySQL and file-based SQLite)
+    DB_POOL_SIZE: int = 10  # Connections kept open
+    DB_MAX_OVERFLOW: int = 20  # Extra connections allowed under load
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Replace MySQL connections older than this (seconds), before the server drops them
+    DB_POOL_PRE_PING: bool = True  # Check MySQL connections on checkout
+    
+    # SQLite Tuning (applied to every new connection)
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL lets readers run while one connection writes
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL; FULL syncs on every commit
+    SQLITE_BUSY_TIMEOUT_MS: int = 15000  # How long a writer waits for the lock instead of "database is locked"
+    SQLITE_CACHE_SIZE_KB: int = 65536  # Page cache per connection
+    SQLITE_MMAP_SIZE_BYTES: int = 268435456  # Memory-mapped I/O (256 MB)
+
+    # Schema verification at startup (create missing tables):
+    # "background" - after startup, off the request path; "blocking" - before the app is built; "off"
+    SCHEMA_VERIFY_MODE: str = "background"
+
+    # Logging (queued, written by a background thread; see app/core/logging_config.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # Per-logger levels, e.g. "app.services.price_list_service_v2=DEBUG,sqlalchemy.engine=WARNING"
+    LOG_FORMAT: str = "json"  # "json" (one object per line) or "text"
+    LOG_FILE: str = ""  # Also write to this file, rotated at 50 MB (empty = stdout only)
+    LOG_SAMPLE_INITIAL: int = 20  # DEBUG records kept per call site each minute before sampling
+    LOG_SAMPLE_EVERY: int = 100  # Then keep one in this many (1 = keep all)
+
+    # Request Metrics (GET /metrics for Prometheus, GET /api/system/metrics for admins)
+    METRICS_ENABLED: bool = True  # Time requests and count their SQL statements
+    METRICS_TOKEN: str = ""  # Bearer token required by /metrics (empty = no token)
+    METRICS_SLOW_QUERY_MS: int = 200  # Statements at least this slow are kept in the slowest-statements list
+    METRICS_SLOW_QUERY_LIMIT: int = 100  # Distinct slow statements kept
+
+    # N+1 Query Detection (development and tests; GET /api/system/n-plus-one)
+    # "off"; "log" - warn when a request repeats a statement shape or exceeds its @query_budget; "raise" - also fail the request
+    N_PLUS_ONE_MODE: str = "off"
+    N_PLUS_ONE_THRESHOLD: int = 10  # Runs of one statement shape in a request that count as N+1
+
     # JWT Settings
     SECRET_KEY: str = "your-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
@@ -41,6 +78,14 @@ class Settings(BaseSettings):
     BACKUP_ENABLED: bool = True  # Enable automatic backups
     BACKUP_DIR: str = "./backups"  # Directory to store backups
     BACKUP_RETENTION_DAYS: int = 30  # Keep backups for this many days
+
+    # Discharge Summary Settings
+    DISCHARGE_SUMMARY_CACHE_DIR: str = "./cache/discharge_summaries"  # Rendered discharge summaries, one folder per admission
+
+    # Attachment Settings
+    ATTACHMENT_THUMBNAIL_DIR: str = "./cache/thumbnails"  # Generated image / PDF previews of result attachments
+    ATTACHMENT_COMPRESSION_ENABLED: bool = True  # Build compressed web copies of new image / PDF attachments
+    ATTACHMENT_COMPRESSION_WORKERS: int = 2  # Processes in the compression pool
     
     # Scheduled Backup Settings
     SCHEDULED_BACKUP_ENABLED: bool = False  # Enable scheduled backups
@@ -56,6 +101,17 @@ class Settings(BaseSettings):
     SYNC_REMOTE_DATABASE: str = ""  # Remote MySQL database name
     SYNC_INTERVAL_MINUTES: int = 60  # Sync interval in minutes (default: 1 hour)
     
+    # Read Replica Settings (reports, exports and audit queries)
+    REPLICA_ENABLED: bool = False  # Route read-only report endpoints to the replica
+    REPLICA_DATABASE_URL: str = ""  # Replica URL; empty uses the sync remote database
+    REPLICA_MAX_LAG_SECONDS: int = 7200  # Fall back to the primary when the replica's sync watermark is older
+    REPLICA_CHECK_INTERVAL_SECONDS: int = 30  # How long a replica health / lag check is reused
+    
+    # Bill Totals Reconciliation Settings
+    BILL_RECONCILE_ENABLED: bool = True  # Nightly check of denormalized bill/encounter totals
+    BILL_RECONCILE_TIME: str = "03:00"  # Time to run the daily reconciliation (HH:MM)
+    BILL_RECONCILE_REPAIR: bool = False  # Repair drift automatically (default: report only)
+    
     # Application Date Override Settings
     # When set, the application will use this date instead of the system date
     # Format: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS" (e.g., "2024-01-15" or "2024-01-15 10:30:00")
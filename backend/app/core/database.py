@@ -1,28 +1,176 @@
 """
 Database connection and session management
+
+create_db_engine builds engines from Settings:
+- SQLite: every new connection gets the journal / synchronous / busy-timeout /
+  cache / mmap pragmas (WAL lets the desks read while one of them writes, and
+  busy_timeout makes writers queue instead of failing with "database is locked")
+- MySQL: sized pool, pre-ping and recycle so connections the server has
+  dropped are replaced instead of surfacing as errors
+
+Pools are instrumented; get_pool_stats reports checked-out / overflow
+connections and how often (and how long) requests waited for one.
 """
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
 
-# Configure connection arguments based on database mode
-connect_args = {}
-if settings.DATABASE_MODE.lower() == "sqlite":
-    connect_args = {"check_same_thread": False}
-elif settings.DATABASE_MODE.lower() == "mysql":
-    connect_args = {
-        "charset": settings.MYSQL_CHARSET,
-        "connect_timeout": 10,
-    }
+
+class PoolMonitor:
+    """Thread-safe counters for one engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.waits = 0  # Checkouts that found the pool (and overflow) exhausted
+        self.timeouts = 0  # Waits that gave up after pool_timeout
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def record_wait(self, wait_ms: float, timed_out: bool) -> None:
+        with self._lock:
+            self.waits += 1
+            self.timeouts += int(timed_out)
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "invalidations": self.invalidations,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / self.waits, 2) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 2),
+            }
+
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool that records checkouts which had to wait for a connection"""
+
+    monitor: PoolMonitor
+
+    def _do_get(self):
+        max_overflow = getattr(self, "_max_overflow", 0)
+        exhausted = max_overflow > -1 and self.checkedout() >= self.size() + max_overflow
+        if not exhausted:
+            return super()._do_get()
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except Exception:
+            timed_out = True
+            raise
+        finally:
+            self.monitor.record_wait((time.perf_counter() - start) * 1000, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size = -{int(settings.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE_BYTES)}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(database_url: str = None, **overrides) -> Engine:
+    """
+    Engine for `database_url` (default settings.DATABASE_URL) tuned from Settings.
+    Keyword overrides are passed to create_engine.
+    """
+    url = make_url(database_url or settings.DATABASE_URL)
+    is_sqlite = url.get_backend_name() == "sqlite"
+    kwargs = {"echo": False}  # Set echo=True for SQL query logging
+
+    if is_sqlite:
+        # sqlite3's own timeout is the same busy wait, in seconds
+        kwargs["connect_args"] = {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if not _is_sqlite_memory(url):
+            kwargs.update(
+                poolclass=MonitoredQueuePool,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+            )
+    else:
+        kwargs.update(
+            connect_args={"charset": settings.MYSQL_CHARSET, "connect_timeout": 10},
+            poolclass=MonitoredQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    kwargs.update(overrides)
+
+    new_engine = create_engine(url, **kwargs)
+    monitor = PoolMonitor()
+    new_engine.pool.monitor = monitor
+    event.listen(new_engine, "connect", lambda *args: monitor.count("connects"))
+    event.listen(new_engine, "checkout", lambda *args: monitor.count("checkouts"))
+    event.listen(new_engine, "invalidate", lambda *args: monitor.count("invalidations"))
+    if is_sqlite:
+        event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+
+def get_pool_stats(target: Engine = None) -> dict:
+    """Live pool state and counters for an engine (default: the application engine)"""
+    target = target or engine
+    pool = target.pool
+    stats = {"pool_class": type(pool).__name__, "dialect": target.dialect.name}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    stats["max_overflow"] = getattr(pool, "_max_overflow", None)
+    stats["timeout"] = getattr(pool, "_timeout", None)
+    stats["recycle"] = getattr(pool, "_recycle", None)
+    monitor = getattr(pool, "monitor", None)
+    if monitor is not None:
+        stats.update(monitor.snapshot())
+    if target.dialect.name == "sqlite":
+        with target.connect() as conn:
+            stats["sqlite"] = {
+                pragma: conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+                for pragma in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+            }
+    return stats
+
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args=connect_args,
-    pool_pre_ping=True if settings.DATABASE_MODE.lower() == "mysql" else False,
-    echo=False  # Set to True for SQL query logging
-)
+engine = create_db_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -31,6 +179,25 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def verify_schema(target: Engine = None) -> list:
+    """
+    Create any model tables missing from the database (target default: the application engine).
+    Lists the existing tables once instead of probing each table like create_all does.
+
+    Returns:
+        Names of the tables created
+    """
+    import app.models  # noqa: F401 - register every model with Base
+    from sqlalchemy import inspect
+
+    target = target or engine
+    existing = {name.lower() for name in inspect(target).get_table_names()}
+    missing = [table for table in Base.metadata.sorted_tables if table.name.lower() not in existing]
+    if missing:
+        Base.metadata.create_all(bind=target, tables=missing)
+    return [table.name for table in missing]
+
+
 def get_db():
     """
     Dependency function to get database session
@@ -41,4 +208,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
@@ -0,0 +1,223 @@
+"""
+Logging setup
+configure_logging routes every logger through a QueueHandler: the request
+thread only puts the record on a bounded queue, and a QueueListener thread
+formats and writes it (stdout, plus LOG_FILE when set). When the queue is full
+the record is dropped and counted rather than blocking the request.
+
+Records are JSON lines (LOG_FORMAT=text for development) carrying the request
+ID of the request that logged them: RequestIdMiddleware takes X-Request-ID from
+the request or generates one, and returns it on the response. Fields passed
+with extra={...} are included in the JSON.
+
+Levels: LOG_LEVEL for everything, LOG_LEVELS for individual loggers
+("app.services.price_list_service_v2=DEBUG,app.services.analyzer_server=WARNING").
+DEBUG records are sampled per call site: the first LOG_SAMPLE_INITIAL each
+minute are kept, then one in LOG_SAMPLE_EVERY (marked with "sampled": N).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+SAMPLE_WINDOW_SECONDS = 60
+QUEUE_SIZE = 10000
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def get_request_id() -> Optional[str]:
+    """ID of the request being handled, None outside a request"""
+    return _request_id.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request ID (runs in the logging thread, before queueing)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps the first `initial` DEBUG records per call site each window, then one in `every`"""
+
+    def __init__(self, initial: int, every: int):
+        super().__init__()
+        self.initial = initial
+        self.every = max(every, 1)
+        self._lock = threading.Lock()
+        # (pathname, lineno) -> (window start, count)
+        self._counts: Dict[Tuple[str, int], Tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count = self._counts.get(key, (now, 0))
+            if now - window_start >= SAMPLE_WINDOW_SECONDS:
+                window_start, count = now, 0
+            count += 1
+            self._counts[key] = (window_start, count)
+        if count <= self.initial:
+            return True
+        if (count - self.initial) % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of waiting when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback here (args may not survive the thread hop),
+        # keeping them as separate fields for the JSON formatter
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "func": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def configure_logging() -> None:
+    """Install the queue handler on the root logger and start the writer thread (once)"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    formatter = TextFormatter() if settings.LOG_FORMAT.lower() == "text" else JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            settings.LOG_FILE, maxBytes=50 * 1024 * 1024, backupCount=5, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=QUEUE_SIZE))
+    _queue_handler.addFilter(RequestIdFilter())
+    _queue_handler.addFilter(DebugSampler(settings.LOG_SAMPLE_INITIAL, settings.LOG_SAMPLE_EVERY))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in _parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> dict:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+    }
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: X-Request-ID from the request (or a new one) for logs and the response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = dict(scope.get("headers", [])).get(b"x-request-id", b"").decode("latin-1").strip()
+        request_id = supplied[:64] if supplied else uuid.uuid4().hex
+        token = _request_id.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
@@ -0,0 +1,304 @@
+"""
+N+1 query detection (development and test runs)
+With N_PLUS_ONE_MODE = "log" or "raise", a before_cursor_execute listener
+fingerprints every SQL statement a request runs - literals and IN lists
+collapsed, so "WHERE patients.id = 7" and "... = 8" are one shape - and
+counts the shapes per request. A shape repeated N_PLUS_ONE_THRESHOLD times
+(one query per row of something) is flagged with the application frames that
+issued it.
+
+Endpoints can declare a budget with @query_budget(n) (under the @router
+decorator); a request running more statements than that is flagged too.
+
+"log" writes a warning per finding and keeps the findings for
+GET /api/system/n-plus-one. "raise" also raises NPlusOneError from the
+offending statement, and the middleware replaces the response of a request
+with findings by a 500 - even when the endpoint caught the error - so a
+TestClient test calling the endpoint fails. Responses carry X-Query-Count in
+either mode. "off" (the default) registers nothing.
+
+assert_no_n_plus_one() checks a block of code (a service call, or TestClient
+requests) in tests, whatever the mode.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.request_metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACK_FRAMES = 8
+MAX_FINDINGS = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class NPlusOneError(RuntimeError):
+    """A request repeated one statement shape past the threshold or ran over its query budget"""
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement shape: literals and placeholders as ?, IN lists as IN (?), whitespace collapsed"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def query_budget(max_queries: int) -> Callable:
+    """Declare the most SQL statements an endpoint may run per request"""
+    def decorator(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorator
+
+
+def _call_site() -> List[str]:
+    """Application frames (innermost last) of the statement being executed"""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(APP_DIR) and frame.filename != __file__
+    ]
+    return [
+        f"{os.path.relpath(frame.filename, os.path.dirname(APP_DIR))}:{frame.lineno} in {frame.name}"
+        for frame in frames[-STACK_FRAMES:]
+    ]
+
+
+class RequestQueries:
+    """Statement shapes run by one request"""
+
+    __slots__ = ("scope", "limit", "name", "total", "shapes", "flagged", "over_budget")
+
+    def __init__(self, scope, limit: Optional[int] = None, name: Optional[str] = None):
+        self.scope = scope
+        # Budget and label for code checked outside a request (assert_no_n_plus_one)
+        self.limit = limit
+        self.name = name
+        self.total = 0
+        self.shapes: Dict[str, int] = {}
+        # shape -> call site, for shapes that reached the threshold
+        self.flagged: Dict[str, List[str]] = {}
+        self.over_budget: Optional[List[str]] = None
+
+    def budget(self) -> Optional[int]:
+        if self.limit is not None:
+            return self.limit
+        return getattr(self.scope.get("endpoint"), "query_budget", None)
+
+    def route(self) -> str:
+        return self.name or route_template(self.scope)
+
+    def has_findings(self) -> bool:
+        return bool(self.flagged) or self.over_budget is not None
+
+    def repeated_message(self, shape: str) -> str:
+        return (
+            f"N+1 in {self.route()}: statement run {self.shapes[shape]} times in one request "
+            f"(threshold {settings.N_PLUS_ONE_THRESHOLD}): {shape[:300]}\n  " + "\n  ".join(self.flagged[shape])
+        )
+
+    def budget_message(self) -> str:
+        return (
+            f"{self.route()} ran {self.total} queries, more than its budget of {self.budget()}; "
+            f"first statement over budget from:\n  " + "\n  ".join(self.over_budget)
+        )
+
+    def messages(self) -> List[str]:
+        messages = [self.repeated_message(shape) for shape in self.flagged]
+        if self.over_budget is not None:
+            messages.append(self.budget_message())
+        return messages
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("n_plus_one", default=None)
+
+
+class FindingsRegistry:
+    """Findings since startup, one per route and statement shape (or budget overrun)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.findings: Dict[Tuple[str, str, str], dict] = {}
+
+    def record(self, kind: str, method: str, route: str, shape: str, count: int, stack: List[str], limit: int) -> None:
+        key = (kind, f"{method} {route}", shape)
+        with self._lock:
+            entry = self.findings.get(key)
+            if entry is None:
+                if len(self.findings) >= MAX_FINDINGS:
+                    oldest = min(self.findings, key=lambda k: self.findings[k]["last_seen"])
+                    del self.findings[oldest]
+                entry = self.findings[key] = {
+                    "kind": kind, "route": key[1], "statement": shape, "requests": 0, "max_count": 0, "limit": limit,
+                }
+            entry["requests"] += 1
+            entry["max_count"] = max(entry["max_count"], count)
+            entry["stack"] = stack
+            entry["last_seen"] = time.time()
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            findings = [dict(entry) for entry in self.findings.values()]
+        return sorted(findings, key=lambda entry: (entry["requests"], entry["max_count"]), reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.findings.clear()
+
+
+findings_registry = FindingsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current_request.get()
+    if queries is None:
+        return
+    queries.total += 1
+    shape = fingerprint(statement)
+    count = queries.shapes.get(shape, 0) + 1
+    queries.shapes[shape] = count
+
+    if count == settings.N_PLUS_ONE_THRESHOLD:
+        queries.flagged[shape] = _call_site()
+        if settings.N_PLUS_ONE_MODE == "raise":
+            raise NPlusOneError(queries.repeated_message(shape))
+
+    budget = queries.budget()
+    if budget is not None and queries.total > budget and queries.over_budget is None:
+        queries.over_budget = _call_site()
+        if settings.N_PLUS_ONE_MODE == "raise":
+            raise NPlusOneError(queries.budget_message())
+
+
+def _report(queries: RequestQueries) -> None:
+    if not queries.flagged and queries.over_budget is None:
+        return
+    method, route = queries.scope["method"], queries.route()
+    for shape, stack in queries.flagged.items():
+        count = queries.shapes[shape]
+        findings_registry.record("repeated_statement", method, route, shape, count, stack, settings.N_PLUS_ONE_THRESHOLD)
+        logger.warning(
+            "N+1 in %s %s: statement run %d times in one request: %s\n  %s",
+            method, route, count, shape[:300], "\n  ".join(stack),
+        )
+    if queries.over_budget is not None:
+        budget = queries.budget()
+        findings_registry.record("over_budget", method, route, "", queries.total, queries.over_budget, budget)
+        logger.warning(
+            "%s %s ran %d queries, over its budget of %d; first statement over budget from:\n  %s",
+            method, route, queries.total, budget, "\n  ".join(queries.over_budget),
+        )
+
+
+class NPlusOneMiddleware:
+    """
+    ASGI middleware: collects each request's statement shapes and reports findings.
+    In raise mode a request with findings gets a 500 instead of the endpoint's
+    response (the endpoint has finished by the time its response starts).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+        token = _current_request.set(queries)
+        replaced = False
+
+        async def send_with_count(message):
+            nonlocal replaced
+            if message["type"] == "http.response.start":
+                count_header = (b"x-query-count", str(queries.total).encode())
+                if settings.N_PLUS_ONE_MODE == "raise" and queries.has_findings():
+                    replaced = True
+                    body = json.dumps({"detail": "\n".join(queries.messages())}).encode()
+                    await send({
+                        "type": "http.response.start", "status": 500,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                            count_header,
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                message = {**message, "headers": [*message.get("headers", []), count_header]}
+            elif replaced:
+                return  # The endpoint's own body
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _current_request.reset(token)
+            _report(queries)
+
+
+@contextmanager
+def assert_no_n_plus_one(max_queries: Optional[int] = None) -> Iterator[RequestQueries]:
+    """
+    Test helper: fail with AssertionError when the code in the block repeats a
+    statement shape N_PLUS_ONE_THRESHOLD times or runs more than max_queries
+    statements. Works in any N_PLUS_ONE_MODE. Requests made through TestClient
+    inside the block count too when the app runs the middleware (mode log or
+    raise): their findings are taken from the registry.
+
+        with assert_no_n_plus_one(max_queries=3):
+            get_ward_board(db, ward="Male Ward")
+    """
+    registered = event.contains(Engine, "before_cursor_execute", _before_cursor_execute)
+    if not registered:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    queries = RequestQueries({"type": "http", "method": "TEST"}, limit=max_queries, name="assert_no_n_plus_one block")
+    token = _current_request.set(queries)
+    started = time.time()
+    try:
+        yield queries
+    finally:
+        _current_request.reset(token)
+        if not registered:
+            event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+    problems = queries.messages() + [
+        f"{finding['kind']} in {finding['route']} ({finding['max_count']} runs): {finding['statement'][:300]}"
+        for finding in findings_registry.snapshot() if finding["last_seen"] >= started
+    ]
+    if problems:
+        raise AssertionError("\n".join(problems))
+
+
+def detection_enabled() -> bool:
+    return settings.N_PLUS_ONE_MODE in ("log", "raise")
+
+
+def register_n_plus_one_listener() -> None:
+    """Fingerprint statements on every engine; only when N_PLUS_ONE_MODE is log or raise"""
+    if not detection_enabled() or event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    logger.warning(
+        "N+1 query detection is on (mode %s, threshold %d) - meant for development and tests",
+        settings.N_PLUS_ONE_MODE, settings.N_PLUS_ONE_THRESHOLD,
+    )
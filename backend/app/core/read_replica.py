@@ -0,0 +1,143 @@
+"""
+Read-replica routing
+get_read_db is the session dependency for read-only report, export and audit
+endpoints. It hands out a session on the replica (REPLICA_DATABASE_URL, or the
+remote database DatabaseSyncService copies to) when the replica is reachable
+and its sync watermark is recent enough, and a session on the primary
+otherwise - so month-end reporting runs off the primary's connection pool
+without reports silently serving data older than REPLICA_MAX_LAG_SECONDS.
+
+The health check (one indexed single-row query) is cached for
+REPLICA_CHECK_INTERVAL_SECONDS; a replica error marks it unavailable until the
+next check. Sessions from get_read_db refuse to flush, on either database.
+The response carries X-Read-Source: replica|primary.
+"""
+import logging
+import threading
+import time
+from typing import Generator, Optional, Tuple
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings
+from app.core.database import create_db_engine, engine
+from app.core.datetime_utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _refuse_writes(session: Session, flush_context, instances) -> None:
+    raise RuntimeError("Read-only session: report endpoints must not write")
+
+
+class ReplicaRouter:
+    """Picks the replica or the primary for read-only sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engine = None
+        self._url: Optional[str] = None
+        self._checked_at = 0.0
+        self._available = False
+        self._lag_seconds: Optional[float] = None
+        self._reason = "not checked"
+        self.replica_sessions = 0
+        self.primary_sessions = 0
+
+    @staticmethod
+    def configured_url() -> str:
+        if not settings.REPLICA_ENABLED:
+            return ""
+        return settings.REPLICA_DATABASE_URL or settings.SYNC_DATABASE_URL
+
+    def _replica_engine(self):
+        url = self.configured_url()
+        if not url:
+            return None
+        if self._engine is None or url != self._url:
+            if self._engine is not None:
+                self._engine.dispose()
+            self._engine = create_db_engine(url)
+            self._url = url
+        return self._engine
+
+    def _check(self, replica_engine) -> Tuple[bool, Optional[float], str]:
+        from app.models.replica_watermark import ReplicaSyncWatermark
+
+        try:
+            with Session(bind=replica_engine) as replica:
+                synced_through = replica.query(ReplicaSyncWatermark.synced_through).filter(
+                    ReplicaSyncWatermark.id == 1
+                ).scalar()
+        except DBAPIError as e:
+            return False, None, f"replica unreachable: {e.__class__.__name__}"
+        if synced_through is None:
+            return False, None, "replica has no sync watermark yet"
+        lag = (utcnow() - synced_through).total_seconds()
+        if lag > settings.REPLICA_MAX_LAG_SECONDS:
+            return False, lag, f"replica is {int(lag)}s behind (max {settings.REPLICA_MAX_LAG_SECONDS}s)"
+        return True, lag, "ok"
+
+    def replica_engine_if_fresh(self):
+        """The replica engine when it is usable now, else None"""
+        with self._lock:
+            replica_engine = self._replica_engine()
+            if replica_engine is None:
+                self._available, self._reason = False, "replica not configured"
+                return None
+            if time.monotonic() - self._checked_at >= settings.REPLICA_CHECK_INTERVAL_SECONDS:
+                self._available, self._lag_seconds, self._reason = self._check(replica_engine)
+                self._checked_at = time.monotonic()
+                if not self._available:
+                    logger.warning("Read replica not used: %s", self._reason)
+            return replica_engine if self._available else None
+
+    def mark_unavailable(self, reason: str) -> None:
+        with self._lock:
+            self._available, self._reason = False, reason
+            self._checked_at = time.monotonic()
+        logger.warning("Read replica marked unavailable: %s", reason)
+
+    def session(self) -> Tuple[Session, str]:
+        replica_engine = self.replica_engine_if_fresh()
+        if replica_engine is not None:
+            self.replica_sessions += 1
+            return ReadSessionLocal(bind=replica_engine), "replica"
+        self.primary_sessions += 1
+        return ReadSessionLocal(bind=engine), "primary"
+
+    def status(self) -> dict:
+        self.replica_engine_if_fresh()
+        return {
+            "enabled": settings.REPLICA_ENABLED,
+            "configured": bool(self.configured_url()),
+            "available": self._available,
+            "lag_seconds": round(self._lag_seconds, 1) if self._lag_seconds is not None else None,
+            "max_lag_seconds": settings.REPLICA_MAX_LAG_SECONDS,
+            "reason": self._reason,
+            "replica_sessions": self.replica_sessions,
+            "primary_sessions": self.primary_sessions,
+        }
+
+
+replica_router = ReplicaRouter()
+
+
+def get_read_db(response: Response) -> Generator[Session, None, None]:
+    """
+    Dependency for read-only endpoints: a session on a fresh replica, else on the primary
+    """
+    db, source = replica_router.session()
+    response.headers["X-Read-Source"] = source
+    try:
+        yield db
+    except OperationalError as e:
+        if source == "replica":
+            replica_router.mark_unavailable(f"query failed: {e.__class__.__name__}")
+        raise
+    finally:
+        db.close()
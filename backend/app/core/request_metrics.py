@@ -0,0 +1,347 @@
+"""
+Request metrics
+RequestMetricsMiddleware times every HTTP request and, through SQLAlchemy
+cursor events on all engines, counts the queries each request runs and the time
+spent in them. Per route template (/api/consultation/ward-admissions/{id}, not
+the concrete URL) it keeps histograms of latency, queries per request and
+database time, plus the slowest SQL statements seen.
+
+Exposed as Prometheus text at GET /metrics (METRICS_TOKEN as a bearer token
+when set) and as JSON for admins at GET /api/system/metrics. A route whose
+queries per request grow with the data (high average and max queries, most of
+its time in the database) is the place to look for an N+1.
+
+Queries outside a request (scheduler, sync, startup) are counted under the
+"background" route. Counters are per process and reset on restart.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+# Upper bounds; Prometheus adds +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+DB_TIME_BUCKETS = LATENCY_BUCKETS
+
+BACKGROUND_ROUTE = "background"
+UNMATCHED_ROUTE = "unmatched"
+MAX_STATEMENT_CHARS = 2000
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics), not thread-safe on its own"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        running, result = 0, []
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (max when it is above the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, running in self.cumulative():
+            if running >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class RequestStats:
+    """Queries run by one request (held in a context variable for the request's duration)"""
+
+    __slots__ = ("scope", "queries", "db_seconds", "finished")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.finished = False
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("request_metrics", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled, None outside a request"""
+    return _current_request.get()
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram(DB_TIME_BUCKETS)
+        self.statuses: Dict[str, int] = {}
+
+
+class MetricsRegistry:
+    """Per-route request histograms, global query counters and the slowest statements"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+            self.queries_total = 0
+            self.query_seconds_total = 0.0
+            self.background_queries = 0
+            self.slow_queries_total = 0
+            # statement -> {count, total_ms, max_ms, route, last_seen}
+            self.slow_statements: Dict[str, dict] = {}
+
+    def record_request(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            metrics = self.routes.get((method, route))
+            if metrics is None:
+                metrics = self.routes[(method, route)] = RouteMetrics()
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(stats.queries)
+            metrics.db_time.observe(stats.db_seconds)
+            status_class = f"{status_code // 100}xx"
+            metrics.statuses[status_class] = metrics.statuses.get(status_class, 0) + 1
+
+    def record_query(self, statement: str, seconds: float, stats: Optional[RequestStats]) -> None:
+        slow = seconds * 1000 >= settings.METRICS_SLOW_QUERY_MS
+        route = route_template(stats.scope) if slow and stats is not None else BACKGROUND_ROUTE
+        with self._lock:
+            self.queries_total += 1
+            self.query_seconds_total += seconds
+            if stats is None:
+                self.background_queries += 1
+            if slow:
+                self.slow_queries_total += 1
+                self._record_slow(statement[:MAX_STATEMENT_CHARS], seconds * 1000, route)
+
+    def _record_slow(self, statement: str, ms: float, route: str) -> None:
+        entry = self.slow_statements.get(statement)
+        if entry is None:
+            if len(self.slow_statements) >= settings.METRICS_SLOW_QUERY_LIMIT:
+                # Keep the slowest: replace the entry with the lowest max if this one is slower
+                fastest = min(self.slow_statements, key=lambda key: self.slow_statements[key]["max_ms"])
+                if self.slow_statements[fastest]["max_ms"] >= ms:
+                    return
+                del self.slow_statements[fastest]
+            entry = self.slow_statements[statement] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "route": route}
+        entry["count"] += 1
+        entry["total_ms"] += ms
+        entry["last_seen"] = time.time()
+        if ms >= entry["max_ms"]:
+            entry["max_ms"] = ms
+            entry["route"] = route
+
+    def snapshot(self, limit: int = 50) -> dict:
+        """JSON view: routes by total time spent, and the slowest statements"""
+        with self._lock:
+            routes = []
+            for (method, route), metrics in self.routes.items():
+                count = metrics.latency.count
+                routes.append({
+                    "method": method,
+                    "route": route,
+                    "requests": count,
+                    "statuses": dict(metrics.statuses),
+                    "total_seconds": round(metrics.latency.sum, 3),
+                    "avg_ms": round(metrics.latency.sum / count * 1000, 1),
+                    "p50_ms": round(metrics.latency.quantile(0.5) * 1000, 1),
+                    "p95_ms": round(metrics.latency.quantile(0.95) * 1000, 1),
+                    "p99_ms": round(metrics.latency.quantile(0.99) * 1000, 1),
+                    "max_ms": round(metrics.latency.max * 1000, 1),
+                    "avg_queries": round(metrics.queries.sum / count, 1),
+                    "max_queries": int(metrics.queries.max),
+                    "avg_db_ms": round(metrics.db_time.sum / count * 1000, 1),
+                    "db_share": round(metrics.db_time.sum / metrics.latency.sum, 2) if metrics.latency.sum else 0.0,
+                })
+            slow = [
+                {
+                    "statement": statement,
+                    "count": entry["count"],
+                    "max_ms": round(entry["max_ms"], 1),
+                    "avg_ms": round(entry["total_ms"] / entry["count"], 1),
+                    "route": entry["route"],
+                    "last_seen": entry["last_seen"],
+                }
+                for statement, entry in self.slow_statements.items()
+            ]
+            totals = {
+                "since": self.started_at,
+                "requests": sum(route["requests"] for route in routes),
+                "queries": self.queries_total,
+                "query_seconds": round(self.query_seconds_total, 3),
+                "background_queries": self.background_queries,
+                "slow_queries": self.slow_queries_total,
+                "slow_query_ms": settings.METRICS_SLOW_QUERY_MS,
+            }
+        routes.sort(key=lambda route: route["total_seconds"], reverse=True)
+        return {
+            **totals,
+            "routes": routes[:limit],
+            "most_queries_per_request": sorted(routes, key=lambda route: route["avg_queries"], reverse=True)[:10],
+            "slowest_statements": sorted(slow, key=lambda entry: entry["max_ms"], reverse=True)[:limit],
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, attribute: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), metrics in sorted(self.routes.items()):
+                hist = getattr(metrics, attribute)
+                labels = f'method="{method}",route="{_escape_label(route)}"'
+                for bound, running in hist.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {running}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        with self._lock:
+            histogram("hms_http_request_duration_seconds", "Request latency by route template.", "latency")
+            histogram("hms_http_request_db_queries", "SQL statements executed per request.", "queries")
+            histogram("hms_http_request_db_seconds", "Time spent in SQL statements per request.", "db_time")
+
+            lines.append("# HELP hms_http_responses_total Responses by route template and status class.")
+            lines.append("# TYPE hms_http_responses_total counter")
+            for (method, route), metrics in sorted(self.routes.items()):
+                for status_class, count in sorted(metrics.statuses.items()):
+                    lines.append(
+                        f'hms_http_responses_total{{method="{method}",route="{_escape_label(route)}",'
+                        f'status="{status_class}"}} {count}'
+                    )
+
+            lines.append("# HELP hms_db_queries_total SQL statements executed, including background work.")
+            lines.append("# TYPE hms_db_queries_total counter")
+            lines.append(f"hms_db_queries_total {self.queries_total}")
+            lines.append("# HELP hms_db_query_seconds_total Time spent in SQL statements, including background work.")
+            lines.append("# TYPE hms_db_query_seconds_total counter")
+            lines.append(f"hms_db_query_seconds_total {self.query_seconds_total:.6f}")
+            lines.append(f"# HELP hms_db_slow_queries_total SQL statements slower than {settings.METRICS_SLOW_QUERY_MS} ms.")
+            lines.append("# TYPE hms_db_slow_queries_total counter")
+            lines.append(f"hms_db_slow_queries_total {self.slow_queries_total}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return str(int(bound)) if float(bound).is_integer() else repr(bound)
+
+
+metrics_registry = MetricsRegistry()
+
+
+def route_template(scope) -> str:
+    """
+    Path template of the matched route with any router prefixes
+    (/api/consultation/ward-admissions/{ward_admission_id}), UNMATCHED_ROUTE for 404s.
+    The matched route may only know its path inside its router, so the prefix is
+    taken from the request path in front of the route's own (filled-in) path.
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return UNMATCHED_ROUTE
+    path = scope.get("path", "")
+    try:
+        own_path = path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return path_format
+    if path.endswith(own_path):
+        return path[: len(path) - len(own_path)] + path_format
+    return path_format
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware: latency, status and query stats of each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_and_record(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not stats.finished:
+                # Response complete: background tasks that run after it do not count towards it
+                _finish(stats, status_code, start)
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            if not stats.finished:
+                _finish(stats, status_code, start)
+            _current_request.reset(token)
+
+
+def _finish(stats: RequestStats, status_code: int, start: float) -> None:
+    stats.finished = True
+    metrics_registry.record_request(
+        stats.scope["method"], route_template(stats.scope), status_code, time.perf_counter() - start, stats
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    stats = _current_request.get()
+    if stats is not None and stats.finished:
+        stats = None
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+    metrics_registry.record_query(statement, seconds, stats)
+
+
+def register_query_metrics_listeners() -> None:
+    """Time every SQL statement on every engine (primary, replica, sync)"""
+    if not settings.METRICS_ENABLED or event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
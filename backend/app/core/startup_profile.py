@@ -0,0 +1,75 @@
+"""
+Startup profile
+Milliseconds spent in each step of application startup - router imports,
+listener registration, schema verification and the startup tasks - so a slow
+restart can be traced to the step that caused it (GET /api/system/startup).
+
+Import steps are cumulative: the first router to import FastAPI, SQLAlchemy
+or the models pays for them, later ones only for their own module.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+
+def _process_age_ms() -> Optional[float]:
+    """Milliseconds since this process started (Linux only), else None"""
+    try:
+        with open(f"/proc/{os.getpid()}/stat") as stat:
+            start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as uptime:
+            uptime_seconds = float(uptime.read().split()[0])
+        return (uptime_seconds - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """Records named, timed startup steps (thread-safe: background steps report here too)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        # Interpreter start and imports before this module was loaded
+        self.before_profile_ms = _process_age_ms()
+        self.steps: List[dict] = []
+        self.ready_ms: Optional[float] = None
+
+    def _elapsed_ms(self, since: Optional[float] = None) -> float:
+        return round((time.perf_counter() - (self._origin if since is None else since)) * 1000, 1)
+
+    @contextmanager
+    def step(self, name: str, kind: str = "step"):
+        """Time the enclosed block; errors are recorded and re-raised"""
+        start = time.perf_counter()
+        entry = {"name": name, "kind": kind, "started_ms": self._elapsed_ms(), "thread": threading.current_thread().name}
+        try:
+            yield entry
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            entry["duration_ms"] = self._elapsed_ms(start)
+            with self._lock:
+                self.steps.append(entry)
+
+    def mark_ready(self) -> None:
+        """The application accepts requests from here on (end of the startup event)"""
+        self.ready_ms = self._elapsed_ms()
+
+    def report(self) -> dict:
+        with self._lock:
+            steps = sorted(self.steps, key=lambda entry: entry["started_ms"])
+        imports = [entry for entry in steps if entry["kind"] == "import"]
+        return {
+            "before_profile_ms": round(self.before_profile_ms, 1) if self.before_profile_ms is not None else None,
+            "ready_ms": self.ready_ms,
+            "imports_ms": round(sum(entry["duration_ms"] for entry in imports), 1),
+            "slowest_imports": sorted(imports, key=lambda entry: entry["duration_ms"], reverse=True)[:5],
+            "steps": steps,
+        }
+
+
+startup_profile = StartupProfile()
@@ -1,47 +1,121 @@
 """
 Main FastAPI application
 """
+from app.core.startup_profile import startup_profile  # First, so its clock covers the imports below
+from app.core.logging_config import RequestIdMiddleware, configure_logging
+configure_logging()
+import importlib
 import os
+import threading
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from pathlib import Path
-from app.api import (
-    auth,
-    patients,
-    encounters,
-    vitals,
-    consultation,
-    billing,
-    claims,
-    price_list,
-    staff,
-    lab_templates,
-    analyzer,
-    database_management,
-    system,
-    audit_logs,
-    mis_reports
-)
-from app.core.database import engine, Base
+from app.core.config import settings
 import traceback
 
-# Import all models to ensure they're registered with Base
-import app.models  # This imports all models from __init__.py
-
-# Create database tables (with error handling - don't crash if DB is temporarily unavailable)
-try:
-    Base.metadata.create_all(bind=engine)
-    print("Database tables verified/created successfully")
-except Exception as e:
-    print(f"WARNING: Could not create/verify database tables: {e}")
-    print("This might be a connection issue. Server will start but database operations may fail.")
-    print("Please check MySQL is running and configuration is correct.")
-    import traceback
-    traceback.print_exc()
+# Routers, in inclusion order. Imported one at a time so the startup profile shows what each costs
+ROUTER_MODULES = (
+    "auth",
+    "patients",
+    "encounters",
+    "vitals",
+    "consultation",
+    "billing",
+    "claims",
+    "price_list",
+    "staff",
+    "lab_templates",
+    "analyzer",
+    "database_management",
+    "system",
+    "audit_logs",
+    "mis_reports",
+    "events",
+)
+routers = {}
+for _name in ROUTER_MODULES:
+    with startup_profile.step(f"app.api.{_name}", kind="import"):
+        routers[_name] = importlib.import_module(f"app.api.{_name}")
+
+with startup_profile.step("session listeners"):
+    from app.core.database import engine, SessionLocal, verify_schema
+    from app.services.bill_totals import register_bill_totals_listeners
+    from app.services.ward_census import register_ward_census_listeners
+    from app.services.stock_ledger import register_stock_ledger_listeners
+    from app.services.change_feed import register_change_feed_listeners
+    from app.services.bed_occupancy import register_bed_occupancy_listeners
+    from app.services.attachment_store import register_attachment_store_listeners
+    from app.services.attachment_delivery import UploadsStaticFiles
+    from app.services.attachment_compression import register_attachment_compression_listeners
+    from app.core.request_metrics import RequestMetricsMiddleware, register_query_metrics_listeners
+    from app.core.n_plus_one import NPlusOneMiddleware, detection_enabled, register_n_plus_one_listener
+
+    # Import all models to ensure they're registered with Base
+    import app.models  # This imports all models from __init__.py
+
+    # Keep denormalized bill/encounter totals in step with bill, bill item and receipt writes
+    register_bill_totals_listeners(SessionLocal)
+    # Keep the ward census in step with admissions, transfers and discharges
+    register_ward_census_listeners(SessionLocal)
+    # Keep the per-ward stock ledger in step with inventory debits and releases
+    register_stock_ledger_listeners(SessionLocal)
+    # Publish committed changes to the push channel (/api/events/stream)
+    register_change_feed_listeners(SessionLocal)
+    # Keep the bed availability index in step with bed assignments and bed edits
+    register_bed_occupancy_listeners(SessionLocal)
+    # Delete stored attachment files once the last result referencing them is committed
+    register_attachment_store_listeners(SessionLocal)
+    # Build compressed copies of newly stored attachments on the process pool
+    register_attachment_compression_listeners(SessionLocal)
+    # Count and time SQL statements per request (GET /metrics)
+    register_query_metrics_listeners()
+    # Flag repeated statement shapes and query budget overruns (N_PLUS_ONE_MODE, off by default)
+    register_n_plus_one_listener()
+
+
+def verify_database_schema():
+    """Create missing tables (with error handling - don't crash if DB is temporarily unavailable)"""
+    try:
+        with startup_profile.step("schema verification") as step:
+            created = verify_schema(engine)
+            step["tables_created"] = len(created)
+        if created:
+            print(f"Database tables created: {', '.join(created)}")
+        else:
+            print("Database tables verified successfully")
+    except Exception as e:
+        print(f"WARNING: Could not create/verify database tables: {e}")
+        print("This might be a connection issue. Server will start but database operations may fail.")
+        print("Please check MySQL is running and configuration is correct.")
+        traceback.print_exc()
+
+
+def build_bed_index():
+    """Build the bed availability index (otherwise built on first use)"""
+    try:
+        from app.services.bed_occupancy import bed_index
+        with startup_profile.step("bed availability index"):
+            db = SessionLocal()
+            try:
+                print(f"Bed availability index built ({bed_index.rebuild(db)} beds)")
+            finally:
+                db.close()
+    except Exception as e:
+        print(f"WARNING: Could not build bed availability index: {e}")
+
+
+def warm_up():
+    """Startup work that requests do not wait for: schema verification, then the bed index"""
+    if settings.SCHEMA_VERIFY_MODE == "background":
+        verify_database_schema()
+    build_bed_index()
+
+
+if settings.SCHEMA_VERIFY_MODE == "blocking":
+    verify_database_schema()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -80,6 +154,13 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Per-route latency and SQL statement counts (GET /metrics, GET /api/system/metrics)
+app.add_middleware(RequestMetricsMiddleware)
+if detection_enabled():
+    app.add_middleware(NPlusOneMiddleware)
+# Outermost: request ID for every log record written while handling the request (X-Request-ID)
+app.add_middleware(RequestIdMiddleware)
+
 # Global exception handler to ensure CORS headers are included in error responses
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -168,26 +249,14 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 # Include routers
-app.include_router(auth.router, prefix="/api")
-app.include_router(patients.router, prefix="/api")
-app.include_router(encounters.router, prefix="/api")
-app.include_router(vitals.router, prefix="/api")
-app.include_router(consultation.router, prefix="/api")
-app.include_router(billing.router, prefix="/api")
-app.include_router(claims.router, prefix="/api")
-app.include_router(price_list.router, prefix="/api")
-app.include_router(staff.router, prefix="/api")
-app.include_router(lab_templates.router, prefix="/api")
-app.include_router(analyzer.router, prefix="/api")
-app.include_router(database_management.router, prefix="/api")
-app.include_router(system.router, prefix="/api")
-app.include_router(audit_logs.router, prefix="/api")
-app.include_router(mis_reports.router, prefix="/api")
+for _name in ROUTER_MODULES:
+    app.include_router(routers[_name].router, prefix="/api")
 
 # Mount static files for lab result attachments
 uploads_dir = Path("uploads")
 uploads_dir.mkdir(exist_ok=True)
-app.mount("/api/uploads", StaticFiles(directory="uploads"), name="uploads")
+# StaticFiles plus Cache-Control (stored attachments are immutable)
+app.mount("/api/uploads", UploadsStaticFiles(directory="uploads"), name="uploads")
 
 
 @app.get("/")
@@ -214,6 +283,20 @@ def health_check():
         return {"status": "degraded", "database": "disconnected", "error": str(e)}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    """Request and SQL metrics in Prometheus text format (bearer METRICS_TOKEN when set)"""
+    from fastapi.responses import PlainTextResponse
+    from app.core.request_metrics import metrics_registry
+    import secrets
+
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not secrets.compare_digest(supplied, settings.METRICS_TOKEN):
+            return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Invalid metrics token"})
+    return PlainTextResponse(metrics_registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 # Startup event: Start analyzer server if enabled
 @app.on_event("startup")
 async def startup_event():
@@ -223,30 +306,29 @@ async def startup_event():
     print("=" * 70)
     try:
         from app.services.analyzer_server import start_analyzer_server
-        from app.core.config import settings
         
         print(f"Analyzer enabled: {settings.ANALYZER_ENABLED}")
         if settings.ANALYZER_ENABLED:
             print("Starting analyzer server...")
             try:
-                start_analyzer_server()
+                with startup_profile.step("analyzer server"):
+                    start_analyzer_server()
                 print("Analyzer server startup initiated")
             except Exception as analyzer_error:
                 print(f"WARNING: Analyzer server failed to start: {analyzer_error}")
                 print("Application will continue without analyzer server")
-                import traceback
                 traceback.print_exc()
         else:
             print("Analyzer server is disabled (ANALYZER_ENABLED=false)")
     except Exception as e:
         print(f"ERROR: Failed to start analyzer server: {e}")
         print("Application will continue without analyzer server")
-        import traceback
         traceback.print_exc()
     # Start backup scheduler
     try:
-        from app.services.backup_scheduler import backup_scheduler
-        backup_scheduler.start()
+        with startup_profile.step("backup scheduler"):
+            from app.services.backup_scheduler import backup_scheduler
+            backup_scheduler.start()
         print("Backup scheduler started")
     except ImportError as e:
         print(f"WARNING: Backup scheduler module not found: {e}")
@@ -254,9 +336,12 @@ async def startup_event():
     except Exception as e:
         print(f"WARNING: Backup scheduler failed to start: {e}")
         print("Server will continue without scheduled backups.")
-        import traceback
         traceback.print_exc()
-    
+
+    # Schema verification (SCHEMA_VERIFY_MODE=background) and the bed index build off the critical path
+    threading.Thread(target=warm_up, daemon=True, name="StartupWarmUp").start()
+
+    startup_profile.mark_ready()
     print("=" * 70)
     print("Application startup complete")
     print("=" * 70)
@@ -283,3 +368,10 @@ async def shutdown_event():
     except Exception as e:
         print(f"ERROR: Failed to stop backup scheduler: {e}")
 
+    # Stop attachment compression workers (unfinished attachments stay pending)
+    try:
+        from app.services.attachment_compression import shutdown_compression_pool
+        shutdown_compression_pool()
+    except Exception as e:
+        print(f"ERROR: Failed to stop attachment compression pool: {e}")
+
@@ -46,6 +46,12 @@ from app.models.xray_result import XrayResult
 from app.models.inpatient_xray_result import InpatientXrayResult
 from app.models.audit_log import AuditLog
 from app.models.consultation_template import ConsultationTemplate
+from app.models.revenue_summary import DailyRevenueSummary
+from app.models.ward_census import WardCensusEvent, WardDailyCensus
+from app.models.ward_stock_balance import WardStockBalance
+from app.models.blood_bank import BloodUnit, BloodUnitStatus, BloodStock
+from app.models.attachment import Attachment, DerivativeStatus
+from app.models.replica_watermark import ReplicaSyncWatermark
 
 __all__ = [
     "User",
@@ -104,5 +110,15 @@ __all__ = [
     "InpatientXrayResult",
     "AuditLog",
     "ConsultationTemplate",
+    "DailyRevenueSummary",
+    "WardCensusEvent",
+    "WardDailyCensus",
+    "WardStockBalance",
+    "BloodUnit",
+    "BloodUnitStatus",
+    "BloodStock",
+    "Attachment",
+    "DerivativeStatus",
+    "ReplicaSyncWatermark",
 ]
 
@@ -0,0 +1,43 @@
+"""
+Attachment model - content-addressed file store metadata
+One row per distinct file content; results reference it by path
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from app.core.database import Base
+from app.core.datetime_utils import utcnow_callable
+
+
+class DerivativeStatus:
+    PENDING = "pending"  # Not built yet (or no library for the type when it was stored)
+    READY = "ready"  # Compressed copy available
+    SKIPPED = "skipped"  # Not a type we compress, or compression would not save space
+    FAILED = "failed"
+
+
+class Attachment(Base):
+    """
+    A stored file, identified by the SHA-256 of its content. Uploading the same
+    content again reuses the stored file and increments ref_count; the file is
+    removed when the last reference to it is released.
+    """
+    __tablename__ = "attachments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, unique=True)
+    size_bytes = Column(Integer, nullable=False)
+    mime_type = Column(String(100), nullable=False, default="application/octet-stream")
+    original_filename = Column(String(255), nullable=True)  # Name of the first upload of this content
+    storage_path = Column(String(255), nullable=False)  # Relative to uploads/, e.g. attachments/ab/cd/<sha256>
+    ref_count = Column(Integer, nullable=False, default=0)  # Result attachment paths pointing at this file
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=utcnow_callable)
+    last_referenced_at = Column(DateTime, default=utcnow_callable)
+    # Compressed web copy (downscaled image / linearized PDF); the original is always kept
+    derivative_status = Column(String(20), nullable=False, default=DerivativeStatus.PENDING, index=True)
+    derivative_path = Column(String(255), nullable=True)  # Relative to uploads/
+    derivative_size_bytes = Column(Integer, nullable=True)
+    derivative_mime_type = Column(String(100), nullable=True)
+    derivative_processed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Attachment {self.sha256[:12]} ({self.size_bytes} bytes, refs={self.ref_count})>"
@@ -13,10 +13,11 @@ class Bill(Base):
     __tablename__ = "bills"
     
     id = Column(Integer, primary_key=True, index=True)
-    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False)
+    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False, index=True)
     bill_number = Column(String(50), unique=True, index=True, nullable=False)
     total_amount = Column(Float, nullable=False, default=0.0)
     paid_amount = Column(Float, nullable=False, default=0.0)
+    balance = Column(Float, nullable=False, default=0.0)  # total_amount - paid_amount, maintained by app.services.bill_totals
     is_paid = Column(Boolean, default=False)
     is_insured = Column(Boolean, default=False)  # Whether using insurance pricing
     miscellaneous = Column(Text)  # Additional items
@@ -38,7 +39,7 @@ class BillItem(Base):
     __tablename__ = "bill_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    bill_id = Column(Integer, ForeignKey("bills.id"), nullable=False)
+    bill_id = Column(Integer, ForeignKey("bills.id"), nullable=False, index=True)
     item_code = Column(String(50), nullable=False)
     item_name = Column(String(500), nullable=False)
     category = Column(String(50))  # surgery, procedure, product, consumable, drg
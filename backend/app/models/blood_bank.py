@@ -0,0 +1,77 @@
+"""
+Blood bank models - unit-level blood stock and per-type stock counters
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, Text
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+from app.core.datetime_utils import utcnow_callable
+
+
+class BloodUnitStatus:
+    AVAILABLE = "available"  # In the bank, can be reserved
+    RESERVED = "reserved"  # Held for an accepted request
+    ISSUED = "issued"  # Handed to the ward (request fulfilled)
+    QUARANTINED = "quarantined"  # Returned from the ward, held until the lab re-checks it
+    DISCARDED = "discarded"  # Expired, damaged or otherwise removed from stock
+
+
+class BloodUnit(Base):
+    """One bag of blood (or blood product) received into the blood bank"""
+    __tablename__ = "blood_units"
+    __table_args__ = (
+        # Reserve picks the earliest-expiring available units of a type
+        Index("ix_blood_units_type_status_expiry", "transfusion_type_id", "status", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    transfusion_type_id = Column(Integer, ForeignKey("blood_transfusion_types.id"), nullable=False)
+    unit_number = Column(String(100), nullable=False, unique=True)  # Bag / donation number
+    blood_group = Column(String(5), nullable=True)  # e.g. "O+", "AB-"
+    volume_ml = Column(Float, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    status = Column(String(20), nullable=False, default=BloodUnitStatus.AVAILABLE)
+    # Request holding (or that last held) the unit; kept as history, so deleting the request only clears it
+    request_id = Column(
+        Integer, ForeignKey("blood_transfusion_requests.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    received_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    received_at = Column(DateTime, default=utcnow_callable, nullable=False)
+    reserved_at = Column(DateTime, nullable=True)
+    issued_at = Column(DateTime, nullable=True)
+    returned_at = Column(DateTime, nullable=True)  # Came back from the ward into quarantine
+    checked_by = Column(Integer, ForeignKey("users.id"), nullable=True)  # Lab re-check of a returned unit
+    checked_at = Column(DateTime, nullable=True)
+    discarded_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    discarded_at = Column(DateTime, nullable=True)
+    discard_reason = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=utcnow_callable)
+    updated_at = Column(DateTime, default=utcnow_callable, onupdate=utcnow_callable)
+
+    transfusion_type = relationship("BloodTransfusionType")
+    request = relationship("BloodTransfusionRequest")
+
+    def __repr__(self):
+        return f"<BloodUnit {self.unit_number} - {self.status}>"
+
+
+class BloodStock(Base):
+    """
+    Unit counts for one blood transfusion type. The row is locked while units
+    of the type are reserved, issued or released, so concurrent lab users
+    cannot hand the same units to two requests.
+    """
+    __tablename__ = "blood_stock"
+
+    id = Column(Integer, primary_key=True, index=True)
+    transfusion_type_id = Column(Integer, ForeignKey("blood_transfusion_types.id"), nullable=False, unique=True)
+    available_units = Column(Integer, nullable=False, default=0)
+    reserved_units = Column(Integer, nullable=False, default=0)
+    issued_units = Column(Integer, nullable=False, default=0)
+    quarantined_units = Column(Integer, nullable=False, default=0)
+    discarded_units = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=utcnow_callable, onupdate=utcnow_callable)
+
+    transfusion_type = relationship("BloodTransfusionType")
+
+    def __repr__(self):
+        return f"<BloodStock type {self.transfusion_type_id} - Available: {self.available_units}>"
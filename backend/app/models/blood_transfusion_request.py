@@ -1,7 +1,7 @@
 """
 Blood Transfusion Request model - tracks blood transfusion requests
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -11,9 +11,13 @@ from app.core.datetime_utils import utcnow_callable
 class BloodTransfusionRequest(Base):
     """Stores blood transfusion requests for patients"""
     __tablename__ = "blood_transfusion_requests"
+    __table_args__ = (
+        # Blood bank queue: one status, oldest first, keyset paginated on (requested_at, id)
+        Index("ix_blood_requests_status_requested", "status", "requested_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False)
+    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False, index=True)
     encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False)
     transfusion_type_id = Column(Integer, ForeignKey("blood_transfusion_types.id"), nullable=False)
     quantity = Column(Float, nullable=False, default=1.0)  # Number of units requested
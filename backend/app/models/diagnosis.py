@@ -13,7 +13,7 @@ class Diagnosis(Base):
     __tablename__ = "diagnoses"
     
     id = Column(Integer, primary_key=True, index=True)
-    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False)
+    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False, index=True)
     icd10 = Column(String(50), nullable=False)  # ICD-10 code
     diagnosis = Column(Text, nullable=False)  # Diagnosis description
     gdrg_code = Column(String(50))  # GDRG code for NHIA
@@ -13,7 +13,7 @@ class DoctorNoteEntry(Base):
     __tablename__ = "doctor_note_entries"
 
     id = Column(Integer, primary_key=True, index=True)
-    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False)
+    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False, index=True)
     notes = Column(Text, nullable=False)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=utcnow_callable, nullable=False)
@@ -1,7 +1,7 @@
 """
 Encounter model
 """
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Text, Enum, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Text, Enum, Boolean, Float
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -31,7 +31,7 @@ class Encounter(Base):
     __tablename__ = "encounters"
     
     id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False, index=True)
     ccc_number = Column(String(50), nullable=True)  # CCC number for this encounter
     status = Column(String(50), default=EncounterStatus.DRAFT.value, nullable=False)
     department = Column(String(100), nullable=False)  # Service Type (Department/Clinic) from procedures
@@ -43,6 +43,10 @@ class Encounter(Base):
     finalized_at = Column(DateTime, nullable=True)
     finalized_by = Column(Integer, ForeignKey("users.id"), nullable=True)  # Doctor/PA who finalized
     archived = Column(Boolean, default=False, nullable=False)  # Soft delete flag
+    # Denormalized bill totals across all bills of this encounter (maintained by app.services.bill_totals)
+    bill_total_amount = Column(Float, default=0.0, nullable=False)
+    bill_paid_amount = Column(Float, default=0.0, nullable=False)
+    bill_balance = Column(Float, default=0.0, nullable=False)
     
     # Relationships
     patient = relationship("Patient", back_populates="encounters")
@@ -13,7 +13,7 @@ class InpatientClinicalReview(Base):
     __tablename__ = "inpatient_clinical_reviews"
 
     id = Column(Integer, primary_key=True, index=True)
-    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False)
+    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False, index=True)
     review_notes = Column(Text, nullable=True)  # General review notes
     reviewed_by = Column(Integer, ForeignKey("users.id"), nullable=False)  # Doctor/PA who reviewed
     reviewed_at = Column(DateTime, default=utcnow_callable, nullable=False)
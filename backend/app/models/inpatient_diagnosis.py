@@ -13,7 +13,7 @@ class InpatientDiagnosis(Base):
     __tablename__ = "inpatient_diagnoses"
     
     id = Column(Integer, primary_key=True, index=True)
-    clinical_review_id = Column(Integer, ForeignKey("inpatient_clinical_reviews.id"), nullable=False)
+    clinical_review_id = Column(Integer, ForeignKey("inpatient_clinical_reviews.id"), nullable=False, index=True)
     icd10 = Column(String(50), nullable=False)  # ICD-10 code
     diagnosis = Column(Text, nullable=False)  # Diagnosis description
     gdrg_code = Column(String(50))  # GDRG code for NHIA
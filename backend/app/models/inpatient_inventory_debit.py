@@ -1,7 +1,7 @@
 """
 Inpatient Inventory Debit model - tracks products/consumables used for ward admissions
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -11,9 +11,16 @@ from app.core.datetime_utils import utcnow_callable
 class InpatientInventoryDebit(Base):
     """Tracks products/consumables used for inpatients (e.g., gloves, gauze, infusion sets)"""
     __tablename__ = "inpatient_inventory_debits"
+    __table_args__ = (
+        # Pharmacy release queue: status + ward filters in used_at order
+        Index("ix_inventory_debits_released_ward_used", "is_released", "requesting_ward", "used_at", "id"),
+        Index("ix_inventory_debits_released_used", "is_released", "used_at", "id"),
+        # Stock ledger recompute per ward and product
+        Index("ix_inventory_debits_ward_product", "requesting_ward", "product_code"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False)
+    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False, index=True)
     encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False)
     requesting_ward = Column(String(100), nullable=False)  # Original ward that requested the inventory (preserved even after transfer)
     product_code = Column(String(50), nullable=False)  # Product/medication code
@@ -1,7 +1,7 @@
 """
 Inpatient Investigation model - stores investigations for clinical reviews
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -27,9 +27,14 @@ class InpatientInvestigationStatus(str, enum.Enum):
 class InpatientInvestigation(Base):
     """Investigation model for inpatient clinical reviews"""
     __tablename__ = "inpatient_investigations"
+    __table_args__ = (
+        # Same worklist access path as the OPD investigations table
+        Index("ix_inpatient_investigations_type_status_created", "investigation_type", "status", "created_at"),
+        Index("ix_inpatient_investigations_type_created", "investigation_type", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    clinical_review_id = Column(Integer, ForeignKey("inpatient_clinical_reviews.id"), nullable=False)
+    clinical_review_id = Column(Integer, ForeignKey("inpatient_clinical_reviews.id"), nullable=False, index=True)
     service_type = Column(String(100), nullable=True)  # Service Type (Department/Clinic)
     gdrg_code = Column(String(50), nullable=False)  # GDRG code for the investigation
     procedure_name = Column(String(500), nullable=True)  # Procedure/service name
@@ -1,7 +1,7 @@
 """
 Inpatient Prescription model - stores prescriptions for clinical reviews
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -11,9 +11,12 @@ from app.core.datetime_utils import utcnow_callable
 class InpatientPrescription(Base):
     """Prescription model for inpatient clinical reviews"""
     __tablename__ = "inpatient_prescriptions"
+    __table_args__ = (
+        Index("ix_inpatient_prescriptions_created", "created_at", "id"),  # Dispensing queue order / cursor
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    clinical_review_id = Column(Integer, ForeignKey("inpatient_clinical_reviews.id"), nullable=False)
+    clinical_review_id = Column(Integer, ForeignKey("inpatient_clinical_reviews.id"), nullable=False, index=True)
     medicine_code = Column(String(50), nullable=False)  # Medicine/item code
     medicine_name = Column(String(500), nullable=False)
     dose = Column(String(100))  # e.g., "500"
@@ -13,7 +13,7 @@ class InpatientVital(Base):
     __tablename__ = "inpatient_vitals"
 
     id = Column(Integer, primary_key=True, index=True)
-    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False)
+    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False, index=True)
     temperature = Column(Float, nullable=True)
     blood_pressure_systolic = Column(Integer, nullable=True)
     blood_pressure_diastolic = Column(Integer, nullable=True)
@@ -1,7 +1,7 @@
 """
 Investigation model (labs, scans, x-rays)
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -27,9 +27,14 @@ class InvestigationStatus(str, enum.Enum):
 class Investigation(Base):
     """Investigation model (labs, scans, x-rays)"""
     __tablename__ = "investigations"
+    __table_args__ = (
+        # Lab/Scan/X-ray worklists filter by type (+ status) and page newest-first
+        Index("ix_investigations_type_status_created", "investigation_type", "status", "created_at"),
+        Index("ix_investigations_type_created", "investigation_type", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=True)  # Optional for direct walk-in services
+    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=True, index=True)  # Optional for direct walk-in services
     gdrg_code = Column(String(50), nullable=False)  # GDRG code for the investigation
     procedure_name = Column(String(500), nullable=True)  # Procedure/service name
     investigation_type = Column(String(50), nullable=False)  # lab, scan, xray
@@ -44,6 +49,10 @@ class Investigation(Base):
     cancellation_reason = Column(String(1000), nullable=True)  # Reason for cancellation
     cancelled_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=utcnow_callable)
+    updated_at = Column(DateTime, default=utcnow_callable, onupdate=utcnow_callable)  # Drives worklist ETags
+    # Denormalized from the encounter's patient so worklists need no joins (kept in sync on patient update)
+    patient_display_name = Column(String(800), nullable=True)
+    patient_card_number = Column(String(50), nullable=True)
     
     # Relationships
     encounter = relationship("Encounter", back_populates="investigations")
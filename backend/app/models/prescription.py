@@ -13,7 +13,7 @@ class Prescription(Base):
     __tablename__ = "prescriptions"
     
     id = Column(Integer, primary_key=True, index=True)
-    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False)
+    encounter_id = Column(Integer, ForeignKey("encounters.id"), nullable=False, index=True)
     medicine_code = Column(String(50), nullable=False)  # Medicine/item code
     medicine_name = Column(String(500), nullable=False)
     dose = Column(String(100))  # e.g., "500"
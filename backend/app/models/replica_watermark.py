@@ -0,0 +1,23 @@
+"""
+Replica sync watermark - written to the remote (replica) database by the sync service
+"""
+from sqlalchemy import Column, Integer, DateTime
+from app.core.database import Base
+from app.core.datetime_utils import utcnow_callable
+
+
+class ReplicaSyncWatermark(Base):
+    """
+    Single row (id=1) in the replica: every change committed on the primary
+    before synced_through has been copied. Only advanced by a sync run that
+    copied every table without errors.
+    """
+    __tablename__ = "replica_sync_watermark"
+
+    id = Column(Integer, primary_key=True)
+    synced_through = Column(DateTime, nullable=False)  # Start time of the last complete sync
+    completed_at = Column(DateTime, nullable=False, default=utcnow_callable)
+    records = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ReplicaSyncWatermark {self.synced_through}>"
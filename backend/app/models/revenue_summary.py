@@ -0,0 +1,35 @@
+"""
+Daily revenue summary model - running cashier totals maintained by receipt and refund writes
+"""
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+from app.core.datetime_utils import utcnow_callable
+
+
+class DailyRevenueSummary(Base):
+    """One row per (day, cashier, service group, payment method) bucket"""
+    __tablename__ = "daily_revenue_summaries"
+    __table_args__ = (
+        UniqueConstraint(
+            "summary_date", "cashier_id", "service_group", "payment_method",
+            name="uq_daily_revenue_bucket"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    summary_date = Column(Date, nullable=False, index=True)  # Day the money moved (receipt or refund date)
+    cashier_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)  # User who issued the receipt
+    service_group = Column(String(50), nullable=False)  # From determine_service_group: Lab, Scan, Pharmacy, ...
+    payment_method = Column(String(50), nullable=False, default="cash")
+    amount_collected = Column(Float, nullable=False, default=0.0)  # Sum of receipt item payments
+    amount_refunded = Column(Float, nullable=False, default=0.0)  # Sum of refunded receipt item payments
+    payment_count = Column(Integer, nullable=False, default=0)  # Number of receipt items collected
+    refund_count = Column(Integer, nullable=False, default=0)  # Number of receipt items refunded
+    updated_at = Column(DateTime, default=utcnow_callable, onupdate=utcnow_callable)
+
+    # Relationships
+    cashier = relationship("User", foreign_keys=[cashier_id])
+
+    def __repr__(self):
+        return f"<DailyRevenueSummary {self.summary_date} {self.cashier_id} {self.service_group} - {self.amount_collected}>"
@@ -1,7 +1,7 @@
 """
 Treatment Sheet Administration model - tracks when medications are given to patients
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Time
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Time, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -11,6 +11,10 @@ from app.core.datetime_utils import utcnow_callable
 class TreatmentSheetAdministration(Base):
     """Tracks medication administration for treatment sheet"""
     __tablename__ = "treatment_sheet_administrations"
+    __table_args__ = (
+        # Ward medication round: a day's administrations for many admissions
+        Index("ix_treatment_sheet_admin_admission_date", "ward_admission_id", "administration_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False)
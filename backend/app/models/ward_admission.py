@@ -1,7 +1,7 @@
 """
 Ward Admission model - tracks patients currently admitted to wards
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -11,6 +11,9 @@ from app.core.datetime_utils import utcnow_callable
 class WardAdmission(Base):
     """Stores active ward admissions - patients currently in wards"""
     __tablename__ = "ward_admissions"
+    __table_args__ = (
+        Index("ix_ward_admissions_ward_discharged", "ward", "discharged_at"),  # Ward board
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     admission_recommendation_id = Column(Integer, ForeignKey("admission_recommendations.id"), nullable=False, unique=True)
@@ -0,0 +1,64 @@
+"""
+Ward census models - admission/transfer/discharge event log and per-ward daily census
+"""
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index, UniqueConstraint
+import enum
+from app.core.database import Base
+from app.core.datetime_utils import utcnow_callable
+
+
+class WardCensusEventType(str, enum.Enum):
+    """Census event type enumeration"""
+    ADMISSION = "admission"
+    TRANSFER_IN = "transfer_in"
+    TRANSFER_OUT = "transfer_out"
+    DISCHARGE = "discharge"
+    DEATH = "death"
+
+
+class WardCensusEvent(Base):
+    """One movement of a patient into or out of a ward"""
+    __tablename__ = "ward_census_events"
+    __table_args__ = (
+        Index("ix_ward_census_events_ward_date", "ward", "event_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # No foreign key: events of a cancelled admission are removed by the census service
+    ward_admission_id = Column(Integer, nullable=False, index=True)
+    transfer_id = Column(Integer, nullable=True)  # WardTransfer behind transfer_in/transfer_out events
+    ward = Column(String(100), nullable=False)
+    event_type = Column(String(20), nullable=False)  # admission, transfer_in, transfer_out, discharge, death
+    related_ward = Column(String(100), nullable=True)  # Other ward of a transfer
+    event_at = Column(DateTime, nullable=False)
+    event_date = Column(Date, nullable=False)  # event_at date, the census day it counts towards
+    created_at = Column(DateTime, default=utcnow_callable)
+
+    def __repr__(self):
+        return f"<WardCensusEvent {self.ward} {self.event_type} {self.event_date}>"
+
+
+class WardDailyCensus(Base):
+    """
+    Census for one ward on one day. Rows exist only for days with events;
+    a day without a row has the closing count of the latest earlier row.
+    """
+    __tablename__ = "ward_daily_census"
+    __table_args__ = (
+        UniqueConstraint("ward", "census_date", name="uq_ward_daily_census"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    ward = Column(String(100), nullable=False)
+    census_date = Column(Date, nullable=False)
+    opening = Column(Integer, nullable=False, default=0)  # Patients in the ward at the start of the day
+    admissions = Column(Integer, nullable=False, default=0)  # New admissions
+    transfers_in = Column(Integer, nullable=False, default=0)
+    transfers_out = Column(Integer, nullable=False, default=0)
+    discharges = Column(Integer, nullable=False, default=0)
+    deaths = Column(Integer, nullable=False, default=0)
+    closing = Column(Integer, nullable=False, default=0)  # Patients remaining at midnight
+    updated_at = Column(DateTime, default=utcnow_callable, onupdate=utcnow_callable)
+
+    def __repr__(self):
+        return f"<WardDailyCensus {self.ward} {self.census_date} - {self.closing}>"
@@ -0,0 +1,34 @@
+"""
+Ward stock balance model - running per-ward, per-product totals of inventory debits
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from app.core.database import Base
+from app.core.datetime_utils import utcnow_callable
+
+
+class WardStockBalance(Base):
+    """
+    Stock ledger balance for one product in one ward, maintained from
+    InpatientInventoryDebit writes by the stock ledger service
+    """
+    __tablename__ = "ward_stock_balances"
+    __table_args__ = (
+        UniqueConstraint("ward", "product_code", name="uq_ward_stock_balance"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    ward = Column(String(100), nullable=False)  # Requesting ward of the debits
+    product_code = Column(String(50), nullable=False)
+    product_name = Column(String(500), nullable=True)  # Product name as recorded on the debits
+    debit_count = Column(Integer, nullable=False, default=0)
+    requested_quantity = Column(Float, nullable=False, default=0.0)  # Everything debited by the ward
+    released_quantity = Column(Float, nullable=False, default=0.0)  # Released by pharmacy
+    outstanding_quantity = Column(Float, nullable=False, default=0.0)  # Waiting for release
+    requested_value = Column(Float, nullable=False, default=0.0)  # Sum of total_price
+    released_value = Column(Float, nullable=False, default=0.0)
+    last_used_at = Column(DateTime, nullable=True)
+    last_released_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=utcnow_callable, onupdate=utcnow_callable)
+
+    def __repr__(self):
+        return f"<WardStockBalance {self.ward} {self.product_code} - Outstanding: {self.outstanding_quantity}>"
@@ -13,7 +13,7 @@ class WardTransfer(Base):
     __tablename__ = "ward_transfers"
 
     id = Column(Integer, primary_key=True, index=True)
-    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False)
+    ward_admission_id = Column(Integer, ForeignKey("ward_admissions.id"), nullable=False, index=True)
     from_ward = Column(String(100), nullable=False)  # Ward patient is transferring from
     to_ward = Column(String(100), nullable=False)  # Ward patient is transferring to
     transfer_reason = Column(Text, nullable=True)  # Reason for transfer
@@ -162,41 +162,29 @@ class AnalyzerMapper:
         Returns:
             Tuple of (investigation, is_inpatient) or None if not found
         """
+        from sqlalchemy import cast, String
         from app.models.lab_result import LabResult
         from app.models.inpatient_lab_result import InpatientLabResult
-        from app.models.investigation import Investigation
-        from app.models.inpatient_investigation import InpatientInvestigation
+        from app.services.investigation_resolver import resolve_investigation, SOURCE_OPD, SOURCE_IPD
         import json
         
-        # Search in OPD lab results
-        opd_results = self.db.query(LabResult).filter(
-            LabResult.template_data.isnot(None)
-        ).all()
+        sample_id = sample_id.strip()
         
-        for result in opd_results:
-            if result.template_data:
-                template_data = result.template_data if isinstance(result.template_data, dict) else json.loads(result.template_data)
-                if template_data.get('sample_no', '').strip() == sample_id.strip():
-                    investigation = self.db.query(Investigation).filter(
-                        Investigation.id == result.investigation_id
-                    ).first()
-                    if investigation:
-                        return (investigation, False)
-        
-        # Search in IPD lab results
-        ipd_results = self.db.query(InpatientLabResult).filter(
-            InpatientLabResult.template_data.isnot(None)
-        ).all()
-        
-        for result in ipd_results:
-            if result.template_data:
+        # Search OPD lab results first, then IPD. Only rows whose stored JSON
+        # mentions the sample id are loaded and parsed.
+        for result_model, source in ((LabResult, SOURCE_OPD), (InpatientLabResult, SOURCE_IPD)):
+            candidates = self.db.query(result_model).filter(
+                result_model.template_data.isnot(None),
+                cast(result_model.template_data, String).contains(sample_id, autoescape=True)
+            ).all()
+            
+            for result in candidates:
                 template_data = result.template_data if isinstance(result.template_data, dict) else json.loads(result.template_data)
-                if template_data.get('sample_no', '').strip() == sample_id.strip():
-                    investigation = self.db.query(InpatientInvestigation).filter(
-                        InpatientInvestigation.id == result.investigation_id
-                    ).first()
-                    if investigation:
-                        return (investigation, True)
+                if str(template_data.get('sample_no', '')).strip() == sample_id:
+                    # The result table already tells us the source - no probing of the other table
+                    resolved = resolve_investigation(self.db, result.investigation_id, source)
+                    if resolved:
+                        return (resolved.investigation, resolved.is_inpatient)
         
         return None
 
@@ -35,6 +35,8 @@ class AnalyzerServer:
         self.running = False
         self.parser = ASTMParser()
         self.thread: Optional[threading.Thread] = None
+        # Set by the server thread once it is listening (or has given up)
+        self._started = threading.Event()
     
     def start(self):
         """Start the TCP server in a background thread"""
@@ -47,51 +49,37 @@ class AnalyzerServer:
             return
         
         try:
-            # Use both print and logger to ensure visibility
-            print("=" * 70)
-            print("Starting Analyzer Server...")
-            print(f"  Host: {settings.ANALYZER_HOST}")
-            print(f"  Port: {settings.ANALYZER_PORT}")
-            print(f"  Equipment IP: {settings.ANALYZER_EQUIPMENT_IP}")
-            print("=" * 70)
             
-            logger.info("=" * 70)
             logger.info("Starting Analyzer Server...")
-            logger.info(f"  Host: {settings.ANALYZER_HOST}")
-            logger.info(f"  Port: {settings.ANALYZER_PORT}")
-            logger.info(f"  Equipment IP: {settings.ANALYZER_EQUIPMENT_IP}")
-            logger.info("=" * 70)
+            logger.info("  Host: %s", settings.ANALYZER_HOST)
+            logger.info("  Port: %s", settings.ANALYZER_PORT)
+            logger.info("  Equipment IP: %s", settings.ANALYZER_EQUIPMENT_IP)
             
             self.running = True
+            self._started.clear()
             self.thread = threading.Thread(target=self._run_server, daemon=True, name="AnalyzerServer")
             
-            print("Starting server thread...")
             logger.info("Starting server thread...")
             
             self.thread.start()
             
-            # Give it a moment to start and bind
-            import time
-            time.sleep(1.0)  # Increased wait time
+            # Wait only until the thread has bound (or failed to) - milliseconds, not a fixed sleep
+            if not self._started.wait(timeout=5.0):
+                logger.warning("Analyzer server thread has not bound yet - continuing startup")
             
-            if self.thread.is_alive():
-                print("✓ Analyzer server thread is alive")
-                logger.info(f"✓ Analyzer server thread is alive")
+            if self.thread.is_alive() and self.running:
+                logger.info("✓ Analyzer server thread is alive")
                 
                 # Check if socket was created
                 if self.server_socket:
-                    print(f"✓ Server socket created: {self.server_socket}")
-                    logger.info(f"✓ Server socket created: {self.server_socket}")
+                    logger.info("✓ Server socket created: %s", self.server_socket)
                 else:
-                    print("⚠ Server socket not yet created (may still be initializing)")
                     logger.warning("Server socket not yet created")
             else:
-                print("✗ Analyzer server thread died immediately!")
-                print("  Check logs above for errors")
-                logger.error(f"✗ Analyzer server thread died immediately!")
+                logger.error("✗ Analyzer server thread died immediately!")
                 self.running = False
         except Exception as e:
-            logger.error(f"Failed to start analyzer server: {e}", exc_info=True)
+            logger.error("Failed to start analyzer server: %s", e, exc_info=True)
             self.running = False
     
     def stop(self):
@@ -101,13 +89,12 @@ class AnalyzerServer:
             try:
                 self.server_socket.close()
             except Exception as e:
-                logger.error(f"Error closing server socket: {e}")
+                logger.error("Error closing server socket: %s", e)
         logger.info("Analyzer server stopped")
     
     def _run_server(self):
         """Run the TCP server (blocking)"""
         try:
-            print("Creating socket...")
             logger.info("Creating socket...")
             
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -116,46 +103,35 @@ class AnalyzerServer:
             bind_address = settings.ANALYZER_HOST
             bind_port = settings.ANALYZER_PORT
             
-            print(f"Attempting to bind analyzer server to {bind_address}:{bind_port}")
-            logger.info(f"Attempting to bind analyzer server to {bind_address}:{bind_port}")
+            logger.info("Attempting to bind analyzer server to %s:%s", bind_address, bind_port)
             
             try:
                 self.server_socket.bind((bind_address, bind_port))
-                print(f"✓ Successfully bound to {bind_address}:{bind_port}")
-                logger.info(f"✓ Successfully bound to {bind_address}:{bind_port}")
+                logger.info("✓ Successfully bound to %s:%s", bind_address, bind_port)
             except OSError as e:
                 error_msg = f"Failed to bind to {bind_address}:{bind_port}: {e}"
-                print(f"✗ {error_msg}")
-                print(f"  Port {bind_port} may already be in use or address not available")
                 logger.error(error_msg)
-                logger.error(f"Port {bind_port} may already be in use or address not available")
+                logger.error("Port %s may already be in use or address not available", bind_port)
                 self.running = False
                 return
             except Exception as e:
                 error_msg = f"Unexpected error binding socket: {e}"
-                print(f"✗ {error_msg}")
                 logger.error(error_msg, exc_info=True)
                 self.running = False
                 return
             
-            print("Setting up listener...")
             logger.info("Setting up listener...")
             
             self.server_socket.listen(5)
             self.server_socket.settimeout(1.0)  # Allow periodic checking of self.running
+            self._started.set()
             
-            print(f"✓ Analyzer server is now listening on {bind_address}:{bind_port}")
-            print(f"  Equipment IP: {settings.ANALYZER_EQUIPMENT_IP}")
-            print(f"  Ready to receive data from analyzer")
-            print(f"  Configure analyzer to connect to: 10.10.17.223:{bind_port}")
-            print("=" * 70)
             
-            logger.info(f"✓ Analyzer server is now listening on {bind_address}:{bind_port}")
-            logger.info(f"  Equipment IP: {settings.ANALYZER_EQUIPMENT_IP}")
-            logger.info(f"  Ready to receive data from analyzer")
-            logger.info(f"  Configure analyzer to connect to: 10.10.17.223:{bind_port}")
+            logger.info("✓ Analyzer server is now listening on %s:%s", bind_address, bind_port)
+            logger.info("  Equipment IP: %s", settings.ANALYZER_EQUIPMENT_IP)
+            logger.info("  Ready to receive data from analyzer")
+            logger.info("  Configure analyzer to connect to: 10.10.17.223:%s", bind_port)
             
-            print("Waiting for connections...")
             logger.info("Waiting for connections...")
             
             connection_count = 0
@@ -164,10 +140,8 @@ class AnalyzerServer:
                     client_socket, address = self.server_socket.accept()
                     connection_count += 1
                     
-                    print(f"🔌 NEW CONNECTION #{connection_count} from {address[0]}:{address[1]}")
-                    logger.info(f"🔌 NEW CONNECTION #{connection_count} from {address[0]}:{address[1]}")
-                    print(f"   Connection accepted, starting handler thread...")
-                    logger.info(f"   Connection accepted, starting handler thread...")
+                    logger.info("🔌 NEW CONNECTION #%s from %s:%s", connection_count, address[0], address[1])
+                    logger.info("   Connection accepted, starting handler thread...")
                     
                     # Handle client in a separate thread
                     client_thread = threading.Thread(
@@ -177,8 +151,7 @@ class AnalyzerServer:
                         name=f"AnalyzerClient-{connection_count}"
                     )
                     client_thread.start()
-                    print(f"   Handler thread started for {address}")
-                    logger.info(f"   Handler thread started for {address}")
+                    logger.info("   Handler thread started for %s", address)
                 
                 except socket.timeout:
                     # Timeout is expected, continue loop to check self.running
@@ -186,24 +159,20 @@ class AnalyzerServer:
                 except Exception as e:
                     if self.running:
                         error_msg = f"Error accepting connection: {e}"
-                        print(f"✗ {error_msg}")
                         logger.error(error_msg, exc_info=True)
         
         except Exception as e:
             error_msg = f"Error in analyzer server: {e}"
-            print(f"✗ {error_msg}")
             logger.error(error_msg, exc_info=True)
         finally:
-            print("Analyzer server thread ending...")
+            self._started.set()
             logger.info("Analyzer server thread ending...")
             if self.server_socket:
                 try:
                     self.server_socket.close()
-                    print("Server socket closed")
                     logger.info("Server socket closed")
                 except Exception as e:
-                    print(f"Error closing socket: {e}")
-                    logger.error(f"Error closing socket: {e}")
+                    logger.error("Error closing socket: %s", e)
     
     def _handle_client(self, client_socket: socket.socket, address: tuple):
         """Handle a client connection"""
@@ -217,18 +186,18 @@ class AnalyzerServer:
             # Peek at first data to check if it's HTTP (browser/health check)
             try:
                 first_data = client_socket.recv(1024, socket.MSG_PEEK)
-                logger.info(f"📥 First data from {address}: {len(first_data)} bytes")
-                logger.debug(f"   First 50 bytes (hex): {first_data[:50].hex()}")
-                logger.debug(f"   First 50 bytes (readable): {first_data[:50]}")
+                logger.info("📥 First data from %s: %s bytes", address, len(first_data))
+                logger.debug("   First 50 bytes (hex): %s", first_data[:50].hex())
+                logger.debug("   First 50 bytes (readable): %s", first_data[:50])
                 
                 if first_data.startswith(b'GET ') or first_data.startswith(b'POST ') or first_data.startswith(b'HTTP/'):
-                    logger.warning(f"⚠️  Ignoring HTTP request from {address} (not analyzer data)")
+                    logger.warning("⚠️  Ignoring HTTP request from %s (not analyzer data)", address)
                     client_socket.close()
                     return
                 else:
-                    logger.info(f"✓ Non-HTTP data received, processing as analyzer data")
+                    logger.info("✓ Non-HTTP data received, processing as analyzer data")
             except Exception as e:
-                logger.warning(f"Could not peek data from {address}: {e}")
+                logger.warning("Could not peek data from %s: %s", address, e)
             
             while self.running:
                 try:
@@ -238,16 +207,16 @@ class AnalyzerServer:
                     
                     # Skip HTTP requests
                     if data.startswith(b'GET ') or data.startswith(b'POST ') or data.startswith(b'HTTP/'):
-                        logger.info(f"Ignoring HTTP request from {address}")
+                        logger.info("Ignoring HTTP request from %s", address)
                         client_socket.close()
                         return
                     
                     # Save raw data to file
                     if raw_data_file is None:
                         raw_data_file = RAW_DATA_DIR / f"raw_data_{connection_id}.txt"
-                        logger.info(f"💾 Receiving analyzer data from {address}")
-                        logger.info(f"   Saving to: {raw_data_file}")
-                        logger.info(f"   First data chunk: {len(data)} bytes")
+                        logger.info("💾 Receiving analyzer data from %s", address)
+                        logger.info("   Saving to: %s", raw_data_file)
+                        logger.info("   First data chunk: %s bytes", len(data))
                     
                     # Append raw bytes to file
                     with open(raw_data_file, 'ab') as f:
@@ -313,7 +282,7 @@ class AnalyzerServer:
                     
                     # Send ACK
                     client_socket.send(b'\x06')  # ACK
-                    logger.info(f"Sent ACK to analyzer at {address}")
+                    logger.debug("Sent ACK to analyzer at %s", address)
                     
                     # Clear frame_data for next iteration
                     del frame_data
@@ -321,58 +290,58 @@ class AnalyzerServer:
                 except socket.timeout:
                     # Process any remaining data in buffer
                     if buffer:
-                        logger.info(f"Processing remaining buffer data ({len(buffer)} bytes)")
+                        logger.info("Processing remaining buffer data (%s bytes)", len(buffer))
                         self._process_astm_data(buffer, address)
                         buffer = b''
                     break
                 except Exception as e:
-                    logger.error(f"Error receiving data from {address}: {e}", exc_info=True)
+                    logger.error("Error receiving data from %s: %s", address, e, exc_info=True)
                     break
             
             if raw_data_file:
-                logger.info(f"Raw data saved to: {raw_data_file}")
-                logger.info(f"Hex dump saved to: {hex_file}")
-                logger.info(f"Parsed frames saved to: {parsed_file}")
+                logger.info("Raw data saved to: %s", raw_data_file)
+                logger.info("Hex dump saved to: %s", hex_file)
+                logger.info("Parsed frames saved to: %s", parsed_file)
         
         except Exception as e:
-            logger.error(f"Error handling client {address}: {e}", exc_info=True)
+            logger.error("Error handling client %s: %s", address, e, exc_info=True)
         finally:
             try:
                 client_socket.close()
             except Exception:
                 pass
-            logger.info(f"Analyzer connection from {address} closed")
+            logger.info("Analyzer connection from %s closed", address)
     
     def _process_astm_data(self, data: bytes, address: tuple):
         """Process received ASTM data"""
         try:
             # Log raw data for debugging
-            logger.debug(f"Processing {len(data)} bytes from {address}")
-            logger.debug(f"Raw data (hex): {data.hex()}")
+            logger.debug("Processing %s bytes from %s", len(data), address)
+            logger.debug("Raw data (hex): %s", data.hex())
             
             # Parse ASTM frame
             records = self.parser.parse_frame(data)
             
             if not records:
-                logger.warning(f"No records parsed from data from {address}")
-                logger.warning(f"Raw data: {data.hex()}")
+                logger.warning("No records parsed from data from %s", address)
+                logger.warning("Raw data: %s", data.hex())
                 return
             
-            logger.info(f"Parsed {len(records)} ASTM records from {address}")
+            logger.debug("Parsed %s ASTM records from %s", len(records), address)
             
             # Log parsed records for debugging
             for i, record in enumerate(records):
-                logger.debug(f"Record {i+1}: {record}")
+                logger.debug("Record %s: %s", i+1, record)
             
             # Extract results
             extracted = self.parser.extract_results(records)
             
             sample_id = extracted.get('sample_id', '').strip()
             if not sample_id:
-                logger.warning(f"No sample ID found in ASTM data from {address}")
+                logger.warning("No sample ID found in ASTM data from %s", address)
                 return
             
-            logger.info(f"Processing analyzer results for sample ID: {sample_id}")
+            logger.info("Processing analyzer results for sample ID: %s", sample_id)
             
             # Process in database session
             db = SessionLocal()
@@ -383,7 +352,7 @@ class AnalyzerServer:
                 investigation_info = mapper.find_investigation_by_sample_id(sample_id)
                 
                 if not investigation_info:
-                    logger.warning(f"No investigation found for sample ID: {sample_id}")
+                    logger.warning("No investigation found for sample ID: %s", sample_id)
                     return
                 
                 investigation, is_inpatient = investigation_info
@@ -399,12 +368,12 @@ class AnalyzerServer:
                     ).first()
                 
                 if not lab_result:
-                    logger.warning(f"No lab result found for investigation {investigation.id}")
+                    logger.warning("No lab result found for investigation %s", investigation.id)
                     return
                 
                 # Get template
                 if not lab_result.template_id:
-                    logger.warning(f"No template ID for lab result {lab_result.id}")
+                    logger.warning("No template ID for lab result %s", lab_result.id)
                     return
                 
                 template = db.query(LabResultTemplate).filter(
@@ -412,7 +381,7 @@ class AnalyzerServer:
                 ).first()
                 
                 if not template:
-                    logger.warning(f"Template {lab_result.template_id} not found")
+                    logger.warning("Template %s not found", lab_result.template_id)
                     return
                 
                 # Map ASTM data to template format
@@ -451,16 +420,16 @@ class AnalyzerServer:
                 
                 db.commit()
                 
-                logger.info(f"Successfully updated lab result {lab_result.id} with analyzer data for sample {sample_id}")
+                logger.info("Successfully updated lab result %s with analyzer data for sample %s", lab_result.id, sample_id)
             
             except Exception as e:
                 db.rollback()
-                logger.error(f"Error processing analyzer data for sample {sample_id}: {e}", exc_info=True)
+                logger.error("Error processing analyzer data for sample %s: %s", sample_id, e, exc_info=True)
             finally:
                 db.close()
         
         except Exception as e:
-            logger.error(f"Error processing ASTM data from {address}: {e}", exc_info=True)
+            logger.error("Error processing ASTM data from %s: %s", address, e, exc_info=True)
 
 
 # Global server instance
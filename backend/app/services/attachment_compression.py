@@ -0,0 +1,198 @@
+"""
+Attachment compression
+Builds compressed web copies ("derivatives") of stored attachments on a
+process pool, keeping the originals.
+
+New attachments are queued when the transaction that stored them commits;
+the work (media_derivatives.build_derivative) runs in ATTACHMENT_COMPRESSION_WORKERS
+separate processes so image decoding and PDF rewriting never compete with
+request handling for the GIL. When a job finishes its outcome is written to
+the attachment row: ready (with the derivative's path, size and type),
+skipped (nothing to gain) or failed.
+
+Attachments stored before this existed, or while Pillow / pikepdf were
+missing, stay pending until queue_pending_compression picks them up.
+
+The viewer is served the derivative by default (see get_derivative); the
+original is always available.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.datetime_utils import utcnow
+from app.models.attachment import Attachment, DerivativeStatus
+from app.services import media_derivatives
+from app.services.attachment_store import UPLOAD_ROOT, attachment_sha256, derivative_base
+
+logger = logging.getLogger(__name__)
+
+_PENDING_JOBS = "attachment_compression_jobs"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_in_flight: set = set()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max(1, settings.ATTACHMENT_COMPRESSION_WORKERS))
+        return _executor
+
+
+def shutdown_compression_pool(wait: bool = False) -> None:
+    """Stop the worker processes (queued jobs are dropped and stay pending)"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+        _in_flight.clear()
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def submit_compression(attachment_id: int, sha256: str, storage_path: str, mime_type: str) -> Optional[Future]:
+    """Queue one attachment; None if it is already queued or its type cannot be compressed here"""
+    if not media_derivatives.can_build(mime_type):
+        return None
+    with _lock:
+        if attachment_id in _in_flight:
+            return None
+        _in_flight.add(attachment_id)
+    try:
+        future = _get_executor().submit(
+            media_derivatives.build_derivative,
+            str(UPLOAD_ROOT / storage_path), mime_type, str(UPLOAD_ROOT / derivative_base(sha256)),
+        )
+    except Exception:
+        with _lock:
+            _in_flight.discard(attachment_id)
+        raise
+    future.add_done_callback(lambda done: _record_result(attachment_id, sha256, done))
+    return future
+
+
+def _record_result(attachment_id: int, sha256: str, future: Future) -> None:
+    """Write a finished job's outcome to the attachment row (runs on the pool's callback thread)"""
+    with _lock:
+        _in_flight.discard(attachment_id)
+    if future.cancelled():
+        return
+    values = {"derivative_processed_at": utcnow()}
+    derivative = None
+    error = future.exception()
+    if error is not None:
+        logger.warning("Compressing attachment %s failed: %s", attachment_id, error)
+        values["derivative_status"] = DerivativeStatus.FAILED
+    elif future.result() is None:
+        values["derivative_status"] = DerivativeStatus.SKIPPED
+    else:
+        path, size, mime_type = future.result()
+        derivative = Path(path)
+        values.update(
+            derivative_status=DerivativeStatus.READY,
+            derivative_path=derivative_base(sha256) + Path(path).suffix,
+            derivative_size_bytes=size,
+            derivative_mime_type=mime_type,
+        )
+    db = SessionLocal()
+    try:
+        updated = db.query(Attachment).filter(Attachment.id == attachment_id).update(values, synchronize_session=False)
+        db.commit()
+        # The attachment was released while compressing and its files already purged:
+        # remove the copy just built, unless the same content has been stored again
+        if not updated and derivative is not None and not db.query(Attachment.id).filter(Attachment.sha256 == sha256).first():
+            derivative.unlink(missing_ok=True)
+    except Exception as e:
+        db.rollback()
+        logger.warning("Could not record compression of attachment %s: %s", attachment_id, e)
+    finally:
+        db.close()
+
+
+def queue_pending_compression(db: Session, limit: int = 500, retry_failed: bool = False) -> int:
+    """Queue attachments whose derivative has not been built; returns how many were queued"""
+    statuses = [DerivativeStatus.PENDING] + ([DerivativeStatus.FAILED] if retry_failed else [])
+    rows = db.query(Attachment.id, Attachment.sha256, Attachment.storage_path, Attachment.mime_type).filter(
+        Attachment.derivative_status.in_(statuses)
+    ).order_by(Attachment.id).limit(limit).all()
+    return sum(1 for row in rows if submit_compression(*row) is not None)
+
+
+def get_derivative(db: Session, attachment_path: str) -> Optional[Tuple[Path, str, str, str]]:
+    """(file, mime type, download filename, ETag) of an attachment's compressed copy, if built"""
+    sha256 = attachment_sha256(attachment_path)
+    if sha256 is None:
+        return None
+    row = db.query(Attachment.derivative_path, Attachment.derivative_mime_type).filter(
+        Attachment.sha256 == sha256, Attachment.derivative_status == DerivativeStatus.READY
+    ).first()
+    if row is None or not row.derivative_path:
+        return None
+    file_path = UPLOAD_ROOT / row.derivative_path
+    if not file_path.exists():
+        return None
+    suffix = Path(row.derivative_path).suffix
+    return file_path, row.derivative_mime_type, Path(attachment_path).stem + suffix, f'"{sha256}{suffix}"'
+
+
+def get_compression_stats(db: Session) -> dict:
+    """Attachment counts and bytes per derivative status, and the space the derivatives save"""
+    rows = db.query(
+        Attachment.derivative_status,
+        func.count(Attachment.id),
+        func.coalesce(func.sum(Attachment.size_bytes), 0),
+        func.coalesce(func.sum(Attachment.derivative_size_bytes), 0),
+    ).group_by(Attachment.derivative_status).all()
+    by_status = {
+        status: {"attachments": count, "original_bytes": int(original), "derivative_bytes": int(derived)}
+        for status, count, original, derived in rows
+    }
+    ready = by_status.get(DerivativeStatus.READY, {"original_bytes": 0, "derivative_bytes": 0})
+    return {
+        "by_status": by_status,
+        "stored_bytes": sum(entry["original_bytes"] + entry["derivative_bytes"] for entry in by_status.values()),
+        "bytes_saved": ready["original_bytes"] - ready["derivative_bytes"],
+        "in_flight": len(_in_flight),
+        "workers": settings.ATTACHMENT_COMPRESSION_WORKERS,
+        "enabled": settings.ATTACHMENT_COMPRESSION_ENABLED,
+        "image_support": media_derivatives.PIL_AVAILABLE,
+        "pdf_support": media_derivatives.PIKEPDF_AVAILABLE,
+    }
+
+
+def _collect_new_attachments(session: Session, flush_context) -> None:
+    for obj in session.new:
+        if isinstance(obj, Attachment):
+            session.info.setdefault(_PENDING_JOBS, []).append(
+                (obj.id, obj.sha256, obj.storage_path, obj.mime_type)
+            )
+
+
+def _submit_jobs(session: Session) -> None:
+    jobs = session.info.pop(_PENDING_JOBS, None)
+    if not jobs or not settings.ATTACHMENT_COMPRESSION_ENABLED:
+        return
+    for job in jobs:
+        try:
+            submit_compression(*job)
+        except Exception as e:
+            logger.warning("Could not queue compression of attachment %s: %s", job[0], e)
+
+
+def _discard_jobs(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_PENDING_JOBS, None)
+
+
+def register_attachment_compression_listeners(session_factory) -> None:
+    """Queue compression of newly stored attachments on commit (idempotent)"""
+    if not event.contains(session_factory, "after_flush", _collect_new_attachments):
+        event.listen(session_factory, "after_flush", _collect_new_attachments)
+        event.listen(session_factory, "after_commit", _submit_jobs)
+        event.listen(session_factory, "after_rollback", _discard_jobs)
@@ -0,0 +1,236 @@
+"""
+Attachment delivery
+Serves result attachments with cache validators, byte ranges and thumbnails.
+
+- ETag / If-None-Match: stored attachments use their SHA-256 as a strong
+  ETag; legacy uploads use size and modification time.
+- Range: a single "bytes=" range is answered with 206 and Content-Range
+  (If-Range honoured); anything else gets the whole file. The file is
+  streamed in chunks rather than read into memory.
+- Cache-Control: content-addressed files requested by path never change, so
+  they are cached as immutable; other responses must be revalidated.
+- Thumbnails: JPEG previews of images (Pillow) and of a PDF's first page
+  (pypdfium2), generated on demand and cached on disk under
+  ATTACHMENT_THUMBNAIL_DIR. Both libraries are optional.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Iterator, Optional
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from app.core.config import settings
+from app.services.attachment_store import CHUNK_SIZE, STORE_DIR, attachment_sha256
+
+# Optional; imported when a thumbnail is first rendered
+PIL_AVAILABLE = find_spec("PIL") is not None
+PDFIUM_AVAILABLE = find_spec("pypdfium2") is not None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "private, max-age=31536000, immutable"
+REVALIDATE = "private, no-cache"
+THUMBNAIL_SIZES = (128, 256, 512, 1024)
+THUMBNAIL_VERSION = 1
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def attachment_etag(file_path: Path, attachment_path: str) -> str:
+    sha256 = attachment_sha256(attachment_path)
+    if sha256:
+        return f'"{sha256}"'
+    stat = file_path.stat()
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def parse_range(header: Optional[str], size: int):
+    """
+    (start, end) inclusive for a single satisfiable byte range, None to send the whole file.
+
+    Raises:
+        ValueError: range cannot be satisfied (416)
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None  # Malformed or multi-range - the whole file is a valid answer
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            raise ValueError("Range not satisfiable")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def _read_file(file_path: Path, start: int, length: int) -> Iterator[bytes]:
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def attachment_response(
+    request: Request,
+    file_path: Path,
+    filename: str,
+    mime_type: str,
+    etag: str,
+    immutable: bool = False,
+    disposition: str = "attachment",
+) -> Response:
+    """Streamed file response honouring If-None-Match, Range and If-Range"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'{disposition}; filename="{filename}"',
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = file_path.stat().st_size
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _read_file(file_path, start, end - start + 1), status_code=status_code, media_type=mime_type, headers=headers
+    )
+
+
+def thumbnail_size(requested: int) -> int:
+    """Smallest cached thumbnail size covering the request"""
+    return next((size for size in THUMBNAIL_SIZES if size >= requested), THUMBNAIL_SIZES[-1])
+
+
+def _render_thumbnail(file_path: Path, mime_type: str, size: int) -> bytes:
+    import io
+
+    if mime_type == "application/pdf":
+        if not PDFIUM_AVAILABLE or not PIL_AVAILABLE:
+            raise RuntimeError("PDF previews are not available. Install with: pip install pypdfium2 Pillow")
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(str(file_path))
+        try:
+            page = pdf[0]
+            width, height = page.get_size()
+            image = page.render(scale=size / max(width, height, 1)).to_pil()
+        finally:
+            pdf.close()
+    else:
+        if not PIL_AVAILABLE:
+            raise RuntimeError("Image previews are not available. Install with: pip install Pillow")
+        from PIL import Image
+
+        image = Image.open(file_path)
+        image.draft("RGB", (size, size))  # Lets JPEG decode at a reduced scale
+    image.thumbnail((size, size))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+def get_thumbnail(file_path: Path, mime_type: str, etag: str, size: int) -> dict:
+    """
+    JPEG preview of an image or PDF, from the disk cache when already generated.
+
+    Returns:
+        {"content": bytes, "etag": str, "cached": bool}
+
+    Raises:
+        ValueError: the attachment is not an image or PDF
+        RuntimeError: the library needed for this type is not installed
+    """
+    if not (mime_type.startswith("image/") or mime_type == "application/pdf"):
+        raise ValueError("Previews are only available for images and PDFs")
+    key = hashlib.sha256(f"{etag}|{size}|v{THUMBNAIL_VERSION}".encode()).hexdigest()
+    cache_path = Path(settings.ATTACHMENT_THUMBNAIL_DIR) / key[:2] / f"{key}.jpg"
+    result = {"etag": f'"{key[:32]}"'}
+    try:
+        return {**result, "content": cache_path.read_bytes(), "cached": True}
+    except OSError:
+        pass
+
+    try:
+        content = _render_thumbnail(file_path, mime_type, size)
+    except (RuntimeError, ValueError):
+        raise
+    except Exception as e:
+        raise ValueError(f"Could not generate a preview: {e}")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(content)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning("Could not cache thumbnail %s: %s", cache_path, e)
+    return {**result, "content": content, "cached": False}
+
+
+def thumbnail_response(request: Request, file_path: Path, mime_type: str, etag: str,
+                       size: int, immutable: bool = False) -> Response:
+    """
+    Raises:
+        ValueError, RuntimeError: see get_thumbnail
+    """
+    thumbnail = get_thumbnail(file_path, mime_type, etag, thumbnail_size(size))
+    headers = {
+        "ETag": thumbnail["etag"],
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "X-Cache": "hit" if thumbnail["cached"] else "miss",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), thumbnail["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=thumbnail["content"], media_type="image/jpeg", headers=headers)
+
+
+class UploadsStaticFiles(StaticFiles):
+    """
+    /api/uploads mount. StaticFiles already answers If-None-Match and Range;
+    this adds Cache-Control - immutable for content-addressed files.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        relative = os.path.relpath(full_path, os.path.realpath(self.directory))
+        is_stored = relative.split(os.sep)[0] == STORE_DIR
+        response.headers["Cache-Control"] = IMMUTABLE if is_stored else REVALIDATE
+        return response
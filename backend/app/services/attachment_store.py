@@ -0,0 +1,238 @@
+"""
+Attachment store
+Content-addressed storage for lab, scan and X-ray result attachments.
+
+Uploads are copied from the request's spooled file in fixed-size chunks on a
+worker thread (never on the event loop), hashed with SHA-256 as they are
+written, and kept once per distinct content under sharded directories:
+
+    uploads/attachments/ab/cd/abcd1234...   (the file, named by its hash)
+
+Results keep a path string in attachment_path as before. For stored
+attachments it is the blob's path plus the uploaded filename,
+
+    attachments/ab/cd/abcd1234.../chest_xray.pdf
+
+so screens that show the last path segment still show the original name,
+and the same content uploaded under two names shares one file. Paths written
+before the store existed (lab_results/..., scan_results/..., xray_results/...)
+resolve to uploads/<path> as they always did.
+
+The attachments table holds size, MIME type and hash for each stored file
+with a reference count. release_attachment drops a reference; the file (and
+its compressed copy, see attachment_compression) is deleted after the
+transaction that released its last reference commits.
+"""
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+from fastapi import UploadFile
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.datetime_utils import utcnow
+from app.models.attachment import Attachment, DerivativeStatus
+from app.services.media_derivatives import is_compressible
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ROOT = Path("uploads")
+STORE_DIR = "attachments"
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+_PENDING_PURGE = "attachment_store_purge"
+_STORED_PATH = re.compile(rf"^{STORE_DIR}/([0-9a-f]{{2}})/([0-9a-f]{{2}})/([0-9a-f]{{64}})/[^/]+$")
+
+
+class StoredAttachment(NamedTuple):
+    path: str  # Value for the result's attachment_path
+    sha256: str
+    size_bytes: int
+    mime_type: str
+    deduplicated: bool  # Content was already in the store
+
+
+def safe_filename(filename: Optional[str], default: str = "unnamed_file.pdf") -> str:
+    """Last path component of an uploaded filename, with spaces replaced"""
+    name = Path(filename or "").name.replace(" ", "_").replace("\\", "_")
+    return name or default
+
+
+def blob_path(sha256: str) -> str:
+    """Where content with this hash is kept, relative to uploads/"""
+    return f"{STORE_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def derivative_base(sha256: str) -> str:
+    """Compressed copy of the content, relative to uploads/ (the builder adds the extension)"""
+    return f"{STORE_DIR}/derived/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def resolve_attachment(attachment_path: str) -> Path:
+    """
+    File on disk for a result attachment path (stored or legacy).
+
+    Raises:
+        ValueError: path escapes the uploads directory
+    """
+    match = _STORED_PATH.match(attachment_path)
+    if match:
+        return UPLOAD_ROOT / blob_path(match.group(3))
+    if ".." in Path(attachment_path).parts or Path(attachment_path).is_absolute():
+        raise ValueError("Invalid attachment path")
+    return UPLOAD_ROOT / attachment_path
+
+
+def attachment_sha256(attachment_path: str) -> Optional[str]:
+    match = _STORED_PATH.match(attachment_path or "")
+    return match.group(3) if match else None
+
+
+def result_attachment_paths(value: Optional[str]) -> List[str]:
+    """A result's attachment_path as a list (scan and X-ray results store a JSON array)"""
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return [value]
+    return parsed if isinstance(parsed, list) else [value]
+
+
+def get_attachment_metadata(db: Session, attachment_path: str) -> Optional[Attachment]:
+    sha256 = attachment_sha256(attachment_path)
+    if sha256 is None:
+        return None
+    return db.query(Attachment).filter(Attachment.sha256 == sha256).first()
+
+
+def _copy_into_store(source) -> tuple:
+    """Stream a file object into the store; returns (sha256, size, created). Runs on a worker thread."""
+    staging = UPLOAD_ROOT / STORE_DIR / "tmp"
+    staging.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=staging)
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                tmp.write(chunk)
+        sha256 = digest.hexdigest()
+        target = UPLOAD_ROOT / blob_path(sha256)
+        if target.exists():
+            os.remove(tmp_path)
+            return sha256, size, False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Same content under the same name, so a concurrent identical upload replacing it is harmless
+        os.replace(tmp_path, target)
+        return sha256, size, True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _add_reference(db: Session, sha256: str, size: int, mime_type: str, filename: str, user_id: Optional[int]) -> bool:
+    """Count one more reference to the content, creating its row if new; returns True if the row existed"""
+    values = {"ref_count": Attachment.ref_count + 1, "last_referenced_at": utcnow()}
+    if db.execute(update(Attachment).where(Attachment.sha256 == sha256).values(**values)).rowcount:
+        return True
+    try:
+        with db.begin_nested():
+            db.add(Attachment(
+                sha256=sha256, size_bytes=size, mime_type=mime_type, original_filename=filename,
+                storage_path=blob_path(sha256), ref_count=1, created_by=user_id,
+                derivative_status=DerivativeStatus.PENDING if is_compressible(mime_type) else DerivativeStatus.SKIPPED,
+            ))
+        return False
+    except IntegrityError:
+        # Another upload of the same content created the row first
+        db.execute(update(Attachment).where(Attachment.sha256 == sha256).values(**values))
+        return True
+
+
+async def store_upload(db: Session, upload: UploadFile, user_id: Optional[int] = None,
+                       default_filename: str = "unnamed_file.pdf") -> StoredAttachment:
+    """
+    Store an uploaded file and take a reference to it (committed with the caller's transaction).
+    """
+    filename = safe_filename(upload.filename, default_filename)
+    mime_type = mimetypes.guess_type(filename)[0] or upload.content_type or "application/octet-stream"
+    await upload.seek(0)
+    sha256, size, created = await run_in_threadpool(_copy_into_store, upload.file)
+    existed = _add_reference(db, sha256, size, mime_type, filename, user_id)
+    if not existed and not created and not (UPLOAD_ROOT / blob_path(sha256)).exists():
+        # The file was there when copied, but its last reference was released and
+        # purged before this row was created: write it again
+        await upload.seek(0)
+        await run_in_threadpool(_copy_into_store, upload.file)
+    return StoredAttachment(f"{blob_path(sha256)}/{filename}", sha256, size, mime_type, existed)
+
+
+def release_attachment(db: Session, attachment_path: Optional[str]) -> None:
+    """
+    Drop a result's reference to an attachment. Stored content is deleted once
+    unreferenced and the transaction commits; legacy files are deleted on commit.
+    """
+    if not attachment_path:
+        return
+    sha256 = attachment_sha256(attachment_path)
+    if sha256 is None:
+        try:
+            _schedule_purge(db, resolve_attachment(attachment_path))
+        except ValueError:
+            pass
+        return
+    attachment = db.query(Attachment).filter(Attachment.sha256 == sha256).with_for_update().first()
+    if attachment is None:
+        return
+    attachment.ref_count = max(0, attachment.ref_count - 1)
+    if attachment.ref_count == 0:
+        db.delete(attachment)
+        _schedule_purge(db, UPLOAD_ROOT / attachment.storage_path, sha256)
+
+
+def _schedule_purge(db: Session, path: Path, sha256: Optional[str] = None) -> None:
+    db.info.setdefault(_PENDING_PURGE, []).append((path, sha256))
+
+
+def _purge_files(session: Session) -> None:
+    pending = session.info.pop(_PENDING_PURGE, None)
+    if not pending:
+        return
+    for path, sha256 in pending:
+        paths = [path]
+        if sha256 is not None:
+            # Re-uploaded between release and commit
+            with Session(bind=session.get_bind()) as check:
+                if check.query(Attachment.id).filter(Attachment.sha256 == sha256).first():
+                    continue
+            paths += (UPLOAD_ROOT / derivative_base(sha256)).parent.glob(f"{sha256}.*")
+        for file_path in paths:
+            try:
+                file_path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning("Could not delete attachment %s: %s", file_path, e)
+
+
+def _discard_purge(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_PENDING_PURGE, None)
+
+
+def register_attachment_store_listeners(session_factory) -> None:
+    """Attach the file-deletion hooks to a sessionmaker (idempotent)"""
+    if not event.contains(session_factory, "after_commit", _purge_files):
+        event.listen(session_factory, "after_commit", _purge_files)
+        event.listen(session_factory, "after_rollback", _discard_purge)
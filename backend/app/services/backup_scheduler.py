@@ -30,6 +30,7 @@ class BackupScheduler:
         self.backup_service = DatabaseBackupService()
         self.scheduled_job_ids = []  # List to store multiple backup job IDs
         self.sync_job_id = None
+        self.reconcile_job_id = None
         
         if not APSCHEDULER_AVAILABLE:
             # Don't raise error, just mark as unavailable
@@ -47,7 +48,7 @@ class BackupScheduler:
             logger.warning("Backup scheduler cannot start - APScheduler is not installed")
             return
         
-        if not settings.BACKUP_ENABLED:
+        if not settings.BACKUP_ENABLED and not settings.BILL_RECONCILE_ENABLED:
             logger.info("Backup scheduler is disabled")
             return
         
@@ -56,12 +57,16 @@ class BackupScheduler:
             logger.info("Backup scheduler started")
             
             # Schedule backups if enabled
-            if settings.SCHEDULED_BACKUP_ENABLED:
+            if settings.BACKUP_ENABLED and settings.SCHEDULED_BACKUP_ENABLED:
                 self.schedule_backup()
             
             # Schedule sync if enabled
-            if settings.SYNC_ENABLED:
+            if settings.BACKUP_ENABLED and settings.SYNC_ENABLED:
                 self.schedule_sync()
+            
+            # Schedule bill totals reconciliation if enabled
+            if settings.BILL_RECONCILE_ENABLED:
+                self.schedule_bill_reconciliation()
         
         except Exception as e:
             logger.error(f"Failed to start backup scheduler: {e}", exc_info=True)
@@ -155,6 +160,30 @@ class BackupScheduler:
         except Exception as e:
             logger.error(f"Error scheduling sync: {e}", exc_info=True)
     
+    def schedule_bill_reconciliation(self):
+        """Schedule the daily bill/encounter totals reconciliation"""
+        if not self.available or not self.scheduler:
+            logger.warning("Cannot schedule bill reconciliation - APScheduler is not available")
+            return
+        
+        try:
+            time_parts = settings.BILL_RECONCILE_TIME.strip().split(':')
+            hour = int(time_parts[0])
+            minute = int(time_parts[1]) if len(time_parts) > 1 else 0
+            
+            self.scheduler.add_job(
+                self._perform_bill_reconciliation,
+                trigger=CronTrigger(hour=hour, minute=minute),
+                id='bill_totals_reconciliation',
+                name=f'Bill Totals Reconciliation ({settings.BILL_RECONCILE_TIME})',
+                replace_existing=True
+            )
+            self.reconcile_job_id = 'bill_totals_reconciliation'
+            logger.info(f"Bill totals reconciliation set for {settings.BILL_RECONCILE_TIME} daily")
+        
+        except Exception as e:
+            logger.error(f"Error scheduling bill reconciliation: {e}", exc_info=True)
+    
     def _perform_backup(self):
         """Perform a scheduled backup"""
         if not self.available or not self.backup_service:
@@ -195,6 +224,29 @@ class BackupScheduler:
         except Exception as e:
             logger.error(f"Error performing scheduled sync: {e}", exc_info=True)
     
+    def _perform_bill_reconciliation(self):
+        """Verify (and optionally repair) denormalized bill totals"""
+        try:
+            from app.core.database import SessionLocal
+            from app.services.bill_totals import reconcile_bill_totals
+            
+            db = SessionLocal()
+            try:
+                result = reconcile_bill_totals(db, repair=settings.BILL_RECONCILE_REPAIR)
+            finally:
+                db.close()
+            
+            if result["bill_drift_count"] or result["encounter_drift_count"]:
+                logger.warning(
+                    f"Bill totals drift: {result['bill_drift_count']} bill(s), "
+                    f"{result['encounter_drift_count']} encounter(s), repaired={result['repaired']}"
+                )
+            else:
+                logger.info(f"Bill totals reconciled: {result['bills_checked']} bill(s) checked, no drift")
+        
+        except Exception as e:
+            logger.error(f"Error performing bill reconciliation: {e}", exc_info=True)
+    
     def get_schedule_info(self) -> dict:
         """Get information about scheduled jobs"""
         if not self.available or not self.scheduler:
@@ -235,6 +287,20 @@ class BackupScheduler:
             except Exception as e:
                 logger.warning(f"Error getting sync job info: {e}")
         
+        # Get bill reconciliation job
+        if self.reconcile_job_id:
+            try:
+                job = self.scheduler.get_job(self.reconcile_job_id)
+                if job:
+                    jobs.append({
+                        "id": job.id,
+                        "name": job.name,
+                        "next_run": job.next_run_time.isoformat() if job.next_run_time else None,
+                        "trigger": str(job.trigger)
+                    })
+            except Exception as e:
+                logger.warning(f"Error getting reconciliation job info: {e}")
+        
         return {
             "running": self.scheduler.running if hasattr(self.scheduler, 'running') else False,
             "jobs": jobs,
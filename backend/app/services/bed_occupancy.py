@@ -0,0 +1,271 @@
+"""
+Bed occupancy service
+Assigns and frees beds for the admission, transfer and discharge workflows,
+and keeps an in-memory bed availability index for the bed pickers and census.
+
+Double assignment is guarded in the database, not by the check-then-set the
+endpoints used to do: claim_bed() is a single compare-and-set UPDATE
+(... WHERE is_occupied = false), so of two requests racing for the same bed
+exactly one updates the row and the other gets ValueError. The row lock the
+UPDATE takes is held until that transaction commits or rolls back.
+
+The index maps ward -> free bed ids, so "free beds by ward" is answered
+without a query. It is
+- built at startup (and lazily on first use)
+- updated after commit with the beds claimed, released, created, edited or
+  deleted in that transaction; a rollback discards the changes
+- rebuilt when older than MAX_INDEX_AGE_SECONDS, which bounds how stale it can
+  be in a process that did not make the change (other workers)
+"""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Union
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.datetime_utils import utcnow
+from app.models.bed import Bed
+from app.models.ward_admission import WardAdmission
+
+logger = logging.getLogger(__name__)
+
+MAX_INDEX_AGE_SECONDS = 30
+
+# session.info key holding the bed changes of the open transaction
+_PENDING_BEDS = "bed_occupancy_pending"
+
+
+class BedEntry(NamedTuple):
+    id: int
+    ward: str
+    bed_number: str
+    is_occupied: bool
+    is_active: bool
+
+
+class _Removed(NamedTuple):
+    id: int
+
+
+class BedOccupancyIndex:
+    """Per-process bed availability index (thread-safe)"""
+
+    def __init__(self, max_age: float = MAX_INDEX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._beds: Dict[int, BedEntry] = {}
+        self._free: Dict[str, Set[int]] = {}
+        self._totals: Dict[str, int] = {}
+        self._built_at: Optional[float] = None
+
+    def rebuild(self, db: Session) -> int:
+        rows = db.execute(
+            select(Bed.id, Bed.ward, Bed.bed_number, Bed.is_occupied, Bed.is_active)
+        ).all()
+        beds = {row.id: BedEntry(row.id, row.ward, row.bed_number, bool(row.is_occupied), bool(row.is_active)) for row in rows}
+        with self._lock:
+            self._beds = {}
+            self._free = {}
+            self._totals = {}
+            for entry in beds.values():
+                self._add(entry)
+            self._built_at = time.monotonic()
+        return len(beds)
+
+    def ensure_fresh(self, db: Session) -> None:
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self.max_age:
+            self.rebuild(db)
+
+    def invalidate(self) -> None:
+        self._built_at = None
+
+    def _add(self, entry: BedEntry) -> None:
+        self._beds[entry.id] = entry
+        if entry.is_active:
+            self._totals[entry.ward] = self._totals.get(entry.ward, 0) + 1
+            if not entry.is_occupied:
+                self._free.setdefault(entry.ward, set()).add(entry.id)
+
+    def _remove(self, bed_id: int) -> None:
+        entry = self._beds.pop(bed_id, None)
+        if entry is None or not entry.is_active:
+            return
+        self._totals[entry.ward] -= 1
+        self._free.get(entry.ward, set()).discard(entry.id)
+
+    def apply(self, changes: Iterable[Union[BedEntry, _Removed]]) -> None:
+        """Apply committed bed changes, in order"""
+        with self._lock:
+            for change in changes:
+                self._remove(change.id)
+                if isinstance(change, BedEntry):
+                    self._add(change)
+
+    def free_count(self, ward: str) -> int:
+        return len(self._free.get(ward, ()))
+
+    def total_count(self, ward: str) -> int:
+        return self._totals.get(ward, 0)
+
+    def free_beds(self, ward: Optional[str] = None) -> List[BedEntry]:
+        with self._lock:
+            if ward is not None:
+                ids = list(self._free.get(ward, ()))
+            else:
+                ids = [bed_id for free in self._free.values() for bed_id in free]
+            return [self._beds[bed_id] for bed_id in ids]
+
+    def beds(self, ward: Optional[str] = None, include_inactive: bool = False) -> List[BedEntry]:
+        with self._lock:
+            return [
+                entry for entry in self._beds.values()
+                if (ward is None or entry.ward == ward) and (include_inactive or entry.is_active)
+            ]
+
+    def availability(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                ward: {"total_beds": total, "free_beds": len(self._free.get(ward, ())), "occupied_beds": total - len(self._free.get(ward, ()))}
+                for ward, total in sorted(self._totals.items())
+                if total
+            }
+
+    def stats(self) -> dict:
+        built_at = self._built_at
+        return {
+            "beds": len(self._beds),
+            "age_seconds": round(time.monotonic() - built_at, 1) if built_at is not None else None,
+            "max_age_seconds": self.max_age,
+        }
+
+
+bed_index = BedOccupancyIndex()
+
+
+def _entry(bed: Bed) -> BedEntry:
+    return BedEntry(bed.id, bed.ward, bed.bed_number, bool(bed.is_occupied), bool(bed.is_active))
+
+
+def _record(db: Session, change: Union[BedEntry, _Removed]) -> None:
+    db.info.setdefault(_PENDING_BEDS, []).append(change)
+
+
+def _set_occupied(db: Session, bed: Bed, occupied: bool) -> bool:
+    """Compare-and-set is_occupied; False when the bed was not in the expected state"""
+    now = utcnow()
+    conditions = [Bed.id == bed.id, Bed.is_occupied == (not occupied)]
+    if occupied:
+        conditions.append(Bed.is_active == True)
+    result = db.execute(
+        update(Bed).where(*conditions).values(is_occupied=occupied, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    set_committed_value(bed, "is_occupied", occupied)
+    set_committed_value(bed, "updated_at", now)
+    _record(db, _entry(bed))
+    return True
+
+
+def claim_bed(db: Session, bed: Bed) -> None:
+    """
+    Mark a bed occupied for an admission or transfer.
+
+    Raises:
+        ValueError: the bed is occupied (possibly by a concurrent request) or inactive
+    """
+    if not _set_occupied(db, bed, True):
+        db.refresh(bed, ["is_occupied", "is_active"])
+        if not bed.is_active:
+            raise ValueError("Bed is not active")
+        raise ValueError("Bed is already occupied")
+
+
+def release_bed(db: Session, bed: Union[Bed, int, None]) -> None:
+    """Mark a bed free (discharge, transfer out, cancelled admission); a free or missing bed is left alone"""
+    if bed is None:
+        return
+    if isinstance(bed, int):
+        bed = db.get(Bed, bed)
+        if bed is None:
+            return
+    _set_occupied(db, bed, False)
+
+
+def _collect_beds(session: Session, flush_context) -> None:
+    """Record beds created, edited or deleted through the ORM (bed management endpoints)"""
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Bed):
+            _record(session, _entry(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Bed):
+            _record(session, _Removed(obj.id))
+
+
+def _apply_beds(session: Session) -> None:
+    pending = session.info.pop(_PENDING_BEDS, None)
+    if pending:
+        bed_index.apply(pending)
+
+
+def _discard_beds(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_PENDING_BEDS, None)
+
+
+def register_bed_occupancy_listeners(session_factory) -> None:
+    """Attach the bed index hooks to a sessionmaker (idempotent)"""
+    if not event.contains(session_factory, "after_flush", _collect_beds):
+        event.listen(session_factory, "after_flush", _collect_beds)
+        event.listen(session_factory, "after_commit", _apply_beds)
+        event.listen(session_factory, "after_rollback", _discard_beds)
+
+
+def get_bed_availability(db: Session, ward: Optional[str] = None) -> dict:
+    """Total / free / occupied beds per ward, from the index"""
+    bed_index.ensure_fresh(db)
+    wards = bed_index.availability()
+    if ward is not None:
+        wards = {ward: wards.get(ward, {"total_beds": 0, "free_beds": 0, "occupied_beds": 0})}
+    return {
+        "wards": [{"ward": name, **counts} for name, counts in wards.items()],
+        "total_beds": sum(counts["total_beds"] for counts in wards.values()),
+        "free_beds": sum(counts["free_beds"] for counts in wards.values()),
+        "index": bed_index.stats(),
+    }
+
+
+def reconcile_bed_occupancy(db: Session) -> dict:
+    """
+    Recompute is_occupied from the active ward admissions (bed_id of every
+    admission that is not discharged) and rebuild the index. Fixes beds left
+    occupied or free by edits made outside the workflows, and reports beds
+    held by more than one active admission (left by the old check-then-set
+    assignment) for the ward to resolve.
+    """
+    active = db.execute(
+        select(WardAdmission.bed_id, func.count(WardAdmission.id).label("admissions"))
+        .where(WardAdmission.discharged_at.is_(None), WardAdmission.bed_id.isnot(None))
+        .group_by(WardAdmission.bed_id)
+    ).all()
+    occupied_ids = {row.bed_id for row in active}
+    shared = sorted(row.bed_id for row in active if row.admissions > 1)
+    beds = db.execute(select(Bed.id, Bed.is_occupied)).all()
+    to_occupy = [row.id for row in beds if row.id in occupied_ids and not row.is_occupied]
+    to_free = [row.id for row in beds if row.id not in occupied_ids and row.is_occupied]
+    now = utcnow()
+    if to_occupy:
+        db.execute(update(Bed).where(Bed.id.in_(to_occupy)).values(is_occupied=True, updated_at=now)
+                   .execution_options(synchronize_session=False))
+    if to_free:
+        db.execute(update(Bed).where(Bed.id.in_(to_free)).values(is_occupied=False, updated_at=now)
+                   .execution_options(synchronize_session=False))
+    db.commit()
+    bed_count = bed_index.rebuild(db)
+    if to_occupy or to_free:
+        logger.warning("Bed occupancy reconciled: %d marked occupied, %d freed", len(to_occupy), len(to_free))
+    if shared:
+        logger.warning("Beds held by more than one active admission: %s", shared)
+    return {"beds": bed_count, "marked_occupied": to_occupy, "freed": to_free, "shared_beds": shared}
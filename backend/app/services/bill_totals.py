@@ -0,0 +1,308 @@
+"""
+Bill totals service
+Keeps the denormalized bill and encounter totals (total_amount, paid_amount,
+balance) in step with bill, bill item and receipt writes, and provides the
+reconciliation job that verifies and repairs drift.
+
+The totals are maintained from SQLAlchemy session events, so every endpoint
+that adds a bill item or receipt keeps them current without extra code:
+- after_flush records which bills/encounters the flush touched
+- after_flush_postexec recomputes those rows with aggregate queries in the
+  same transaction
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.datetime_utils import utcnow
+from app.models.bill import Bill, BillItem, Receipt, ReceiptItem
+from app.models.encounter import Encounter
+
+logger = logging.getLogger(__name__)
+
+# session.info keys used to carry touched ids from after_flush to after_flush_postexec
+_TOUCHED_BILLS = "bill_totals_touched_bills"
+_TOUCHED_RECEIPTS = "bill_totals_touched_receipts"
+_TOUCHED_ENCOUNTERS = "bill_totals_touched_encounters"
+_RECOMPUTING = "bill_totals_recomputing"
+
+
+def _collect_touched(session: Session, flush_context) -> None:
+    """Remember which bills/receipts/encounters were written by this flush"""
+    if session.info.get(_RECOMPUTING):
+        return
+    bill_ids: Set[int] = session.info.setdefault(_TOUCHED_BILLS, set())
+    receipt_ids: Set[int] = session.info.setdefault(_TOUCHED_RECEIPTS, set())
+    encounter_ids: Set[int] = session.info.setdefault(_TOUCHED_ENCOUNTERS, set())
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Bill):
+            if obj.id is not None:
+                bill_ids.add(obj.id)
+            if obj.encounter_id is not None:
+                encounter_ids.add(obj.encounter_id)
+        elif isinstance(obj, (BillItem, Receipt)):
+            if obj.bill_id is not None:
+                bill_ids.add(obj.bill_id)
+        elif isinstance(obj, ReceiptItem):
+            if obj.receipt_id is not None:
+                receipt_ids.add(obj.receipt_id)
+
+
+def _recompute_touched(session: Session, flush_context) -> None:
+    """Recompute totals for everything the last flush touched"""
+    if session.info.get(_RECOMPUTING):
+        return
+    bill_ids: Set[int] = session.info.pop(_TOUCHED_BILLS, set())
+    receipt_ids: Set[int] = session.info.pop(_TOUCHED_RECEIPTS, set())
+    encounter_ids: Set[int] = session.info.pop(_TOUCHED_ENCOUNTERS, set())
+    if not (bill_ids or receipt_ids or encounter_ids):
+        return
+
+    session.info[_RECOMPUTING] = True
+    try:
+        if receipt_ids:
+            bill_ids.update(session.execute(
+                select(Receipt.bill_id).where(Receipt.id.in_(receipt_ids))
+            ).scalars().all())
+        if bill_ids:
+            encounter_ids.update(refresh_bill_totals(session, bill_ids))
+        if encounter_ids:
+            refresh_encounter_totals(session, encounter_ids)
+    finally:
+        session.info.pop(_RECOMPUTING, None)
+
+
+def _sync_identity_map(session: Session, model, values_by_id: Dict[int, dict]) -> None:
+    """Mirror core UPDATE values onto already-loaded objects without marking them dirty"""
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, model) and obj.id in values_by_id:
+            for key, value in values_by_id[obj.id].items():
+                set_committed_value(obj, key, value)
+
+
+def refresh_bill_totals(session: Session, bill_ids: Iterable[int]) -> Set[int]:
+    """
+    Recompute total_amount (sum of bill items) and balance for the given bills.
+    paid_amount stays as maintained by the receipt endpoints.
+
+    Returns:
+        Encounter ids of the refreshed bills
+    """
+    bill_ids = sorted(bill_ids)
+    # Lock the bills first (in id order) so two transactions adding items or
+    # receipts to the same bill recompute it one after the other
+    session.execute(select(Bill.id).where(Bill.id.in_(bill_ids)).order_by(Bill.id).with_for_update())
+    rows = session.execute(
+        select(
+            Bill.id,
+            Bill.encounter_id,
+            Bill.paid_amount,
+            func.coalesce(func.sum(BillItem.total_price), 0.0)
+        ).outerjoin(
+            BillItem, BillItem.bill_id == Bill.id
+        ).where(
+            Bill.id.in_(bill_ids)
+        ).group_by(Bill.id, Bill.encounter_id, Bill.paid_amount)
+    ).all()
+
+    values_by_id: Dict[int, dict] = {}
+    encounter_ids: Set[int] = set()
+    for bill_id, encounter_id, paid_amount, items_total in rows:
+        total_amount = float(items_total or 0.0)
+        values = {"total_amount": total_amount, "balance": total_amount - float(paid_amount or 0.0)}
+        session.execute(
+            update(Bill).where(Bill.id == bill_id).values(**values),
+            execution_options={"synchronize_session": False}
+        )
+        values_by_id[bill_id] = values
+        encounter_ids.add(encounter_id)
+
+    _sync_identity_map(session, Bill, values_by_id)
+    return encounter_ids
+
+
+def refresh_encounter_totals(session: Session, encounter_ids: Iterable[int]) -> None:
+    """Roll bill totals up onto the encounter (one aggregate query for all ids)"""
+    encounter_ids = sorted(encounter_ids)
+    session.execute(
+        select(Encounter.id).where(Encounter.id.in_(encounter_ids)).order_by(Encounter.id).with_for_update()
+    )
+    sums = {
+        encounter_id: (float(total or 0.0), float(paid or 0.0))
+        for encounter_id, total, paid in session.execute(
+            select(
+                Bill.encounter_id,
+                func.sum(Bill.total_amount),
+                func.sum(Bill.paid_amount)
+            ).where(
+                Bill.encounter_id.in_(encounter_ids)
+            ).group_by(Bill.encounter_id)
+        ).all()
+    }
+
+    values_by_id: Dict[int, dict] = {}
+    for encounter_id in encounter_ids:
+        total_amount, paid_amount = sums.get(encounter_id, (0.0, 0.0))
+        values = {
+            "bill_total_amount": total_amount,
+            "bill_paid_amount": paid_amount,
+            "bill_balance": total_amount - paid_amount,
+        }
+        # Keep updated_at as-is: a payment is not a clinical change to the encounter
+        session.execute(
+            update(Encounter).where(Encounter.id == encounter_id).values(
+                updated_at=Encounter.updated_at, **values
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        values_by_id[encounter_id] = values
+
+    _sync_identity_map(session, Encounter, values_by_id)
+
+
+def register_bill_totals_listeners(session_factory) -> None:
+    """Attach the totals maintenance hooks to a sessionmaker (idempotent)"""
+    if not event.contains(session_factory, "after_flush", _collect_touched):
+        event.listen(session_factory, "after_flush", _collect_touched)
+        event.listen(session_factory, "after_flush_postexec", _recompute_touched)
+
+
+def reconcile_bill_totals(db: Session, repair: bool = False, encounter_id: Optional[int] = None) -> dict:
+    """
+    Verify the denormalized totals against bill items and receipts.
+
+    Expected values:
+        total_amount = sum of bill item total_price
+        paid_amount  = sum of non-refunded receipt amounts (capped at total_amount, as update_bill does)
+        balance      = total_amount - paid_amount
+        is_paid      = paid_amount covers a non-zero total_amount, as the billing endpoints set it
+    Encounter totals are the sums over the encounter's bills.
+
+    Args:
+        db: Database session (committed here when repair=True)
+        repair: Write the expected values back when drift is found
+        encounter_id: Limit the check to one encounter
+
+    Returns:
+        Counts checked and the list of drifted rows
+    """
+    tolerance = 0.005
+
+    items_total = select(
+        BillItem.bill_id.label("bill_id"),
+        func.sum(BillItem.total_price).label("items_total")
+    ).group_by(BillItem.bill_id).subquery()
+    receipts_total = select(
+        Receipt.bill_id.label("bill_id"),
+        func.sum(Receipt.amount_paid).label("receipts_total")
+    ).where(Receipt.refunded == False).group_by(Receipt.bill_id).subquery()
+
+    query = select(
+        Bill.id,
+        Bill.encounter_id,
+        Bill.total_amount,
+        Bill.paid_amount,
+        Bill.balance,
+        Bill.is_paid,
+        func.coalesce(items_total.c.items_total, 0.0),
+        func.coalesce(receipts_total.c.receipts_total, 0.0)
+    ).outerjoin(
+        items_total, items_total.c.bill_id == Bill.id
+    ).outerjoin(
+        receipts_total, receipts_total.c.bill_id == Bill.id
+    )
+    if encounter_id:
+        query = query.where(Bill.encounter_id == encounter_id)
+
+    bill_drift: List[dict] = []
+    expected_by_encounter: Dict[int, List[float]] = {}
+    bills_checked = 0
+    for bill_id, bill_encounter_id, total_amount, paid_amount, balance, is_paid, expected_total, receipt_sum in db.execute(query).all():
+        bills_checked += 1
+        expected_total = float(expected_total or 0.0)
+        expected_paid = min(float(receipt_sum or 0.0), expected_total)
+        expected_balance = expected_total - expected_paid
+        expected_is_paid = expected_total > 0 and expected_balance <= tolerance
+        sums = expected_by_encounter.setdefault(bill_encounter_id, [0.0, 0.0])
+        sums[0] += expected_total
+        sums[1] += expected_paid
+
+        if (abs((total_amount or 0.0) - expected_total) > tolerance
+                or abs((paid_amount or 0.0) - expected_paid) > tolerance
+                or balance is None or abs(balance - expected_balance) > tolerance
+                or bool(is_paid) != expected_is_paid):
+            bill_drift.append({
+                "bill_id": bill_id,
+                "encounter_id": bill_encounter_id,
+                "total_amount": total_amount,
+                "expected_total_amount": expected_total,
+                "paid_amount": paid_amount,
+                "expected_paid_amount": expected_paid,
+                "balance": balance,
+                "expected_balance": expected_balance,
+                "is_paid": is_paid,
+                "expected_is_paid": expected_is_paid,
+            })
+            if repair:
+                db.execute(update(Bill).where(Bill.id == bill_id).values(
+                    total_amount=expected_total,
+                    paid_amount=expected_paid,
+                    balance=expected_balance,
+                    is_paid=expected_is_paid,
+                    paid_at=func.coalesce(Bill.paid_at, utcnow()) if expected_is_paid else None
+                ))
+
+    encounter_query = select(
+        Encounter.id, Encounter.bill_total_amount, Encounter.bill_paid_amount, Encounter.bill_balance
+    )
+    if encounter_id:
+        encounter_query = encounter_query.where(Encounter.id == encounter_id)
+    else:
+        # Encounters without bills only drift if they carry non-zero totals
+        encounter_query = encounter_query.where(
+            (Encounter.id.in_(list(expected_by_encounter.keys())))
+            | (func.coalesce(Encounter.bill_total_amount, 0.0) != 0)
+            | (func.coalesce(Encounter.bill_paid_amount, 0.0) != 0)
+        )
+
+    encounter_drift: List[dict] = []
+    encounters_checked = 0
+    for enc_id, bill_total_amount, bill_paid_amount, bill_balance in db.execute(encounter_query).all():
+        encounters_checked += 1
+        expected_total, expected_paid = expected_by_encounter.get(enc_id, (0.0, 0.0))
+        expected_balance = expected_total - expected_paid
+        if (bill_total_amount is None or abs(bill_total_amount - expected_total) > tolerance
+                or bill_paid_amount is None or abs(bill_paid_amount - expected_paid) > tolerance
+                or bill_balance is None or abs(bill_balance - expected_balance) > tolerance):
+            encounter_drift.append({
+                "encounter_id": enc_id,
+                "bill_total_amount": bill_total_amount,
+                "expected_bill_total_amount": expected_total,
+                "bill_paid_amount": bill_paid_amount,
+                "expected_bill_paid_amount": expected_paid,
+                "bill_balance": bill_balance,
+                "expected_bill_balance": expected_balance,
+            })
+            if repair:
+                db.execute(update(Encounter).where(Encounter.id == enc_id).values(
+                    updated_at=Encounter.updated_at,
+                    bill_total_amount=expected_total,
+                    bill_paid_amount=expected_paid,
+                    bill_balance=expected_balance
+                ))
+
+    if repair and (bill_drift or encounter_drift):
+        db.commit()
+        logger.info("Bill totals repaired: %d bill(s), %d encounter(s)", len(bill_drift), len(encounter_drift))
+
+    return {
+        "bills_checked": bills_checked,
+        "encounters_checked": encounters_checked,
+        "bill_drift_count": len(bill_drift),
+        "encounter_drift_count": len(encounter_drift),
+        "repaired": repair,
+        "bill_drift": bill_drift,
+        "encounter_drift": encounter_drift,
+    }
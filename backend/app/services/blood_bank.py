@@ -0,0 +1,473 @@
+"""
+Blood bank service
+Unit-level blood stock per BloodTransfusionType and the blood request queue.
+
+Stock is tracked per bag (BloodUnit) with counters per type (BloodStock):
+- receive_units adds bags to the bank
+- accepting a request reserves its units (earliest expiry first), fulfilling
+  issues them, and cancelling or returning puts reserved units back
+- issued units that come back from the ward are quarantined, keeping their
+  request and issue time, until the lab re-checks them (recheck_unit): they
+  then return to available stock or are discarded
+Every stock movement first locks the type's BloodStock row (SELECT ... FOR
+UPDATE), then moves the units with a status-guarded UPDATE, so two lab users
+accepting requests at the same time cannot reserve the same bags. Types the
+bank has never received units for are not stock-managed: their requests are
+accepted and fulfilled as before, without reservations.
+
+The request queue reads one status at a time through the (status,
+requested_at, id) index, keyset paginated, with the patient, ward and type in
+one joined query and the staff names and reserved units in one batched query
+each.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.datetime_utils import utcnow
+from app.models.blood_bank import BloodStock, BloodUnit, BloodUnitStatus
+from app.models.blood_transfusion_request import BloodTransfusionRequest
+from app.models.blood_transfusion_type import BloodTransfusionType
+from app.models.encounter import Encounter
+from app.models.patient import Patient
+from app.models.ward_admission import WardAdmission
+from app.services.investigation_worklist import user_names
+from app.services.pharmacy_queue import decode_cursor, encode_cursor
+
+REQUEST_STATUSES = ("pending", "accepted", "fulfilled", "returned", "cancelled")
+OPEN_STATUSES = ("pending", "accepted")  # Requests the lab still has to act on
+EXPIRING_SOON = timedelta(days=7)
+
+_COUNTER_BY_STATUS = {
+    BloodUnitStatus.AVAILABLE: "available_units",
+    BloodUnitStatus.RESERVED: "reserved_units",
+    BloodUnitStatus.ISSUED: "issued_units",
+    BloodUnitStatus.QUARANTINED: "quarantined_units",
+    BloodUnitStatus.DISCARDED: "discarded_units",
+}
+
+
+def units_for_quantity(quantity: float) -> int:
+    """Whole bags needed for a requested quantity (1.5 units -> 2 bags)"""
+    return max(1, math.ceil(quantity or 0))
+
+
+def lock_stock(db: Session, transfusion_type_id: int) -> Optional[BloodStock]:
+    """The type's stock row, locked for the rest of the transaction (None when the type is not stock-managed)"""
+    return db.execute(
+        select(BloodStock).where(BloodStock.transfusion_type_id == transfusion_type_id).with_for_update()
+    ).scalar_one_or_none()
+
+
+def lock_blood_request(db: Session, request_id: int) -> Optional[BloodTransfusionRequest]:
+    """Load a request locked for a status transition, so two users cannot accept / fulfill / return it at once"""
+    return db.execute(
+        select(BloodTransfusionRequest).where(BloodTransfusionRequest.id == request_id).with_for_update()
+    ).scalar_one_or_none()
+
+
+def _move_units(db: Session, stock: BloodStock, unit_ids: List[int], from_status: str, to_status: str, **values) -> None:
+    """
+    Move units between statuses and adjust the counters.
+
+    Raises:
+        ValueError: when a unit is no longer in from_status (changed by another transaction)
+    """
+    if not unit_ids:
+        return
+    result = db.execute(
+        update(BloodUnit)
+        .where(BloodUnit.id.in_(unit_ids), BloodUnit.status == from_status)
+        .values(status=to_status, updated_at=utcnow(), **values)
+        .execution_options(synchronize_session="fetch")
+    )
+    if result.rowcount != len(unit_ids):
+        raise ValueError("Blood stock changed while it was being updated. Please try again.")
+    from_counter, to_counter = _COUNTER_BY_STATUS[from_status], _COUNTER_BY_STATUS[to_status]
+    setattr(stock, from_counter, getattr(stock, from_counter) - len(unit_ids))
+    setattr(stock, to_counter, getattr(stock, to_counter) + len(unit_ids))
+
+
+def receive_units(
+    db: Session,
+    transfusion_type_id: int,
+    unit_numbers: List[str],
+    received_by: int,
+    blood_group: Optional[str] = None,
+    volume_ml: Optional[float] = None,
+    expires_at: Optional[datetime] = None
+) -> List[BloodUnit]:
+    """
+    Add bags to the bank. The first receipt of a type makes it stock-managed.
+    Caller commits.
+
+    Raises:
+        ValueError: unknown type, empty or duplicate unit numbers
+    """
+    numbers = [number.strip() for number in unit_numbers if number and number.strip()]
+    if not numbers:
+        raise ValueError("At least one unit number is required")
+    if len(set(numbers)) != len(numbers):
+        raise ValueError("Unit numbers must be unique")
+    if db.get(BloodTransfusionType, transfusion_type_id) is None:
+        raise ValueError("Blood transfusion type not found")
+    existing = db.execute(select(BloodUnit.unit_number).where(BloodUnit.unit_number.in_(numbers))).scalars().all()
+    if existing:
+        raise ValueError(f"Unit number(s) already in the blood bank: {', '.join(sorted(existing))}")
+
+    stock = lock_stock(db, transfusion_type_id)
+    if stock is None:
+        # First receipt of the type: another user may be creating the row at the same time
+        try:
+            with db.begin_nested():
+                stock = BloodStock(
+                    transfusion_type_id=transfusion_type_id, available_units=0, reserved_units=0,
+                    issued_units=0, quarantined_units=0, discarded_units=0
+                )
+                db.add(stock)
+        except IntegrityError:
+            stock = lock_stock(db, transfusion_type_id)
+    now = utcnow()
+    units = [
+        BloodUnit(
+            transfusion_type_id=transfusion_type_id, unit_number=number, blood_group=blood_group,
+            volume_ml=volume_ml, expires_at=expires_at, status=BloodUnitStatus.AVAILABLE,
+            received_by=received_by, received_at=now
+        )
+        for number in numbers
+    ]
+    db.add_all(units)
+    stock.available_units += len(units)
+    db.flush()
+    return units
+
+
+def reserve_units(db: Session, blood_request: BloodTransfusionRequest) -> List[BloodUnit]:
+    """
+    Reserve the bags for an accepted request, earliest expiry first, skipping
+    expired bags. Returns [] when the type is not stock-managed. Caller commits.
+
+    Raises:
+        ValueError: not enough unexpired bags available
+    """
+    stock = lock_stock(db, blood_request.transfusion_type_id)
+    if stock is None:
+        return []
+    needed = units_for_quantity(blood_request.quantity)
+    now = utcnow()
+    units = db.execute(
+        select(BloodUnit)
+        .where(
+            BloodUnit.transfusion_type_id == blood_request.transfusion_type_id,
+            BloodUnit.status == BloodUnitStatus.AVAILABLE,
+            or_(BloodUnit.expires_at.is_(None), BloodUnit.expires_at > now)
+        )
+        .order_by(BloodUnit.expires_at.is_(None), BloodUnit.expires_at, BloodUnit.id)
+        .limit(needed)
+        .with_for_update()
+    ).scalars().all()
+    if len(units) < needed:
+        raise ValueError(f"Not enough blood in stock: {needed} unit(s) needed, {len(units)} available")
+    _move_units(
+        db, stock, [unit.id for unit in units], BloodUnitStatus.AVAILABLE, BloodUnitStatus.RESERVED,
+        request_id=blood_request.id, reserved_at=now
+    )
+    return units
+
+
+def _request_unit_ids(db: Session, request_id: int, status: str) -> List[int]:
+    return db.execute(
+        select(BloodUnit.id).where(BloodUnit.request_id == request_id, BloodUnit.status == status).with_for_update()
+    ).scalars().all()
+
+
+def issue_units(db: Session, blood_request: BloodTransfusionRequest) -> int:
+    """Issue the request's reserved bags to the ward (request fulfilled). Caller commits."""
+    stock = lock_stock(db, blood_request.transfusion_type_id)
+    if stock is None:
+        return 0
+    unit_ids = _request_unit_ids(db, blood_request.id, BloodUnitStatus.RESERVED)
+    _move_units(db, stock, unit_ids, BloodUnitStatus.RESERVED, BloodUnitStatus.ISSUED, issued_at=utcnow())
+    return len(unit_ids)
+
+
+def release_units(db: Session, blood_request: BloodTransfusionRequest) -> int:
+    """
+    Take back the request's bags (request cancelled, or blood returned to the
+    bank). Reserved bags never left the bank and go back into available stock;
+    issued bags have been on the ward and are quarantined, keeping their
+    request and issue time, until the lab re-checks them. Caller commits.
+    """
+    stock = lock_stock(db, blood_request.transfusion_type_id)
+    if stock is None:
+        return 0
+    reserved_ids = _request_unit_ids(db, blood_request.id, BloodUnitStatus.RESERVED)
+    _move_units(
+        db, stock, reserved_ids, BloodUnitStatus.RESERVED, BloodUnitStatus.AVAILABLE,
+        request_id=None, reserved_at=None
+    )
+    issued_ids = _request_unit_ids(db, blood_request.id, BloodUnitStatus.ISSUED)
+    _move_units(
+        db, stock, issued_ids, BloodUnitStatus.ISSUED, BloodUnitStatus.QUARANTINED, returned_at=utcnow()
+    )
+    return len(reserved_ids) + len(issued_ids)
+
+
+def recheck_unit(
+    db: Session,
+    unit_id: int,
+    checked_by: int,
+    passed: bool,
+    reason: Optional[str] = None
+) -> BloodUnit:
+    """
+    Lab re-check of a quarantined bag. A bag that passes goes back into
+    available stock (its request and issue time stay on it as history until it
+    is reserved again); one that fails is discarded. Caller commits.
+
+    Raises:
+        ValueError: unknown bag, or the bag is not quarantined
+    """
+    unit = db.get(BloodUnit, unit_id)
+    if unit is None:
+        raise ValueError("Blood unit not found")
+    stock = lock_stock(db, unit.transfusion_type_id)
+    db.refresh(unit)
+    if unit.status != BloodUnitStatus.QUARANTINED or stock is None:
+        raise ValueError(f"Cannot re-check a unit with status '{unit.status}'")
+    now = utcnow()
+    if passed:
+        _move_units(
+            db, stock, [unit.id], BloodUnitStatus.QUARANTINED, BloodUnitStatus.AVAILABLE,
+            checked_by=checked_by, checked_at=now
+        )
+    else:
+        _move_units(
+            db, stock, [unit.id], BloodUnitStatus.QUARANTINED, BloodUnitStatus.DISCARDED,
+            checked_by=checked_by, checked_at=now,
+            discarded_by=checked_by, discarded_at=now, discard_reason=reason
+        )
+    return unit
+
+
+def discard_unit(db: Session, unit_id: int, discarded_by: int, reason: Optional[str] = None) -> BloodUnit:
+    """
+    Remove an available bag from stock (expired, damaged). Caller commits.
+
+    Raises:
+        ValueError: unknown bag, or the bag is not available
+    """
+    unit = db.get(BloodUnit, unit_id)
+    if unit is None:
+        raise ValueError("Blood unit not found")
+    stock = lock_stock(db, unit.transfusion_type_id)
+    db.refresh(unit)
+    if unit.status != BloodUnitStatus.AVAILABLE or stock is None:
+        raise ValueError(f"Cannot discard a unit with status '{unit.status}'")
+    _move_units(
+        db, stock, [unit.id], BloodUnitStatus.AVAILABLE, BloodUnitStatus.DISCARDED,
+        discarded_by=discarded_by, discarded_at=utcnow(), discard_reason=reason
+    )
+    return unit
+
+
+def rebuild_blood_stock(db: Session) -> int:
+    """Recount every type's stock row from its units (one aggregate query). Caller commits."""
+    counts: Dict[int, Dict[str, int]] = {}
+    for type_id, status, count in db.execute(
+        select(BloodUnit.transfusion_type_id, BloodUnit.status, func.count(BloodUnit.id))
+        .group_by(BloodUnit.transfusion_type_id, BloodUnit.status)
+    ):
+        counts.setdefault(type_id, {})[status] = count
+    stocks = {stock.transfusion_type_id: stock for stock in db.execute(select(BloodStock).with_for_update()).scalars()}
+    for type_id, by_status in counts.items():
+        stock = stocks.get(type_id)
+        if stock is None:
+            stock = BloodStock(transfusion_type_id=type_id)
+            db.add(stock)
+        for status, counter in _COUNTER_BY_STATUS.items():
+            setattr(stock, counter, by_status.get(status, 0))
+    db.flush()
+    return len(counts)
+
+
+def get_blood_stock(db: Session) -> List[dict]:
+    """Stock per stock-managed type, with expired and soon-expiring available bags"""
+    now = utcnow()
+    expiry = {
+        type_id: (expired, expiring)
+        for type_id, expired, expiring in db.execute(
+            select(
+                BloodUnit.transfusion_type_id,
+                func.sum(case((BloodUnit.expires_at <= now, 1), else_=0)),
+                func.sum(case((and_(BloodUnit.expires_at > now, BloodUnit.expires_at <= now + EXPIRING_SOON), 1), else_=0)),
+            )
+            .where(BloodUnit.status == BloodUnitStatus.AVAILABLE)
+            .group_by(BloodUnit.transfusion_type_id)
+        )
+    }
+    rows = db.execute(
+        select(BloodStock, BloodTransfusionType.type_name, BloodTransfusionType.unit_type)
+        .join(BloodTransfusionType, BloodTransfusionType.id == BloodStock.transfusion_type_id)
+        .order_by(BloodTransfusionType.type_name)
+    ).all()
+    result = []
+    for stock, type_name, unit_type in rows:
+        expired, expiring = expiry.get(stock.transfusion_type_id, (0, 0))
+        result.append({
+            "transfusion_type_id": stock.transfusion_type_id,
+            "transfusion_type_name": type_name,
+            "unit_type": unit_type,
+            "available_units": stock.available_units,
+            "usable_units": stock.available_units - (expired or 0),
+            "expired_units": expired or 0,
+            "expiring_soon_units": expiring or 0,
+            "reserved_units": stock.reserved_units,
+            "issued_units": stock.issued_units,
+            "quarantined_units": stock.quarantined_units,
+            "discarded_units": stock.discarded_units,
+            "updated_at": stock.updated_at,
+        })
+    return result
+
+
+def blood_request_filters(status: Optional[str] = None, ward: Optional[str] = None) -> list:
+    filters = []
+    if status:
+        filters.append(BloodTransfusionRequest.status == status)
+    if ward:
+        filters.append(WardAdmission.ward == ward)
+    return filters
+
+
+def blood_request_rows(db: Session, filters: list, order_by: list, limit: Optional[int] = None) -> List[dict]:
+    """
+    Requests as returned by the blood transfusion endpoints: one joined query
+    for request, type, admission and patient, one batched query for staff
+    names and one for the reserved / issued unit numbers.
+    """
+    query = (
+        select(
+            BloodTransfusionRequest,
+            BloodTransfusionType.type_name, BloodTransfusionType.unit_price,
+            WardAdmission.ward,
+            Patient.name, Patient.surname, Patient.card_number,
+        )
+        .join(BloodTransfusionType, BloodTransfusionType.id == BloodTransfusionRequest.transfusion_type_id)
+        .join(WardAdmission, WardAdmission.id == BloodTransfusionRequest.ward_admission_id)
+        .join(Encounter, Encounter.id == WardAdmission.encounter_id)
+        .join(Patient, Patient.id == Encounter.patient_id)
+        .where(*filters)
+        .order_by(*order_by)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query).all()
+
+    requests = [row[0] for row in rows]
+    names = user_names(db, [
+        user_id for req in requests
+        for user_id in (req.requested_by, req.accepted_by, req.fulfilled_by, req.returned_by)
+    ])
+    units: Dict[int, List[str]] = {}
+    if requests:
+        for request_id, unit_number in db.execute(
+            select(BloodUnit.request_id, BloodUnit.unit_number)
+            .where(
+                BloodUnit.request_id.in_([req.id for req in requests]),
+                BloodUnit.status.in_((BloodUnitStatus.RESERVED, BloodUnitStatus.ISSUED))
+            )
+            .order_by(BloodUnit.id)
+        ):
+            units.setdefault(request_id, []).append(unit_number)
+
+    result = []
+    for req, type_name, unit_price, ward, name, surname, card_number in rows:
+        result.append({
+            "id": req.id,
+            "ward_admission_id": req.ward_admission_id,
+            "encounter_id": req.encounter_id,
+            "transfusion_type_id": req.transfusion_type_id,
+            "transfusion_type_name": type_name or "",
+            "quantity": req.quantity,
+            "request_reason": req.request_reason,
+            "status": req.status,
+            "requested_by": req.requested_by,
+            "requested_by_name": names.get(req.requested_by),
+            "accepted_by": req.accepted_by,
+            "accepted_by_name": names.get(req.accepted_by),
+            "fulfilled_by": req.fulfilled_by,
+            "fulfilled_by_name": names.get(req.fulfilled_by),
+            "returned_by": req.returned_by,
+            "returned_by_name": names.get(req.returned_by),
+            "bill_item_id": req.bill_item_id,
+            "return_bill_item_id": req.return_bill_item_id,
+            "requested_at": req.requested_at,
+            "accepted_at": req.accepted_at,
+            "fulfilled_at": req.fulfilled_at,
+            "returned_at": req.returned_at,
+            "cancelled_at": req.cancelled_at,
+            "cancellation_reason": req.cancellation_reason,
+            "patient_name": f"{name} {surname or ''}".strip(),
+            "patient_card_number": card_number or "",
+            "ward": ward or "",
+            "unit_price": unit_price or 0.0,
+            "total_price": (unit_price or 0.0) * req.quantity,
+            "unit_numbers": units.get(req.id, []),
+        })
+    return result
+
+
+def blood_request_response(db: Session, request_id: int) -> Optional[dict]:
+    rows = blood_request_rows(db, [BloodTransfusionRequest.id == request_id], [BloodTransfusionRequest.id])
+    return rows[0] if rows else None
+
+
+def get_blood_request_queue(
+    db: Session,
+    status: str = "pending",
+    ward: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> dict:
+    """
+    One page of the blood request queue for a status, oldest request first.
+
+    Returns:
+        {"items": [...], "next_cursor": str or None,
+         "counts": {"pending": n, "accepted": n}}
+
+    Raises:
+        ValueError: on an unknown status or a malformed cursor
+    """
+    if status not in REQUEST_STATUSES:
+        raise ValueError(f"Invalid status. Must be one of: {', '.join(REQUEST_STATUSES)}")
+    filters = blood_request_filters(status, ward)
+    if cursor:
+        after_requested_at, after_id = decode_cursor(cursor)
+        filters.append(or_(
+            BloodTransfusionRequest.requested_at > after_requested_at,
+            and_(BloodTransfusionRequest.requested_at == after_requested_at, BloodTransfusionRequest.id > after_id)
+        ))
+    items = blood_request_rows(
+        db, filters, [BloodTransfusionRequest.requested_at, BloodTransfusionRequest.id], limit=limit + 1
+    )
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(items[-1]["requested_at"], items[-1]["id"]) if has_more and items else None
+
+    # Counts for the open statuses only: a range on the status index, however long the history
+    count_query = (
+        select(BloodTransfusionRequest.status, func.count(BloodTransfusionRequest.id))
+        .where(BloodTransfusionRequest.status.in_(OPEN_STATUSES))
+        .group_by(BloodTransfusionRequest.status)
+    )
+    if ward:
+        count_query = count_query.join(
+            WardAdmission, WardAdmission.id == BloodTransfusionRequest.ward_admission_id
+        ).where(WardAdmission.ward == ward)
+    counts = {name: 0 for name in OPEN_STATUSES}
+    counts.update(dict(db.execute(count_query).all()))
+    return {"items": items, "next_cursor": next_cursor, "counts": counts}
@@ -0,0 +1,139 @@
+"""
+Change feed service
+Turns committed writes to the rows behind the worklists, ward board, transfer,
+blood bank, pharmacy and billing screens into typed ChangeEvents on the
+in-process event bus.
+
+Events are captured from SQLAlchemy session events, like the bill totals, so
+every mutation in the consultation and billing endpoints publishes without
+per-endpoint code:
+- after_flush records created / updated / deleted rows of the watched models
+  with their ids and a few display fields
+- after_commit publishes them; a rollback discards them, so screens never see
+  a change that did not happen
+"""
+from dataclasses import dataclass
+from typing import List, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models.bill import Bill, BillItem, Receipt
+from app.models.blood_bank import BloodStock
+from app.models.blood_transfusion_request import BloodTransfusionRequest
+from app.models.inpatient_inventory_debit import InpatientInventoryDebit
+from app.models.inpatient_investigation import InpatientInvestigation
+from app.models.inpatient_prescription import InpatientPrescription
+from app.models.investigation import Investigation
+from app.models.prescription import Prescription
+from app.models.ward_admission import WardAdmission
+from app.models.ward_transfer import WardTransfer
+from app.services.event_bus import ChangeEvent, event_bus
+
+# session.info key holding the events of the open transaction
+_PENDING_CHANGES = "change_feed_pending"
+
+
+@dataclass(frozen=True)
+class _Watched:
+    topic: str
+    entity: str
+    fields: Tuple[str, ...]  # Columns copied into the event data
+    ward_fields: Tuple[str, ...] = ()  # Columns naming the wards the row belongs to
+
+
+_WATCHED = {
+    Investigation: _Watched(
+        "lab_worklist", "investigation",
+        ("encounter_id", "investigation_type", "status", "gdrg_code", "procedure_name")
+    ),
+    InpatientInvestigation: _Watched(
+        "lab_worklist", "inpatient_investigation",
+        ("clinical_review_id", "investigation_type", "status", "gdrg_code", "procedure_name")
+    ),
+    WardAdmission: _Watched(
+        "ward_board", "ward_admission",
+        ("encounter_id", "ward", "bed_id", "doctor_id", "discharged_at"), ("ward",)
+    ),
+    WardTransfer: _Watched(
+        "transfers", "ward_transfer",
+        ("ward_admission_id", "from_ward", "to_ward", "status"), ("from_ward", "to_ward")
+    ),
+    BloodTransfusionRequest: _Watched(
+        "blood_transfusion", "blood_transfusion_request",
+        ("ward_admission_id", "encounter_id", "transfusion_type_id", "quantity", "status")
+    ),
+    BloodStock: _Watched(
+        "blood_transfusion", "blood_stock",
+        ("transfusion_type_id", "available_units", "reserved_units", "issued_units")
+    ),
+    Prescription: _Watched(
+        "pharmacy", "prescription",
+        ("encounter_id", "medicine_code", "medicine_name", "confirmed_by", "dispensed_by")
+    ),
+    InpatientPrescription: _Watched(
+        "pharmacy", "inpatient_prescription",
+        ("clinical_review_id", "medicine_code", "medicine_name", "confirmed_by", "dispensed_by")
+    ),
+    InpatientInventoryDebit: _Watched(
+        "pharmacy", "inventory_debit",
+        ("ward_admission_id", "product_code", "product_name", "quantity", "is_released"), ("requesting_ward",)
+    ),
+    Bill: _Watched("billing", "bill", ("encounter_id", "bill_number", "is_paid")),
+    BillItem: _Watched("billing", "bill_item", ("bill_id", "item_code", "category")),
+    Receipt: _Watched("billing", "receipt", ("bill_id", "receipt_number", "amount_paid")),
+}
+
+
+def _read(obj, name: str, deleted: bool):
+    # Deleted rows cannot be refreshed, so only their loaded values are used
+    return obj.__dict__.get(name) if deleted else getattr(obj, name, None)
+
+
+def _change_event(obj, watched: _Watched, action: str) -> ChangeEvent:
+    deleted = action == "deleted"
+    data = {}
+    for name in watched.fields:
+        value = _read(obj, name, deleted)
+        data[name] = value.isoformat() if hasattr(value, "isoformat") else value
+    wards = [_read(obj, name, deleted) for name in watched.ward_fields]
+    if action == "updated":
+        # A row moved between wards (transfer) is news on the ward it left too;
+        # after_flush still sees the pre-flush values in the attribute history
+        attrs = inspect(obj).attrs
+        for name in watched.ward_fields:
+            wards.extend(attrs[name].history.deleted)
+    wards = tuple(dict.fromkeys(ward for ward in wards if ward))
+    return ChangeEvent(
+        topic=watched.topic, entity=watched.entity, action=action,
+        entity_id=_read(obj, "id", deleted), wards=wards, data=data
+    )
+
+
+def _collect_changes(session: Session, flush_context) -> None:
+    """Record the watched rows written by this flush (ids are assigned by now)"""
+    pending: List[ChangeEvent] = session.info.setdefault(_PENDING_CHANGES, [])
+    for objects, action in ((session.new, "created"), (session.dirty, "updated"), (session.deleted, "deleted")):
+        for obj in objects:
+            watched = _WATCHED.get(type(obj))
+            if watched is None:
+                continue
+            if action == "updated" and not session.is_modified(obj, include_collections=False):
+                continue
+            pending.append(_change_event(obj, watched, action))
+
+
+def _publish_changes(session: Session) -> None:
+    pending: List[ChangeEvent] = session.info.pop(_PENDING_CHANGES, [])
+    if pending:
+        event_bus.publish(pending)
+
+
+def _discard_changes(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_PENDING_CHANGES, None)
+
+
+def register_change_feed_listeners(session_factory) -> None:
+    """Attach the change feed hooks to a sessionmaker (idempotent)"""
+    if not event.contains(session_factory, "after_flush", _collect_changes):
+        event.listen(session_factory, "after_flush", _collect_changes)
+        event.listen(session_factory, "after_commit", _publish_changes)
+        event.listen(session_factory, "after_rollback", _discard_changes)
@@ -8,6 +8,7 @@ import subprocess
 import logging
 import gzip
 import json
+import sqlite3
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Tuple
@@ -17,6 +18,24 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 
+def _sqlite_copy(source: Path, target: Path, standalone: bool = False) -> None:
+    """
+    Copy one SQLite database into another with the SQLite backup API.
+    standalone: leave the copy in rollback-journal mode so it is a single file
+    """
+    src = sqlite3.connect(str(source))
+    try:
+        dst = sqlite3.connect(str(target), timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000)
+        try:
+            src.backup(dst)
+            if standalone:
+                dst.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
 class DatabaseBackupService:
     """Service for backing up and restoring databases"""
     
@@ -53,8 +72,9 @@ class DatabaseBackupService:
             backup_filename = f"hms_backup_{timestamp}.db"
             backup_path = self.backup_dir / backup_filename
             
-            # Copy SQLite database file
-            shutil.copy2(db_path, backup_path)
+            # Online backup - consistent while the app is writing, and includes
+            # changes still in the WAL file that a plain file copy would miss
+            _sqlite_copy(db_path, backup_path, standalone=True)
             
             logger.info(f"SQLite backup created: {backup_path}")
             return str(backup_path), None
@@ -256,11 +276,12 @@ class DatabaseBackupService:
             if db_path.exists():
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 pre_restore_backup = self.backup_dir / f"pre_restore_{timestamp}.db"
-                shutil.copy2(db_path, pre_restore_backup)
+                _sqlite_copy(db_path, pre_restore_backup, standalone=True)
                 logger.info(f"Created pre-restore backup: {pre_restore_backup}")
             
-            # Copy backup file to database location
-            shutil.copy2(backup_path, db_path)
+            # Restore through SQLite rather than over the file, so the live WAL and
+            # open connections see the restored database instead of corrupting it
+            _sqlite_copy(backup_path, db_path)
             
             logger.info(f"SQLite backup restored from: {backup_path}")
             return True, None
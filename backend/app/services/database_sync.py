@@ -1,18 +1,23 @@
 """
 Database synchronization service
 Syncs local database to remote MySQL database for online backup
+Rows deleted locally are deleted from the remote copy too, so reports routed
+to it as a read replica do not keep counting them.
 """
 import logging
 from typing import Optional, Tuple
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import bindparam, text, inspect
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
-from app.core.database import Base, engine as local_engine
+from app.core.datetime_utils import utcnow
+from app.core.database import Base, create_db_engine, engine as local_engine
 # Import all models to ensure they're registered with Base
 import app.models  # This imports all models from __init__.py
 
 logger = logging.getLogger(__name__)
 
+DELETE_CHUNK_SIZE = 500
+
 
 class DatabaseSyncService:
     """Service for syncing local database to remote MySQL database"""
@@ -20,6 +25,7 @@ class DatabaseSyncService:
     def __init__(self):
         self.remote_engine = None
         self.remote_session = None
+        self._sync_errors = 0
         self._initialize_remote_connection()
     
     def _initialize_remote_connection(self):
@@ -29,11 +35,8 @@ class DatabaseSyncService:
             return
         
         try:
-            self.remote_engine = create_engine(
-                settings.SYNC_DATABASE_URL,
-                pool_pre_ping=True,
-                echo=False
-            )
+            # Same pool tuning (pre-ping, recycle) as the main engine
+            self.remote_engine = create_db_engine(settings.SYNC_DATABASE_URL)
             self.remote_session = sessionmaker(bind=self.remote_engine)
             logger.info("Remote database connection initialized")
         except Exception as e:
@@ -69,14 +72,24 @@ class DatabaseSyncService:
             return False, "Remote database connection not initialized"
         
         try:
+            sync_started = utcnow()
+            
             # Step 1: Create tables in remote database if they don't exist
             logger.info("Creating/updating tables in remote database...")
             Base.metadata.create_all(bind=self.remote_engine)
             
             # Step 2: Sync data from local to remote
             logger.info("Syncing data to remote database...")
+            self._sync_errors = 0
             sync_count = self._sync_data()
             
+            # Step 3: Advance the replica watermark (read-replica routing checks it) -
+            # only when every record made it, so the replica is complete up to sync_started
+            if self._sync_errors == 0:
+                self._write_watermark(sync_started, sync_count)
+            else:
+                logger.warning(f"Sync had {self._sync_errors} errors - replica watermark not advanced")
+            
             logger.info(f"Database sync completed. Synced {sync_count} records.")
             return True, f"Sync completed. {sync_count} records processed."
         
@@ -92,6 +105,8 @@ class DatabaseSyncService:
         remote_db = self.remote_session()
         
         sync_count = 0
+        # table -> (primary key column, primary keys present locally), for the deletion pass
+        local_keys = {}
         
         try:
             # Get all tables from local database
@@ -102,8 +117,8 @@ class DatabaseSyncService:
             
             for table_name in local_tables:
                 try:
-                    # Skip system tables
-                    if table_name.startswith('_') or table_name in ['alembic_version']:
+                    # Skip system tables (and the watermark, which only the remote copy holds)
+                    if table_name.startswith('_') or table_name in ['alembic_version', 'replica_sync_watermark']:
                         logger.debug(f"Skipping system table: {table_name}")
                         continue
                     
@@ -153,6 +168,7 @@ class DatabaseSyncService:
                     ).fetchall()
                     
                     logger.info(f"Found {len(local_records)} records in local table {table_name}")
+                    local_keys[table_name] = (pk_column, {record._mapping[pk_column] for record in local_records})
                     
                     if len(local_records) == 0:
                         logger.debug(f"Table {table_name} is empty, skipping")
@@ -201,6 +217,7 @@ class DatabaseSyncService:
                             
                         except Exception as e:
                             logger.error(f"Error syncing record {idx} in table {table_name}: {e}", exc_info=True)
+                            self._sync_errors += 1
                             continue
                     
                     remote_db.commit()
@@ -208,16 +225,61 @@ class DatabaseSyncService:
                 
                 except Exception as e:
                     logger.error(f"Error syncing table {table_name}: {e}", exc_info=True)
+                    self._sync_errors += 1
                     remote_db.rollback()
                     continue
             
-            logger.info(f"Total records synced: {sync_count}")
-            return sync_count
+            deleted = self._delete_removed_rows(remote_db, local_keys)
+            logger.info(f"Total records synced: {sync_count}, deleted from remote: {deleted}")
+            return sync_count + deleted
         
         finally:
             local_db.close()
             remote_db.close()
     
+    def _delete_removed_rows(self, remote_db, local_keys: dict) -> int:
+        """
+        Delete remote rows whose primary key is no longer in the local table.
+        Children are handled before their parents so foreign keys do not block the deletes.
+        """
+        order = {table.name.lower(): position for position, table in enumerate(Base.metadata.sorted_tables)}
+        deleted = 0
+        for table_name in sorted(local_keys, key=lambda name: order.get(name.lower(), -1), reverse=True):
+            pk_column, keys = local_keys[table_name]
+            try:
+                remote_keys = remote_db.execute(text(f"SELECT `{pk_column}` FROM `{table_name}`")).scalars().all()
+                removed = [key for key in remote_keys if key not in keys]
+                if not removed:
+                    continue
+                delete_sql = text(
+                    f"DELETE FROM `{table_name}` WHERE `{pk_column}` IN :keys"
+                ).bindparams(bindparam("keys", expanding=True))
+                for start in range(0, len(removed), DELETE_CHUNK_SIZE):
+                    remote_db.execute(delete_sql, {"keys": removed[start:start + DELETE_CHUNK_SIZE]})
+                remote_db.commit()
+                deleted += len(removed)
+                logger.info(f"Deleted {len(removed)} records from remote table {table_name}")
+            except Exception as e:
+                logger.error(f"Error deleting removed records from table {table_name}: {e}", exc_info=True)
+                self._sync_errors += 1
+                remote_db.rollback()
+        return deleted
+    
+    def _write_watermark(self, synced_through, records: int) -> None:
+        """Record in the remote database that it holds everything committed before synced_through"""
+        from app.models.replica_watermark import ReplicaSyncWatermark
+        
+        remote_db = self.remote_session()
+        try:
+            watermark = remote_db.get(ReplicaSyncWatermark, 1) or ReplicaSyncWatermark(id=1)
+            watermark.synced_through = synced_through
+            watermark.completed_at = utcnow()
+            watermark.records = records
+            remote_db.add(watermark)
+            remote_db.commit()
+        finally:
+            remote_db.close()
+    
     def get_sync_status(self) -> dict:
         """Get sync status information"""
         if not settings.SYNC_ENABLED:
@@ -0,0 +1,443 @@
+"""
+Discharge summary service
+Builds an admission's discharge summary - patient, admission and discharge
+details, transfers, clinical reviews, diagnoses, medications, investigations,
+surgeries and admission / discharge vitals - and renders it as HTML or PDF.
+
+Gathering is a fixed number of queries however long the stay: the admission
+with its patient and bed, then one query per section filtered by the
+admission or its clinical review ids, and one batched query for staff names.
+
+Rendered documents are cached on disk under
+DISCHARGE_SUMMARY_CACHE_DIR/<admission id>/, named by the record's last
+modified time and a digest of its content, so a reprint of an unchanged
+record is a file read and any change to it (including a status change that
+does not touch a timestamp) renders a new document. Older renders of the
+admission are removed when a new one is written.
+
+PDF rendering uses fpdf2 (pure Python) when it is installed; HTML is always
+available.
+"""
+import hashlib
+import html
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from importlib.util import find_spec
+from pathlib import Path
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.bed import Bed
+from app.models.encounter import Encounter
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.inpatient_diagnosis import InpatientDiagnosis
+from app.models.inpatient_investigation import InpatientInvestigation
+from app.models.inpatient_prescription import InpatientPrescription
+from app.models.inpatient_surgery import InpatientSurgery
+from app.models.inpatient_vital import InpatientVital
+from app.models.patient import Patient
+from app.models.ward_admission import WardAdmission
+from app.models.ward_transfer import WardTransfer
+from app.services.investigation_worklist import patient_display_name, user_names
+
+# fpdf2 is optional and imported when a PDF is first rendered
+FPDF_AVAILABLE = find_spec("fpdf") is not None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so cached documents are re-rendered
+RENDER_VERSION = 2
+
+FORMATS = {"html": "text/html; charset=utf-8", "pdf": "application/pdf"}
+
+# PDF sections printed as notes (one block per row, text wrapped across pages) rather than tables
+_PDF_NOTE_SECTIONS = {"Clinical reviews"}
+# Longer PDF table cells are cut and printed in full below the table (a table row must fit on one page)
+PDF_CELL_MAX_CHARS = 400
+
+
+class RenderError(Exception):
+    """A document could not be laid out (server-side failure, not a bad request)"""
+
+_VITAL_FIELDS = (
+    ("temperature", "Temp (°C)"), ("blood_pressure", "BP (mmHg)"), ("pulse", "Pulse"),
+    ("respiratory_rate", "Resp. rate"), ("oxygen_saturation", "SpO2 (%)"), ("weight", "Weight (kg)"),
+)
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _vital(vital: Optional[InpatientVital]) -> Optional[dict]:
+    if vital is None:
+        return None
+    blood_pressure = None
+    if vital.blood_pressure_systolic and vital.blood_pressure_diastolic:
+        blood_pressure = f"{vital.blood_pressure_systolic}/{vital.blood_pressure_diastolic}"
+    return {
+        "recorded_at": _iso(vital.recorded_at), "temperature": vital.temperature, "blood_pressure": blood_pressure,
+        "pulse": vital.pulse, "respiratory_rate": vital.respiratory_rate,
+        "oxygen_saturation": vital.oxygen_saturation, "weight": vital.weight,
+    }
+
+
+def gather_discharge_record(db: Session, ward_admission_id: int) -> Optional[dict]:
+    """Everything the discharge summary shows, as plain JSON-serialisable data (None if no such admission)"""
+    row = db.query(WardAdmission, Patient, Bed.bed_number).join(
+        Encounter, Encounter.id == WardAdmission.encounter_id
+    ).join(
+        Patient, Patient.id == Encounter.patient_id
+    ).outerjoin(
+        Bed, Bed.id == WardAdmission.bed_id
+    ).filter(WardAdmission.id == ward_admission_id).first()
+    if row is None:
+        return None
+    admission, patient, bed_number = row
+
+    reviews = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.ward_admission_id == admission.id
+    ).order_by(InpatientClinicalReview.reviewed_at, InpatientClinicalReview.id).all()
+    review_ids = [review.id for review in reviews]
+
+    diagnoses, prescriptions, investigations = [], [], []
+    if review_ids:
+        diagnoses = db.query(InpatientDiagnosis).filter(
+            InpatientDiagnosis.clinical_review_id.in_(review_ids)
+        ).order_by(InpatientDiagnosis.is_chief.desc(), InpatientDiagnosis.created_at, InpatientDiagnosis.id).all()
+        prescriptions = db.query(InpatientPrescription).filter(
+            InpatientPrescription.clinical_review_id.in_(review_ids)
+        ).order_by(InpatientPrescription.created_at, InpatientPrescription.id).all()
+        investigations = db.query(InpatientInvestigation).filter(
+            InpatientInvestigation.clinical_review_id.in_(review_ids),
+            InpatientInvestigation.status != "cancelled"
+        ).order_by(InpatientInvestigation.created_at, InpatientInvestigation.id).all()
+
+    surgeries = db.query(InpatientSurgery).filter(
+        InpatientSurgery.ward_admission_id == admission.id
+    ).order_by(InpatientSurgery.surgery_date, InpatientSurgery.created_at).all()
+    transfers = db.query(WardTransfer).filter(
+        WardTransfer.ward_admission_id == admission.id, WardTransfer.status == "accepted"
+    ).order_by(WardTransfer.accepted_at, WardTransfer.id).all()
+
+    vitals_query = db.query(InpatientVital).filter(InpatientVital.ward_admission_id == admission.id)
+    first_vital = vitals_query.order_by(InpatientVital.recorded_at, InpatientVital.id).first()
+    last_vital = vitals_query.order_by(InpatientVital.recorded_at.desc(), InpatientVital.id.desc()).first()
+
+    names = user_names(db, [
+        admission.doctor_id, admission.admitted_by, admission.discharged_by,
+        *(review.reviewed_by for review in reviews),
+        *(prescription.prescribed_by for prescription in prescriptions),
+    ])
+
+    end = admission.discharged_at
+    length_of_stay = None
+    if end and admission.admitted_at:
+        length_of_stay = max(1, (end.date() - admission.admitted_at.date()).days)
+
+    timestamps = [
+        admission.updated_at, patient.updated_at,
+        *(review.updated_at for review in reviews), *(d.created_at for d in diagnoses),
+        *(p.confirmed_at or p.created_at for p in prescriptions), *(i.cancelled_at or i.created_at for i in investigations),
+        *(s.updated_at for s in surgeries), *(t.updated_at for t in transfers),
+        last_vital.updated_at if last_vital else None,
+    ]
+    last_modified = max((ts for ts in timestamps if ts is not None), default=admission.admitted_at)
+
+    return {
+        "ward_admission_id": admission.id,
+        "last_modified": _iso(last_modified),
+        "patient": {
+            "name": patient_display_name(patient), "card_number": patient.card_number, "gender": patient.gender,
+            "age": patient.age, "date_of_birth": _iso(patient.date_of_birth), "insurance_id": patient.insurance_id,
+        },
+        "admission": {
+            "ward": admission.ward, "bed_number": bed_number, "ccc_number": admission.ccc_number,
+            "doctor": names.get(admission.doctor_id), "admitted_by": names.get(admission.admitted_by),
+            "admitted_at": _iso(admission.admitted_at), "admission_notes": admission.admission_notes,
+            "discharged_at": _iso(admission.discharged_at), "discharged_by": names.get(admission.discharged_by),
+            "discharge_outcome": admission.discharge_outcome, "discharge_condition": admission.discharge_condition,
+            "death_recorded_at": _iso(admission.death_recorded_at), "final_orders": admission.final_orders,
+            "length_of_stay_days": length_of_stay,
+        },
+        "transfers": [
+            {"from_ward": t.from_ward, "to_ward": t.to_ward, "accepted_at": _iso(t.accepted_at), "reason": t.transfer_reason}
+            for t in transfers
+        ],
+        "clinical_reviews": [
+            {"reviewed_at": _iso(r.reviewed_at), "reviewed_by": names.get(r.reviewed_by), "notes": r.review_notes}
+            for r in reviews
+        ],
+        "diagnoses": [
+            {"icd10": d.icd10, "diagnosis": d.diagnosis, "is_chief": bool(d.is_chief), "is_provisional": bool(d.is_provisional)}
+            for d in diagnoses
+        ],
+        "medications": [
+            {
+                "medicine_name": p.medicine_name, "dose": p.dose, "unit": p.unit, "frequency": p.frequency,
+                "duration": p.duration, "quantity": p.quantity, "instructions": p.instructions,
+                "prescribed_by": names.get(p.prescribed_by), "dispensed": p.dispensed_by is not None,
+                "is_external": bool(p.is_external),
+            }
+            for p in prescriptions
+        ],
+        "investigations": [
+            {"investigation_type": i.investigation_type, "procedure_name": i.procedure_name or i.gdrg_code,
+             "status": i.status, "service_date": _iso(i.service_date)}
+            for i in investigations
+        ],
+        "surgeries": [
+            {"surgery_name": s.surgery_name, "surgery_date": _iso(s.surgery_date), "surgeon_name": s.surgeon_name,
+             "anesthesia_type": s.anesthesia_type, "is_completed": bool(s.is_completed), "complications": s.complications}
+            for s in surgeries
+        ],
+        "vitals": {
+            "on_admission": _vital(first_vital),
+            "at_discharge": _vital(last_vital) if last_vital is not None and last_vital is not first_vital else None,
+        },
+    }
+
+
+def record_digest(record: dict) -> str:
+    payload = json.dumps(record, sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload + f"|v{RENDER_VERSION}".encode()).hexdigest()[:20]
+
+
+def _text(value) -> str:
+    if value is None or value == "":
+        return "-"
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    return str(value)
+
+
+def _when(value: Optional[str]) -> str:
+    if not value:
+        return "-"
+    try:
+        return datetime.fromisoformat(value).strftime("%d %b %Y %H:%M")
+    except ValueError:
+        return value
+
+
+def _dose(medication: dict) -> str:
+    parts = [f"{medication['dose'] or ''}{(' ' + medication['unit']) if medication['unit'] else ''}".strip(),
+             medication["frequency"], medication["duration"]]
+    return " ".join(part for part in parts if part) or "-"
+
+
+def _sections(record: dict) -> List[Tuple[str, List[str], List[List[str]]]]:
+    """The summary as (title, header, rows) tables shared by the HTML and PDF layouts"""
+    patient, admission = record["patient"], record["admission"]
+    sections = [
+        ("Patient", ["Name", "Card number", "Gender", "Age", "Member no."], [[
+            _text(patient["name"]), _text(patient["card_number"]), _text(patient["gender"]),
+            _text(patient["age"]), _text(patient["insurance_id"]),
+        ]]),
+        ("Admission", ["Ward / bed", "Doctor", "Admitted", "Discharged", "Stay (days)"], [[
+            f"{admission['ward']} / {admission['bed_number'] or '-'}", _text(admission["doctor"]),
+            _when(admission["admitted_at"]), _when(admission["discharged_at"]), _text(admission["length_of_stay_days"]),
+        ]]),
+        ("Outcome", ["Outcome", "Condition", "Discharged by", "CCC"], [[
+            _text(admission["discharge_outcome"]), _text(admission["discharge_condition"]),
+            _text(admission["discharged_by"]), _text(admission["ccc_number"]),
+        ]]),
+        ("Diagnoses", ["ICD-10", "Diagnosis", "Chief", "Provisional"], [
+            [_text(d["icd10"]), _text(d["diagnosis"]), _text(d["is_chief"]), _text(d["is_provisional"])]
+            for d in record["diagnoses"]
+        ]),
+        ("Surgeries", ["Date", "Surgery", "Surgeon", "Anaesthesia", "Complications"], [
+            [_when(s["surgery_date"]), _text(s["surgery_name"]), _text(s["surgeon_name"]),
+             _text(s["anesthesia_type"]), _text(s["complications"])]
+            for s in record["surgeries"]
+        ]),
+        ("Medications", ["Medicine", "Dose", "Qty", "Dispensed"], [
+            [_text(m["medicine_name"]), _dose(m), _text(m["quantity"]), "External" if m["is_external"] else _text(m["dispensed"])]
+            for m in record["medications"]
+        ]),
+        ("Investigations", ["Type", "Investigation", "Status", "Date"], [
+            [_text(i["investigation_type"]), _text(i["procedure_name"]), _text(i["status"]), _when(i["service_date"])]
+            for i in record["investigations"]
+        ]),
+        ("Transfers", ["From", "To", "Accepted", "Reason"], [
+            [_text(t["from_ward"]), _text(t["to_ward"]), _when(t["accepted_at"]), _text(t["reason"])]
+            for t in record["transfers"]
+        ]),
+    ]
+    vitals = [(label, record["vitals"][key]) for label, key in (("On admission", "on_admission"), ("At discharge", "at_discharge"))]
+    sections.append(("Vitals", ["", *(label for _, label in _VITAL_FIELDS)], [
+        [label, *(_text(vital[field]) for field, _ in _VITAL_FIELDS)] for label, vital in vitals if vital
+    ]))
+    sections.append(("Clinical reviews", ["Date", "Reviewed by", "Notes"], [
+        [_when(r["reviewed_at"]), _text(r["reviewed_by"]), _text(r["notes"])] for r in record["clinical_reviews"]
+    ]))
+    return sections
+
+
+def render_html(record: dict) -> bytes:
+    esc = html.escape
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Discharge summary</title><style>",
+        "body{font-family:Arial,sans-serif;font-size:12px;margin:24px}h1{font-size:18px}h2{font-size:14px;margin:16px 0 4px}",
+        "table{border-collapse:collapse;width:100%}th,td{border:1px solid #999;padding:3px 6px;text-align:left;vertical-align:top}",
+        "th{background:#eee}.note{white-space:pre-wrap}",
+        "</style></head><body>",
+        f"<h1>Discharge summary - {esc(_text(record['patient']['name']))}</h1>",
+    ]
+    for title, header, rows in _sections(record):
+        parts.append(f"<h2>{esc(title)}</h2>")
+        if not rows:
+            parts.append("<p>None recorded</p>")
+            continue
+        parts.append("<table><tr>" + "".join(f"<th>{esc(cell)}</th>" for cell in header) + "</tr>")
+        for row in rows:
+            parts.append("<tr>" + "".join(f"<td class='note'>{esc(cell)}</td>" for cell in row) + "</tr>")
+        parts.append("</table>")
+    admission = record["admission"]
+    for title, value in (("Admission notes", admission["admission_notes"]), ("Final orders", admission["final_orders"])):
+        parts.append(f"<h2>{title}</h2><p class='note'>{esc(_text(value))}</p>")
+    parts.append(f"<p><small>Record last modified {esc(_when(record['last_modified']))}</small></p></body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def _latin1(value: str) -> str:
+    # The PDF core fonts are latin-1 only
+    return value.encode("latin-1", "replace").decode("latin-1")
+
+
+def render_pdf(record: dict) -> bytes:
+    """
+    Raises:
+        RuntimeError: fpdf2 is not installed
+    """
+    if not FPDF_AVAILABLE:
+        raise RuntimeError("PDF rendering is not available. Install with: pip install 'fpdf2>=2.7.0'")
+    from fpdf import FPDF
+
+    pdf = FPDF(format="A4")
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 15)
+    pdf.cell(0, 9, _latin1(f"Discharge summary - {_text(record['patient']['name'])}"), new_x="LMARGIN", new_y="NEXT")
+    for title, header, rows in _sections(record):
+        pdf.set_font("Helvetica", "B", 11)
+        pdf.cell(0, 8, title, new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Helvetica", size=8)
+        if not rows:
+            pdf.cell(0, 5, "None recorded", new_x="LMARGIN", new_y="NEXT")
+            continue
+        if title in _PDF_NOTE_SECTIONS:
+            # Label cells on one line, the free text (last cell) wrapped below it
+            for *labels, note in rows:
+                pdf.set_font("Helvetica", "B", 8)
+                pdf.multi_cell(0, 4.5, _latin1(" - ".join(labels)), new_x="LMARGIN", new_y="NEXT")
+                pdf.set_font("Helvetica", size=8)
+                pdf.multi_cell(0, 4.5, _latin1(note), new_x="LMARGIN", new_y="NEXT")
+                pdf.ln(1.5)
+            continue
+        overflow = []
+        with pdf.table(first_row_as_headings=True, line_height=4.5) as table:
+            for cells in [header, *rows]:
+                table_row = table.row()
+                for column, cell in zip(header, cells):
+                    if len(cell) > PDF_CELL_MAX_CHARS:
+                        overflow.append((f"{column} ({cells[0]})", cell))
+                        cell = cell[:PDF_CELL_MAX_CHARS] + "... (continued below)"
+                    table_row.cell(_latin1(cell))
+        for label, text in overflow:
+            pdf.set_font("Helvetica", "B", 8)
+            pdf.multi_cell(0, 4.5, _latin1(label), new_x="LMARGIN", new_y="NEXT")
+            pdf.set_font("Helvetica", size=8)
+            pdf.multi_cell(0, 4.5, _latin1(text), new_x="LMARGIN", new_y="NEXT")
+    admission = record["admission"]
+    for title, value in (("Admission notes", admission["admission_notes"]), ("Final orders", admission["final_orders"])):
+        pdf.set_font("Helvetica", "B", 11)
+        pdf.cell(0, 8, title, new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Helvetica", size=9)
+        pdf.multi_cell(0, 5, _latin1(_text(value)), new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "I", 7)
+    pdf.cell(0, 6, _latin1(f"Record last modified {_when(record['last_modified'])}"))
+    return bytes(pdf.output())
+
+
+_RENDERERS = {"html": render_html, "pdf": render_pdf}
+
+
+def _cache_dir(ward_admission_id: int) -> Path:
+    return Path(settings.DISCHARGE_SUMMARY_CACHE_DIR) / str(ward_admission_id)
+
+
+def _cache_name(record: dict, digest: str, fmt: str) -> str:
+    stamp = (record["last_modified"] or "").replace(":", "").replace("-", "").replace(".", "")
+    return f"{stamp}-{digest}.{fmt}"
+
+
+def _write_atomically(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def get_discharge_summary(db: Session, ward_admission_id: int, fmt: str = "pdf") -> Optional[dict]:
+    """
+    The rendered discharge summary, from the disk cache when the record is unchanged.
+
+    Returns:
+        None when the admission does not exist, else
+        {"content": bytes, "media_type", "digest", "last_modified", "cached": bool}
+
+    Raises:
+        ValueError: unknown format
+        RuntimeError: PDF requested but fpdf2 is not installed
+        RenderError: the document could not be laid out
+    """
+    if fmt not in _RENDERERS:
+        raise ValueError(f"Invalid format. Must be one of: {', '.join(_RENDERERS)}")
+    record = gather_discharge_record(db, ward_admission_id)
+    if record is None:
+        return None
+    digest = record_digest(record)
+    path = _cache_dir(ward_admission_id) / _cache_name(record, digest, fmt)
+    result = {"media_type": FORMATS[fmt], "digest": digest, "last_modified": record["last_modified"]}
+    try:
+        return {**result, "content": path.read_bytes(), "cached": True}
+    except OSError:
+        pass
+
+    try:
+        content = _RENDERERS[fmt](record)
+    except ValueError as e:
+        # fpdf reports layout failures as ValueError; keep them apart from an invalid format
+        raise RenderError(f"Could not render the discharge summary for admission {ward_admission_id}: {e}") from e
+    try:
+        _write_atomically(path, content)
+        for old in path.parent.glob(f"*.{fmt}"):
+            if old != path:
+                old.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning("Could not cache discharge summary for admission %s: %s", ward_admission_id, e)
+    return {**result, "content": content, "cached": False}
+
+
+def prerender_discharge_summary(ward_admission_id: int) -> None:
+    """Render and cache the PDF after discharge (background task; opens its own session)"""
+    if not FPDF_AVAILABLE:
+        return
+    db = SessionLocal()
+    try:
+        get_discharge_summary(db, ward_admission_id, "pdf")
+    except Exception as e:
+        logger.warning("Could not pre-render discharge summary for admission %s: %s", ward_admission_id, e)
+    finally:
+        db.close()
@@ -0,0 +1,171 @@
+"""
+In-process event bus
+Carries typed change events from the request threads that commit them to the
+clients listening on the push channel (/api/events/stream).
+
+- publish() is thread-safe and never blocks: sync endpoints run in the
+  threadpool, so events are handed to each subscriber's event loop with
+  call_soon_threadsafe
+- the last EVENT_BUFFER_SIZE events are kept so a reconnecting client can
+  resume from its Last-Event-ID instead of re-downloading its lists
+- a subscriber that falls QUEUE_SIZE events behind is marked overflowed and
+  told to resync rather than slowing down publishers
+
+The bus is per process: with several workers each one pushes the changes its
+own requests made, so run the push channel on a single worker.
+"""
+import asyncio
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.datetime_utils import utcnow
+
+EVENT_BUFFER_SIZE = 2000
+QUEUE_SIZE = 500
+
+# Screens that can subscribe, and what changes reach them
+TOPICS = {
+    "lab_worklist": "OPD and IPD investigation requests",
+    "ward_board": "Ward admissions, bed assignments and discharges",
+    "transfers": "Ward transfer requests",
+    "blood_transfusion": "Blood transfusion requests and blood bank stock",
+    "pharmacy": "OPD and inpatient prescriptions and inventory debits",
+    "billing": "Bills, bill items and receipts",
+}
+
+
+@dataclass
+class ChangeEvent:
+    """One committed change to a row a screen displays"""
+    topic: str
+    entity: str  # e.g. "ward_transfer"
+    action: str  # created / updated / deleted
+    entity_id: Optional[int]
+    wards: Tuple[str, ...] = ()  # Wards the change belongs to; empty when not ward-specific
+    data: Dict[str, Any] = field(default_factory=dict)
+    at: datetime = field(default_factory=utcnow)
+    id: int = 0  # Sequence number assigned by the bus
+
+    def to_dict(self) -> dict:
+        payload = asdict(self)
+        payload["wards"] = list(self.wards)
+        payload["at"] = self.at.isoformat()
+        return payload
+
+
+class Subscription:
+    """A client's queue of events, filtered by topic and ward"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, topics: Optional[Iterable[str]], ward: Optional[str]):
+        self.loop = loop
+        self.topics = set(topics) if topics else None
+        self.ward = ward
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event: ChangeEvent) -> bool:
+        if self.topics is not None and event.topic not in self.topics:
+            return False
+        return not (self.ward and event.wards and self.ward not in event.wards)
+
+    def deliver(self, event: ChangeEvent) -> None:
+        """Runs on the subscriber's loop"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBus:
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._subscribers: List[Subscription] = []
+        self._sequence = 0
+
+    @property
+    def last_event_id(self) -> int:
+        return self._sequence
+
+    def publish(self, events: Iterable[ChangeEvent]) -> None:
+        """Number, buffer and fan out events (safe from any thread)"""
+        with self._lock:
+            for event in events:
+                self._sequence += 1
+                event.id = self._sequence
+                self._buffer.append(event)
+                for subscription in self._subscribers:
+                    if subscription.wants(event):
+                        try:
+                            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+                        except RuntimeError:
+                            pass  # Loop closed; the stream's cleanup unsubscribes it
+
+    def subscribe(
+        self,
+        topics: Optional[Iterable[str]] = None,
+        ward: Optional[str] = None,
+        last_event_id: Optional[int] = None
+    ) -> Tuple[Subscription, Optional[List[ChangeEvent]]]:
+        """
+        Register a subscriber on the running loop.
+
+        Returns:
+            (subscription, replay) - replay holds the buffered events after
+            last_event_id, or None when they are no longer buffered (the
+            client has to reload its lists)
+        """
+        subscription = Subscription(asyncio.get_running_loop(), topics, ward)
+        with self._lock:
+            self._subscribers.append(subscription)
+            # Registered and replayed under the lock: queued events all come after the replay
+            replay: Optional[List[ChangeEvent]] = []
+            if last_event_id is not None and last_event_id != self._sequence:
+                if self._missed(last_event_id):
+                    replay = None
+                else:
+                    replay = [e for e in self._buffer if e.id > last_event_id and subscription.wants(e)]
+        return subscription, replay
+
+    def _missed(self, last_event_id: int) -> bool:
+        """Whether events after last_event_id are gone (dropped from the buffer, or the process restarted)"""
+        if last_event_id > self._sequence:
+            return True
+        oldest = self._buffer[0].id if self._buffer else self._sequence + 1
+        return last_event_id + 1 < oldest
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def recent(
+        self,
+        since: int = 0,
+        topics: Optional[Iterable[str]] = None,
+        ward: Optional[str] = None
+    ) -> Optional[List[ChangeEvent]]:
+        """Buffered events after since (None when some were already dropped from the buffer)"""
+        with self._lock:
+            if since != self._sequence and self._missed(since):
+                return None
+            events = [e for e in self._buffer if e.id > since]
+        topic_set = set(topics) if topics else None
+        return [
+            e for e in events
+            if (topic_set is None or e.topic in topic_set)
+            and not (ward and e.wards and ward not in e.wards)
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "last_event_id": self._sequence,
+                "buffered_events": len(self._buffer),
+            }
+
+
+event_bus = EventBus()
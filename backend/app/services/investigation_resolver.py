@@ -0,0 +1,146 @@
+"""
+Investigation resolver
+OPD investigations (investigations table) and IPD investigations
+(inpatient_investigations table) have independent id sequences, so an id on its
+own does not say which table it belongs to. Every lab/scan/x-ray endpoint and
+the analyzer resolve ids through resolve_investigation:
+- with a source ("opd" / "ipd") it is a single primary-key lookup
+- without one it keeps the historical IPD-first precedence for older clients
+
+A type-tagged reference ("opd-12", "ipd-12") identifies an investigation
+across both tables; the merged worklist returns it for every row.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+from sqlalchemy.orm import Session
+from app.models.investigation import Investigation
+from app.models.inpatient_investigation import InpatientInvestigation
+from app.models.lab_result import LabResult
+from app.models.inpatient_lab_result import InpatientLabResult
+from app.models.scan_result import ScanResult
+from app.models.inpatient_scan_result import InpatientScanResult
+from app.models.xray_result import XrayResult
+from app.models.inpatient_xray_result import InpatientXrayResult
+
+SOURCE_OPD = "opd"
+SOURCE_IPD = "ipd"
+
+# Spellings already used around the code base for the two sources
+_SOURCE_ALIASES = {
+    "opd": SOURCE_OPD,
+    "outpatient": SOURCE_OPD,
+    "ipd": SOURCE_IPD,
+    "inpatient": SOURCE_IPD,
+}
+
+_INVESTIGATION_MODELS = {
+    SOURCE_OPD: Investigation,
+    SOURCE_IPD: InpatientInvestigation,
+}
+
+_RESULT_MODELS = {
+    ("lab", SOURCE_OPD): LabResult,
+    ("lab", SOURCE_IPD): InpatientLabResult,
+    ("scan", SOURCE_OPD): ScanResult,
+    ("scan", SOURCE_IPD): InpatientScanResult,
+    ("xray", SOURCE_OPD): XrayResult,
+    ("xray", SOURCE_IPD): InpatientXrayResult,
+}
+
+
+@dataclass
+class ResolvedInvestigation:
+    """An investigation together with the table it came from"""
+    source: str
+    investigation: Union[Investigation, InpatientInvestigation]
+
+    @property
+    def is_inpatient(self) -> bool:
+        return self.source == SOURCE_IPD
+
+    @property
+    def ref(self) -> str:
+        return investigation_ref(self.source, self.investigation.id)
+
+    def result_model(self, kind: Optional[str] = None):
+        """Result table for this investigation (lab/scan/xray, defaults to its own type)"""
+        return _RESULT_MODELS[((kind or self.investigation.investigation_type), self.source)]
+
+    def get_result(self, db: Session, kind: Optional[str] = None):
+        """Load the lab/scan/x-ray result row for this investigation, if any"""
+        model = self.result_model(kind)
+        return db.query(model).filter(model.investigation_id == self.investigation.id).first()
+
+
+def normalize_source(source: Optional[str]) -> Optional[str]:
+    """Map opd/outpatient/ipd/inpatient to SOURCE_OPD/SOURCE_IPD (None stays None)"""
+    if source is None or str(source).strip() == "":
+        return None
+    normalized = _SOURCE_ALIASES.get(str(source).strip().lower())
+    if normalized is None:
+        raise ValueError(f"Invalid investigation source: {source}")
+    return normalized
+
+
+def investigation_ref(source: str, investigation_id: int) -> str:
+    """Type-tagged reference, e.g. ipd-12"""
+    return f"{source}-{investigation_id}"
+
+
+def parse_investigation_ref(ref: str) -> Tuple[str, int]:
+    """Split an 'opd-12' / 'ipd-12' reference into (source, id)"""
+    try:
+        source, investigation_id = ref.strip().lower().split("-", 1)
+        return normalize_source(source), int(investigation_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid investigation reference: {ref}")
+
+
+def resolve_investigation(
+    db: Session,
+    investigation_id: int,
+    source: Optional[str] = None
+) -> Optional[ResolvedInvestigation]:
+    """
+    Find an OPD or IPD investigation by id.
+
+    Args:
+        db: Database session
+        investigation_id: Investigation id
+        source: "opd" or "ipd" when the caller knows it (one query); otherwise the
+            IPD table is checked first, then OPD, as the endpoints always did
+
+    Returns:
+        ResolvedInvestigation, or None if no such investigation exists
+    """
+    source = normalize_source(source)
+    sources = [source] if source else [SOURCE_IPD, SOURCE_OPD]
+    for candidate in sources:
+        model = _INVESTIGATION_MODELS[candidate]
+        investigation = db.query(model).filter(model.id == investigation_id).first()
+        if investigation is not None:
+            return ResolvedInvestigation(source=candidate, investigation=investigation)
+    return None
+
+
+def resolve_typed_investigation(
+    db: Session,
+    investigation_id: int,
+    source: Optional[str] = None
+) -> Tuple[Optional[InpatientInvestigation], Optional[Investigation]]:
+    """
+    resolve_investigation for endpoints that branch on the table: returns
+    (ipd_investigation, opd_investigation), at most one of them set.
+    """
+    resolved = resolve_investigation(db, investigation_id, source)
+    if resolved is None:
+        return None, None
+    if resolved.is_inpatient:
+        return resolved.investigation, None
+    return None, resolved.investigation
+
+
+def resolved_from_instance(investigation) -> ResolvedInvestigation:
+    """Wrap an already-loaded OPD/IPD investigation object"""
+    source = SOURCE_IPD if isinstance(investigation, InpatientInvestigation) else SOURCE_OPD
+    return ResolvedInvestigation(source=source, investigation=investigation)
@@ -0,0 +1,320 @@
+"""
+Investigation worklist service
+Paged Lab / Scan / X-ray worklists served from the investigations table alone:
+- filters run on the (investigation_type, status, created_at) composite index
+- patient name and card number are denormalized onto the investigation row
+- a cheap aggregate over the filtered set yields an ETag, so desks that poll
+  the worklist get 304 Not Modified while nothing has changed
+
+The unified worklist pages OPD and IPD investigations together with a single
+UNION ALL query; each row carries its source and type-tagged reference.
+"""
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import Integer, String, cast, func, literal, null, or_, select, union_all, update
+from sqlalchemy.orm import Session
+from app.core.datetime_utils import utcnow
+from app.models.encounter import Encounter
+from app.models.investigation import Investigation
+from app.models.inpatient_investigation import InpatientInvestigation
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.ward_admission import WardAdmission
+from app.models.patient import Patient
+from app.models.user import User
+from app.services.investigation_resolver import SOURCE_OPD, SOURCE_IPD, investigation_ref
+
+WORKLIST_TYPES = ["lab", "scan", "xray"]
+WORKLIST_STATUSES = ["requested", "confirmed", "completed", "cancelled"]
+
+
+def patient_display_name(patient: Optional[Patient]) -> Optional[str]:
+    """Name as shown on worklists: name surname other_names"""
+    if patient is None:
+        return None
+    return f"{patient.name or ''} {patient.surname or ''} {patient.other_names or ''}".strip()
+
+
+def stamp_patient_details(db: Session, investigation: Investigation, patient: Optional[Patient] = None) -> None:
+    """Copy the patient display name and card number onto a new investigation"""
+    if patient is None and investigation.encounter_id:
+        patient = db.query(Patient).join(
+            Encounter, Encounter.patient_id == Patient.id
+        ).filter(Encounter.id == investigation.encounter_id).first()
+    if patient is not None:
+        investigation.patient_display_name = patient_display_name(patient)
+        investigation.patient_card_number = patient.card_number
+
+
+def refresh_patient_details(db: Session, patient: Patient) -> int:
+    """
+    Re-stamp the denormalized name/card number after a patient is edited.
+    Bumps updated_at so polling worklists see the change. Caller commits.
+
+    Returns:
+        Number of investigations updated
+    """
+    encounter_ids = select(Encounter.id).where(Encounter.patient_id == patient.id)
+    result = db.execute(
+        update(Investigation).where(
+            Investigation.encounter_id.in_(encounter_ids)
+        ).values(
+            patient_display_name=patient_display_name(patient),
+            patient_card_number=patient.card_number,
+            updated_at=utcnow()
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    return result.rowcount or 0
+
+
+def backfill_patient_details(db: Session, batch_size: int = 1000) -> int:
+    """Stamp patient details onto investigations that do not have them yet. Caller commits."""
+    updated = 0
+    while True:
+        rows = db.query(Investigation.id, Patient).join(
+            Encounter, Encounter.id == Investigation.encounter_id
+        ).join(
+            Patient, Patient.id == Encounter.patient_id
+        ).filter(
+            Investigation.patient_display_name.is_(None)
+        ).limit(batch_size).all()
+        if not rows:
+            return updated
+        for investigation_id, patient in rows:
+            db.execute(
+                update(Investigation).where(Investigation.id == investigation_id).values(
+                    patient_display_name=patient_display_name(patient) or "",
+                    patient_card_number=patient.card_number
+                ),
+                execution_options={"synchronize_session": False}
+            )
+        db.flush()
+        updated += len(rows)
+
+
+def user_names(db: Session, user_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+    """Resolve user ids to full names with a single IN query"""
+    ids = {user_id for user_id in user_ids if user_id}
+    if not ids:
+        return {}
+    return dict(db.query(User.id, User.full_name).filter(User.id.in_(ids)).all())
+
+
+def _common_filters(
+    model,
+    investigation_type: str,
+    status: Optional[str],
+    date_from: Optional[date],
+    date_to: Optional[date]
+) -> list:
+    """Type/status/request-date filters shared by the OPD and IPD tables (index-backed)"""
+    filters = [model.investigation_type == investigation_type]
+    if status:
+        filters.append(model.status == status)
+    if date_from:
+        filters.append(model.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        filters.append(model.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return filters
+
+
+def _worklist_filters(
+    investigation_type: str,
+    status: Optional[str],
+    date_from: Optional[date],
+    date_to: Optional[date],
+    search: Optional[str]
+) -> list:
+    filters = _common_filters(Investigation, investigation_type, status, date_from, date_to)
+    if search:
+        search_term = f"%{search.strip()}%"
+        filters.append(or_(
+            Investigation.patient_card_number.ilike(search_term),
+            Investigation.patient_display_name.ilike(search_term)
+        ))
+    return filters
+
+
+def get_worklist_state(
+    db: Session,
+    investigation_type: str,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    search: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 50
+) -> dict:
+    """
+    Count and change marker for a worklist filter (one aggregate query).
+
+    Returns:
+        {"total": ..., "etag": ...} - the ETag changes whenever a row enters,
+        leaves or is modified within the filtered set
+    """
+    filters = _worklist_filters(investigation_type, status, date_from, date_to, search)
+    total, max_id, last_change = db.query(
+        func.count(Investigation.id),
+        func.max(Investigation.id),
+        func.max(func.coalesce(Investigation.updated_at, Investigation.created_at))
+    ).filter(*filters).one()
+
+    fingerprint = "|".join(str(part) for part in (
+        investigation_type, status, date_from, date_to, search, page, page_size,
+        total, max_id, last_change
+    ))
+    return {"total": total, "etag": f'W/"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'}
+
+
+def get_worklist_page(
+    db: Session,
+    investigation_type: str,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    search: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 50
+) -> List[dict]:
+    """One page of worklist rows, newest first, with requested/confirmed/completed user names"""
+    filters = _worklist_filters(investigation_type, status, date_from, date_to, search)
+    investigations = db.query(Investigation).filter(*filters).order_by(
+        Investigation.created_at.desc(), Investigation.id.desc()
+    ).offset((page - 1) * page_size).limit(page_size).all()
+
+    names = user_names(db, (
+        user_id
+        for inv in investigations
+        for user_id in (inv.requested_by, inv.confirmed_by, inv.completed_by)
+    ))
+
+    return [
+        {
+            "id": inv.id,
+            "encounter_id": inv.encounter_id,
+            "gdrg_code": inv.gdrg_code,
+            "procedure_name": inv.procedure_name,
+            "investigation_type": inv.investigation_type,
+            "notes": inv.notes,
+            "price": inv.price,
+            "status": inv.status,
+            "confirmed_by": inv.confirmed_by,
+            "completed_by": inv.completed_by,
+            "cancelled_by": inv.cancelled_by,
+            "cancellation_reason": inv.cancellation_reason,
+            "cancelled_at": inv.cancelled_at,
+            "created_at": inv.created_at,
+            "patient_name": inv.patient_display_name,
+            "patient_card_number": inv.patient_card_number,
+            "requested_by_name": names.get(inv.requested_by),
+            "confirmed_by_name": names.get(inv.confirmed_by),
+            "completed_by_name": names.get(inv.completed_by),
+        }
+        for inv in investigations
+    ]
+
+
+def get_unified_worklist(
+    db: Session,
+    investigation_type: str,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    search: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 50
+) -> dict:
+    """
+    OPD and IPD investigations of one type in a single paged list, newest first.
+    One UNION ALL query for the page, one for the count, one for user names.
+
+    Returns:
+        {"total": ..., "items": [...]} - items carry source ("opd"/"ipd") and ref ("ipd-12")
+    """
+    search_term = f"%{search.strip()}%" if search and search.strip() else None
+
+    opd_filters = _common_filters(Investigation, investigation_type, status, date_from, date_to)
+    if search_term:
+        opd_filters.append(or_(
+            Investigation.patient_card_number.ilike(search_term),
+            Investigation.patient_display_name.ilike(search_term)
+        ))
+    opd = select(
+        literal(SOURCE_OPD, String).label("source"),
+        Investigation.id.label("id"),
+        Investigation.encounter_id.label("encounter_id"),
+        cast(null(), Integer).label("ward_admission_id"),
+        cast(null(), String).label("ward"),
+        Investigation.gdrg_code.label("gdrg_code"),
+        Investigation.procedure_name.label("procedure_name"),
+        Investigation.investigation_type.label("investigation_type"),
+        Investigation.status.label("status"),
+        Investigation.price.label("price"),
+        Investigation.notes.label("notes"),
+        Investigation.created_at.label("created_at"),
+        Investigation.patient_display_name.label("patient_name"),
+        Investigation.patient_card_number.label("patient_card_number"),
+        Investigation.requested_by.label("requested_by"),
+        Investigation.confirmed_by.label("confirmed_by"),
+        Investigation.completed_by.label("completed_by"),
+    ).where(*opd_filters)
+
+    ipd_patient_name = func.trim(
+        func.coalesce(Patient.name, "") + " " + func.coalesce(Patient.surname, "") + " " + func.coalesce(Patient.other_names, "")
+    )
+    ipd_filters = _common_filters(InpatientInvestigation, investigation_type, status, date_from, date_to)
+    if search_term:
+        # Same name the OPD side searches (patient_display_name): name, surname and other names
+        ipd_filters.append(or_(
+            Patient.card_number.ilike(search_term),
+            ipd_patient_name.ilike(search_term)
+        ))
+    ipd = select(
+        literal(SOURCE_IPD, String).label("source"),
+        InpatientInvestigation.id.label("id"),
+        WardAdmission.encounter_id.label("encounter_id"),
+        WardAdmission.id.label("ward_admission_id"),
+        WardAdmission.ward.label("ward"),
+        InpatientInvestigation.gdrg_code.label("gdrg_code"),
+        InpatientInvestigation.procedure_name.label("procedure_name"),
+        InpatientInvestigation.investigation_type.label("investigation_type"),
+        InpatientInvestigation.status.label("status"),
+        InpatientInvestigation.price.label("price"),
+        InpatientInvestigation.notes.label("notes"),
+        InpatientInvestigation.created_at.label("created_at"),
+        ipd_patient_name.label("patient_name"),
+        Patient.card_number.label("patient_card_number"),
+        InpatientInvestigation.requested_by.label("requested_by"),
+        InpatientInvestigation.confirmed_by.label("confirmed_by"),
+        InpatientInvestigation.completed_by.label("completed_by"),
+    ).select_from(InpatientInvestigation).join(
+        InpatientClinicalReview, InpatientClinicalReview.id == InpatientInvestigation.clinical_review_id
+    ).join(
+        WardAdmission, WardAdmission.id == InpatientClinicalReview.ward_admission_id
+    ).join(
+        Encounter, Encounter.id == WardAdmission.encounter_id
+    ).join(
+        Patient, Patient.id == Encounter.patient_id
+    ).where(*ipd_filters)
+
+    combined = union_all(opd, ipd).subquery()
+    total = db.execute(select(func.count()).select_from(combined)).scalar() or 0
+    rows = db.execute(
+        select(combined).order_by(
+            combined.c.created_at.desc(), combined.c.source, combined.c.id.desc()
+        ).offset((page - 1) * page_size).limit(page_size)
+    ).mappings().all()
+
+    names = user_names(db, (
+        row[key] for row in rows for key in ("requested_by", "confirmed_by", "completed_by")
+    ))
+    items = []
+    for row in rows:
+        item = dict(row)
+        item["ref"] = investigation_ref(row["source"], row["id"])
+        item["requested_by_name"] = names.get(row["requested_by"])
+        item["confirmed_by_name"] = names.get(row["confirmed_by"])
+        item["completed_by_name"] = names.get(row["completed_by"])
+        items.append(item)
+    return {"total": total, "items": items}
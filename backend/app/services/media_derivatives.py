@@ -0,0 +1,97 @@
+"""
+Media derivatives
+Builds the compressed, web-friendly copy of an attachment:
+- images: orientation fixed, downscaled to MAX_IMAGE_SIDE, saved as WebP
+  (JPEG where Pillow has no WebP support)
+- PDFs: streams recompressed and the file linearized (pikepdf) so viewers
+  can show the first page before the rest arrives
+
+These functions run in worker processes, so the module imports nothing from
+the app. Pillow and pikepdf are optional; without them nothing is built.
+They are imported by the worker that builds a derivative, not at app startup.
+"""
+import os
+import tempfile
+from importlib.util import find_spec
+from typing import Optional, Tuple
+
+PIL_AVAILABLE = find_spec("PIL") is not None
+PIKEPDF_AVAILABLE = find_spec("pikepdf") is not None
+
+MAX_IMAGE_SIDE = 2048
+IMAGE_QUALITY = 80
+# A derivative must save at least this fraction of the original to be kept
+MIN_SAVING = 0.05
+
+
+def is_compressible(mime_type: str) -> bool:
+    """Types a derivative is built for (whether or not the library is installed here)"""
+    return mime_type.startswith("image/") or mime_type == "application/pdf"
+
+
+def can_build(mime_type: str) -> bool:
+    if mime_type == "application/pdf":
+        return PIKEPDF_AVAILABLE
+    return mime_type.startswith("image/") and PIL_AVAILABLE
+
+
+def _image(source: str, target_base: str) -> Tuple[str, str]:
+    from PIL import Image, ImageOps, features
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+        if features.check("webp"):
+            target, mime_type = f"{target_base}.webp", "image/webp"
+            image.save(target, format="WEBP", quality=IMAGE_QUALITY, method=4)
+        else:
+            target, mime_type = f"{target_base}.jpg", "image/jpeg"
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image.save(target, format="JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    return target, mime_type
+
+
+def _pdf(source: str, target_base: str) -> Tuple[str, str]:
+    import pikepdf
+
+    target = f"{target_base}.pdf"
+    with pikepdf.open(source) as pdf:
+        pdf.remove_unreferenced_resources()
+        pdf.save(
+            target, linearize=True, compress_streams=True,
+            object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            recompress_flate=True,
+        )
+    return target, "application/pdf"
+
+
+def build_derivative(source: str, mime_type: str, target_base: str) -> Optional[Tuple[str, int, str]]:
+    """
+    Write the derivative of `source` next to `target_base` (extension added).
+
+    Returns:
+        (path, size_bytes, mime_type), or None when the type is not handled or
+        the result would not be meaningfully smaller than the original.
+    """
+    if not can_build(mime_type):
+        return None
+    os.makedirs(os.path.dirname(target_base), exist_ok=True)
+    # Build under a temporary name so a half-written derivative is never served
+    fd, tmp_base = tempfile.mkstemp(dir=os.path.dirname(target_base))
+    os.close(fd)
+    os.remove(tmp_base)
+    try:
+        built, out_mime = _pdf(source, tmp_base) if mime_type == "application/pdf" else _image(source, tmp_base)
+        size = os.path.getsize(built)
+        if size > os.path.getsize(source) * (1 - MIN_SAVING):
+            os.remove(built)
+            return None
+        target = target_base + os.path.splitext(built)[1]
+        os.replace(built, target)
+        return target, size, out_mime
+    except BaseException:
+        for leftover in (f"{tmp_base}.webp", f"{tmp_base}.jpg", f"{tmp_base}.pdf"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
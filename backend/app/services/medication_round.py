@@ -0,0 +1,310 @@
+"""
+Medication round service
+Ward-level medication administration record (MAR) for a drug round: for every
+active admission in a ward, which doses of its dispensed prescriptions are
+given, due, overdue or still to come on a day, from each prescription's
+frequency and duration and the TreatmentSheetAdministration records.
+
+A round is built from a fixed set of queries - admissions, inpatient
+prescriptions, OPD prescriptions, the day's administrations and the givers'
+names - whatever the number of patients. Dose schedules are derived from
+(frequency, frequency_value, duration, start date) only, so they are cached
+per distinct prescription schedule and reused across rounds and wards.
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.datetime_utils import now, utcnow
+from app.models.bed import Bed
+from app.models.encounter import Encounter
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.inpatient_prescription import InpatientPrescription
+from app.models.patient import Patient
+from app.models.prescription import Prescription
+from app.models.treatment_sheet_administration import TreatmentSheetAdministration
+from app.models.ward_admission import WardAdmission
+from app.services.investigation_worklist import patient_display_name, user_names
+
+# Doses per day for each frequency label (same mapping as the prescription forms)
+FREQUENCY_DOSES_PER_DAY = {
+    "NOCTE": 1,
+    "STAT": 1,
+    "OD": 1,
+    "DAILY": 1,
+    "PRN": 1,
+    "BDS": 2,
+    "BID": 2,
+    "QDS": 4,
+    "QID": 4,
+    "TID": 3,
+    "TDS": 3,
+    "5X": 5,
+    "EVERY OTHER DAY": 1,
+    "AT BED TIME": 1,
+    "6 TIMES": 6,
+}
+
+# Ward round clock times by doses per day; other counts are spread from 06:00 to 22:00
+ROUND_TIMES = {
+    1: (time(8, 0),),
+    2: (time(8, 0), time(20, 0)),
+    3: (time(6, 0), time(14, 0), time(22, 0)),
+    4: (time(6, 0), time(12, 0), time(18, 0), time(22, 0)),
+}
+_BEDTIME = (time(22, 0),)
+
+# A dose is "due" from DUE_WINDOW before its time until DUE_WINDOW after; later it is overdue
+DUE_WINDOW = timedelta(hours=1)
+
+SHIFTS = {
+    "morning": (time(6, 0), time(14, 0)),
+    "afternoon": (time(14, 0), time(22, 0)),
+    "night": (time(22, 0), time(6, 0)),  # Wraps past midnight
+}
+
+
+class DoseSchedule(NamedTuple):
+    """When a prescription's doses fall due"""
+    start_date: date
+    days: int  # Length of the course in days
+    every_days: int  # 1 = daily, 2 = every other day
+    times: Tuple[time, ...]  # Clock times on each dosing day
+    as_needed: bool  # PRN - nothing is ever due or overdue
+    single_dose: bool  # STAT - one dose at the time it was prescribed
+
+    def times_on(self, day: date) -> Tuple[time, ...]:
+        """Scheduled dose times on a calendar day (empty outside the course)"""
+        if self.as_needed:
+            return ()
+        offset = (day - self.start_date).days
+        if offset < 0 or offset >= self.days or offset % self.every_days:
+            return ()
+        if self.single_dose:
+            return self.times if offset == 0 else ()
+        return self.times
+
+
+def parse_duration_days(duration: Optional[str]) -> int:
+    """Course length in days from "7", "7 DAYS", "5/7" ... (1 when missing, like the treatment sheet)"""
+    if not duration:
+        return 1
+    match = re.search(r"\d+", str(duration))
+    return max(int(match.group(0)), 1) if match else 1
+
+
+def doses_per_day(frequency: Optional[str], frequency_value: Optional[int]) -> int:
+    if frequency_value and frequency_value > 0:
+        return frequency_value
+    return FREQUENCY_DOSES_PER_DAY.get((frequency or "").strip().upper(), 1)
+
+
+def _spread_times(count: int) -> Tuple[time, ...]:
+    if count in ROUND_TIMES:
+        return ROUND_TIMES[count]
+    step_minutes = 16 * 60 // (count - 1)
+    return tuple(
+        (datetime.combine(date.min, time(6, 0)) + timedelta(minutes=step_minutes * i)).time()
+        for i in range(count)
+    )
+
+
+@lru_cache(maxsize=4096)
+def dose_schedule(
+    frequency: Optional[str],
+    frequency_value: Optional[int],
+    duration: Optional[str],
+    prescribed_at: datetime
+) -> DoseSchedule:
+    """
+    Dose schedule of a prescription (cached: every argument that shapes the
+    schedule is part of the key, so an edited prescription gets a new entry).
+
+    Args:
+        prescribed_at: local time the prescription was written; the course starts that day
+    """
+    label = (frequency or "").strip().upper()
+    if label == "STAT":
+        times = (prescribed_at.time().replace(second=0, microsecond=0),)
+    elif label in ("NOCTE", "AT BED TIME"):
+        times = _BEDTIME
+    else:
+        times = _spread_times(doses_per_day(frequency, frequency_value))
+    return DoseSchedule(
+        start_date=prescribed_at.date(),
+        days=parse_duration_days(duration),
+        every_days=2 if label == "EVERY OTHER DAY" else 1,
+        times=times,
+        as_needed=label == "PRN",
+        single_dose=label == "STAT",
+    )
+
+
+def _in_shift(slot: time, shift: Optional[str]) -> bool:
+    if not shift:
+        return True
+    start, end = SHIFTS[shift]
+    if start < end:
+        return start <= slot < end
+    return slot >= start or slot < end
+
+
+def _dose_status(scheduled: datetime, current: datetime) -> str:
+    if current > scheduled + DUE_WINDOW:
+        return "overdue"
+    if current >= scheduled - DUE_WINDOW:
+        return "due"
+    return "upcoming"
+
+
+def get_ward_medication_round(
+    db: Session,
+    ward: str,
+    round_date: Optional[date] = None,
+    shift: Optional[str] = None
+) -> dict:
+    """
+    Medication round for every active admission in a ward.
+
+    Args:
+        round_date: day of the round (defaults to today)
+        shift: morning / afternoon / night to limit the doses listed
+
+    Returns:
+        {"ward", "date", "shift", "generated_at", "summary": {...}, "patients": [...]}
+
+    Raises:
+        ValueError: on an unknown shift
+    """
+    if shift and shift not in SHIFTS:
+        raise ValueError(f"Invalid shift: {shift}. Must be one of: {', '.join(SHIFTS)}")
+    current = now()
+    round_date = round_date or current.date()
+    # Prescriptions are stamped in UTC; schedules run on the ward's local clock
+    utc_offset = current - utcnow()
+
+    admissions = db.query(WardAdmission, Patient, Bed.bed_number).join(
+        Encounter, Encounter.id == WardAdmission.encounter_id
+    ).join(
+        Patient, Patient.id == Encounter.patient_id
+    ).outerjoin(
+        Bed, Bed.id == WardAdmission.bed_id
+    ).filter(
+        WardAdmission.ward == ward,
+        WardAdmission.discharged_at.is_(None)
+    ).order_by(Bed.bed_number, WardAdmission.id).all()
+    if not admissions:
+        return {
+            "ward": ward, "date": round_date.isoformat(), "shift": shift, "generated_at": current,
+            "summary": {"given": 0, "due": 0, "overdue": 0, "upcoming": 0, "as_needed_given": 0}, "patients": [],
+        }
+
+    admission_ids = [admission.id for admission, _, _ in admissions]
+    admission_of_encounter = {admission.encounter_id: admission.id for admission, _, _ in admissions}
+
+    # Dispensed prescriptions for every admission: inpatient (via clinical reviews) and OPD (via encounter)
+    prescriptions: Dict[int, List[tuple]] = {admission_id: [] for admission_id in admission_ids}
+    for prescription, ward_admission_id in db.query(
+        InpatientPrescription, InpatientClinicalReview.ward_admission_id
+    ).join(
+        InpatientClinicalReview, InpatientClinicalReview.id == InpatientPrescription.clinical_review_id
+    ).filter(
+        InpatientClinicalReview.ward_admission_id.in_(admission_ids),
+        InpatientPrescription.dispensed_by.isnot(None)
+    ).all():
+        prescriptions[ward_admission_id].append(("inpatient", prescription))
+    for prescription in db.query(Prescription).filter(
+        Prescription.encounter_id.in_(list(admission_of_encounter)),
+        Prescription.dispensed_by.isnot(None)
+    ).all():
+        prescriptions[admission_of_encounter[prescription.encounter_id]].append(("opd", prescription))
+
+    # The day's administrations, grouped per prescription in time order
+    given: Dict[tuple, List[TreatmentSheetAdministration]] = {}
+    for administration in db.query(TreatmentSheetAdministration).filter(
+        TreatmentSheetAdministration.ward_admission_id.in_(admission_ids),
+        TreatmentSheetAdministration.administration_date == round_date
+    ).order_by(TreatmentSheetAdministration.administration_time, TreatmentSheetAdministration.id).all():
+        key = (administration.ward_admission_id, administration.prescription_type or "inpatient", administration.prescription_id)
+        given.setdefault(key, []).append(administration)
+    names = user_names(db, (a.given_by for records in given.values() for a in records))
+
+    def administration_entry(administration: TreatmentSheetAdministration) -> dict:
+        return {
+            "administration_id": administration.id,
+            "administration_time": administration.administration_time.strftime("%H:%M"),
+            "given_by": administration.given_by,
+            "given_by_name": names.get(administration.given_by),
+            "signature": administration.signature,
+            "notes": administration.notes,
+        }
+
+    summary = {"given": 0, "due": 0, "overdue": 0, "upcoming": 0, "as_needed_given": 0}
+    patients = []
+    for admission, patient, bed_number in admissions:
+        medications = []
+        for prescription_type, prescription in prescriptions[admission.id]:
+            prescribed_at = (prescription.created_at or utcnow()) + utc_offset
+            schedule = dose_schedule(
+                prescription.frequency, prescription.frequency_value, prescription.duration,
+                prescribed_at.replace(microsecond=0)
+            )
+            records = given.get((admission.id, prescription_type, prescription.id), [])
+            slots = schedule.times_on(round_date)
+            if not slots and not records:
+                continue
+
+            # Administrations fill the day's slots in time order, as on the treatment sheet
+            doses = []
+            for index, slot in enumerate(slots):
+                record = records[index] if index < len(records) else None
+                status = "given" if record else _dose_status(datetime.combine(round_date, slot), current)
+                if _in_shift(slot, shift):
+                    summary[status] += 1
+                    doses.append({
+                        "scheduled_time": slot.strftime("%H:%M"),
+                        "status": status,
+                        "administration": administration_entry(record) if record else None,
+                    })
+            extra = [administration_entry(record) for record in records[len(slots):]]
+            if schedule.as_needed:
+                summary["as_needed_given"] += len(extra)
+            if not doses and not extra:
+                continue
+
+            medications.append({
+                "prescription_id": prescription.id,
+                "prescription_type": prescription_type,
+                "medicine_code": prescription.medicine_code,
+                "medicine_name": prescription.medicine_name,
+                "dose": prescription.dose,
+                "unit": prescription.unit,
+                "frequency": prescription.frequency,
+                "duration": prescription.duration,
+                "instructions": prescription.instructions,
+                "as_needed": schedule.as_needed,
+                "course_day": (round_date - schedule.start_date).days + 1,
+                "course_days": schedule.days,
+                "doses": doses,
+                "additional_administrations": extra,  # PRN doses and doses beyond the schedule
+            })
+
+        if medications:
+            patients.append({
+                "ward_admission_id": admission.id,
+                "encounter_id": admission.encounter_id,
+                "bed_number": bed_number,
+                "patient_name": patient_display_name(patient),
+                "patient_card_number": patient.card_number,
+                "medications": medications,
+            })
+
+    return {
+        "ward": ward,
+        "date": round_date.isoformat(),
+        "shift": shift,
+        "generated_at": current,
+        "summary": summary,
+        "patients": patients,
+    }
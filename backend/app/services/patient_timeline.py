@@ -0,0 +1,297 @@
+"""
+Patient timeline service
+Merges a patient's clinical events - OPD encounters, vitals, diagnoses,
+prescriptions, investigations and doctor notes, and IPD admissions, transfers,
+clinical reviews, vitals, diagnoses, prescriptions, investigations and
+discharges - into one stream, newest first.
+
+The number of queries is fixed however long the patient's history is:
+- encounters, ward admissions and clinical reviews (one query each) give the
+  id lists every other source is filtered on with IN
+- each remaining source is one query, cut at the cursor and limited to one
+  page, so a page never loads more than page size + 1 rows per source
+- user names are resolved with one IN query
+
+Pages are keyset paginated on (at, type, id): the cursor is the position of the
+last event returned.
+"""
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.models.diagnosis import Diagnosis
+from app.models.doctor_note_entry import DoctorNoteEntry
+from app.models.encounter import Encounter
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.inpatient_diagnosis import InpatientDiagnosis
+from app.models.inpatient_investigation import InpatientInvestigation
+from app.models.inpatient_prescription import InpatientPrescription
+from app.models.inpatient_vital import InpatientVital
+from app.models.investigation import Investigation
+from app.models.prescription import Prescription
+from app.models.vital import Vital
+from app.models.ward_admission import WardAdmission
+from app.models.ward_transfer import WardTransfer
+from app.services.investigation_worklist import user_names
+
+
+@dataclass
+class _QuerySource:
+    """An event type read from its own table, filtered by a parent id list"""
+    event_type: str
+    source: str  # opd / ipd
+    model: type
+    time_column: str
+    parent: str  # encounter / admission / review - which id list parent_column is matched against
+    parent_column: str
+    actor_column: str
+    describe: Callable
+    extra_filters: Callable = None
+
+
+def _prescription_details(p) -> dict:
+    return {
+        "medicine_code": p.medicine_code, "medicine_name": p.medicine_name, "dose": p.dose, "unit": p.unit,
+        "frequency": p.frequency, "duration": p.duration, "quantity": p.quantity,
+        "is_external": bool(p.is_external), "confirmed": p.confirmed_by is not None,
+        "dispensed": p.dispensed_by is not None,
+    }
+
+
+def _diagnosis_details(d) -> dict:
+    return {
+        "icd10": d.icd10, "diagnosis": d.diagnosis, "gdrg_code": d.gdrg_code,
+        "diagnosis_status": d.diagnosis_status, "is_provisional": bool(d.is_provisional), "is_chief": bool(d.is_chief),
+    }
+
+
+def _investigation_details(i) -> dict:
+    return {
+        "investigation_type": i.investigation_type, "gdrg_code": i.gdrg_code,
+        "procedure_name": i.procedure_name, "status": i.status,
+    }
+
+
+_QUERY_SOURCES = [
+    _QuerySource("vitals", "opd", Vital, "recorded_at", "encounter", "encounter_id", "recorded_by",
+                 lambda v: ("Vitals recorded", {
+                     "bp": v.bp, "temperature": v.temperature, "pulse": v.pulse, "respiration": v.respiration,
+                     "weight": v.weight, "spo2": v.spo2, "rbs": v.rbs, "fbs": v.fbs,
+                 })),
+    _QuerySource("diagnosis", "opd", Diagnosis, "created_at", "encounter", "encounter_id", "created_by",
+                 lambda d: (d.diagnosis, _diagnosis_details(d))),
+    _QuerySource("prescription", "opd", Prescription, "created_at", "encounter", "encounter_id", "prescribed_by",
+                 lambda p: (p.medicine_name, _prescription_details(p))),
+    _QuerySource("investigation", "opd", Investigation, "created_at", "encounter", "encounter_id", "requested_by",
+                 lambda i: (i.procedure_name or i.gdrg_code, _investigation_details(i))),
+    _QuerySource("doctor_note", "opd", DoctorNoteEntry, "created_at", "encounter", "encounter_id", "created_by",
+                 lambda n: ("Doctor's note", {"notes": n.notes})),
+    _QuerySource("ward_transfer", "ipd", WardTransfer, "accepted_at", "admission", "ward_admission_id", "accepted_by",
+                 lambda t: (f"Transferred from {t.from_ward} to {t.to_ward}", {
+                     "from_ward": t.from_ward, "to_ward": t.to_ward, "transfer_reason": t.transfer_reason,
+                 }),
+                 lambda: [WardTransfer.status == "accepted"]),
+    _QuerySource("inpatient_vitals", "ipd", InpatientVital, "recorded_at", "admission", "ward_admission_id", "recorded_by",
+                 lambda v: ("Ward vitals recorded", {
+                     "temperature": v.temperature, "blood_pressure_systolic": v.blood_pressure_systolic,
+                     "blood_pressure_diastolic": v.blood_pressure_diastolic, "pulse": v.pulse,
+                     "respiratory_rate": v.respiratory_rate, "oxygen_saturation": v.oxygen_saturation, "notes": v.notes,
+                 })),
+    _QuerySource("inpatient_diagnosis", "ipd", InpatientDiagnosis, "created_at", "review", "clinical_review_id", "created_by",
+                 lambda d: (d.diagnosis, _diagnosis_details(d))),
+    _QuerySource("inpatient_prescription", "ipd", InpatientPrescription, "created_at", "review", "clinical_review_id", "prescribed_by",
+                 lambda p: (p.medicine_name, _prescription_details(p))),
+    _QuerySource("inpatient_investigation", "ipd", InpatientInvestigation, "created_at", "review", "clinical_review_id", "requested_by",
+                 lambda i: (i.procedure_name or i.gdrg_code, _investigation_details(i))),
+]
+
+# Events built from the encounter / admission / review rows loaded for the id lists
+_LOADED_TYPES = ["encounter", "ward_admission", "ward_discharge", "clinical_review"]
+
+TIMELINE_EVENT_TYPES = _LOADED_TYPES + [source.event_type for source in _QUERY_SOURCES]
+
+
+def encode_cursor(at: datetime, event_type: str, event_id: int) -> str:
+    """Opaque cursor for the position of an event"""
+    raw = f"{at.isoformat()}|{event_type}|{event_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Raises:
+        ValueError: if the cursor was not produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        at, event_type, event_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 2)
+        return datetime.fromisoformat(at), event_type, int(event_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_event_types(types: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated types= filter.
+
+    Raises:
+        ValueError: on an unknown event type
+    """
+    if not types or not types.strip():
+        return None
+    requested = [name.strip() for name in types.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in TIMELINE_EVENT_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown timeline event type(s): {', '.join(unknown)}")
+    return requested
+
+
+def _before_cursor(time_column, id_column, event_type: str, cursor: tuple):
+    """SQL filter for rows of one event type that sort after the cursor (newest first)"""
+    at, cursor_type, cursor_id = cursor
+    if event_type < cursor_type:
+        return time_column <= at
+    if event_type > cursor_type:
+        return time_column < at
+    return or_(time_column < at, and_(time_column == at, id_column < cursor_id))
+
+
+def _sort_key(event: dict) -> tuple:
+    return (event["at"], event["type"], event["id"])
+
+
+def get_patient_timeline(
+    db: Session,
+    patient_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    event_types: Optional[List[str]] = None,
+    source: Optional[str] = None
+) -> dict:
+    """
+    One page of a patient's timeline, newest event first.
+
+    Args:
+        event_types: only these event types (see TIMELINE_EVENT_TYPES)
+        source: "opd" or "ipd" to restrict to one side
+
+    Returns:
+        {"items": [...], "next_cursor": str or None}
+
+    Raises:
+        ValueError: on a malformed cursor
+    """
+    position = decode_cursor(cursor) if cursor else None
+    wanted = set(event_types) if event_types else set(TIMELINE_EVENT_TYPES)
+
+    encounters = db.query(Encounter).filter(
+        Encounter.patient_id == patient_id,
+        Encounter.archived == False
+    ).all()
+    encounter_ids = [encounter.id for encounter in encounters]
+    admissions = db.query(WardAdmission).filter(
+        WardAdmission.encounter_id.in_(encounter_ids)
+    ).all() if encounter_ids else []
+    admission_ids = [admission.id for admission in admissions]
+    reviews = db.query(InpatientClinicalReview).filter(
+        InpatientClinicalReview.ward_admission_id.in_(admission_ids)
+    ).all() if admission_ids else []
+
+    encounters_by_id = {encounter.id: encounter for encounter in encounters}
+    admissions_by_id = {admission.id: admission for admission in admissions}
+    admission_of_review = {review.id: review.ward_admission_id for review in reviews}
+    parent_ids = {
+        "encounter": encounter_ids,
+        "admission": admission_ids,
+        "review": [review.id for review in reviews],
+    }
+
+    events: List[dict] = []
+
+    def add(event_type, event_source, event_id, at, actor_id, title, details, encounter_id=None, ward_admission_id=None):
+        if at is None:
+            return
+        if ward_admission_id is not None and encounter_id is None:
+            encounter_id = admissions_by_id[ward_admission_id].encounter_id
+        events.append({
+            "type": event_type,
+            "source": event_source,
+            "id": event_id,
+            "at": at,
+            "encounter_id": encounter_id,
+            "ward_admission_id": ward_admission_id,
+            "actor_id": actor_id,
+            "title": title,
+            "details": details,
+        })
+
+    # Events that come from rows already loaded for the id lists
+    if source in (None, "opd") and "encounter" in wanted:
+        for encounter in encounters:
+            add("encounter", "opd", encounter.id, encounter.created_at, encounter.created_by,
+                f"{encounter.department} encounter", {
+                    "department": encounter.department, "status": encounter.status,
+                    "ccc_number": encounter.ccc_number,
+                }, encounter_id=encounter.id)
+    if source in (None, "ipd"):
+        for admission in admissions:
+            if "ward_admission" in wanted:
+                add("ward_admission", "ipd", admission.id, admission.admitted_at, admission.admitted_by,
+                    f"Admitted to {admission.ward}", {"ward": admission.ward, "bed_id": admission.bed_id},
+                    ward_admission_id=admission.id)
+            if "ward_discharge" in wanted:
+                add("ward_discharge", "ipd", admission.id, admission.discharged_at, admission.discharged_by,
+                    f"Discharged from {admission.ward}", {
+                        "ward": admission.ward, "discharge_outcome": admission.discharge_outcome,
+                        "discharge_condition": admission.discharge_condition,
+                    }, ward_admission_id=admission.id)
+        if "clinical_review" in wanted:
+            for review in reviews:
+                add("clinical_review", "ipd", review.id, review.reviewed_at, review.reviewed_by,
+                    "Clinical review", {"review_notes": review.review_notes},
+                    ward_admission_id=review.ward_admission_id)
+    if position is not None:
+        events = [event for event in events if _sort_key(event) < position]
+
+    # One query per remaining source, cut at the cursor and limited to one page
+    for spec in _QUERY_SOURCES:
+        ids = parent_ids[spec.parent]
+        if spec.event_type not in wanted or (source and spec.source != source) or not ids:
+            continue
+        time_column = getattr(spec.model, spec.time_column)
+        query = db.query(spec.model).filter(
+            getattr(spec.model, spec.parent_column).in_(ids),
+            time_column.isnot(None)
+        )
+        if spec.extra_filters:
+            query = query.filter(*spec.extra_filters())
+        if position is not None:
+            query = query.filter(_before_cursor(time_column, spec.model.id, spec.event_type, position))
+        rows = query.order_by(time_column.desc(), spec.model.id.desc()).limit(limit + 1).all()
+        for row in rows:
+            title, details = spec.describe(row)
+            parent_id = getattr(row, spec.parent_column)
+            if spec.parent == "encounter":
+                location = {"encounter_id": parent_id}
+            elif spec.parent == "admission":
+                location = {"ward_admission_id": parent_id}
+            else:
+                location = {"ward_admission_id": admission_of_review[parent_id]}
+            add(spec.event_type, spec.source, row.id, getattr(row, spec.time_column),
+                getattr(row, spec.actor_column), title, details, **location)
+
+    events.sort(key=_sort_key, reverse=True)
+    page = events[:limit]
+    names = user_names(db, (event["actor_id"] for event in page))
+    for event in page:
+        event["actor_name"] = names.get(event["actor_id"])
+        encounter = encounters_by_id.get(event["encounter_id"])
+        event["encounter_department"] = encounter.department if encounter else None
+
+    next_cursor = None
+    if len(events) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last["at"], last["type"], last["id"])
+    return {"items": page, "next_cursor": next_cursor}
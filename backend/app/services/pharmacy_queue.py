@@ -0,0 +1,301 @@
+"""
+Pharmacy dispensing queue service
+Hospital-wide queue of inpatient prescriptions for the pharmacy:
+- the clinical review -> ward admission -> encounter -> patient chain is joined
+  and eager-loaded in the same query as the prescriptions
+- prescriber / confirmer / dispenser names come from one batched IN query
+- pages are keyset (cursor) paginated on (created_at, id), oldest first, so a
+  page costs the same however deep into the queue it is
+
+Bulk confirm loads every requested prescription with its chain in one query,
+prices all lines with one get_prices_batch call and adds them to the
+encounters' open IPD bills.
+"""
+import base64
+import random
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, contains_eager
+from app.core.datetime_utils import utcnow
+from app.models.bill import Bill, BillItem
+from app.models.encounter import Encounter
+from app.models.inpatient_clinical_review import InpatientClinicalReview
+from app.models.inpatient_prescription import InpatientPrescription
+from app.models.patient import Patient
+from app.models.ward_admission import WardAdmission
+from app.services.investigation_worklist import patient_display_name, user_names
+from app.services.price_list_service_v2 import get_prices_batch
+
+QUEUE_STATUSES = ["pending", "confirmed", "dispensed", "external"]
+
+
+def encode_cursor(created_at: datetime, prescription_id: int) -> str:
+    """Opaque cursor for the position after (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{prescription_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Raises:
+        ValueError: if the cursor was not produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, prescription_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(prescription_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def prescription_status(prescription: InpatientPrescription) -> str:
+    """pending / confirmed / dispensed / external"""
+    if prescription.is_external:
+        return "external"
+    if prescription.dispensed_by is not None:
+        return "dispensed"
+    if prescription.confirmed_by is not None:
+        return "confirmed"
+    return "pending"
+
+
+def _status_filter(status: str):
+    internal = or_(InpatientPrescription.is_external.is_(None), InpatientPrescription.is_external == 0)
+    if status == "pending":
+        return and_(internal, InpatientPrescription.confirmed_by.is_(None))
+    if status == "confirmed":
+        return and_(internal, InpatientPrescription.confirmed_by.isnot(None), InpatientPrescription.dispensed_by.is_(None))
+    if status == "dispensed":
+        return and_(internal, InpatientPrescription.dispensed_by.isnot(None))
+    if status == "external":
+        return InpatientPrescription.is_external == 1
+    raise ValueError(f"Invalid status: {status}. Must be one of: {', '.join(QUEUE_STATUSES)}")
+
+
+def prescriptions_with_chain(db: Session):
+    """InpatientPrescription query with review, admission, encounter and patient joined and eager-loaded"""
+    return db.query(InpatientPrescription).join(
+        InpatientClinicalReview, InpatientClinicalReview.id == InpatientPrescription.clinical_review_id
+    ).join(
+        WardAdmission, WardAdmission.id == InpatientClinicalReview.ward_admission_id
+    ).join(
+        Encounter, Encounter.id == WardAdmission.encounter_id
+    ).join(
+        Patient, Patient.id == Encounter.patient_id
+    ).options(
+        contains_eager(InpatientPrescription.clinical_review)
+        .contains_eager(InpatientClinicalReview.ward_admission)
+        .contains_eager(WardAdmission.encounter)
+        .contains_eager(Encounter.patient)
+    )
+
+
+def get_dispensing_queue(
+    db: Session,
+    status: Optional[str] = "pending",
+    ward: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> dict:
+    """
+    One page of the dispensing queue, oldest prescription first.
+
+    Returns:
+        {"items": [...], "next_cursor": str or None} - pass next_cursor back
+        as cursor for the following page; None means the queue is exhausted
+
+    Raises:
+        ValueError: on an unknown status or a malformed cursor
+    """
+    query = prescriptions_with_chain(db)
+    if status:
+        query = query.filter(_status_filter(status))
+    if ward:
+        query = query.filter(WardAdmission.ward == ward)
+    if search and search.strip():
+        search_term = f"%{search.strip()}%"
+        query = query.filter(or_(
+            Patient.card_number.ilike(search_term),
+            Patient.name.ilike(search_term),
+            Patient.surname.ilike(search_term),
+            InpatientPrescription.medicine_name.ilike(search_term)
+        ))
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            InpatientPrescription.created_at > after_created_at,
+            and_(InpatientPrescription.created_at == after_created_at, InpatientPrescription.id > after_id)
+        ))
+
+    # One extra row tells whether another page exists
+    prescriptions = query.order_by(
+        InpatientPrescription.created_at, InpatientPrescription.id
+    ).limit(limit + 1).all()
+    has_more = len(prescriptions) > limit
+    prescriptions = prescriptions[:limit]
+
+    names = user_names(db, (
+        user_id
+        for p in prescriptions
+        for user_id in (p.prescribed_by, p.confirmed_by, p.dispensed_by)
+    ))
+
+    items = []
+    for p in prescriptions:
+        ward_admission = p.clinical_review.ward_admission
+        encounter = ward_admission.encounter
+        patient = encounter.patient
+        items.append({
+            "id": p.id,
+            "clinical_review_id": p.clinical_review_id,
+            "ward_admission_id": ward_admission.id,
+            "encounter_id": ward_admission.encounter_id,
+            "ward": ward_admission.ward,
+            "bed_id": ward_admission.bed_id,
+            "patient_name": patient_display_name(patient),
+            "patient_card_number": patient.card_number,
+            "is_insured": bool(encounter.ccc_number and encounter.ccc_number.strip()),
+            "medicine_code": p.medicine_code,
+            "medicine_name": p.medicine_name,
+            "dose": p.dose,
+            "unit": p.unit,
+            "frequency": p.frequency,
+            "frequency_value": p.frequency_value,
+            "duration": p.duration,
+            "instructions": p.instructions,
+            "quantity": p.quantity,
+            "status": prescription_status(p),
+            "prescribed_by": p.prescribed_by,
+            "prescriber_name": names.get(p.prescribed_by, "Unknown"),
+            "confirmed_by": p.confirmed_by,
+            "confirmer_name": names.get(p.confirmed_by, "Unknown") if p.confirmed_by else None,
+            "confirmed_at": p.confirmed_at,
+            "dispensed_by": p.dispensed_by,
+            "dispenser_name": names.get(p.dispensed_by, "Unknown") if p.dispensed_by else None,
+            "service_date": p.service_date,
+            "created_at": p.created_at,
+        })
+
+    next_cursor = None
+    if has_more and prescriptions:
+        last = prescriptions[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def bulk_confirm_prescriptions(
+    db: Session,
+    prescription_ids: List[int],
+    confirmed_by: int,
+    add_to_ipd_bill: bool = True
+) -> dict:
+    """
+    Confirm many inpatient prescriptions and add them to the IPD bills in one pass:
+    one query for the prescriptions and their chain, one batched price lookup,
+    one query for open bills and one for their existing prescription items.
+    Prescriptions that cannot be confirmed are reported in errors. Caller commits.
+
+    Returns:
+        {"confirmed_ids": [...], "errors": [...], "billed_amount": float}
+    """
+    requested_ids = list(dict.fromkeys(prescription_ids))
+    prescriptions = {
+        p.id: p for p in prescriptions_with_chain(db).filter(InpatientPrescription.id.in_(requested_ids)).all()
+    }
+
+    errors = []
+    to_confirm: List[InpatientPrescription] = []
+    for prescription_id in requested_ids:
+        prescription = prescriptions.get(prescription_id)
+        if prescription is None:
+            errors.append(f"Inpatient prescription {prescription_id} not found")
+        elif prescription.is_external:
+            errors.append(f"Prescription {prescription_id} is external and is not confirmed by pharmacy")
+        elif prescription.confirmed_by is not None:
+            errors.append(f"Prescription {prescription_id} has already been confirmed")
+        else:
+            to_confirm.append(prescription)
+
+    if not to_confirm:
+        return {"confirmed_ids": [], "errors": errors, "billed_amount": 0.0}
+
+    def encounter_of(prescription: InpatientPrescription) -> Encounter:
+        return prescription.clinical_review.ward_admission.encounter
+
+    def is_insured(encounter: Encounter) -> bool:
+        return encounter.ccc_number is not None and encounter.ccc_number.strip() != ""
+
+    prices = get_prices_batch(db, [
+        (p.medicine_code, None, None, is_insured(encounter_of(p))) for p in to_confirm
+    ])
+
+    confirmed_at = utcnow()
+    for prescription in to_confirm:
+        prescription.confirmed_by = confirmed_by
+        prescription.confirmed_at = confirmed_at
+        if not prescription.quantity or prescription.quantity <= 0:
+            prescription.quantity = 1
+
+    billed_amount = 0.0
+    if add_to_ipd_bill:
+        encounter_ids = {encounter_of(p).id for p in to_confirm}
+        open_bills: Dict[int, Bill] = {}
+        for bill in db.query(Bill).filter(
+            Bill.encounter_id.in_(encounter_ids),
+            Bill.is_paid == False  # Only use unpaid bills
+        ).order_by(Bill.id).all():
+            open_bills.setdefault(bill.encounter_id, bill)
+
+        # Existing prescription items on those bills, to avoid billing a line twice
+        billed_names: Dict[tuple, List[str]] = {}
+        if open_bills:
+            for bill_id, item_code, item_name in db.query(
+                BillItem.bill_id, BillItem.item_code, BillItem.item_name
+            ).filter(
+                BillItem.bill_id.in_([bill.id for bill in open_bills.values()]),
+                BillItem.item_code.in_({p.medicine_code for p in to_confirm})
+            ).all():
+                billed_names.setdefault((bill_id, item_code), []).append((item_name or "").lower())
+
+        for prescription, unit_price in zip(to_confirm, prices):
+            total_price = unit_price * prescription.quantity
+            if total_price <= 0:
+                continue
+            encounter = encounter_of(prescription)
+            bill = open_bills.get(encounter.id)
+            if bill is None:
+                bill = Bill(
+                    encounter_id=encounter.id,
+                    bill_number=f"BILL-{random.randint(100000, 999999)}",
+                    is_insured=is_insured(encounter),
+                    total_amount=0.0,
+                    created_by=confirmed_by
+                )
+                db.add(bill)
+                db.flush()
+                open_bills[encounter.id] = bill
+            else:
+                already_billed = billed_names.get((bill.id, prescription.medicine_code), [])
+                if any(prescription.medicine_name.lower() in name for name in already_billed):
+                    continue
+
+            item_name = f"Prescription: {prescription.medicine_name}"
+            db.add(BillItem(
+                bill_id=bill.id,
+                item_code=prescription.medicine_code,
+                item_name=item_name,
+                category="product",
+                quantity=prescription.quantity,
+                unit_price=unit_price,
+                total_price=total_price
+            ))
+            billed_names.setdefault((bill.id, prescription.medicine_code), []).append(item_name.lower())
+            billed_amount += total_price
+
+    return {
+        "confirmed_ids": [p.id for p in to_confirm],
+        "errors": errors,
+        "billed_amount": billed_amount,
+    }
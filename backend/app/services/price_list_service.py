@@ -1,7 +1,6 @@
 """
 Price list service for uploading and managing prices
 """
-import pandas as pd
 from sqlalchemy.orm import Session
 from fastapi import UploadFile
 from app.models.price_list import PriceListItem
@@ -15,6 +14,7 @@ def parse_excel_price_list(file: UploadFile, category: str) -> List[dict]:
     1. New format: G-DRG Code, Service Type, Service ID, Service Name, Base Rate, NHIA App, NHIA Claim Co-Payment
     2. Old format: item_code, item_name, category, insured_price, cash_price
     """
+    import pandas as pd
     # Read Excel file (skip header row if needed, pandas will auto-detect)
     df = pd.read_excel(file.file)
     
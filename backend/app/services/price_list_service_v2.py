@@ -2,16 +2,20 @@
 New Price list service for separate table structure
 Handles different Excel file types with all columns preserved
 """
-import pandas as pd
+import logging
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from fastapi import UploadFile
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional
 from app.models.procedure_price import ProcedurePrice
 from app.models.surgery_price import SurgeryPrice
 from app.models.product_price import ProductPrice
 from app.models.unmapped_drg_price import UnmappedDRGPrice
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
 
 def extract_medication_code_from_product_name(product_name: str) -> tuple:
     """
@@ -55,12 +59,13 @@ def extract_medication_code_from_product_name(product_name: str) -> tuple:
     return None, product_name
 
 
-def parse_product_excel(df: pd.DataFrame, original_columns: List[str]) -> List[Dict]:
+def parse_product_excel(df: "pd.DataFrame", original_columns: List[str]) -> List[Dict]:
     """
     Parse product/medication Excel file with product-specific columns
     Columns: Sr.No., Sub Categ (twice), Product ID, Product N, Formulati,
     Strength, Base Rate, NHIA App, Claim Am, NHIA Clain, Bill Effecti
     """
+    import pandas as pd
     items = []
     
     # Map product-specific columns
@@ -152,12 +157,10 @@ def parse_product_excel(df: pd.DataFrame, original_columns: List[str]) -> List[D
     if not product_name_col:
         raise ValueError("Missing required column: Product N (Product Name)")
     
-    # Debug: Print detected columns
-    print(f"DEBUG: Detected columns for product price list:")
-    print(f"  - Product Name: {product_name_col}")
-    print(f"  - Insurance Covered: {insurance_covered_col}")
-    print(f"  - Base Rate: {base_rate_col}")
-    print(f"  - All columns: {list(df.columns)}")
+    logger.debug(
+        "Product price list columns: product name %s, insurance covered %s, base rate %s (all: %s)",
+        product_name_col, insurance_covered_col, base_rate_col, list(df.columns),
+    )
     
     # Process rows
     for idx, row in df.iterrows():
@@ -178,7 +181,7 @@ def parse_product_excel(df: pd.DataFrame, original_columns: List[str]) -> List[D
                 medication_code = str(row[product_id_col]).strip()
             else:
                 # Skip rows without medication code
-                print(f"Warning: Could not extract medication code from: {product_name_raw}")
+                logger.warning("Could not extract medication code from: %s", product_name_raw)
                 continue
         
         # Build item dictionary
@@ -286,18 +289,18 @@ def parse_product_excel(df: pd.DataFrame, original_columns: List[str]) -> List[D
                 # Check for "no" variations (case-insensitive) - be explicit
                 if insurance_val_lower in ['no', 'n', 'false', '0', 'f']:
                     item['insurance_covered'] = 'no'
-                    print(f"DEBUG: Row {idx+1}: Set insurance_covered='no' from value '{insurance_val}'")
+                    logger.debug("Row %s: Set insurance_covered='no' from value '%s'", idx+1, insurance_val)
                 elif insurance_val_lower in ['yes', 'y', 'true', '1', 't']:
                     item['insurance_covered'] = 'yes'
-                    print(f"DEBUG: Row {idx+1}: Set insurance_covered='yes' from value '{insurance_val}'")
+                    logger.debug("Row %s: Set insurance_covered='yes' from value '%s'", idx+1, insurance_val)
                 else:
                     # If value exists but is not recognized, default to "yes" for backward compatibility
-                    print(f"Warning: Row {idx+1}: Unrecognized insurance_covered value '{insurance_val}' for product {item.get('medication_code', 'N/A')}, defaulting to 'yes'")
+                    logger.warning("Row %s: Unrecognized insurance_covered value '%s' for product %s, defaulting to 'yes'", idx+1, insurance_val, item.get('medication_code', 'N/A'))
                     item['insurance_covered'] = 'yes'
         else:
             # If column doesn't exist, default to "yes"
             if idx < 3:  # Only print for first few rows
-                print(f"DEBUG: Row {idx+1}: Insurance Covered column not found, defaulting to 'yes'")
+                logger.debug("Row %s: Insurance Covered column not found, defaulting to 'yes'", idx+1)
             item['insurance_covered'] = 'yes'  # Default to "yes" if column not found
         
         items.append(item)
@@ -322,6 +325,7 @@ def parse_excel_price_list_complete(file: UploadFile, file_type: str) -> List[Di
     Strength, Base Rate, NHIA App, Claim Am, NHIA Clain, Bill Effecti
     """
     import io
+    import pandas as pd
     # Read file content into BytesIO to avoid seekable() issues with SpooledTemporaryFile
     # The file.file is a SpooledTemporaryFile which may not have seekable() in some Python versions
     file_content = file.file.read()
@@ -588,7 +592,7 @@ def upload_product_prices(db: Session, items: List[Dict]):
                 medication_code = item_data.get('g_drg_code')
             
             if not medication_code:
-                print(f"Warning: Skipping item without medication_code. Keys: {list(item_data.keys())}")
+                logger.warning("Skipping item without medication_code. Keys: %s", list(item_data.keys()))
                 continue
             
             # Make sure medication_code is in the item_data for model creation
@@ -648,8 +652,7 @@ def upload_product_prices(db: Session, items: List[Dict]):
                 new_item = ProductPrice(**filtered_data)
                 db.add(new_item)
         except Exception as e:
-            print(f"Error processing product item: {item_data}")
-            print(f"Error: {str(e)}")
+            logger.exception("Error processing product item %s: %s", item_data, e)
             raise
     
     db.commit()
@@ -695,7 +698,7 @@ def get_price_from_all_tables(db: Session, item_code: str, is_insured: bool = Fa
         service_type: Optional service type (department/clinic) to filter by for procedures
         procedure_name: Optional procedure/service name to match exactly (helps when G-DRG codes map to multiple procedures)
     """
-    print(f"DEBUG get_price_from_all_tables: item_code='{item_code}', is_insured={is_insured}, service_type='{service_type}', procedure_name='{procedure_name}'")
+    logger.debug("item_code='%s', is_insured=%s, service_type='%s', procedure_name='%s'", item_code, is_insured, service_type, procedure_name)
     
     # Search in procedure, surgery, and unmapped_drg tables (use g_drg_code)
     # If service_type is provided, filter by it to get the correct price for that department/clinic
@@ -739,27 +742,27 @@ def get_price_from_all_tables(db: Session, item_code: str, is_insured: bool = Fa
     for table_name, query in tables:
         item = query.first()
         if item:
-            print(f"DEBUG: Found item in {table_name} table with service_type='{service_type}'")
+            logger.debug("Found item in %s table with service_type='%s'", table_name, service_type)
             if is_insured:
                 # For insured patients: use Co-Payment (top-up amount)
                 # If Co-Payment is not available, fall back to Base Rate
                 if item.nhia_claim_co_payment is not None:
-                    print(f"DEBUG: Returning co-payment from {table_name}: {item.nhia_claim_co_payment}")
+                    logger.debug("Returning co-payment from %s: %s", table_name, item.nhia_claim_co_payment)
                     return float(item.nhia_claim_co_payment)
                 else:
                     # Fallback to base rate if co-payment not specified
-                    print(f"DEBUG: No co-payment, returning base_rate from {table_name}: {item.base_rate}")
+                    logger.debug("No co-payment, returning base_rate from %s: %s", table_name, item.base_rate)
                     return float(item.base_rate)
             else:
                 # For cash patients: use Base Rate
-                print(f"DEBUG: Returning base_rate from {table_name}: {item.base_rate}")
+                logger.debug("Returning base_rate from %s: %s", table_name, item.base_rate)
                 return float(item.base_rate)
     
     # If service_type or procedure_name was provided but no match found, try fallback strategies
     if service_type or procedure_name:
         # Strategy 1: Try with procedure_name but without service_type filter
         if service_type and procedure_name:
-            print(f"DEBUG: No match found with service_type='{service_type}' and procedure_name='{procedure_name}', trying with procedure_name only")
+            logger.debug("No match found with service_type='%s' and procedure_name='%s', trying with procedure_name only", service_type, procedure_name)
             fallback_tables = [
                 ("ProcedurePrice", db.query(ProcedurePrice).filter(
                     ProcedurePrice.g_drg_code == item_code,
@@ -781,21 +784,21 @@ def get_price_from_all_tables(db: Session, item_code: str, is_insured: bool = Fa
             for table_name, query in fallback_tables:
                 item = query.first()
                 if item:
-                    print(f"DEBUG: Found item in {table_name} table (with procedure_name='{procedure_name}', without service_type filter)")
+                    logger.debug("Found item in %s table (with procedure_name='%s', without service_type filter)", table_name, procedure_name)
                     if is_insured:
                         if item.nhia_claim_co_payment is not None:
-                            print(f"DEBUG: Returning co-payment from {table_name}: {item.nhia_claim_co_payment}")
+                            logger.debug("Returning co-payment from %s: %s", table_name, item.nhia_claim_co_payment)
                             return float(item.nhia_claim_co_payment)
                         else:
-                            print(f"DEBUG: No co-payment, returning base_rate from {table_name}: {item.base_rate}")
+                            logger.debug("No co-payment, returning base_rate from %s: %s", table_name, item.base_rate)
                             return float(item.base_rate)
                     else:
-                        print(f"DEBUG: Returning base_rate from {table_name}: {item.base_rate}")
+                        logger.debug("Returning base_rate from %s: %s", table_name, item.base_rate)
                         return float(item.base_rate)
         
         # Strategy 2: Try with service_type but without procedure_name filter
         if service_type:
-            print(f"DEBUG: No match found with service_type='{service_type}' and procedure_name='{procedure_name}', trying with service_type only")
+            logger.debug("No match found with service_type='%s' and procedure_name='%s', trying with service_type only", service_type, procedure_name)
             fallback_tables = [
                 ("ProcedurePrice", db.query(ProcedurePrice).filter(
                     ProcedurePrice.g_drg_code == item_code,
@@ -817,20 +820,20 @@ def get_price_from_all_tables(db: Session, item_code: str, is_insured: bool = Fa
             for table_name, query in fallback_tables:
                 item = query.first()
                 if item:
-                    print(f"DEBUG: Found item in {table_name} table (with service_type='{service_type}', without procedure_name filter)")
+                    logger.debug("Found item in %s table (with service_type='%s', without procedure_name filter)", table_name, service_type)
                     if is_insured:
                         if item.nhia_claim_co_payment is not None:
-                            print(f"DEBUG: Returning co-payment from {table_name}: {item.nhia_claim_co_payment}")
+                            logger.debug("Returning co-payment from %s: %s", table_name, item.nhia_claim_co_payment)
                             return float(item.nhia_claim_co_payment)
                         else:
-                            print(f"DEBUG: No co-payment, returning base_rate from {table_name}: {item.base_rate}")
+                            logger.debug("No co-payment, returning base_rate from %s: %s", table_name, item.base_rate)
                             return float(item.base_rate)
                     else:
-                        print(f"DEBUG: Returning base_rate from {table_name}: {item.base_rate}")
+                        logger.debug("Returning base_rate from %s: %s", table_name, item.base_rate)
                         return float(item.base_rate)
         
         # Strategy 3: Try without any filters (just G-DRG code)
-        print(f"DEBUG: No match found with filters, trying without any filters (G-DRG code only)")
+        logger.debug("No match found with filters, trying without any filters (G-DRG code only)")
         fallback_tables = [
             ("ProcedurePrice", db.query(ProcedurePrice).filter(ProcedurePrice.g_drg_code == item_code, ProcedurePrice.is_active == True)),
             ("SurgeryPrice", db.query(SurgeryPrice).filter(SurgeryPrice.g_drg_code == item_code, SurgeryPrice.is_active == True)),
@@ -840,19 +843,19 @@ def get_price_from_all_tables(db: Session, item_code: str, is_insured: bool = Fa
         for table_name, query in fallback_tables:
             item = query.first()
             if item:
-                print(f"DEBUG: Found item in {table_name} table (G-DRG code only, no filters)")
+                logger.debug("Found item in %s table (G-DRG code only, no filters)", table_name)
                 if is_insured:
                     if item.nhia_claim_co_payment is not None:
-                        print(f"DEBUG: Returning co-payment from {table_name}: {item.nhia_claim_co_payment}")
+                        logger.debug("Returning co-payment from %s: %s", table_name, item.nhia_claim_co_payment)
                         return float(item.nhia_claim_co_payment)
                     else:
-                        print(f"DEBUG: No co-payment, returning base_rate from {table_name}: {item.base_rate}")
+                        logger.debug("No co-payment, returning base_rate from %s: %s", table_name, item.base_rate)
                         return float(item.base_rate)
                 else:
-                    print(f"DEBUG: Returning base_rate from {table_name}: {item.base_rate}")
+                    logger.debug("Returning base_rate from %s: %s", table_name, item.base_rate)
                     return float(item.base_rate)
     
-    print(f"DEBUG: Item not found in procedure/surgery/unmapped_drg tables, checking ProductPrice table")
+    logger.debug("Item not found in procedure/surgery/unmapped_drg tables, checking ProductPrice table")
     
     # Search in product table (uses medication_code)
     product = db.query(ProductPrice).filter(
@@ -861,7 +864,7 @@ def get_price_from_all_tables(db: Session, item_code: str, is_insured: bool = Fa
     ).first()
     
     if not product:
-        print(f"Product NOT FOUND - Code: {item_code}")
+        logger.debug("Product NOT FOUND - Code: %s", item_code)
         return 0.0
     
     # Check if product is covered by insurance
@@ -875,15 +878,15 @@ def get_price_from_all_tables(db: Session, item_code: str, is_insured: bool = Fa
             insurance_covered_str = None
     
     # Debug logging
-    print(f"Product pricing - Code: {item_code}, Insurance Covered: '{insurance_covered_str}' (raw: '{insurance_covered}', type: {type(insurance_covered)}), Is Insured: {is_insured}, Base Rate: {product.base_rate}")
+    logger.debug("Product pricing - Code: %s, Insurance Covered: '%s' (raw: '%s', type: %s), Is Insured: %s, Base Rate: %s", item_code, insurance_covered_str, insurance_covered, type(insurance_covered), is_insured, product.base_rate)
     
     # Check if product is NOT covered by insurance (case-insensitive, handles 'no', 'NO', ' No ', etc.)
     if insurance_covered_str == 'no':
         # If product is not covered by insurance, always charge base_rate regardless of patient insurance status
         base_rate_value = float(product.base_rate) if product.base_rate is not None else 0.0
-        print(f"Product NOT covered by insurance - returning base_rate: {base_rate_value}")
+        logger.debug("Product NOT covered by insurance - returning base_rate: %s", base_rate_value)
         if base_rate_value <= 0:
-            print(f"WARNING: base_rate is 0 or None for product {item_code} - this may prevent bill generation")
+            logger.warning("base_rate is 0 or None for product %s - this may prevent bill generation", item_code)
         return base_rate_value
     
     # Product is covered by insurance (or insurance_covered is null/yes)
@@ -891,20 +894,138 @@ def get_price_from_all_tables(db: Session, item_code: str, is_insured: bool = Fa
         # For insured clients: use top-up (nhia_claim_co_payment)
         # If top-up is null, billed amount is 0
         if product.nhia_claim_co_payment is not None:
-            print(f"Insured patient - returning co-payment: {product.nhia_claim_co_payment}")
+            logger.debug("Insured patient - returning co-payment: %s", product.nhia_claim_co_payment)
             return float(product.nhia_claim_co_payment)
         else:
-            print(f"Insured patient - no co-payment, returning 0.0")
+            logger.debug("Insured patient - no co-payment, returning 0.0")
             return 0.0
     else:
         # For non-insured clients: use Base Rate
         base_rate_value = float(product.base_rate) if product.base_rate is not None else 0.0
-        print(f"Cash patient - returning base_rate: {base_rate_value}")
+        logger.debug("Cash patient - returning base_rate: %s", base_rate_value)
         return base_rate_value
     
     return 0.0
 
 
+# Max values per IN (...) list - keeps batch lookups under SQLite's bound-parameter limit
+PRICE_BATCH_CHUNK_SIZE = 500
+
+
+def _normalize_service_name(name: Optional[str]) -> str:
+    """Python equivalent of func.lower(func.trim(...)) used by the per-item lookup"""
+    return (name or "").strip(" ").lower()
+
+
+def _drg_row_price(item, is_insured: bool) -> float:
+    """Price rule for procedure/surgery/unmapped DRG rows (co-payment for insured, else base rate)"""
+    if is_insured and item.nhia_claim_co_payment is not None:
+        return float(item.nhia_claim_co_payment)
+    return float(item.base_rate or 0.0)
+
+
+def _product_row_price(product, is_insured: bool) -> float:
+    """Price rule for product rows - same as the ProductPrice branch of get_price_from_all_tables"""
+    insurance_covered_str = None
+    if product.insurance_covered:
+        insurance_covered_str = str(product.insurance_covered).strip().lower() or None
+    if insurance_covered_str == 'no':
+        return float(product.base_rate) if product.base_rate is not None else 0.0
+    if is_insured:
+        return float(product.nhia_claim_co_payment) if product.nhia_claim_co_payment is not None else 0.0
+    return float(product.base_rate) if product.base_rate is not None else 0.0
+
+
+def _load_rows_by_code(db: Session, model, code_column, codes: List[str]) -> Dict[str, list]:
+    """
+    Load active rows for all codes with one IN-query per chunk, grouped by
+    normalized code in id order. The column is compared as-is (like the per-item
+    lookup's ``code_column == item_code``) so its index is used; only the dict
+    keys are normalized, so rows the collation matches case-insensitively are
+    found under the request's code.
+    """
+    rows_by_code: Dict[str, list] = {}
+    for start in range(0, len(codes), PRICE_BATCH_CHUNK_SIZE):
+        chunk = codes[start:start + PRICE_BATCH_CHUNK_SIZE]
+        rows = db.query(model).filter(
+            code_column.in_(chunk),
+            model.is_active == True
+        ).order_by(model.id).all()
+        for row in rows:
+            rows_by_code.setdefault(_normalize_service_name(getattr(row, code_column.key)), []).append(row)
+    return rows_by_code
+
+
+def get_prices_batch(db: Session, requests: List[tuple]) -> List[float]:
+    """
+    Resolve many prices at once - batch version of get_price_from_all_tables.
+    
+    Loads every candidate row with one IN-query per price table (procedure, surgery,
+    unmapped DRG, product) and then applies the same lookup order and fallback
+    passes in memory, so results match the per-item function.
+    
+    Args:
+        db: Database session
+        requests: List of (item_code, service_type, procedure_name, is_insured) tuples
+    
+    Returns:
+        Prices in the same order as requests (0.0 where no price was found)
+    """
+    codes = sorted({code for code, _, _, _ in requests if code and code.strip()})
+    if not codes:
+        return [0.0 for _ in requests]
+    
+    drg_tables = [
+        _load_rows_by_code(db, ProcedurePrice, ProcedurePrice.g_drg_code, codes),
+        _load_rows_by_code(db, SurgeryPrice, SurgeryPrice.g_drg_code, codes),
+        _load_rows_by_code(db, UnmappedDRGPrice, UnmappedDRGPrice.g_drg_code, codes),
+    ]
+    products = _load_rows_by_code(db, ProductPrice, ProductPrice.medication_code, codes)
+    
+    def _first_match(code: str, service_type: Optional[str], procedure_name: Optional[str]):
+        name_key = _normalize_service_name(procedure_name) if procedure_name else None
+        type_key = _normalize_service_name(service_type) if service_type else None
+        for rows_by_code in drg_tables:
+            for row in rows_by_code.get(code, ()):
+                if type_key is not None and _normalize_service_name(row.service_type) != type_key:
+                    continue
+                if name_key is not None and _normalize_service_name(row.service_name) != name_key:
+                    continue
+                return row
+        return None
+    
+    prices = []
+    for item_code, service_type, procedure_name, is_insured in requests:
+        item_code = _normalize_service_name(item_code)
+        if not item_code:
+            prices.append(0.0)
+            continue
+        
+        # Same pass order as get_price_from_all_tables
+        passes = [(service_type, procedure_name)]
+        if service_type or procedure_name:
+            if service_type and procedure_name:
+                passes.append((None, procedure_name))
+            if service_type:
+                passes.append((service_type, None))
+            passes.append((None, None))
+        
+        row = None
+        for pass_service_type, pass_procedure_name in passes:
+            row = _first_match(item_code, pass_service_type, pass_procedure_name)
+            if row is not None:
+                break
+        
+        if row is not None:
+            prices.append(_drg_row_price(row, is_insured))
+            continue
+        
+        product_rows = products.get(item_code)
+        prices.append(_product_row_price(product_rows[0], is_insured) if product_rows else 0.0)
+    
+    return prices
+
+
 def get_surgery_price(db: Session, g_drg_code: str, is_insured: bool = False, service_type: Optional[str] = None) -> float:
     """
     Get price for a surgery from SurgeryPrice table only (prioritizes surgery prices over procedure/day surgery prices)
@@ -918,7 +1039,7 @@ def get_surgery_price(db: Session, g_drg_code: str, is_insured: bool = False, se
         is_insured: Whether the patient is insured
         service_type: Optional service type (department/clinic) to filter by
     """
-    print(f"DEBUG get_surgery_price: g_drg_code='{g_drg_code}', is_insured={is_insured}, service_type='{service_type}'")
+    logger.debug("g_drg_code='%s', is_insured=%s, service_type='%s'", g_drg_code, is_insured, service_type)
     
     # Search ONLY in SurgeryPrice table (not ProcedurePrice which may contain day surgeries)
     surgery_query = db.query(SurgeryPrice).filter(
@@ -931,44 +1052,44 @@ def get_surgery_price(db: Session, g_drg_code: str, is_insured: bool = False, se
     surgery = surgery_query.first()
     
     if surgery:
-        print(f"DEBUG: Found surgery in SurgeryPrice table with service_type='{service_type}'")
+        logger.debug("Found surgery in SurgeryPrice table with service_type='%s'", service_type)
         if is_insured:
             # For insured patients: use Co-Payment (top-up amount)
             # If Co-Payment is not available, fall back to Base Rate
             if surgery.nhia_claim_co_payment is not None:
-                print(f"DEBUG: Returning co-payment from SurgeryPrice: {surgery.nhia_claim_co_payment}")
+                logger.debug("Returning co-payment from SurgeryPrice: %s", surgery.nhia_claim_co_payment)
                 return float(surgery.nhia_claim_co_payment)
             else:
                 # Fallback to base rate if co-payment not specified
-                print(f"DEBUG: No co-payment, returning base_rate from SurgeryPrice: {surgery.base_rate}")
+                logger.debug("No co-payment, returning base_rate from SurgeryPrice: %s", surgery.base_rate)
                 return float(surgery.base_rate)
         else:
             # For cash patients: use Base Rate
-            print(f"DEBUG: Returning base_rate from SurgeryPrice: {surgery.base_rate}")
+            logger.debug("Returning base_rate from SurgeryPrice: %s", surgery.base_rate)
             return float(surgery.base_rate)
     
     # If service_type was provided but no match found, try without service_type filter as fallback
     if service_type:
-        print(f"DEBUG: No match found with service_type='{service_type}', trying without service_type filter")
+        logger.debug("No match found with service_type='%s', trying without service_type filter", service_type)
         fallback_surgery = db.query(SurgeryPrice).filter(
             SurgeryPrice.g_drg_code == g_drg_code,
             SurgeryPrice.is_active == True
         ).first()
         
         if fallback_surgery:
-            print(f"DEBUG: Found surgery in SurgeryPrice table (without service_type filter)")
+            logger.debug("Found surgery in SurgeryPrice table (without service_type filter)")
             if is_insured:
                 if fallback_surgery.nhia_claim_co_payment is not None:
-                    print(f"DEBUG: Returning co-payment from SurgeryPrice: {fallback_surgery.nhia_claim_co_payment}")
+                    logger.debug("Returning co-payment from SurgeryPrice: %s", fallback_surgery.nhia_claim_co_payment)
                     return float(fallback_surgery.nhia_claim_co_payment)
                 else:
-                    print(f"DEBUG: No co-payment, returning base_rate from SurgeryPrice: {fallback_surgery.base_rate}")
+                    logger.debug("No co-payment, returning base_rate from SurgeryPrice: %s", fallback_surgery.base_rate)
                     return float(fallback_surgery.base_rate)
             else:
-                print(f"DEBUG: Returning base_rate from SurgeryPrice: {fallback_surgery.base_rate}")
+                logger.debug("Returning base_rate from SurgeryPrice: %s", fallback_surgery.base_rate)
                 return float(fallback_surgery.base_rate)
     
-    print(f"DEBUG: Surgery NOT FOUND in SurgeryPrice table - Code: {g_drg_code}")
+    logger.debug("Surgery NOT FOUND in SurgeryPrice table - Code: %s", g_drg_code)
     return 0.0
 
 
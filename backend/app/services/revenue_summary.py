@@ -0,0 +1,329 @@
+"""
+Revenue summary service
+Keeps running daily cashier totals in daily_revenue_summaries so end-of-day
+reconciliation does not have to re-read every bill and receipt.
+
+Billing endpoints call record_receipt_items / record_receipt_refund /
+reverse_receipt_item inside their own transaction (before commit), so the
+summary rows commit or roll back together with the receipt rows.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.bill import Bill, BillItem, Receipt, ReceiptItem
+from app.models.revenue_summary import DailyRevenueSummary
+from app.models.user import User
+
+
+def determine_service_group(item_name: str, category: str, investigation_type: Optional[str] = None) -> str:
+    """Determine service group based on item name, category, and investigation type"""
+    item_name_lower = item_name.lower()
+
+    # Check item name prefixes
+    if item_name_lower.startswith("diagnosis:"):
+        return "Diagnose"
+    elif item_name_lower.startswith("prescription:"):
+        return "Pharmacy"
+    elif item_name_lower.startswith("investigation:"):
+        # Use investigation type if available
+        if investigation_type:
+            if investigation_type.lower() == "lab":
+                return "Lab"
+            elif investigation_type.lower() == "scan":
+                return "Scan"
+            elif investigation_type.lower() == "xray":
+                return "X-ray"
+        # Fallback to checking item name
+        if "lab" in item_name_lower:
+            return "Lab"
+        elif "scan" in item_name_lower:
+            return "Scan"
+        elif "xray" in item_name_lower or "x-ray" in item_name_lower:
+            return "X-ray"
+        return "Investigation"  # Fallback
+    elif category == "surgery":
+        return "Surgery"
+    elif category == "product" or category == "pharmacy":
+        return "Pharmacy"
+    elif category == "drg":
+        return "Diagnose"
+    else:
+        return "Other"
+
+
+def _to_date(value: Optional[datetime]) -> date:
+    """Bucket date for a receipt/refund timestamp (falls back to today for unsaved rows)"""
+    if value is None:
+        return datetime.utcnow().date()
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _get_bucket(
+    db: Session,
+    summary_date: date,
+    cashier_id: int,
+    service_group: str,
+    payment_method: Optional[str]
+) -> DailyRevenueSummary:
+    """Fetch (or create) the summary row for one bucket, locking it for the update"""
+    payment_method = payment_method or "cash"
+    bucket = db.query(DailyRevenueSummary).filter(
+        DailyRevenueSummary.summary_date == summary_date,
+        DailyRevenueSummary.cashier_id == cashier_id,
+        DailyRevenueSummary.service_group == service_group,
+        DailyRevenueSummary.payment_method == payment_method
+    ).with_for_update().first()
+
+    if bucket:
+        return bucket
+    try:
+        # Savepoint insert: two cashiers opening the same bucket at once must not fail the receipt
+        with db.begin_nested():
+            bucket = DailyRevenueSummary(
+                summary_date=summary_date,
+                cashier_id=cashier_id,
+                service_group=service_group,
+                payment_method=payment_method,
+                amount_collected=0.0,
+                amount_refunded=0.0,
+                payment_count=0,
+                refund_count=0
+            )
+            db.add(bucket)
+        return bucket
+    except IntegrityError:
+        # uq_daily_revenue_bucket: another transaction created the row first - lock theirs
+        return db.query(DailyRevenueSummary).filter(
+            DailyRevenueSummary.summary_date == summary_date,
+            DailyRevenueSummary.cashier_id == cashier_id,
+            DailyRevenueSummary.service_group == service_group,
+            DailyRevenueSummary.payment_method == payment_method
+        ).with_for_update().one()
+
+
+def _group_amounts(payments: Iterable[Tuple[BillItem, float]]) -> Dict[str, Tuple[float, int]]:
+    """Collapse (bill_item, amount) pairs into {service_group: (amount, count)}"""
+    grouped: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+    for bill_item, amount in payments:
+        if bill_item is not None:
+            group = determine_service_group(bill_item.item_name or "", bill_item.category or "")
+        else:
+            group = "Other"
+        grouped[group][0] += amount or 0.0
+        grouped[group][1] += 1
+    return {group: (values[0], values[1]) for group, values in grouped.items()}
+
+
+def record_receipt_items(db: Session, receipt: Receipt, payments: Iterable[Tuple[BillItem, float]]) -> None:
+    """
+    Add newly collected receipt item payments to the day's totals.
+
+    Args:
+        db: Database session (caller commits)
+        receipt: Receipt the payments were recorded on
+        payments: (bill_item, amount_paid) pairs for the receipt items just created
+    """
+    summary_date = _to_date(receipt.issued_at)
+    for group, (amount, count) in _group_amounts(payments).items():
+        bucket = _get_bucket(db, summary_date, receipt.issued_by, group, receipt.payment_method)
+        bucket.amount_collected += amount
+        bucket.payment_count += count
+
+
+def reverse_receipt_item(db: Session, receipt: Receipt, receipt_item: ReceiptItem) -> None:
+    """Take a deleted receipt item back out of the totals for the day it was collected"""
+    summary_date = _to_date(receipt.issued_at)
+    for group, (amount, count) in _group_amounts([(receipt_item.bill_item, receipt_item.amount_paid)]).items():
+        bucket = _get_bucket(db, summary_date, receipt.issued_by, group, receipt.payment_method)
+        bucket.amount_collected -= amount
+        bucket.payment_count = max(0, bucket.payment_count - count)
+
+
+def record_receipt_refund(db: Session, receipt: Receipt) -> None:
+    """
+    Record a refunded receipt against the issuing cashier on the refund date.
+    Collections stay on the original day so closed days are not rewritten.
+    """
+    summary_date = _to_date(receipt.refunded_at)
+    payments = [(item.bill_item, item.amount_paid) for item in receipt.receipt_items]
+    if not payments:
+        # Receipts without itemization are refunded as a whole
+        payments = [(None, receipt.amount_paid)]
+    for group, (amount, count) in _group_amounts(payments).items():
+        bucket = _get_bucket(db, summary_date, receipt.issued_by, group, receipt.payment_method)
+        bucket.amount_refunded += amount
+        bucket.refund_count += count
+
+
+def rebuild_revenue_summary(db: Session, start_date: date, end_date: date) -> int:
+    """
+    Recompute the summary rows for a date range from receipts and receipt items.
+    Used to backfill history and to repair drift. Caller commits.
+
+    Returns:
+        Number of summary rows written
+    """
+    start_dt = datetime.combine(start_date, datetime.min.time())
+    end_dt = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+
+    db.query(DailyRevenueSummary).filter(
+        DailyRevenueSummary.summary_date >= start_date,
+        DailyRevenueSummary.summary_date <= end_date
+    ).delete(synchronize_session=False)
+
+    rows = db.query(
+        Receipt.issued_at,
+        Receipt.refunded,
+        Receipt.refunded_at,
+        Receipt.issued_by,
+        Receipt.payment_method,
+        Receipt.amount_paid,
+        ReceiptItem.id,
+        ReceiptItem.amount_paid,
+        BillItem.item_name,
+        BillItem.category
+    ).outerjoin(
+        ReceiptItem, ReceiptItem.receipt_id == Receipt.id
+    ).outerjoin(
+        BillItem, BillItem.id == ReceiptItem.bill_item_id
+    ).filter(
+        or_(
+            and_(Receipt.issued_at >= start_dt, Receipt.issued_at < end_dt),
+            and_(Receipt.refunded == True, Receipt.refunded_at >= start_dt, Receipt.refunded_at < end_dt)
+        )
+    ).all()
+
+    buckets: Dict[Tuple[date, int, str, str], List[float]] = defaultdict(lambda: [0.0, 0.0, 0, 0])
+    for (issued_at, refunded, refunded_at, issued_by, payment_method, receipt_amount,
+         receipt_item_id, amount, item_name, category) in rows:
+        if receipt_item_id is None:
+            # Receipt without itemization: counted whole under "Other", as record_receipt_refund does
+            group, amount = "Other", receipt_amount
+        else:
+            group = determine_service_group(item_name or "", category or "")
+        method = payment_method or "cash"
+        if issued_at and start_dt <= issued_at < end_dt:
+            bucket = buckets[(issued_at.date(), issued_by, group, method)]
+            bucket[0] += amount or 0.0
+            bucket[2] += 1
+        if refunded and refunded_at and start_dt <= refunded_at < end_dt:
+            bucket = buckets[(refunded_at.date(), issued_by, group, method)]
+            bucket[1] += amount or 0.0
+            bucket[3] += 1
+
+    for (summary_date, cashier_id, group, method), values in buckets.items():
+        db.add(DailyRevenueSummary(
+            summary_date=summary_date,
+            cashier_id=cashier_id,
+            service_group=group,
+            payment_method=method,
+            amount_collected=values[0],
+            amount_refunded=values[1],
+            payment_count=values[2],
+            refund_count=values[3]
+        ))
+    db.flush()
+    return len(buckets)
+
+
+def get_revenue_summary(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    cashier_id: Optional[int] = None
+) -> dict:
+    """
+    Build the cashier summary for a date range from the pre-aggregated rows.
+    Also reports the payment state (paid / partial / unpaid) of bills raised in the range.
+    """
+    query = db.query(DailyRevenueSummary, User.full_name).outerjoin(
+        User, User.id == DailyRevenueSummary.cashier_id
+    ).filter(
+        DailyRevenueSummary.summary_date >= start_date,
+        DailyRevenueSummary.summary_date <= end_date
+    )
+    if cashier_id:
+        query = query.filter(DailyRevenueSummary.cashier_id == cashier_id)
+
+    rows = []
+    totals = {"amount_collected": 0.0, "amount_refunded": 0.0, "net_amount": 0.0, "payment_count": 0, "refund_count": 0}
+    by_day: Dict[str, dict] = {}
+    by_cashier: Dict[int, dict] = {}
+    by_service_group: Dict[str, dict] = {}
+    by_payment_method: Dict[str, dict] = {}
+
+    def _add(target: dict, row: DailyRevenueSummary):
+        target["amount_collected"] += row.amount_collected
+        target["amount_refunded"] += row.amount_refunded
+        target["net_amount"] += row.amount_collected - row.amount_refunded
+        target["payment_count"] += row.payment_count
+        target["refund_count"] += row.refund_count
+
+    def _empty(**extra) -> dict:
+        return {**extra, "amount_collected": 0.0, "amount_refunded": 0.0, "net_amount": 0.0, "payment_count": 0, "refund_count": 0}
+
+    for summary, cashier_name in query.order_by(DailyRevenueSummary.summary_date).all():
+        day_key = summary.summary_date.isoformat()
+        _add(totals, summary)
+        _add(by_day.setdefault(day_key, _empty(date=day_key)), summary)
+        _add(by_cashier.setdefault(summary.cashier_id, _empty(cashier_id=summary.cashier_id, cashier_name=cashier_name)), summary)
+        _add(by_service_group.setdefault(summary.service_group, _empty(service_group=summary.service_group)), summary)
+        _add(by_payment_method.setdefault(summary.payment_method, _empty(payment_method=summary.payment_method)), summary)
+        rows.append({
+            "date": day_key,
+            "cashier_id": summary.cashier_id,
+            "cashier_name": cashier_name,
+            "service_group": summary.service_group,
+            "payment_method": summary.payment_method,
+            "amount_collected": summary.amount_collected,
+            "amount_refunded": summary.amount_refunded,
+            "net_amount": summary.amount_collected - summary.amount_refunded,
+            "payment_count": summary.payment_count,
+            "refund_count": summary.refund_count,
+        })
+
+    # Payment state of bills raised in the range - one aggregate query
+    start_dt = datetime.combine(start_date, datetime.min.time())
+    end_dt = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    payment_state = case(
+        (Bill.is_paid == True, "paid"),
+        (Bill.paid_amount > 0, "partial"),
+        else_="unpaid"
+    )
+    state_rows = db.query(
+        payment_state.label("state"),
+        func.count(Bill.id),
+        func.coalesce(func.sum(Bill.total_amount), 0.0),
+        func.coalesce(func.sum(Bill.paid_amount), 0.0)
+    ).filter(
+        Bill.created_at >= start_dt,
+        Bill.created_at < end_dt
+    ).group_by(payment_state).all()
+
+    bill_payment_state = {
+        state: {"bill_count": 0, "total_amount": 0.0, "paid_amount": 0.0, "outstanding_amount": 0.0}
+        for state in ("paid", "partial", "unpaid")
+    }
+    for state, count, total_amount, paid_amount in state_rows:
+        bill_payment_state[state] = {
+            "bill_count": count,
+            "total_amount": float(total_amount or 0.0),
+            "paid_amount": float(paid_amount or 0.0),
+            "outstanding_amount": float((total_amount or 0.0) - (paid_amount or 0.0)),
+        }
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "cashier_id": cashier_id,
+        "totals": totals,
+        "by_day": list(by_day.values()),
+        "by_cashier": list(by_cashier.values()),
+        "by_service_group": list(by_service_group.values()),
+        "by_payment_method": list(by_payment_method.values()),
+        "bill_payment_state": bill_payment_state,
+        "rows": rows,
+    }
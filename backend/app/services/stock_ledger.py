@@ -0,0 +1,442 @@
+"""
+Stock ledger service
+Per-ward, per-product running balances of inpatient inventory debits
+(requested, released and outstanding quantities and values) and the pharmacy
+release queue built on them.
+
+Balances are maintained from SQLAlchemy session events, like the bill totals:
+- after_flush records which (ward, product) pairs the flush touched, including
+  the pair a debit moved away from or was deleted from
+- after_flush_postexec recomputes those balances with one aggregate query in
+  the same transaction
+so recording, deleting and releasing debits keep them current without extra code.
+
+The queue is keyset (cursor) paginated on (used_at, id), oldest first, and is
+filtered on requesting_ward directly (backfilled by the ledger migration) so
+the composite indexes apply.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import and_, case, delete, event, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.datetime_utils import utcnow
+from app.models.encounter import Encounter
+from app.models.inpatient_inventory_debit import InpatientInventoryDebit
+from app.models.patient import Patient
+from app.models.user import User
+from app.models.ward_admission import WardAdmission
+from app.models.ward_stock_balance import WardStockBalance
+from app.services.investigation_worklist import user_names
+from app.services.pharmacy_queue import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# session.info keys used to carry touched balances from after_flush to after_flush_postexec
+_TOUCHED_BALANCES = "stock_ledger_touched_balances"
+_RECOMPUTING = "stock_ledger_recomputing"
+
+_released = func.coalesce(InpatientInventoryDebit.is_released, False) == True
+
+
+def _previous_value(state, key: str):
+    history = state.attrs[key].history
+    return history.deleted[0] if history.deleted else state.attrs[key].value
+
+
+def _collect_touched(session: Session, flush_context) -> None:
+    """Remember which (ward, product) balances were written by this flush"""
+    if session.info.get(_RECOMPUTING):
+        return
+    touched: Set[Tuple[str, str]] = session.info.setdefault(_TOUCHED_BALANCES, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, InpatientInventoryDebit):
+            continue
+        if obj.requesting_ward and obj.product_code:
+            touched.add((obj.requesting_ward, obj.product_code))
+        if obj in session.dirty:
+            # A changed ward / product also moves the debit out of its previous balance
+            state = obj._sa_instance_state
+            previous = (_previous_value(state, "requesting_ward"), _previous_value(state, "product_code"))
+            if all(previous):
+                touched.add(previous)
+
+
+def _recompute_touched(session: Session, flush_context) -> None:
+    """Recompute the balances the last flush touched"""
+    if session.info.get(_RECOMPUTING):
+        return
+    touched: Set[Tuple[str, str]] = session.info.pop(_TOUCHED_BALANCES, set())
+    if not touched:
+        return
+    session.info[_RECOMPUTING] = True
+    try:
+        refresh_stock_balances(session, touched)
+    finally:
+        session.info.pop(_RECOMPUTING, None)
+
+
+def register_stock_ledger_listeners(session_factory) -> None:
+    """Attach the ledger maintenance hooks to a sessionmaker (idempotent)"""
+    if not event.contains(session_factory, "after_flush", _collect_touched):
+        event.listen(session_factory, "after_flush", _collect_touched)
+        event.listen(session_factory, "after_flush_postexec", _recompute_touched)
+
+
+def _balance_totals(session: Session, where, lock: bool = False) -> Dict[Tuple[str, str], dict]:
+    """
+    Aggregate debits into balance values per (ward, product), one GROUP BY query.
+    lock=True makes it a locking read (SELECT ... FOR UPDATE): it sees debits
+    other transactions committed after this one started, not the snapshot.
+    """
+    released_quantity = func.sum(case((_released, InpatientInventoryDebit.quantity), else_=0.0))
+    released_value = func.sum(case((_released, InpatientInventoryDebit.total_price), else_=0.0))
+
+    query = (
+        select(
+            InpatientInventoryDebit.requesting_ward,
+            InpatientInventoryDebit.product_code,
+            func.max(InpatientInventoryDebit.product_name),
+            func.count(InpatientInventoryDebit.id),
+            func.coalesce(func.sum(InpatientInventoryDebit.quantity), 0.0),
+            func.coalesce(released_quantity, 0.0),
+            func.coalesce(func.sum(InpatientInventoryDebit.total_price), 0.0),
+            func.coalesce(released_value, 0.0),
+            func.max(InpatientInventoryDebit.used_at),
+            func.max(InpatientInventoryDebit.released_at),
+        ).where(where).group_by(
+            InpatientInventoryDebit.requesting_ward, InpatientInventoryDebit.product_code
+        )
+    )
+    if lock:
+        query = query.with_for_update()
+    rows = session.execute(query).all()
+
+    totals = {}
+    for ward, product_code, product_name, count, requested, released, requested_value, released_value_sum, last_used, last_released in rows:
+        requested = float(requested or 0.0)
+        released = float(released or 0.0)
+        totals[(ward, product_code)] = {
+            "product_name": product_name,
+            "debit_count": count,
+            "requested_quantity": requested,
+            "released_quantity": released,
+            "outstanding_quantity": requested - released,
+            "requested_value": float(requested_value or 0.0),
+            "released_value": float(released_value_sum or 0.0),
+            "last_used_at": last_used,
+            "last_released_at": last_released,
+        }
+    return totals
+
+
+def _insert_balance(session: Session, key: Tuple[str, str], values: dict, updated_at: datetime) -> bool:
+    """
+    Insert a new balance row in a savepoint; False when another transaction
+    created it first (uq_ward_stock_balance). A Core savepoint on the session's
+    connection, since this runs inside the session's flush.
+    """
+    savepoint = session.connection().begin_nested()
+    try:
+        session.execute(insert(WardStockBalance).values(
+            ward=key[0], product_code=key[1], updated_at=updated_at, **values
+        ))
+    except IntegrityError:
+        savepoint.rollback()
+        return False
+    savepoint.commit()
+    return True
+
+
+def refresh_stock_balances(session: Session, keys: Iterable[Tuple[str, str]]) -> None:
+    """
+    Recompute the balances of the given (ward, product_code) pairs; pairs
+    without debits are removed. The balance rows are locked before the debits
+    are aggregated, so two transactions debiting one product on one ward
+    recompute its balance one after the other.
+    """
+    keys = list(set(keys))
+    if not keys:
+        return
+    wards = {ward for ward, _ in keys}
+    products = {product_code for _, product_code in keys}
+    existing = {
+        (ward, product_code): balance_id
+        for balance_id, ward, product_code in session.execute(
+            select(WardStockBalance.id, WardStockBalance.ward, WardStockBalance.product_code).where(
+                WardStockBalance.ward.in_(wards),
+                WardStockBalance.product_code.in_(products)
+            ).order_by(WardStockBalance.id).with_for_update()
+        ).all()
+    }
+    totals = _balance_totals(session, and_(
+        InpatientInventoryDebit.requesting_ward.in_(wards),
+        InpatientInventoryDebit.product_code.in_(products)
+    ), lock=True)
+
+    updated_at = utcnow()
+    for key in keys:
+        values = totals.get(key)
+        balance_id = existing.get(key)
+        if values is None:
+            if balance_id is not None:
+                session.execute(delete(WardStockBalance).where(WardStockBalance.id == balance_id))
+        elif balance_id is None:
+            if not _insert_balance(session, key, values, updated_at):
+                # The other transaction has committed its row: lock it and recount with its debits
+                values = _balance_totals(session, and_(
+                    InpatientInventoryDebit.requesting_ward == key[0],
+                    InpatientInventoryDebit.product_code == key[1]
+                ), lock=True).get(key, values)
+                session.execute(
+                    update(WardStockBalance).where(
+                        WardStockBalance.ward == key[0], WardStockBalance.product_code == key[1]
+                    ).values(updated_at=updated_at, **values),
+                    execution_options={"synchronize_session": False}
+                )
+        else:
+            session.execute(
+                update(WardStockBalance).where(WardStockBalance.id == balance_id).values(
+                    updated_at=updated_at, **values
+                ),
+                execution_options={"synchronize_session": False}
+            )
+
+
+def rebuild_stock_ledger(session: Session) -> dict:
+    """
+    Recompute every balance from the debits (repairs drift and fills the
+    ledger after the migration). Caller commits.
+
+    Returns:
+        {"balances": number of balance rows written}
+    """
+    session.info[_RECOMPUTING] = True
+    try:
+        session.execute(delete(WardStockBalance))
+        totals = _balance_totals(session, and_(
+            InpatientInventoryDebit.requesting_ward.isnot(None),
+            InpatientInventoryDebit.product_code.isnot(None)
+        ))
+        updated_at = utcnow()
+        if totals:
+            session.execute(insert(WardStockBalance), [
+                {"ward": ward, "product_code": product_code, "updated_at": updated_at, **values}
+                for (ward, product_code), values in totals.items()
+            ])
+    finally:
+        session.info.pop(_RECOMPUTING, None)
+    logger.info(f"Stock ledger rebuilt: {len(totals)} balance(s)")
+    return {"balances": len(totals)}
+
+
+def get_stock_balances(
+    db: Session,
+    ward: Optional[str] = None,
+    product_code: Optional[str] = None,
+    outstanding_only: bool = False
+) -> dict:
+    """
+    Stock balances, by ward then product, with per-ward totals.
+
+    Returns:
+        {"items": [...], "wards": {ward: {"requested_value", "released_value", "outstanding_quantity"}}}
+    """
+    query = select(WardStockBalance)
+    if ward:
+        query = query.where(WardStockBalance.ward == ward)
+    if product_code:
+        query = query.where(WardStockBalance.product_code == product_code)
+    if outstanding_only:
+        query = query.where(WardStockBalance.outstanding_quantity > 0)
+    balances = db.execute(query.order_by(WardStockBalance.ward, WardStockBalance.product_code)).scalars().all()
+
+    items = []
+    wards: Dict[str, dict] = {}
+    for balance in balances:
+        items.append({
+            "ward": balance.ward,
+            "product_code": balance.product_code,
+            "product_name": balance.product_name,
+            "debit_count": balance.debit_count,
+            "requested_quantity": balance.requested_quantity,
+            "released_quantity": balance.released_quantity,
+            "outstanding_quantity": balance.outstanding_quantity,
+            "requested_value": balance.requested_value,
+            "released_value": balance.released_value,
+            "last_used_at": balance.last_used_at,
+            "last_released_at": balance.last_released_at,
+        })
+        ward_totals = wards.setdefault(balance.ward, {
+            "requested_value": 0.0, "released_value": 0.0, "outstanding_quantity": 0.0
+        })
+        ward_totals["requested_value"] += balance.requested_value
+        ward_totals["released_value"] += balance.released_value
+        ward_totals["outstanding_quantity"] += balance.outstanding_quantity
+    return {"items": items, "wards": wards}
+
+
+def inventory_debit_rows(db: Session, filters: List, order_by: List, limit: Optional[int] = None) -> List[dict]:
+    """
+    Inventory debits with ward admission and patient columns from one joined
+    query and user names from one batched lookup (pharmacy view rows).
+    Outer joins keep old debits whose admission or encounter is missing.
+    """
+    query = select(
+        InpatientInventoryDebit, WardAdmission.ward, WardAdmission.admitted_at, Patient
+    ).outerjoin(
+        WardAdmission, WardAdmission.id == InpatientInventoryDebit.ward_admission_id
+    ).outerjoin(
+        Encounter, Encounter.id == InpatientInventoryDebit.encounter_id
+    ).outerjoin(
+        Patient, Patient.id == Encounter.patient_id
+    ).where(*filters).order_by(*order_by)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query).all()
+
+    names = user_names(db, (
+        user_id for debit, *_ in rows for user_id in (debit.used_by, debit.released_by)
+    ))
+    result = []
+    for debit, current_ward, admitted_at, patient in rows:
+        result.append({
+            "id": debit.id,
+            "ward_admission_id": debit.ward_admission_id,
+            "encounter_id": debit.encounter_id,
+            "product_code": debit.product_code,
+            "product_name": debit.product_name,
+            "quantity": debit.quantity,
+            "unit_price": debit.unit_price,
+            "total_price": debit.total_price,
+            "notes": debit.notes,
+            "is_billed": debit.is_billed,
+            "bill_item_id": debit.bill_item_id,
+            "is_released": debit.is_released,
+            "released_by": debit.released_by,
+            "released_by_name": names.get(debit.released_by) if debit.released_by else None,
+            "released_at": debit.released_at,
+            "used_by": debit.used_by,
+            "used_by_name": names.get(debit.used_by),
+            "used_at": debit.used_at,
+            "created_at": debit.created_at,
+            "updated_at": debit.updated_at,
+            "patient_name": f"{patient.surname or ''} {patient.name or ''} {patient.other_names or ''}".strip() if patient else None,
+            "patient_card_number": patient.card_number if patient else None,
+            "ward": current_ward,  # Current ward (for backward compatibility)
+            "requesting_ward": debit.requesting_ward or current_ward,  # Original requesting ward
+            "admitted_at": admitted_at,
+        })
+    return result
+
+
+def inventory_debit_filters(
+    ward: Optional[str] = None,
+    is_released: Optional[bool] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    product_code: Optional[str] = None,
+    product_name: Optional[str] = None,
+    used_by_name: Optional[str] = None
+) -> List:
+    """WHERE clauses for the pharmacy inventory debit views"""
+    filters = []
+    if ward:
+        filters.append(InpatientInventoryDebit.requesting_ward == ward)
+    if is_released is not None:
+        filters.append(_released if is_released else ~_released)
+    if start:
+        filters.append(InpatientInventoryDebit.used_at >= start)
+    if end:
+        filters.append(InpatientInventoryDebit.used_at <= end)
+    if product_code:
+        filters.append(InpatientInventoryDebit.product_code.ilike(f"%{product_code}%"))
+    if product_name:
+        filters.append(InpatientInventoryDebit.product_name.ilike(f"%{product_name}%"))
+    if used_by_name:
+        filters.append(InpatientInventoryDebit.used_by.in_(
+            select(User.id).where(User.full_name.ilike(f"%{used_by_name}%"))
+        ))
+    return filters
+
+
+def get_inventory_debit_queue(
+    db: Session,
+    ward: Optional[str] = None,
+    is_released: Optional[bool] = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> dict:
+    """
+    One page of the inventory release queue, oldest debit first.
+
+    Returns:
+        {"items": [...], "next_cursor": str or None} - pass next_cursor back
+        as cursor for the following page; None means the queue is exhausted
+
+    Raises:
+        ValueError: on a malformed cursor
+    """
+    filters = inventory_debit_filters(ward, is_released, start, end)
+    if search and search.strip():
+        search_term = f"%{search.strip()}%"
+        filters.append(or_(
+            InpatientInventoryDebit.product_code.ilike(search_term),
+            InpatientInventoryDebit.product_name.ilike(search_term)
+        ))
+    if cursor:
+        after_used_at, after_id = decode_cursor(cursor)
+        filters.append(or_(
+            InpatientInventoryDebit.used_at > after_used_at,
+            and_(InpatientInventoryDebit.used_at == after_used_at, InpatientInventoryDebit.id > after_id)
+        ))
+
+    # One extra row tells whether another page exists
+    items = inventory_debit_rows(
+        db, filters, [InpatientInventoryDebit.used_at, InpatientInventoryDebit.id], limit=limit + 1
+    )
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(items[-1]["used_at"], items[-1]["id"]) if has_more and items else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def release_inventory_debits(db: Session, debit_ids: List[int], released_by: int) -> dict:
+    """
+    Release many inventory debits in one pass: one locking SELECT for the
+    requested rows and one flush for the updates (the ledger balances follow
+    in the same transaction). Debits that cannot be released are reported in
+    errors. Caller commits.
+
+    Returns:
+        {"released_ids": [...], "errors": [...], "released_at": datetime}
+    """
+    requested_ids = list(dict.fromkeys(debit_ids))
+    debits = {
+        debit.id: debit for debit in db.execute(
+            select(InpatientInventoryDebit).where(
+                InpatientInventoryDebit.id.in_(requested_ids)
+            ).with_for_update()
+        ).scalars().all()
+    }
+
+    released_at = utcnow()
+    released_ids = []
+    errors = []
+    for debit_id in requested_ids:
+        debit = debits.get(debit_id)
+        if debit is None:
+            errors.append(f"Inventory debit {debit_id} not found")
+        elif debit.is_released:
+            errors.append(f"Inventory debit {debit_id} has already been released")
+        else:
+            debit.is_released = True
+            debit.released_by = released_by
+            debit.released_at = released_at
+            released_ids.append(debit_id)
+    db.flush()
+    return {"released_ids": released_ids, "errors": errors, "released_at": released_at}
@@ -0,0 +1,217 @@
+"""
+Ward board service
+Rows for the nurses' ward admission board, built with a fixed number of queries
+however many patients are on the ward:
+- one joined select for admission, encounter, patient and bed columns
+- one IN query for the admitting / discharging / attending users
+The ward filter excludes admissions transferred out with a correlated NOT EXISTS
+(index-backed per row) rather than a NOT IN over every accepted transfer.
+
+Boards that refresh constantly pass since= to receive only rows changed after
+their last refresh, plus the ids currently on the board so departed rows can be
+dropped, and fields= to receive only the columns they display. since= goes back
+SINCE_SAFETY_MARGIN, so a row committed while the previous refresh was running
+(its updated_at just before that refresh's server_time) is still sent; a row
+sent twice is simply replaced on the board.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import exists, or_, select
+from sqlalchemy.orm import Session
+from app.core.datetime_utils import utcnow
+from app.models.bed import Bed
+from app.models.encounter import Encounter
+from app.models.patient import Patient
+from app.models.user import User
+from app.models.ward_admission import WardAdmission
+from app.models.ward_transfer import WardTransfer
+
+# How far before the client's since= to look, to cover transactions in flight at the previous refresh
+SINCE_SAFETY_MARGIN = timedelta(seconds=5)
+
+# Every key of a ward board row, in response order
+BOARD_FIELDS = [
+    "id", "encounter_id", "ward", "bed_id", "bed_number",
+    "doctor_id", "doctor_name", "doctor_username",
+    "admitted_by", "admitted_at", "discharged_at", "discharged_by",
+    "patient_name", "patient_surname", "patient_other_names", "patient_card_number",
+    "patient_gender", "patient_date_of_birth",
+    "encounter_created_at", "encounter_service_type",
+    "admitted_by_name", "admitted_by_role", "discharged_by_name", "discharged_by_role",
+    "emergency_contact_name", "emergency_contact_relationship", "emergency_contact_number",
+    "admission_notes",
+]
+
+# Fields that need the user lookup
+_USER_FIELDS = {
+    "doctor_name", "doctor_username", "admitted_by_name", "admitted_by_role",
+    "discharged_by_name", "discharged_by_role",
+}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated fields= projection. id is always included.
+
+    Raises:
+        ValueError: if a field is not a ward board field
+    """
+    if not fields or not fields.strip():
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in BOARD_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown ward board field(s): {', '.join(unknown)}")
+    return ["id"] + [name for name in BOARD_FIELDS if name in requested and name != "id"]
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; accept aware since= values too"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _board_filters(ward: Optional[str], include_discharged: bool) -> list:
+    filters = []
+    if not include_discharged:
+        filters.append(WardAdmission.discharged_at.is_(None))
+    if ward:
+        filters.append(WardAdmission.ward == ward)
+        # Safeguard for admissions whose ward was not updated when a transfer was accepted
+        filters.append(~exists().where(
+            WardTransfer.ward_admission_id == WardAdmission.id,
+            WardTransfer.status == "accepted",
+            WardTransfer.from_ward == ward,
+            WardTransfer.to_ward != ward
+        ))
+    return filters
+
+
+def _user_details(db: Session, user_ids: Iterable[Optional[int]]) -> Dict[int, tuple]:
+    """id -> (full_name, role, username) with a single IN query"""
+    ids = {user_id for user_id in user_ids if user_id}
+    if not ids:
+        return {}
+    return {
+        user_id: (full_name, role, username)
+        for user_id, full_name, role, username in db.query(
+            User.id, User.full_name, User.role, User.username
+        ).filter(User.id.in_(ids)).all()
+    }
+
+
+def get_ward_admission_rows(
+    db: Session,
+    ward: Optional[str] = None,
+    include_discharged: bool = False,
+    since: Optional[datetime] = None,
+    fields: Optional[List[str]] = None
+) -> List[dict]:
+    """
+    Ward board rows, most recent admission first.
+
+    Args:
+        since: only rows whose admission or patient changed after this time
+            (less SINCE_SAFETY_MARGIN). Only the ward admission and patient rows
+            are compared: renaming a bed or a user does not mark the rows that
+            show it as changed, and reaches the board on its next full load.
+        fields: keys to return (see parse_fields); all BOARD_FIELDS when None
+    """
+    filters = _board_filters(ward, include_discharged)
+    if since is not None:
+        since = _naive_utc(since) - SINCE_SAFETY_MARGIN
+        filters.append(or_(WardAdmission.updated_at > since, Patient.updated_at > since))
+
+    rows = db.execute(
+        select(WardAdmission, Encounter.created_at, Encounter.department, Patient, Bed.bed_number)
+        .join(Encounter, Encounter.id == WardAdmission.encounter_id)
+        .join(Patient, Patient.id == Encounter.patient_id)
+        .outerjoin(Bed, Bed.id == WardAdmission.bed_id)
+        .where(*filters)
+        .order_by(WardAdmission.admitted_at.desc(), WardAdmission.id.desc())
+    ).all()
+
+    wanted = set(fields) if fields else None
+    users = {}
+    if wanted is None or wanted & _USER_FIELDS:
+        users = _user_details(db, (
+            user_id
+            for admission, *_ in rows
+            for user_id in (admission.admitted_by, admission.discharged_by, admission.doctor_id)
+        ))
+    no_user = (None, None, None)
+
+    result = []
+    for admission, encounter_created_at, department, patient, bed_number in rows:
+        admitted_user = users.get(admission.admitted_by, no_user)
+        discharged_user = users.get(admission.discharged_by, no_user)
+        doctor = users.get(admission.doctor_id, no_user)
+        row = {
+            "id": admission.id,
+            "encounter_id": admission.encounter_id,
+            "ward": admission.ward,
+            "bed_id": admission.bed_id,
+            "bed_number": bed_number,
+            "doctor_id": admission.doctor_id,
+            "doctor_name": doctor[0],
+            "doctor_username": doctor[2],
+            "admitted_by": admission.admitted_by,
+            "admitted_at": admission.admitted_at,
+            "discharged_at": admission.discharged_at,
+            "discharged_by": admission.discharged_by,
+            "patient_name": patient.name,
+            "patient_surname": patient.surname,
+            "patient_other_names": patient.other_names,
+            "patient_card_number": patient.card_number,
+            "patient_gender": patient.gender,
+            "patient_date_of_birth": patient.date_of_birth.isoformat() if patient.date_of_birth else None,
+            "encounter_created_at": encounter_created_at,
+            "encounter_service_type": department,
+            "admitted_by_name": admitted_user[0],
+            "admitted_by_role": admitted_user[1],
+            "discharged_by_name": discharged_user[0],
+            "discharged_by_role": discharged_user[1],
+            # Emergency contact is stored in patient registration, not in ward_admission
+            "emergency_contact_name": patient.emergency_contact_name,
+            "emergency_contact_relationship": patient.emergency_contact_relationship,
+            "emergency_contact_number": patient.emergency_contact_number,
+            "admission_notes": admission.admission_notes,
+        }
+        if fields:
+            row = {name: row[name] for name in fields}
+        result.append(row)
+    return result
+
+
+def get_ward_board(
+    db: Session,
+    ward: Optional[str] = None,
+    include_discharged: bool = False,
+    since: Optional[datetime] = None,
+    fields: Optional[List[str]] = None
+) -> dict:
+    """
+    Ward board payload.
+
+    Returns:
+        {"server_time": ..., "full": bool, "ids": [...], "items": [...]}
+        - server_time: pass back as since= on the next refresh
+        - ids: every admission currently on the board (only with since=);
+          rows missing from it have left the board
+        - items: all rows, or only the rows changed since since=
+    """
+    server_time = utcnow()
+    items = get_ward_admission_rows(db, ward, include_discharged, since, fields)
+    payload = {"server_time": server_time, "full": since is None, "items": items}
+    if since is not None:
+        payload["ids"] = [
+            admission_id for (admission_id,) in db.execute(
+                select(WardAdmission.id)
+                .join(Encounter, Encounter.id == WardAdmission.encounter_id)
+                .join(Patient, Patient.id == Encounter.patient_id)
+                .where(*_board_filters(ward, include_discharged))
+                .order_by(WardAdmission.admitted_at.desc(), WardAdmission.id.desc())
+            ).all()
+        ]
+    return payload
@@ -0,0 +1,434 @@
+"""
+Ward census service
+Records every admission, ward transfer, discharge and death as a ward census
+event and keeps a per-ward, per-day census (opening, movements, closing) up to
+date as the events happen, so daily ward state and occupancy trends are read
+in O(days) instead of re-scanning every admission.
+
+Events are captured from SQLAlchemy session events, like the bill totals:
+- after_flush inspects WardAdmission inserts, ward changes, discharge/death
+  timestamps and deletes (cancelled admissions)
+- after_flush_postexec writes the events and census updates in the same transaction
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.datetime_utils import utcnow
+from app.models.ward_admission import WardAdmission
+from app.models.ward_transfer import WardTransfer
+from app.models.ward_census import WardCensusEvent, WardCensusEventType, WardDailyCensus
+
+logger = logging.getLogger(__name__)
+
+# session.info keys used to carry events from after_flush to after_flush_postexec
+_PENDING_EVENTS = "ward_census_pending_events"
+_VOIDED_ADMISSIONS = "ward_census_voided_admissions"
+_APPLYING = "ward_census_applying"
+
+# Census column and occupancy change for each event type
+_EVENT_COLUMNS = {
+    WardCensusEventType.ADMISSION.value: ("admissions", 1),
+    WardCensusEventType.TRANSFER_IN.value: ("transfers_in", 1),
+    WardCensusEventType.TRANSFER_OUT.value: ("transfers_out", -1),
+    WardCensusEventType.DISCHARGE.value: ("discharges", -1),
+    WardCensusEventType.DEATH.value: ("deaths", -1),
+}
+
+_CENSUS_FIELDS = ["opening", "admissions", "transfers_in", "transfers_out", "discharges", "deaths", "closing"]
+
+
+def _exit_type(admission: WardAdmission) -> str:
+    """Discharge or death, for the event that takes an admission out of its ward"""
+    if admission.death_recorded_at is not None or admission.discharge_outcome == "died":
+        return WardCensusEventType.DEATH.value
+    return WardCensusEventType.DISCHARGE.value
+
+
+def _exit_time(discharged_at: Optional[datetime], death_recorded_at: Optional[datetime]) -> Optional[datetime]:
+    """An admission leaves its ward at the first of discharge or recorded death"""
+    times = [value for value in (discharged_at, death_recorded_at) if value is not None]
+    return min(times) if times else None
+
+
+def _value_before_flush(state, key: str):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return None
+    return state.attrs[key].value
+
+
+def _collect_events(session: Session, flush_context) -> None:
+    """Turn WardAdmission changes in this flush into census events"""
+    if session.info.get(_APPLYING):
+        return
+    pending: List[dict] = session.info.setdefault(_PENDING_EVENTS, [])
+    voided = session.info.setdefault(_VOIDED_ADMISSIONS, set())
+
+    # Transfers accepted in this flush, to timestamp and link the ward change
+    accepted_transfers: Dict[int, WardTransfer] = {}
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, WardTransfer) and obj.status == "accepted" and obj.from_ward != obj.to_ward:
+            accepted_transfers[obj.ward_admission_id] = obj
+
+    for obj in session.new:
+        if not isinstance(obj, WardAdmission):
+            continue
+        pending.append({
+            "ward_admission_id": obj.id,
+            "ward": obj.ward,
+            "event_type": WardCensusEventType.ADMISSION.value,
+            "event_at": obj.admitted_at or utcnow(),
+        })
+        left_at = _exit_time(obj.discharged_at, obj.death_recorded_at)
+        if left_at is not None:
+            pending.append({
+                "ward_admission_id": obj.id,
+                "ward": obj.ward,
+                "event_type": _exit_type(obj),
+                "event_at": left_at,
+            })
+
+    for obj in session.dirty:
+        if not isinstance(obj, WardAdmission):
+            continue
+        state = inspect(obj)
+
+        old_ward = _value_before_flush(state, "ward")
+        if old_ward and old_ward != obj.ward:
+            transfer = accepted_transfers.get(obj.id)
+            moved_at = (transfer.accepted_at if transfer else None) or utcnow()
+            transfer_id = transfer.id if transfer else None
+            pending.append({
+                "ward_admission_id": obj.id,
+                "transfer_id": transfer_id,
+                "ward": old_ward,
+                "related_ward": obj.ward,
+                "event_type": WardCensusEventType.TRANSFER_OUT.value,
+                "event_at": moved_at,
+            })
+            pending.append({
+                "ward_admission_id": obj.id,
+                "transfer_id": transfer_id,
+                "ward": obj.ward,
+                "related_ward": old_ward,
+                "event_type": WardCensusEventType.TRANSFER_IN.value,
+                "event_at": moved_at,
+            })
+
+        left_before = _exit_time(
+            _value_before_flush(state, "discharged_at"), _value_before_flush(state, "death_recorded_at")
+        )
+        left_after = _exit_time(obj.discharged_at, obj.death_recorded_at)
+        if left_before is None and left_after is not None:
+            pending.append({
+                "ward_admission_id": obj.id,
+                "ward": obj.ward,
+                "event_type": _exit_type(obj),
+                "event_at": left_after,
+            })
+        elif left_before is not None and left_after is None:
+            # Discharge undone - drop the admission's events and replay its history
+            voided.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, WardAdmission):
+            voided.add(obj.id)
+
+
+def _apply_events(session: Session, flush_context) -> None:
+    """Write the collected events and move the daily census"""
+    if session.info.get(_APPLYING):
+        return
+    events: List[dict] = session.info.pop(_PENDING_EVENTS, [])
+    voided = session.info.pop(_VOIDED_ADMISSIONS, set())
+    if not (events or voided):
+        return
+
+    session.info[_APPLYING] = True
+    try:
+        rebuild_from: Dict[str, date] = {}
+        if voided:
+            for ward, first_day in session.execute(
+                select(WardCensusEvent.ward, func.min(WardCensusEvent.event_date)).where(
+                    WardCensusEvent.ward_admission_id.in_(voided)
+                ).group_by(WardCensusEvent.ward)
+            ).all():
+                rebuild_from[ward] = min(first_day, rebuild_from.get(ward, first_day))
+            session.execute(delete(WardCensusEvent).where(WardCensusEvent.ward_admission_id.in_(voided)))
+
+        for census_event in events:
+            if census_event["ward_admission_id"] in voided:
+                continue  # Replayed from the admission's history below
+            census_event["event_date"] = census_event["event_at"].date()
+            session.execute(insert(WardCensusEvent).values(**census_event))
+            ward = census_event["ward"]
+            if ward in rebuild_from and census_event["event_date"] >= rebuild_from[ward]:
+                continue
+            apply_census_event(session, ward, census_event["event_date"], census_event["event_type"])
+
+        # Voided admissions that still exist (undone discharges) are replayed; deleted ones stay out
+        for admission in session.execute(
+            select(WardAdmission).where(WardAdmission.id.in_(voided))
+        ).scalars().all() if voided else []:
+            for replayed in admission_history_events(session, admission):
+                replayed["event_date"] = replayed["event_at"].date()
+                session.execute(insert(WardCensusEvent).values(**replayed))
+                ward = replayed["ward"]
+                rebuild_from[ward] = min(replayed["event_date"], rebuild_from.get(ward, replayed["event_date"]))
+
+        for ward, start in rebuild_from.items():
+            rebuild_ward_census(session, ward, start)
+    finally:
+        session.info.pop(_APPLYING, None)
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+def register_ward_census_listeners(session_factory) -> None:
+    """Attach the census hooks to a sessionmaker (idempotent)"""
+    if not event.contains(session_factory, "after_flush", _collect_events):
+        event.listen(session_factory, "after_flush", _collect_events)
+        event.listen(session_factory, "after_flush_postexec", _apply_events)
+    # Load the previous value when an expired attribute is assigned, so the
+    # flush history always shows what the ward / discharge times changed from
+    for attribute in (WardAdmission.ward, WardAdmission.discharged_at, WardAdmission.death_recorded_at):
+        if not event.contains(attribute, "set", _keep_previous_value):
+            event.listen(attribute, "set", _keep_previous_value, active_history=True, retval=True)
+
+
+def _insert_census_day(session: Session, ward: str, day: date, opening: int) -> bool:
+    """
+    Insert an empty census row in a savepoint; False when another transaction
+    created it first (uq_ward_daily_census). A Core savepoint on the session's
+    connection, since this runs inside the session's flush.
+    """
+    savepoint = session.connection().begin_nested()
+    try:
+        session.execute(insert(WardDailyCensus).values(
+            ward=ward, census_date=day, opening=opening, admissions=0, transfers_in=0,
+            transfers_out=0, discharges=0, deaths=0, closing=opening
+        ))
+    except IntegrityError:
+        savepoint.rollback()
+        return False
+    savepoint.commit()
+    return True
+
+
+def apply_census_event(session: Session, ward: str, day: date, event_type: str) -> None:
+    """Count one event on its census day; later days shift by the occupancy change"""
+    column, delta = _EVENT_COLUMNS[event_type]
+    census_id = session.execute(
+        select(WardDailyCensus.id).where(
+            WardDailyCensus.ward == ward,
+            WardDailyCensus.census_date == day
+        ).with_for_update()
+    ).scalar()
+
+    if census_id is None:
+        opening = session.execute(
+            select(WardDailyCensus.closing).where(
+                WardDailyCensus.ward == ward,
+                WardDailyCensus.census_date < day
+            ).order_by(WardDailyCensus.census_date.desc()).limit(1)
+        ).scalar() or 0
+        if not _insert_census_day(session, ward, day, opening):
+            # Another transaction created the day first; wait for its row lock
+            session.execute(
+                select(WardDailyCensus.id).where(
+                    WardDailyCensus.ward == ward,
+                    WardDailyCensus.census_date == day
+                ).with_for_update()
+            )
+
+    counter = getattr(WardDailyCensus, column)
+    session.execute(
+        update(WardDailyCensus).where(
+            WardDailyCensus.ward == ward,
+            WardDailyCensus.census_date == day
+        ).values({counter: counter + 1, WardDailyCensus.closing: WardDailyCensus.closing + delta}),
+        execution_options={"synchronize_session": False}
+    )
+    # Back-dated events move every later day's opening and closing
+    session.execute(
+        update(WardDailyCensus).where(
+            WardDailyCensus.ward == ward,
+            WardDailyCensus.census_date > day
+        ).values(opening=WardDailyCensus.opening + delta, closing=WardDailyCensus.closing + delta),
+        execution_options={"synchronize_session": False}
+    )
+
+
+def rebuild_ward_census(session: Session, ward: str, start_date: date) -> int:
+    """
+    Recompute a ward's census rows from start_date onwards from the event log.
+    Caller commits.
+
+    Returns:
+        Number of census rows written
+    """
+    session.execute(delete(WardDailyCensus).where(
+        WardDailyCensus.ward == ward,
+        WardDailyCensus.census_date >= start_date
+    ))
+    opening = session.execute(
+        select(WardDailyCensus.closing).where(
+            WardDailyCensus.ward == ward,
+            WardDailyCensus.census_date < start_date
+        ).order_by(WardDailyCensus.census_date.desc()).limit(1)
+    ).scalar() or 0
+
+    counts: Dict[date, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for day, event_type, count in session.execute(
+        select(WardCensusEvent.event_date, WardCensusEvent.event_type, func.count(WardCensusEvent.id)).where(
+            WardCensusEvent.ward == ward,
+            WardCensusEvent.event_date >= start_date
+        ).group_by(WardCensusEvent.event_date, WardCensusEvent.event_type)
+    ).all():
+        counts[day][event_type] += count
+
+    for day in sorted(counts):
+        row = {"ward": ward, "census_date": day, "opening": opening}
+        closing = opening
+        for event_type, (column, delta) in _EVENT_COLUMNS.items():
+            row[column] = counts[day].get(event_type, 0)
+            closing += delta * row[column]
+        row["closing"] = closing
+        session.execute(insert(WardDailyCensus).values(**row))
+        opening = closing
+    return len(counts)
+
+
+def admission_history_events(session: Session, admission: WardAdmission) -> List[dict]:
+    """
+    Rebuild the event history of one admission from the admission and its
+    accepted ward transfers (used for backfills and undone discharges)
+    """
+    transfers = session.execute(
+        select(WardTransfer).where(
+            WardTransfer.ward_admission_id == admission.id,
+            WardTransfer.status == "accepted",
+            WardTransfer.from_ward != WardTransfer.to_ward
+        ).order_by(func.coalesce(WardTransfer.accepted_at, WardTransfer.transferred_at), WardTransfer.id)
+    ).scalars().all()
+
+    first_ward = transfers[0].from_ward if transfers else admission.ward
+    events = [{
+        "ward_admission_id": admission.id,
+        "ward": first_ward,
+        "event_type": WardCensusEventType.ADMISSION.value,
+        "event_at": admission.admitted_at,
+    }]
+    for transfer in transfers:
+        moved_at = transfer.accepted_at or transfer.transferred_at
+        events.append({
+            "ward_admission_id": admission.id,
+            "transfer_id": transfer.id,
+            "ward": transfer.from_ward,
+            "related_ward": transfer.to_ward,
+            "event_type": WardCensusEventType.TRANSFER_OUT.value,
+            "event_at": moved_at,
+        })
+        events.append({
+            "ward_admission_id": admission.id,
+            "transfer_id": transfer.id,
+            "ward": transfer.to_ward,
+            "related_ward": transfer.from_ward,
+            "event_type": WardCensusEventType.TRANSFER_IN.value,
+            "event_at": moved_at,
+        })
+
+    left_at = _exit_time(admission.discharged_at, admission.death_recorded_at)
+    if left_at is not None:
+        events.append({
+            "ward_admission_id": admission.id,
+            "ward": admission.ward,
+            "event_type": _exit_type(admission),
+            "event_at": left_at,
+        })
+    return events
+
+
+def rebuild_all_census(session: Session) -> dict:
+    """
+    Regenerate the whole event log and census from ward admissions and transfers.
+    Used by the backfill migration and to repair drift. Caller commits.
+    """
+    session.info[_APPLYING] = True
+    try:
+        session.execute(delete(WardDailyCensus))
+        session.execute(delete(WardCensusEvent))
+
+        event_count = 0
+        first_day_by_ward: Dict[str, date] = {}
+        for admission in session.execute(select(WardAdmission)).scalars().all():
+            for census_event in admission_history_events(session, admission):
+                census_event["event_date"] = census_event["event_at"].date()
+                session.execute(insert(WardCensusEvent).values(**census_event))
+                ward = census_event["ward"]
+                first_day_by_ward[ward] = min(census_event["event_date"], first_day_by_ward.get(ward, census_event["event_date"]))
+                event_count += 1
+
+        census_rows = 0
+        for ward, start in first_day_by_ward.items():
+            census_rows += rebuild_ward_census(session, ward, start)
+    finally:
+        session.info.pop(_APPLYING, None)
+
+    return {"events": event_count, "wards": len(first_day_by_ward), "census_rows": census_rows}
+
+
+def get_ward_census(session: Session, ward: str, start_date: date, end_date: date) -> List[dict]:
+    """
+    Daily census for every day in the range (days without events carry the
+    previous closing forward). Two queries regardless of how many admissions exist.
+    """
+    carried = session.execute(
+        select(WardDailyCensus.closing).where(
+            WardDailyCensus.ward == ward,
+            WardDailyCensus.census_date < start_date
+        ).order_by(WardDailyCensus.census_date.desc()).limit(1)
+    ).scalar() or 0
+
+    rows = {
+        row.census_date: row
+        for row in session.execute(
+            select(WardDailyCensus).where(
+                WardDailyCensus.ward == ward,
+                WardDailyCensus.census_date >= start_date,
+                WardDailyCensus.census_date <= end_date
+            )
+        ).scalars().all()
+    }
+
+    days = []
+    day = start_date
+    while day <= end_date:
+        row = rows.get(day)
+        if row is not None:
+            values = {field: getattr(row, field) for field in _CENSUS_FIELDS}
+        else:
+            values = {field: 0 for field in _CENSUS_FIELDS}
+            values["opening"] = values["closing"] = carried
+        carried = values["closing"]
+        days.append({"date": day.isoformat(), **values})
+        day += timedelta(days=1)
+    return days
+
+
+def get_ward_day_events(session: Session, ward: str, day: date) -> List[WardCensusEvent]:
+    """Events recorded against a ward on one census day"""
+    return session.execute(
+        select(WardCensusEvent).where(
+            WardCensusEvent.ward == ward,
+            WardCensusEvent.event_date == day
+        ).order_by(WardCensusEvent.event_at, WardCensusEvent.id)
+    ).scalars().all()
@@ -0,0 +1,192 @@
+"""
+Benchmark: blood bank request queue vs the previous blood transfusion request listing
+
+Seeds a throwaway in-memory SQLite database with thousands of historical blood
+requests (fulfilled, cancelled and returned) and a small live queue (pending
+and accepted), then loads the lab's pending and accepted lists with:
+- the previous approach: the blood request screens load the whole listing
+  (no status filter) with joinedload of type, admission, encounter, patient
+  and four User relationships, and filter it client-side
+- get_blood_request_queue: one page through the (status, requested_at, id)
+  index, one joined query plus batched staff names and unit numbers
+Checks that the first page matches the oldest rows of the legacy listing and
+reports time and query counts, plus the time to reserve and issue units.
+
+Usage:
+    python benchmark_blood_bank_queue.py [historical_requests] [rounds]
+
+Example:
+    python benchmark_blood_bank_queue.py 20000 20
+"""
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+# Add backend directory to path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import joinedload, sessionmaker
+from app.core.database import Base
+from app.core.datetime_utils import utcnow
+import app.models  # Register all models
+from app.models.admission import AdmissionRecommendation
+from app.models.blood_transfusion_request import BloodTransfusionRequest
+from app.models.blood_transfusion_type import BloodTransfusionType
+from app.models.encounter import Encounter
+from app.models.patient import Patient
+from app.models.user import User
+from app.models.ward_admission import WardAdmission
+from app.services.blood_bank import get_blood_request_queue, issue_units, receive_units, reserve_units
+
+WARDS = [f"Ward {chr(ord('A') + i)}" for i in range(8)]
+PAGE_SIZE = 50
+
+
+def seed(db, historical: int):
+    """Staff, 400 admissions, blood types, `historical` closed requests and a live queue of 150"""
+    rng = random.Random(39)
+    staff = [User(username=f"staff{i}", hashed_password="x", full_name=f"Staff Member {i}", role="Lab") for i in range(30)]
+    db.add_all(staff)
+    types = [
+        BloodTransfusionType(type_name=name, unit_price=price, unit_type="unit", created_by=1)
+        for name, price in (("Whole Blood", 150.0), ("Packed Cells", 120.0), ("Plasma", 80.0), ("Platelets", 200.0))
+    ]
+    db.add_all(types)
+    db.flush()
+
+    admissions = []
+    for i in range(400):
+        patient = Patient(name=f"Patient{i}", surname="Mensah", gender="F", card_number=f"ER-A25-C{i:05d}")
+        db.add(patient)
+        db.flush()
+        encounter = Encounter(patient_id=patient.id, department="General", created_by=staff[0].id)
+        db.add(encounter)
+        db.flush()
+        recommendation = AdmissionRecommendation(encounter_id=encounter.id, ward=WARDS[i % len(WARDS)], recommended_by=staff[0].id)
+        db.add(recommendation)
+        db.flush()
+        admission = WardAdmission(
+            admission_recommendation_id=recommendation.id, encounter_id=encounter.id,
+            ward=recommendation.ward, admitted_by=staff[0].id
+        )
+        db.add(admission)
+        admissions.append(admission)
+    db.flush()
+
+    start = utcnow() - timedelta(days=365)
+    statuses = ["fulfilled"] * 8 + ["cancelled", "returned"]
+    rows = []
+    for i in range(historical + 150):
+        admission = rng.choice(admissions)
+        if i < historical:
+            status = rng.choice(statuses)
+        else:
+            status = "pending" if i < historical + 100 else "accepted"
+        requested_at = start + timedelta(minutes=i * (365 * 24 * 60) // (historical + 150))
+        rows.append(BloodTransfusionRequest(
+            ward_admission_id=admission.id, encounter_id=admission.encounter_id,
+            transfusion_type_id=rng.choice(types).id, quantity=rng.choice([1.0, 1.0, 2.0]),
+            status=status, requested_by=rng.choice(staff).id, requested_at=requested_at,
+            accepted_by=rng.choice(staff).id if status != "pending" else None,
+            fulfilled_by=rng.choice(staff).id if status == "fulfilled" else None,
+        ))
+    db.add_all(rows)
+    db.commit()
+    return types, staff
+
+
+def legacy_listing(db, status=None):
+    """The blood transfusion request listing as it was: every request (of the status), eagerly loaded"""
+    query = db.query(BloodTransfusionRequest).options(
+        joinedload(BloodTransfusionRequest.transfusion_type),
+        joinedload(BloodTransfusionRequest.ward_admission).joinedload(WardAdmission.encounter).joinedload(Encounter.patient),
+        joinedload(BloodTransfusionRequest.requester),
+        joinedload(BloodTransfusionRequest.accepter),
+        joinedload(BloodTransfusionRequest.fulfiller),
+        joinedload(BloodTransfusionRequest.returner)
+    )
+    if status:
+        query = query.filter(BloodTransfusionRequest.status == status)
+    requests = query.order_by(BloodTransfusionRequest.requested_at.desc()).all()
+    return [{
+        "id": req.id,
+        "patient_card_number": req.ward_admission.encounter.patient.card_number,
+        "ward": req.ward_admission.ward,
+        "transfusion_type_name": req.transfusion_type.type_name,
+        "requested_by_name": req.requester.full_name if req.requester else None,
+        "accepted_by_name": req.accepter.full_name if req.accepter else None,
+    } for req in requests]
+
+
+def main():
+    historical = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+
+    query_count = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        query_count["n"] += 1
+
+    print(f"Seeding {historical} historical blood requests...")
+    types, staff = seed(db, historical)
+
+    def run(label, load):
+        db.expire_all()
+        query_count["n"] = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            load()
+        elapsed_ms = (time.perf_counter() - start) * 1000 / rounds
+        print(f"{label:<30}{elapsed_ms:9.1f} ms  {query_count['n'] // rounds:4d} queries")
+        return elapsed_ms
+
+    print(f"Loading the pending and accepted lists, averaged over {rounds} round(s):")
+    legacy_ms = run("Full eager listing (legacy):", lambda: legacy_listing(db))
+    run("Eager listing, per status:", lambda: [legacy_listing(db, status) for status in ("pending", "accepted")])
+    queue_ms = run(f"Queue, first page of {PAGE_SIZE}:", lambda: [
+        get_blood_request_queue(db, status, limit=PAGE_SIZE) for status in ("pending", "accepted")
+    ])
+    run("Queue, ward filter:", lambda: [
+        get_blood_request_queue(db, status, ward=WARDS[0], limit=PAGE_SIZE) for status in ("pending", "accepted")
+    ])
+
+    # Reserve and issue against a stocked type
+    receive_units(db, types[0].id, [f"BAG{i:05d}" for i in range(500)], staff[0].id, expires_at=utcnow() + timedelta(days=30))
+    db.commit()
+    pending = db.query(BloodTransfusionRequest).filter(
+        BloodTransfusionRequest.status == "pending", BloodTransfusionRequest.transfusion_type_id == types[0].id
+    ).limit(20).all()
+    start = time.perf_counter()
+    for blood_request in pending:
+        reserve_units(db, blood_request)
+        blood_request.status = "accepted"
+        db.commit()
+        issue_units(db, blood_request)
+        blood_request.status = "fulfilled"
+        db.commit()
+    if pending:
+        print(f"{'Reserve + issue, per request:':<30}{(time.perf_counter() - start) * 1000 / len(pending):9.1f} ms")
+
+    if queue_ms > 0:
+        print(f"Speed-up:                     {legacy_ms / queue_ms:9.1f}x")
+
+    legacy = legacy_listing(db, "pending")
+    page = get_blood_request_queue(db, "pending", limit=PAGE_SIZE)["items"]
+    oldest = sorted(legacy, key=lambda row: row["id"])[:PAGE_SIZE]
+    page_subset = [{key: row[key] for key in oldest[0]} for row in page] if oldest else []
+    if oldest != page_subset:
+        print("✗ Queue page differs from the oldest rows of the legacy listing")
+        sys.exit(1)
+    print("✓ Queue page matches the legacy listing")
+
+
+if __name__ == "__main__":
+    main()
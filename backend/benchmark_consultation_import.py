@@ -0,0 +1,151 @@
+"""
+Benchmark: consultation router import time and per-request import overhead
+
+Imports app.api.consultation in fresh interpreters (FastAPI, SQLAlchemy and the
+models preloaded, so only the consultation package itself is timed) and fails
+when the median exceeds the budget or when the import drags in a heavy optional
+library (pandas, openpyxl, fpdf2, Pillow, pikepdf, pypdfium2) that should only
+load on first use.
+
+It also counts the import statements left inside endpoint functions - each runs
+on every request - and times one such (already cached) import to estimate the
+per-request cost. Given a git ref, the same numbers are reported for the
+consultation module at that ref, for a before / after comparison.
+
+Usage:
+    python benchmark_consultation_import.py [budget_ms] [git_ref]
+
+Example:
+    python benchmark_consultation_import.py 750 HEAD~1
+"""
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+PACKAGE_DIR = BACKEND_DIR / "app" / "api" / "consultation"
+LEGACY_MODULE = "backend/app/api/consultation.py"
+RUNS = 5
+HEAVY_MODULES = ("pandas", "openpyxl", "fpdf", "PIL", "pikepdf", "pypdfium2")
+
+# Shared by every router; imported before the clock starts
+PRELOAD = "import fastapi, fastapi.openapi.models, sqlalchemy, pydantic, app.models, app.core.dependencies"
+
+IMPORT_SNIPPET = """
+import importlib.util, json, sys, time
+sys.path.insert(0, {backend!r})
+{preload}
+start = time.perf_counter()
+{import_statement}
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed_ms, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def time_import(import_statement: str) -> dict:
+    """Median import time over RUNS fresh interpreters, and heavy modules it loaded"""
+    code = IMPORT_SNIPPET.format(
+        backend=str(BACKEND_DIR), preload=PRELOAD, import_statement=import_statement, heavy=HEAVY_MODULES
+    )
+    env = dict(os.environ, SQLITE_DB_PATH=os.environ.get("SQLITE_DB_PATH", os.path.join(tempfile.gettempdir(), "benchmark_import.db")))
+    samples, heavy = [], set()
+    for _ in range(RUNS):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=BACKEND_DIR, env=env)
+        if result.returncode != 0:
+            raise SystemExit(f"Import failed:\n{result.stderr}")
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(measured["ms"])
+        heavy.update(measured["heavy"])
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples), "heavy": sorted(heavy)}
+
+
+def local_imports(sources) -> dict:
+    """Import statements inside endpoint functions (decorated with @router.*)"""
+    per_endpoint = []
+    for source in sources:
+        for node in ast.parse(source).body:
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) or not node.decorator_list:
+                continue
+            count = sum(isinstance(child, (ast.Import, ast.ImportFrom)) for child in ast.walk(node))
+            per_endpoint.append(count)
+    return {
+        "endpoints": len(per_endpoint),
+        "statements": sum(per_endpoint),
+        "endpoints_with_imports": sum(1 for count in per_endpoint if count),
+        "max_per_endpoint": max(per_endpoint, default=0),
+        "avg_per_endpoint": sum(per_endpoint) / len(per_endpoint) if per_endpoint else 0.0,
+    }
+
+
+def local_import_cost_us() -> float:
+    """Cost of executing one function-local import of an already imported module"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    import app.models.ward_admission  # noqa: F401 - cached before timing
+
+    def endpoint_body():
+        from app.models.ward_admission import WardAdmission  # noqa: F401
+
+    runs = 200_000
+    return min(timeit.repeat(endpoint_body, number=runs, repeat=5)) / runs * 1e6
+
+
+def report(label: str, timing: dict, imports: dict, cost_us: float) -> None:
+    print(f"{label}")
+    print(f"  Import time:            {timing['median_ms']:8.1f} ms median ({timing['min_ms']:.1f} ms best of {RUNS})")
+    print(f"  Heavy libraries loaded: {', '.join(timing['heavy']) or 'none'}")
+    print(f"  Endpoints:              {imports['endpoints']:8d}")
+    print(f"  Local imports:          {imports['statements']:8d} in {imports['endpoints_with_imports']} endpoints "
+          f"(max {imports['max_per_endpoint']} per endpoint)")
+    print(f"  Import overhead:        {imports['avg_per_endpoint'] * cost_us:8.2f} us per request on average, "
+          f"{imports['max_per_endpoint'] * cost_us:.2f} us worst case")
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 750.0
+    ref = sys.argv[2] if len(sys.argv) > 2 else None
+
+    cost_us = local_import_cost_us()
+    print(f"One cached function-local import: {cost_us:.3f} us\n")
+
+    if ref:
+        legacy = subprocess.run(
+            ["git", "show", f"{ref}:{LEGACY_MODULE}"], capture_output=True, text=True, cwd=BACKEND_DIR
+        )
+        if legacy.returncode != 0:
+            raise SystemExit(f"{LEGACY_MODULE} not found at {ref}")
+        with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as handle:
+            handle.write(legacy.stdout)
+        try:
+            before = time_import(
+                f"spec = importlib.util.spec_from_file_location('consultation_before', {handle.name!r}); "
+                "spec.loader.exec_module(importlib.util.module_from_spec(spec))"
+            )
+        finally:
+            os.remove(handle.name)
+        report(f"Before ({ref}, single module)", before, local_imports([legacy.stdout]), cost_us)
+        print()
+
+    after = time_import("import app.api.consultation")
+    sources = [path.read_text() for path in sorted(PACKAGE_DIR.glob("*.py"))]
+    report("Current (app.api.consultation package)", after, local_imports(sources), cost_us)
+
+    failed = False
+    if after["median_ms"] > budget_ms:
+        print(f"✗ Import time {after['median_ms']:.1f} ms is over the {budget_ms:.0f} ms budget")
+        failed = True
+    if after["heavy"]:
+        print(f"✗ Importing the router loads {', '.join(after['heavy'])} - import these where they are used")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"✓ Within the {budget_ms:.0f} ms import budget")
+
+
+if __name__ == "__main__":
+    main()
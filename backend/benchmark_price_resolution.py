@@ -0,0 +1,132 @@
+"""
+Benchmark: batch price resolution vs per-item price lookups
+
+Seeds a throwaway in-memory SQLite database with procedure, surgery, unmapped DRG
+and product prices, then resolves the same list of (code, service_type,
+procedure_name, insured) requests with get_price_from_all_tables (one call per
+item) and with get_prices_batch (one IN-query per price table). Checks that
+both paths return identical prices and reports time and query counts.
+
+Usage:
+    python benchmark_price_resolution.py [number_of_items]
+
+Example:
+    python benchmark_price_resolution.py 200
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+# Add backend directory to path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models.procedure_price import ProcedurePrice
+from app.models.surgery_price import SurgeryPrice
+from app.models.product_price import ProductPrice
+from app.models.unmapped_drg_price import UnmappedDRGPrice
+from app.services.price_list_service_v2 import get_price_from_all_tables, get_prices_batch
+
+SERVICE_TYPES = ["Lab", "Scan", "X-ray", "OPD", "Surgery"]
+PRICE_TABLES = [ProcedurePrice, SurgeryPrice, UnmappedDRGPrice, ProductPrice]
+
+
+def seed(db, codes_per_table: int = 2000):
+    """Insert price rows - several rows per DRG code to exercise the fallback passes"""
+    rng = random.Random(42)
+    for model, prefix in ((ProcedurePrice, "PROC"), (SurgeryPrice, "SURG"), (UnmappedDRGPrice, "UDRG")):
+        for i in range(codes_per_table):
+            for service_type in rng.sample(SERVICE_TYPES, 2):
+                db.add(model(
+                    g_drg_code=f"{prefix}{i:05d}",
+                    service_type=service_type,
+                    service_name=f"{prefix} service {i} {service_type}",
+                    base_rate=rng.randint(5, 500),
+                    nhia_claim_co_payment=rng.choice([None, rng.randint(0, 50)]),
+                    is_active=True
+                ))
+    for i in range(codes_per_table):
+        db.add(ProductPrice(
+            medication_code=f"MED{i:05d}",
+            product_name=f"Product {i}",
+            base_rate=rng.randint(1, 200),
+            nhia_claim_co_payment=rng.choice([None, rng.randint(0, 20)]),
+            insurance_covered=rng.choice(["yes", "no", None]),
+            is_active=True
+        ))
+    db.commit()
+
+
+def build_requests(count: int, codes_per_table: int = 2000):
+    """Mix of exact matches, fallback matches, products and unknown codes"""
+    rng = random.Random(7)
+    requests = []
+    for _ in range(count):
+        kind = rng.random()
+        insured = rng.random() < 0.5
+        if kind < 0.7:
+            prefix = rng.choice(["PROC", "SURG", "UDRG"])
+            i = rng.randrange(codes_per_table)
+            service_type = rng.choice(SERVICE_TYPES + [None])
+            procedure_name = rng.choice([None, f"{prefix} service {i} {service_type}"])
+            requests.append((f"{prefix}{i:05d}", service_type, procedure_name, insured))
+        elif kind < 0.95:
+            requests.append((f"MED{rng.randrange(codes_per_table):05d}", None, None, insured))
+        else:
+            requests.append((f"MISSING{rng.randrange(1000)}", rng.choice(SERVICE_TYPES), None, insured))
+    return requests
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[model.__table__ for model in PRICE_TABLES])
+    db = sessionmaker(bind=engine)()
+
+    query_count = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        query_count["n"] += 1
+
+    print("Seeding price tables...")
+    seed(db)
+    requests = build_requests(count)
+
+    # Per-item path (silence its debug prints so they do not dominate the timing output)
+    query_count["n"] = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        per_item = [get_price_from_all_tables(db, code, insured, service_type, name)
+                    for code, service_type, name, insured in requests]
+    per_item_ms = (time.perf_counter() - start) * 1000
+    per_item_queries = query_count["n"]
+
+    # Batch path
+    query_count["n"] = 0
+    start = time.perf_counter()
+    batch = get_prices_batch(db, requests)
+    batch_ms = (time.perf_counter() - start) * 1000
+    batch_queries = query_count["n"]
+
+    mismatches = [(req, a, b) for req, a, b in zip(requests, per_item, batch) if a != b]
+
+    print(f"Items resolved:     {count}")
+    print(f"Per-item lookups:   {per_item_ms:9.1f} ms  {per_item_queries:6d} queries")
+    print(f"Batch lookup:       {batch_ms:9.1f} ms  {batch_queries:6d} queries")
+    if batch_ms > 0:
+        print(f"Speed-up:           {per_item_ms / batch_ms:9.1f}x")
+    if mismatches:
+        print(f"✗ {len(mismatches)} price mismatches, e.g. {mismatches[:3]}")
+        sys.exit(1)
+    print("✓ Batch prices match per-item prices")
+
+
+if __name__ == "__main__":
+    main()
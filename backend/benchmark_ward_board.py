@@ -0,0 +1,230 @@
+"""
+Benchmark: ward board (batched lookups) vs the previous per-row ward admissions listing
+
+Seeds a throwaway in-memory SQLite database with a 200-bed hospital (10 wards of
+20 beds, most beds occupied, some discharged admissions and accepted transfers),
+then refreshes every ward's board with:
+- the previous approach: NOT IN over accepted transfers, three User queries and
+  several print() calls per admission
+- get_ward_admission_rows: one joined query plus one batched User query
+- get_ward_board with fields= and with since= after a few admissions change
+Checks that the rows match and reports time, query counts and payload size.
+
+Usage:
+    python benchmark_ward_board.py [refresh_rounds]
+
+Example:
+    python benchmark_ward_board.py 20
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+# Add backend directory to path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import and_, create_engine, event, update
+from sqlalchemy.orm import joinedload, sessionmaker
+from app.core.database import Base
+from app.core.datetime_utils import utcnow
+import app.models  # Register all models
+from app.models.admission import AdmissionRecommendation
+from app.models.bed import Bed
+from app.models.encounter import Encounter
+from app.models.patient import Patient
+from app.models.user import User
+from app.models.ward_admission import WardAdmission
+from app.models.ward_transfer import WardTransfer
+from app.services.ward_board import SINCE_SAFETY_MARGIN, get_ward_admission_rows, get_ward_board, parse_fields
+
+WARDS = [f"Ward {chr(ord('A') + i)}" for i in range(10)]
+BEDS_PER_WARD = 20
+BOARD_FIELDS = "bed_number,patient_name,patient_surname,patient_card_number,patient_gender,doctor_name,admitted_at"
+
+
+def seed(db):
+    """200 beds, ~180 active admissions, 60 discharged admissions, 30 accepted transfers"""
+    rng = random.Random(42)
+    staff = []
+    for i in range(30):
+        staff.append(User(
+            username=f"staff{i}", hashed_password="x", full_name=f"Staff Member {i}",
+            role=rng.choice(["Nurse", "Doctor", "PA"])
+        ))
+    db.add_all(staff)
+    db.flush()
+
+    beds = {}
+    for ward in WARDS:
+        beds[ward] = [Bed(ward=ward, bed_number=f"{ward[-1]}{n + 1}", is_active=True) for n in range(BEDS_PER_WARD)]
+        db.add_all(beds[ward])
+    db.flush()
+
+    admissions = []
+    for i in range(240):
+        ward = WARDS[i % len(WARDS)]
+        discharged = i >= 180
+        patient = Patient(
+            name=f"Patient{i}", surname=rng.choice(["Mensah", "Owusu", "Boateng", "Asante"]),
+            gender=rng.choice(["M", "F"]), card_number=f"ER-A25-B{i:05d}",
+            date_of_birth=date(1950, 1, 1) + timedelta(days=rng.randrange(25000)),
+            emergency_contact_name=f"Contact {i}", emergency_contact_number=f"024{i:07d}"
+        )
+        db.add(patient)
+        db.flush()
+        encounter = Encounter(patient_id=patient.id, department="General", created_by=rng.choice(staff).id)
+        db.add(encounter)
+        db.flush()
+        recommendation = AdmissionRecommendation(encounter_id=encounter.id, ward=ward, recommended_by=rng.choice(staff).id)
+        db.add(recommendation)
+        db.flush()
+        bed = None if discharged else beds[ward][(i // len(WARDS)) % BEDS_PER_WARD]
+        admission = WardAdmission(
+            admission_recommendation_id=recommendation.id, encounter_id=encounter.id, ward=ward,
+            bed_id=bed.id if bed else None, doctor_id=rng.choice(staff).id, admitted_by=rng.choice(staff).id,
+            admitted_at=utcnow() - timedelta(days=rng.randrange(1, 30), minutes=i),
+            discharged_at=utcnow() - timedelta(hours=i) if discharged else None,
+            discharged_by=rng.choice(staff).id if discharged else None,
+        )
+        db.add(admission)
+        admissions.append(admission)
+    db.flush()
+
+    # Accepted transfers (ward updated) and a few where the ward was not updated
+    for admission in rng.sample(admissions[:180], 30):
+        to_ward = rng.choice([ward for ward in WARDS if ward != admission.ward])
+        db.add(WardTransfer(
+            ward_admission_id=admission.id, from_ward=admission.ward, to_ward=to_ward,
+            status="accepted", transferred_by=rng.choice(staff).id
+        ))
+        if rng.random() < 0.8:
+            admission.ward = to_ward
+    db.commit()
+    return admissions
+
+
+def legacy_board(db, ward):
+    """The ward admissions listing as it was: NOT IN subquery and per-row User lookups and prints"""
+    query = db.query(WardAdmission).filter(WardAdmission.discharged_at.is_(None), WardAdmission.ward == ward)
+    accepted_transfers_subquery = db.query(WardTransfer.ward_admission_id).filter(
+        and_(WardTransfer.status == "accepted", WardTransfer.from_ward == ward, WardTransfer.to_ward != ward)
+    )
+    query = query.filter(~WardAdmission.id.in_(accepted_transfers_subquery))
+    ward_admissions = query.options(
+        joinedload(WardAdmission.encounter).joinedload(Encounter.patient),
+        joinedload(WardAdmission.bed)
+    ).order_by(WardAdmission.admitted_at.desc()).all()
+
+    result = []
+    for ward_admission in ward_admissions:
+        patient = ward_admission.encounter.patient
+        admitted_user = db.query(User).filter(User.id == ward_admission.admitted_by).first()
+        discharged_user = db.query(User).filter(User.id == ward_admission.discharged_by).first() if ward_admission.discharged_by else None
+        doctor_user = db.query(User).filter(User.id == ward_admission.doctor_id).first() if ward_admission.doctor_id else None
+        bed_number = ward_admission.bed.bed_number if ward_admission.bed else None
+        print(f"DEBUG get_ward_admissions: Ward admission {ward_admission.id} has bed_id={ward_admission.bed_id}, bed_number={bed_number}")
+        print(f"Ward admission {ward_admission.id} - Patient {patient.card_number}: emergency_contact_name={patient.emergency_contact_name}")
+        result.append({
+            "id": ward_admission.id,
+            "bed_number": bed_number,
+            "patient_card_number": patient.card_number,
+            "doctor_name": doctor_user.full_name if doctor_user else None,
+            "admitted_by_name": admitted_user.full_name if admitted_user else None,
+            "discharged_by_name": discharged_user.full_name if discharged_user else None,
+        })
+    return result
+
+
+def _silenced(func, *args):
+    """Run the legacy listing without letting its prints reach the terminal (they still cost I/O)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def payload_bytes(payload) -> int:
+    return len(json.dumps(payload, default=str).encode())
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+
+    query_count = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(conn, cursor, statement, parameters, context, executemany):
+        query_count["n"] += 1
+
+    print("Seeding a 200-bed hospital...")
+    seed(db)
+    # Seeded rows were last changed well before the board's since=, which looks back SINCE_SAFETY_MARGIN
+    seeded_at = utcnow() - SINCE_SAFETY_MARGIN * 10
+    db.execute(update(WardAdmission).values(updated_at=seeded_at))
+    db.execute(update(Patient).values(updated_at=seeded_at))
+    db.commit()
+
+    def run(label, refresh, report_size=True):
+        db.expire_all()
+        query_count["n"] = 0
+        start = time.perf_counter()
+        size = 0
+        for _ in range(rounds):
+            for ward in WARDS:
+                size = payload_bytes(refresh(ward))
+        elapsed_ms = (time.perf_counter() - start) * 1000 / rounds
+        queries = query_count["n"] // rounds
+        size_text = f"{size:8d} bytes (last ward)" if report_size else ""
+        print(f"{label:<28}{elapsed_ms:9.1f} ms  {queries:6d} queries  {size_text}")
+        return elapsed_ms
+
+    print(f"Refreshing all {len(WARDS)} wards, averaged over {rounds} round(s):")
+    legacy_ms = run("Per-row lookups (legacy):", lambda ward: _silenced(legacy_board, db, ward), report_size=False)
+    board_ms = run("Batched board:", lambda ward: get_ward_admission_rows(db, ward))
+    fields = parse_fields(BOARD_FIELDS)
+    run("Batched board, fields=:", lambda ward: get_ward_admission_rows(db, ward, fields=fields))
+
+    since = utcnow()
+    time.sleep(0.01)
+    changed = db.query(WardAdmission).filter(WardAdmission.discharged_at.is_(None)).limit(3).all()
+    for admission in changed:
+        admission.admission_notes = "Reviewed on the ward round"
+    db.commit()
+    run("Incremental, since=:", lambda ward: get_ward_board(db, ward, since=since, fields=fields))
+
+    mismatches = []
+    for ward in WARDS:
+        legacy = _silenced(legacy_board, db, ward)
+        board = get_ward_admission_rows(db, ward)
+        board_subset = [{key: row[key] for key in legacy[0]} for row in board] if legacy else []
+        if sorted(legacy, key=lambda r: r["id"]) != sorted(board_subset, key=lambda r: r["id"]):
+            mismatches.append(ward)
+
+    incremental_rows = sum(len(get_ward_board(db, ward, since=since)["items"]) for ward in WARDS)
+    if board_ms > 0:
+        print(f"Speed-up:                   {legacy_ms / board_ms:9.1f}x")
+    print(f"Rows returned by since=:    {incremental_rows} (changed: {len(changed)})")
+    failed = False
+    if mismatches:
+        print(f"✗ Board rows differ from the legacy listing for: {', '.join(mismatches)}")
+        failed = True
+    else:
+        print("✓ Board rows match the legacy listing")
+    if incremental_rows != len(changed):
+        print(f"✗ since= returned {incremental_rows} rows, expected the {len(changed)} changed")
+        failed = True
+    else:
+        print("✓ since= returned only the changed rows")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Migration: Add compressed-copy (derivative) columns to attachments
+Existing attachments are left pending; queue them with
+POST /api/database/storage/attachments/compress
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+import app.models  # Register all models
+
+NEW_COLUMNS = [
+    ("derivative_status", "VARCHAR(20) NOT NULL DEFAULT 'pending'"),
+    ("derivative_path", "VARCHAR(255) NULL"),
+    ("derivative_size_bytes", "INTEGER NULL"),
+    ("derivative_mime_type", "VARCHAR(100) NULL"),
+    ("derivative_processed_at", "DATETIME NULL"),
+]
+
+
+def migrate():
+    """Add the derivative columns and status index to attachments"""
+    inspector = inspect(engine)
+    if "attachments" not in inspector.get_table_names():
+        print("✓ attachments table does not exist yet - columns will be created with it")
+        return
+
+    existing_columns = [c["name"] for c in inspector.get_columns("attachments")]
+    existing_indexes = [i["name"] for i in inspector.get_indexes("attachments")]
+    with engine.begin() as conn:
+        for column, definition in NEW_COLUMNS:
+            if column in existing_columns:
+                print(f"✓ Column {column} already exists")
+                continue
+            print(f"Adding column {column}...")
+            conn.execute(text(f"ALTER TABLE attachments ADD COLUMN {column} {definition}"))
+            print(f"✓ Added column {column}")
+        if "ix_attachments_derivative_status" in existing_indexes:
+            print("✓ Index ix_attachments_derivative_status already exists")
+        else:
+            conn.execute(text("CREATE INDEX ix_attachments_derivative_status ON attachments (derivative_status)"))
+            print("✓ Created index ix_attachments_derivative_status")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,66 @@
+"""
+Migration: Add denormalized bill totals
+- bills.balance
+- encounters.bill_total_amount, encounters.bill_paid_amount, encounters.bill_balance
+- indexes on bills.encounter_id and bill_items.bill_id
+Then backfills the values with the bill totals reconciliation job.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine, SessionLocal
+import app.models  # Register all models
+from app.services.bill_totals import reconcile_bill_totals
+
+NEW_COLUMNS = [
+    ("bills", "balance"),
+    ("encounters", "bill_total_amount"),
+    ("encounters", "bill_paid_amount"),
+    ("encounters", "bill_balance"),
+]
+
+NEW_INDEXES = [
+    ("ix_bills_encounter_id", "bills", "encounter_id"),
+    ("ix_bill_items_bill_id", "bill_items", "bill_id"),
+]
+
+
+def migrate():
+    """Add bill totals columns and indexes, then backfill"""
+    inspector = inspect(engine)
+    
+    with engine.begin() as conn:
+        for table, column in NEW_COLUMNS:
+            existing = [c["name"] for c in inspector.get_columns(table)]
+            if column in existing:
+                print(f"✓ {table}.{column} already exists")
+                continue
+            print(f"Adding {table}.{column}...")
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} FLOAT NOT NULL DEFAULT 0"))
+            print(f"✓ Added {table}.{column}")
+        
+        for index_name, table, column in NEW_INDEXES:
+            existing = [i["name"] for i in inspector.get_indexes(table)]
+            if index_name in existing:
+                print(f"✓ Index {index_name} already exists")
+                continue
+            print(f"Creating index {index_name}...")
+            conn.execute(text(f"CREATE INDEX {index_name} ON {table} ({column})"))
+            print(f"✓ Created index {index_name}")
+    
+    print("Backfilling bill and encounter totals...")
+    db = SessionLocal()
+    try:
+        result = reconcile_bill_totals(db, repair=True)
+        print(f"✓ Checked {result['bills_checked']} bill(s); repaired {result['bill_drift_count']} bill(s) "
+              f"and {result['encounter_drift_count']} encounter(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
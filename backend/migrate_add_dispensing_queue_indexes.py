@@ -0,0 +1,40 @@
+"""
+Migration: Add pharmacy dispensing queue indexes to inpatient_prescriptions
+- (created_at, id) for the oldest-first queue and its cursor pagination
+- clinical_review_id for the prescription -> clinical review join
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+NEW_INDEXES = [
+    ("ix_inpatient_prescriptions_created", "created_at, id"),
+    ("ix_inpatient_prescriptions_clinical_review_id", "clinical_review_id"),
+]
+
+
+def migrate():
+    """Create the dispensing queue indexes"""
+    inspector = inspect(engine)
+    if "inpatient_prescriptions" not in inspector.get_table_names():
+        print("✓ inpatient_prescriptions table does not exist yet - indexes will be created with it")
+        return
+
+    existing_indexes = [i["name"] for i in inspector.get_indexes("inpatient_prescriptions")]
+    with engine.begin() as conn:
+        for index_name, columns in NEW_INDEXES:
+            if index_name in existing_indexes:
+                print(f"✓ Index {index_name} already exists")
+                continue
+            print(f"Creating index {index_name}...")
+            conn.execute(text(f"CREATE INDEX {index_name} ON inpatient_prescriptions ({columns})"))
+            print(f"✓ Created index {index_name}")
+
+
+if __name__ == "__main__":
+    migrate()
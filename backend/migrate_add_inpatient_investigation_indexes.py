@@ -0,0 +1,41 @@
+"""
+Migration: Add worklist indexes to inpatient_investigations
+- (investigation_type, status, created_at) and (investigation_type, created_at) for the unified OPD + IPD worklist
+- clinical_review_id for the review -> admission -> patient join
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+NEW_INDEXES = [
+    ("ix_inpatient_investigations_type_status_created", "investigation_type, status, created_at"),
+    ("ix_inpatient_investigations_type_created", "investigation_type, created_at"),
+    ("ix_inpatient_investigations_clinical_review_id", "clinical_review_id"),
+]
+
+
+def migrate():
+    """Create the inpatient investigation worklist indexes"""
+    inspector = inspect(engine)
+    if "inpatient_investigations" not in inspector.get_table_names():
+        print("✓ inpatient_investigations table does not exist yet - indexes will be created with it")
+        return
+
+    existing_indexes = [i["name"] for i in inspector.get_indexes("inpatient_investigations")]
+    with engine.begin() as conn:
+        for index_name, columns in NEW_INDEXES:
+            if index_name in existing_indexes:
+                print(f"✓ Index {index_name} already exists")
+                continue
+            print(f"Creating index {index_name}...")
+            conn.execute(text(f"CREATE INDEX {index_name} ON inpatient_investigations ({columns})"))
+            print(f"✓ Created index {index_name}")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,67 @@
+"""
+Migration: Add investigation worklist support
+- investigations.updated_at (change marker for worklist ETags)
+- investigations.patient_display_name, investigations.patient_card_number (denormalized patient details)
+- composite indexes on (investigation_type, status, created_at) and (investigation_type, created_at)
+Then backfills the patient details from each investigation's encounter.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine, SessionLocal
+import app.models  # Register all models
+from app.services.investigation_worklist import backfill_patient_details
+
+NEW_COLUMNS = [
+    ("updated_at", "DATETIME NULL"),
+    ("patient_display_name", "VARCHAR(800) NULL"),
+    ("patient_card_number", "VARCHAR(50) NULL"),
+]
+
+NEW_INDEXES = [
+    ("ix_investigations_type_status_created", "investigation_type, status, created_at"),
+    ("ix_investigations_type_created", "investigation_type, created_at"),
+]
+
+
+def migrate():
+    """Add worklist columns and indexes to investigations, then backfill"""
+    inspector = inspect(engine)
+
+    with engine.begin() as conn:
+        existing_columns = [c["name"] for c in inspector.get_columns("investigations")]
+        for column, definition in NEW_COLUMNS:
+            if column in existing_columns:
+                print(f"✓ investigations.{column} already exists")
+                continue
+            print(f"Adding investigations.{column}...")
+            conn.execute(text(f"ALTER TABLE investigations ADD COLUMN {column} {definition}"))
+            print(f"✓ Added investigations.{column}")
+
+        existing_indexes = [i["name"] for i in inspector.get_indexes("investigations")]
+        for index_name, columns in NEW_INDEXES:
+            if index_name in existing_indexes:
+                print(f"✓ Index {index_name} already exists")
+                continue
+            print(f"Creating index {index_name}...")
+            conn.execute(text(f"CREATE INDEX {index_name} ON investigations ({columns})"))
+            print(f"✓ Created index {index_name}")
+
+        conn.execute(text("UPDATE investigations SET updated_at = created_at WHERE updated_at IS NULL"))
+
+    print("Backfilling patient details on investigations...")
+    db = SessionLocal()
+    try:
+        updated = backfill_patient_details(db)
+        db.commit()
+        print(f"✓ Backfilled {updated} investigation(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
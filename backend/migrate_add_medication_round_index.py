@@ -0,0 +1,38 @@
+"""
+Migration: Add the ward medication round index to treatment_sheet_administrations
+- (ward_admission_id, administration_date) for a day's administrations across a ward
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+INDEX_NAME = "ix_treatment_sheet_admin_admission_date"
+
+
+def migrate():
+    """Create the medication round index"""
+    inspector = inspect(engine)
+    if "treatment_sheet_administrations" not in inspector.get_table_names():
+        print("✓ treatment_sheet_administrations table does not exist yet - index will be created with it")
+        return
+
+    existing_indexes = [i["name"] for i in inspector.get_indexes("treatment_sheet_administrations")]
+    if INDEX_NAME in existing_indexes:
+        print(f"✓ Index {INDEX_NAME} already exists")
+        return
+
+    with engine.begin() as conn:
+        print(f"Creating index {INDEX_NAME}...")
+        conn.execute(text(
+            f"CREATE INDEX {INDEX_NAME} ON treatment_sheet_administrations (ward_admission_id, administration_date)"
+        ))
+        print(f"✓ Created index {INDEX_NAME}")
+
+
+if __name__ == "__main__":
+    migrate()
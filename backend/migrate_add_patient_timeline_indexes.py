@@ -0,0 +1,48 @@
+"""
+Migration: Add patient timeline indexes
+Indexes the parent id columns the patient timeline filters on with IN lists.
+MySQL already indexes foreign key columns, so a column that is the leading
+column of an existing index is skipped.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+NEW_INDEXES = [
+    ("encounters", "ix_encounters_patient_id", "patient_id"),
+    ("diagnoses", "ix_diagnoses_encounter_id", "encounter_id"),
+    ("prescriptions", "ix_prescriptions_encounter_id", "encounter_id"),
+    ("investigations", "ix_investigations_encounter_id", "encounter_id"),
+    ("doctor_note_entries", "ix_doctor_note_entries_encounter_id", "encounter_id"),
+    ("inpatient_clinical_reviews", "ix_inpatient_clinical_reviews_ward_admission_id", "ward_admission_id"),
+    ("inpatient_diagnoses", "ix_inpatient_diagnoses_clinical_review_id", "clinical_review_id"),
+    ("inpatient_vitals", "ix_inpatient_vitals_ward_admission_id", "ward_admission_id"),
+]
+
+
+def migrate():
+    """Create the patient timeline indexes"""
+    inspector = inspect(engine)
+    table_names = inspector.get_table_names()
+
+    with engine.begin() as conn:
+        for table, index_name, column in NEW_INDEXES:
+            if table not in table_names:
+                print(f"✓ {table} table does not exist yet - {index_name} will be created with it")
+                continue
+            indexes = inspector.get_indexes(table)
+            if any(i["column_names"] and i["column_names"][0] == column for i in indexes):
+                print(f"✓ {table}.{column} is already indexed")
+                continue
+            print(f"Creating index {index_name}...")
+            conn.execute(text(f"CREATE INDEX {index_name} ON {table} ({column})"))
+            print(f"✓ Created index {index_name}")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,41 @@
+"""
+Migration: Add ward board indexes
+- ward_admissions (ward, discharged_at) for the active-patients-per-ward board query
+- ward_transfers (ward_admission_id) for the transferred-out check on each board row
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+NEW_INDEXES = [
+    ("ward_admissions", "ix_ward_admissions_ward_discharged", "ward, discharged_at"),
+    ("ward_transfers", "ix_ward_transfers_ward_admission_id", "ward_admission_id"),
+]
+
+
+def migrate():
+    """Create the ward board indexes"""
+    inspector = inspect(engine)
+    table_names = inspector.get_table_names()
+
+    with engine.begin() as conn:
+        for table, index_name, columns in NEW_INDEXES:
+            if table not in table_names:
+                print(f"✓ {table} table does not exist yet - {index_name} will be created with it")
+                continue
+            existing_indexes = [i["name"] for i in inspector.get_indexes(table)]
+            if index_name in existing_indexes:
+                print(f"✓ Index {index_name} already exists")
+                continue
+            print(f"Creating index {index_name}...")
+            conn.execute(text(f"CREATE INDEX {index_name} ON {table} ({columns})"))
+            print(f"✓ Created index {index_name}")
+
+
+if __name__ == "__main__":
+    migrate()
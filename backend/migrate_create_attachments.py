@@ -0,0 +1,31 @@
+"""
+Migration: Create the attachments table (content-addressed attachment store)
+Existing result attachments keep their paths under uploads/lab_results,
+uploads/scan_results and uploads/xray_results and are served as before;
+new uploads go to uploads/attachments/.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect
+from app.core.database import engine
+import app.models  # Register all models
+from app.models.attachment import Attachment
+
+
+def migrate():
+    """Create the attachments table"""
+    inspector = inspect(engine)
+    if "attachments" in inspector.get_table_names():
+        print("✓ attachments table already exists")
+        return
+    print("Creating attachments table...")
+    Attachment.__table__.create(bind=engine, checkfirst=True)
+    print("✓ attachments table created")
+
+
+if __name__ == "__main__":
+    migrate()
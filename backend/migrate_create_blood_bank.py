@@ -0,0 +1,99 @@
+"""
+Migration: Create the blood bank
+- creates blood_units and blood_stock
+- adds the returned-unit quarantine columns to tables created before them
+- MySQL: makes blood_units.request_id ON DELETE SET NULL, so deleting a request
+  its returned units still point to does not fail
+- adds the blood request queue indexes to blood_transfusion_requests
+  (status, requested_at, id) and (ward_admission_id)
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.config import settings
+from app.core.database import engine
+import app.models  # Register all models
+from app.models.blood_bank import BloodStock, BloodUnit
+
+NEW_COLUMNS = [
+    ("blood_units", "returned_at", "DATETIME"),
+    ("blood_units", "checked_by", "INTEGER"),
+    ("blood_units", "checked_at", "DATETIME"),
+    ("blood_stock", "quarantined_units", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+REQUEST_FK_NAME = "fk_blood_units_request_id"
+
+NEW_INDEXES = [
+    ("ix_blood_requests_status_requested", "status, requested_at, id"),
+    ("ix_blood_transfusion_requests_ward_admission_id", "ward_admission_id"),
+]
+
+
+def migrate():
+    """Create the blood bank tables and the request queue indexes"""
+    inspector = inspect(engine)
+    if "blood_transfusion_types" not in inspector.get_table_names():
+        print("✓ blood_transfusion_types table does not exist yet - blood bank will be created with it")
+        return
+
+    for table in (BloodUnit.__table__, BloodStock.__table__):
+        print(f"Creating {table.name} table (if missing)...")
+        table.create(bind=engine, checkfirst=True)
+        print(f"✓ {table.name} table ready")
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, column_name, column_type in NEW_COLUMNS:
+            if column_name in [c["name"] for c in inspector.get_columns(table_name)]:
+                print(f"✓ {table_name}.{column_name} already exists")
+                continue
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+            print(f"✓ Added {table_name}.{column_name}")
+
+    _request_fk_set_null(inspector)
+
+    if "blood_transfusion_requests" not in inspector.get_table_names():
+        print("✓ blood_transfusion_requests table does not exist yet - indexes will be created with it")
+        return
+
+    existing_indexes = [i["name"] for i in inspector.get_indexes("blood_transfusion_requests")]
+    with engine.begin() as conn:
+        for index_name, columns in NEW_INDEXES:
+            if index_name in existing_indexes:
+                print(f"✓ Index {index_name} already exists")
+                continue
+            print(f"Creating index {index_name}...")
+            conn.execute(text(f"CREATE INDEX {index_name} ON blood_transfusion_requests ({columns})"))
+            print(f"✓ Created index {index_name}")
+
+
+def _request_fk_set_null(inspector):
+    """Recreate the blood_units.request_id foreign key with ON DELETE SET NULL (MySQL only)"""
+    if settings.DATABASE_MODE.lower() != "mysql":
+        print("✓ SQLite - blood_units.request_id foreign key left as created (the delete endpoint clears it)")
+        return
+    for fk in inspector.get_foreign_keys("blood_units"):
+        if fk["constrained_columns"] != ["request_id"]:
+            continue
+        if (fk.get("options") or {}).get("ondelete", "").upper() == "SET NULL":
+            print("✓ blood_units.request_id foreign key already ON DELETE SET NULL")
+            return
+        print(f"Recreating foreign key {fk['name']} with ON DELETE SET NULL...")
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE blood_units DROP FOREIGN KEY {fk['name']}"))
+            conn.execute(text(
+                f"ALTER TABLE blood_units ADD CONSTRAINT {REQUEST_FK_NAME} FOREIGN KEY (request_id) "
+                "REFERENCES blood_transfusion_requests (id) ON DELETE SET NULL"
+            ))
+        print("✓ blood_units.request_id foreign key is ON DELETE SET NULL")
+        return
+    print("✓ blood_units.request_id has no foreign key to update")
+
+
+if __name__ == "__main__":
+    migrate()
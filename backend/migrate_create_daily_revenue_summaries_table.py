@@ -0,0 +1,45 @@
+"""
+Migration: Create daily_revenue_summaries table and backfill it from existing receipts
+The table holds running cashier totals per day, service group and payment method.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import func
+from app.core.database import engine, SessionLocal
+import app.models  # Register all models (users, bills, receipts) for foreign keys
+from app.models.bill import Receipt
+from app.models.revenue_summary import DailyRevenueSummary
+from app.services.revenue_summary import rebuild_revenue_summary
+
+
+def migrate():
+    """Create daily_revenue_summaries table and backfill history"""
+    print("Creating daily_revenue_summaries table...")
+    DailyRevenueSummary.__table__.create(bind=engine, checkfirst=True)
+    print("✓ daily_revenue_summaries table ready")
+    
+    db = SessionLocal()
+    try:
+        first_issued, last_issued = db.query(func.min(Receipt.issued_at), func.max(Receipt.issued_at)).one()
+        last_refunded = db.query(func.max(Receipt.refunded_at)).scalar()
+        if not first_issued:
+            print("No receipts found - nothing to backfill")
+            return
+        last = max(d for d in (last_issued, last_refunded) if d is not None)
+        print(f"Backfilling revenue summary from {first_issued.date()} to {last.date()}...")
+        rows = rebuild_revenue_summary(db, first_issued.date(), last.date())
+        db.commit()
+        print(f"✓ Wrote {rows} summary rows")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
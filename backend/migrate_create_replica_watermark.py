@@ -0,0 +1,39 @@
+"""
+Migration: Create the replica_sync_watermark table on the read replica
+The table lives in the database DatabaseSyncService copies to (REPLICA_DATABASE_URL,
+or SYNC_DATABASE_URL); the sync creates it on its next run anyway, this just
+makes it exist before then. Until a sync completes, reports keep reading the primary.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect
+from app.core.database import create_db_engine
+from app.core.read_replica import ReplicaRouter
+import app.models  # Register all models
+from app.models.replica_watermark import ReplicaSyncWatermark
+
+
+def migrate():
+    """Create the replica_sync_watermark table on the replica"""
+    url = ReplicaRouter.configured_url()
+    if not url:
+        print("✓ Read replica not enabled (REPLICA_ENABLED) - nothing to do")
+        return
+    replica_engine = create_db_engine(url)
+    try:
+        if "replica_sync_watermark" in inspect(replica_engine).get_table_names():
+            print("✓ replica_sync_watermark table already exists")
+            return
+        print("Creating replica_sync_watermark table on the replica...")
+        ReplicaSyncWatermark.__table__.create(bind=replica_engine, checkfirst=True)
+        print("✓ replica_sync_watermark table created")
+    finally:
+        replica_engine.dispose()
+
+
+if __name__ == "__main__":
+    migrate()
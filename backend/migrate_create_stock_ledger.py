@@ -0,0 +1,76 @@
+"""
+Migration: Create the inventory stock ledger
+- backfills requesting_ward on old inventory debits from their ward admission
+  and marks debits with no release status as not released, so the pharmacy
+  queue filters are plain column comparisons
+- adds the release queue / ledger indexes to inpatient_inventory_debits
+- creates ward_stock_balances and fills it from the existing debits
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine, SessionLocal
+import app.models  # Register all models
+from app.models.ward_stock_balance import WardStockBalance
+from app.services.stock_ledger import rebuild_stock_ledger
+
+NEW_INDEXES = [
+    ("ix_inventory_debits_released_ward_used", "is_released, requesting_ward, used_at, id"),
+    ("ix_inventory_debits_released_used", "is_released, used_at, id"),
+    ("ix_inventory_debits_ward_product", "requesting_ward, product_code"),
+    ("ix_inpatient_inventory_debits_ward_admission_id", "ward_admission_id"),
+]
+
+
+def migrate():
+    """Backfill debits, add indexes, create and fill the stock ledger"""
+    inspector = inspect(engine)
+    if "inpatient_inventory_debits" not in inspector.get_table_names():
+        print("✓ inpatient_inventory_debits table does not exist yet - ledger will be created with it")
+        return
+
+    with engine.begin() as conn:
+        print("Backfilling requesting_ward and is_released on old inventory debits...")
+        result = conn.execute(text("""
+            UPDATE inpatient_inventory_debits
+            SET requesting_ward = (
+                SELECT ward_admissions.ward FROM ward_admissions
+                WHERE ward_admissions.id = inpatient_inventory_debits.ward_admission_id
+            )
+            WHERE requesting_ward IS NULL OR requesting_ward = ''
+        """))
+        print(f"✓ Backfilled requesting_ward on {result.rowcount} debit(s)")
+        result = conn.execute(text(
+            "UPDATE inpatient_inventory_debits SET is_released = 0 WHERE is_released IS NULL"
+        ))
+        print(f"✓ Set is_released on {result.rowcount} debit(s)")
+
+        existing_indexes = [i["name"] for i in inspector.get_indexes("inpatient_inventory_debits")]
+        for index_name, columns in NEW_INDEXES:
+            if index_name in existing_indexes:
+                print(f"✓ Index {index_name} already exists")
+                continue
+            print(f"Creating index {index_name}...")
+            conn.execute(text(f"CREATE INDEX {index_name} ON inpatient_inventory_debits ({columns})"))
+            print(f"✓ Created index {index_name}")
+
+    print(f"Creating {WardStockBalance.__tablename__} table (if missing)...")
+    WardStockBalance.__table__.create(bind=engine, checkfirst=True)
+    print(f"✓ {WardStockBalance.__tablename__} table ready")
+
+    print("Filling the stock ledger from inventory debits...")
+    db = SessionLocal()
+    try:
+        result = rebuild_stock_ledger(db)
+        db.commit()
+        print(f"✓ Stock ledger has {result['balances']} balance(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
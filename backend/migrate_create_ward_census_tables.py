@@ -0,0 +1,37 @@
+"""
+Migration: Create ward census tables
+- ward_census_events (admission / transfer / discharge / death event log)
+- ward_daily_census (per-ward, per-day census)
+Then backfills both from existing ward admissions and accepted transfers.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.core.database import engine, SessionLocal
+import app.models  # Register all models
+from app.models.ward_census import WardCensusEvent, WardDailyCensus
+from app.services.ward_census import rebuild_all_census
+
+
+def migrate():
+    """Create the ward census tables and backfill them"""
+    for model in (WardCensusEvent, WardDailyCensus):
+        print(f"Creating {model.__tablename__} table (if missing)...")
+        model.__table__.create(bind=engine, checkfirst=True)
+        print(f"✓ {model.__tablename__} table ready")
+
+    print("Backfilling ward census from ward admissions...")
+    db = SessionLocal()
+    try:
+        result = rebuild_all_census(db)
+        db.commit()
+        print(f"✓ Recorded {result['events']} event(s) across {result['wards']} ward(s), {result['census_rows']} census day(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,41 @@
+"""
+Migration: Reconcile bed occupancy with the active ward admissions
+Beds are now assigned with an atomic compare-and-set; this fixes is_occupied on
+beds left out of step by the previous check-then-set assignment and lists beds
+held by more than one active admission.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect
+from app.core.database import engine, SessionLocal
+
+
+def migrate():
+    """Recompute beds.is_occupied from ward_admissions"""
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+    if "beds" not in tables or "ward_admissions" not in tables:
+        print("✓ beds / ward_admissions tables do not exist yet - nothing to reconcile")
+        return
+
+    import app.models  # noqa: F401 - register all mappers
+    from app.services.bed_occupancy import reconcile_bed_occupancy
+
+    db = SessionLocal()
+    try:
+        result = reconcile_bed_occupancy(db)
+    finally:
+        db.close()
+    print(f"✓ Checked {result['beds']} beds")
+    print(f"✓ Marked occupied: {result['marked_occupied'] or 'none'}")
+    print(f"✓ Freed: {result['freed'] or 'none'}")
+    if result["shared_beds"]:
+        print(f"WARNING: Beds held by more than one active admission (transfer one patient): {result['shared_beds']}")
+
+
+if __name__ == "__main__":
+    migrate()
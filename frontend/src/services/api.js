@@ -27,6 +27,9 @@ const getApiBaseUrl = () => {
 
 const API_BASE_URL = getApiBaseUrl();
 
+// Investigation source as the result endpoints take it ('opd' / 'ipd'); pages also say 'inpatient' / 'outpatient'
+const resultSource = (source) => ({ opd: 'opd', outpatient: 'opd', ipd: 'ipd', inpatient: 'ipd' })[source];
+
 // Create axios instance
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -347,74 +350,84 @@ export const consultationAPI = {
     api.put(`/consultation/investigation/${investigationId}/revert-status`),
   revertInvestigationToRequested: (investigationId, reason) => 
     api.put(`/consultation/investigation/${investigationId}/revert-to-requested`, { reason }),
-  getLabResult: (investigationId) => 
-    api.get(`/consultation/lab-result/investigation/${investigationId}`),
-  saveSampleId: (investigationId, sampleId) =>
+  // source names the table investigationId belongs to ('opd' / 'ipd', or 'inpatient') - OPD and IPD ids overlap
+  getLabResult: (investigationId, source) => 
+    api.get(`/consultation/lab-result/investigation/${investigationId}`, { params: { source: resultSource(source) } }),
+  saveSampleId: (investigationId, sampleId, source) =>
     api.post('/consultation/lab-result/sample-id', {
       investigation_id: investigationId,
       sample_no: sampleId,
+      source: resultSource(source),
     }),
-  createLabResult: (formData) => 
-    api.post('/consultation/lab-result', formData, {
+  createLabResult: (formData, source) => {
+    if (source) formData.append('source', resultSource(source));
+    return api.post('/consultation/lab-result', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
-    }),
-  downloadLabResultAttachment: (investigationId, view = false) => 
+    });
+  },
+  downloadLabResultAttachment: (investigationId, view = false, source) => 
     api.get(`/consultation/lab-result/${investigationId}/download`, {
-      params: { view: view },
+      params: { view: view, source: resultSource(source) },
       responseType: 'blob',
     }),
-  deleteLabResultAttachment: (investigationId) => 
-    api.delete(`/consultation/lab-result/${investigationId}/attachment`),
-  getLabResultTemplateForInvestigation: (investigationId) =>
-    api.get(`/consultation/lab-result/investigation/${investigationId}/template`),
-  getScanResult: (investigationId) => 
-    api.get(`/consultation/scan-result/investigation/${investigationId}`),
-  createScanResult: (formData) => 
-    api.post('/consultation/scan-result', formData, {
+  deleteLabResultAttachment: (investigationId, source) => 
+    api.delete(`/consultation/lab-result/${investigationId}/attachment`, { params: { source: resultSource(source) } }),
+  getLabResultTemplateForInvestigation: (investigationId, source) =>
+    api.get(`/consultation/lab-result/investigation/${investigationId}/template`, { params: { source: resultSource(source) } }),
+  getScanResult: (investigationId, source) => 
+    api.get(`/consultation/scan-result/investigation/${investigationId}`, { params: { source: resultSource(source) } }),
+  createScanResult: (formData, source) => {
+    if (source) formData.append('source', resultSource(source));
+    return api.post('/consultation/scan-result', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
-    }),
-  downloadScanResultAttachment: (investigationId, attachmentPath, view = false) => {
+    });
+  },
+  downloadScanResultAttachment: (investigationId, attachmentPath, view = false, source) => {
     const url = `/consultation/scan-result/${investigationId}/download`;
     const params = {};
     if (attachmentPath) params.attachment_path = attachmentPath;
     if (view) params.view = true;
+    if (source) params.source = resultSource(source);
     return api.get(url, {
       params,
       responseType: 'blob',
     });
   },
-  deleteScanResultAttachment: (investigationId, attachmentPath) => {
+  deleteScanResultAttachment: (investigationId, attachmentPath, source) => {
     const url = `/consultation/scan-result/${investigationId}/attachment`;
     return api.delete(url, {
-      params: { attachment_path: attachmentPath },
+      params: { attachment_path: attachmentPath, source: resultSource(source) },
     });
   },
-  getXrayResult: (investigationId) => 
-    api.get(`/consultation/xray-result/investigation/${investigationId}`),
-  createXrayResult: (formData) => 
-    api.post('/consultation/xray-result', formData, {
+  getXrayResult: (investigationId, source) => 
+    api.get(`/consultation/xray-result/investigation/${investigationId}`, { params: { source: resultSource(source) } }),
+  createXrayResult: (formData, source) => {
+    if (source) formData.append('source', resultSource(source));
+    return api.post('/consultation/xray-result', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
-    }),
-  downloadXrayResultAttachment: (investigationId, attachmentPath, view = false) => {
+    });
+  },
+  downloadXrayResultAttachment: (investigationId, attachmentPath, view = false, source) => {
     const url = `/consultation/xray-result/${investigationId}/download`;
     const params = {};
     if (attachmentPath) params.attachment_path = attachmentPath;
     if (view) params.view = true;
+    if (source) params.source = resultSource(source);
     return api.get(url, {
       params,
       responseType: 'blob',
     });
   },
-  deleteXrayResultAttachment: (investigationId, attachmentPath) => {
+  deleteXrayResultAttachment: (investigationId, attachmentPath, source) => {
     const url = `/consultation/xray-result/${investigationId}/attachment`;
     return api.delete(url, {
-      params: { attachment_path: attachmentPath },
+      params: { attachment_path: attachmentPath, source: resultSource(source) },
     });
   },
   getAdmissionRecommendations: () => api.get('/consultation/admissions'),